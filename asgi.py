@@ -4,6 +4,7 @@ ASGI Application for Cloud Run WebSocket Support
 Uses Starlette for WebSocket + Flask WSGI wrapper
 BUILD 85: Google STT Fix + Conversation Memory + Auto Leads
 BUILD 189: Fixed to use asyncio.Queue instead of sync Queue for proper async behavior
+Media streams: MediaStreamBridge (server/services/media_bridge.py) - frames decoded once on the loop
 """
 import os
 import sys
@@ -23,6 +24,9 @@ from starlette.websockets import WebSocket
 from starlette.responses import PlainTextResponse
 from starlette.requests import Request
 
+from server.services.call_event_loop import get_shared_call_loop, is_async_engine_enabled
+from server.services.media_bridge import MediaStreamBridge
+
 # BUILD 168.2: Minimal startup logging
 log = logging.getLogger("asgi")
 
@@ -96,73 +100,6 @@ async def healthz_immediate(request: Request):
     """Immediate health check - no Flask required"""
     return PlainTextResponse("ok", status_code=200)
 
-class SyncWebSocketWrapper:
-    """
-    Makes async Starlette WebSocket work with sync MediaStreamHandler
-    Uses asyncio queues to bridge async/sync boundary
-    
-    🔥 CRITICAL FIX: Uses asyncio.Queue (not queue.Queue) to prevent blocking event loop
-    """
-    def __init__(self):
-        # Use asyncio.Queue for proper async behavior
-        self.recv_queue = asyncio.Queue(maxsize=500)  # async → sync (max 500 frames ~10s of audio)
-        self.send_queue = asyncio.Queue(maxsize=600)  # sync → async (max 600 frames ~12s buffer - handles AI latency)
-        self.running = True
-        self._loop = None
-        
-    def set_event_loop(self, loop):
-        """Set the event loop for this wrapper"""
-        self._loop = loop
-        
-    def receive(self):
-        """Sync receive - blocks until message available
-        This runs in a sync thread, so we use asyncio.run_coroutine_threadsafe
-        """
-        if not self._loop:
-            return None
-            
-        try:
-            # Get from async queue in sync context
-            future = asyncio.run_coroutine_threadsafe(
-                asyncio.wait_for(self.recv_queue.get(), timeout=120),
-                self._loop
-            )
-            msg = future.result(timeout=120)
-            if msg is None:
-                return None
-            return msg
-        except (asyncio.TimeoutError, Exception):
-            return None
-    
-    def send(self, data):
-        """Sync send - puts in queue for async sender
-        This runs in a sync thread, so we use asyncio.run_coroutine_threadsafe
-        """
-        if self.running and self._loop:
-            try:
-                # Put to async queue in sync context with timeout
-                future = asyncio.run_coroutine_threadsafe(
-                    asyncio.wait_for(self.send_queue.put(data), timeout=2.0),
-                    self._loop
-                )
-                future.result(timeout=2.0)
-            except (asyncio.TimeoutError, Exception):
-                pass  # Drop frame if queue is full (backpressure)
-    
-    async def async_stop(self):
-        """Stop wrapper - async version"""
-        self.running = False
-        try:
-            await asyncio.wait_for(self.recv_queue.put(None), timeout=1.0)
-        except:
-            pass
-    
-    def stop(self):
-        """Stop wrapper - sync version for thread"""
-        self.running = False
-        if self._loop:
-            asyncio.run_coroutine_threadsafe(self.async_stop(), self._loop)
-
 async def ws_twilio_media(websocket: WebSocket):
     """
     WebSocket handler for Twilio Media Streams
@@ -216,18 +153,18 @@ async def ws_twilio_media(websocket: WebSocket):
     print("[REALTIME] WebSocket connected: /ws/twilio-media", flush=True)
     twilio_log.info("[REALTIME] WebSocket connected: /ws/twilio-media")
     
-    # Create sync wrapper with event loop
-    print("[REALTIME] Creating SyncWebSocketWrapper...", flush=True)
-    twilio_log.info("[REALTIME] Creating SyncWebSocketWrapper...")
-    ws_wrapper = SyncWebSocketWrapper()
-    ws_wrapper.set_event_loop(asyncio.get_event_loop())
+    # Bridge to the sync handler thread (frames decoded once, batched hand-off)
+    print("[REALTIME] Creating MediaStreamBridge...", flush=True)
+    twilio_log.info("[REALTIME] Creating MediaStreamBridge...")
+    ws_wrapper = MediaStreamBridge(websocket)
+    ws_wrapper.bind_loop(asyncio.get_running_loop())
     handler_thread = None
     
     # 🔥 FIX: START event watchdog to close ghost sessions
     start_event_received = asyncio.Event()
     ghost_session_timeout = False  # Set to True when ghost session detected
     
-    print("[REALTIME] SyncWebSocketWrapper created - about to enter try block", flush=True)
+    print("[REALTIME] MediaStreamBridge created - about to enter try block", flush=True)
     
     try:
         print("[REALTIME] INSIDE try block - importing MediaStreamHandler...", flush=True)
@@ -259,86 +196,27 @@ async def ws_twilio_media(websocket: WebSocket):
                 pass
             return  # Exit handler - no point continuing without MediaStreamHandler
         
-        # Task 1: Receive from Starlette WS → put in async queue for sync handler
+        # Task 1: Starlette WS → decoded frames for the sync handler
+        def on_start():
+            print("[WS] START EVENT RECEIVED!", flush=True)
+            twilio_log.info(f"[WS] START EVENT RECEIVED! Forwarding to handler")
+            start_event_received.set()  # Signal that START was received
+        
         async def receive_loop():
-            nonlocal ghost_session_timeout
-            msg_count = 0
+            print("[REALTIME] receive_loop: STARTED", flush=True)
+            twilio_log.info("[WS] receive_loop started")
             try:
-                print("[REALTIME] receive_loop: STARTED", flush=True)
-                twilio_log.info("[WS] receive_loop started")
-                while ws_wrapper.running and not ghost_session_timeout:
-                    try:
-                        msg = await websocket.receive_json()
-                        msg_count += 1
-                        event_type = msg.get("event", "unknown")
-                        if event_type == "start":
-                            print("[WS] START EVENT RECEIVED!", flush=True)
-                            twilio_log.info(f"[WS] START EVENT RECEIVED! Forwarding to handler")
-                            start_event_received.set()  # Signal that START was received
-                        # Put to async queue (non-blocking with timeout)
-                        try:
-                            await asyncio.wait_for(
-                                ws_wrapper.recv_queue.put(json.dumps(msg)),
-                                timeout=1.0
-                            )
-                        except asyncio.TimeoutError:
-                            twilio_log.warning(f"[WS] recv_queue full, dropping message")
-                    except json.JSONDecodeError:
-                        try:
-                            _ = await websocket.receive_text()
-                        except Exception:
-                            pass
-                        continue
-                    except Exception as e:
-                        twilio_log.error(f"[WS] Receive error after {msg_count} msgs: {e}")
-                        break
+                await ws_wrapper.pump_in(on_start=on_start)
             finally:
-                twilio_log.info(f"[WS] receive_loop ended after {msg_count} messages")
-                await ws_wrapper.async_stop()
+                twilio_log.info(f"[WS] receive_loop ended: {ws_wrapper.stats()}")
         
-        # Task 2: Get from async queue → send to Starlette WS
+        # Task 2: handler sends → Starlette WS (drained in batches)
         async def send_loop():
+            print("[REALTIME] send_loop: STARTED", flush=True)
             try:
-                print("[REALTIME] send_loop: STARTED", flush=True)
-                error_count = 0
-                max_errors = 10
-                
-                while ws_wrapper.running and error_count < max_errors:
-                    try:
-                        # Get from async queue (non-blocking with timeout)
-                        data = await asyncio.wait_for(
-                            ws_wrapper.send_queue.get(),
-                            timeout=0.5
-                        )
-                        
-                        if data is None:
-                            break
-                        
-                        try:
-                            if isinstance(data, str):
-                                await websocket.send_text(data)
-                            else:
-                                await websocket.send_bytes(data)
-                            error_count = 0
-                        except Exception as send_err:
-                            error_count += 1
-                            if error_count >= max_errors:
-                                break
-                            await asyncio.sleep(0.05)
-                            
-                    except asyncio.TimeoutError:
-                        # No data available, continue
-                        await asyncio.sleep(0.01)
-                    except Exception as e:
-                        error_count += 1
-                        twilio_log.error(f"Send loop error: {e}")
-                        if error_count >= max_errors:
-                            break
-                        await asyncio.sleep(0.05)
+                await ws_wrapper.pump_out()
             except Exception as fatal:
                 twilio_log.error(f"Fatal send_loop error: {fatal}")
-            finally:
-                await ws_wrapper.async_stop()
         
         # Task 3: START event watchdog - closes ghost sessions after 3 seconds
         async def start_watchdog():
@@ -363,36 +241,54 @@ async def ws_twilio_media(websocket: WebSocket):
                 except Exception:
                     pass
         
-        # Task 4: MediaStreamHandler in background thread
+        # Task 4: MediaStreamHandler - a thread per call, or a task on the shared
+        # call loop (CALLS_ENGINE_MODE=async)
+        def create_handler():
+            print("[REALTIME] run_handler: STARTED - Getting Flask app...", flush=True)
+            twilio_log.info("[REALTIME] run_handler: STARTED - Getting Flask app...")
+            _ = get_flask_app()
+            print("[REALTIME] run_handler: Flask app ready - Creating MediaStreamHandler...", flush=True)
+            twilio_log.info("[REALTIME] run_handler: Flask app ready - Creating MediaStreamHandler...")
+            return MediaStreamHandler(ws_wrapper)
+        
+        def log_handler_error(e):
+            if isinstance(e, RuntimeError) and "Over capacity" in str(e):
+                # P2+Calls: Handle capacity overflow gracefully
+                error_msg = str(e)
+                print(f"[CALLS_OVER_CAPACITY] {error_msg}", flush=True)
+                twilio_log.warning(f"[CALLS_OVER_CAPACITY] {error_msg}")
+                # Close connection gracefully - no stuck sessions
+                return
+            if isinstance(e, RuntimeError):
+                twilio_log.exception(f"[REALTIME] MediaStreamHandler RuntimeError: {e}")
+            else:
+                twilio_log.exception(f"[REALTIME] MediaStreamHandler error: {e}")
+            import traceback
+            twilio_log.error(f"[REALTIME] Full traceback:\n{traceback.format_exc()}")
+        
         def run_handler():
             try:
-                print("[REALTIME] run_handler: STARTED - Getting Flask app...", flush=True)
-                twilio_log.info("[REALTIME] run_handler: STARTED - Getting Flask app...")
-                _ = get_flask_app()
-                print("[REALTIME] run_handler: Flask app ready - Creating MediaStreamHandler...", flush=True)
-                twilio_log.info("[REALTIME] run_handler: Flask app ready - Creating MediaStreamHandler...")
-                handler = MediaStreamHandler(ws_wrapper)
+                handler = create_handler()
                 print("[REALTIME] run_handler: MediaStreamHandler created - About to call handler.run()...", flush=True)
                 twilio_log.info("[REALTIME] run_handler: MediaStreamHandler created - Starting handler.run()...")
                 handler.run()
                 print("[REALTIME] run_handler: handler.run() completed normally", flush=True)
                 twilio_log.info("[REALTIME] run_handler: handler.run() completed normally")
-            except RuntimeError as capacity_error:
-                # P2+Calls: Handle capacity overflow gracefully
-                if "Over capacity" in str(capacity_error):
-                    error_msg = str(capacity_error)
-                    print(f"[CALLS_OVER_CAPACITY] {error_msg}", flush=True)
-                    twilio_log.warning(f"[CALLS_OVER_CAPACITY] {error_msg}")
-                    # Close connection gracefully - no stuck sessions
-                else:
-                    # Other RuntimeError - log and re-raise
-                    twilio_log.exception(f"[REALTIME] MediaStreamHandler RuntimeError: {capacity_error}")
-                    import traceback
-                    twilio_log.error(f"[REALTIME] Full traceback:\n{traceback.format_exc()}")
             except Exception as e:
-                twilio_log.exception(f"[REALTIME] MediaStreamHandler error: {e}")
-                import traceback
-                twilio_log.error(f"[REALTIME] Full traceback:\n{traceback.format_exc()}")
+                log_handler_error(e)
+            finally:
+                twilio_log.info("[REALTIME] run_handler: CLEANUP - stopping wrapper")
+                ws_wrapper.stop()
+        
+        async def run_handler_async():
+            try:
+                # Handler setup touches the DB - keep it off the shared loop
+                handler = await get_shared_call_loop().run_blocking(create_handler)
+                twilio_log.info("[REALTIME] run_handler: MediaStreamHandler created - Starting handler.run_async()...")
+                await handler.run_async()
+                twilio_log.info("[REALTIME] run_handler: handler.run_async() completed normally")
+            except Exception as e:
+                log_handler_error(e)
             finally:
                 twilio_log.info("[REALTIME] run_handler: CLEANUP - stopping wrapper")
                 ws_wrapper.stop()
@@ -418,7 +314,10 @@ async def ws_twilio_media(websocket: WebSocket):
             # Now start handler thread
             print("[REALTIME] run_all: Creating and starting handler thread...", flush=True)
             twilio_log.info("[REALTIME] run_all: Creating and starting handler thread...")
-            handler_thread = threading.Thread(target=run_handler, daemon=True)
+            if is_async_engine_enabled():
+                handler_thread = get_shared_call_loop().task(run_handler_async, name="TwilioReader")
+            else:
+                handler_thread = threading.Thread(target=run_handler, daemon=True)
             handler_thread.start()
             print("[REALTIME] run_all: Handler thread STARTED - waiting for loops to finish...", flush=True)
             twilio_log.info("[REALTIME] run_all: Handler thread started - waiting for loops...")
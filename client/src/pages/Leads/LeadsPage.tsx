@@ -441,6 +441,22 @@ export default function LeadsPage() {
     }
   };
 
+  // Poll a background export job until its download link is ready
+  const waitForExportJob = async (jobId: string): Promise<string> => {
+    for (;;) {
+      await new Promise((resolve) => setTimeout(resolve, 2000));
+      const job = await http.get<{ status: string; download_url?: string; error?: string }>(
+        `/api/leads/export/jobs/${jobId}`
+      );
+      if (job.status === 'finished' && job.download_url) {
+        return job.download_url;
+      }
+      if (job.status === 'failed' || job.status === 'canceled' || job.status === 'stopped') {
+        throw new Error(job.error || 'הייצוא נכשל');
+      }
+    }
+  };
+
   // 🔥 NEW: Export leads with current filters
   const handleExportLeads = async () => {
     setIsExporting(true);
@@ -472,14 +488,33 @@ export default function LeadsPage() {
 
       // Create download URL
       const url = `/api/leads/export?${params.toString()}`;
-      
+      const response = await fetch(url, { method: 'GET', credentials: 'include' });
+      if (!response.ok) {
+        const errorData = await response.json().catch(() => ({}));
+        throw new Error(errorData.error || 'שגיאה בייצוא הלידים');
+      }
+
+      let downloadUrl: string;
+      let revoke = false;
+      if (response.status === 202) {
+        // Large export runs as a background job - poll until the file is ready
+        const job = await response.json();
+        downloadUrl = await waitForExportJob(job.job_id);
+      } else {
+        downloadUrl = window.URL.createObjectURL(await response.blob());
+        revoke = true;
+      }
+
       // Trigger download by creating a temporary link
       const link = document.createElement('a');
-      link.href = url;
+      link.href = downloadUrl;
       link.download = `leads_export_${new Date().toISOString().split('T')[0]}.csv`;
       document.body.appendChild(link);
       link.click();
       document.body.removeChild(link);
+      if (revoke) {
+        window.URL.revokeObjectURL(downloadUrl);
+      }
       
       console.log('✅ Export started:', url);
     } catch (error: any) {
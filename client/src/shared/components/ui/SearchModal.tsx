@@ -206,6 +206,7 @@ export function SearchModal({ isOpen, onClose }: SearchModalProps) {
             leads: SearchResult[];
             calls: SearchResult[];
             whatsapp: SearchResult[];
+            messages?: SearchResult[];
             contacts: SearchResult[];
             pages: SearchResult[];
             settings: SearchResult[];
@@ -220,6 +221,7 @@ export function SearchModal({ isOpen, onClose }: SearchModalProps) {
           ...response.results.leads,
           ...response.results.calls,
           ...response.results.whatsapp,
+          ...(response.results.messages || []),
           ...response.results.contacts
         ];
         
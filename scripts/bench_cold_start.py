@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark: create_app() per SERVICE_ROLE
+
+Each run is a fresh interpreter (`python -c ...`) that imports
+server.app_factory and calls create_app(role=...), so nothing is shared
+between runs or roles. Per role it reports:
+- process wall time (interpreter start → app ready), median over runs
+- import time of server.app_factory and create_app() time, median
+- modules loaded, blueprints and URL rules registered
+- heavy SDKs that ended up in sys.modules (should load on first use instead)
+
+The child runs with migrations and the TTS warmup off and a scratch SQLite
+DATABASE_URL unless those are already set, so no database or Google
+credentials are needed.
+
+Exit code is non-zero if a role loads an SDK it must not load at boot
+(ROLE_FORBIDDEN_SDKS) or exceeds a --budget. With GITHUB_STEP_SUMMARY set
+(GitHub Actions) the table is also written to the job summary.
+
+Usage:
+    python scripts/bench_cold_start.py
+    python scripts/bench_cold_start.py --roles=calls,worker --runs=5
+    python scripts/bench_cold_start.py --budget=calls=4 --budget=worker=3
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+ROLES = ('api', 'calls', 'worker', 'scheduler')
+
+# Imported lazily (services/lazy_services.py) - seeing them after boot is a regression
+HEAVY_SDKS = ('openai', 'agents', 'playwright', 'google.genai', 'google.cloud.texttospeech',
+              'google.cloud.speech', 'sendgrid', 'reportlab', 'boto3', 'numpy')
+
+ROLE_FORBIDDEN_SDKS = {
+    'calls': ('agents', 'playwright'),
+    'worker': ('openai', 'agents', 'playwright'),
+    'scheduler': ('openai', 'agents', 'playwright'),
+}
+
+RESULT_MARK = "COLD_START_RESULT "
+
+CHILD_CODE = """
+import json, sys, time
+started = time.perf_counter()
+from server.app_factory import create_app
+imported = time.perf_counter()
+app = create_app(role=sys.argv[1])
+ready = time.perf_counter()
+print(%(mark)r + json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "create_ms": (ready - imported) * 1000,
+    "modules": len(sys.modules),
+    "blueprints": len(app.blueprints),
+    "rules": len(list(app.url_map.iter_rules())),
+    "sdks": [name for name in %(sdks)r if name in sys.modules],
+}), flush=True)
+""" % {"mark": RESULT_MARK, "sdks": HEAVY_SDKS}
+
+
+def child_env(role, scratch_dir):
+    """Environment for a cold-start child: no migrations, no TTS warmup, scratch DB"""
+    env = dict(os.environ)
+    env['SERVICE_ROLE'] = role
+    env['PYTHONPATH'] = ROOT + os.pathsep + env.get('PYTHONPATH', '')
+    env.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(scratch_dir, 'cold_start.db')}")
+    env.setdefault('RUN_MIGRATIONS', '0')
+    env.setdefault('DISABLE_TTS_WARMUP', 'true')
+    env.setdefault('OPENAI_API_KEY', 'cold-start-benchmark')
+    return env
+
+
+def run_once(role, scratch_dir, timeout):
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-c', CHILD_CODE, role], cwd=scratch_dir,
+                          env=child_env(role, scratch_dir), capture_output=True, text=True, timeout=timeout)
+    wall_ms = (time.perf_counter() - started) * 1000
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith(RESULT_MARK):
+            result = json.loads(line[len(RESULT_MARK):])
+            result['wall_ms'] = wall_ms
+            return result
+    tail = (proc.stderr or proc.stdout).strip().splitlines()[-5:]
+    raise RuntimeError(f"create_app(role={role!r}) failed (exit {proc.returncode}): " + " | ".join(tail))
+
+
+def bench_role(role, runs, timeout):
+    with tempfile.TemporaryDirectory(prefix=f"cold_start_{role}_") as scratch_dir:
+        try:
+            results = [run_once(role, scratch_dir, timeout) for _ in range(runs)]
+        except (RuntimeError, subprocess.TimeoutExpired) as e:
+            return {"role": role, "failed": str(e)}
+    last = results[-1]
+    return {
+        "role": role,
+        "failed": None,
+        "wall_ms": statistics.median(r['wall_ms'] for r in results),
+        "import_ms": statistics.median(r['import_ms'] for r in results),
+        "create_ms": statistics.median(r['create_ms'] for r in results),
+        "modules": last['modules'],
+        "blueprints": last['blueprints'],
+        "rules": last['rules'],
+        "sdks": last['sdks'],
+        "forbidden": [sdk for sdk in last['sdks'] if sdk in ROLE_FORBIDDEN_SDKS.get(role, ())],
+    }
+
+
+def parse_budgets(values):
+    budgets = {}
+    for value in values:
+        role, _, seconds = value.partition('=')
+        if role not in ROLES or not seconds:
+            raise SystemExit(f"--budget expects ROLE=SECONDS with ROLE in {ROLES}, got {value!r}")
+        budgets[role] = float(seconds)
+    return budgets
+
+
+def format_table(rows, budgets):
+    lines = [
+        "| role | wall ms | import ms | create_app ms | modules | blueprints | rules | heavy SDKs at boot | status |",
+        "|---|---:|---:|---:|---:|---:|---:|---|---|",
+    ]
+    for row in rows:
+        if row['failed']:
+            lines.append(f"| {row['role']} | | | | | | | | FAILED: {row['failed'][:120]} |")
+            continue
+        status = row['status']
+        lines.append(f"| {row['role']} | {row['wall_ms']:.0f} | {row['import_ms']:.0f} | {row['create_ms']:.0f} "
+                     f"| {row['modules']} | {row['blueprints']} | {row['rules']} "
+                     f"| {', '.join(row['sdks']) or '-'} | {status} |")
+    if budgets:
+        lines.append("")
+        lines.append("Budgets (wall seconds): " + ", ".join(f"{r}={s:g}" for r, s in budgets.items()))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start benchmark: create_app() per SERVICE_ROLE")
+    parser.add_argument("--roles", default=",".join(ROLES), help="comma-separated roles to measure")
+    parser.add_argument("--runs", type=int, default=3, help="fresh processes per role (median is reported)")
+    parser.add_argument("--budget", action="append", default=[], help="ROLE=SECONDS wall-time budget (repeatable)")
+    parser.add_argument("--timeout", type=float, default=180.0, help="seconds before a child run is abandoned")
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    args = parser.parse_args()
+
+    budgets = parse_budgets(args.budget)
+    roles = [r.strip() for r in args.roles.split(",") if r.strip()]
+    for role in roles:
+        if role not in ROLES:
+            raise SystemExit(f"unknown role {role!r} (expected one of {ROLES})")
+
+    rows = []
+    for role in roles:
+        row = bench_role(role, args.runs, args.timeout)
+        if not row['failed']:
+            problems = [f"loads {sdk}" for sdk in row['forbidden']]
+            if role in budgets and row['wall_ms'] > budgets[role] * 1000:
+                problems.append(f"over {budgets[role]:g}s budget")
+            row['status'] = "; ".join(problems) if problems else "ok"
+        rows.append(row)
+
+    table = format_table(rows, budgets)
+    print("=" * 100)
+    print(f"Cold start per SERVICE_ROLE - median of {args.runs} fresh processes")
+    print("=" * 100)
+    print(table)
+
+    summary_path = os.getenv("GITHUB_STEP_SUMMARY")
+    if summary_path:
+        with open(summary_path, "a") as f:
+            f.write(f"## Cold start per SERVICE_ROLE\n\n{table}\n\n")
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(rows, f, indent=2)
+
+    ok = all(not row['failed'] and row['status'] == "ok" for row in rows)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
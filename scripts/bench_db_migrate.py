@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Migration startup benchmark: one query per existence check vs the schema catalog snapshot
+
+Collects every literal check_table_exists / check_column_exists /
+check_index_exists / check_constraint_exists call in server/db_migrate.py and
+replays them twice against the same schema:
+
+- per-check: the old path - one information_schema / pg_catalog round trip each
+- snapshot: SchemaCatalog.load() (4 catalog queries + schema_migrations), then
+  every check answered from memory
+
+Both runs must give the same answer for every check (asserted).
+
+Without --database-url the schema is synthetic and every round trip costs
+--rtt-ms (the pooler round trip is what dominates startup, not the query).
+With --database-url the checks run against that database (read-only).
+
+Usage:
+    python scripts/bench_db_migrate.py
+    python scripts/bench_db_migrate.py --rtt-ms=8
+    python scripts/bench_db_migrate.py --database-url=postgresql://...
+"""
+import os
+import sys
+import ast
+import time
+import argparse
+
+# Add server to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from server import db_migrate  # noqa: E402
+
+CHECKS = ("check_table_exists", "check_column_exists", "check_index_exists", "check_constraint_exists")
+
+
+def collect_checks():
+    """Every check_* call in db_migrate.py whose arguments are all string literals"""
+    with open(db_migrate.__file__, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    calls = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in CHECKS:
+            if node.args and all(isinstance(a, ast.Constant) and isinstance(a.value, str) for a in node.args):
+                calls.append((node.func.id, tuple(a.value for a in node.args)))
+    return calls
+
+
+class SimulatedDB:
+    """A schema where roughly every other checked object exists; each query sleeps rtt"""
+
+    def __init__(self, calls, rtt):
+        self.rtt = rtt
+        self.queries = 0
+        self.tables, self.columns, self.indexes, self.constraints = set(), set(), set(), set()
+        for i, (name, args) in enumerate(calls):
+            if i % 2:
+                continue
+            if name == "check_table_exists":
+                self.tables.add(args[0])
+            elif name == "check_column_exists":
+                self.columns.add(args)
+            elif name == "check_index_exists":
+                self.indexes.add(args[0])
+            else:
+                self.constraints.add((args[0], args[1] if len(args) > 1 else "leads"))
+        # Plus the rest of a production-sized catalog that nobody asks about
+        for t in range(150):
+            self.tables.add(f"table_{t}")
+            self.columns.update((f"table_{t}", f"column_{c}") for c in range(20))
+            self.indexes.add(f"idx_table_{t}")
+
+    def _round_trip(self):
+        self.queries += 1
+        time.sleep(self.rtt)
+
+    def execute_with_retry(self, engine, sql, params=None, **kwargs):
+        self._round_trip()
+        params = params or {}
+        if "information_schema.columns" in sql:
+            hit = (params["table_name"], params["column_name"]) in self.columns
+        elif "information_schema.tables" in sql:
+            hit = params["table_name"] in self.tables
+        elif "pg_indexes" in sql:
+            hit = params["index_name"] in self.indexes
+        elif "to_regclass" in sql:
+            hit = (params["constraint_name"], params["table_name"].split(".", 1)[1]) in self.constraints
+        else:
+            hit = any(name == params["constraint_name"] for name, _ in self.constraints)
+        return [("x",)] if hit else []
+
+    def fetch_all(self, engine, sql, params=None, retries=4):
+        self._round_trip()
+        if "information_schema.tables" in sql:
+            return [(t,) for t in self.tables]
+        if "information_schema.columns" in sql:
+            return list(self.columns)
+        if "pg_indexes" in sql:
+            return [(i,) for i in self.indexes]
+        if "pg_constraint" in sql:
+            return list(self.constraints)
+        return []
+
+
+def replay(calls):
+    return [getattr(db_migrate, name)(*args) for name, args in calls]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migration existence checks: per-check queries vs catalog snapshot")
+    parser.add_argument("--rtt-ms", type=float, default=3.0, help="simulated DB round trip")
+    parser.add_argument("--database-url", default=None, help="run the checks against a real database instead")
+    args = parser.parse_args()
+
+    calls = collect_checks()
+    if args.database_url:
+        from sqlalchemy import create_engine
+        engine = create_engine(args.database_url, pool_pre_ping=True)
+        db_migrate.get_migrate_engine = lambda: engine
+        counter = None
+    else:
+        engine = None
+        counter = SimulatedDB(calls, args.rtt_ms / 1000)
+        db_migrate.get_migrate_engine = lambda: None
+        db_migrate.execute_with_retry = counter.execute_with_retry
+        db_migrate.fetch_all = counter.fetch_all
+
+    t0 = time.perf_counter()
+    direct = replay(calls)
+    direct_s = time.perf_counter() - t0
+    direct_queries = counter.queries if counter else len(calls)
+
+    if counter:
+        counter.queries = 0
+    t0 = time.perf_counter()
+    catalog = db_migrate.activate_schema_catalog(engine)
+    snapshot = replay(calls)
+    snapshot_s = time.perf_counter() - t0
+    db_migrate.deactivate_schema_catalog()
+    snapshot_queries = counter.queries if counter else catalog.loads * 5
+
+    mismatches = [(call, a, b) for call, a, b in zip(calls, direct, snapshot) if a != b]
+    assert not mismatches, f"snapshot disagrees with direct checks: {mismatches[:5]}"
+
+    source = args.database_url.split("@")[-1] if args.database_url else f"simulated, rtt {args.rtt_ms}ms"
+    print(f"{len(calls)} existence checks in db_migrate.py ({source})")
+    print(f"\n{'mode':<10} {'queries':>8} {'time':>10}")
+    print("-" * 30)
+    print(f"{'per-check':<10} {direct_queries:>8} {direct_s * 1000:>8.0f}ms")
+    print(f"{'snapshot':<10} {snapshot_queries:>8} {snapshot_s * 1000:>8.0f}ms "
+          f"(load {catalog.load_seconds * 1000:.0f}ms)")
+    print(f"\nspeedup: {direct_s / max(snapshot_s, 1e-6):,.1f}x; every check gave the same answer")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
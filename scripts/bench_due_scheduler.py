@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Scheduler benchmark: DB polling ticks vs server.services.due_scheduler
+
+Registers synthetic due items (scheduled WhatsApp messages) in a scratch Redis
+sorted set with due times spread over a window, then runs the scheduler's due
+loop (pop_due + seconds_until_next_due, SCHEDULER_DUE_POLL_MS) and records how
+late each item was dispatched relative to its due time.
+
+Reports:
+- Due-item latency p50/p95/max for the due index (measured) and for polling
+  ticks (modelled: an item waits for the next tick, uniform over the interval)
+- DB queries per hour by due-item rate: polling runs the claim queries every
+  tick whether or not anything is due; the due index only queries per
+  dispatched batch plus the reconcile ticks every SCHEDULER_RECONCILE_MINUTES
+
+Needs a REDIS_URL (data goes to key "scheduler:due:bench", deleted afterwards).
+
+Usage:
+    REDIS_URL=redis://localhost:6379/0 python scripts/bench_due_scheduler.py
+    python scripts/bench_due_scheduler.py --items=2000 --window=30 --poll-ms=250
+    python scripts/bench_due_scheduler.py --tick=90 --reconcile-minutes=10
+"""
+import os
+import sys
+import math
+import time
+import random
+import argparse
+import statistics
+
+# Add server to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import redis  # noqa: E402
+
+from server.services import due_scheduler  # noqa: E402
+
+KEY = "scheduler:due:bench"
+# Queries per tick of the two DB-polling tick jobs (scheduled messages claim +
+# appointment automation pending-runs select), and per due-index batch (claim +
+# fetch of the claimed rows)
+TICK_QUERIES = 2
+BATCH_QUERIES = 2
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def run_due_loop(conn, due_at, poll_seconds):
+    """Run the scheduler due loop until every item is dispatched; returns (latencies, batches)"""
+    latencies = []
+    batches = 0
+    remaining = len(due_at)
+    while remaining:
+        now = time.time()
+        while True:
+            members = due_scheduler.pop_due(conn, now=now, key=KEY)
+            if not members:
+                break
+            dispatched_at = time.time()
+            batches += 1
+            remaining -= len(members)
+            latencies.extend(dispatched_at - due_at[m.decode() if isinstance(m, bytes) else m] for m in members)
+            if len(members) < due_scheduler.POP_BATCH:
+                break
+        next_due = due_scheduler.seconds_until_next_due(conn, now=time.time(), key=KEY)
+        if remaining:
+            time.sleep(poll_seconds if next_due is None else min(poll_seconds, next_due))
+    return latencies, batches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scheduler benchmark (DB polling ticks vs Redis due index)")
+    parser.add_argument("--items", type=int, default=1000, help="due items to register")
+    parser.add_argument("--window", type=float, default=20.0, help="seconds over which items become due")
+    parser.add_argument("--poll-ms", type=int, default=250, help="due loop poll interval (SCHEDULER_DUE_POLL_MS)")
+    parser.add_argument("--tick", type=float, default=60.0,
+                        help="polling tick interval in seconds (legacy ticks: every minute)")
+    parser.add_argument("--reconcile-minutes", type=int, default=5, help="SCHEDULER_RECONCILE_MINUTES")
+    args = parser.parse_args()
+
+    redis_url = os.getenv("REDIS_URL")
+    if not redis_url:
+        print("REDIS_URL is required")
+        return 1
+    conn = redis.from_url(redis_url)
+    conn.delete(KEY)
+
+    start = time.time() + 0.5
+    due_at = {f"scheduled_msg:{i}": start + random.uniform(0, args.window) for i in range(args.items)}
+    conn.zadd(KEY, due_at)
+    print(f"Registered {args.items:,} items due over {args.window:.0f}s, polling every {args.poll_ms}ms...")
+
+    try:
+        latencies, batches = run_due_loop(conn, due_at, args.poll_ms / 1000.0)
+    finally:
+        conn.delete(KEY)
+
+    due_ms = [latency * 1000 for latency in latencies]
+    tick_ms = [random.uniform(0, args.tick) * 1000 for _ in range(args.items)]
+
+    print(f"\n{'latency':<14} {'p50':>10} {'p95':>10} {'max':>10}")
+    print("-" * 46)
+    print(f"{'polling ' + str(int(args.tick)) + 's':<14} {statistics.median(tick_ms):>8.0f}ms "
+          f"{percentile(tick_ms, 0.95):>8.0f}ms {max(tick_ms):>8.0f}ms   (modelled)")
+    print(f"{'due index':<14} {statistics.median(due_ms):>8.1f}ms "
+          f"{percentile(due_ms, 0.95):>8.1f}ms {max(due_ms):>8.1f}ms   ({batches} batches)")
+
+    # Queries per hour: polling pays every tick; the due index pays per non-empty
+    # poll (items due within one poll share a batch) plus the reconcile ticks
+    poll = args.poll_ms / 1000.0
+    polls_per_hour = 3600 / poll
+    polling_queries = TICK_QUERIES * 3600 / args.tick
+    print(f"\n{'due items/hour':<16} {'polling ' + str(int(args.tick)) + 's':>14} {'due index':>12}   DB queries/hour")
+    print("-" * 46)
+    for per_hour in (0, 60, 600, 6000, 60000):
+        due_batches = polls_per_hour * (1 - math.exp(-per_hour / polls_per_hour))
+        due_queries = BATCH_QUERIES * due_batches + TICK_QUERIES * 60 / args.reconcile_minutes
+        print(f"{per_hour:<16,} {polling_queries:>14,.0f} {due_queries:>12,.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
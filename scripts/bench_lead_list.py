@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Leads list benchmark: OFFSET + count() vs keyset cursor + lead_counters
+
+Generates one large tenant (default 2M leads, 8 statuses, 6 sources) plus a
+few small ones in a scratch schema, builds the keyset indexes from
+db_indexes.py, seeds lead_counters with the reconciler's recount and times
+what GET /api/leads runs for:
+
+- page 1, page 100 and page 20,000 (the last) of the unfiltered list
+- the same pages with a status filter (kanban column)
+- the total for a status / source filter (count() vs counters)
+
+Reports p50/p95 latency per query. Needs a Postgres DATABASE_URL (data goes to
+schema "lead_list_bench", dropped with --drop).
+
+Usage:
+    DATABASE_URL=postgresql://... python scripts/bench_lead_list.py
+    python scripts/bench_lead_list.py --rows=2000000 --page-size=50 --runs=10
+    python scripts/bench_lead_list.py --drop
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+# Add server to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, text  # noqa: E402
+
+from server.db_indexes import INDEX_DEFS  # noqa: E402
+from server.services.lead_counters import _RECOUNT_SQL, _SET_COUNT_SQL, LeadCounts  # noqa: E402
+
+SCHEMA = "lead_list_bench"
+BATCH = 200_000
+TENANT = 1
+SMALL_TENANTS = 3
+STATUSES = ["new", "attempting", "contacted", "qualified", "won", "lost", "unqualified", "no_answer"]
+SOURCES = ["call", "whatsapp", "form", "manual", "imported_outbound", "webhook"]
+KEYSET_INDEXES = ("idx_leads_tenant_created_id", "idx_leads_tenant_lower_status_created_id")
+
+OFFSET_PAGE_SQL = """
+    SELECT id FROM leads WHERE tenant_id = :tenant {where}
+    ORDER BY created_at DESC LIMIT :limit OFFSET :offset
+"""
+COUNT_SQL = "SELECT count(id) FROM leads WHERE tenant_id = :tenant {where}"
+KEYSET_PAGE_SQL = """
+    SELECT id, created_at FROM leads WHERE tenant_id = :tenant {where}
+      AND created_at IS NOT NULL AND (created_at, id) < (:created_at, :id)
+    ORDER BY created_at DESC, id DESC LIMIT :limit
+"""
+COUNTERS_SQL = "SELECT status, source, lead_count FROM lead_counters WHERE tenant_id = :tenant"
+
+
+def pg_array(values):
+    return "ARRAY[" + ", ".join("'" + v + "'" for v in values) + "]"
+
+
+def setup(engine, rows: int):
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {SCHEMA}"))
+        conn.execute(text(f"SET search_path TO {SCHEMA}, public"))
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS leads (
+                id serial PRIMARY KEY,
+                tenant_id integer NOT NULL,
+                status varchar(32), source varchar(32),
+                created_at timestamp
+            )
+        """))
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS lead_counters (
+                tenant_id integer NOT NULL, status varchar(32) NOT NULL, source varchar(32) NOT NULL,
+                lead_count integer NOT NULL DEFAULT 0, updated_at timestamp, reconciled_at timestamp,
+                PRIMARY KEY (tenant_id, status, source)
+            )
+        """))
+        total = rows + SMALL_TENANTS * 1000
+        existing = conn.execute(text("SELECT count(*) FROM leads")).scalar()
+        if existing != total:
+            print(f"Generating {rows:,} leads for tenant {TENANT} + {SMALL_TENANTS} small tenants...")
+            conn.execute(text("TRUNCATE leads RESTART IDENTITY"))
+            start = time.perf_counter()
+            for lo in range(1, total + 1, BATCH):
+                hi = min(lo + BATCH - 1, total)
+                conn.execute(text(f"""
+                    INSERT INTO leads (tenant_id, status, source, created_at)
+                    SELECT CASE WHEN g <= {rows} THEN {TENANT} ELSE 2 + g % {SMALL_TENANTS} END,
+                           ({pg_array(STATUSES)})[1 + (g * 7) % {len(STATUSES)}],
+                           ({pg_array(SOURCES)})[1 + (g * 13) % {len(SOURCES)}],
+                           timestamp '2026-01-01' + (g || ' seconds')::interval
+                    FROM generate_series({lo}, {hi}) AS g
+                """))
+                print(f"  {hi:,}/{total:,}", end="\r", flush=True)
+            print(f"\n  done in {time.perf_counter() - start:.1f}s")
+
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_leads_created ON leads(created_at)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_leads_tenant ON leads(tenant_id)"))
+        for index_def in INDEX_DEFS:
+            if index_def["name"] in KEYSET_INDEXES:
+                start = time.perf_counter()
+                conn.execute(text(index_def["sql"].replace(" CONCURRENTLY", "")))
+                print(f"  index {index_def['name']}: {time.perf_counter() - start:.1f}s")
+        conn.execute(text("ANALYZE leads"))
+
+    # Seed the counters the way the reconciler does
+    with engine.begin() as conn:
+        conn.execute(text(f"SET search_path TO {SCHEMA}, public"))
+        conn.execute(text("TRUNCATE lead_counters"))
+        for tenant_id in range(1, 2 + SMALL_TENANTS):
+            counts = conn.execute(_RECOUNT_SQL, {"tenant_id": tenant_id}).all()
+            if counts:
+                conn.execute(_SET_COUNT_SQL, [
+                    {"tenant_id": tenant_id, "status": r.status, "source": r.source,
+                     "lead_count": r.lead_count, "now": "2026-01-01"} for r in counts
+                ])
+
+
+def timed(conn, sql, params, runs: int):
+    samples, result = [], None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = conn.execute(text(sql), params).fetchall()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[min(len(samples) - 1, int(0.95 * len(samples)))], result
+
+
+def keyset_anchor(conn, where, params, offset):
+    """(created_at, id) of the row just before the page - what the client's cursor holds"""
+    if offset == 0:
+        return {"created_at": "infinity", "id": 0}
+    row = conn.execute(text(f"""
+        SELECT created_at, id FROM leads WHERE tenant_id = :tenant {where}
+        ORDER BY created_at DESC, id DESC LIMIT 1 OFFSET :offset
+    """), {**params, "offset": offset - 1}).one()
+    return {"created_at": row.created_at, "id": row.id}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Leads list benchmark (OFFSET + count vs keyset + counters)")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--drop", action="store_true", help="Drop the benchmark schema and exit")
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        print("DATABASE_URL is required (Postgres)")
+        return 1
+    engine = create_engine(database_url)
+
+    if args.drop:
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        print(f"Dropped schema {SCHEMA}")
+        return 0
+
+    setup(engine, args.rows)
+
+    size = args.page_size
+    last_page = max(1, args.rows // size)
+    filters = [
+        ("all", "", {}),
+        ("status=qualified", "AND lower(status) = :status", {"status": "qualified"}),
+    ]
+
+    print(f"\n{'page':<28} {'offset p50':>11} {'p95':>9} {'keyset p50':>11} {'p95':>9} {'speedup':>8}")
+    print("-" * 80)
+    with engine.connect() as conn:
+        conn.execute(text(f"SET search_path TO {SCHEMA}, public"))
+        for label, where, extra in filters:
+            params = {"tenant": TENANT, "limit": size, **extra}
+            pages = [1, 100, last_page if not extra else last_page // len(STATUSES)]
+            for page in pages:
+                offset = (page - 1) * size
+                legacy = timed(conn, OFFSET_PAGE_SQL.format(where=where), {**params, "offset": offset}, args.runs)
+                anchor = keyset_anchor(conn, where, params, offset)
+                keyset = timed(conn, KEYSET_PAGE_SQL.format(where=where), {**params, **anchor}, args.runs)
+                assert [r.id for r in legacy[2]] == [r.id for r in keyset[2]], "pages differ"
+                print(f"{label + ' page ' + format(page, ','):<28} {legacy[0]:>9.1f}ms {legacy[1]:>7.1f}ms "
+                      f"{keyset[0]:>9.1f}ms {keyset[1]:>7.1f}ms {legacy[0] / max(keyset[0], 1e-3):>7.1f}x")
+
+        print(f"\n{'total':<28} {'count() p50':>11} {'p95':>9} {'counters p50':>12} {'p95':>8} {'speedup':>8}")
+        print("-" * 80)
+        totals = [
+            ("all", "", {}, None, None),
+            ("status=qualified", "AND lower(status) = :status", {"status": "qualified"}, ["qualified"], None),
+            ("source=whatsapp", "AND source = :source", {"source": "whatsapp"}, None, ["whatsapp"]),
+        ]
+        for label, where, extra, statuses, sources in totals:
+            exact = timed(conn, COUNT_SQL.format(where=where), {"tenant": TENANT, **extra}, args.runs)
+            counters = timed(conn, COUNTERS_SQL, {"tenant": TENANT}, args.runs)
+            counted = LeadCounts({(r.status, r.source): r.lead_count for r in counters[2]})
+            assert counted.count(statuses=statuses, sources=sources) == exact[2][0][0], "counters drifted"
+            print(f"{label:<28} {exact[0]:>9.1f}ms {exact[1]:>7.1f}ms {counters[0]:>10.2f}ms {counters[1]:>6.2f}ms "
+                  f"{exact[0] / max(counters[0], 1e-3):>7.0f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
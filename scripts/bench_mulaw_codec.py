@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+μ-law codec benchmark: server.services.mulaw_fast vs audioop
+
+audioop is removed in Python 3.13 (audioop-lts backport is used when present).
+Measures the per-20ms-frame operations on the Twilio media path:
+
+- decode:    μ-law → PCM16 (160 bytes)
+- b64dec:    base64 payload → PCM16 (fused)
+- encode:    PCM16 → μ-law (320 bytes)
+- 8k→16k:    resample for Gemini input
+- 24k→8k:    resample for Gemini output (480 samples)
+- rms:       noise gate RMS
+
+Usage:
+    python scripts/bench_mulaw_codec.py
+    python scripts/bench_mulaw_codec.py --iterations=50000
+"""
+import os
+import sys
+import time
+import base64
+import argparse
+
+import numpy as np
+
+# Add server to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from server.services import mulaw_fast  # noqa: E402
+
+
+def bench(fn, iterations: int) -> float:
+    """Return mean microseconds per call"""
+    for _ in range(min(1000, iterations)):
+        fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="μ-law codec benchmark")
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    it = args.iterations
+
+    rng = np.random.default_rng(42)
+    mulaw = rng.integers(0, 256, 160, dtype=np.uint8).tobytes()
+    payload = base64.b64encode(mulaw).decode("ascii")
+    pcm_8k = rng.integers(-12000, 12000, 160).astype(np.int16).tobytes()
+    pcm_24k = rng.integers(-12000, 12000, 480).astype(np.int16).tobytes()
+
+    pcm_buf = np.empty(160, dtype=np.int16)
+    mulaw_buf = np.empty(160, dtype=np.uint8)
+    pcm_arr = np.frombuffer(pcm_8k, dtype=np.int16)
+
+    cases = [
+        ("decode", lambda: mulaw_fast.mulaw_to_pcm16_fast(mulaw),
+         lambda: mulaw_fast.ulaw_decode(mulaw, out=pcm_buf), "ulaw2lin"),
+        ("b64dec", lambda: mulaw_fast.b64_mulaw_to_pcm16(payload),
+         lambda: mulaw_fast.b64_mulaw_decode(payload, out=pcm_buf), "b64decode+ulaw2lin"),
+        ("encode", lambda: mulaw_fast.pcm16_to_mulaw_fast(pcm_8k),
+         lambda: mulaw_fast.ulaw_encode(pcm_arr, out=mulaw_buf), "lin2ulaw"),
+        ("8k→16k", lambda: mulaw_fast.ratecv_fast(pcm_8k, 8000, 16000), None, "ratecv"),
+        ("24k→8k", lambda: mulaw_fast.ratecv_fast(pcm_24k, 24000, 8000), None, "ratecv"),
+        ("rms", lambda: mulaw_fast.pcm16_rms(pcm_arr), None, "rms"),
+    ]
+
+    try:
+        import audioop
+    except ImportError:
+        audioop = None
+
+    reference = {}
+    if audioop is not None:
+        reference = {
+            "decode": lambda: audioop.ulaw2lin(mulaw, 2),
+            "b64dec": lambda: audioop.ulaw2lin(base64.b64decode(payload), 2),
+            "encode": lambda: audioop.lin2ulaw(pcm_8k, 2),
+            "8k→16k": lambda: audioop.ratecv(pcm_8k, 2, 1, 8000, 16000, None)[0],
+            "24k→8k": lambda: audioop.ratecv(pcm_24k, 2, 1, 24000, 8000, None)[0],
+            "rms": lambda: audioop.rms(pcm_8k, 2),
+        }
+
+    print("=" * 80)
+    print(f"μ-law codec benchmark - {it} iterations per case (µs per 20ms frame)")
+    print("=" * 80)
+    print(f"{'case':<8} {'numpy':>9} {'numpy out=':>11} {'audioop':>9}   match")
+    for name, fn, fn_into, _ in cases:
+        numpy_us = bench(fn, it)
+        into_us = bench(fn_into, it) if fn_into else float("nan")
+        if name in reference:
+            ref_us = bench(reference[name], it)
+            ref_val = reference[name]()
+            val = fn()
+            match = "yes" if val == ref_val else "NO"
+            print(f"{name:<8} {numpy_us:9.2f} {into_us:11.2f} {ref_us:9.2f}   {match}")
+        else:
+            print(f"{name:<8} {numpy_us:9.2f} {into_us:11.2f} {'n/a':>9}   -")
+
+    if audioop is None:
+        print("-" * 80)
+        print("audioop not available on this Python - numpy timings only")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Receipt preview rendering benchmark: browser per preview vs the browser pool
+
+Renders the receipt fixtures (server/tests/fixtures/receipts/*.html) to PNG
+and reports previews/minute and the peak RSS of this process plus every
+child process (Chromium and its renderers):
+- per-preview: sync_playwright() + chromium.launch() + new_page() for every
+               preview, --concurrency at a time (the old path behind
+               playwright_semaphore(2))
+- pool:        BrowserPool(size=--concurrency) with --concurrency callers
+- pdf:         the no-browser fast path, generate_pdf_thumbnail() on one-page
+               PDF receipts (needs PyMuPDF)
+
+--capture=quick loads the HTML and screenshots it, so the numbers are browser
+startup + page cost. --capture=full runs _capture_receipt_png(), the
+production capture with its fixed stabilization waits (~3.5s per preview).
+
+The pool numbers assume one long-lived process, as in the RQ worker for the
+RQ_IN_PROCESS_QUEUES queues (see server/worker.py). A job on a forking queue
+starts a new pool, so a job rendering one preview pays the launch like per-preview.
+
+Without Playwright, --simulate swaps Chromium for a child process that takes
+--launch-ms to start, holds --browser-mb of memory, and spends --render-ms per
+preview. This shows how the pool behaves, not how fast Chromium is.
+
+Usage:
+    python scripts/bench_preview_render.py
+    python scripts/bench_preview_render.py --previews=60 --concurrency=2 --capture=full
+    python scripts/bench_preview_render.py --simulate --launch-ms=900 --browser-mb=250
+"""
+import os
+import re
+import sys
+import time
+import logging
+import argparse
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_gmail_api import make_pdf  # noqa: E402
+from server.services.browser_pool import CHROMIUM_ARGS, BrowserPool  # noqa: E402
+from server.services.lazy_services import sdk_available  # noqa: E402
+
+FIXTURES_DIR = Path(__file__).resolve().parent.parent / 'server' / 'tests' / 'fixtures' / 'receipts'
+VIEWPORT = {'width': 1280, 'height': 720}
+
+
+# ─── Memory ───────────────────────────────────────────────
+
+def process_tree_rss_mb(root=None):
+    """RSS of `root` (default: this process) and all its descendants, from /proc"""
+    root = root or os.getpid()
+    children, rss_kb = {}, {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/status') as f:
+                status = f.read()
+        except OSError:
+            continue
+        ppid = re.search(r'^PPid:\s+(\d+)', status, re.M)
+        rss = re.search(r'^VmRSS:\s+(\d+)', status, re.M)
+        if ppid:
+            children.setdefault(int(ppid.group(1)), []).append(int(entry))
+        rss_kb[int(entry)] = int(rss.group(1)) if rss else 0
+    total, stack = 0, [root]
+    while stack:
+        pid = stack.pop()
+        total += rss_kb.get(pid, 0)
+        stack.extend(children.get(pid, []))
+    return total / 1024
+
+
+class PeakRss:
+    """Samples process_tree_rss_mb() every `interval` seconds while in the with block"""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while True:
+            self.peak_mb = max(self.peak_mb, process_tree_rss_mb())
+            if self._stop.wait(self.interval):
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, process_tree_rss_mb())
+
+
+# ─── Browsers ─────────────────────────────────────────────
+
+def quick_capture(page, html):
+    page.set_viewport_size(VIEWPORT)
+    page.set_content(html, wait_until='domcontentloaded', timeout=30000)
+    return page.screenshot(full_page=True, type='png')
+
+
+def full_capture(page, html):
+    from server.services.gmail_sync_service import _capture_receipt_png
+    return _capture_receipt_png(page, html, VIEWPORT['width'], VIEWPORT['height'], 0)
+
+
+def render_in_fresh_browser(capture, html):
+    from playwright.sync_api import sync_playwright
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True, args=CHROMIUM_ARGS)
+        try:
+            page = browser.new_page(viewport=VIEWPORT, ignore_https_errors=True)
+            return capture(page, html)
+        finally:
+            browser.close()
+
+
+SIMULATED_BROWSER = "import sys; held = b'x' * (int(sys.argv[1]) << 20); print('ready', flush=True); sys.stdin.read()"
+
+
+class SimulatedBrowser:
+    """A child process that starts in launch_ms and holds browser_mb, with the Playwright calls the pool makes"""
+
+    def __init__(self, launch_ms, browser_mb):
+        self.process = subprocess.Popen([sys.executable, '-c', SIMULATED_BROWSER, str(browser_mb)],
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        self.process.stdout.readline()
+        time.sleep(launch_ms / 1000)
+
+    def new_context(self, **options):
+        return self
+
+    def new_page(self, **options):
+        return self
+
+    def is_connected(self):
+        return self.process.poll() is None
+
+    def close(self):
+        if self.process.poll() is None:
+            self.process.stdin.close()
+            self.process.wait()
+
+
+def simulated_capture(render_ms):
+    def capture(page, html):
+        time.sleep(render_ms / 1000)
+        return html.encode()
+    return capture
+
+
+# ─── Runs ─────────────────────────────────────────────────
+
+def run_per_preview(documents, concurrency, capture, simulate):
+    def one(html):
+        if simulate:
+            browser = SimulatedBrowser(*simulate)
+            try:
+                return capture(browser.new_page(), html)
+            finally:
+                browser.close()
+        return render_in_fresh_browser(capture, html)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(one, documents)), len(documents)
+
+
+def run_pool(documents, concurrency, capture, simulate):
+    kwargs = {}
+    if simulate:
+        kwargs['launcher'] = lambda: (SimulatedBrowser(*simulate), lambda: None)
+    with BrowserPool(size=concurrency, timeout=300, **kwargs) as pool:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(lambda html: pool.render(lambda page: capture(page, html)), documents))
+        return results, pool.stats['launches']
+
+
+def run_pdf(count):
+    from server.services.receipt_preview_service import generate_pdf_thumbnail
+
+    pdfs = [make_pdf(f"Tax invoice {n} Date 03/10/2026 Total to pay {n}.90 ILS") for n in range(count)]
+    return [generate_pdf_thumbnail(pdf) for pdf in pdfs], 0
+
+
+def measure(name, run, *args):
+    with PeakRss() as rss:
+        started = time.perf_counter()
+        results, launches = run(*args)
+        seconds = time.perf_counter() - started
+    rendered = sum(1 for result in results if result)
+    return name, rendered, seconds, rss.peak_mb, launches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Receipt preview rendering: browser per preview vs browser pool")
+    parser.add_argument("--previews", type=int, default=30, help="previews per mode")
+    parser.add_argument("--concurrency", type=int, default=2, help="concurrent renders (pool size)")
+    parser.add_argument("--capture", choices=('quick', 'full'), default='quick', help="capture function")
+    parser.add_argument("--simulate", action="store_true", help="simulated browsers instead of Chromium")
+    parser.add_argument("--launch-ms", type=int, default=900, help="--simulate: browser startup")
+    parser.add_argument("--browser-mb", type=int, default=250, help="--simulate: browser memory")
+    parser.add_argument("--render-ms", type=int, default=150, help="--simulate: time per preview")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    if not args.simulate and not sdk_available("playwright"):
+        print("Playwright is not installed - run with --simulate, or install playwright + chromium")
+        return 1
+
+    fixtures = [path.read_text(encoding='utf-8') for path in sorted(FIXTURES_DIR.glob('*.html'))]
+    documents = [f"{fixtures[n % len(fixtures)]}<!-- preview {n} -->" for n in range(args.previews)]
+    if args.simulate:
+        capture, simulate = simulated_capture(args.render_ms), (args.launch_ms, args.browser_mb)
+    else:
+        capture, simulate = (quick_capture if args.capture == 'quick' else full_capture), None
+
+    baseline_mb = process_tree_rss_mb()
+    rows = [
+        measure("per-preview", run_per_preview, documents, args.concurrency, capture, simulate),
+        measure(f"pool x{args.concurrency}", run_pool, documents, args.concurrency, capture, simulate),
+    ]
+    if sdk_available("fitz"):
+        rows.append(measure("pdf", run_pdf, args.previews))
+
+    print("=" * 100)
+    kind = f"simulated ({args.launch_ms}ms launch, {args.browser_mb}MB)" if args.simulate else f"chromium, {args.capture} capture"
+    print(f"Preview rendering: {args.previews} previews per mode, {args.concurrency} concurrent, {kind}")
+    print(f"baseline RSS (this process): {baseline_mb:.0f} MB")
+    print("=" * 100)
+    print(f"{'mode':<13} {'rendered':>9} {'seconds':>9} {'previews/min':>13} {'peak RSS MB':>12} {'launches':>9}")
+    for name, rendered, seconds, peak_mb, launches in rows:
+        print(f"{name:<13} {rendered:>9} {seconds:>9.2f} {rendered / seconds * 60:>13.0f} {peak_mb:>12.0f} {launches:>9}")
+    if not sdk_available("fitz"):
+        print("\npdf fast path skipped: PyMuPDF (fitz) is not installed")
+    return 0 if all(rendered == args.previews for _, rendered, *_ in rows) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Receipt extraction benchmark: receipts/second per core, inline vs process pool vs cache
+
+Corpus: the receipt fixtures in server/tests/fixtures/receipts (Stripe,
+AliExpress, Contabo, plus the logo-only and blank negatives) and generated
+one-page PDF receipts (scripts/fake_gmail_api.make_pdf) in ILS/USD/EUR. Every
+document gets a unique order number, so nothing is a cache hit by accident.
+
+Runs:
+- inline:  extract_receipt_fields() on this process, one at a time (what the
+           sync did on its only thread)
+- pool:    ExtractionPool with --workers processes, all documents in flight
+- cached:  the same documents again through submit_extraction() with a
+           receipt_extractions cache (SQLite in memory) filled by a first pass
+
+PDF text is only parsed where PyPDF2 or pdfminer is installed; without them
+the PDF part costs ~nothing and the numbers are HTML/regex throughput.
+
+Usage:
+    python scripts/bench_receipt_extraction.py
+    python scripts/bench_receipt_extraction.py --documents=2000 --workers=4
+    python scripts/bench_receipt_extraction.py --html-scale=20   # heavier emails
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_gmail_api import make_pdf  # noqa: E402
+from server.services.receipt_extraction import (  # noqa: E402
+    ExtractionCache, ExtractionPool, extract_receipt_fields, pdf_hash, submit_extraction,
+)
+
+FIXTURES_DIR = Path(__file__).resolve().parent.parent / 'server' / 'tests' / 'fixtures' / 'receipts'
+
+# (sender domain, subject, PDF text) - text stays latin-1, the fake PDF font has no Hebrew
+PDF_RECEIPTS = [
+    ("bezeq.co.il", "Invoice {n} - Bezeq", "Tax invoice {n} Date 03/10/2026 Total to pay 289.90 ILS"),
+    ("github.com", "[GitHub] Payment receipt {n}", "Receipt #{n} GitHub Team Amount: $44.00 USD paid 01/10/2026"),
+    ("hetzner.com", "Invoice {n}", "Invoice {n} Hetzner Online Total EUR 17.85 due 15/10/2026"),
+    ("wolt.com", "Your order {n}", "Order {n} Subtotal 84.00 Delivery 12.00 Total 96.00 NIS"),
+]
+
+
+def build_corpus(count, html_scale):
+    """[(pdfs, html, subject, from_domain)] - fixture emails and PDF receipts, alternating"""
+    fixtures = [(path.stem, path.read_text(encoding='utf-8')) for path in sorted(FIXTURES_DIR.glob('*.html'))]
+    corpus = []
+    for n in range(count):
+        if n % 2 == 0 and fixtures:
+            name, html = fixtures[(n // 2) % len(fixtures)]
+            domain = name.split('_')[0] + '.com'
+            corpus.append(([], f"{html * html_scale}<!-- order {n} -->", f"Your receipt #{n}", domain))
+        else:
+            domain, subject, text = PDF_RECEIPTS[(n // 2) % len(PDF_RECEIPTS)]
+            html = f"<p>Thanks for your order {n}. The invoice is attached.</p>" * html_scale
+            corpus.append(([make_pdf(text.format(n=n))], html, subject.format(n=n), domain))
+    return corpus
+
+
+def run_inline(corpus):
+    return [extract_receipt_fields([(pdf_hash(data), data) for data in pdfs], html, subject, domain)
+            for pdfs, html, subject, domain in corpus]
+
+
+def run_pool(corpus, workers):
+    with ExtractionPool(workers=workers, timeout=300) as pool:
+        pool.result(pool.submit([], '', '', ''))  # start the workers outside the timing
+        started = time.perf_counter()
+        futures = [pool.submit([(pdf_hash(data), data) for data in pdfs], html, subject, domain)
+                   for pdfs, html, subject, domain in corpus]
+        results = [pool.result(future) for future in futures]
+        return results, time.perf_counter() - started
+
+
+def run_cached(corpus, workers):
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import StaticPool
+    from server.models_sql import ReceiptExtraction
+
+    engine = create_engine('sqlite://', poolclass=StaticPool, connect_args={'check_same_thread': False})
+    ReceiptExtraction.__table__.create(bind=engine)
+    cache = ExtractionCache(business_id=1, engine=engine)
+    with ExtractionPool(workers=workers, timeout=300) as pool:
+        for pdfs, html, subject, domain in corpus:  # first sync: parse and store
+            future, key = submit_extraction(pool, cache, pdfs, html, subject, domain)
+            cache.store(key, pool.result(future))
+        started = time.perf_counter()
+        results = []
+        for pdfs, html, subject, domain in corpus:  # re-sync: every document is a hit
+            future, _ = submit_extraction(pool, cache, pdfs, html, subject, domain)
+            results.append(pool.result(future))
+        return results, time.perf_counter() - started, cache.stats['hits']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Receipt extraction throughput: inline vs process pool vs cache")
+    parser.add_argument("--documents", type=int, default=600, help="receipts in the corpus")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1), help="extraction processes")
+    parser.add_argument("--html-scale", type=int, default=1, help="repeat each email body N times")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)  # the extractors log every amount they find
+
+    corpus = build_corpus(args.documents, args.html_scale)
+
+    started = time.perf_counter()
+    inline = run_inline(corpus)
+    inline_seconds = time.perf_counter() - started
+    pooled, pool_seconds = run_pool(corpus, args.workers)
+    cached, cached_seconds, hits = run_cached(corpus, args.workers)
+
+    rows = [
+        ("inline", inline_seconds, 1),
+        (f"pool x{args.workers}", pool_seconds, args.workers),
+        ("cached", cached_seconds, 1),
+    ]
+    print("=" * 100)
+    print(f"Receipt extraction: {len(corpus)} documents, html x{args.html_scale}, {os.cpu_count()} CPUs")
+    print("=" * 100)
+    print(f"{'mode':<12} {'seconds':>9} {'receipts/s':>11} {'per core':>10} {'speedup':>8}")
+    for name, seconds, cores in rows:
+        rate = len(corpus) / seconds
+        print(f"{name:<12} {seconds:>9.3f} {rate:>11.1f} {rate / cores:>10.1f} {inline_seconds / seconds:>7.1f}x")
+    print(f"\ncache hits: {hits}/{len(corpus)}")
+
+    same = all(a['extracted'] == b['extracted'] == c['extracted'] for a, b, c in zip(inline, pooled, cached))
+    print(f"results identical across modes: {same}")
+    return 0 if same and hits == len(corpus) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Post-call transcription benchmark: whole recording vs silence-split segments
+
+Generates a synthetic call (tone bursts separated by pauses, like turn-taking)
+and reports time-to-transcript for:
+- whole-file: one STT request for the whole recording (the old
+              transcribe_recording_with_whisper path)
+- chunked:    transcribe_recording_chunked() with --workers segments in flight
+
+The STT backend is a stub whose latency is --stt-overhead-ms per request plus
+--stt-ms-per-sec per second of audio, so the numbers show the pipeline's
+overlap and parallelism, not OpenAI's speed.
+
+Usage:
+    python scripts/bench_recording_pipeline.py
+    python scripts/bench_recording_pipeline.py --minutes=12 --workers=4 --stt-ms-per-sec=60
+"""
+import os
+import sys
+import time
+import wave
+import random
+import logging
+import argparse
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from server.services import recording_pipeline  # noqa: E402
+
+RATE = 8000  # Twilio recordings are 8kHz
+
+
+def make_call(path, minutes, seed=7):
+    """Speech-like tone bursts of 1-12s with 0.2-1.5s pauses, 16-bit mono"""
+    rng = random.Random(seed)
+    total, pieces = 0.0, []
+    while total < minutes * 60:
+        talk, pause = rng.uniform(1, 12), rng.uniform(0.2, 1.5)
+        t = np.arange(int(talk * RATE)) / RATE
+        pieces.append(np.sin(2 * np.pi * rng.uniform(150, 400) * t) * 8000)
+        pieces.append(np.zeros(int(pause * RATE)))
+        total += talk + pause
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(RATE)
+        wav.writeframes(np.concatenate(pieces).astype('<i2').tobytes())
+    return total
+
+
+def stub_stt(overhead_ms, ms_per_sec):
+    def transcribe(path, *args):
+        with wave.open(path, 'rb') as wav:
+            seconds = wav.getnframes() / wav.getframerate()
+        time.sleep((overhead_ms + ms_per_sec * seconds) / 1000)
+        return f"[{seconds:.0f}s]"
+    return transcribe
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Post-call transcription: whole file vs silence-split segments")
+    parser.add_argument("--minutes", type=float, default=8, help="length of the synthetic call")
+    parser.add_argument("--workers", type=int, default=4, help="segments transcribed concurrently")
+    parser.add_argument("--stt-overhead-ms", type=int, default=400, help="stub STT fixed cost per request")
+    parser.add_argument("--stt-ms-per-sec", type=int, default=40, help="stub STT cost per second of audio")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    recording_pipeline.shutil.which = lambda name: None  # same decoder in both modes, whatever the box has
+
+    stt = stub_stt(args.stt_overhead_ms, args.stt_ms_per_sec)
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = os.path.join(work_dir, 'call.wav')
+        seconds = make_call(path, args.minutes)
+
+        started = time.perf_counter()
+        whole = stt(path)
+        whole_sec = time.perf_counter() - started
+
+        segments = []
+        original_split = recording_pipeline.split_on_silence
+
+        def counting_split(*a, **kw):
+            for segment in original_split(*a, **kw):
+                segments.append(segment)
+                yield segment
+
+        recording_pipeline.split_on_silence = counting_split
+        started = time.perf_counter()
+        chunked = recording_pipeline.transcribe_recording_chunked(path, 'BENCH', transcribe_fn=stt, workers=args.workers)
+        chunked_sec = time.perf_counter() - started
+
+    print("=" * 80)
+    print(f"Post-call transcription: {seconds / 60:.1f} min call, stub STT "
+          f"{args.stt_overhead_ms}ms + {args.stt_ms_per_sec}ms/s of audio")
+    print("=" * 80)
+    print(f"{'mode':<14} {'requests':>9} {'seconds':>9} {'speedup':>8}")
+    print(f"{'whole-file':<14} {1:>9} {whole_sec:>9.2f} {1:>8.1f}x")
+    print(f"{f'chunked x{args.workers}':<14} {len(segments):>9} {chunked_sec:>9.2f} {whole_sec / chunked_sec:>8.1f}x")
+    return 0 if whole and chunked else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+/api/search benchmark: legacy OR'd ilike vs server.services.search_service
+
+Generates a synthetic leads table (default 1M rows, Hebrew names, IL phones,
+notes on 10% of rows) in a scratch schema, builds the search indexes from
+db_indexes.py and times the lead search for typical keystroke queries:
+
+- Hebrew name / surname (final letters: "כהן" is stored and typed as-is)
+- Phone in local format (050-...), E.164 and a 4-digit suffix
+- Email fragment, notes word
+
+Reports p50/p95 latency per query and whether the plan uses the indexes.
+Needs a Postgres DATABASE_URL (data goes to schema "search_bench", dropped with --drop).
+
+Usage:
+    DATABASE_URL=postgresql://... python scripts/bench_search.py
+    python scripts/bench_search.py --rows=1000000 --tenants=4 --runs=20
+    python scripts/bench_search.py --drop
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+# Add server to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, text  # noqa: E402
+
+from server.db_indexes import INDEX_DEFS  # noqa: E402
+from server.services import search_service  # noqa: E402
+
+SCHEMA = "search_bench"
+BATCH = 100_000
+PHONE_STEP = 7919  # coprime with 10^8 -> unique 8-digit phone suffixes
+
+FIRST_NAMES = ["משה", "דוד", "יוסף", "אברהם", "יעקב", "שרה", "רחל", "מרים", "נועה", "תמר",
+               "איתן", "יונתן", "דניאל", "אורי", "עומר", "מיכל", "יעל", "שירה", "אלון", "גיל",
+               "Daniel", "Noa", "David", "Maya", "Ariel"]
+LAST_NAMES = ["כהן", "לוי", "מזרחי", "פרץ", "ביטון", "דהן", "אברהם", "פרידמן", "אזולאי", "מלכה",
+              "חדד", "גבאי", "שפירא", "קליין", "רוזן", "אשכנזי", "יוסף", "בן דוד", "עמר", "שטרן",
+              "Cohen", "Levi", "Katz"]
+SERVICES = ["מנעולן", "אינסטלטור", "חשמלאי", "שיפוצים", "מיזוג אוויר"]
+
+LEGACY_SQL = """
+    SELECT id FROM leads
+    WHERE tenant_id = :tenant AND (
+        first_name ILIKE :p OR last_name ILIKE :p OR phone_e164 ILIKE :p
+        OR email ILIKE :p OR notes ILIKE :p)
+    ORDER BY created_at DESC LIMIT :limit
+"""
+
+
+def pg_array(values):
+    return "ARRAY[" + ", ".join("'" + v.replace("'", "''") + "'" for v in values) + "]"
+
+
+def phone_for(row: int) -> str:
+    return "+9725" + f"{(row * PHONE_STEP) % 100_000_000:08d}"
+
+
+def setup(engine, rows: int, tenants: int):
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {SCHEMA}"))
+        conn.execute(text(f"SET search_path TO {SCHEMA}, public"))
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS leads (
+                id serial PRIMARY KEY,
+                tenant_id integer NOT NULL,
+                first_name varchar(255), last_name varchar(255), name varchar(255),
+                email varchar(255), phone_e164 varchar(64), notes text,
+                created_at timestamp
+            )
+        """))
+        existing = conn.execute(text("SELECT count(*) FROM leads")).scalar()
+        if existing != rows:
+            print(f"Generating {rows:,} leads ({tenants} tenants)...")
+            conn.execute(text("TRUNCATE leads RESTART IDENTITY"))
+            start = time.perf_counter()
+            for lo in range(1, rows + 1, BATCH):
+                hi = min(lo + BATCH - 1, rows)
+                conn.execute(text(f"""
+                    INSERT INTO leads (tenant_id, first_name, last_name, email, phone_e164, notes, created_at)
+                    SELECT 1 + g % {tenants},
+                           ({pg_array(FIRST_NAMES)})[1 + (g * 7) % {len(FIRST_NAMES)}],
+                           ({pg_array(LAST_NAMES)})[1 + (g * 13) % {len(LAST_NAMES)}],
+                           'user' || g || '@' || (ARRAY['gmail.com', 'walla.co.il', 'hotmail.com'])[1 + g % 3],
+                           '+9725' || lpad(((g::bigint * {PHONE_STEP}) % 100000000)::text, 8, '0'),
+                           CASE WHEN g % 10 = 0
+                                THEN 'לקוח מתעניין ב' || ({pg_array(SERVICES)})[1 + g % {len(SERVICES)}] END,
+                           now() - (g || ' seconds')::interval
+                    FROM generate_series({lo}, {hi}) AS g
+                """))
+                print(f"  {hi:,}/{rows:,}", end="\r", flush=True)
+            print(f"\n  done in {time.perf_counter() - start:.1f}s")
+
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_leads_tenant ON leads(tenant_id)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_leads_created ON leads(created_at)"))
+        for index_def in INDEX_DEFS:
+            if index_def["table"] == "leads" and "_search_" in index_def["name"]:
+                start = time.perf_counter()
+                conn.execute(text(index_def["sql"].replace(" CONCURRENTLY", "")))
+                print(f"  index {index_def['name']}: {time.perf_counter() - start:.1f}s")
+        conn.execute(text("ANALYZE leads"))
+
+
+def timed(conn, stmt, params, runs: int):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        conn.execute(stmt, params).fetchall()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+
+
+def plan_uses_index(conn, stmt) -> bool:
+    compiled = stmt.compile(dialect=conn.dialect)
+    plan = conn.exec_driver_sql("EXPLAIN " + compiled.string, compiled.params).fetchall()
+    return any("_search_" in str(row[0]) for row in plan)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lead search benchmark (legacy ilike vs indexed search)")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--tenants", type=int, default=4)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--drop", action="store_true", help="Drop the benchmark schema and exit")
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        print("DATABASE_URL is required (Postgres)")
+        return 1
+    engine = create_engine(database_url)
+
+    if args.drop:
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        print(f"Dropped schema {SCHEMA}")
+        return 0
+
+    setup(engine, args.rows, args.tenants)
+
+    known = args.rows // 2 + 1
+    tenant = 1 + known % args.tenants
+    phone = phone_for(known)
+    queries = [
+        ("hebrew surname", "כהן"),
+        ("hebrew full name", "משה לוי"),
+        ("latin name", "katz"),
+        ("phone local", f"0{phone[4:6]}-{phone[6:9]}-{phone[9:]}"),
+        ("phone e164", phone),
+        ("phone suffix", phone[-4:]),
+        ("email", f"user{known}@"),
+        ("notes word", "אינסטלטור"),
+    ]
+
+    print(f"\n{'query':<18} {'legacy p50':>11} {'p95':>9} {'indexed p50':>12} {'p95':>9} {'speedup':>8}  index")
+    print("-" * 80)
+    with engine.connect() as conn:
+        conn.execute(text(f"SET search_path TO {SCHEMA}, public"))
+        for label, q in queries:
+            legacy = timed(conn, text(LEGACY_SQL), {"tenant": tenant, "p": f"%{q}%", "limit": args.limit}, args.runs)
+            stmt = search_service.lead_search_select(
+                search_service.parse_search_query(q), tenant, args.limit)
+            indexed = timed(conn, stmt, {}, args.runs)
+            print(f"{label:<18} {legacy[0]:>9.1f}ms {legacy[1]:>7.1f}ms {indexed[0]:>10.1f}ms {indexed[1]:>7.1f}ms "
+                  f"{legacy[0] / max(indexed[0], 1e-3):>7.1f}x  {'yes' if plan_uses_index(conn, stmt) else 'NO'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Auto-status benchmark: call-end status decisions per second with the compiled status catalog
+
+Seeds --tenants tenants with the default statuses plus --custom custom ones
+(no-answer attempts, Hebrew labels), generates --summaries synthetic Hebrew
+call summaries ending in [המלצה: ...] and runs one decision per summary:
+
+    suggest_status()        recommendation → status name
+    _map_from_keywords()    keyword scoring of the summary text
+    should_change_status()  family / progression comparison with the lead's status
+    get_lead_status_label() Hebrew label of the result
+
+    catalog   the catalog is loaded once per tenant and reused (production path)
+    uncached  the tenant's catalog is invalidated before every decision, so each
+              one pays the LeadStatus query and recompiles (an upper bound for
+              the old path, which queried LeadStatus 3-5 times per decision)
+
+and reports decisions/s, p50/p95 per decision and LeadStatus queries issued.
+Also times the keyword layer alone: automaton vs the linear `kw in text` scans.
+
+Runs on DATABASE_URL if set (lead_statuses must exist - rows are written there,
+use a scratch database), else on a temporary SQLite file.
+
+Usage:
+    python scripts/bench_status_catalog.py
+    python scripts/bench_status_catalog.py --summaries=10000 --tenants=20 --custom=30
+    python scripts/bench_status_catalog.py --mode=uncached --summaries=2000
+"""
+import os
+import sys
+import time
+import random
+import logging
+import argparse
+import tempfile
+
+# Add server to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import event  # noqa: E402
+
+DEFAULT_STATUSES = [
+    ('new', 'חדש'), ('attempting', 'בניסיון קשר'), ('no_answer', 'אין מענה'), ('no_answer_2', 'אין מענה 2'),
+    ('no_answer_3', 'אין מענה 3'), ('contacted', 'נוצר קשר'), ('interested', 'מעוניין'), ('follow_up', 'חזרה'),
+    ('not_relevant', 'לא רלוונטי'), ('qualified', 'נקבעה פגישה'), ('won', 'זכיה'), ('lost', 'אובדן'),
+]
+FILLER = ("הלקוח ענה לשיחה ושאל על המחיר של השירות, הסברנו על החבילות השונות ועל זמני האספקה. "
+          "הוא ציין שהוא משווה בין כמה ספקים ושהתקציב שלו מוגבל. ").split()
+PHRASES = ['מעוניין לשמוע עוד', 'נשמע טוב', 'קבענו פגישה ביום שלישי', 'בשעה 10', 'תחזרו בשבוע הבא',
+           'לא מעוניין', 'תורידו אותי מהרשימה', 'לא ענה', 'תא קולי', 'מאוחר יותר', 'שלח פרטים בוואטסאפ']
+
+
+def percentile(samples, q):
+    return samples[min(len(samples) - 1, int(q * len(samples)))] if samples else 0.0
+
+
+def make_app():
+    from flask import Flask
+    from server.db import db
+    from server.models_sql import LeadStatus
+
+    app = Flask(__name__)
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        url = f"sqlite:///{tempfile.mkdtemp()}/statuses.db"
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        db.metadata.create_all(bind=db.engine, tables=[LeadStatus.__table__])
+    return app
+
+
+def seed(db, tenants, custom, first_tenant):
+    from server.models_sql import LeadStatus
+
+    labels = {}
+    for tenant in range(first_tenant, first_tenant + tenants):
+        rows = list(DEFAULT_STATUSES) + [(f'custom_{tenant}_{i}', f'סטטוס מותאם {i}') for i in range(custom)]
+        for index, (name, label) in enumerate(rows):
+            db.session.add(LeadStatus(business_id=tenant, name=name, label=label, order_index=index, is_active=True))
+        labels[tenant] = [label for _, label in rows]
+    db.session.commit()
+    return labels
+
+
+def make_summaries(count, labels, rng):
+    tenants = sorted(labels)
+    summaries = []
+    for _ in range(count):
+        tenant = rng.choice(tenants)
+        words = rng.sample(FILLER, k=min(len(FILLER), 25)) + rng.sample(PHRASES, k=3)
+        rng.shuffle(words)
+        summaries.append((tenant, ' '.join(words) + f" [המלצה: {rng.choice(labels[tenant])}]",
+                          rng.choice(DEFAULT_STATUSES)[0]))
+    return summaries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Auto-status decisions/s with the compiled status catalog")
+    parser.add_argument("--mode", choices=("catalog", "uncached"), default="catalog")
+    parser.add_argument("--summaries", type=int, default=10000)
+    parser.add_argument("--tenants", type=int, default=10)
+    parser.add_argument("--custom", type=int, default=20, help="Custom statuses per tenant")
+    parser.add_argument("--first-tenant", type=int, default=900000, help="Tenant ids used for the seeded statuses")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)  # the services log every decision
+    os.environ.pop('OPENAI_API_KEY', None)  # family classification must stay on the keyword path
+
+    from server.db import db
+    from server.services.hebrew_label_service import HebrewLabelService
+    from server.services.lead_auto_status_service import (
+        KEYWORD_GROUPS, LeadAutoStatusService, score_keywords,
+    )
+    from server.services.status_catalog import clear_status_catalogs, invalidate_status_catalog
+
+    rng = random.Random(args.seed)
+    app = make_app()
+    with app.app_context():
+        labels = seed(db, args.tenants, args.custom, args.first_tenant)
+        summaries = make_summaries(args.summaries, labels, rng)
+        clear_status_catalogs()
+
+        queries = [0]
+
+        def count(conn, cursor, statement, *a):
+            if 'lead_statuses' in statement:
+                queries[0] += 1
+
+        event.listen(db.engine, 'before_cursor_execute', count)
+        service = LeadAutoStatusService()
+        timings = []
+        matched = 0
+        start = time.perf_counter()
+        for tenant, summary, current in summaries:
+            t0 = time.perf_counter()
+            if args.mode == "uncached":
+                invalidate_status_catalog(tenant)
+            suggested = service.suggest_status(tenant, 1, 'outbound', call_summary=summary)
+            service._map_from_keywords(summary, service._get_valid_statuses(tenant), tenant)
+            service.should_change_status(current, suggested, tenant)
+            HebrewLabelService(tenant).get_lead_status_label(suggested or current)
+            timings.append((time.perf_counter() - t0) * 1000)
+            matched += suggested is not None
+        elapsed = time.perf_counter() - start
+        event.remove(db.engine, 'before_cursor_execute', count)
+
+        timings.sort()
+        print(f"{args.mode}: {len(summaries):,} summaries over {args.tenants} tenants "
+              f"({len(DEFAULT_STATUSES) + args.custom} statuses each)")
+        print(f"decisions  {len(summaries) / elapsed:,.0f}/s  p50 {percentile(timings, 0.5):.3f}ms  "
+              f"p95 {percentile(timings, 0.95):.3f}ms  ({matched:,} mapped)")
+        print(f"queries    {queries[0]:,} on lead_statuses ({queries[0] / len(summaries):.2f} per decision)")
+
+        # Keyword layer alone
+        texts = [summary.lower() for _, summary, _ in summaries]
+        t0 = time.perf_counter()
+        for text in texts:
+            {group: sum(1 for kw in kws if kw in text) for group, _, kws in KEYWORD_GROUPS}
+        linear = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for text in texts:
+            score_keywords(text)
+        automaton = time.perf_counter() - t0
+        print(f"keywords   linear {len(texts) / linear:,.0f}/s  automaton {len(texts) / automaton:,.0f}/s "
+              f"({sum(len(k) for _, _, k in KEYWORD_GROUPS)} keywords)")
+
+        from server.models_sql import LeadStatus
+        LeadStatus.query.filter(LeadStatus.business_id >= args.first_tenant,
+                                LeadStatus.business_id < args.first_tenant + args.tenants).delete()
+        db.session.commit()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Topic classifier benchmark: keyword/synonym layer throughput with the compiled TopicKeywordIndex
+
+Generates --topics synthetic Hebrew topics (each with --synonyms synonyms) and
+--texts synthetic call transcripts, then times LAYER 1 of classify_text:
+
+    linear    per-topic scan as before: normalize the name, `in` checks for the
+              name and every synonym, keyword sets rebuilt for every topic
+    index     TopicKeywordIndex built once per topics version (production path):
+              one automaton pass for names + synonyms, inverted keyword index
+
+Both paths must return the same (topic, method, score) for every text - the
+script checks it and reports mismatches. No database or OpenAI key needed.
+
+Usage:
+    python scripts/bench_topic_classifier.py
+    python scripts/bench_topic_classifier.py --topics=500 --synonyms=5 --texts=5000
+"""
+import os
+import sys
+import time
+import random
+import logging
+import argparse
+
+# Add server to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+WORDS = ("התקנה תיקון החלפה ניקוי בדיקה מזגן דוד שמש מנעול דלת ברז צנרת חשמל לוח גג איטום חלון "
+         "תריס מקרר מכונת כביסה מדיח אזעקה מצלמה אינטרקום פרקט אריחים צבע טיח").split()
+FILLER = ("שלום רציתי לשאול לגבי מחיר ואם אפשר להגיע מחר בבוקר כי יש לי בעיה בבית "
+          "ואני צריך מישהו דחוף תודה רבה על העזרה").split()
+
+
+def linear_match(classifier, text, topics):
+    """LAYER 1 as it was before the index (same checks, same order)"""
+    from server.services.topic_classifier import _normalize_text_for_matching
+
+    text_normalized = _normalize_text_for_matching(text)
+    text_keywords = classifier._extract_keywords(text_normalized)
+    for topic in topics:
+        name_normalized = _normalize_text_for_matching(topic['name'])
+        if name_normalized and name_normalized in text_normalized:
+            return topic['id'], 'keyword', 0.95
+        if topic.get('synonyms_normalized') and topic.get('synonyms'):
+            for synonym in topic['synonyms_normalized']:
+                if synonym and synonym in text_normalized:
+                    return topic['id'], 'synonym', 0.93
+        topic_keywords = classifier._extract_keywords(name_normalized)
+        for synonym in topic.get('synonyms_normalized') or []:
+            if synonym:
+                topic_keywords.update(classifier._extract_keywords(synonym))
+        matching = text_keywords & topic_keywords
+        if len(matching) >= 2 and topic_keywords:
+            ratio = len(matching) / len(topic_keywords)
+            if ratio >= 0.5:
+                return topic['id'], 'multi_keyword', 0.85 + (ratio * 0.05)
+    return None
+
+
+def make_topics(count, synonyms, rng):
+    from server.services.topic_classifier import _normalize_synonyms_list
+
+    topics, seen = [], set()
+    while len(topics) < count:
+        name = ' '.join(rng.sample(WORDS, 3))
+        if name in seen:
+            continue
+        seen.add(name)
+        syns = [' '.join(rng.sample(WORDS, 3)) for _ in range(synonyms)]
+        topics.append({'id': len(topics) + 1, 'name': name, 'synonyms': syns,
+                       'synonyms_normalized': _normalize_synonyms_list(syns)})
+    return topics
+
+
+def make_texts(count, topics, rng):
+    texts = []
+    for _ in range(count):
+        words = rng.sample(FILLER, 12)
+        roll = rng.random()
+        if roll < 0.3:
+            words.append(rng.choice(topics)['name'])  # exact name somewhere in the list
+        elif roll < 0.5:
+            words.extend(rng.sample(WORDS, 2))  # loose keywords only
+        rng.shuffle(words)
+        texts.append(' '.join(words))
+    return texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TopicClassifier keyword layer: linear scan vs compiled index")
+    parser.add_argument("--topics", type=int, default=300)
+    parser.add_argument("--synonyms", type=int, default=3, help="Synonyms per topic")
+    parser.add_argument("--texts", type=int, default=3000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)  # the classifier logs every match
+
+    from server.services.topic_classifier import TopicClassifier, TopicKeywordIndex
+
+    rng = random.Random(args.seed)
+    topics = make_topics(args.topics, args.synonyms, rng)
+    texts = make_texts(args.texts, topics, rng)
+    classifier = TopicClassifier()
+
+    t0 = time.perf_counter()
+    index = TopicKeywordIndex(topics)
+    build = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    expected = [linear_match(classifier, text, topics) for text in texts]
+    linear = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    results = [classifier._keyword_match(text, topics, index) for text in texts]
+    compiled = time.perf_counter() - t0
+
+    got = [(r['topic_id'], r['method'], r['score']) if r else None for r in results]
+    mismatches = sum(1 for a, b in zip(got, expected) if a != b)
+    methods = {}
+    for r in got:
+        methods[r[1] if r else 'none'] = methods.get(r[1] if r else 'none', 0) + 1
+
+    print(f"{args.topics} topics x {args.synonyms} synonyms, {len(texts):,} texts "
+          f"({', '.join(f'{k} {v:,}' for k, v in sorted(methods.items()))})")
+    print(f"index build  {build * 1000:.1f}ms (once per topics version)")
+    print(f"linear       {len(texts) / linear:,.0f} texts/s")
+    print(f"index        {len(texts) / compiled:,.0f} texts/s  ({linear / compiled:.1f}x)")
+    print(f"mismatches   {mismatches}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
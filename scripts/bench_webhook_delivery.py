@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Outbound webhook benchmark: the outbox + pooled delivery engine against local stub endpoints
+
+Starts --endpoints stub HTTP servers on localhost (--latency-ms per request,
+--error-rate of 503s), then produces events at --rate per minute for --seconds:
+
+    outbox  enqueue_webhook() in the producer, deliver_due() loops in a
+            background thread like back-to-back delivery jobs
+    inline  the old path: requests.post() per event in the producer, new
+            connection each time, no retries
+
+and reports the producer's cost per event (p50/p95 ms - what the request or
+job that fired the webhook pays), end-to-end delivery latency as seen by the
+stub (p50/p95), events/s delivered and how many were lost.
+
+The outbox runs on DATABASE_URL if set (webhook_outbox must exist - rows are
+written there, use a scratch database), else on a temporary SQLite file.
+
+Usage:
+    python scripts/bench_webhook_delivery.py
+    python scripts/bench_webhook_delivery.py --rate=10000 --seconds=60 --endpoints=20 --latency-ms=80
+    python scripts/bench_webhook_delivery.py --mode=inline --rate=3000 --seconds=20
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add server to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import requests  # noqa: E402
+
+
+def percentile(samples, q):
+    return samples[min(len(samples) - 1, int(q * len(samples)))] if samples else 0.0
+
+
+class Stub:
+    """Local webhook endpoints; records when each event arrived"""
+
+    def __init__(self, count, latency_ms, error_rate):
+        self.lock = threading.Lock()
+        self.received = {}  # event id -> end-to-end ms (first successful arrival)
+        self.requests = 0
+        self.servers = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, as real endpoints
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                time.sleep(latency_ms / 1000.0)
+                failed = random.random() < error_rate
+                now = time.time()
+                with stub.lock:
+                    stub.requests += 1
+                    if not failed:
+                        for event in body.get('events', [body]):
+                            stub.received.setdefault(event['id'], (now - event['sent']) * 1000)
+                self.send_response(503 if failed else 200)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        for _ in range(count):
+            server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            self.servers.append(server)
+
+    @property
+    def urls(self):
+        return [f"http://127.0.0.1:{server.server_address[1]}/hook" for server in self.servers]
+
+    def close(self):
+        for server in self.servers:
+            server.shutdown()
+
+
+def make_app():
+    from flask import Flask
+    from server.db import db
+    from server.models_sql import WebhookOutbox
+
+    app = Flask(__name__)
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        url = f"sqlite:///{tempfile.mkdtemp()}/outbox.db"
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'timeout': 30, 'check_same_thread': False}}
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        db.metadata.create_all(bind=db.engine, tables=[WebhookOutbox.__table__])
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Outbound webhook delivery benchmark (local stub endpoints)")
+    parser.add_argument("--mode", choices=("outbox", "inline"), default="outbox")
+    parser.add_argument("--rate", type=int, default=10000, help="Events per minute")
+    parser.add_argument("--seconds", type=int, default=30)
+    parser.add_argument("--endpoints", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--error-rate", type=float, default=0.02, help="Share of requests answered 503")
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--per-endpoint", type=int, default=4)
+    parser.add_argument("--batch", type=int, default=1, help="N8N_BATCH_MAX_EVENTS (>1 batches per URL)")
+    args = parser.parse_args()
+
+    import server.config as config
+    from server.services import webhook_delivery
+
+    config.WEBHOOK_DELIVERY_PER_ENDPOINT = args.per_endpoint
+    config.WEBHOOK_DELIVERY_WORKERS = args.workers
+    config.WEBHOOK_RETRY_BASE_SECONDS = 0.5
+    config.N8N_BATCH_MAX_EVENTS = args.batch
+    webhook_delivery.wake_delivery = lambda redis_conn=None: True  # the loop below stands in for the jobs
+    webhook_delivery._clear_wake = lambda redis_conn=None: None
+
+    stub = Stub(args.endpoints, args.latency_ms, args.error_rate)
+    urls = stub.urls
+    total = args.rate * args.seconds // 60
+    interval = 60.0 / args.rate
+    print(f"{args.mode}: {total:,} events at {args.rate:,}/min over {args.endpoints} endpoints "
+          f"({args.latency_ms:.0f}ms, {args.error_rate:.0%} 503s)")
+
+    app = make_app() if args.mode == "outbox" else None
+    stop = threading.Event()
+    rounds = []
+
+    def deliver_loop():
+        with app.app_context():
+            while not stop.is_set():
+                stats = webhook_delivery.deliver_due(max_seconds=5)
+                rounds.append(stats)
+                if not stats['requests']:
+                    time.sleep(0.05)
+
+    if app is not None:
+        threading.Thread(target=deliver_loop, daemon=True).start()
+
+    producer_ms = []
+    start = time.perf_counter()
+    with (app.app_context() if app is not None else _null()):
+        for i in range(total):
+            target = start + i * interval
+            delay = target - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            body = json.dumps({'id': i, 'sent': time.time(), 'event_type': 'bench'})
+            url = urls[i % len(urls)]
+            t0 = time.perf_counter()
+            if args.mode == "outbox":
+                webhook_delivery.enqueue_webhook(webhook_delivery.CHANNEL_N8N, url, body,
+                                                 {'Content-Type': 'application/json'}, 'bench',
+                                                 batchable=args.batch > 1)
+            else:
+                try:
+                    requests.post(url, data=body, headers={'Content-Type': 'application/json'}, timeout=10)
+                except requests.RequestException:
+                    pass
+            producer_ms.append((time.perf_counter() - t0) * 1000)
+    produced_seconds = time.perf_counter() - start
+
+    # Let the engine finish (retries included)
+    deadline = time.time() + 60
+    while len(stub.received) < total and time.time() < deadline and args.mode == "outbox":
+        time.sleep(0.2)
+    elapsed = time.perf_counter() - start
+    stop.set()
+
+    producer_ms.sort()
+    e2e = sorted(stub.received.values())
+    print(f"\nproducer  p50 {percentile(producer_ms, 0.5):.2f}ms  p95 {percentile(producer_ms, 0.95):.2f}ms  "
+          f"({total / produced_seconds:,.0f} events/s offered)")
+    print(f"delivery  p50 {percentile(e2e, 0.5):.0f}ms  p95 {percentile(e2e, 0.95):.0f}ms end to end, "
+          f"{len(e2e) / elapsed:,.0f} events/s")
+    print(f"          {len(e2e):,}/{total:,} delivered, {total - len(e2e):,} lost, {stub.requests:,} requests")
+    if rounds:
+        print(f"engine    {sum(r['retried'] for r in rounds):,} retries, "
+              f"{sum(r['failed'] for r in rounds):,} gave up")
+    stub.close()
+    return 0
+
+
+class _null:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Baileys webhook benchmark: replay payloads through server.services.whatsapp_ingest
+
+Replays webhook bodies ({"tenantId": ..., "payload": {"messages": [...]}}) -
+captured ones from a JSONL file, or a synthetic history-sync burst - and
+measures the two halves of the ack-first path:
+
+- ack: publish_baileys_messages() per webhook body, i.e. what the request
+  does before it returns (p50/p95/max ms, bodies/s)
+- drain: --workers threads drain the partitions like the RQ drain jobs and
+  report messages/second end to end
+
+--process picks what a drained batch goes through:
+    noop  transport only (Redis streams, locks, acks)
+    app   the real routes_whatsapp.process_baileys_messages (dedupe, lead,
+          session, bulk insert) with the AI enqueue and appointment check
+          stubbed out. Needs DATABASE_URL with a business for each tenantId -
+          rows are really written, use a scratch database.
+
+Needs a REDIS_URL; keys go under "bench:wa:ingest:" and are deleted afterwards.
+Capture payloads by logging request.get_data() of /api/whatsapp/webhook/incoming.
+
+Usage:
+    REDIS_URL=redis://localhost:6379/15 python scripts/bench_whatsapp_ingest.py
+    python scripts/bench_whatsapp_ingest.py --chats=500 --messages=20000 --partitions=16 --workers=8
+    python scripts/bench_whatsapp_ingest.py --replay=captured.jsonl --process=app
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+import threading
+
+# Add server to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import redis  # noqa: E402
+
+from server.services import whatsapp_ingest  # noqa: E402
+
+PREFIX = "bench:wa:ingest:"
+
+
+def synthetic_bodies(chats: int, messages: int, per_body: int, tenants: int):
+    """History-sync shaped burst: each webhook body carries a run of one chat's messages"""
+    rng = random.Random(7)
+    now = int(time.time())
+    bodies, sent = [], 0
+    while sent < messages:
+        chat = rng.randrange(chats)
+        count = min(per_body, messages - sent)
+        bodies.append({
+            'tenantId': f'business_{1 + chat % tenants}',
+            'payload': {'messages': [{
+                'key': {'remoteJid': f'97250{chat:07d}@s.whatsapp.net', 'id': f'BENCH{sent + i:010d}', 'fromMe': False},
+                'pushName': f'Chat {chat}',
+                'messageTimestamp': now - (messages - sent - i),
+                'message': {'conversation': f'הודעה מספר {sent + i} בשיחה {chat}'},
+            } for i in range(count)]},
+        })
+        sent += count
+    return bodies
+
+
+def load_replay(path: str):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(samples, q):
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def app_processor():
+    """process_baileys_messages inside an app context, AI enqueue / appointment check stubbed"""
+    from server.app_factory import create_app
+    import server.routes_whatsapp as routes_whatsapp
+    import server.whatsapp_appointment_handler as appointment_handler
+
+    routes_whatsapp.enqueue_job = lambda **kwargs: None
+    appointment_handler.process_incoming_whatsapp_message = lambda **kwargs: {}
+    app = create_app()
+
+    def process(tenant_id, messages):
+        with app.app_context():
+            return routes_whatsapp.process_baileys_messages(tenant_id, messages) or 0
+    return process
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Baileys webhook ingest benchmark (ack latency + drain throughput)")
+    parser.add_argument("--replay", help="JSONL file of captured webhook bodies")
+    parser.add_argument("--chats", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=10000)
+    parser.add_argument("--per-body", type=int, default=50, help="Messages per synthetic webhook body")
+    parser.add_argument("--tenants", type=int, default=4)
+    parser.add_argument("--partitions", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent drainers")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--process", choices=("noop", "app"), default="noop")
+    args = parser.parse_args()
+
+    redis_url = os.getenv("REDIS_URL")
+    if not redis_url:
+        print("REDIS_URL is required")
+        return 1
+    conn = redis.Redis.from_url(redis_url)
+
+    # Scratch keys, fixed partition count, drains run here instead of RQ
+    whatsapp_ingest.STREAM_PREFIX = PREFIX
+    whatsapp_ingest.WAKE_PREFIX = PREFIX + "wake:"
+    whatsapp_ingest.LOCK_PREFIX = PREFIX + "lock:"
+    whatsapp_ingest._partitions = lambda: args.partitions
+    whatsapp_ingest.enqueue_drain = lambda partition, redis_conn=None: True
+    for key in conn.scan_iter(PREFIX + "*"):
+        conn.delete(key)
+
+    bodies = load_replay(args.replay) if args.replay else \
+        synthetic_bodies(args.chats, args.messages, args.per_body, args.tenants)
+    total = sum(len((b.get('payload') or {}).get('messages') or []) for b in bodies)
+    print(f"Replaying {len(bodies):,} webhook bodies / {total:,} messages "
+          f"into {args.partitions} partitions ({args.process} processing)")
+
+    # Ack: what the webhook does before returning
+    samples, queued = [], 0
+    start = time.perf_counter()
+    for body in bodies:
+        t0 = time.perf_counter()
+        queued += whatsapp_ingest.publish_baileys_messages(body['tenantId'], body['payload']['messages'], conn) or 0
+        samples.append((time.perf_counter() - t0) * 1000)
+    publish_seconds = time.perf_counter() - start
+    samples.sort()
+    print(f"\nack      p50 {statistics.median(samples):.2f}ms  p95 {percentile(samples, 0.95):.2f}ms  "
+          f"max {samples[-1]:.2f}ms  ({len(bodies) / publish_seconds:,.0f} bodies/s, {queued:,} queued)")
+
+    # Drain: workers take partitions like the RQ drain jobs, each partition in order
+    process = app_processor() if args.process == "app" else (lambda tenant_id, messages: len(messages))
+    order_errors = []
+    last_seen = {}
+
+    def checked(tenant_id, messages):
+        for msg in messages:  # per-chat order must match publish order
+            chat, seq = msg['key']['remoteJid'], msg['key']['id']
+            if last_seen.get(chat, '') > seq:
+                order_errors.append(chat)
+            last_seen[chat] = seq
+        return process(tenant_id, messages)
+
+    todo = list(range(args.partitions))
+    todo_lock = threading.Lock()
+    drained = {'messages': 0, 'processed': 0}
+
+    def worker():
+        while True:
+            with todo_lock:
+                if not todo:
+                    return
+                partition = todo.pop()
+            stats = whatsapp_ingest.drain_partition(partition, checked, redis_conn=conn,
+                                                    batch_size=args.batch_size, max_seconds=3600)
+            with todo_lock:
+                drained['messages'] += stats['messages']
+                drained['processed'] += stats['processed']
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(args.workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    drain_seconds = time.perf_counter() - start
+
+    print(f"drain    {drained['messages']:,} messages in {drain_seconds:.2f}s = "
+          f"{drained['messages'] / max(drain_seconds, 1e-9):,.0f} messages/s "
+          f"({args.workers} workers, {drained['processed']:,} processed)")
+    if not args.replay:
+        print(f"order    {'OK' if not order_errors else f'{len(order_errors)} out-of-order message(s)'}")
+
+    for key in conn.scan_iter(PREFIX + "*"):
+        conn.delete(key)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Local fake of the Gmail REST API - enough of it for the receipt sync
+
+Serves a synthetic mailbox on the real URL layout, so GmailApiClient (and the
+whole sync) runs against it by pointing GMAIL_API_ROOT at the server:
+- GET  /gmail/v1/users/me/messages              (maxResults / pageToken; q is ignored)
+- GET  /gmail/v1/users/me/messages/{id}         (format=full)
+- GET  /gmail/v1/users/me/messages/{id}/attachments/{attachment_id}
+- GET  /gmail/v1/users/me/profile               (historyId)
+- GET  /gmail/v1/users/me/history               (messageAdded since startHistoryId)
+- POST /batch/gmail/v1                          (multipart/mixed batch of message GETs)
+
+Knobs for tests and benchmarks: per-request latency, forced 429s
+(`fail_next`), and an expired history id (404). `stats` counts requests by
+kind and the peak number of requests served concurrently.
+
+Usage:
+    python scripts/fake_gmail_api.py --messages=500 --latency-ms=80
+    GMAIL_API_ROOT=http://127.0.0.1:8088 ...   # then sync against it
+"""
+import re
+import sys
+import json
+import time
+import base64
+import argparse
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_pdf(text):
+    """Smallest valid one-page PDF showing `text`"""
+    stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).decode()
+
+
+def make_message(message_id, receipt=True, pdf=True, date="Mon, 5 Oct 2026 10:00:00 +0000"):
+    """Gmail format=full message; receipts carry an invoice subject and (optionally) a PDF"""
+    subject = f"Invoice #{message_id} - payment receipt" if receipt else f"Team lunch {message_id}"
+    sender = "Billing <billing@paypal.com>" if receipt else "Friend <friend@example.org>"
+    body_text = f"Total 123.45 ILS for order {message_id}" if receipt else "See you tomorrow"
+    parts = [{"partId": "0", "mimeType": "text/plain", "filename": "",
+              "body": {"size": len(body_text), "data": _b64(body_text.encode())}}]
+    attachments = {}
+    if receipt and pdf:
+        attachment_id = f"att-{message_id}"
+        attachments[attachment_id] = make_pdf(f"Invoice {message_id} Total 123.45")
+        parts.append({"partId": "1", "mimeType": "application/pdf", "filename": f"invoice-{message_id}.pdf",
+                      "headers": [{"name": "Content-Disposition", "value": "attachment"}],
+                      "body": {"attachmentId": attachment_id, "size": len(attachments[attachment_id])}})
+    message = {
+        "id": message_id,
+        "threadId": f"thread-{message_id}",
+        "labelIds": ["INBOX"],
+        "snippet": body_text,
+        "payload": {
+            "mimeType": "multipart/mixed",
+            "headers": [{"name": "Subject", "value": subject}, {"name": "From", "value": sender},
+                        {"name": "Date", "value": date}],
+            "parts": parts,
+        },
+    }
+    return message, attachments
+
+
+class FakeMailbox:
+    """Messages newest first (like messages.list) plus a history log"""
+
+    def __init__(self, count=0, receipt_every=1, pdf=True):
+        self.messages = {}
+        self.attachments = {}
+        self.order = []
+        self.history = []  # (history_id, message_id, labels)
+        self.history_id = 1000
+        for idx in range(count):
+            self.add(f"m{idx:05d}", receipt=idx % receipt_every == 0, pdf=pdf)
+
+    def add(self, message_id, receipt=True, pdf=True, labels=("INBOX",)):
+        message, attachments = make_message(message_id, receipt=receipt, pdf=pdf)
+        message["labelIds"] = list(labels)
+        self.messages[message_id] = message
+        self.attachments.update(attachments)
+        self.order.insert(0, message_id)
+        self.history_id += 1
+        self.history.append((self.history_id, message_id, list(labels)))
+        return message_id
+
+
+class FakeGmailApi:
+    """ThreadingHTTPServer around a FakeMailbox - use as a context manager"""
+
+    def __init__(self, mailbox=None, latency=0.0, host="127.0.0.1", port=0):
+        self.mailbox = mailbox or FakeMailbox()
+        self.latency = latency
+        self.fail_next = 0  # answer this many requests (batch parts included) with 429
+        self.history_expired = False
+        self.stats = {"list": 0, "get": 0, "attachment": 0, "batch": 0, "batch_parts": 0,
+                      "history": 0, "profile": 0, "throttled": 0, "peak_concurrency": 0}
+        self._lock = threading.Lock()
+        self._active = 0
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="fake-gmail-api", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _count(self, kind, n=1):
+        with self._lock:
+            self.stats[kind] += n
+
+    def _throttle(self):
+        with self._lock:
+            if self.fail_next > 0:
+                self.fail_next -= 1
+                self.stats["throttled"] += 1
+                return True
+        return False
+
+    # ─── API ───────────────────────────────────────────────
+
+    def handle_get(self, path, query):
+        """(status, json) for a GET under /gmail/v1/users/me"""
+        if self._throttle():
+            return 429, {"error": {"code": 429, "message": "Rate Limit Exceeded"}}
+        box = self.mailbox
+        if path == "/messages":
+            self._count("list")
+            size = min(int(query.get("maxResults", ["100"])[0]), 500)
+            offset = int(query.get("pageToken", ["0"])[0])
+            ids = box.order[offset:offset + size]
+            page = {"messages": [{"id": i, "threadId": f"thread-{i}"} for i in ids],
+                    "resultSizeEstimate": len(box.order)}
+            if offset + size < len(box.order):
+                page["nextPageToken"] = str(offset + size)
+            return 200, page
+        if path == "/profile":
+            self._count("profile")
+            return 200, {"emailAddress": "fake@example.com", "historyId": str(box.history_id),
+                         "messagesTotal": len(box.order)}
+        if path == "/history":
+            self._count("history")
+            start = int(query.get("startHistoryId", ["0"])[0])
+            if self.history_expired:
+                return 404, {"error": {"code": 404, "message": "Requested entity was not found."}}
+            records = [{"id": str(hid), "messagesAdded": [{"message": {"id": mid, "labelIds": labels}}]}
+                       for hid, mid, labels in box.history if hid > start]
+            return 200, {"history": records, "historyId": str(box.history_id)}
+        match = re.fullmatch(r"/messages/([^/]+)/attachments/([^/]+)", path)
+        if match:
+            self._count("attachment")
+            data = box.attachments.get(match.group(2))
+            if data is None:
+                return 404, {"error": {"code": 404, "message": "Not Found"}}
+            return 200, {"size": len(data), "data": _b64(data)}
+        match = re.fullmatch(r"/messages/([^/]+)", path)
+        if match:
+            self._count("get")
+            message = box.messages.get(match.group(1))
+            if message is None:
+                return 404, {"error": {"code": 404, "message": "Not Found"}}
+            return 200, message
+        return 404, {"error": {"code": 404, "message": f"no route {path}"}}
+
+    def handle_batch(self, content_type, body):
+        """multipart/mixed batch of GETs -> (content_type, body)"""
+        self._count("batch")
+        boundary = re.search(r'boundary="?([^";]+)"?', content_type).group(1)
+        out_boundary = "batch_fake_response"
+        out = []
+        for part in body.replace(b"\r\n", b"\n").split(b"--" + boundary.encode()):
+            part = part.strip()
+            if not part or part == b"--":
+                continue
+            headers, _, request = part.partition(b"\n\n")
+            content_id = re.search(rb"Content-ID:\s*<([^>]+)>", headers, re.IGNORECASE).group(1).decode()
+            request_line = request.split(b"\n", 1)[0].decode()
+            _, target, *_ = request_line.split(" ")
+            parsed = urlparse(target)
+            self._count("batch_parts")
+            status, payload = self.handle_get(parsed.path.replace("/gmail/v1/users/me", "", 1), parse_qs(parsed.query))
+            out.append(f"--{out_boundary}\r\nContent-Type: application/http\r\n"
+                       f"Content-ID: <response-{content_id}>\r\n\r\n"
+                       f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                       f"Content-Type: application/json; charset=UTF-8\r\n\r\n"
+                       f"{json.dumps(payload)}\r\n")
+        out.append(f"--{out_boundary}--\r\n")
+        return f"multipart/mixed; boundary={out_boundary}", "".join(out).encode()
+
+    def _handler_class(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True  # keep-alive responses would otherwise wait on delayed ACKs
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, content_type, body):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                if status == 429:
+                    self.send_header("Retry-After", "0")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _serve(self, handle):
+                with api._lock:
+                    api._active += 1
+                    api.stats["peak_concurrency"] = max(api.stats["peak_concurrency"], api._active)
+                try:
+                    if api.latency:
+                        time.sleep(api.latency)
+                    handle()
+                finally:
+                    with api._lock:
+                        api._active -= 1
+
+            def do_GET(self):
+                def handle():
+                    parsed = urlparse(self.path)
+                    prefix = "/gmail/v1/users/me"
+                    if not parsed.path.startswith(prefix):
+                        return self._send(404, "application/json", b"{}")
+                    status, payload = api.handle_get(parsed.path[len(prefix):], parse_qs(parsed.query))
+                    self._send(status, "application/json", json.dumps(payload).encode())
+                self._serve(handle)
+
+            def do_POST(self):
+                def handle():
+                    body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                    if urlparse(self.path).path != "/batch/gmail/v1":
+                        return self._send(404, "application/json", b"{}")
+                    if api._throttle():
+                        return self._send(429, "application/json", b'{"error": {"code": 429}}')
+                    content_type, payload = api.handle_batch(self.headers.get("Content-Type", ""), body)
+                    self._send(200, content_type, payload)
+                self._serve(handle)
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local fake Gmail API with a synthetic mailbox")
+    parser.add_argument("--messages", type=int, default=200, help="messages in the mailbox")
+    parser.add_argument("--receipt-every", type=int, default=2, help="every Nth message is a receipt with a PDF")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="added latency per HTTP request")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8088)
+    args = parser.parse_args()
+
+    api = FakeGmailApi(FakeMailbox(args.messages, receipt_every=args.receipt_every),
+                       latency=args.latency_ms / 1000, host=args.host, port=args.port)
+    print(f"Fake Gmail API with {args.messages} messages on {api.url} - export GMAIL_API_ROOT={api.url}")
+    try:
+        api.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.server.server_close()
+        print(json.dumps(api.stats))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
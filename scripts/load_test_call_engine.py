@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+"""
+Call engine load test: thread-per-call vs shared event loop (CALLS_ENGINE_MODE)
+
+Three processes, real websockets on localhost:
+
+    fake Twilio carrier  ──ws──▶  media gateway (this process)  ──ws──▶  stub realtime server
+    (N media streams,             MediaStreamBridge +                      (streams audio deltas
+     50 frames/s each,            MediaStreamHandler TX pacer +            at 2x real time:
+     timestamps every             audio-out bridge, thread or              2s speech / 1s pause)
+     outbound frame)              async engine)
+
+The gateway runs the production TX / audio-out code (MediaStreamHandler._tx_loop,
+_tx_loop_async, _realtime_audio_out_loop, _realtime_audio_out_loop_async) bound
+to a lightweight call object, so the only difference between the two modes is
+the engine. As in production, the Twilio reader and the realtime session are
+threads in thread mode and tasks on the shared call loop in async mode.
+
+Reported per mode and concurrency level:
+- p50 / p99 outbound frame jitter (|inter-arrival - 20ms| inside speech bursts)
+  at the carrier, and "tx p99" measured at the gateway's send call (pacer only)
+- delivery ratio (frames received by the carrier / frames produced by the stub)
+- peak thread count, CPU seconds, shared loop lag (async)
+- max sustainable concurrent calls: highest level with p99 jitter within budget
+  and delivery above --min-delivery
+
+Usage:
+    python scripts/load_test_call_engine.py
+    python scripts/load_test_call_engine.py --levels=50,100,200,400 --seconds=15
+    python scripts/load_test_call_engine.py --modes=async --jitter-budget-ms=5
+"""
+import os
+import sys
+import json
+import time
+import queue
+import base64
+import asyncio
+import argparse
+import threading
+import multiprocessing as mp
+
+import numpy as np
+
+# Add server to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+FRAME_BYTES = 160           # 20ms μ-law @ 8kHz
+FRAME_INTERVAL = 0.020
+BURST_FRAMES = 5            # stub realtime sends 100ms of audio per delta
+GENERATION_SPEEDUP = 2.0    # providers generate audio faster than real time
+SPEECH_SEC = 2.0
+PAUSE_SEC = 1.0
+BURST_GAP_SEC = 0.1         # inter-arrival above this = pause between utterances, not jitter
+
+
+def burst_jitter(timestamps):
+    """|inter-frame gap - 20ms| for gaps inside speech bursts (seconds)"""
+    if len(timestamps) < 2:
+        return []
+    gaps = np.diff(np.asarray(timestamps))
+    gaps = gaps[gaps < BURST_GAP_SEC]
+    return np.abs(gaps - FRAME_INTERVAL).tolist()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Stub realtime server (child process)
+# ─────────────────────────────────────────────────────────────────────────────
+def _stub_realtime_main(port_q, frames_sent):
+    import websockets
+
+    delta = base64.b64encode(bytes([0xFF]) * (FRAME_BYTES * BURST_FRAMES)).decode("ascii")
+    message = json.dumps({"type": "response.audio.delta", "delta": delta})
+
+    async def session(ws):
+        async def drain_input():
+            async for _ in ws:  # input_audio_buffer.append - discarded
+                pass
+
+        drain = asyncio.create_task(drain_input())
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                start = loop.time()
+                deadline = start
+                while loop.time() - start < SPEECH_SEC / GENERATION_SPEEDUP:
+                    await ws.send(message)
+                    with frames_sent.get_lock():
+                        frames_sent.value += BURST_FRAMES
+                    deadline += BURST_FRAMES * FRAME_INTERVAL / GENERATION_SPEEDUP
+                    await asyncio.sleep(max(0.0, deadline - loop.time()))
+                # Utterance plays out for SPEECH_SEC at the TX pace, then the caller's turn
+                await asyncio.sleep(SPEECH_SEC - SPEECH_SEC / GENERATION_SPEEDUP + PAUSE_SEC)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            drain.cancel()
+
+    async def main():
+        async with websockets.serve(session, "127.0.0.1", 0, max_queue=None) as server:
+            port_q.put(server.sockets[0].getsockname()[1])
+            await asyncio.Future()
+
+    asyncio.run(main())
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Fake Twilio carrier (child process)
+# ─────────────────────────────────────────────────────────────────────────────
+def _carrier_main(gateway_port, streams, seconds, result_q):
+    import websockets
+
+    silence = base64.b64encode(bytes([0xFF]) * FRAME_BYTES).decode("ascii")
+
+    async def media_stream(idx, arrivals):
+        uri = f"ws://127.0.0.1:{gateway_port}/ws/twilio-media"
+        async with websockets.connect(uri, max_queue=None) as ws:
+            stream_sid = f"MZload{idx:05d}"
+            await ws.send(json.dumps({"event": "start", "start": {
+                "streamSid": stream_sid, "callSid": f"CAload{idx:05d}"}}))
+
+            async def receive():
+                async for raw in ws:
+                    if '"media"' in raw:
+                        arrivals.append(time.monotonic())
+
+            recv = asyncio.create_task(receive())
+            loop = asyncio.get_running_loop()
+            deadline = loop.time()
+            end = deadline + seconds
+            chunk = 0
+            while loop.time() < end:
+                chunk += 1
+                await ws.send(json.dumps({"event": "media", "streamSid": stream_sid, "media": {
+                    "track": "inbound", "chunk": str(chunk), "payload": silence}}))
+                deadline += FRAME_INTERVAL
+                await asyncio.sleep(max(0.0, deadline - loop.time()))
+            await ws.send(json.dumps({"event": "stop", "streamSid": stream_sid}))
+            recv.cancel()
+
+    async def main():
+        per_stream = [[] for _ in range(streams)]
+        tasks = []
+        for i in range(streams):
+            tasks.append(asyncio.create_task(media_stream(i, per_stream[i])))
+            await asyncio.sleep(0.005)  # ramp: 200 calls/s
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        errors = sum(1 for r in results if isinstance(r, Exception))
+
+        jitter = []
+        received = 0
+        for arrivals in per_stream:
+            received += len(arrivals)
+            jitter.extend(burst_jitter(arrivals))
+        result_q.put({"received": received, "jitter": jitter, "errors": errors})
+
+    asyncio.run(main())
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Media gateway (this process) - production TX / audio-out code
+# ─────────────────────────────────────────────────────────────────────────────
+def _load_handler_methods():
+    import builtins
+    report_print = builtins.print
+    import server.media_ws_ai as media_ws_ai
+    builtins.print = report_print  # media_ws_ai replaces print on import
+    media_ws_ai._orig_print = lambda *args, **kwargs: None  # per-call start/exit lines
+    return media_ws_ai.MediaStreamHandler
+
+
+class LoadTestCall:
+    """Minimal call state that runs MediaStreamHandler's TX + audio-out methods"""
+
+    def __init__(self, ws, async_engine: bool, realtime_port: int):
+        from server.services.audio_ring_buffer import FrameRingQueue, tx_item_size
+        from server.services.call_event_loop import get_shared_call_loop
+        from server.services.frame_pacer import FramePacer
+
+        self.ws = ws
+        self._async_engine = async_engine
+        self._realtime_port = realtime_port
+        self.call_sid = None
+        self.stream_sid = None
+        self.tx = 0
+        self.closed = False
+        self._ws_closed = False
+        self._ai_provider = "openai"
+        self.barge_in_stop_tx = False
+        self._first_audio_sent = False
+        self._recording_started = True  # no recording in the load test
+        self.realtime_stop_flag = False
+        self.realtime_thread = None
+        self.realtime_audio_in_queue = queue.Queue(maxsize=1000)
+        self.tx_q = FrameRingQueue(maxsize=400, sizeof=tx_item_size)
+        self.tx_running = False
+        self._tx_pacer = FramePacer(interval=FRAME_INTERVAL)
+        self._ws_send_method = ws.send_nowait if async_engine else ws.send
+        self.send_times = []  # engine-side TX timestamps (pacer jitter without transport)
+
+        if async_engine:
+            self.realtime_audio_out_queue = FrameRingQueue(maxsize=1000)
+            call_loop = get_shared_call_loop()
+            self.tx_thread = call_loop.task(self._tx_loop_async, name="TX")
+            self.audio_out = call_loop.task(self._realtime_audio_out_loop_async, name="AudioOut")
+        else:
+            self.realtime_audio_out_queue = queue.Queue(maxsize=1000)
+            self.tx_thread = threading.Thread(target=self._tx_loop, daemon=True)
+            self.audio_out = threading.Thread(target=self._realtime_audio_out_loop, daemon=True)
+
+    def _ws_send(self, data):
+        if self.closed or self._ws_closed:
+            return False
+        self._ws_send_method(data)
+        if '"media"' in data:
+            self.send_times.append(time.monotonic())
+        return True
+
+    def _realtime_session_thread(self):
+        """Realtime provider client, thread mode - own thread + loop (as production)"""
+        asyncio.run(self._realtime_session())
+
+    async def _realtime_session(self):
+        """Realtime provider client - a task on the shared call loop in async mode"""
+        import websockets
+
+        try:
+            async with websockets.connect(f"ws://127.0.0.1:{self._realtime_port}", max_queue=None) as rt:
+                async def audio_in():
+                    while not self.realtime_stop_flag:
+                        try:
+                            payload = self.realtime_audio_in_queue.get_nowait()
+                        except queue.Empty:
+                            await asyncio.sleep(FRAME_INTERVAL)
+                            continue
+                        await rt.send(json.dumps({"type": "input_audio_buffer.append", "audio": payload}))
+
+                sender = asyncio.create_task(audio_in())
+                try:
+                    while not self.realtime_stop_flag:
+                        try:
+                            raw = await asyncio.wait_for(rt.recv(), timeout=0.5)
+                        except asyncio.TimeoutError:
+                            continue
+                        event = json.loads(raw)
+                        if event.get("type") == "response.audio.delta":
+                            try:
+                                self.realtime_audio_out_queue.put_nowait(event["delta"])
+                            except queue.Full:
+                                pass
+                finally:
+                    sender.cancel()
+        except Exception:
+            pass
+
+    def _handle_event(self, evt, kind) -> bool:
+        """One Twilio event; True when the reader should stop"""
+        if kind == "start":
+            self.stream_sid = evt["start"]["streamSid"]
+            self.call_sid = evt["start"]["callSid"]
+            if self._async_engine:
+                from server.services.call_event_loop import get_shared_call_loop
+                self.realtime_thread = get_shared_call_loop().task(self._realtime_session, name="Realtime")
+            else:
+                self.realtime_thread = threading.Thread(target=self._realtime_session_thread, daemon=True)
+            self.realtime_thread.start()
+            self.audio_out.start()
+            self.tx_running = True
+            self.tx_thread.start()
+        elif kind == "media":
+            try:
+                self.realtime_audio_in_queue.put_nowait(evt["media"]["payload"])
+            except queue.Full:
+                pass
+        elif kind == "stop":
+            return True
+        return False
+
+    def _end_run(self):
+        self.realtime_stop_flag = True
+        self.tx_running = False
+        self.closed = True
+        for worker in (self.tx_thread, self.audio_out, self.realtime_thread):
+            if worker is not None and worker.is_alive():
+                worker.join(timeout=1.0)
+
+    def run(self):
+        """Twilio reader, thread mode - same role as MediaStreamHandler.run"""
+        try:
+            while True:
+                frame = self.ws.receive()
+                if frame is None or self._handle_event(frame.data, frame.event):
+                    break
+        finally:
+            self._end_run()
+
+    async def run_async(self):
+        """Twilio reader, async mode - same role as MediaStreamHandler.run_async"""
+        from server.services.call_event_loop import get_shared_call_loop
+
+        try:
+            stop = False
+            while not stop:
+                events = await self.ws.receive_batch()
+                if not events:
+                    break
+                for evt, _audio in events:
+                    stop = self._handle_event(evt, evt.get("event"))
+                    if stop:
+                        break
+        finally:
+            # Joins the call's tasks - never on the loop itself
+            await get_shared_call_loop().run_blocking(self._end_run)
+
+
+def _bind_handler_methods():
+    handler_cls = _load_handler_methods()
+    for name in ("_tx_loop", "_tx_loop_async", "_tx_needs_slot", "_tx_send_item", "_tx_drain_on_close",
+                 "_tx_close_turn_if_idle", "_tx_loop_exit_log", "_realtime_audio_out_loop", "_realtime_audio_out_loop_async",
+                 "_audio_out_log_start", "_audio_out_accept_chunk", "_audio_out_needs_pacing",
+                 "_audio_out_log_put_timeout"):
+        setattr(LoadTestCall, name, getattr(handler_cls, name))
+
+
+class _StarletteSocket:
+    """The Starlette WebSocket surface MediaStreamBridge uses, over a websockets connection"""
+
+    def __init__(self, ws):
+        self._ws = ws
+
+    async def receive(self):
+        try:
+            raw = await self._ws.recv()
+        except Exception:
+            return {"type": "websocket.disconnect"}
+        key = "text" if isinstance(raw, str) else "bytes"
+        return {"type": "websocket.receive", key: raw}
+
+    async def send_text(self, data):
+        await self._ws.send(data)
+
+    async def send_bytes(self, data):
+        await self._ws.send(data)
+
+
+class MediaGateway:
+    """Stands in for asgi.ws_twilio_media: websocket ⇄ MediaStreamBridge ⇄ call thread / task"""
+
+    def __init__(self, async_engine: bool, realtime_port: int):
+        self.async_engine = async_engine
+        self.realtime_port = realtime_port
+        self.port = None
+        self.calls = []
+        self._ready = threading.Event()
+        self._loop = None
+        self._stop = None
+        self._thread = threading.Thread(target=self._run, daemon=True, name="MediaGateway")
+
+    def start(self):
+        self._thread.start()
+        self._ready.wait()
+
+    def stop(self):
+        self._loop.call_soon_threadsafe(self._stop.set_result, None)
+        self._thread.join(timeout=5.0)
+
+    async def _connection(self, ws):
+        from server.services.media_bridge import MediaStreamBridge
+
+        bridge = MediaStreamBridge(_StarletteSocket(ws))
+        bridge.bind_loop(asyncio.get_running_loop())
+        call = LoadTestCall(bridge, self.async_engine, self.realtime_port)
+        self.calls.append(call)
+        if self.async_engine:
+            from server.services.call_event_loop import get_shared_call_loop
+            get_shared_call_loop().task(call.run_async, name="TwilioReader").start()
+        else:
+            threading.Thread(target=call.run, daemon=True).start()
+        await asyncio.gather(bridge.pump_in(), bridge.pump_out(), return_exceptions=True)
+
+    def _run(self):
+        import websockets
+
+        async def main():
+            self._loop = asyncio.get_running_loop()
+            self._stop = self._loop.create_future()
+            async with websockets.serve(self._connection, "127.0.0.1", 0, max_queue=None) as server:
+                self.port = server.sockets[0].getsockname()[1]
+                self._ready.set()
+                await self._stop
+
+        asyncio.run(main())
+
+
+def run_level(mode: str, streams: int, seconds: float, ctx) -> dict:
+    from server.services.call_event_loop import get_shared_call_loop
+
+    frames_sent = ctx.Value("q", 0)
+    port_q = ctx.Queue()
+    stub = ctx.Process(target=_stub_realtime_main, args=(port_q, frames_sent), daemon=True)
+    stub.start()
+    realtime_port = port_q.get(timeout=30)
+
+    async_engine = mode == "async"
+    if async_engine:
+        call_loop = get_shared_call_loop()
+        call_loop.max_lag_ms = 0.0
+    gateway = MediaGateway(async_engine, realtime_port)
+    gateway.start()
+
+    result_q = ctx.Queue()
+    carrier = ctx.Process(target=_carrier_main, args=(gateway.port, streams, seconds, result_q), daemon=True)
+    cpu_start = time.process_time()
+    carrier.start()
+
+    peak_threads = 0
+    result = None
+    deadline = time.monotonic() + seconds + 60
+    while result is None and time.monotonic() < deadline:
+        peak_threads = max(peak_threads, threading.active_count())
+        try:
+            result = result_q.get(timeout=0.25)
+        except queue.Empty:
+            continue
+    cpu = time.process_time() - cpu_start
+
+    carrier.join(timeout=5)
+    stub.terminate()
+    stub.join(timeout=5)
+    gateway.stop()
+    time.sleep(1.5)  # let per-call workers exit before the next level
+
+    if result is None:
+        return {"mode": mode, "streams": streams, "failed": True}
+
+    jitter_ms = np.asarray(result["jitter"]) * 1000.0
+    tx_jitter_ms = np.asarray([j for call in gateway.calls for j in burst_jitter(call.send_times)]) * 1000.0
+    produced = frames_sent.value
+    return {
+        "mode": mode,
+        "streams": streams,
+        "failed": False,
+        "p50_jitter_ms": float(np.percentile(jitter_ms, 50)) if jitter_ms.size else float("nan"),
+        "p99_jitter_ms": float(np.percentile(jitter_ms, 99)) if jitter_ms.size else float("nan"),
+        "tx_p99_jitter_ms": float(np.percentile(tx_jitter_ms, 99)) if tx_jitter_ms.size else float("nan"),
+        "delivery": result["received"] / produced if produced else 0.0,
+        "errors": result["errors"],
+        "peak_threads": peak_threads,
+        "cpu_sec": cpu,
+        "loop_max_lag_ms": get_shared_call_loop().max_lag_ms if async_engine else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Call engine load test (thread vs async)")
+    parser.add_argument("--levels", default="25,50,100,200", help="comma-separated concurrent calls")
+    parser.add_argument("--seconds", type=float, default=10.0, help="call duration per level")
+    parser.add_argument("--modes", default="thread,async")
+    parser.add_argument("--jitter-budget-ms", type=float, default=10.0, help="p99 jitter limit")
+    parser.add_argument("--min-delivery", type=float, default=0.95, help="min delivered / produced frames")
+    args = parser.parse_args()
+
+    levels = [int(x) for x in args.levels.split(",") if x]
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    ctx = mp.get_context("spawn")
+    _bind_handler_methods()
+
+    print("=" * 96)
+    print(f"Call engine load test - {args.seconds:.0f}s calls, jitter budget p99 ≤ {args.jitter_budget_ms}ms, "
+          f"delivery ≥ {args.min_delivery:.0%}")
+    print("=" * 96)
+    print(f"{'mode':<7} {'calls':>6} {'p50 ms':>8} {'p99 ms':>8} {'tx p99':>8} {'delivery':>9} {'threads':>8} "
+          f"{'cpu s':>7} {'loop lag':>9} {'errors':>7}  ok")
+
+    summary = {}
+    for mode in modes:
+        max_ok = 0
+        for streams in levels:
+            r = run_level(mode, streams, args.seconds, ctx)
+            if r["failed"]:
+                print(f"{mode:<7} {streams:>6}   carrier did not report - stopping")
+                break
+            ok = (r["p99_jitter_ms"] <= args.jitter_budget_ms and r["delivery"] >= args.min_delivery
+                  and r["errors"] == 0)
+            lag = f"{r['loop_max_lag_ms']:.1f}ms" if r["loop_max_lag_ms"] is not None else "-"
+            print(f"{mode:<7} {streams:>6} {r['p50_jitter_ms']:8.2f} {r['p99_jitter_ms']:8.2f} "
+                  f"{r['tx_p99_jitter_ms']:8.2f} "
+                  f"{r['delivery']:9.1%} {r['peak_threads']:8d} {r['cpu_sec']:7.1f} {lag:>9} "
+                  f"{r['errors']:7d}  {'yes' if ok else 'NO'}")
+            if not ok:
+                break
+            max_ok = streams
+        summary[mode] = max_ok
+
+    print("-" * 96)
+    for mode, max_ok in summary.items():
+        print(f"max sustainable concurrent calls ({mode}): {max_ok if max_ok else '< ' + str(levels[0])}")
+
+
+if __name__ == "__main__":
+    main()
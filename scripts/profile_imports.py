@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Import-time profile of create_app() per SERVICE_ROLE (python -X importtime)
+
+Runs create_app(role=...) in a fresh interpreter with -X importtime, parses
+the per-module timings from stderr and prints, per role:
+- total import time and module count
+- the slowest imports by cumulative time (what a role pays for at boot)
+- cumulative time grouped by top-level package (openai, agents, sqlalchemy, ...)
+
+Child environment is the same as scripts/bench_cold_start.py (no migrations,
+no TTS warmup, scratch SQLite DATABASE_URL unless set).
+
+Usage:
+    python scripts/profile_imports.py
+    python scripts/profile_imports.py --roles=calls --top=40
+    python scripts/profile_imports.py --roles=api --raw=importtime_api.txt
+"""
+import os
+import re
+import sys
+import argparse
+import tempfile
+import subprocess
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_cold_start import CHILD_CODE, ROLES, child_env  # noqa: E402
+
+# "import time:       self [us] |  cumulative | imported package"
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def parse_importtime(stderr):
+    """[(module, self_us, cumulative_us, depth)] in the order -X importtime reports them"""
+    entries = []
+    for line in stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            entries.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return entries
+
+
+def profile_role(role, timeout):
+    with tempfile.TemporaryDirectory(prefix=f"importtime_{role}_") as scratch_dir:
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHILD_CODE, role], cwd=scratch_dir,
+                              env=child_env(role, scratch_dir), capture_output=True, text=True, timeout=timeout)
+    entries = parse_importtime(proc.stderr)
+    if proc.returncode != 0 or not entries:
+        tail = [l for l in proc.stderr.splitlines() if not l.startswith("import time:")][-5:]
+        raise RuntimeError(f"create_app(role={role!r}) failed (exit {proc.returncode}): " + " | ".join(tail))
+    return entries, proc.stderr
+
+
+def summarize(entries, top):
+    # Top-level entries (depth 0) partition the total; nested ones are included in them
+    total_us = sum(cumulative for _, _, cumulative, depth in entries if depth == 0)
+    by_package = defaultdict(int)
+    for module, self_us, _, _ in entries:
+        by_package[module.split('.')[0]] += self_us
+    slowest = sorted(entries, key=lambda e: e[2], reverse=True)[:top]
+    packages = sorted(by_package.items(), key=lambda kv: kv[1], reverse=True)[:top]
+    return total_us, slowest, packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="-X importtime summary of create_app() per SERVICE_ROLE")
+    parser.add_argument("--roles", default=",".join(ROLES), help="comma-separated roles to profile")
+    parser.add_argument("--top", type=int, default=25, help="rows per table")
+    parser.add_argument("--raw", help="write the raw -X importtime output here (single role)")
+    parser.add_argument("--timeout", type=float, default=180.0, help="seconds before a child run is abandoned")
+    args = parser.parse_args()
+
+    roles = [r.strip() for r in args.roles.split(",") if r.strip()]
+    failed = False
+    for role in roles:
+        print("=" * 100)
+        print(f"SERVICE_ROLE={role}")
+        print("=" * 100)
+        try:
+            entries, stderr = profile_role(role, args.timeout)
+        except (RuntimeError, subprocess.TimeoutExpired) as e:
+            print(f"  FAILED: {e}")
+            failed = True
+            continue
+        if args.raw:
+            with open(args.raw, "w") as f:
+                f.write(stderr)
+
+        total_us, slowest, packages = summarize(entries, args.top)
+        print(f"  {len(entries)} modules imported in {total_us / 1000:.0f}ms")
+        print()
+        print(f"  {'cumulative ms':>13} {'self ms':>9}  module (slowest by cumulative time)")
+        for module, self_us, cumulative_us, depth in slowest:
+            print(f"  {cumulative_us / 1000:>13.1f} {self_us / 1000:>9.1f}  {'  ' * depth}{module}")
+        print()
+        print(f"  {'self ms':>13} {'share':>9}  top-level package")
+        for package, self_us in packages:
+            print(f"  {self_us / 1000:>13.1f} {self_us / max(total_us, 1):>8.1%}  {package}")
+        print()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Replay recorded Twilio media streams through the per-call audio buffers
+
+Measures allocation churn of the inbound utterance buffer + outbound TX queue
+for the legacy structures (bytearray + queue.Queue) versus the preallocated
+rings (PCMRingBuffer + FrameRingQueue) used by MediaStreamHandler.
+
+Input is a Twilio Media Streams websocket capture: one JSON event per line
+({"event": "start" | "media" | "stop", ...}). Without --recording a synthetic
+call is generated (speech bursts + silence, 50 frames/s).
+
+Reported per mode:
+- frames/s replay speed
+- gen0 GC collections per 1000 frames (container allocation churn)
+- allocated memory blocks per frame (sys.getallocatedblocks sampling)
+- tracemalloc peak
+
+Usage:
+    python scripts/replay_twilio_media.py
+    python scripts/replay_twilio_media.py --recording=call.jsonl --streams=100
+    python scripts/replay_twilio_media.py --write-synthetic=call.jsonl --seconds=120
+"""
+import os
+import gc
+import sys
+import json
+import time
+import queue
+import base64
+import argparse
+import tracemalloc
+
+import numpy as np
+
+# Add server to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from server.services.audio_ring_buffer import PCMRingBuffer, FrameRingQueue, tx_item_size  # noqa: E402
+from server.services.mulaw_fast import MULAW_ENCODE_TABLE, ulaw_decode  # noqa: E402
+
+SR = 8000
+FRAME_BYTES = 160
+MAX_UTT_SEC = 12.0
+SPEECH_RMS = 180  # crude VAD threshold for the replay model
+SILENCE_FRAMES_EOU = 25  # 0.5s silence ends an utterance
+
+
+def synthetic_events(seconds: float, seed: int = 7):
+    """Generate a Twilio media-stream capture: 1.5s speech / 1s silence cycles"""
+    rng = np.random.default_rng(seed)
+    yield {"event": "start", "start": {"streamSid": "MZsynthetic", "callSid": "CAsynthetic"}}
+    n_frames = int(seconds * 50)
+    for i in range(n_frames):
+        t = np.arange(i * FRAME_BYTES, (i + 1) * FRAME_BYTES) / SR
+        speaking = (i % 125) < 75
+        amp = 6000 if speaking else 40
+        pcm = amp * np.sin(2 * np.pi * 300 * t) + rng.normal(0, 30, FRAME_BYTES)
+        pcm16 = np.clip(pcm, -32768, 32767).astype(np.int16)
+        payload = base64.b64encode(MULAW_ENCODE_TABLE[pcm16.view(np.uint16)].tobytes()).decode("ascii")
+        yield {"event": "media", "media": {"track": "inbound", "chunk": str(i + 1),
+                                           "timestamp": str(i * 20), "payload": payload}}
+    yield {"event": "stop"}
+
+
+def load_payloads(path):
+    payloads = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            evt = json.loads(line)
+            if evt.get("event") == "media":
+                payloads.append(evt["media"]["payload"])
+    return payloads
+
+
+class LegacyCall:
+    """Previous structures: growing bytearray + queue.Queue"""
+
+    def __init__(self):
+        self.buf = bytearray()
+        self.tx_q = queue.Queue(maxsize=400)
+        self.silence = 0
+
+    def utterance_done(self):
+        utt = bytes(self.buf)
+        self.buf.clear()
+        return utt
+
+    def enqueue(self, item):
+        try:
+            self.tx_q.put_nowait(item)
+        except queue.Full:
+            self.tx_q.get_nowait()
+            self.tx_q.put_nowait(item)
+
+
+class RingCall:
+    """Preallocated structures used by MediaStreamHandler"""
+
+    def __init__(self):
+        self.buf = PCMRingBuffer(capacity=int((MAX_UTT_SEC + 1.0) * 2 * SR))
+        self.tx_q = FrameRingQueue(maxsize=400, sizeof=tx_item_size)
+        self.silence = 0
+
+    def utterance_done(self):
+        utt = self.buf.snapshot()
+        self.buf.clear()
+        return utt
+
+    def enqueue(self, item):
+        self.tx_q.put_drop_oldest(item)
+
+
+def replay(call_cls, payloads, streams: int):
+    """Replay the capture on `streams` concurrent (interleaved) calls"""
+    calls = [call_cls() for _ in range(streams)]
+    echo_payload = payloads[0] if payloads else ""
+    utterances = 0
+    pcm_scratch = np.empty(FRAME_BYTES, dtype=np.int16)
+
+    gc.collect()
+    gen0_before = gc.get_stats()[0]["collections"]
+    blocks_samples = []
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    for i, payload in enumerate(payloads):
+        mulaw = base64.b64decode(payload)
+        pcm = ulaw_decode(mulaw, out=pcm_scratch[:len(mulaw)])
+        loud = int(np.abs(pcm).mean()) > SPEECH_RMS
+        pcm_bytes = pcm.tobytes()
+        for call in calls:
+            if loud:
+                call.buf.extend(pcm_bytes)
+                call.silence = 0
+            elif len(call.buf):
+                call.silence += 1
+                if call.silence >= SILENCE_FRAMES_EOU:
+                    call.utterance_done()
+                    utterances += 1
+            # Outbound: one paced frame in, one out (TX loop)
+            call.enqueue({"type": "media", "payload": echo_payload})
+            if call.tx_q.qsize() > 50:
+                call.tx_q.get_nowait()
+        if i % 500 == 0:
+            blocks_samples.append(sys.getallocatedblocks())
+
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    gen0 = gc.get_stats()[0]["collections"] - gen0_before
+
+    total_frames = len(payloads) * streams
+    block_growth = (blocks_samples[-1] - blocks_samples[0]) if len(blocks_samples) > 1 else 0
+    return {
+        "frames": total_frames,
+        "frames_per_sec": total_frames / elapsed if elapsed else 0.0,
+        "gen0_per_1k_frames": gen0 * 1000.0 / total_frames if total_frames else 0.0,
+        "block_growth_per_frame": block_growth / total_frames if total_frames else 0.0,
+        "tracemalloc_peak_kb": peak / 1024.0,
+        "utterances": utterances,
+        "per_call_memory": calls[0].buf.memory_stats() if hasattr(calls[0].buf, "memory_stats") else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay Twilio media streams through audio buffers")
+    parser.add_argument("--recording", help="Twilio media-stream capture (JSONL)")
+    parser.add_argument("--seconds", type=float, default=60.0, help="synthetic call length")
+    parser.add_argument("--streams", type=int, default=50, help="concurrent calls to replay")
+    parser.add_argument("--write-synthetic", help="write a synthetic capture to this path and exit")
+    args = parser.parse_args()
+
+    if args.write_synthetic:
+        with open(args.write_synthetic, "w") as f:
+            for evt in synthetic_events(args.seconds):
+                f.write(json.dumps(evt) + "\n")
+        print(f"wrote {args.write_synthetic}")
+        return
+
+    if args.recording:
+        payloads = load_payloads(args.recording)
+    else:
+        payloads = [e["media"]["payload"] for e in synthetic_events(args.seconds) if e["event"] == "media"]
+
+    print("=" * 80)
+    print(f"Twilio media replay - {len(payloads)} frames x {args.streams} streams")
+    print("=" * 80)
+    for name, cls in (("legacy", LegacyCall), ("ring", RingCall)):
+        r = replay(cls, payloads, args.streams)
+        print(f"{name:<7} {r['frames_per_sec']:>10.0f} frames/s  "
+              f"gen0/1k frames={r['gen0_per_1k_frames']:.2f}  "
+              f"blocks/frame={r['block_growth_per_frame']:+.4f}  "
+              f"peak={r['tracemalloc_peak_kb']:.0f}KB  utterances={r['utterances']}")
+        if r["per_call_memory"]:
+            print(f"{'':<7} per-call utterance ring: {r['per_call_memory']}")
+
+
+if __name__ == "__main__":
+    main()
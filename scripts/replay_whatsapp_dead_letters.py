@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Replay WhatsApp ingest dead letters
+
+Messages that failed WA_INGEST_MAX_DELIVERIES times are moved to the
+wa:ingest:dead stream (server/services/whatsapp_ingest.py) with the error of
+their last attempt. Without --replay this lists them; with --replay they go
+back on their chat partitions and the drain jobs process them like new
+messages (deduplicated by provider message id). Replay after fixing the cause.
+
+Usage:
+    python scripts/replay_whatsapp_dead_letters.py
+    python scripts/replay_whatsapp_dead_letters.py --tenant=business_7
+    python scripts/replay_whatsapp_dead_letters.py --replay --tenant=business_7 --limit=100
+"""
+import os
+import sys
+import json
+import argparse
+from collections import Counter
+
+# Add server to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from server.services.whatsapp_ingest import DEAD_LETTER_STREAM, iter_dead_letters, replay_dead_letters  # noqa: E402
+
+
+def list_dead_letters(tenant_id=None, limit=None):
+    """Print the dead letters (oldest first) and a summary by tenant"""
+    by_tenant = Counter()
+    for dead_id, fields in iter_dead_letters(tenant_id=tenant_id):
+        if limit is not None and sum(by_tenant.values()) >= limit:
+            break
+        by_tenant[fields.get('tenant')] += 1
+        message_id = (json.loads(fields['msg']).get('key') or {}).get('id')
+        print(f"{dead_id}  tenant={fields.get('tenant')}  message={message_id}  "
+              f"partition={fields.get('partition')}  failures={fields.get('failures')}")
+        print(f"    {fields.get('error', '')}")
+
+    print()
+    print(f"{sum(by_tenant.values())} message(s) in {DEAD_LETTER_STREAM}")
+    for tenant, count in by_tenant.most_common():
+        print(f"  {tenant}: {count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='List or replay WhatsApp ingest dead letters')
+    parser.add_argument('--replay', action='store_true', help='Put the messages back on their partitions')
+    parser.add_argument('--tenant', help='Only messages of this tenant id')
+    parser.add_argument('--limit', type=int, help='At most this many messages')
+    args = parser.parse_args()
+
+    if not os.getenv('REDIS_URL'):
+        print("ERROR: REDIS_URL environment variable not set")
+        sys.exit(1)
+
+    if not args.replay:
+        list_dead_letters(tenant_id=args.tenant, limit=args.limit)
+        return
+    replayed = replay_dead_letters(tenant_id=args.tenant, limit=args.limit)
+    print(f"Replayed {replayed} message(s) from {DEAD_LETTER_STREAM}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Media stream soak test: N synthetic Twilio streams against asgi.py
+
+    carrier processes  ──ws──▶  uvicorn + asgi.app (gateway process)
+    (N streams, 50 frames/s,    /ws/twilio-media → MediaStreamBridge →
+     send time stamped in        echo handler thread: every inbound media
+     each media payload)         frame is sent back as outbound media
+
+The gateway runs the production websocket route (asgi.ws_twilio_media) with
+MediaStreamHandler replaced by an echo handler, so what is measured is the
+transport: uvicorn, the bridge and the handler threads - not the AI pipeline.
+
+Reported per level:
+- end-to-end frame latency (carrier send → echo back at the carrier), p50 / p99 / max
+- echo ratio (frames echoed / frames sent)
+- gateway CPU: seconds, per call (% of one core), peak threads
+- bridge drops (ws_bridge counters)
+
+Usage:
+    python scripts/soak_media_streams.py
+    python scripts/soak_media_streams.py --streams=100,200,400 --seconds=30
+    python scripts/soak_media_streams.py --handler-work-us=200   # simulate per-frame handler work
+"""
+import os
+import sys
+import json
+import time
+import queue
+import base64
+import socket
+import struct
+import asyncio
+import argparse
+import resource
+import threading
+import multiprocessing as mp
+
+# Add server to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+FRAME_BYTES = 160           # 20ms μ-law @ 8kHz
+FRAME_INTERVAL = 0.020
+STAMP = struct.Struct("<dI")  # send time (monotonic), stream index
+
+
+def _percentile(values, pct):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Gateway (child process): uvicorn + asgi.app with an echo handler
+# ─────────────────────────────────────────────────────────────────────────────
+class EchoHandler:
+    """Stands in for MediaStreamHandler: echoes inbound media back to the caller"""
+
+    work_seconds = 0.0
+
+    def __init__(self, ws):
+        self.ws = ws
+
+    def run(self):
+        stream_sid = None
+        frames = 0
+        while True:
+            frame = self.ws.receive()
+            if frame is None:
+                break
+            if isinstance(frame, (str, bytes)):  # a bridge that hands over raw JSON
+                evt = json.loads(frame)
+                event = evt.get("event")
+                audio = base64.b64decode(evt["media"]["payload"]) if event == "media" else None
+            else:
+                evt, event, audio = frame.data, frame.event, frame.audio
+            if event == "start":
+                stream_sid = evt["start"]["streamSid"]
+            elif event == "media":
+                if self.work_seconds:
+                    deadline = time.perf_counter() + self.work_seconds
+                    while time.perf_counter() < deadline:
+                        pass
+                frames += 1
+                self.ws.send(json.dumps({"event": "media", "streamSid": stream_sid,
+                                         "media": {"payload": base64.b64encode(audio).decode("ascii")}}))
+                if frames % 50 == 0:
+                    self.ws.send(json.dumps({"event": "mark", "streamSid": stream_sid,
+                                             "mark": {"name": f"m{frames}"}}))
+            elif event == "stop":
+                break
+
+
+def _gateway_main(port, ready, stop, result_q, work_us):
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)  # asgi.py prints every connection step
+    import logging
+    logging.disable(logging.WARNING)
+
+    import uvicorn
+    import asgi
+    import server.media_ws_ai as media_ws_ai
+    from server.services.media_bridge import bridge_stats, _bridges
+
+    asgi.flask_app = object()  # skip the Flask warmup - only the websocket route is used
+    EchoHandler.work_seconds = work_us / 1e6
+    media_ws_ai.MediaStreamHandler = EchoHandler
+
+    config = uvicorn.Config(asgi.app, host="127.0.0.1", port=port, log_level="error",
+                            ws_max_queue=1024, lifespan="off")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    peak_streams = 0
+    peak_threads = 0
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    cpu_start = usage.ru_utime + usage.ru_stime
+    ready.set()
+    while not stop.wait(0.25):
+        peak_streams = max(peak_streams, bridge_stats()["streams"])
+        peak_threads = max(peak_threads, threading.active_count())
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    cpu = usage.ru_utime + usage.ru_stime - cpu_start
+
+    dropped = {"rx_dropped": 0, "tx_dropped": 0, "tx_cleared": 0}
+    for bridge in list(_bridges):
+        for key in dropped:
+            dropped[key] += bridge.counters[key]
+    result_q.put({"cpu_sec": cpu, "peak_streams": peak_streams, "peak_threads": peak_threads, **dropped})
+    server.should_exit = True
+    thread.join(timeout=5)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Carrier (child processes): synthetic Twilio media streams
+# ─────────────────────────────────────────────────────────────────────────────
+def _carrier_main(port, first, count, seconds, result_q):
+    import websockets
+
+    async def media_stream(idx, latencies, counts):
+        uri = f"ws://127.0.0.1:{port}/ws/twilio-media"
+        async with websockets.connect(uri, max_queue=None) as ws:
+            stream_sid = f"MZsoak{idx:05d}"
+            await ws.send(json.dumps({"event": "start", "start": {
+                "streamSid": stream_sid, "callSid": f"CAsoak{idx:05d}"}}))
+
+            async def receive():
+                async for raw in ws:
+                    evt = json.loads(raw)
+                    if evt.get("event") != "media":
+                        continue
+                    sent_at, _ = STAMP.unpack_from(base64.b64decode(evt["media"]["payload"]))
+                    latencies.append(time.monotonic() - sent_at)
+                    counts[1] += 1
+
+            recv = asyncio.create_task(receive())
+            loop = asyncio.get_running_loop()
+            padding = bytes([0xFF]) * (FRAME_BYTES - STAMP.size)
+            deadline = loop.time()
+            end = deadline + seconds
+            chunk = 0
+            while loop.time() < end:
+                chunk += 1
+                payload = base64.b64encode(STAMP.pack(time.monotonic(), idx) + padding).decode("ascii")
+                await ws.send(json.dumps({"event": "media", "streamSid": stream_sid, "media": {
+                    "track": "inbound", "chunk": str(chunk), "payload": payload}}))
+                counts[0] += 1
+                deadline += FRAME_INTERVAL
+                await asyncio.sleep(max(0.0, deadline - loop.time()))
+            await asyncio.sleep(0.5)  # let the last echoes arrive
+            await ws.send(json.dumps({"event": "stop", "streamSid": stream_sid}))
+            recv.cancel()
+
+    async def main():
+        latencies = []
+        counts = [0, 0]  # sent, echoed
+        tasks = []
+        for i in range(first, first + count):
+            tasks.append(asyncio.create_task(media_stream(i, latencies, counts)))
+            await asyncio.sleep(0.01)  # ramp: 100 streams/s per carrier
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        errors = [repr(r) for r in results if isinstance(r, Exception)]
+        result_q.put({"sent": counts[0], "echoed": counts[1], "latencies": latencies, "errors": errors})
+
+    asyncio.run(main())
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def run_level(streams: int, seconds: float, carriers: int, work_us: float, ctx) -> dict:
+    port = _free_port()
+    ready, stop = ctx.Event(), ctx.Event()
+    gateway_q = ctx.Queue()
+    gateway = ctx.Process(target=_gateway_main, args=(port, ready, stop, gateway_q, work_us), daemon=True)
+    gateway.start()
+    if not ready.wait(60):
+        gateway.terminate()
+        return {"streams": streams, "failed": "gateway did not start"}
+
+    carrier_q = ctx.Queue()
+    procs = []
+    per_carrier = -(-streams // carriers)
+    for first in range(0, streams, per_carrier):
+        count = min(per_carrier, streams - first)
+        proc = ctx.Process(target=_carrier_main, args=(port, first, count, seconds, carrier_q), daemon=True)
+        proc.start()
+        procs.append(proc)
+
+    results = []
+    deadline = time.monotonic() + seconds + 60
+    while len(results) < len(procs) and time.monotonic() < deadline:
+        try:
+            results.append(carrier_q.get(timeout=0.5))
+        except queue.Empty:
+            continue
+    stop.set()
+    try:
+        gateway_result = gateway_q.get(timeout=10)
+    except queue.Empty:
+        gateway_result = None
+    for proc in procs:
+        proc.join(timeout=5)
+    gateway.join(timeout=10)
+
+    if gateway_result is None or len(results) < len(procs):
+        return {"streams": streams, "failed": "timeout"}
+
+    latencies_ms = [lat * 1000.0 for r in results for lat in r["latencies"]]
+    sent = sum(r["sent"] for r in results)
+    echoed = sum(r["echoed"] for r in results)
+    errors = [e for r in results for e in r["errors"]]
+    return {
+        "streams": streams,
+        "failed": None,
+        "p50_ms": _percentile(latencies_ms, 50),
+        "p99_ms": _percentile(latencies_ms, 99),
+        "max_ms": max(latencies_ms) if latencies_ms else float("nan"),
+        "echo_ratio": echoed / sent if sent else 0.0,
+        "cpu_sec": gateway_result["cpu_sec"],
+        "cpu_per_call_pct": gateway_result["cpu_sec"] / (streams * seconds) * 100.0,
+        "peak_threads": gateway_result["peak_threads"],
+        "rx_dropped": gateway_result["rx_dropped"],
+        "tx_dropped": gateway_result["tx_dropped"],
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak test: synthetic Twilio media streams against asgi.py")
+    parser.add_argument("--streams", default="100,200", help="comma-separated concurrent streams per level")
+    parser.add_argument("--seconds", type=float, default=15.0, help="stream duration per level")
+    parser.add_argument("--carriers", type=int, default=4, help="carrier processes generating the streams")
+    parser.add_argument("--handler-work-us", type=float, default=0.0, help="busy work per frame in the handler")
+    args = parser.parse_args()
+
+    ctx = mp.get_context("spawn")
+    levels = [int(x) for x in args.streams.split(",") if x.strip()]
+    rows = [run_level(n, args.seconds, args.carriers, args.handler_work_us, ctx) for n in levels]
+
+    print("=" * 100)
+    print(f"Media stream soak - {args.seconds:.0f}s streams, echo handler "
+          f"({args.handler_work_us:.0f}us work/frame), {args.carriers} carrier processes")
+    print("=" * 100)
+    print(f"{'streams':>7} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'echoed':>8} "
+          f"{'cpu s':>7} {'cpu/call':>9} {'threads':>8} {'rx drop':>8} {'tx drop':>8} {'errors':>7}")
+    for row in rows:
+        if row["failed"]:
+            print(f"{row['streams']:>7}  FAILED: {row['failed']}")
+            continue
+        print(f"{row['streams']:>7} {row['p50_ms']:>8.2f} {row['p99_ms']:>8.2f} {row['max_ms']:>8.1f} "
+              f"{row['echo_ratio']:>7.1%} {row['cpu_sec']:>7.1f} {row['cpu_per_call_pct']:>8.2f}% "
+              f"{row['peak_threads']:>8} {row['rx_dropped']:>8} {row['tx_dropped']:>8} {len(row['errors']):>7}")
+        for error in row["errors"][:3]:
+            print(f"        {error}")
+    print("-" * 100)
+    print("cpu/call = gateway CPU time / (streams x duration): share of one core each call costs")
+    return 0 if all(not row["failed"] and not row["errors"] for row in rows) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,11 +2,13 @@
 # This file must exist but should only export our local functions
 # DO NOT import from 'agents' package here to avoid conflicts
 
-from server.agent_tools.agent_factory import (
-    get_agent,
-    create_booking_agent,
-    create_ops_agent,
-    AGENTS_ENABLED
-)
-
+# Resolved on first access: importing agent_factory loads the Agents SDK (~1.5s),
+# which modules that only need phone_utils / tools_* must not pay for at boot.
 __all__ = ['get_agent', 'create_booking_agent', 'create_ops_agent', 'AGENTS_ENABLED']
+
+
+def __getattr__(name):
+    if name in __all__:
+        from server.agent_tools import agent_factory
+        return getattr(agent_factory, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
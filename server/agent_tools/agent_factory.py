@@ -11,7 +11,7 @@ import os
 from datetime import datetime, timedelta
 import pytz
 import threading
-from typing import Dict, Tuple, Optional
+from typing import Dict, Optional
 
 # 🔥 CRITICAL FIX: Import OpenAI Agents SDK directly (server/agents/__init__.py is now empty)
 from agents import Agent, ModelSettings
@@ -25,6 +25,7 @@ from server.agent_tools.tools_crm_context import (
     find_lead_by_phone, get_lead_context, create_lead_note, update_lead_fields
 )
 # NOTE: update_lead_status imported lazily to avoid circular imports
+from server.services.agent_cache import get_agent_cache
 import logging
 
 logger = logging.getLogger(__name__)
@@ -32,10 +33,8 @@ logger = logging.getLogger(__name__)
 # Check if agents are enabled
 AGENTS_ENABLED = os.getenv("AGENTS_ENABLED", "1") == "1"
 
-# 🔥 SINGLETON CACHE: Store agents by (business_id, channel) key
-_AGENT_CACHE: Dict[Tuple[int, str], Tuple[Agent, datetime]] = {}
-_AGENT_LOCK = threading.Lock()
-_CACHE_TTL_MINUTES = 30  # 🔥 FIX: Increased to 30 minutes to maintain conversation context across messages
+# 🔥 SINGLETON CACHE: Agents by (business_id, channel) live in the shared AgentCache
+# (services/agent_cache.py) - 30 minute TTL to maintain conversation context across messages
 
 # 🔥 NEW: Track conversation statistics for debugging
 _CONVERSATION_STATS: Dict[str, Dict] = {}
@@ -126,16 +125,10 @@ def invalidate_agent_cache(business_id: int):
     """
     🔥 CRITICAL: Invalidate agent cache for specific business
     Called after prompt updates to ensure new conversations use updated prompts
+    (in every worker - the invalidation is broadcast to other processes)
     """
-    with _AGENT_LOCK:
-        keys_to_remove = [k for k in _AGENT_CACHE.keys() if k[0] == business_id]
-        for key in keys_to_remove:
-            del _AGENT_CACHE[key]
-            logger.info(f"✅ Agent cache invalidated: business={key[0]}, channel={key[1]}")
-        if keys_to_remove:
-            logger.info(f"♻️  Cleared {len(keys_to_remove)} cached agents for business {business_id}")
-        else:
-            logger.info(f"♻️  No cached agents found for business {business_id}")
+    get_agent_cache().invalidate(business_id)
+    logger.info(f"♻️  Cleared cached agents for business {business_id}")
 
 # 🎯 Model settings for all agents - matching AgentKit best practices
 # 🔥 CRITICAL: Use OpenAI with timeout to prevent 10s silence!
@@ -193,25 +186,10 @@ def get_or_create_agent(business_id: int, channel: str, business_name: str = "ה
         logger.error("❌ Cannot create agent without business_id")
         return None
     
-    cache_key = (business_id, channel)
-    now = datetime.now(tz=pytz.UTC)
-    
-    # 🔒 THREAD-SAFE: Acquire lock for cache access
-    with _AGENT_LOCK:
-        # Check if we have a valid cached agent
-        if cache_key in _AGENT_CACHE:
-            cached_agent, cached_time = _AGENT_CACHE[cache_key]
-            age_minutes = (now - cached_time).total_seconds() / 60
-            
-            if age_minutes < _CACHE_TTL_MINUTES:
-                # Using cached agent silently
-                return cached_agent
-            else:
-                # Cache expired, remove it
-                del _AGENT_CACHE[cache_key]
-        
-        # No valid cache - create new agent
-        
+    # 🔒 THREAD-SAFE: shared AgentCache - concurrent misses for the same
+    # business+channel build the agent once (other keys are not blocked)
+    def _create_agent():
+        nonlocal custom_instructions
         try:
             import time
             agent_start = time.time()
@@ -267,13 +245,10 @@ def get_or_create_agent(business_id: int, channel: str, business_name: str = "ה
             if agent_creation_time > 2000:
                 logger.warning(f"⚠️  SLOW AGENT CREATION: {agent_creation_time:.0f}ms > 2000ms!")
             
-            if new_agent:
-                # Cache the new agent
-                _AGENT_CACHE[cache_key] = (new_agent, now)
-                if custom_instructions:
-                    import hashlib
-                    prompt_hash = hashlib.sha1(custom_instructions.encode()).hexdigest()[:8]
-                    logger.info(f"✅ Agent cached: business={business_id}, channel={channel}, prompt_hash={prompt_hash}")
+            if new_agent and custom_instructions:
+                import hashlib
+                prompt_hash = hashlib.sha1(custom_instructions.encode()).hexdigest()[:8]
+                logger.info(f"✅ Agent cached: business={business_id}, channel={channel}, prompt_hash={prompt_hash}")
             
             return new_agent
             
@@ -282,6 +257,8 @@ def get_or_create_agent(business_id: int, channel: str, business_name: str = "ה
             import traceback
             traceback.print_exc()
             return None
+    
+    return get_agent_cache().get_or_create(business_id, channel, _create_agent, business_name)
 
 def create_booking_agent(business_name: str = "העסק", custom_instructions: str = None, business_id: int = None, channel: str = "phone") -> Agent:
     """
@@ -2078,7 +2055,7 @@ def warmup_all_agents():
 def get_agent(agent_type: str = "booking", business_name: str = "העסק", custom_instructions: str = None, business_id: int = None, channel: str = "phone") -> Agent:
     """
     🔥 FIX: Legacy function now delegates to get_or_create_agent()
-    This ensures all agent creation goes through the proper cache (_AGENT_CACHE)
+    This ensures all agent creation goes through the proper cache (AgentCache)
     and prompt updates are properly invalidated.
     
     Args:
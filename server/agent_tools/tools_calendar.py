@@ -12,6 +12,7 @@ from flask import g
 from server.models_sql import db, Appointment, BusinessSettings, CallLog
 from server.agent_tools.phone_utils import normalize_il_phone
 from server.services.customer_intelligence import CustomerIntelligence
+from server.services.availability_service import find_nearest_slots
 import logging
 import time
 
@@ -135,135 +136,41 @@ def _calendar_find_slots_impl(input: FindSlotsInput, context: Optional[Dict[str,
             logger.warning(f"Date {input.date_iso} is beyond booking window ({policy.booking_window_days} days)")
             return FindSlotsOutput(slots=[])
         
-        # Get weekday name for opening hours
-        weekday_map = {0: "mon", 1: "tue", 2: "wed", 3: "thu", 4: "fri", 5: "sat", 6: "sun"}
-        weekday_key = weekday_map[date.weekday()]
-        
-        # Get existing appointments for this date
-        start_of_day = date.replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
-        end_of_day = date.replace(hour=23, minute=59, second=59, microsecond=999999, tzinfo=None)
-        
-        # Query appointments - optionally filter by calendar_id
-        query = Appointment.query.filter(
-            Appointment.business_id == input.business_id,
-            Appointment.start_time >= start_of_day,
-            Appointment.start_time < end_of_day,
-            Appointment.status.in_(['scheduled', 'confirmed'])
-        )
+        # 🔥 Interval index: cached per (business, calendar, day), bisect per candidate
+        target_minute = None
+        if input.preferred_time:
+            try:
+                pref_hour, pref_min = map(int, input.preferred_time.split(':'))
+                target_minute = pref_hour * 60 + pref_min
+            except (ValueError, AttributeError):
+                pass
         
         if input.calendar_id:
-            query = query.filter(Appointment.calendar_id == input.calendar_id)
             logger.info(f"📅 Filtering by calendar_id={input.calendar_id}")
         
-        existing = query.all()
-        
-        logger.info(f"📊 Found {len(existing)} existing appointments on {input.date_iso}")
-        
-        # 🔥 BUILD 182: OPTIMIZED slot generation - search outward from preferred_time
-        # Instead of generating ALL slots then sorting, start from preferred time and expand
-        slots = []
         now = datetime.now(business_tz)
+        minutes = find_nearest_slots(
+            input.business_id,
+            date.date(),
+            input.duration_min,
+            policy,
+            target_minute=target_minute,
+            count=2,
+            calendar_id=input.calendar_id,
+            now=now
+        )
         
-        # Parse preferred time to start point (default: current time + min_notice)
-        start_search_min = (now.hour * 60 + now.minute) + policy.min_notice_min
-        if input.preferred_time:
-            try:
-                pref_hour, pref_min = map(int, input.preferred_time.split(':'))
-                start_search_min = pref_hour * 60 + pref_min
-            except:
-                pass
-        
-        def check_slot(minute_offset: int) -> Slot:
-            """Check if a slot at given minute offset is available"""
-            hour = minute_offset // 60
-            minute = minute_offset % 60
-            if hour < 0 or hour >= 24:
-                return None
-                
-            slot_start = date.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        slots = []
+        for minute in minutes:
+            slot_start = date.replace(hour=minute // 60, minute=minute % 60, second=0, microsecond=0)
             slot_end = slot_start + timedelta(minutes=input.duration_min)
-            
-            # Check minimum notice
-            if (slot_start - now).total_seconds() < policy.min_notice_min * 60:
-                return None
-            
-            # Check business hours (if not 24/7)
-            if not policy.allow_24_7:
-                opening_windows = policy.opening_hours.get(weekday_key, [])
-                slot_start_min = hour * 60 + minute
-                slot_end_min = slot_end.hour * 60 + slot_end.minute
-                
-                in_window = False
-                for window in opening_windows:
-                    if not window or len(window) < 2:
-                        continue
-                    w_start_h, w_start_m = map(int, window[0].split(':'))
-                    w_end_h, w_end_m = map(int, window[1].split(':'))
-                    w_start_min = w_start_h * 60 + w_start_m
-                    w_end_min = w_end_h * 60 + w_end_m
-                    
-                    if slot_start_min >= w_start_min and slot_end_min <= w_end_min:
-                        in_window = True
-                        break
-                
-                if not in_window:
-                    return None
-            
-            # Check conflicts
-            has_conflict = any(
-                (business_tz.localize(apt.start_time) if apt.start_time.tzinfo is None else apt.start_time) < slot_end and
-                (business_tz.localize(apt.end_time) if apt.end_time.tzinfo is None else apt.end_time) > slot_start
-                for apt in existing
-            )
-            
-            if has_conflict:
-                return None
-                
-            return Slot(
+            slots.append(Slot(
                 start_iso=slot_start.isoformat(),
                 end_iso=slot_end.isoformat(),
                 start_display=slot_start.strftime("%H:%M")
-            )
-        
-        # 🔥 Search outward from preferred time - find 2 slots quickly!
-        max_search_distance = 12 * 60  # Max 12 hours in each direction
-        slot_size = policy.slot_size_min
-        
-        # Align to slot grid
-        start_search_min = (start_search_min // slot_size) * slot_size
-        
-        for delta in range(0, max_search_distance, slot_size):
-            if len(slots) >= 2:
-                break  # 🔥 EARLY EXIT - found 2 slots!
-            
-            # Check slot at preferred_time + delta
-            slot = check_slot(start_search_min + delta)
-            if slot and slot not in [s.start_display for s in slots]:
-                slots.append(slot)
-            
-            # Check slot at preferred_time - delta (only if delta > 0)
-            if delta > 0 and len(slots) < 2:
-                slot = check_slot(start_search_min - delta)
-                if slot and slot.start_display not in [s.start_display for s in slots]:
-                    slots.insert(0, slot)  # Insert earlier times first
-        
-        # Sort by proximity to preferred time
-        if input.preferred_time and slots:
-            try:
-                pref_hour, pref_min = map(int, input.preferred_time.split(':'))
-                preferred_minutes = pref_hour * 60 + pref_min
-                
-                def slot_distance(slot: Slot) -> tuple:
-                    slot_hour, slot_min = map(int, slot.start_display.split(':'))
-                    slot_minutes = slot_hour * 60 + slot_min
-                    delta = slot_minutes - preferred_minutes
-                    return (abs(delta), delta)
-                
-                slots.sort(key=slot_distance)
-            except:
-                pass
+            ))
         
-        logger.info(f"🎯 [OPTIMIZED] Found {len(slots)} slots near {input.preferred_time or 'current time'}")
+        logger.info(f"🎯 [INDEXED] Found {len(slots)} slots near {input.preferred_time or 'earliest available'}")
         
         # Build business_hours string from policy
         if policy.allow_24_7:
@@ -239,412 +239,94 @@ def create_minimal_app():
     from server.db import db
     import server.models_sql  # Import models module
     db.init_app(app)
-    
+
     return app
 
-def create_app():
-    """Create Flask application with React frontend (לפי ההנחיות המדויקות)"""
-    
-    # Check if we're in migration mode - skip all heavy initialization
-    if os.getenv('MIGRATION_MODE') == '1':
-        logger.info("🔧 MIGRATION_MODE detected - creating minimal app")
-        return create_minimal_app()
-    
-    # 🔒 P1: Determine production mode for security features
-    is_production_mode = os.getenv('PRODUCTION', '0') in ('1', 'true', 'True')
-    
-    # 🔒 P1: SECRET_KEY Fail-Fast in Production
-    secret_key = os.getenv('SECRET_KEY')
-    if is_production_mode and not secret_key:
-        raise RuntimeError(
-            "PRODUCTION=1 requires SECRET_KEY environment variable. "
-            "Generate with: python3 -c \"import secrets; print(secrets.token_hex(32))\""
-        )
-    if not secret_key:
-        secret_key = secrets.token_hex(32)
-        logger.warning("⚠️ Development mode: Using generated SECRET_KEY (not persistent)")
-    
-    # GCP credentials setup
-    import json
-    gcp_creds = os.getenv('GOOGLE_APPLICATION_CREDENTIALS', '')
-    if gcp_creds and gcp_creds.startswith('{'):
+# ====================================================================
+# Service roles
+# ====================================================================
+# SERVICE_ROLE decides what create_app() loads:
+# - api / all: every blueprint, UI, SPA (the full dashboard API)
+# - calls: only what nginx routes to the calls pod (/ws/, /webhook*)
+# - worker / scheduler: no HTTP surface - the app exists for app_context + DB
+# Any other value (migrate, indexer, backfill, ...) loads everything, as before.
+SERVICE_ROLES = ('api', 'calls', 'worker', 'scheduler', 'all')
+
+# (module, blueprint attribute) per role; None = full API surface
+ROLE_BLUEPRINTS = {
+    'api': None,
+    'all': None,
+    'calls': (
+        ('server.health_endpoints', 'health_bp'),
+        ('server.routes_twilio', 'twilio_bp'),    # /webhook/incoming_call, call_status, recordings
+        ('server.routes_webhook', 'webhook_bp'),  # /webhook/* (Baileys)
+    ),
+    'worker': (
+        ('server.health_endpoints', 'health_bp'),
+    ),
+    'scheduler': (
+        ('server.health_endpoints', 'health_bp'),
+    ),
+}
+
+# Roles that pre-warm the live call path (TTS / Google clients) at startup
+CALL_WARMUP_ROLES = ('calls', 'all')
+
+# Roles that own outbound runs and clean up stuck ones on startup
+OUTBOUND_CLEANUP_ROLES = ('api', 'all')
+
+
+def get_service_role(role=None):
+    """
+    Normalized SERVICE_ROLE for this process.
+
+    Args:
+        role: Explicit role (overrides the SERVICE_ROLE env var)
+
+    Returns:
+        One of SERVICE_ROLES ('all' for unset or unknown roles)
+    """
+    role = (role or os.getenv('SERVICE_ROLE') or 'all').strip().lower()
+    return role if role in SERVICE_ROLES else 'all'
+
+
+def _register_role_blueprints(app, role):
+    """Register only the blueprints `role` serves (fail-fast, like the essential blueprints)"""
+    import importlib
+    for module_name, attr in ROLE_BLUEPRINTS[role]:
         try:
-            creds_data = json.loads(gcp_creds)
-            credentials_path = '/tmp/gcp_credentials.json'
-            with open(credentials_path, 'w') as f:
-                json.dump(creds_data, f)
-            os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = credentials_path
-        except Exception:
-            pass
-    
-    app = Flask(__name__, 
-                static_folder=os.path.join(os.path.dirname(__file__), "..", "client", "dist"),
-                static_url_path="",
-                template_folder=os.path.join(os.path.dirname(__file__), "templates"))
-    
-    import time, subprocess
-    
-    # Git SHA for version info endpoint
-    try:
-        git_sha = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], 
-                                        cwd=os.path.dirname(__file__), 
-                                        stderr=subprocess.DEVNULL,
-                                        timeout=2).decode().strip()
-    except:
-        git_sha = "dev"
-    
-    version_info = {
-        "build": 87,
-        "sha": git_sha,
-        "fe": "client/dist",
-        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
-        "app": "AgentLocator-Complete",
-        "commit": os.getenv("GIT_COMMIT", git_sha),
-        "startup_ts": int(time.time())
-    }
-    
-    # Database configuration with SSL fix
-    # 🔥 CRITICAL FIX: Use unified DATABASE_URL validation
-    # This prevents confusing DNS errors from invalid database URLs
-    from server.database_validation import validate_database_url
-    validate_database_url()
-    
-    # 🔥 FIX: Single source of truth for database URL
-    # Use unified function that prioritizes DATABASE_URL, falls back to DB_POSTGRESDB_*
-    # 🔥 CRITICAL: Use POOLER connection for API/Worker traffic (not direct)
-    from server.database_url import get_database_url
-    DATABASE_URL = get_database_url(connection_type="pooler")
-    
-    # Enterprise Security Configuration
-    app.config.update({
-        'SECRET_KEY': secret_key,
-        'DATABASE_URL': DATABASE_URL,
-        'SQLALCHEMY_DATABASE_URI': DATABASE_URL,
-        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
-        'SQLALCHEMY_ENGINE_OPTIONS': {
-            'pool_pre_ping': True,  # ✅ DB RESILIENCE: Verify connections before use (prevents stale connections)
-            'pool_recycle': 180,    # 🔥 FIX: Recycle connections after 3 min (before Supabase pooler timeout)
-            # Fix for Eventlet + SQLAlchemy lock issue
-            'poolclass': __import__('sqlalchemy.pool', fromlist=['NullPool']).NullPool,
-            'connect_args': {
-                'connect_timeout': 5,  # 🔥 DNS FIX: Shorter timeout for faster failover
-                'application_name': 'AgentLocator-71',
-                # ✅ DB RESILIENCE: Add statement timeout to prevent hanging queries
-                'options': '-c statement_timeout=30000',  # 30 seconds max per statement
-                # 🔥 DNS FIX: TCP keepalive to detect dead connections
-                'keepalives': 1,
-                'keepalives_idle': 30,
-                'keepalives_interval': 10,
-                'keepalives_count': 5
-            }
-        },
-        # Session configuration
-        'SESSION_COOKIE_HTTPONLY': True,
-        'PERMANENT_SESSION_LIFETIME': timedelta(hours=8),
-        'SESSION_REFRESH_EACH_REQUEST': True
-    })
-    
-    # ✅ DB RESILIENCE: Log pool configuration for troubleshooting
-    logger.info(f"[DB_POOL] pool_pre_ping=True pool_recycle=60s (forced refresh)")  # QA: Fixed log to match actual value
-    
-    # 1) Flask bootstrap - ProxyFix for Replit's reverse proxy
-    app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
-    app.config.update(PREFERRED_URL_SCHEME='https')
+            blueprint = getattr(importlib.import_module(module_name), attr)
+            app.register_blueprint(blueprint)
+        except Exception as e:
+            app.logger.error(f"❌ [BOOT][FATAL] Failed to register {module_name}.{attr} for SERVICE_ROLE={role}: {e}")
+            raise RuntimeError(f"Blueprint '{attr}' failed to register for SERVICE_ROLE={role}: {e}")
+    app.logger.info(f"✅ SERVICE_ROLE={role}: {len(ROLE_BLUEPRINTS[role])} blueprint(s) registered")
 
-    # ═══════════════════════════════════════════════════════════════════
-    # BUILD 143 UNIFIED COOKIE CONFIGURATION - ONE SET FOR ALL ENVIRONMENTS
-    # All cookies MUST use the same settings for Replit cross-origin to work!
-    # BUILD 177: Support HTTP mode via COOKIE_SECURE=false env var for external servers
-    # ═══════════════════════════════════════════════════════════════════
-    
-    # Determine if cookies should be secure (HTTPS only)
-    # Default: True for production (HTTPS required)
-    # Set COOKIE_SECURE=false for HTTP-only deployments (not recommended for production!)
-    cookie_secure = os.getenv("COOKIE_SECURE", "true").lower() != "false"
-    
-    # P3 Security: Enforce secure cookies in production
-    is_production = os.getenv('PRODUCTION', '0') == '1'
-    if is_production and not cookie_secure:
-        logger.error("❌ SECURITY: PRODUCTION=1 requires COOKIE_SECURE=true (HTTPS only)")
-        logger.error("Set COOKIE_SECURE=false only for development/testing")
-        raise ValueError("Production mode requires secure cookies (HTTPS)")
-    
-    cookie_samesite = 'None' if cookie_secure else 'Lax'  # SameSite=None requires Secure
-    
-    if not cookie_secure:
-        app.logger.warning("⚠️ COOKIE_SECURE=false - Running in HTTP mode. NOT recommended for production!")
-    
-    # Session Cookie Settings
-    app.config.update(
-        SESSION_COOKIE_NAME='session',
-        SESSION_COOKIE_SECURE=cookie_secure,       # BUILD 177: Configurable
-        SESSION_COOKIE_SAMESITE=cookie_samesite,   # Must be Lax if not Secure
-        SESSION_COOKIE_HTTPONLY=True,     # Security: JS can't read session
-        SESSION_COOKIE_PATH='/',
-        REMEMBER_COOKIE_SECURE=cookie_secure,
-        REMEMBER_COOKIE_SAMESITE=cookie_samesite,
-        REMEMBER_COOKIE_HTTPONLY=True,
-    )
-    
-    # P3 Security: Log session configuration
-    session_lifetime = app.config.get('PERMANENT_SESSION_LIFETIME', timedelta(hours=8))
-    if isinstance(session_lifetime, timedelta):
-        session_hours = session_lifetime.total_seconds() / 3600
-    else:
-        session_hours = session_lifetime / 3600 if session_lifetime else 8
-    
-    logger.info(f"[SESSION] Secure={cookie_secure}, HttpOnly=True, SameSite={cookie_samesite}, Lifetime={session_hours}h")
-    
-    # SeaSurf CSRF Cookie Settings - MUST match session settings!
-    app.config.update(
-        SEASURF_COOKIE_NAME='csrf_token',
-        SEASURF_HEADER='X-CSRFToken',
-        SEASURF_COOKIE_SECURE=cookie_secure,       # BUILD 177: Configurable
-        SEASURF_COOKIE_SAMESITE=cookie_samesite,   # Must be Lax if not Secure
-        SEASURF_COOKIE_HTTPONLY=False,    # MUST be False! Frontend needs to read it
-        SEASURF_COOKIE_PATH='/',
-        SEASURF_INCLUDE_OR_EXEMPT_VIEWS='include',  # Default include all views
-    )
-    
-    # Initialize SeaSurf
-    from server.extensions import csrf
-    csrf.init_app(app)
-    
-    # שגיאות JSON ברורות (שלא תראה Error {} ריק) - REMOVED DUPLICATES
-    
-    # Enterprise Security Headers
-    @app.after_request
-    def add_security_headers(response):
-        """Add enterprise security headers"""
+def _register_api_blueprints(app, csrf):
+    """Full API surface: every blueprint, the UI and the security context (api / all roles)"""
+    # ⚡ CRITICAL FIX: Register essential API blueprints FIRST (before all other blueprints)
+    # This ensures dashboard, business, notifications, etc. work even if other blueprints fail
+    # If these fail to register, app CRASHES (fail-fast) instead of running without API
+    try:
+        # Health endpoints - MUST be registered FIRST for monitoring
+        from server.health_endpoints import health_bp
+        app.register_blueprint(health_bp)
+        app.logger.info("✅ Health endpoints registered")
         
-        # Check if this is a PDF viewing endpoint that needs iframe support
-        is_pdf_endpoint = (
-            request.endpoint and 
-            (request.endpoint.endswith('.stream_contract_pdf') or 
-             request.endpoint.endswith('.get_contract_pdf_url'))
-        )
+        # API Adapter - Dashboard, stats, activity endpoints
+        from server.api_adapter import api_adapter_bp
+        app.register_blueprint(api_adapter_bp)
+        app.logger.info("✅ API Adapter blueprint registered (dashboard endpoints)")
         
-        # CSP (Content Security Policy) - Strict but functional
-        # For PDF endpoints, allow same-origin framing
-        if is_pdf_endpoint:
-            csp_policy = (
-                "default-src 'self'; "
-                "script-src 'self' 'unsafe-inline' https://unpkg.com; "
-                "style-src 'self' 'unsafe-inline' https://fonts.googleapis.com; "
-                "font-src 'self' https://fonts.gstatic.com data:; "
-                "img-src 'self' data: blob: https:; "
-                "media-src 'self' blob: data:; "  # Allow blob and data URLs for audio playback
-                "connect-src 'self' wss: ws: https://fonts.googleapis.com https://fonts.gstatic.com; "
-                "frame-src 'self' https://*.r2.cloudflarestorage.com; "  # Allow R2 URLs in iframes for PDF viewing
-                "frame-ancestors 'self'; "  # Allow same-origin framing for PDFs
-                "object-src 'none'; "
-                "base-uri 'self'; "
-                "form-action 'self';"
-            )
-        else:
-            csp_policy = (
-                "default-src 'self'; "
-                "script-src 'self' 'unsafe-inline' https://unpkg.com; "
-                "style-src 'self' 'unsafe-inline' https://fonts.googleapis.com; "
-                "font-src 'self' https://fonts.gstatic.com data:; "
-                "img-src 'self' data: blob: https:; "
-                "media-src 'self' blob: data:; "  # Allow blob and data URLs for audio playback
-                "connect-src 'self' wss: ws: https://fonts.googleapis.com https://fonts.gstatic.com; "
-                "frame-src 'self' https://*.r2.cloudflarestorage.com; "  # Allow R2 URLs in iframes
-                "frame-ancestors 'none'; "
-                "object-src 'none'; "
-                "base-uri 'self'; "
-                "form-action 'self';"
-            )
-        response.headers['Content-Security-Policy'] = csp_policy
+        # Admin endpoints - /api/admin/businesses, etc.
+        from server.routes_admin import admin_bp
+        app.register_blueprint(admin_bp)
+        app.logger.info("✅ Admin blueprint registered")
         
-        # HSTS - Strict Transport Security (force HTTPS)
-        # Only add in production (when using HTTPS)
-        if cookie_secure:
-            response.headers['Strict-Transport-Security'] = 'max-age=31536000; includeSubDomains'
-        
-        # Additional security headers
-        # For PDF endpoints, allow same-origin framing
-        if is_pdf_endpoint:
-            response.headers['X-Frame-Options'] = 'SAMEORIGIN'  # Allow same-origin framing for PDFs
-        else:
-            response.headers['X-Frame-Options'] = 'DENY'
-            
-        response.headers['X-Content-Type-Options'] = 'nosniff'
-        response.headers['X-XSS-Protection'] = '1; mode=block'
-        response.headers['Referrer-Policy'] = 'strict-origin-when-cross-origin'
-        response.headers['Permissions-Policy'] = 'camera=(), microphone=(), geolocation=(), payment=()'
-        
-        # Cross-Origin headers for additional security
-        response.headers['Cross-Origin-Opener-Policy'] = 'same-origin'
-        response.headers['Cross-Origin-Resource-Policy'] = 'same-origin'
-        
-        # Cache control for sensitive pages
-        if request.endpoint and ('admin' in request.endpoint or 'biz' in request.endpoint):
-            response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, private'
-            response.headers['Pragma'] = 'no-cache'
-            response.headers['Expires'] = '0'
-            
-        return response
-    
-# הוסרה כפילות של _dbg_csrf
-
-    # Session Management and Rotation - with auth exemptions
-    @app.before_request
-    def manage_session_security():
-        """Enhanced session security management"""
-        # Skip for static files, health endpoints, React routes, and auth endpoints  
-        auth_paths = ['/api/auth/login', '/api/auth/logout', '/api/auth/me', '/api/auth/csrf', '/api/ui/login']
-        if (request.endpoint in ['static', 'health', 'readyz', 'version'] or 
-            request.path in ['/', '/login', '/forgot', '/reset', '/home'] or
-            any(request.path.startswith(p) for p in auth_paths)):
-            return
-            
-        # BUILD 142 FINAL: Session timeout check - DON'T clear session automatically!
-        if 'user' in session or 'al_user' in session:
-            last_activity = session.get('_last_activity')
-            if last_activity:
-                last_time = datetime.fromisoformat(last_activity)
-                if datetime.now() - last_time > timedelta(hours=8):
-                    # BUILD 142 FINAL: Return 401 but DON'T clear session
-                    # Let the client handle re-authentication
-                    return jsonify({'error': 'Session expired'}), 401
-            
-            # Update last activity
-            session['_last_activity'] = datetime.now().isoformat()
-            
-            # Session rotation (rotate session ID periodically) - FIXED: More conservative
-            session_start = session.get('_session_start')
-            if not session_start:
-                session['_session_start'] = datetime.now().isoformat()
-                # SeaSurf handles CSRF - no manual _csrf_token needed
-            else:
-                start_time = datetime.fromisoformat(session_start)
-                # BUILD 142 FINAL: Increase rotation period and preserve BOTH session keys!
-                if datetime.now() - start_time > timedelta(hours=24):
-                    # Preserve ALL user session data (BOTH keys + impersonation)
-                    user_data = session.get('user')  # BUILD 142: Save BOTH keys!
-                    al_user_data = session.get('al_user')
-                    impersonated_tenant_id = session.get('impersonated_tenant_id')
-                    token = session.get('token')
-                    
-                    session.clear()
-                    
-                    # Restore BOTH user session keys
-                    if user_data:
-                        session['user'] = user_data
-                    if al_user_data:
-                        session['al_user'] = al_user_data
-                    if impersonated_tenant_id:
-                        session['impersonated_tenant_id'] = impersonated_tenant_id
-                    if token:
-                        session['token'] = token
-                    session['_session_start'] = datetime.now().isoformat()
-                    # SeaSurf handles CSRF - no manual _csrf_token needed
-    
-    # CSRF כבר מוגדר למעלה - הסרת כפילות
-    
-    # 🔒 P1: CORS with Production Lockdown
-    # In production: Only allow explicitly configured origins
-    # In development: Allow localhost and replit for easier development
-    if is_production_mode:
-        # Production: Strict CORS - only explicit allowed origins
-        cors_origins = []
-        
-        # Add PUBLIC_BASE_URL if configured
-        public_url = os.getenv('PUBLIC_BASE_URL', '').strip()
-        if public_url:
-            cors_origins.append(public_url)
-            logger.info(f"[CORS] Production: Added PUBLIC_BASE_URL: {public_url}")
-        
-        # Add FRONTEND_URL if configured
-        frontend_url = os.getenv('FRONTEND_URL', '').strip()
-        if frontend_url and frontend_url not in cors_origins:
-            cors_origins.append(frontend_url)
-            logger.info(f"[CORS] Production: Added FRONTEND_URL: {frontend_url}")
-        
-        # Add external origins from CORS_ALLOWED_ORIGINS
-        external_origins = os.getenv("CORS_ALLOWED_ORIGINS", "").strip()
-        if external_origins:
-            for origin in external_origins.split(","):
-                origin = origin.strip()
-                if origin and origin not in cors_origins:
-                    cors_origins.append(origin)
-                    logger.info(f"[CORS] Production: Added external origin: {origin}")
-        
-        # Remove duplicates and empty strings
-        cors_origins = [o for o in set(cors_origins) if o]
-        
-        # 🔒 P1: Fail-fast if no origins configured in production
-        # This prevents silent failures where CORS would block all requests
-        if not cors_origins:
-            logger.error("🚨 CRITICAL: CORS enabled with credentials but no origins configured!")
-            logger.error("   Set PUBLIC_BASE_URL and/or CORS_ALLOWED_ORIGINS in production")
-            raise RuntimeError(
-                "Production requires CORS origins when using credentials. "
-                "Set PUBLIC_BASE_URL or CORS_ALLOWED_ORIGINS environment variables."
-            )
-    else:
-        # Development: Allow localhost and replit patterns for easier development
-        cors_origins = [
-            "http://localhost:5000",
-            "http://localhost:3000",
-            "http://127.0.0.1:3000",
-            "http://localhost:8080",
-            r"^https://[\w-]+\.replit\.app$",    # Regex pattern for *.replit.app
-            r"^https://[\w-]+\.replit\.dev$"     # Regex pattern for *.replit.dev
-        ]
-        
-        # Add external origins from environment variable in dev too
-        external_origins = os.getenv("CORS_ALLOWED_ORIGINS", "").strip()
-        if external_origins:
-            for origin in external_origins.split(","):
-                origin = origin.strip()
-                if origin:
-                    cors_origins.append(origin)
-                    logger.info(f"[CORS] Development: Added external origin: {origin}")
-    
-    # 🔒 P1: CORS Configuration with Credentials
-    # When supports_credentials=True (required for cookies/sessions):
-    # - MUST have explicit origins (cannot use '*')
-    # - Origins must match exactly (no wildcards in origin strings, only regex patterns)
-    # - Browser enforces strict origin matching
-    
-    CORS(app, 
-         origins=cors_origins,
-         supports_credentials=True,  # Required for session cookies
-         allow_headers=["Content-Type", "Authorization", "X-CSRFToken", "HX-Request"],
-         methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"]
-    )
-    
-    logger.info(f"[CORS] Configured with {len(cors_origins)} allowed origin(s)")
-    if is_production_mode:
-        safe_origins = [o for o in cors_origins if not o.startswith('r"')]
-        logger.info(f"[CORS] Production mode: {', '.join(safe_origins)}")
-    
-    # ⚡ CRITICAL FIX: Register essential API blueprints FIRST (before all other blueprints)
-    # This ensures dashboard, business, notifications, etc. work even if other blueprints fail
-    # If these fail to register, app CRASHES (fail-fast) instead of running without API
-    try:
-        # Health endpoints - MUST be registered FIRST for monitoring
-        from server.health_endpoints import health_bp
-        app.register_blueprint(health_bp)
-        app.logger.info("✅ Health endpoints registered")
-        
-        # API Adapter - Dashboard, stats, activity endpoints
-        from server.api_adapter import api_adapter_bp
-        app.register_blueprint(api_adapter_bp)
-        app.logger.info("✅ API Adapter blueprint registered (dashboard endpoints)")
-        
-        # Admin endpoints - /api/admin/businesses, etc.
-        from server.routes_admin import admin_bp
-        app.register_blueprint(admin_bp)
-        app.logger.info("✅ Admin blueprint registered")
-        
-        # Business management - /api/business/current, settings, FAQs
-        from server.routes_business_management import biz_mgmt_bp
-        app.register_blueprint(biz_mgmt_bp)
-        app.logger.info("✅ Business management blueprint registered")
+        # Business management - /api/business/current, settings, FAQs
+        from server.routes_business_management import biz_mgmt_bp
+        app.register_blueprint(biz_mgmt_bp)
+        app.logger.info("✅ Business management blueprint registered")
         
         # Leads - /api/leads, /api/notifications
         from server.routes_leads import leads_bp
@@ -894,40 +576,509 @@ def create_app():
         from server.routes_agent_ops import ops_bp
         app.register_blueprint(ops_bp)
         
-        # Admin Channels API - Multi-tenant routing management
-        from server.routes_admin_channels import admin_channels_bp
-        app.register_blueprint(admin_channels_bp)
+        # Admin Channels API - Multi-tenant routing management
+        from server.routes_admin_channels import admin_channels_bp
+        app.register_blueprint(admin_channels_bp)
+        
+        # CSRF exemptions לroutes WhatsApp - only GET routes for security
+        try:
+            csrf.exempt(app.view_functions.get('whatsapp.status'))  # GET - safe
+            csrf.exempt(app.view_functions.get('whatsapp.qr'))      # GET - safe  
+            # POST start NOT exempt for security - requires CSRF token
+            app.logger.info("WhatsApp CSRF exemptions applied (GET only)")
+        except Exception as e:
+            app.logger.warning(f"WhatsApp CSRF exemption issue: {e}")
+        
+        app.logger.info("New API blueprints registered")
+        app.logger.info("Twilio webhooks registered")
+        
+        # Note: API Adapter and Health blueprints now registered earlier (before line 356)
+        
+        # data_api removed - כפילות
+        
+        # Register UI blueprint last (after React routes are defined)
+        app.logger.info(f"Registering UI Blueprint: {ui_bp}")
+        app.register_blueprint(ui_bp, url_prefix='')  # No prefix for admin/business routes
+        
+        # CSRF exemption for login after blueprint registration
+        from server.ui.routes import api_login
+        csrf.exempt(api_login)
+        app.logger.info("CSRF exemption added for login")
+        
+        app.logger.info("All blueprints registered")
+    except Exception as e:
+        app.logger.error(f"Blueprint registration error: {e}")
+        import traceback
+        traceback.print_exc()
+
+
+def _register_spa_routes(app):
+    """Note attachments and the React SPA (api / all roles)"""
+    # BUILD 172: Serve uploaded note attachments with session-based authentication
+    @app.route('/uploads/notes/<int:tenant_id>/<path:filename>')
+    def serve_note_attachment(tenant_id, filename):
+        """Serve uploaded note attachments - requires session authentication and tenant match"""
+        from flask import session, abort
+        
+        # Check session-based authentication (same as require_api_auth)
+        user = session.get("al_user") or session.get("user")
+        if not user:
+            abort(401)
+        
+        user_role = user.get('role', '')
+        
+        # Compute user's tenant - impersonation overrides business_id
+        if session.get("impersonated_tenant_id"):
+            user_tenant = session.get("impersonated_tenant_id")
+        else:
+            user_tenant = user.get('business_id')
+        
+        # System admin can access all tenants
+        if user_role != 'system_admin' and user_tenant != tenant_id:
+            abort(403)
+        
+        # Safe path check - prevent directory traversal
+        if '..' in filename or filename.startswith('/'):
+            abort(400)
+        
+        uploads_dir = os.path.join(os.path.dirname(__file__), "..", "uploads", "notes", str(tenant_id))
+        file_path = os.path.join(uploads_dir, filename)
+        
+        # Check file exists
+        if not os.path.isfile(file_path):
+            abort(404)
+        
+        return send_from_directory(uploads_dir, filename)
+
+    # Health endpoints moved below to prevent duplicates
+        
+    # SPA serving - לפי ההנחיות המדויקות  
+    from pathlib import Path
+    from flask import send_from_directory, abort
+    FE_DIST = Path(__file__).resolve().parents[1] / "client" / "dist"
+    
+    
+    @app.route('/assets/<path:filename>')
+    def assets(filename):
+        """Serve static assets with immutable cache headers"""
+        resp = send_from_directory(FE_DIST/'assets', filename)
+        # Assets have hash in filename → safe to cache forever
+        resp.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+        # Ensure correct MIME types
+        if filename.endswith('.js'):
+            resp.headers['Content-Type'] = 'application/javascript'
+        elif filename.endswith('.css'):
+            resp.headers['Content-Type'] = 'text/css'
+        return resp
+
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def spa(path):
+        # אל תיתן לנתיבי /api, /webhook, /static, /wa, /uploads להגיע לכאן
+        if path.startswith(('api','webhook','static','assets','wa','uploads')):
+            abort(404)
+        resp = send_from_directory(FE_DIST, 'index.html')
+        # index.html must never be cached (always fresh)
+        resp.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
+        resp.headers['Pragma'] = 'no-cache'
+        resp.headers['Expires'] = '0'
+        return resp
+
+
+def create_app(role=None):
+    """
+    Create Flask application with React frontend (לפי ההנחיות המדויקות)
+
+    Args:
+        role: SERVICE_ROLE to build for (defaults to the SERVICE_ROLE env var);
+              see ROLE_BLUEPRINTS for what each role loads
+    """
+    
+    # Check if we're in migration mode - skip all heavy initialization
+    if os.getenv('MIGRATION_MODE') == '1':
+        logger.info("🔧 MIGRATION_MODE detected - creating minimal app")
+        return create_minimal_app()
+    
+    service_role = get_service_role(role)
+    logger.info(f"🔧 Building app for SERVICE_ROLE={service_role}")
+    
+    # 🔒 P1: Determine production mode for security features
+    is_production_mode = os.getenv('PRODUCTION', '0') in ('1', 'true', 'True')
+    
+    # 🔒 P1: SECRET_KEY Fail-Fast in Production
+    secret_key = os.getenv('SECRET_KEY')
+    if is_production_mode and not secret_key:
+        raise RuntimeError(
+            "PRODUCTION=1 requires SECRET_KEY environment variable. "
+            "Generate with: python3 -c \"import secrets; print(secrets.token_hex(32))\""
+        )
+    if not secret_key:
+        secret_key = secrets.token_hex(32)
+        logger.warning("⚠️ Development mode: Using generated SECRET_KEY (not persistent)")
+    
+    # GCP credentials setup
+    import json
+    gcp_creds = os.getenv('GOOGLE_APPLICATION_CREDENTIALS', '')
+    if gcp_creds and gcp_creds.startswith('{'):
+        try:
+            creds_data = json.loads(gcp_creds)
+            credentials_path = '/tmp/gcp_credentials.json'
+            with open(credentials_path, 'w') as f:
+                json.dump(creds_data, f)
+            os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = credentials_path
+        except Exception:
+            pass
+    
+    app = Flask(__name__, 
+                static_folder=os.path.join(os.path.dirname(__file__), "..", "client", "dist"),
+                static_url_path="",
+                template_folder=os.path.join(os.path.dirname(__file__), "templates"))
+    
+    import time, subprocess
+    
+    # Git SHA for version info endpoint
+    try:
+        git_sha = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], 
+                                        cwd=os.path.dirname(__file__), 
+                                        stderr=subprocess.DEVNULL,
+                                        timeout=2).decode().strip()
+    except:
+        git_sha = "dev"
+    
+    version_info = {
+        "build": 87,
+        "sha": git_sha,
+        "fe": "client/dist",
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "app": "AgentLocator-Complete",
+        "commit": os.getenv("GIT_COMMIT", git_sha),
+        "startup_ts": int(time.time())
+    }
+    
+    # Database configuration with SSL fix
+    # 🔥 CRITICAL FIX: Use unified DATABASE_URL validation
+    # This prevents confusing DNS errors from invalid database URLs
+    from server.database_validation import validate_database_url
+    validate_database_url()
+    
+    # 🔥 FIX: Single source of truth for database URL
+    # Use unified function that prioritizes DATABASE_URL, falls back to DB_POSTGRESDB_*
+    # 🔥 CRITICAL: Use POOLER connection for API/Worker traffic (not direct)
+    from server.database_url import get_database_url
+    DATABASE_URL = get_database_url(connection_type="pooler")
+    
+    # Enterprise Security Configuration
+    app.config.update({
+        'SECRET_KEY': secret_key,
+        'DATABASE_URL': DATABASE_URL,
+        'SQLALCHEMY_DATABASE_URI': DATABASE_URL,
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+        'SQLALCHEMY_ENGINE_OPTIONS': {
+            'pool_pre_ping': True,  # ✅ DB RESILIENCE: Verify connections before use (prevents stale connections)
+            'pool_recycle': 180,    # 🔥 FIX: Recycle connections after 3 min (before Supabase pooler timeout)
+            # Fix for Eventlet + SQLAlchemy lock issue
+            'poolclass': __import__('sqlalchemy.pool', fromlist=['NullPool']).NullPool,
+            'connect_args': {
+                'connect_timeout': 5,  # 🔥 DNS FIX: Shorter timeout for faster failover
+                'application_name': 'AgentLocator-71',
+                # ✅ DB RESILIENCE: Add statement timeout to prevent hanging queries
+                'options': '-c statement_timeout=30000',  # 30 seconds max per statement
+                # 🔥 DNS FIX: TCP keepalive to detect dead connections
+                'keepalives': 1,
+                'keepalives_idle': 30,
+                'keepalives_interval': 10,
+                'keepalives_count': 5
+            }
+        },
+        # Session configuration
+        'SESSION_COOKIE_HTTPONLY': True,
+        'PERMANENT_SESSION_LIFETIME': timedelta(hours=8),
+        'SESSION_REFRESH_EACH_REQUEST': True
+    })
+    
+    # ✅ DB RESILIENCE: Log pool configuration for troubleshooting
+    logger.info(f"[DB_POOL] pool_pre_ping=True pool_recycle=60s (forced refresh)")  # QA: Fixed log to match actual value
+    
+    # 1) Flask bootstrap - ProxyFix for Replit's reverse proxy
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
+    app.config.update(PREFERRED_URL_SCHEME='https')
+
+    # ═══════════════════════════════════════════════════════════════════
+    # BUILD 143 UNIFIED COOKIE CONFIGURATION - ONE SET FOR ALL ENVIRONMENTS
+    # All cookies MUST use the same settings for Replit cross-origin to work!
+    # BUILD 177: Support HTTP mode via COOKIE_SECURE=false env var for external servers
+    # ═══════════════════════════════════════════════════════════════════
+    
+    # Determine if cookies should be secure (HTTPS only)
+    # Default: True for production (HTTPS required)
+    # Set COOKIE_SECURE=false for HTTP-only deployments (not recommended for production!)
+    cookie_secure = os.getenv("COOKIE_SECURE", "true").lower() != "false"
+    
+    # P3 Security: Enforce secure cookies in production
+    is_production = os.getenv('PRODUCTION', '0') == '1'
+    if is_production and not cookie_secure:
+        logger.error("❌ SECURITY: PRODUCTION=1 requires COOKIE_SECURE=true (HTTPS only)")
+        logger.error("Set COOKIE_SECURE=false only for development/testing")
+        raise ValueError("Production mode requires secure cookies (HTTPS)")
+    
+    cookie_samesite = 'None' if cookie_secure else 'Lax'  # SameSite=None requires Secure
+    
+    if not cookie_secure:
+        app.logger.warning("⚠️ COOKIE_SECURE=false - Running in HTTP mode. NOT recommended for production!")
+    
+    # Session Cookie Settings
+    app.config.update(
+        SESSION_COOKIE_NAME='session',
+        SESSION_COOKIE_SECURE=cookie_secure,       # BUILD 177: Configurable
+        SESSION_COOKIE_SAMESITE=cookie_samesite,   # Must be Lax if not Secure
+        SESSION_COOKIE_HTTPONLY=True,     # Security: JS can't read session
+        SESSION_COOKIE_PATH='/',
+        REMEMBER_COOKIE_SECURE=cookie_secure,
+        REMEMBER_COOKIE_SAMESITE=cookie_samesite,
+        REMEMBER_COOKIE_HTTPONLY=True,
+    )
+    
+    # P3 Security: Log session configuration
+    session_lifetime = app.config.get('PERMANENT_SESSION_LIFETIME', timedelta(hours=8))
+    if isinstance(session_lifetime, timedelta):
+        session_hours = session_lifetime.total_seconds() / 3600
+    else:
+        session_hours = session_lifetime / 3600 if session_lifetime else 8
+    
+    logger.info(f"[SESSION] Secure={cookie_secure}, HttpOnly=True, SameSite={cookie_samesite}, Lifetime={session_hours}h")
+    
+    # SeaSurf CSRF Cookie Settings - MUST match session settings!
+    app.config.update(
+        SEASURF_COOKIE_NAME='csrf_token',
+        SEASURF_HEADER='X-CSRFToken',
+        SEASURF_COOKIE_SECURE=cookie_secure,       # BUILD 177: Configurable
+        SEASURF_COOKIE_SAMESITE=cookie_samesite,   # Must be Lax if not Secure
+        SEASURF_COOKIE_HTTPONLY=False,    # MUST be False! Frontend needs to read it
+        SEASURF_COOKIE_PATH='/',
+        SEASURF_INCLUDE_OR_EXEMPT_VIEWS='include',  # Default include all views
+    )
+    
+    # Initialize SeaSurf
+    from server.extensions import csrf
+    csrf.init_app(app)
+    
+    # שגיאות JSON ברורות (שלא תראה Error {} ריק) - REMOVED DUPLICATES
+    
+    # Enterprise Security Headers
+    @app.after_request
+    def add_security_headers(response):
+        """Add enterprise security headers"""
+        
+        # Check if this is a PDF viewing endpoint that needs iframe support
+        is_pdf_endpoint = (
+            request.endpoint and 
+            (request.endpoint.endswith('.stream_contract_pdf') or 
+             request.endpoint.endswith('.get_contract_pdf_url'))
+        )
+        
+        # CSP (Content Security Policy) - Strict but functional
+        # For PDF endpoints, allow same-origin framing
+        if is_pdf_endpoint:
+            csp_policy = (
+                "default-src 'self'; "
+                "script-src 'self' 'unsafe-inline' https://unpkg.com; "
+                "style-src 'self' 'unsafe-inline' https://fonts.googleapis.com; "
+                "font-src 'self' https://fonts.gstatic.com data:; "
+                "img-src 'self' data: blob: https:; "
+                "media-src 'self' blob: data:; "  # Allow blob and data URLs for audio playback
+                "connect-src 'self' wss: ws: https://fonts.googleapis.com https://fonts.gstatic.com; "
+                "frame-src 'self' https://*.r2.cloudflarestorage.com; "  # Allow R2 URLs in iframes for PDF viewing
+                "frame-ancestors 'self'; "  # Allow same-origin framing for PDFs
+                "object-src 'none'; "
+                "base-uri 'self'; "
+                "form-action 'self';"
+            )
+        else:
+            csp_policy = (
+                "default-src 'self'; "
+                "script-src 'self' 'unsafe-inline' https://unpkg.com; "
+                "style-src 'self' 'unsafe-inline' https://fonts.googleapis.com; "
+                "font-src 'self' https://fonts.gstatic.com data:; "
+                "img-src 'self' data: blob: https:; "
+                "media-src 'self' blob: data:; "  # Allow blob and data URLs for audio playback
+                "connect-src 'self' wss: ws: https://fonts.googleapis.com https://fonts.gstatic.com; "
+                "frame-src 'self' https://*.r2.cloudflarestorage.com; "  # Allow R2 URLs in iframes
+                "frame-ancestors 'none'; "
+                "object-src 'none'; "
+                "base-uri 'self'; "
+                "form-action 'self';"
+            )
+        response.headers['Content-Security-Policy'] = csp_policy
+        
+        # HSTS - Strict Transport Security (force HTTPS)
+        # Only add in production (when using HTTPS)
+        if cookie_secure:
+            response.headers['Strict-Transport-Security'] = 'max-age=31536000; includeSubDomains'
+        
+        # Additional security headers
+        # For PDF endpoints, allow same-origin framing
+        if is_pdf_endpoint:
+            response.headers['X-Frame-Options'] = 'SAMEORIGIN'  # Allow same-origin framing for PDFs
+        else:
+            response.headers['X-Frame-Options'] = 'DENY'
+            
+        response.headers['X-Content-Type-Options'] = 'nosniff'
+        response.headers['X-XSS-Protection'] = '1; mode=block'
+        response.headers['Referrer-Policy'] = 'strict-origin-when-cross-origin'
+        response.headers['Permissions-Policy'] = 'camera=(), microphone=(), geolocation=(), payment=()'
         
-        # CSRF exemptions לroutes WhatsApp - only GET routes for security
-        try:
-            csrf.exempt(app.view_functions.get('whatsapp.status'))  # GET - safe
-            csrf.exempt(app.view_functions.get('whatsapp.qr'))      # GET - safe  
-            # POST start NOT exempt for security - requires CSRF token
-            app.logger.info("WhatsApp CSRF exemptions applied (GET only)")
-        except Exception as e:
-            app.logger.warning(f"WhatsApp CSRF exemption issue: {e}")
+        # Cross-Origin headers for additional security
+        response.headers['Cross-Origin-Opener-Policy'] = 'same-origin'
+        response.headers['Cross-Origin-Resource-Policy'] = 'same-origin'
         
-        app.logger.info("New API blueprints registered")
-        app.logger.info("Twilio webhooks registered")
+        # Cache control for sensitive pages
+        if request.endpoint and ('admin' in request.endpoint or 'biz' in request.endpoint):
+            response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, private'
+            response.headers['Pragma'] = 'no-cache'
+            response.headers['Expires'] = '0'
+            
+        return response
+    
+# הוסרה כפילות של _dbg_csrf
+
+    # Session Management and Rotation - with auth exemptions
+    @app.before_request
+    def manage_session_security():
+        """Enhanced session security management"""
+        # Skip for static files, health endpoints, React routes, and auth endpoints  
+        auth_paths = ['/api/auth/login', '/api/auth/logout', '/api/auth/me', '/api/auth/csrf', '/api/ui/login']
+        if (request.endpoint in ['static', 'health', 'readyz', 'version'] or 
+            request.path in ['/', '/login', '/forgot', '/reset', '/home'] or
+            any(request.path.startswith(p) for p in auth_paths)):
+            return
+            
+        # BUILD 142 FINAL: Session timeout check - DON'T clear session automatically!
+        if 'user' in session or 'al_user' in session:
+            last_activity = session.get('_last_activity')
+            if last_activity:
+                last_time = datetime.fromisoformat(last_activity)
+                if datetime.now() - last_time > timedelta(hours=8):
+                    # BUILD 142 FINAL: Return 401 but DON'T clear session
+                    # Let the client handle re-authentication
+                    return jsonify({'error': 'Session expired'}), 401
+            
+            # Update last activity
+            session['_last_activity'] = datetime.now().isoformat()
+            
+            # Session rotation (rotate session ID periodically) - FIXED: More conservative
+            session_start = session.get('_session_start')
+            if not session_start:
+                session['_session_start'] = datetime.now().isoformat()
+                # SeaSurf handles CSRF - no manual _csrf_token needed
+            else:
+                start_time = datetime.fromisoformat(session_start)
+                # BUILD 142 FINAL: Increase rotation period and preserve BOTH session keys!
+                if datetime.now() - start_time > timedelta(hours=24):
+                    # Preserve ALL user session data (BOTH keys + impersonation)
+                    user_data = session.get('user')  # BUILD 142: Save BOTH keys!
+                    al_user_data = session.get('al_user')
+                    impersonated_tenant_id = session.get('impersonated_tenant_id')
+                    token = session.get('token')
+                    
+                    session.clear()
+                    
+                    # Restore BOTH user session keys
+                    if user_data:
+                        session['user'] = user_data
+                    if al_user_data:
+                        session['al_user'] = al_user_data
+                    if impersonated_tenant_id:
+                        session['impersonated_tenant_id'] = impersonated_tenant_id
+                    if token:
+                        session['token'] = token
+                    session['_session_start'] = datetime.now().isoformat()
+                    # SeaSurf handles CSRF - no manual _csrf_token needed
+    
+    # CSRF כבר מוגדר למעלה - הסרת כפילות
+    
+    # 🔒 P1: CORS with Production Lockdown
+    # In production: Only allow explicitly configured origins
+    # In development: Allow localhost and replit for easier development
+    if is_production_mode:
+        # Production: Strict CORS - only explicit allowed origins
+        cors_origins = []
         
-        # Note: API Adapter and Health blueprints now registered earlier (before line 356)
+        # Add PUBLIC_BASE_URL if configured
+        public_url = os.getenv('PUBLIC_BASE_URL', '').strip()
+        if public_url:
+            cors_origins.append(public_url)
+            logger.info(f"[CORS] Production: Added PUBLIC_BASE_URL: {public_url}")
         
-        # data_api removed - כפילות
+        # Add FRONTEND_URL if configured
+        frontend_url = os.getenv('FRONTEND_URL', '').strip()
+        if frontend_url and frontend_url not in cors_origins:
+            cors_origins.append(frontend_url)
+            logger.info(f"[CORS] Production: Added FRONTEND_URL: {frontend_url}")
         
-        # Register UI blueprint last (after React routes are defined)
-        app.logger.info(f"Registering UI Blueprint: {ui_bp}")
-        app.register_blueprint(ui_bp, url_prefix='')  # No prefix for admin/business routes
+        # Add external origins from CORS_ALLOWED_ORIGINS
+        external_origins = os.getenv("CORS_ALLOWED_ORIGINS", "").strip()
+        if external_origins:
+            for origin in external_origins.split(","):
+                origin = origin.strip()
+                if origin and origin not in cors_origins:
+                    cors_origins.append(origin)
+                    logger.info(f"[CORS] Production: Added external origin: {origin}")
         
-        # CSRF exemption for login after blueprint registration
-        from server.ui.routes import api_login
-        csrf.exempt(api_login)
-        app.logger.info("CSRF exemption added for login")
+        # Remove duplicates and empty strings
+        cors_origins = [o for o in set(cors_origins) if o]
         
-        app.logger.info("All blueprints registered")
-    except Exception as e:
-        app.logger.error(f"Blueprint registration error: {e}")
-        import traceback
-        traceback.print_exc()
+        # 🔒 P1: Fail-fast if no origins configured in production
+        # This prevents silent failures where CORS would block all requests
+        if not cors_origins:
+            logger.error("🚨 CRITICAL: CORS enabled with credentials but no origins configured!")
+            logger.error("   Set PUBLIC_BASE_URL and/or CORS_ALLOWED_ORIGINS in production")
+            raise RuntimeError(
+                "Production requires CORS origins when using credentials. "
+                "Set PUBLIC_BASE_URL or CORS_ALLOWED_ORIGINS environment variables."
+            )
+    else:
+        # Development: Allow localhost and replit patterns for easier development
+        cors_origins = [
+            "http://localhost:5000",
+            "http://localhost:3000",
+            "http://127.0.0.1:3000",
+            "http://localhost:8080",
+            r"^https://[\w-]+\.replit\.app$",    # Regex pattern for *.replit.app
+            r"^https://[\w-]+\.replit\.dev$"     # Regex pattern for *.replit.dev
+        ]
+        
+        # Add external origins from environment variable in dev too
+        external_origins = os.getenv("CORS_ALLOWED_ORIGINS", "").strip()
+        if external_origins:
+            for origin in external_origins.split(","):
+                origin = origin.strip()
+                if origin:
+                    cors_origins.append(origin)
+                    logger.info(f"[CORS] Development: Added external origin: {origin}")
+    
+    # 🔒 P1: CORS Configuration with Credentials
+    # When supports_credentials=True (required for cookies/sessions):
+    # - MUST have explicit origins (cannot use '*')
+    # - Origins must match exactly (no wildcards in origin strings, only regex patterns)
+    # - Browser enforces strict origin matching
+    
+    CORS(app, 
+         origins=cors_origins,
+         supports_credentials=True,  # Required for session cookies
+         allow_headers=["Content-Type", "Authorization", "X-CSRFToken", "HX-Request"],
+         methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"]
+    )
+    
+    logger.info(f"[CORS] Configured with {len(cors_origins)} allowed origin(s)")
+    if is_production_mode:
+        safe_origins = [o for o in cors_origins if not o.startswith('r"')]
+        logger.info(f"[CORS] Production mode: {', '.join(safe_origins)}")
+    
+    # ⚡ Blueprints: the full API surface for api/all, only the routes a role serves otherwise
+    if ROLE_BLUEPRINTS[service_role] is None:
+        _register_api_blueprints(app, csrf)
+    else:
+        _register_role_blueprints(app, service_role)
     
     # BUILD 168.2: Minimal production logging - only slow requests (>1s)
     import time as _time
@@ -1031,75 +1182,9 @@ def create_app():
         """Serve static TTS files"""
         return send_from_directory(os.path.join(os.path.dirname(__file__), "..", "static", "tts"), filename)
     
-    # BUILD 172: Serve uploaded note attachments with session-based authentication
-    @app.route('/uploads/notes/<int:tenant_id>/<path:filename>')
-    def serve_note_attachment(tenant_id, filename):
-        """Serve uploaded note attachments - requires session authentication and tenant match"""
-        from flask import session, abort
-        
-        # Check session-based authentication (same as require_api_auth)
-        user = session.get("al_user") or session.get("user")
-        if not user:
-            abort(401)
-        
-        user_role = user.get('role', '')
-        
-        # Compute user's tenant - impersonation overrides business_id
-        if session.get("impersonated_tenant_id"):
-            user_tenant = session.get("impersonated_tenant_id")
-        else:
-            user_tenant = user.get('business_id')
-        
-        # System admin can access all tenants
-        if user_role != 'system_admin' and user_tenant != tenant_id:
-            abort(403)
-        
-        # Safe path check - prevent directory traversal
-        if '..' in filename or filename.startswith('/'):
-            abort(400)
-        
-        uploads_dir = os.path.join(os.path.dirname(__file__), "..", "uploads", "notes", str(tenant_id))
-        file_path = os.path.join(uploads_dir, filename)
-        
-        # Check file exists
-        if not os.path.isfile(file_path):
-            abort(404)
-        
-        return send_from_directory(uploads_dir, filename)
-
-    # Health endpoints moved below to prevent duplicates
-        
-    # SPA serving - לפי ההנחיות המדויקות  
-    from pathlib import Path
-    from flask import send_from_directory, abort
-    FE_DIST = Path(__file__).resolve().parents[1] / "client" / "dist"
-    
-    
-    @app.route('/assets/<path:filename>')
-    def assets(filename):
-        """Serve static assets with immutable cache headers"""
-        resp = send_from_directory(FE_DIST/'assets', filename)
-        # Assets have hash in filename → safe to cache forever
-        resp.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
-        # Ensure correct MIME types
-        if filename.endswith('.js'):
-            resp.headers['Content-Type'] = 'application/javascript'
-        elif filename.endswith('.css'):
-            resp.headers['Content-Type'] = 'text/css'
-        return resp
-
-    @app.route('/', defaults={'path': ''})
-    @app.route('/<path:path>')
-    def spa(path):
-        # אל תיתן לנתיבי /api, /webhook, /static, /wa, /uploads להגיע לכאן
-        if path.startswith(('api','webhook','static','assets','wa','uploads')):
-            abort(404)
-        resp = send_from_directory(FE_DIST, 'index.html')
-        # index.html must never be cached (always fresh)
-        resp.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
-        resp.headers['Pragma'] = 'no-cache'
-        resp.headers['Expires'] = '0'
-        return resp
+    # UI uploads and SPA serving - only where the dashboard is served
+    if ROLE_BLUEPRINTS[service_role] is None:
+        _register_spa_routes(app)
     
     # DEBUG endpoint removed - no longer needed
     
@@ -1117,8 +1202,7 @@ def create_app():
     # Must run AFTER db.init_app() and in app context to avoid SQLAlchemy errors
     # This prevents "Flask app is not registered with this SQLAlchemy instance" error
     # Only run in API service, not in worker service (to prevent duplicate cleanup)
-    service_role = os.getenv('SERVICE_ROLE', 'api').lower()
-    if service_role != 'worker':
+    if service_role in OUTBOUND_CLEANUP_ROLES:
         try:
             logger.info(f"[STARTUP] Running outbound cleanup on startup (service_role={service_role})...")
             with app.app_context():
@@ -1147,7 +1231,7 @@ def create_app():
             import traceback
             logger.error(f"[STARTUP] Traceback: {traceback.format_exc()}")
     else:
-        logger.info(f"[STARTUP] Skipping outbound cleanup (service_role={service_role}, worker services don't need cleanup)")
+        logger.info(f"[STARTUP] Skipping outbound cleanup (service_role={service_role}, outbound runs are owned by the API)")
     
     # 🔒 P1: Rate Limiting for Security
     # Initialize rate limiter with Redis for distributed limiting
@@ -1235,12 +1319,11 @@ def create_app():
         def _background_initialization():
             """Run migrations and initialization after server is listening"""
             global _migrations_complete
-            import time
-            time.sleep(0.5)  # Let server bind to port first
+            # Runs synchronously inside create_app() - the server binds only after it
+            # returns, so there is nothing to wait for here (was a fixed 0.5s sleep)
             
             # 🔥 CRITICAL: Workers must NEVER run migrations
             # Migrations should only run in API service, not in workers
-            service_role = os.getenv('SERVICE_ROLE', '').lower()
             # 🔥 FIX: Check actual PRODUCTION flag, not RUN_MIGRATIONS_ON_START
             is_production = os.getenv('PRODUCTION', '0') in ('1', 'true', 'True')
             
@@ -1363,7 +1446,10 @@ def create_app():
         
         # 🔥 Google clients warmup - Only if Google services are NOT disabled
         # This prevents 403 errors from Google TTS when DISABLE_GOOGLE=true
-        if os.getenv("DISABLE_GOOGLE", "false").lower() != "true":
+        # Only roles that serve live calls pay for the Google SDK import at boot
+        if service_role not in CALL_WARMUP_ROLES:
+            logger.info(f"ℹ️  Google clients warmup skipped (SERVICE_ROLE={service_role}, loaded on first use)")
+        elif os.getenv("DISABLE_GOOGLE", "false").lower() != "true":
             try:
                 from server.services.providers.google_clients import warmup_google_clients
                 warmup_google_clients()
@@ -1436,7 +1522,9 @@ def create_app():
     if os.getenv('MIGRATION_MODE') != '1':
         # 🔥 TTS Warmup - Optional, can be disabled
         # This doesn't query DB and can be skipped for faster startup
-        if os.getenv("DISABLE_TTS_WARMUP") != "true":
+        if service_role not in CALL_WARMUP_ROLES:
+            logger.info(f"ℹ️  TTS warmup skipped (SERVICE_ROLE={service_role})")
+        elif os.getenv("DISABLE_TTS_WARMUP") != "true":
             try:
                 from server.services.gcp_tts_live import maybe_warmup
                 maybe_warmup()
@@ -1449,9 +1537,10 @@ def create_app():
         # 🔥 Agent Warmup - Queries DB, must wait for migrations
         # This is separate from TTS warmup and cannot be completely bypassed
         try:
-            from server.agent_tools.agent_factory import warmup_all_agents
-            
             def warmup_with_context():
+                # Imported here: agent_factory pulls in the Agents SDK (~1.5s)
+                from server.agent_tools.agent_factory import warmup_all_agents
+                
                 # 🔥 CRITICAL: Wait for migrations AND validate actual DB readiness
                 # Agent warmup queries the database (Business.query), so schema MUST be ready
                 # This prevents "InFailedSqlTransaction" errors when warmup queries fail
@@ -1536,13 +1625,9 @@ def create_app():
         # - worker: Only processes jobs from queues
         # - scheduler: Only runs scheduler loop to enqueue periodic jobs
         # - all: Both API and worker (for development/small deployments)
-        SERVICE_ROLE = os.getenv('SERVICE_ROLE', 'all').lower()
+        SERVICE_ROLE = service_role  # already normalized by get_service_role()
         ENABLE_SCHEDULERS = os.getenv('ENABLE_SCHEDULERS', 'false').lower() == 'true'
         
-        if SERVICE_ROLE not in ['api', 'worker', 'scheduler', 'calls', 'all']:
-            logger.warning(f"⚠️ Invalid SERVICE_ROLE '{SERVICE_ROLE}', defaulting to 'all'")
-            SERVICE_ROLE = 'all'
-        
         logger.info(f"🔧 [CONFIG] SERVICE_ROLE={SERVICE_ROLE}, ENABLE_SCHEDULERS={ENABLE_SCHEDULERS}")
         
         # 🔥 CRITICAL: Never start schedulers or threads in api/calls/scheduler mode
@@ -1606,6 +1691,21 @@ def create_app():
     except Exception as metrics_err:
         logger.warning("⚠️  Could not register metrics endpoint: %s", metrics_err)
 
+    # ─── Availability index invalidation ──────────────────
+    try:
+        from server.services.availability_service import register_availability_listeners
+        register_availability_listeners()
+    except Exception as availability_err:
+        logger.warning("⚠️  Could not register availability invalidation: %s", availability_err)
+
+    # ─── Lead counters (per-status / per-source totals) ───
+    try:
+        from server.services.lead_counters import register_lead_counter_listeners
+        with app.app_context():
+            register_lead_counter_listeners(db.engine)
+    except Exception as counters_err:
+        logger.warning("⚠️  Could not register lead counters: %s", counters_err)
+
     # Set singleton so future calls to get_process_app() reuse this instance
     global _app_singleton
     with _app_lock:
@@ -8,7 +8,8 @@ Strategy: Stateless Calls + Redis State (Option 1 from scaling plan)
 
 Key design:
 - All call state is stored in Redis with call_sid as key prefix
-- Active calls counter enforces MAX_CONCURRENT_CALLS globally
+- Active calls are leases on the capacity ledger (services/capacity_ledger.py),
+  which enforces the global and per-business limits in one atomic step
 - Any calls service replica can handle any call (no sticky routing needed)
 - TTL on all keys prevents state leaks on crashes
 """
@@ -24,7 +25,6 @@ logger = logging.getLogger(__name__)
 # Default TTL for call state (1 hour — well beyond any call duration)
 CALL_STATE_TTL = 3600
 
-ACTIVE_CALLS_KEY = "calls:active_count"
 CALL_STATE_PREFIX = "calls:state:"
 CALL_LOCK_PREFIX = "calls:lock:"
 
@@ -49,13 +49,13 @@ class CallStateManager:
             self._redis = redis_lib.from_url(REDIS_URL, decode_responses=True)
         return self._redis
 
-    # ─── Active calls counter ────────────────────────────
+    # ─── Active calls (capacity ledger) ──────────────────
 
     def get_active_count(self) -> int:
         """Get the current number of active calls (globally)."""
         try:
-            val = self.redis.get(ACTIVE_CALLS_KEY)
-            return int(val) if val else 0
+            from server.services.capacity_ledger import capacity_usage
+            return capacity_usage()["active"]
         except Exception:
             return 0
 
@@ -64,46 +64,24 @@ class CallStateManager:
         current = self.get_active_count()
         return current < self._max_concurrent
 
-    def increment_active(self, call_sid: str) -> bool:
+    def increment_active(self, call_sid: str, business_id: int | None = None,
+                         direction: str = "inbound") -> bool:
         """
-        Atomically try to increment active calls.
+        Atomically try to take a call slot (global + per-business limits).
         Returns True if call was accepted, False if over limit.
-        Uses Redis WATCH/MULTI for atomic check-and-increment.
         """
         try:
-            pipe = self.redis.pipeline(True)
-            max_retries = 5
-            for attempt in range(max_retries):
-                try:
-                    pipe.watch(ACTIVE_CALLS_KEY)
-                    current = int(pipe.get(ACTIVE_CALLS_KEY) or 0)
-                    if current >= self._max_concurrent:
-                        pipe.unwatch()
-                        logger.warning(
-                            "Call rejected: active=%d, max=%d, call_sid=%s",
-                            current, self._max_concurrent, call_sid,
-                        )
-                        return False
-                    pipe.multi()
-                    pipe.incr(ACTIVE_CALLS_KEY)
-                    pipe.execute()
-                    return True
-                except Exception as retry_err:
-                    logger.debug("Redis WATCH retry %d/%d: %s", attempt + 1, max_retries, retry_err)
-                    continue
-            logger.error("Failed to increment after %d retries, call_sid=%s", max_retries, call_sid)
-            return False
+            from server.services.capacity_ledger import acquire_lease
+            return acquire_lease(call_sid, business_id, direction).admitted
         except Exception as e:
             logger.error("Failed to increment active calls: %s", e)
             return False
 
     def decrement_active(self, call_sid: str):
-        """Decrement active calls counter (on call end)."""
+        """Release the call's slot (on call end)."""
         try:
-            result = self.redis.decr(ACTIVE_CALLS_KEY)
-            # Prevent negative counts
-            if result is not None and int(result) < 0:
-                self.redis.set(ACTIVE_CALLS_KEY, 0)
+            from server.services.capacity_ledger import release_lease
+            release_lease(call_sid)
         except Exception as e:
             logger.error("Failed to decrement active calls: %s", e)
 
@@ -149,7 +127,8 @@ class CallStateManager:
         Start a new call. Returns False if max concurrent reached.
         This is the entry point for all new calls.
         """
-        if not self.increment_active(call_sid):
+        if not self.increment_active(call_sid, initial_state.get("business_id"),
+                                     initial_state.get("direction", "inbound")):
             return False
         initial_state["started_at"] = time.time()
         initial_state["call_sid"] = call_sid
@@ -29,6 +29,17 @@ def _env_int(key: str, default: int) -> int:
     return default
 
 
+def _env_float(key: str, default: float) -> float:
+    """Read a float env var with fallback."""
+    val = _env(key)
+    if val is not None:
+        try:
+            return float(val)
+        except ValueError:
+            pass
+    return default
+
+
 def _env_bool(key: str, default: bool) -> bool:
     """Read a boolean env var (true/1/yes → True)."""
     val = _env(key)
@@ -49,11 +60,142 @@ BAILEYS_BASE_URL_LEGACY: str = _env(
     "BAILEYS_BASE_URL", f"http://baileys:{BAILEYS_PORT}"
 )
 
+# ─── WhatsApp Broadcasts ──────────────────────────────────
+# Send rates (messages/sec) enforced by Redis token buckets shared by all workers.
+# Baileys: per tenant (one WhatsApp number - keep slow to avoid bans) and per shard.
+BROADCAST_BAILEYS_TENANT_RATE: float = _env_float(
+    "BROADCAST_BAILEYS_TENANT_RATE", _env_float("BROADCAST_RATE_LIMIT", 0.3)
+)
+BROADCAST_BAILEYS_SHARD_RATE: float = _env_float("BROADCAST_BAILEYS_SHARD_RATE", 10.0)
+# Meta Cloud API: per tenant (phone number throughput tier)
+BROADCAST_META_TENANT_RATE: float = _env_float("BROADCAST_META_TENANT_RATE", 20.0)
+# Recipients claimed per SKIP LOCKED page / concurrent sends per worker
+BROADCAST_CLAIM_BATCH: int = _env_int("BROADCAST_CLAIM_BATCH", 50)
+BROADCAST_SEND_CONCURRENCY: int = _env_int("BROADCAST_SEND_CONCURRENCY", 4)
+# RQ jobs started per campaign (they share the recipients safely)
+BROADCAST_JOBS_PER_CAMPAIGN: int = _env_int("BROADCAST_JOBS_PER_CAMPAIGN", 1)
+
+# ─── WhatsApp ingest ───────────────────────────────────────
+# The Baileys webhook appends messages to Redis streams partitioned by (tenant,
+# chat JID) and acks; drain jobs on the 'high' queue process each partition in
+# order (server/services/whatsapp_ingest.py). Changing the partition count while
+# streams hold messages can reorder the chats that move.
+WA_INGEST_STREAM_ENABLED: bool = _env_bool("WA_INGEST_STREAM_ENABLED", True)  # False = process in the request
+WA_INGEST_PARTITIONS: int = max(1, _env_int("WA_INGEST_PARTITIONS", 16))  # chats in parallel = drain jobs running
+WA_INGEST_BATCH_SIZE: int = max(1, _env_int("WA_INGEST_BATCH_SIZE", 200))  # stream entries per bulk insert
+WA_INGEST_STREAM_MAXLEN: int = max(1000, _env_int("WA_INGEST_STREAM_MAXLEN", 100000))  # per partition, then webhooks process inline
+WA_INGEST_DRAIN_MAX_SECONDS: float = _env_float("WA_INGEST_DRAIN_MAX_SECONDS", 60.0)  # then the job re-enqueues itself
+WA_INGEST_MAX_DELIVERIES: int = max(1, _env_int("WA_INGEST_MAX_DELIVERIES", 5))  # failed attempts, then the entry moves to wa:ingest:dead
+WA_INGEST_RETRY_BACKOFF_SECONDS: float = max(0.0, _env_float("WA_INGEST_RETRY_BACKOFF_SECONDS", 5.0))  # doubles per failure / outage
+WA_INGEST_RETRY_BACKOFF_MAX_SECONDS: float = _env_float("WA_INGEST_RETRY_BACKOFF_MAX_SECONDS", 300.0)
+
+# ─── Outbound webhooks ─────────────────────────────────────
+# Customer (generic/status) and n8n webhooks are written to the webhook_outbox
+# table and sent by delivery jobs on the 'default' queue with pooled connections
+# and bounded concurrency per endpoint host (server/services/webhook_delivery.py).
+WEBHOOK_OUTBOX_ENABLED: bool = _env_bool("WEBHOOK_OUTBOX_ENABLED", True)  # False = send in the caller
+WEBHOOK_DELIVERY_WORKERS: int = max(1, _env_int("WEBHOOK_DELIVERY_WORKERS", 32))  # requests in flight per delivery job
+WEBHOOK_DELIVERY_PER_ENDPOINT: int = max(1, _env_int("WEBHOOK_DELIVERY_PER_ENDPOINT", 4))  # per host (= its pool size)
+WEBHOOK_DELIVERY_TIMEOUT: float = _env_float("WEBHOOK_DELIVERY_TIMEOUT", 15.0)  # seconds per request
+WEBHOOK_DELIVERY_MAX_ATTEMPTS: int = max(1, _env_int("WEBHOOK_DELIVERY_MAX_ATTEMPTS", 8))
+WEBHOOK_RETRY_BASE_SECONDS: float = _env_float("WEBHOOK_RETRY_BASE_SECONDS", 2.0)  # base * 2^attempt, full jitter
+WEBHOOK_RETRY_MAX_SECONDS: float = _env_float("WEBHOOK_RETRY_MAX_SECONDS", 900.0)
+WEBHOOK_DELIVERY_MAX_SECONDS: float = _env_float("WEBHOOK_DELIVERY_MAX_SECONDS", 60.0)  # then the job re-enqueues itself
+WEBHOOK_OUTBOX_RETENTION_DAYS: int = max(1, _env_int("WEBHOOK_OUTBOX_RETENTION_DAYS", 7))  # delivered/failed rows kept
+# n8n only: >1 posts due events for the same URL together as {"events": [...]}
+# (the n8n workflow must accept that shape - off by default)
+N8N_BATCH_MAX_EVENTS: int = max(1, _env_int("N8N_BATCH_MAX_EVENTS", 1))
+
 # ─── Calls ─────────────────────────────────────────────────
 MAX_CONCURRENT_CALLS: int = _env_int("MAX_CONCURRENT_CALLS", 50)
 # MAX_ACTIVE_CALLS is an alias used by calls_capacity.py (same purpose as MAX_CONCURRENT_CALLS)
 MAX_ACTIVE_CALLS: int = _env_int("MAX_ACTIVE_CALLS", MAX_CONCURRENT_CALLS)
 CALLS_OVER_CAPACITY_BEHAVIOR: str = _env("CALLS_OVER_CAPACITY_BEHAVIOR", "reject")
+# Capacity ledger (server/services/capacity_ledger.py) - 0 disables a limit
+MAX_ACTIVE_OUTBOUND_CALLS: int = _env_int("MAX_ACTIVE_OUTBOUND_CALLS", 0)  # keeps room for inbound
+MAX_CALLS_PER_BUSINESS: int = _env_int("MAX_CALLS_PER_BUSINESS", 5)  # inbound + outbound
+MAX_OUTBOUND_CALLS_PER_BUSINESS: int = _env_int("MAX_OUTBOUND_CALLS_PER_BUSINESS", 3)
+# A call's slot is a lease heartbeated by the process handling it; a dead pod's
+# slots come back after CALL_LEASE_TTL_SECONDS (must cover ringing time)
+CALL_LEASE_TTL_SECONDS: int = max(30, _env_int("CALL_LEASE_TTL_SECONDS", 120))
+CALL_LEASE_HEARTBEAT_SECONDS: int = max(1, _env_int("CALL_LEASE_HEARTBEAT_SECONDS", 30))
+# "thread" = per-call reader / realtime / TX / audio-out / watchdog threads (default)
+# "async"  = those run as tasks on one shared event loop per worker process
+CALLS_ENGINE_MODE: str = (_env("CALLS_ENGINE_MODE", "thread") or "thread").strip().lower()
+# Async mode: threads shared by all calls for blocking work (DB, REST, call start/stop)
+CALLS_ENGINE_BLOCKING_WORKERS: int = max(1, _env_int("CALLS_ENGINE_BLOCKING_WORKERS", 32))
+
+# ─── Exports ───────────────────────────────────────────────
+# Lead exports above this many rows run as a background job (download link)
+LEADS_EXPORT_ASYNC_THRESHOLD: int = _env_int("LEADS_EXPORT_ASYNC_THRESHOLD", 50000)
+
+# ─── Scheduler ─────────────────────────────────────────────
+# Due-time index: scheduled messages / appointment automations fire from a Redis
+# sorted set; the DB tick jobs only run every SCHEDULER_RECONCILE_MINUTES as a net
+SCHEDULER_DUE_INDEX: bool = _env_bool("SCHEDULER_DUE_INDEX", True)
+SCHEDULER_RECONCILE_MINUTES: int = max(1, _env_int("SCHEDULER_RECONCILE_MINUTES", 5))
+SCHEDULER_DUE_POLL_MS: int = max(10, _env_int("SCHEDULER_DUE_POLL_MS", 250))
+
+# ─── Caches ────────────────────────────────────────────────
+# Shared cache layer (server/utils/cache.py) - both need REDIS_URL
+CACHE_L2_ENABLED: bool = _env_bool("CACHE_L2_ENABLED", True)  # Redis tier for caches built with l2=True
+CACHE_INVALIDATION_ENABLED: bool = _env_bool("CACHE_INVALIDATION_ENABLED", True)  # pub/sub invalidation
+
+# ─── TTS cache ─────────────────────────────────────────────
+# Synthesized phone audio (μ-law 8 kHz) keyed by hash(provider, voice, speed,
+# language, text): in-process LRU + the storage driver (shared by all workers)
+TTS_CACHE_ENABLED: bool = _env_bool("TTS_CACHE_ENABLED", True)
+TTS_CACHE_MEMORY_ENTRIES: int = _env_int("TTS_CACHE_MEMORY_ENTRIES", 256)
+TTS_CACHE_PREWARM: bool = _env_bool("TTS_CACHE_PREWARM", True)  # synthesize greetings when a prompt is saved
+
+# ─── Gmail receipt sync ────────────────────────────────────
+# Pipelined sync engine (server/services/gmail_sync_engine.py). Gmail allows 250
+# quota units per user per second; messages.get / attachments.get cost 5 each
+GMAIL_API_ROOT: str = (_env("GMAIL_API_ROOT", "https://gmail.googleapis.com") or "").rstrip("/")
+GMAIL_SYNC_QUOTA_UNITS_PER_SEC: float = _env_float("GMAIL_SYNC_QUOTA_UNITS_PER_SEC", 200.0)  # per account, 0 = unlimited
+GMAIL_SYNC_FETCH_WORKERS: int = max(1, _env_int("GMAIL_SYNC_FETCH_WORKERS", 6))  # message + attachment downloads
+GMAIL_SYNC_BATCH_SIZE: int = min(100, max(1, _env_int("GMAIL_SYNC_BATCH_SIZE", 25)))  # messages per batch request
+GMAIL_SYNC_PREFETCH: int = max(1, _env_int("GMAIL_SYNC_PREFETCH", 100))  # messages in flight ahead of the DB writer
+GMAIL_SYNC_MAX_RETRIES: int = max(0, _env_int("GMAIL_SYNC_MAX_RETRIES", 5))  # 429 / 5xx retries per request
+GMAIL_SYNC_HISTORY_ENABLED: bool = _env_bool("GMAIL_SYNC_HISTORY_ENABLED", True)  # incremental via history.list
+GMAIL_SYNC_RESUME_MAX_AGE_HOURS: int = _env_int("GMAIL_SYNC_RESUME_MAX_AGE_HOURS", 72)  # older checkpoints start over
+
+# ─── Receipt extraction ────────────────────────────────────
+# PDF text + amount/vendor parsing in a process pool (server/services/receipt_extraction.py)
+RECEIPT_EXTRACTION_WORKERS: int = max(0, _env_int("RECEIPT_EXTRACTION_WORKERS", 2))  # processes, 0 = inline
+RECEIPT_EXTRACTION_TIMEOUT: float = _env_float("RECEIPT_EXTRACTION_TIMEOUT", 30.0)  # seconds per document
+RECEIPT_EXTRACTION_CACHE: bool = _env_bool("RECEIPT_EXTRACTION_CACHE", True)  # reuse results by content hash
+
+# ─── Background worker ─────────────────────────────────────
+# server/worker.py forks a child per job (rq.Worker) - a crash or leak stays in
+# that job. Jobs from these queues render on the browser pool and run in the
+# worker process instead (like rq SimpleWorker), so the pool outlives a job
+RQ_IN_PROCESS_QUEUES: frozenset = frozenset(
+    q.strip() for q in (_env("RQ_IN_PROCESS_QUEUES", "receipts,receipts_sync") or "").split(",") if q.strip()
+)  # empty = fork every job
+
+# ─── Preview rendering ─────────────────────────────────────
+# Long-lived Chromium pages for HTML → PNG/PDF previews (server/services/browser_pool.py)
+BROWSER_POOL_SIZE: int = max(1, _env_int("BROWSER_POOL_SIZE", 2))  # browsers (one page each) per worker process
+BROWSER_POOL_PAGES_PER_CONTEXT: int = max(1, _env_int("BROWSER_POOL_PAGES_PER_CONTEXT", 50))  # renders before a fresh context
+BROWSER_POOL_QUEUE_SIZE: int = max(1, _env_int("BROWSER_POOL_QUEUE_SIZE", 32))  # renders waiting for a page
+BROWSER_POOL_RENDER_TIMEOUT: float = _env_float("BROWSER_POOL_RENDER_TIMEOUT", 120.0)  # seconds, queue wait included
+
+# ─── Recording pipeline ────────────────────────────────────
+# Post-call transcription in silence-split segments (server/services/recording_pipeline.py)
+RECORDING_DOWNLOAD_CHUNK_BYTES: int = max(4096, _env_int("RECORDING_DOWNLOAD_CHUNK_BYTES", 256 * 1024))  # streamed to disk
+RECORDING_CHUNKED_STT: bool = _env_bool("RECORDING_CHUNKED_STT", True)  # False = one request for the whole file
+RECORDING_STT_WORKERS: int = max(1, _env_int("RECORDING_STT_WORKERS", 4))  # segments transcribed concurrently
+RECORDING_SEGMENT_MIN_SEC: float = _env_float("RECORDING_SEGMENT_MIN_SEC", 30.0)  # cut at the first pause after this
+RECORDING_SEGMENT_MAX_SEC: float = _env_float("RECORDING_SEGMENT_MAX_SEC", 120.0)  # hard cut, pause or not
+RECORDING_SILENCE_MIN_MS: int = _env_int("RECORDING_SILENCE_MIN_MS", 500)  # pause long enough to cut on
+RECORDING_SILENCE_DBFS: float = _env_float("RECORDING_SILENCE_DBFS", -40.0)  # frames quieter than this are silence
+
+# ─── Lead counters ─────────────────────────────────────────
+# Per-tenant lead counts by (status, source) kept in step with lead writes
+# (server/services/lead_counters.py); totals for the leads list and kanban views
+LEAD_COUNTERS_ENABLED: bool = _env_bool("LEAD_COUNTERS_ENABLED", True)  # False = exact count() on every list
+LEAD_COUNTERS_RECONCILE_MINUTES: int = max(1, _env_int("LEAD_COUNTERS_RECONCILE_MINUTES", 30))  # recount from leads
 
 # ─── Metrics ───────────────────────────────────────────────
 METRICS_ENABLED: bool = _env_bool("METRICS_ENABLED", True)
@@ -103,6 +103,27 @@ def index_exists(conn, index_name: str) -> bool:
         return False
 
 
+def ensure_extensions(engine) -> List[str]:
+    """
+    Create the Postgres extensions required by INDEX_DEFS (e.g. pg_trgm).
+
+    Returns:
+        Names of extensions that could not be created (their indexes will fail)
+    """
+    missing = []
+    for extension in sorted({d["extension"] for d in INDEX_DEFS if d.get("extension")}):
+        try:
+            with engine.connect().execution_options(
+                isolation_level="AUTOCOMMIT"
+            ) as conn:
+                conn.execute(text(f"CREATE EXTENSION IF NOT EXISTS {extension}"))
+            logger.info(f"✅ Extension {extension} available")
+        except Exception as e:
+            logger.warning(f"⚠️  Could not create extension {extension}: {e}")
+            missing.append(extension)
+    return missing
+
+
 def create_index_with_retry(
     engine,
     index_def: Dict[str, str],
@@ -195,6 +216,8 @@ def build_indexes():
         logger.error("⚠️  Index build skipped, but deployment will continue")
         return
     
+    ensure_extensions(engine)
+    
     logger.info("")
     logger.info(f"Found {len(INDEX_DEFS)} index(es) to process")
     logger.info("")
@@ -13,6 +13,8 @@ Index Structure:
     - critical: Whether this index is critical for basic functionality
     - table: Table name (for reference)
     - description: What the index is for (for documentation)
+    - extension: (optional) Postgres extension the index needs, e.g. "pg_trgm"
+                 (db_build_indexes.py runs CREATE EXTENSION IF NOT EXISTS first)
 
 Guidelines:
     1. Always use "CREATE INDEX CONCURRENTLY IF NOT EXISTS"
@@ -207,6 +209,22 @@ INDEX_DEFS_LEADS_CRM = [
         "critical": False,
         "description": "Composite index for leads list/search by tenant, status, and creation time (Claude performance fix)"
     },
+    # Keyset pagination of the leads list: (created_at, id) DESC per tenant,
+    # optionally per case-insensitive status (kanban columns). See lead_list_service.py
+    {
+        "name": "idx_leads_tenant_created_id",
+        "table": "leads",
+        "sql": "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_leads_tenant_created_id ON leads(tenant_id, created_at DESC, id DESC)",
+        "critical": False,
+        "description": "Keyset pagination of the leads list by (created_at, id) per tenant"
+    },
+    {
+        "name": "idx_leads_tenant_lower_status_created_id",
+        "table": "leads",
+        "sql": "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_leads_tenant_lower_status_created_id ON leads(tenant_id, lower(status), created_at DESC, id DESC)",
+        "critical": False,
+        "description": "Keyset pagination of a status column (case-insensitive) and the lead counters recount"
+    },
     {
         "name": "idx_lead_status_history_lead_created",
         "table": "lead_status_history",
@@ -249,6 +267,38 @@ INDEX_DEFS_LEADS_CRM = [
         "critical": False,
         "description": "Partial index on webhook_lead_ingest for active webhooks per business"
     },
+    # 🔍 SEARCH: /api/search + lead list filters (expressions from services/search_service.py - keep verbatim)
+    {
+        "name": "idx_leads_search_name_trgm",
+        "table": "leads",
+        "sql": "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_leads_search_name_trgm ON leads USING gin ((translate(regexp_replace(lower(coalesce(first_name, '') || ' ' || coalesce(last_name, '') || ' ' || coalesce(name, '')), '[\\u0591-\\u05C7]', '', 'g'), 'ךםןףץ׳״', 'כמנפצ')) gin_trgm_ops)",
+        "critical": False,
+        "extension": "pg_trgm",
+        "description": "Trigram index on Hebrew-normalized lead names for contains/fuzzy search"
+    },
+    {
+        "name": "idx_leads_search_email_trgm",
+        "table": "leads",
+        "sql": "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_leads_search_email_trgm ON leads USING gin ((lower(coalesce(email, ''))) gin_trgm_ops)",
+        "critical": False,
+        "extension": "pg_trgm",
+        "description": "Trigram index on lowercased lead email for contains search"
+    },
+    {
+        "name": "idx_leads_search_phone_trgm",
+        "table": "leads",
+        "sql": "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_leads_search_phone_trgm ON leads USING gin ((regexp_replace(coalesce(phone_e164, ''), '[^0-9]', '', 'g')) gin_trgm_ops)",
+        "critical": False,
+        "extension": "pg_trgm",
+        "description": "Trigram index on phone digits for partial / suffix phone search"
+    },
+    {
+        "name": "idx_leads_search_notes_fts",
+        "table": "leads",
+        "sql": "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_leads_search_notes_fts ON leads USING gin (to_tsvector('simple', translate(regexp_replace(lower(coalesce(notes, '')), '[\\u0591-\\u05C7]', '', 'g'), 'ךםןףץ׳״', 'כמנפצ')))",
+        "critical": False,
+        "description": "Full-text index on normalized lead notes"
+    },
 ]
 
 
@@ -398,6 +448,30 @@ INDEX_DEFS_CALLS = [
         "critical": False,
         "description": "Composite index for calls history by business, status, and time (Claude performance fix)"
     },
+    # 🔍 SEARCH: /api/search calls (expressions from services/search_service.py - keep verbatim)
+    {
+        "name": "idx_call_log_search_from_trgm",
+        "table": "call_log",
+        "sql": "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_call_log_search_from_trgm ON call_log USING gin ((regexp_replace(coalesce(from_number, ''), '[^0-9]', '', 'g')) gin_trgm_ops)",
+        "critical": False,
+        "extension": "pg_trgm",
+        "description": "Trigram index on caller digits for partial / suffix phone search"
+    },
+    {
+        "name": "idx_call_log_search_to_trgm",
+        "table": "call_log",
+        "sql": "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_call_log_search_to_trgm ON call_log USING gin ((regexp_replace(coalesce(to_number, ''), '[^0-9]', '', 'g')) gin_trgm_ops)",
+        "critical": False,
+        "extension": "pg_trgm",
+        "description": "Trigram index on callee digits for partial / suffix phone search"
+    },
+    {
+        "name": "idx_call_log_search_summary_fts",
+        "table": "call_log",
+        "sql": "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_call_log_search_summary_fts ON call_log USING gin (to_tsvector('simple', translate(regexp_replace(lower(coalesce(summary, '')), '[\\u0591-\\u05C7]', '', 'g'), 'ךםןףץ׳״', 'כמנפצ')))",
+        "critical": False,
+        "description": "Full-text index on normalized call summaries"
+    },
 ]
 
 
@@ -491,6 +565,30 @@ INDEX_DEFS_WHATSAPP = [
         "critical": False,
         "description": "Composite index for WhatsApp message loading by business, recipient, and time (Claude performance fix)"
     },
+    # 🔍 SEARCH: /api/search WhatsApp (expressions from services/search_service.py - keep verbatim)
+    {
+        "name": "idx_wa_conv_search_phone_trgm",
+        "table": "whatsapp_conversation",
+        "sql": "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_wa_conv_search_phone_trgm ON whatsapp_conversation USING gin ((regexp_replace(coalesce(customer_number, ''), '[^0-9]', '', 'g')) gin_trgm_ops)",
+        "critical": False,
+        "extension": "pg_trgm",
+        "description": "Trigram index on customer number digits for partial / suffix phone search"
+    },
+    {
+        "name": "idx_wa_conv_search_name_trgm",
+        "table": "whatsapp_conversation",
+        "sql": "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_wa_conv_search_name_trgm ON whatsapp_conversation USING gin ((translate(regexp_replace(lower(coalesce(customer_name, '')), '[\\u0591-\\u05C7]', '', 'g'), 'ךםןףץ׳״', 'כמנפצ')) gin_trgm_ops)",
+        "critical": False,
+        "extension": "pg_trgm",
+        "description": "Trigram index on Hebrew-normalized customer names"
+    },
+    {
+        "name": "idx_whatsapp_message_search_body_fts",
+        "table": "whatsapp_message",
+        "sql": "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_whatsapp_message_search_body_fts ON whatsapp_message USING gin (to_tsvector('simple', translate(regexp_replace(lower(coalesce(body, '')), '[\\u0591-\\u05C7]', '', 'g'), 'ךםןףץ׳״', 'כמנפצ')))",
+        "critical": False,
+        "description": "Full-text index on normalized WhatsApp message bodies"
+    },
 ]
 
 
@@ -741,6 +839,21 @@ INDEX_DEFS_MISC = [
         "critical": False,
         "description": "Index on appointments for looking up appointments by calendar"
     },
+    # Outbound webhook outbox (Migration 151)
+    {
+        "name": "idx_webhook_outbox_due",
+        "table": "webhook_outbox",
+        "sql": "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_webhook_outbox_due ON webhook_outbox(next_attempt_at) WHERE status IN ('pending', 'delivering')",
+        "critical": False,
+        "description": "Partial index on webhook_outbox for the delivery claim (due and expired-claim rows only)"
+    },
+    {
+        "name": "idx_webhook_outbox_done_created",
+        "table": "webhook_outbox",
+        "sql": "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_webhook_outbox_done_created ON webhook_outbox(created_at) WHERE status IN ('delivered', 'failed')",
+        "critical": False,
+        "description": "Partial index on webhook_outbox for pruning delivered/failed rows past retention"
+    },
 ]
 
 
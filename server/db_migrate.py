@@ -88,6 +88,7 @@ Database migrations - additive only, with strict data protection
 from server.db import db
 from datetime import datetime
 import logging
+import re
 import sys
 import time
 import os
@@ -136,6 +137,9 @@ def ensure_migration_tracking_table(engine):
 
 def is_migration_applied(engine, migration_id: str) -> bool:
     """Check if a migration has already been applied"""
+    catalog = _active_catalog(refresh=False)
+    if catalog is not None:
+        return migration_id in catalog.applied
     try:
         result = execute_with_retry(
             engine,
@@ -167,6 +171,8 @@ def mark_migration_applied(engine, migration_id: str, reconciled: bool = False,
             SET applied_at = NOW(), success = TRUE, reconciled = :reconciled, 
                 notes = COALESCE(:notes, schema_migrations.notes)
         """, {"id": migration_id, "reconciled": reconciled, "notes": notes})
+        if _CATALOG is not None:
+            _CATALOG.applied.add(migration_id)
         status = "reconciled" if reconciled else "applied"
         log.info(f"✅ Marked migration {migration_id} as {status}")
     except Exception as e:
@@ -494,6 +500,8 @@ def exec_sql(engine, sql: str, params=None, *, autocommit=False, retries=4, slee
             CHECK (status IN ('pending', 'approved'))
         ''', autocommit=True)
     """
+    if _planned("exec_sql", sql):
+        return
     last_error = None
     for i in range(retries):
         try:
@@ -668,8 +676,139 @@ def fetch_all_retry(engine, sql, params=None, attempts=3):
             raise
     raise last_error
 
+# ═══════════════════════════════════════════════════════════════════════════
+# 🔥 SCHEMA CATALOG SNAPSHOT - Read the catalog once, not once per check
+# ═══════════════════════════════════════════════════════════════════════════
+# apply_migrations() gates every step on check_*_exists() / is_migration_applied(),
+# and each of those used to be its own information_schema round trip (~430 per
+# startup). While a snapshot is active the checks are answered from memory.
+# Any statement that can change the schema (through the exec helpers) marks the
+# snapshot stale and it is reloaded on the next check.
+#
+# MIGRATIONS_DRY_RUN=1 (or `python -m server.db_migrate --dry-run`) records every
+# write instead of executing it and prints the plan with timings.
+
+_CATALOG_DDL_RE = re.compile(r'\b(CREATE|ALTER|DROP|RENAME|COMMENT\s+ON)\b', re.IGNORECASE)
+
+
+class SchemaCatalog:
+    """In-memory view of the public schema and schema_migrations"""
+
+    SCHEMA_QUERIES = {
+        "tables": "SELECT table_name FROM information_schema.tables WHERE table_schema = 'public'",
+        "columns": "SELECT table_name, column_name FROM information_schema.columns WHERE table_schema = 'public'",
+        "indexes": "SELECT indexname FROM pg_indexes WHERE schemaname = 'public'",
+        "constraints": """
+            SELECT c.conname, CASE WHEN n.nspname = 'public' THEN t.relname END
+            FROM pg_constraint c
+            LEFT JOIN pg_class t ON t.oid = c.conrelid
+            LEFT JOIN pg_namespace n ON n.oid = t.relnamespace
+        """,
+    }
+    APPLIED_QUERY = "SELECT migration_id FROM schema_migrations WHERE success = TRUE"
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.tables = set()
+        self.columns = set()
+        self.indexes = set()
+        self.constraint_names = set()
+        self.constraints = set()
+        self.applied = set()
+        self.stale = True
+        self.loads = 0
+        self.load_seconds = 0.0
+        self.checks = 0
+
+    def load(self):
+        """Load the whole snapshot: four catalog queries + schema_migrations"""
+        started = time.time()
+        rows = {name: fetch_all(self.engine, sql) for name, sql in self.SCHEMA_QUERIES.items()}
+        self.tables = {row[0] for row in rows["tables"]}
+        self.columns = {(row[0], row[1]) for row in rows["columns"]}
+        self.indexes = {row[0] for row in rows["indexes"]}
+        self.constraint_names = {row[0] for row in rows["constraints"]}
+        self.constraints = {(row[0], row[1]) for row in rows["constraints"] if row[1]}
+        if not self.loads:
+            try:
+                self.applied = {row[0] for row in fetch_all(self.engine, self.APPLIED_QUERY)}
+            except Exception as e:
+                # schema_migrations may not exist yet (dry run on a fresh database)
+                log.debug(f"Could not load applied migrations: {e}")
+                self.applied = set()
+        self.stale = False
+        self.loads += 1
+        self.load_seconds += time.time() - started
+
+
+_CATALOG = None
+_DRY_RUN_PLAN = None
+
+
+class _PlannedResult:
+    """Stand-in result for a statement recorded by a dry run"""
+    rowcount = 0
+
+
+def activate_schema_catalog(engine):
+    """Load a snapshot and answer check_*_exists() / is_migration_applied() from it"""
+    global _CATALOG
+    catalog = SchemaCatalog(engine)
+    catalog.load()
+    _CATALOG = catalog
+    return catalog
+
+
+def deactivate_schema_catalog():
+    """Go back to one query per check; returns the snapshot that was active"""
+    global _CATALOG
+    catalog, _CATALOG = _CATALOG, None
+    return catalog
+
+
+def _active_catalog(refresh=True):
+    """Return the active snapshot (reloaded if stale), or None to query directly"""
+    catalog = _CATALOG
+    if catalog is None:
+        return None
+    if refresh and catalog.stale:
+        try:
+            catalog.load()
+        except Exception as e:
+            log.warning(f"Schema catalog reload failed, checking directly: {e}")
+            return None
+    catalog.checks += 1
+    return catalog
+
+
+def _planned(helper: str, sql: str) -> bool:
+    """
+    Called by every write helper before it executes.
+    
+    Returns True when a dry run recorded the statement (caller must not execute it).
+    Otherwise marks the snapshot stale if the statement can change the schema.
+    """
+    if _DRY_RUN_PLAN is not None:
+        _DRY_RUN_PLAN.append((helper, " ".join(sql.split())))
+        return True
+    if _CATALOG is not None and _CATALOG_DDL_RE.search(sql):
+        _CATALOG.stale = True
+    return False
+
+
+def _report_catalog(catalog, started):
+    """Log how the run's existence checks were served"""
+    if catalog is None:
+        return
+    checkpoint(f"📊 Schema catalog: {catalog.checks} checks answered from {catalog.loads} snapshot load(s) "
+               f"({catalog.load_seconds * 1000:.0f}ms loading, {time.time() - started:.1f}s total)")
+
+
 def check_column_exists(table_name, column_name):
     """Check if column exists in table using execute_with_retry"""
+    catalog = _active_catalog()
+    if catalog is not None:
+        return (table_name, column_name) in catalog.columns
     try:
         engine = get_migrate_engine()
         rows = execute_with_retry(engine, """
@@ -683,6 +822,9 @@ def check_column_exists(table_name, column_name):
 
 def check_table_exists(table_name):
     """Check if table exists using execute_with_retry"""
+    catalog = _active_catalog()
+    if catalog is not None:
+        return table_name in catalog.tables
     try:
         engine = get_migrate_engine()
         rows = execute_with_retry(engine, """
@@ -696,6 +838,9 @@ def check_table_exists(table_name):
 
 def check_index_exists(index_name):
     """Check if index exists using execute_with_retry"""
+    catalog = _active_catalog()
+    if catalog is not None:
+        return index_name in catalog.indexes
     try:
         engine = get_migrate_engine()
         rows = execute_with_retry(engine, """
@@ -720,6 +865,11 @@ def check_constraint_exists(constraint_name, table_name=None):
     
     Note: Backward compatible - can be called with just constraint_name
     """
+    catalog = _active_catalog()
+    if catalog is not None:
+        if table_name:
+            return (constraint_name, table_name) in catalog.constraints
+        return constraint_name in catalog.constraint_names
     try:
         engine = get_migrate_engine()
         
@@ -796,6 +946,8 @@ def exec_ddl(engine, sql: str):
     Raises:
         Exception: If DDL fails after all retries (including lock timeout)
     """
+    if _planned("exec_ddl", sql):
+        return
     # First, check and log idle-in-transaction count
     try:
         with engine.connect() as conn:
@@ -901,6 +1053,8 @@ def exec_ddl_autocommit(engine, sql: str):
     Raises:
         Exception: If DDL fails after all retries
     """
+    if _planned("exec_ddl_autocommit", sql):
+        return
     import psycopg2
     from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
     
@@ -1010,6 +1164,8 @@ def exec_dml(engine, sql: str, params=None, retries=3):
     Raises:
         Exception: If DML fails after all retries (including lock timeout)
     """
+    if _planned("exec_dml", sql):
+        return 0
     last_error = None
     for i in range(retries):
         try:
@@ -1113,6 +1269,8 @@ def exec_index(engine, sql: str, index_name: str = None, retries=10, best_effort
             WHERE lead_id IS NOT NULL
         ''', index_name='idx_call_log_lead_created')
     """
+    if _planned("exec_index", sql):
+        return True
     if index_name is None:
         # Try to extract index name from SQL
         import re
@@ -1249,6 +1407,8 @@ def exec_ddl_heavy(engine, sql: str, params=None, retries=10):
             DROP CONSTRAINT IF EXISTS chk_receipt_status
         ''')
     """
+    if _planned("exec_ddl_heavy", sql):
+        return
     delay = 2.0
     
     for i in range(retries):
@@ -1426,6 +1586,8 @@ def execute_with_retry(engine, sql: str, params=None, *, max_retries=10, fetch=F
     # Auto-detect if this is a SELECT query
     is_select = sql.strip().upper().startswith('SELECT')
     should_fetch = fetch or is_select
+    if not is_select and _planned("execute_with_retry", sql):
+        return [] if should_fetch else _PlannedResult()
     
     for attempt in range(max_retries):
         try:
@@ -1505,7 +1667,7 @@ def execute_with_retry(engine, sql: str, params=None, *, max_retries=10, fetch=F
     # Should never reach here, but handle it
     raise last_error
 
-def apply_migrations():
+def apply_migrations(dry_run=None):
     """
     Apply all pending migrations
     
@@ -1520,10 +1682,20 @@ def apply_migrations():
     
     🔒 CONNECTION LOCKING: Connection choice (DIRECT or POOLER) is made ONCE at the
     start and locked for entire run. No mid-run connection changes.
+    
+    ⚡ CATALOG SNAPSHOT: Existence checks are answered from a SchemaCatalog loaded
+    once after the tracking table is ready (reloaded only after DDL).
+    
+    🧪 DRY RUN: dry_run=True (or MIGRATIONS_DRY_RUN=1) reads the schema but records
+    every write instead of executing it, and returns the planned statements.
     """
+    global _DRY_RUN_PLAN
     import os
     import time
     
+    if dry_run is None:
+        dry_run = os.getenv('MIGRATIONS_DRY_RUN', '0') == '1'
+    
     # 🔥 CRITICAL: Hard gate - workers must NEVER run migrations
     # Migrations should only run once during API startup, not on every job
     service_role = os.getenv('SERVICE_ROLE', '').lower()
@@ -1547,9 +1719,10 @@ def apply_migrations():
         checkpoint("=" * 80)
         return 'skip'  # Return 'skip' to indicate migrations were disabled
     
-    checkpoint("Starting apply_migrations()")
+    checkpoint("Starting apply_migrations()" + (" [DRY RUN]" if dry_run else ""))
     checkpoint(f"  SERVICE_ROLE: {service_role or 'not set (API server)'}")
     migrations_applied = []
+    run_started = time.time()
     
     # 🔥 CRITICAL: Create migration engine ONCE at start - this locks connection choice
     # Try DIRECT first (with 5s timeout), fall back to POOLER if unavailable
@@ -1633,6 +1806,9 @@ def apply_migrations():
         checkpoint("⚠️ Migration lock acquisition failed -> skipping migrations")
         return 'skip'
     
+    if dry_run:
+        _DRY_RUN_PLAN = []
+    
     try:
         checkpoint("Checking if database is completely empty...")
         # Check if database is empty and create all tables if needed
@@ -1644,7 +1820,10 @@ def apply_migrations():
         if len(existing_tables) == 0:
             checkpoint("Database is empty - creating all tables from SQLAlchemy metadata")
             try:
-                db.create_all()
+                if _DRY_RUN_PLAN is not None:
+                    _DRY_RUN_PLAN.append(("create_all", "db.create_all()"))
+                else:
+                    db.create_all()
                 checkpoint("✅ All tables created successfully from metadata")
                 migrations_applied.append("create_all_tables_from_metadata")
             except Exception as e:
@@ -1656,6 +1835,12 @@ def apply_migrations():
         checkpoint("Setting up migration state tracking...")
         ensure_migration_tracking_table(migrate_engine)
         
+        # ⚡ Load the schema catalog snapshot - every check below is answered from it
+        try:
+            activate_schema_catalog(migrate_engine)
+        except Exception as e:
+            checkpoint(f"⚠️ Could not load schema catalog, checking per statement: {e}")
+        
         # 🔥 Reconcile existing state with SAME engine
         reconcile_existing_state(migrate_engine)
         
@@ -9417,13 +9602,142 @@ def apply_migrations():
             # Don't raise - allow deployment to continue (service will log errors)
         
         checkpoint("✅ Migration 146 complete: lead_status_events table for idempotency")
-        
+
+        # ═══════════════════════════════════════════════════════════════════════
+        # Migration 149: Create receipt_extractions cache table
+        # 🎯 PURPOSE: Content-addressed receipt parsing results (PDF text, fields, confidence)
+        # 🔥 FEATURE: Re-syncs and duplicate attachments skip PDF/HTML parsing
+        # ═══════════════════════════════════════════════════════════════════════
+        checkpoint("Starting Migration 149: Create receipt_extractions table")
+
+        try:
+            if not check_table_exists('receipt_extractions'):
+                checkpoint("  → Creating receipt_extractions table...")
+                execute_with_retry(migrate_engine, """
+                    CREATE TABLE IF NOT EXISTS receipt_extractions (
+                        id SERIAL PRIMARY KEY,
+                        business_id INTEGER NOT NULL REFERENCES business(id) ON DELETE CASCADE,
+                        kind VARCHAR(16) NOT NULL,
+                        content_hash VARCHAR(64) NOT NULL,
+                        extractor_version INTEGER NOT NULL,
+                        pdf_text TEXT,
+                        confidence INTEGER,
+                        fields JSON,
+                        parse_ms INTEGER,
+                        created_at TIMESTAMP DEFAULT NOW(),
+                        CONSTRAINT uq_receipt_extraction_key UNIQUE (business_id, kind, content_hash),
+                        CONSTRAINT chk_receipt_extraction_kind CHECK (kind IN ('pdf', 'fields'))
+                    )
+                """)
+                checkpoint("  ✅ receipt_extractions table created")
+                checkpoint("     💡 The unique key doubles as the lookup index")
+                migrations_applied.append("migration_149_receipt_extractions")
+            else:
+                checkpoint("  ⏭️  receipt_extractions table already exists")
+
+        except Exception as e:
+            checkpoint(f"  ❌ Migration 149 failed: {e}")
+            logger.error(f"Migration 149 error: {e}", exc_info=True)
+
+        checkpoint("✅ Migration 149 complete: receipt_extractions table ready")
+
+        # ═══════════════════════════════════════════════════════════════════════
+        # Migration 150: Create lead_counters table
+        # 🎯 PURPOSE: Per-tenant lead counts by (status, source) for list totals / kanban
+        # 🔥 FEATURE: The leads list no longer runs count() for status/source filters
+        # 💡 Rows are seeded by the lead counters reconciler job (no DML here)
+        # ═══════════════════════════════════════════════════════════════════════
+        checkpoint("Starting Migration 150: Create lead_counters table")
+
+        try:
+            if not check_table_exists('lead_counters'):
+                checkpoint("  → Creating lead_counters table...")
+                execute_with_retry(migrate_engine, """
+                    CREATE TABLE IF NOT EXISTS lead_counters (
+                        tenant_id INTEGER NOT NULL REFERENCES business(id) ON DELETE CASCADE,
+                        status VARCHAR(32) NOT NULL,
+                        source VARCHAR(32) NOT NULL,
+                        lead_count INTEGER NOT NULL DEFAULT 0,
+                        updated_at TIMESTAMP DEFAULT NOW(),
+                        reconciled_at TIMESTAMP NULL,
+                        PRIMARY KEY (tenant_id, status, source)
+                    )
+                """)
+                checkpoint("  ✅ lead_counters table created")
+                checkpoint("     💡 The primary key doubles as the per-tenant lookup index")
+                migrations_applied.append("migration_150_lead_counters")
+            else:
+                checkpoint("  ⏭️  lead_counters table already exists")
+
+        except Exception as e:
+            checkpoint(f"  ❌ Migration 150 failed: {e}")
+            logger.error(f"Migration 150 error: {e}", exc_info=True)
+
+        checkpoint("✅ Migration 150 complete: lead_counters table ready")
+
+        # ═══════════════════════════════════════════════════════════════════════
+        # Migration 151: Create webhook_outbox table
+        # 🎯 PURPOSE: Durable queue for customer / status / n8n webhooks
+        # 🔥 FEATURE: Delivery jobs send with pooled connections, per-endpoint
+        #    concurrency and backoff retries instead of blocking the caller
+        # 💡 The claim index is in db_indexes.py (idx_webhook_outbox_due)
+        # ═══════════════════════════════════════════════════════════════════════
+        checkpoint("Starting Migration 151: Create webhook_outbox table")
+
+        try:
+            if not check_table_exists('webhook_outbox'):
+                checkpoint("  → Creating webhook_outbox table...")
+                execute_with_retry(migrate_engine, """
+                    CREATE TABLE IF NOT EXISTS webhook_outbox (
+                        id BIGSERIAL PRIMARY KEY,
+                        business_id INTEGER,
+                        channel VARCHAR(16) NOT NULL,
+                        event_type VARCHAR(64) NOT NULL,
+                        url TEXT NOT NULL,
+                        body TEXT NOT NULL,
+                        headers JSON,
+                        batchable BOOLEAN NOT NULL DEFAULT FALSE,
+                        status VARCHAR(16) NOT NULL DEFAULT 'pending',
+                        attempts INTEGER NOT NULL DEFAULT 0,
+                        max_attempts INTEGER NOT NULL DEFAULT 8,
+                        next_attempt_at TIMESTAMP NOT NULL DEFAULT NOW(),
+                        last_error TEXT,
+                        last_status_code INTEGER,
+                        last_latency_ms INTEGER,
+                        created_at TIMESTAMP DEFAULT NOW(),
+                        delivered_at TIMESTAMP NULL,
+                        CONSTRAINT chk_webhook_outbox_status
+                            CHECK (status IN ('pending', 'delivering', 'delivered', 'failed'))
+                    )
+                """)
+                checkpoint("  ✅ webhook_outbox table created")
+                migrations_applied.append("migration_151_webhook_outbox")
+            else:
+                checkpoint("  ⏭️  webhook_outbox table already exists")
+
+        except Exception as e:
+            checkpoint(f"  ❌ Migration 151 failed: {e}")
+            logger.error(f"Migration 151 error: {e}", exc_info=True)
+
+        checkpoint("✅ Migration 151 complete: webhook_outbox table ready")
+
         checkpoint("Committing migrations to database...")
         if migrations_applied:
             checkpoint(f"✅ Applied {len(migrations_applied)} migrations: {', '.join(migrations_applied[:3])}...")
         else:
             checkpoint("No migrations needed - database is up to date")
         
+        if _DRY_RUN_PLAN is not None:
+            # Nothing was written - the post-migration checks below would only
+            # report the planned changes as missing
+            plan = list(_DRY_RUN_PLAN)
+            checkpoint("=" * 80)
+            checkpoint(f"🧪 DRY RUN: {len(plan)} statement(s) would be executed")
+            for helper, statement in plan:
+                checkpoint(f"   [{helper}] {statement[:200]}")
+            checkpoint("=" * 80)
+            return plan
+        
         # 🔒 DATA PROTECTION CHECK: Verify data counts AFTER migrations - CRITICAL!
         # If FAQs or leads are deleted, ROLLBACK and FAIL the migration
         checkpoint("Starting data protection layer 3 - verifying no data loss")
@@ -9563,6 +9877,8 @@ def apply_migrations():
     
     # 🔒 CONCURRENCY PROTECTION: Release PostgreSQL advisory lock
     finally:
+        _report_catalog(deactivate_schema_catalog(), run_started)
+        _DRY_RUN_PLAN = None
         if lock_acquired:
             try:
                 # Release lock using the same LOCK_ID (1234567890)
@@ -9585,6 +9901,8 @@ if __name__ == '__main__':
     # Set migration mode
     import os
     os.environ['MIGRATION_MODE'] = '1'
+    if '--dry-run' in sys.argv[1:]:
+        os.environ['MIGRATIONS_DRY_RUN'] = '1'
     os.environ['ASYNC_LOG_QUEUE'] = '0'
     
     checkpoint("=" * 80)
@@ -9617,6 +9935,12 @@ if __name__ == '__main__':
             checkpoint("=" * 80)
             sys.exit(0)
         
+        if os.environ.get('MIGRATIONS_DRY_RUN') == '1':
+            checkpoint("=" * 80)
+            checkpoint(f"🧪 DRY RUN - {len(migrations)} statements planned, nothing executed")
+            checkpoint("=" * 80)
+            sys.exit(0)
+
         # Verify migrations list is not empty (real success)
         if isinstance(migrations, list):
             checkpoint("=" * 80)
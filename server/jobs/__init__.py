@@ -14,6 +14,7 @@ from .delete_imported_leads_job import delete_imported_leads_batch_job
 from .enqueue_outbound_calls_job import enqueue_outbound_calls_batch_job
 from .cleanup_recordings_job import cleanup_old_recordings_job
 from .warmup_agents_job import warmup_agents_job
+from .prewarm_tts_job import prewarm_tts_job
 from .whatsapp_session_job import process_whatsapp_sessions_job
 from .reminder_notification_job import send_reminder_notifications_job
 from .send_whatsapp_message_job import send_whatsapp_message_job
@@ -32,6 +33,7 @@ __all__ = [
     'enqueue_outbound_calls_batch_job',
     'cleanup_old_recordings_job',
     'warmup_agents_job',
+    'prewarm_tts_job',
     'process_whatsapp_sessions_job',
     'send_reminder_notifications_job',
     'send_whatsapp_message_job',
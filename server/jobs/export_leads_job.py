@@ -0,0 +1,64 @@
+"""
+Export Leads Job
+Background lead export (CSV / XLSX) for exports too large for a request
+
+Features:
+- Server-side cursor streaming (lead_export_service) - constant memory
+- Writes to a temp file, then uploads to the storage driver (multipart)
+- Progress in job.meta['processed'] for the status endpoint
+- Result holds the storage key; the status endpoint presigns a download link
+"""
+import logging
+import os
+
+from server.services.lead_export_service import (
+    EXPORT_FORMATS, LeadExportFilters, export_filename, iter_export_rows, write_export_tempfile,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def export_leads_job(filters: dict, fmt: str = 'csv', business_id: int = None, requested_by: int = None):
+    """
+    Export leads matching `filters` to storage.
+
+    Args:
+        filters: LeadExportFilters.to_dict() of the original request
+        fmt: 'csv' or 'xlsx'
+        business_id: Business ID (None → all businesses, system_admin only)
+        requested_by: User ID that requested the export (for logging)
+
+    Returns:
+        dict: storage_key, rows, filename, format
+    """
+    from rq import get_current_job
+    from server.storage import get_storage_driver, build_storage_key
+
+    job = get_current_job()
+    job_id = job.id if job else 'local'
+
+    def on_progress(processed: int):
+        if job:
+            job.meta['processed'] = processed
+            job.save_meta()
+
+    logger.info(f"[EXPORT-LEADS] Starting job={job_id} business_id={business_id} format={fmt} user={requested_by}")
+
+    rows = iter_export_rows(business_id, LeadExportFilters(**filters))
+    path, count = write_export_tempfile(rows, fmt, on_progress=on_progress)
+    try:
+        filename = export_filename(fmt)
+        key = build_storage_key(business_id or 0, 'exports', job_id, filename)
+        with open(path, 'rb') as f:
+            get_storage_driver().put_file(key, f, content_type=EXPORT_FORMATS[fmt])
+    finally:
+        os.unlink(path)
+
+    on_progress(count)
+    logger.info(f"[EXPORT-LEADS] ✅ Job {job_id} exported {count} leads → {key}")
+    return {
+        'storage_key': key,
+        'rows': count,
+        'filename': filename,
+        'format': fmt,
+    }
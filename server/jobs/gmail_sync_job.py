@@ -42,7 +42,8 @@ def sync_gmail_receipts_job(
     max_messages: Optional[int] = None,
     from_date: Optional[str] = None,
     to_date: Optional[str] = None,
-    months_back: int = 36
+    months_back: int = 36,
+    resume: bool = True
 ):
     """
     Background job for syncing Gmail receipts
@@ -61,6 +62,8 @@ def sync_gmail_receipts_job(
         from_date: Start date (YYYY-MM-DD)
         to_date: End date (YYYY-MM-DD)
         months_back: Months to go back for full backfill
+        resume: Continue the business's last unfinished run with the same
+            parameters (killed worker, RQ retry, paused run) instead of starting over
     """
     # 🔥 CRITICAL: Log IMMEDIATELY when job starts (before any imports/setup)
     print(f"=" * 70)
@@ -101,6 +104,7 @@ def sync_gmail_receipts_job(
     try:
         from server.models_sql import db, ReceiptSyncRun
         from server.services.gmail_sync_service import sync_gmail_receipts
+        from server.services.gmail_sync_engine import find_resumable_sync_run
     except ImportError as e:
         error_msg = f"Import failed: {str(e)}"
         logger.error(f"❌ JOB IMPORT ERROR: {e}")
@@ -163,19 +167,30 @@ def sync_gmail_receipts_job(
         logger.info(f"  → RUN_TO_COMPLETION: {RUN_TO_COMPLETION}")
         logger.info("=" * 60)
         
-        # Create sync run record
-        sync_run = ReceiptSyncRun(
-            business_id=business_id,
-            mode=mode,
-            status='running',
-            started_at=datetime.now(timezone.utc),
-            last_heartbeat_at=datetime.now(timezone.utc)
-        )
-        db.session.add(sync_run)
-        db.session.commit()
-        
-        run_id = sync_run.id
-        logger.info(f"✓ Created sync run record: run_id={run_id}")
+        # Resume the last unfinished run (we hold the lock, so it is not live) or create one
+        sync_run = find_resumable_sync_run(business_id, mode, from_date, to_date, months_back) if resume else None
+        if sync_run:
+            sync_run.status = 'running'
+            sync_run.finished_at = None
+            sync_run.error_message = None
+            sync_run.last_heartbeat_at = datetime.now(timezone.utc)
+            db.session.commit()
+            
+            run_id = sync_run.id
+            logger.info(f"✓ Resuming sync run record: run_id={run_id}, messages_scanned={sync_run.messages_scanned}")
+        else:
+            sync_run = ReceiptSyncRun(
+                business_id=business_id,
+                mode=mode,
+                status='running',
+                started_at=datetime.now(timezone.utc),
+                last_heartbeat_at=datetime.now(timezone.utc)
+            )
+            db.session.add(sync_run)
+            db.session.commit()
+            
+            run_id = sync_run.id
+            logger.info(f"✓ Created sync run record: run_id={run_id}")
         
         # Heartbeat updater function
         last_heartbeat = time.time()
@@ -270,12 +285,13 @@ def sync_gmail_receipts_job(
                 sync_run=sync_run  # Pass existing sync_run to avoid duplicates
             )
         
-        # Update sync run with results
-        sync_run.status = 'completed'
+        # Update sync run with results (a paused run keeps its status and checkpoint for the next job)
+        if sync_run.status not in ('paused', 'cancelled'):
+            sync_run.status = 'completed'
         sync_run.finished_at = datetime.now(timezone.utc)
         sync_run.messages_scanned = result.get('messages_scanned', 0)
         sync_run.saved_receipts = result.get('saved_receipts', 0)
-        sync_run.errors_count = result.get('errors_count', 0)
+        sync_run.errors_count = result.get('errors', 0)
         db.session.commit()
         
         duration = (sync_run.finished_at - sync_run.started_at).total_seconds()
@@ -288,14 +304,15 @@ def sync_gmail_receipts_job(
         logger.info(f"  → duration: {duration:.1f}s")
         logger.info(f"  → messages_scanned: {result.get('messages_scanned', 0)}")
         logger.info(f"  → saved_receipts: {result.get('saved_receipts', 0)}")
-        logger.info(f"  → errors_count: {result.get('errors_count', 0)}")
+        logger.info(f"  → errors_count: {result.get('errors', 0)}")
         logger.info("=" * 60)
         
         return {
             "success": True,
             "messages_scanned": result.get('messages_scanned', 0),
             "saved_receipts": result.get('saved_receipts', 0),
-            "errors_count": result.get('errors_count', 0)
+            "errors_count": result.get('errors', 0),
+            "status": sync_run.status
         }
         
     except Exception as e:
@@ -0,0 +1,31 @@
+"""
+TTS Prewarm Job
+Synthesizes a business's greeting / closing sentence / fixed phrases into the
+TTS audio cache so the first call after a prompt or voice change plays cached audio
+"""
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+def prewarm_tts_job(business_id: int):
+    """
+    Prewarm the TTS cache for one business.
+    
+    Args:
+        business_id: Business whose phrases to synthesize
+    
+    Returns:
+        dict: Summary of the prewarm (phrases / cached / synthesized / failed)
+    """
+    logger.info(f"[TTS-PREWARM-JOB] Starting (business_id={business_id})")
+    from server.services.tts_cache import prewarm_business
+    
+    summary = prewarm_business(business_id)
+    return {
+        'status': 'success' if not summary['failed'] else 'partial',
+        'business_id': business_id,
+        **summary,
+        'timestamp': datetime.utcnow().isoformat()
+    }
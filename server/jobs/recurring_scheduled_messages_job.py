@@ -4,9 +4,11 @@ Runs every hour to check for recurring schedule rules and create messages for le
 """
 import logging
 from datetime import datetime
+from sqlalchemy import inspect
 from server.db import db
 from server.models_sql import ScheduledMessageRule, Lead, LeadStatus, Business, ScheduledMessagesQueue
 from server.services import scheduled_messages_service
+from server.services.due_scheduler import schedule_scheduled_messages
 from server.agent_tools.phone_utils import normalize_phone
 
 logger = logging.getLogger(__name__)
@@ -82,6 +84,7 @@ def recurring_scheduled_messages_job():
                 logger.info(f"[RECURRING-MSG-JOB] Rule {rule.id} - found {len(leads)} lead(s) in target statuses")
                 
                 # Create messages for each lead
+                rule_entries = []
                 for lead in leads:
                     try:
                         # Determine WhatsApp JID
@@ -156,6 +159,7 @@ def recurring_scheduled_messages_job():
                         )
                         
                         db.session.add(queue_entry)
+                        rule_entries.append(queue_entry)
                         messages_created += 1
                         
                         logger.info(f"[RECURRING-MSG-JOB] Created message for lead {lead.id} ({lead.name})")
@@ -165,8 +169,14 @@ def recurring_scheduled_messages_job():
                         db.session.rollback()
                         continue
                 
-                # Commit after processing each rule
+                # Commit after processing each rule (flush first to capture IDs for the due index).
+                # A per-lead rollback expunges the entries added before it - only the ones
+                # still persistent get committed, so only those go into the due index.
+                db.session.flush()
+                due_entries = [(entry.id, entry.scheduled_for) for entry in rule_entries
+                               if entry.id is not None and inspect(entry).persistent]
                 db.session.commit()
+                schedule_scheduled_messages(due_entries)
                 logger.info(f"[RECURRING-MSG-JOB] Rule {rule.id} - created {messages_created} message(s)")
                 
             except Exception as e:
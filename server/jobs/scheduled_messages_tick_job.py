@@ -9,6 +9,52 @@ from server.services.jobs import enqueue
 logger = logging.getLogger(__name__)
 
 
+def enqueue_claimed_messages(messages) -> tuple:
+    """
+    Enqueue claimed messages to the send_scheduled_whatsapp_job worker.
+    
+    Shared by the tick job and the due-index dispatcher (due_scheduler).
+    Messages that fail to enqueue are marked as failed.
+    
+    Returns:
+        (enqueued_count, failed_count)
+    """
+    from server.jobs.send_scheduled_whatsapp_job import send_scheduled_whatsapp_job
+    
+    enqueued_count = 0
+    failed_count = 0
+    for message in messages:
+        try:
+            logger.info(f"[SCHEDULED-MSG-TICK] Enqueuing message {message.id} for lead {message.lead_id}, business {message.business_id}")
+            
+            # Enqueue to RQ worker
+            job = enqueue(
+                'default',  # Use default queue for WhatsApp messages
+                send_scheduled_whatsapp_job,
+                message_id=message.id,
+                business_id=message.business_id,  # Add business_id for proper tracking
+                job_id=f"scheduled_wa_{message.id}",
+                timeout=300,  # 5 minutes timeout
+                retry=None,  # Don't auto-retry (we'll handle failures)
+                ttl=3600,  # 1 hour TTL
+                description=f"Send scheduled WhatsApp to lead {message.lead_id}"
+            )
+            
+            enqueued_count += 1
+            logger.info(f"[SCHEDULED-MSG-TICK] ✅ Enqueued message {message.id} as job {job.id}")
+            
+        except Exception as e:
+            failed_count += 1
+            logger.error(f"[SCHEDULED-MSG-TICK] ❌ Failed to enqueue message {message.id}: {e}", exc_info=True)
+            # Mark as failed
+            try:
+                scheduled_messages_service.mark_failed(message.id, f"Failed to enqueue: {str(e)}")
+            except Exception as mark_err:
+                logger.error(f"[SCHEDULED-MSG-TICK] Could not mark message {message.id} as failed: {mark_err}")
+    
+    return enqueued_count, failed_count
+
+
 def scheduled_messages_tick_job():
     """
     Scheduler job that runs every minute to process pending scheduled messages
@@ -35,40 +81,7 @@ def scheduled_messages_tick_job():
         
         logger.info(f"[SCHEDULED-MSG-TICK] ✅ Claimed {len(messages)} message(s) ready to send")
         
-        # Enqueue each message to worker
-        enqueued_count = 0
-        failed_count = 0
-        for message in messages:
-            try:
-                # Import the job function
-                from server.jobs.send_scheduled_whatsapp_job import send_scheduled_whatsapp_job
-                
-                logger.info(f"[SCHEDULED-MSG-TICK] Enqueuing message {message.id} for lead {message.lead_id}, business {message.business_id}")
-                
-                # Enqueue to RQ worker
-                job = enqueue(
-                    'default',  # Use default queue for WhatsApp messages
-                    send_scheduled_whatsapp_job,
-                    message_id=message.id,
-                    business_id=message.business_id,  # Add business_id for proper tracking
-                    job_id=f"scheduled_wa_{message.id}",
-                    timeout=300,  # 5 minutes timeout
-                    retry=None,  # Don't auto-retry (we'll handle failures)
-                    ttl=3600,  # 1 hour TTL
-                    description=f"Send scheduled WhatsApp to lead {message.lead_id}"
-                )
-                
-                enqueued_count += 1
-                logger.info(f"[SCHEDULED-MSG-TICK] ✅ Enqueued message {message.id} as job {job.id}")
-                
-            except Exception as e:
-                failed_count += 1
-                logger.error(f"[SCHEDULED-MSG-TICK] ❌ Failed to enqueue message {message.id}: {e}", exc_info=True)
-                # Mark as failed
-                try:
-                    scheduled_messages_service.mark_failed(message.id, f"Failed to enqueue: {str(e)}")
-                except Exception as mark_err:
-                    logger.error(f"[SCHEDULED-MSG-TICK] Could not mark message {message.id} as failed: {mark_err}")
+        enqueued_count, failed_count = enqueue_claimed_messages(messages)
         
         logger.info(f"[SCHEDULED-MSG-TICK] ✅ Successfully enqueued {enqueued_count}/{len(messages)} message(s), failed={failed_count}")
         
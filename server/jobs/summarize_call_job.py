@@ -6,13 +6,15 @@ Runs after transcription is complete and handles chunking for very long transcri
 """
 import logging
 import os
-import openai
 from datetime import datetime
 from server.app_factory import get_process_app
 from server.db import db
+from server.services.lazy_services import lazy_module
 
 logger = logging.getLogger(__name__)
 
+openai = lazy_module("openai")  # OpenAI SDK is imported on first use
+
 # Configuration constants
 MIN_TRANSCRIPT_LENGTH = 100  # Minimum transcript length to attempt summarization
 CHUNK_SIZE = 2500  # Characters per chunk for long transcripts
@@ -0,0 +1,41 @@
+"""
+Webhook Delivery Job
+
+Sends due rows of the webhook outbox (server/services/webhook_delivery.py)
+with pooled connections and bounded concurrency per endpoint host.
+
+Enqueued on 'default' when a webhook is queued and no delivery job is
+pending, and by the scheduler when rows came due with no job running.
+"""
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def webhook_delivery_job():
+    """
+    Deliver due webhooks. Runs at most WEBHOOK_DELIVERY_MAX_SECONDS, then
+    re-enqueues itself; retries due within a few seconds of the outbox running
+    dry get a fresh job instead of waiting for the scheduler.
+    """
+    from server.services.webhook_delivery import (
+        IDLE_WAIT_SECONDS, deliver_due, enqueue_delivery, maybe_prune, next_due_in, wake_delivery,
+    )
+
+    stats = deliver_due()
+    if stats['status'] == 'yield':
+        enqueue_delivery()
+        return stats
+
+    due_in = next_due_in()
+    if due_in is not None and due_in <= IDLE_WAIT_SECONDS:
+        time.sleep(due_in)
+        wake_delivery()
+    else:
+        try:
+            maybe_prune()
+        except Exception as e:
+            logger.warning(f"[WEBHOOK-DELIVERY] Outbox prune failed: {e}")
+    logger.info(f"[WEBHOOK-DELIVERY] {stats}")
+    return stats
@@ -0,0 +1,28 @@
+"""
+WhatsApp Ingest Drain Job
+
+Processes one partition of the Baileys ingest streams
+(server/services/whatsapp_ingest.py) in arrival order: bulk dedupe + insert
+via routes_whatsapp.process_baileys_messages, then the appointment check and
+AI response job per new message.
+
+Enqueued on 'high' by the webhook when it wakes a partition, and by the
+scheduler for partitions left with entries but no drain job.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def whatsapp_ingest_drain_job(partition: int):
+    """
+    Drain a partition until its stream is empty. Runs at most
+    WA_INGEST_DRAIN_MAX_SECONDS, then re-enqueues itself so one busy partition
+    does not hold a worker indefinitely.
+    """
+    from server.services.whatsapp_ingest import drain_partition, enqueue_drain
+
+    stats = drain_partition(partition)
+    if stats['status'] == 'yield':
+        enqueue_drain(partition)
+    return stats
@@ -38,12 +38,24 @@ ADVANCED VERSION WITH TURN-TAKING, BARGE-IN, AND LOOP PREVENTION
 
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 """
-import os, json, time, base64, audioop, math, threading, queue, random, zlib, asyncio, re, unicodedata, uuid, sys
+import os, json, time, base64, math, threading, queue, random, zlib, asyncio, re, unicodedata, uuid, sys
 import builtins
 from collections import deque
 from dataclasses import dataclass
 from typing import Optional
-from server.services.mulaw_fast import mulaw_to_pcm16_fast
+from server.services.mulaw_fast import (
+    ulaw_decode,
+    ulaw_encode,
+    b64_mulaw_decode,
+    resample_pcm16,
+    ratecv_fast,
+    pcm16_rms,
+    pcm16_peak,
+)
+from server.services.audio_ring_buffer import PCMRingBuffer, FrameRingQueue, tx_item_size
+from server.services.call_event_loop import get_shared_call_loop, is_async_engine_enabled
+from server.services.frame_pacer import FramePacer
+from server.services.media_bridge import MediaFrame
 from server.services.appointment_nlp import extract_appointment_request
 from server.services.hebrew_stt_validator import validate_stt_output, is_gibberish, load_hebrew_lexicon
 from server.config.voices import DEFAULT_VOICE, OPENAI_VOICES, REALTIME_VOICES  # 🎤 Voice Library
@@ -136,7 +148,8 @@ _event_loop_rate_limiter = RateLimiter()
 
 _now_ms = lambda: int(time.time() * 1000)
 
-def emit_turn_metrics(first_partial, final_ms, tts_ready, total, barge_in=False, eou_reason="unknown"):
+def emit_turn_metrics(first_partial=None, final_ms=None, tts_ready=None, total=None, barge_in=False,
+                      eou_reason="unknown", pacer=None):
     """
     ⚡ PHASE 1: Emit turn latency metrics (non-blocking, uses async logger)
     
@@ -145,6 +158,13 @@ def emit_turn_metrics(first_partial, final_ms, tts_ready, total, barge_in=False,
     - STT_FINAL_MS: Time to final/EOU
     - TTS_READY_MS: Time until TTS audio is ready
     - TOTAL_LATENCY_MS: Time until first audio frame sent
+    
+    Outbound pacing (pacer = FramePacer turn counters, see frame_pacer.py):
+    - TX_JITTER_P50_MS / TX_JITTER_P99_MS / TX_JITTER_MAX_MS: send time vs 20ms timeline
+    - TX_LATE_FRAMES: frames sent >5ms after their slot
+    - TX_RESYNCS: timeline re-anchored (fell too far behind to catch up)
+    - TX_UNDERRUNS: TX queue ran dry mid-turn
+    - TX_QUEUE_DEPTH_AVG / TX_QUEUE_DEPTH_MAX: frames waiting behind each send
     """
     payload = {
         "STT_FIRST_PARTIAL_MS": first_partial,
@@ -154,6 +174,18 @@ def emit_turn_metrics(first_partial, final_ms, tts_ready, total, barge_in=False,
         "BARGE_IN_HIT": barge_in,
         "EOU_REASON": eou_reason
     }
+    if pacer:
+        payload.update({
+            "TX_FRAMES": pacer["frames"],
+            "TX_JITTER_P50_MS": pacer["jitter_p50_ms"],
+            "TX_JITTER_P99_MS": pacer["jitter_p99_ms"],
+            "TX_JITTER_MAX_MS": pacer["jitter_max_ms"],
+            "TX_LATE_FRAMES": pacer["late_frames"],
+            "TX_RESYNCS": pacer["resyncs"],
+            "TX_UNDERRUNS": pacer["underruns"],
+            "TX_QUEUE_DEPTH_AVG": pacer["queue_depth_avg"],
+            "TX_QUEUE_DEPTH_MAX": pacer["queue_depth_max"],
+        })
     logging.getLogger("turn").info(json.dumps(payload, ensure_ascii=False))
 
 # 🔥 BUILD 186: DISABLED Google Streaming STT - Use OpenAI Realtime API or Whisper!
@@ -1960,8 +1992,15 @@ class MediaStreamHandler:
         # 🔥 FIX: Guard against double-close websocket error
         self._ws_closed = False
         
+        # 🚀 ASYNC CALL ENGINE: TX pacer / audio-out / watchdogs run as tasks on the
+        # shared per-process loop instead of per-call threads (CALLS_ENGINE_MODE=async)
+        self._async_engine = is_async_engine_enabled()
+        
         # 🔧 תאימות WebSocket - EventLet vs RFC6455 עם טיפול שגיאות
-        if hasattr(ws, 'send'):
+        if self._async_engine and hasattr(ws, 'send_nowait'):
+            # TX runs on the shared loop - sends must never wait on another loop
+            self._ws_send_method = ws.send_nowait
+        elif hasattr(ws, 'send'):
             self._ws_send_method = ws.send
         else:
             # אם אין send, נסה send_text או כל שיטה אחרת
@@ -2018,7 +2057,8 @@ class MediaStreamHandler:
         self.tx = 0
         
         # 🎯 פתרון פשוט ויעיל לניהול תורות
-        self.buf = bytearray()
+        # Preallocated ring (MAX_UTT_SEC + 1s headroom) - no per-frame reallocation
+        self.buf = PCMRingBuffer(capacity=int((MAX_UTT_SEC + 1.0) * 2 * SR))
         self.last_rx = None
         self.speaking = False           # האם הבוט מדבר כרגע
         self.processing = False         # האם מעבד מבע כרגע
@@ -2084,9 +2124,16 @@ class MediaStreamHandler:
         # 400 frames = 8s buffer - prevents mid-sentence audio cutting
         # OpenAI sends audio in bursts, larger queue prevents drops while TX catches up
         # Combined with backpressure (blocking put), this eliminates speech cuts
-        self.tx_q = queue.Queue(maxsize=400)  # 400 frames = 8s buffer
+        # Preallocated slot ring with queue.Queue API + per-call memory accounting
+        self.tx_q = FrameRingQueue(maxsize=400, sizeof=tx_item_size)  # 400 frames = 8s buffer
         self.tx_running = False
-        self.tx_thread = threading.Thread(target=self._tx_loop, daemon=True)
+        # Absolute 20ms timeline + per-call / per-turn jitter counters
+        self._tx_pacer = FramePacer(interval=AUDIO_CONFIG["frame_pacing_ms"] / 1000.0)
+        if self._async_engine:
+            # CallTask has the Thread surface (start / is_alive / join / ident)
+            self.tx_thread = get_shared_call_loop().task(self._tx_loop_async, name="TX")
+        else:
+            self.tx_thread = threading.Thread(target=self._tx_loop, daemon=True)
         self._last_overflow_log = 0.0  # For throttled logging
         self._audio_gap_recovery_active = False  # 🔥 BUILD 181: Gap recovery state
         
@@ -2133,7 +2180,11 @@ class MediaStreamHandler:
         # ✅ Use imported queue module (at top of file) - NOT queue_module alias
         import queue as _queue_module  # Local import to avoid shadowing
         self.realtime_audio_in_queue = _queue_module.Queue(maxsize=1000)  # Twilio → Realtime
-        self.realtime_audio_out_queue = _queue_module.Queue(maxsize=1000)  # Realtime → Twilio
+        if self._async_engine:
+            # Same queue API + awaitable get_async for the audio-out task on the shared loop
+            self.realtime_audio_out_queue = FrameRingQueue(maxsize=1000)  # Realtime → Twilio
+        else:
+            self.realtime_audio_out_queue = _queue_module.Queue(maxsize=1000)  # Realtime → Twilio
         self.realtime_text_input_queue = _queue_module.Queue(maxsize=10)  # DTMF/text → Realtime
         self.realtime_greeting_queue = _queue_module.Queue(maxsize=1)  # Greeting → Realtime
         self.realtime_stop_flag = False  # Signal to stop Realtime threads
@@ -2559,6 +2610,22 @@ class MediaStreamHandler:
         self._silence_watchdog_running = True  # Flag to control watchdog thread
         self._silence_watchdog_task = None  # Asyncio task for silence monitoring
 
+    def _audio_memory_stats(self) -> dict:
+        """
+        Per-call audio buffer accounting (utterance ring + TX frame ring)
+        
+        Returns:
+            dict with 'allocated_bytes' total plus per-buffer stats
+        """
+        utterance = self.buf.memory_stats()
+        tx = self.tx_q.memory_stats()
+        # TX slots hold references; payload bytes are the live cost
+        return {
+            "allocated_bytes": utterance["allocated_bytes"] + tx["queued_bytes"],
+            "utterance": utterance,
+            "tx": tx,
+        }
+    
     def _check_queue_backlog(self, queue, queue_name: str, threshold: int = 200) -> None:
         """
         🔥 Helper method to monitor queue backlog and log warnings
@@ -2610,15 +2677,11 @@ class MediaStreamHandler:
         Args:
             provider: The AI provider ('gemini' or 'openai')
         """
-        def watchdog_thread():
-            import time
-            
-            # Set timeout based on provider
-            # Gemini needs longer grace period due to audio processing pipeline
-            timeout_sec = 8.0 if provider == 'gemini' else 2.5
-            
-            time.sleep(timeout_sec)  # Wait for timeout
-            
+        # Set timeout based on provider
+        # Gemini needs longer grace period due to audio processing pipeline
+        timeout_sec = 8.0 if provider == 'gemini' else 2.5
+        
+        def check_first_audio():
             # Check if first audio has arrived
             first_audio_received = getattr(self, '_greeting_audio_started_logged', False)
             first_audio_enqueued = getattr(self, '_first_audio_out_enqueued', False)  # Gemini milestone
@@ -2688,6 +2751,19 @@ class MediaStreamHandler:
                 # Audio arrived successfully
                 logger.info(f"✅ [AUDIO_WATCHDOG] First audio received within {timeout_sec}s (provider={provider})")
         
+        if self._async_engine:
+            # Timer task on the shared loop - check only reads flags and logs (non-blocking)
+            async def watchdog_task():
+                await asyncio.sleep(timeout_sec)
+                check_first_audio()
+            
+            get_shared_call_loop().task(watchdog_task, name="AudioWatchdog").start()
+            return
+        
+        def watchdog_thread():
+            time.sleep(timeout_sec)  # Wait for timeout
+            check_first_audio()
+        
         # Start watchdog thread
         watchdog = threading.Thread(target=watchdog_thread, daemon=True, name="AudioWatchdog")
         watchdog.start()
@@ -3271,17 +3347,26 @@ class MediaStreamHandler:
         
         🔥 REALTIME STABILITY: Enhanced exception handling with REALTIME_FATAL logging
         """
+        asyncio.run(self._run_realtime_mode())
+    
+    async def _run_realtime_mode(self):
+        """
+        Realtime session with REALTIME_FATAL handling
+        
+        Thread engine: asyncio.run() on the call's realtime thread.
+        Async engine: a task on the shared call loop (no thread, no loop per call).
+        """
         call_id = self.call_sid[:8] if self.call_sid else "unknown"
         
         # 🔥 CRITICAL: Unconditional logs at the very top
         _orig_print(f"🚀 [REALTIME] _run_realtime_mode_thread ENTERED for call {call_id} (FRESH SESSION)", flush=True)
         logger.debug(f"[REALTIME] _run_realtime_mode_thread ENTERED for call {call_id}")
         logger.debug(f"[REALTIME] Thread started for call {call_id}")
-        logger.debug(f"[REALTIME] About to run asyncio.run(_run_realtime_mode_async)...")
+        logger.debug(f"[REALTIME] About to run _run_realtime_mode_async...")
         
         try:
-            asyncio.run(self._run_realtime_mode_async())
-            logger.debug(f"[REALTIME] asyncio.run completed normally for call {call_id}")
+            await self._run_realtime_mode_async()
+            logger.debug(f"[REALTIME] _run_realtime_mode_async completed normally for call {call_id}")
         except Exception as e:
             # ═══════════════════════════════════════════════════════════════════════
             # 🔥 REALTIME_FATAL: Critical exception in realtime thread
@@ -3655,7 +3740,8 @@ class MediaStreamHandler:
             
             # 🔥 PERFORMANCE: Load call cache once at start (replaces ~17 queries during call)
             if not self.call_ctx_loaded:
-                self.call_ctx = self._load_call_context_batch(
+                self.call_ctx = await self._run_blocking(
+                    self._load_call_context_batch,
                     self.call_sid,
                     business_id_safe,
                     lead_id=getattr(self, 'outbound_lead_id', None)
@@ -3865,7 +3951,8 @@ class MediaStreamHandler:
                 phone_number = getattr(self, 'phone_number', None) or getattr(self, 'caller_number', None)
                 
                 # Call resolution with all available identifiers
-                resolved_name, name_source = _resolve_customer_name(
+                resolved_name, name_source = await self._run_blocking(
+                    _resolve_customer_name,
                     self.call_sid, 
                     business_id_safe,
                     lead_id=lead_id,
@@ -3881,65 +3968,68 @@ class MediaStreamHandler:
                         outbound_lead_name = resolved_name
                     
                     # 🆕 GENDER + NOTES: Also fetch gender and notes from same Lead for context
-                    try:
-                        from server.models_sql import Lead, LeadNote
-                        app = _get_flask_app()
-                        with app.app_context():
-                            lead_for_context = None
+                    def _fetch_lead_context():
+                        try:
+                            from server.models_sql import Lead, LeadNote
+                            app = _get_flask_app()
+                            with app.app_context():
+                                lead_for_context = None
                             
-                            # Try to find Lead by same identifiers used for name resolution
-                            if lead_id:
-                                lead_for_context = Lead.query.filter_by(id=lead_id, tenant_id=business_id_safe).first()
-                            elif phone_number:
-                                # Generate phone variants for lookup
-                                phone_variants = [phone_number]
-                                cleaned = phone_number.replace('+', '').replace('-', '').replace(' ', '')
-                                if phone_number.startswith('+972'):
-                                    phone_variants.append('0' + cleaned[3:])
-                                elif phone_number.startswith('0'):
-                                    phone_variants.append('+972' + cleaned[1:])
+                                # Try to find Lead by same identifiers used for name resolution
+                                if lead_id:
+                                    lead_for_context = Lead.query.filter_by(id=lead_id, tenant_id=business_id_safe).first()
+                                elif phone_number:
+                                    # Generate phone variants for lookup
+                                    phone_variants = [phone_number]
+                                    cleaned = phone_number.replace('+', '').replace('-', '').replace(' ', '')
+                                    if phone_number.startswith('+972'):
+                                        phone_variants.append('0' + cleaned[3:])
+                                    elif phone_number.startswith('0'):
+                                        phone_variants.append('+972' + cleaned[1:])
                                 
-                                lead_for_context = Lead.query.filter_by(
-                                    tenant_id=business_id_safe
-                                ).filter(
-                                    Lead.phone_e164.in_(phone_variants)
-                                ).order_by(Lead.updated_at.desc()).first()
+                                    lead_for_context = Lead.query.filter_by(
+                                        tenant_id=business_id_safe
+                                    ).filter(
+                                        Lead.phone_e164.in_(phone_variants)
+                                    ).order_by(Lead.updated_at.desc()).first()
                             
-                            if lead_for_context:
-                                # Fetch gender
-                                if lead_for_context.gender:
-                                    self.pending_customer_gender = lead_for_context.gender
-                                    logger.info(f"✅ [GENDER] Fetched from Lead: '{lead_for_context.gender}' (lead_id={lead_for_context.id})")
+                                if lead_for_context:
+                                    # Fetch gender
+                                    if lead_for_context.gender:
+                                        self.pending_customer_gender = lead_for_context.gender
+                                        logger.info(f"✅ [GENDER] Fetched from Lead: '{lead_for_context.gender}' (lead_id={lead_for_context.id})")
                                 
-                                # 🔥 NEW: Fetch lead notes (last 3 notes for context)
-                                # Notes provide critical context about customer history, preferences, issues
-                                try:
-                                    recent_notes = LeadNote.query.filter_by(
-                                        lead_id=lead_for_context.id,
-                                        tenant_id=business_id_safe
-                                    ).order_by(LeadNote.created_at.desc()).limit(3).all()
+                                    # 🔥 NEW: Fetch lead notes (last 3 notes for context)
+                                    # Notes provide critical context about customer history, preferences, issues
+                                    try:
+                                        recent_notes = LeadNote.query.filter_by(
+                                            lead_id=lead_for_context.id,
+                                            tenant_id=business_id_safe
+                                        ).order_by(LeadNote.created_at.desc()).limit(3).all()
                                     
-                                    if recent_notes:
-                                        # Combine notes into single context string
-                                        notes_parts = []
-                                        for note in recent_notes:
-                                            if note.content and note.content.strip():
-                                                # Truncate each note to 150 chars for efficiency
-                                                note_text = note.content.strip()[:150]
-                                                if len(note.content.strip()) > 150:
-                                                    note_text += "..."
-                                                notes_parts.append(note_text)
+                                        if recent_notes:
+                                            # Combine notes into single context string
+                                            notes_parts = []
+                                            for note in recent_notes:
+                                                if note.content and note.content.strip():
+                                                    # Truncate each note to 150 chars for efficiency
+                                                    note_text = note.content.strip()[:150]
+                                                    if len(note.content.strip()) > 150:
+                                                        note_text += "..."
+                                                    notes_parts.append(note_text)
                                         
-                                        if notes_parts:
-                                            combined_notes = " | ".join(notes_parts)
-                                            self.pending_lead_notes = combined_notes
-                                            logger.info(f"✅ [NOTES] Fetched {len(notes_parts)} notes from Lead (lead_id={lead_for_context.id})")
-                                            logger.info(f"📝 [NOTES] Preview: {combined_notes[:100]}...")
-                                except Exception as notes_err:
-                                    logger.warning(f"[NOTES] Failed to fetch notes: {notes_err}")
-                                    logger.error(f"⚠️ [NOTES] Error fetching notes: {notes_err}")
-                    except Exception as e:
-                        logger.warning(f"[CONTEXT] Failed to fetch lead context (gender/notes): {e}")
+                                            if notes_parts:
+                                                combined_notes = " | ".join(notes_parts)
+                                                self.pending_lead_notes = combined_notes
+                                                logger.info(f"✅ [NOTES] Fetched {len(notes_parts)} notes from Lead (lead_id={lead_for_context.id})")
+                                                logger.info(f"📝 [NOTES] Preview: {combined_notes[:100]}...")
+                                    except Exception as notes_err:
+                                        logger.warning(f"[NOTES] Failed to fetch notes: {notes_err}")
+                                        logger.error(f"⚠️ [NOTES] Error fetching notes: {notes_err}")
+                        except Exception as e:
+                            logger.warning(f"[CONTEXT] Failed to fetch lead context (gender/notes): {e}")
+                    
+                    await self._run_blocking(_fetch_lead_context)
                     
                     # 🔥 DEBUG LOG: Show what we resolved
                     logger.debug(f"🎯 [NAME_ANCHOR DEBUG] Resolved from DB ({call_direction}):")
@@ -4007,11 +4097,10 @@ class MediaStreamHandler:
                 logger.debug(f"🔍 [PROMPT_DEBUG] Missing prebuilt for call_direction={call_direction}")
                 # Build fresh from DB
                 # 🔥 CRITICAL: Wrap in app_context for DB queries in async context
-                app = _get_flask_app()
-                with app.app_context():
-                    from server.services.realtime_prompt_builder import build_realtime_system_prompt
-                    caller_phone = getattr(self, 'phone_number', None) or getattr(self, 'caller_number', None)
-                    full_prompt = build_realtime_system_prompt(business_id_safe, call_direction=call_direction, use_cache=True, caller_phone=caller_phone)
+                from server.services.realtime_prompt_builder import build_realtime_system_prompt
+                caller_phone = getattr(self, 'phone_number', None) or getattr(self, 'caller_number', None)
+                full_prompt = await self._run_in_app_context(
+                    build_realtime_system_prompt, business_id_safe, call_direction=call_direction, use_cache=True, caller_phone=caller_phone)
             else:
                 logger.info(f"🚀 [PROMPT] Using PRE-BUILT FULL prompt from registry (LATENCY-FIRST)")
                 logger.info(f"   └─ FULL: {len(full_prompt)} chars (sent ONCE at start)")
@@ -4025,11 +4114,10 @@ class MediaStreamHandler:
                     
                     # Rebuild with correct direction
                     # 🔥 CRITICAL: Wrap in app_context for DB queries in async context
-                    app = _get_flask_app()
-                    with app.app_context():
-                        from server.services.realtime_prompt_builder import build_realtime_system_prompt
-                        caller_phone = getattr(self, 'phone_number', None) or getattr(self, 'caller_number', None)
-                        full_prompt = build_realtime_system_prompt(business_id_safe, call_direction=call_direction, use_cache=False, caller_phone=caller_phone)
+                    from server.services.realtime_prompt_builder import build_realtime_system_prompt
+                    caller_phone = getattr(self, 'phone_number', None) or getattr(self, 'caller_number', None)
+                    full_prompt = await self._run_in_app_context(
+                        build_realtime_system_prompt, business_id_safe, call_direction=call_direction, use_cache=False, caller_phone=caller_phone)
                     logger.info(f"   ✅ Rebuilt prompt: {len(full_prompt)} chars")
                 else:
                     logger.info(f"✅ [PROMPT_VERIFY] Pre-built prompt matches call direction: {call_direction}")
@@ -4082,7 +4170,7 @@ class MediaStreamHandler:
                     # Last resort: Load from DB (should not happen if START handler worked correctly)
                     try:
                         from server.models_sql import Business
-                        business = Business.query.get(business_id_safe)
+                        business = await self._run_in_app_context(lambda: Business.query.get(business_id_safe))
                         if business:
                             business_voice = getattr(business, 'voice_id', DEFAULT_VOICE) or DEFAULT_VOICE
                             # Validate voice is in allowed list
@@ -4140,7 +4228,7 @@ class MediaStreamHandler:
             
             try:
                 logger.debug(f"[REALTIME] Building tools for call...")
-                realtime_tools = self._build_realtime_tools_for_call()
+                realtime_tools = await self._run_blocking(self._build_realtime_tools_for_call)
                 logger.debug(f"[REALTIME] Tools built successfully: count={len(realtime_tools)}")
                 
                 if realtime_tools:
@@ -4361,21 +4449,11 @@ class MediaStreamHandler:
                         # Priority 1: Check database for saved gender (fallback if pending not available)
                         if not customer_gender:
                             try:
-                                from server.models_sql import CallLog, Lead
-                                app = _get_flask_app()
-                                with app.app_context():
-                                    call_log = CallLog.query.filter_by(call_sid=self.call_sid).first()
-                                    lead = None
-                                    
-                                    if call_log and call_log.lead_id:
-                                        lead = Lead.query.get(call_log.lead_id)
-                                    elif hasattr(self, 'outbound_lead_id') and self.outbound_lead_id:
-                                        lead = Lead.query.get(self.outbound_lead_id)
-                                    
-                                    if lead and lead.gender:
-                                        customer_gender = lead.gender
-                                        logger.info(f"[GENDER_DETECT] Using saved gender from database: {customer_gender} (Lead {lead.id})")
-                                        logger.info(f"🧠 [GENDER] Using saved: {customer_gender} from Lead {lead.id}")
+                                lead = await self._run_blocking(self._lookup_call_lead)
+                                if lead and lead['gender']:
+                                    customer_gender = lead['gender']
+                                    logger.info(f"[GENDER_DETECT] Using saved gender from database: {customer_gender} (Lead {lead['id']})")
+                                    logger.info(f"🧠 [GENDER] Using saved: {customer_gender} from Lead {lead['id']}")
                             except Exception as e:
                                 logger.warning(f"[GENDER_DETECT] Error checking database gender: {e}")
                         
@@ -4868,7 +4946,7 @@ class MediaStreamHandler:
                                 auth_token = os.environ.get('TWILIO_AUTH_TOKEN')
                                 if account_sid and auth_token:
                                     twilio_client = TwilioClient(account_sid, auth_token)
-                                    twilio_client.calls(self.call_sid).update(status='completed')
+                                    await self._run_blocking(twilio_client.calls(self.call_sid).update, status='completed')
                                     logger.info(f"✅ [BUILD 332] Twilio call {self.call_sid} terminated via API!")
                             except Exception as e:
                                 logger.warning(f"⚠️ [BUILD 332] Could not terminate call via Twilio API: {e}")
@@ -4907,15 +4985,12 @@ class MediaStreamHandler:
                     # ✅ AUDIO VALIDATION A: Input to Gemini (Twilio → Gemini)
                     # Gemini expects PCM16 at 16kHz, mono with proper frame alignment
                     
-                    # Step 0: Decode base64 string to raw μ-law bytes (audio_chunk is base64-encoded)
-                    mulaw_bytes = base64.b64decode(audio_chunk)
-                    
-                    # Step 1: Convert μ-law 8kHz (160 bytes/20ms) to PCM16 8kHz (320 bytes/20ms)
-                    pcm16_8k = mulaw_to_pcm16_fast(mulaw_bytes)
+                    # Step 0+1: Fused base64 decode + μ-law 8kHz (160 bytes/20ms) → PCM16 8kHz samples
+                    pcm16_8k = b64_mulaw_decode(audio_chunk)
                     
                     # Step 2: Resample from 8kHz to 16kHz for Gemini (320 bytes→640 bytes/20ms)
-                    # audioop.ratecv preserves 20ms frame duration by doubling samples
-                    pcm16_16k, state = audioop.ratecv(pcm16_8k, 2, 1, 8000, 16000, None)
+                    # resample_pcm16 is bit-exact with audioop.ratecv(..., None)
+                    pcm16_16k = resample_pcm16(pcm16_8k, 8000, 16000).tobytes()
                     
                     # 🔥 FIX: Buffer and align to exact chunk sizes (640, 1280, 1920...)
                     # Add to buffer
@@ -5105,7 +5180,6 @@ class MediaStreamHandler:
             # Gemini can send partial frames (e.g., 47 bytes) that aren't aligned to PCM16 boundaries
             # Buffer accumulates chunks until we have complete frames to process
             try:
-                import audioop
                 import base64
                 
                 # Validate audio_bytes is actually bytes
@@ -5157,11 +5231,11 @@ class MediaStreamHandler:
                 # ✅ AUDIO VALIDATION B: Output from Gemini (Gemini → Twilio)
                 # Gemini outputs PCM16 at 24kHz, we need μ-law at 8kHz for Twilio
                 # Step 1: Resample from 24kHz to 8kHz (3:1 ratio - reduces samples by 66%)
-                # audioop.ratecv requires aligned frames - now guaranteed by buffer logic above
-                pcm16_8k = audioop.ratecv(audio_to_convert, 2, 1, 24000, 8000, None)[0]
+                # ratecv requires aligned frames - now guaranteed by buffer logic above
+                pcm16_8k = resample_pcm16(audio_to_convert, 24000, 8000)
                 
                 # Step 2: Convert PCM16 to μ-law (each sample becomes 1 byte)
-                mulaw_bytes = audioop.lin2ulaw(pcm16_8k, 2)
+                mulaw_bytes = ulaw_encode(pcm16_8k).tobytes()
                 
                 # Step 3: 🔥 CRITICAL FIX: Break into proper 20ms frames (160 bytes μ-law each)
                 # As per audio contract requirement: Twilio needs constant 20ms pacing
@@ -5772,20 +5846,10 @@ class MediaStreamHandler:
                 
                 # Priority 1: Check database for saved gender
                 try:
-                    from server.models_sql import CallLog, Lead
-                    app = _get_flask_app()
-                    with app.app_context():
-                        call_log = CallLog.query.filter_by(call_sid=self.call_sid).first()
-                        lead = None
-                        
-                        if call_log and call_log.lead_id:
-                            lead = Lead.query.get(call_log.lead_id)
-                        elif hasattr(self, 'outbound_lead_id') and self.outbound_lead_id:
-                            lead = Lead.query.get(self.outbound_lead_id)
-                        
-                        if lead and lead.gender:
-                            customer_gender = lead.gender
-                            logger.info(f"[GENDER_DETECT] Using saved gender from database: {customer_gender} (Lead {lead.id})")
+                    lead = await self._run_blocking(self._lookup_call_lead)
+                    if lead and lead['gender']:
+                        customer_gender = lead['gender']
+                        logger.info(f"[GENDER_DETECT] Using saved gender from database: {customer_gender} (Lead {lead['id']})")
                 except Exception as e:
                     logger.warning(f"[GENDER_DETECT] Error checking database gender: {e}")
                 
@@ -7949,60 +8013,47 @@ class MediaStreamHandler:
                         if detected_gender and self.call_sid:
                             # Gender detected from conversation! Update Lead in database
                             try:
-                                from server.models_sql import CallLog, Lead
-                                app = _get_flask_app()
-                                with app.app_context():
-                                    # Find the lead associated with this call
-                                    call_log = CallLog.query.filter_by(call_sid=self.call_sid).first()
-                                    lead = None
+                                lead = await self._run_blocking(self._lookup_call_lead)
+                                if lead:
+                                    # Buffer gender update (will commit at call end)
+                                    old_gender = lead['gender']
+                                    self.db_write_queue.append({
+                                        'type': 'lead_update',
+                                        'lead_id': lead['id'],
+                                        'updates': {'gender': detected_gender}
+                                    })
+                                    logger.info(f"[DB_BUFFER] Queued gender update for lead {lead['id']}: {detected_gender}")
                                     
-                                    if call_log and call_log.lead_id:
-                                        lead = Lead.query.get(call_log.lead_id)
-                                    elif hasattr(self, 'outbound_lead_id') and self.outbound_lead_id:
-                                        # Outbound call - use outbound_lead_id
-                                        lead = Lead.query.get(self.outbound_lead_id)
+                                    logger.info(f"[GENDER_CONVERSATION] Detected gender for lead {lead['id']}: {old_gender} → {detected_gender} (buffered)")
+                                    logger.info(f"🧠 [GENDER] Detected from conversation: {detected_gender} (will save at call end)")
                                     
-                                    if lead:
-                                        # Buffer gender update (will commit at call end)
-                                        old_gender = lead.gender
-                                        lead.gender = detected_gender
-                                        self.db_write_queue.append({
-                                            'type': 'lead_update',
-                                            'lead_id': lead.id,
-                                            'updates': {'gender': detected_gender}
-                                        })
-                                        logger.info(f"[DB_BUFFER] Queued gender update for lead {lead.id}: {detected_gender}")
-                                        
-                                        logger.info(f"[GENDER_CONVERSATION] Detected gender for lead {lead.id}: {old_gender} → {detected_gender} (buffered)")
-                                        logger.info(f"🧠 [GENDER] Detected from conversation: {detected_gender} (will save at call end)")
+                                    # Re-inject NAME_ANCHOR with updated gender
+                                    if hasattr(self, '_name_anchor_customer_name') and self._name_anchor_customer_name:
+                                        from server.services.realtime_prompt_builder import build_name_anchor_message
+                                        use_policy = getattr(self, '_name_anchor_policy', False)
+                                        lead_notes = getattr(self, 'pending_lead_notes', None)  # 🔥 NEW: Get notes
+                                        updated_anchor = build_name_anchor_message(
+                                            self._name_anchor_customer_name, 
+                                            use_policy, 
+                                            detected_gender,
+                                            lead_notes  # 🔥 NEW: Pass notes
+                                        )
                                         
-                                        # Re-inject NAME_ANCHOR with updated gender
-                                        if hasattr(self, '_name_anchor_customer_name') and self._name_anchor_customer_name:
-                                            from server.services.realtime_prompt_builder import build_name_anchor_message
-                                            use_policy = getattr(self, '_name_anchor_policy', False)
-                                            lead_notes = getattr(self, 'pending_lead_notes', None)  # 🔥 NEW: Get notes
-                                            updated_anchor = build_name_anchor_message(
-                                                self._name_anchor_customer_name, 
-                                                use_policy, 
-                                                detected_gender,
-                                                lead_notes  # 🔥 NEW: Pass notes
-                                            )
-                                            
-                                            # Send updated context to AI
-                                            try:
-                                                await client.send_event({
-                                                    "type": "conversation.item.create",
-                                                    "item": {
-                                                        "type": "message",
-                                                        "role": "system",
-                                                        "content": [{"type": "input_text", "text": updated_anchor}]
-                                                    }
-                                                })
-                                                logger.info(f"🧠 [GENDER] Updated AI context with detected gender")
-                                            except Exception as e:
-                                                logger.warning(f"[GENDER_CONVERSATION] Failed to update AI context: {e}")
-                                    else:
-                                        logger.debug(f"[GENDER_CONVERSATION] No lead found for call_sid {self.call_sid[:8]}")
+                                        # Send updated context to AI
+                                        try:
+                                            await client.send_event({
+                                                "type": "conversation.item.create",
+                                                "item": {
+                                                    "type": "message",
+                                                    "role": "system",
+                                                    "content": [{"type": "input_text", "text": updated_anchor}]
+                                                }
+                                            })
+                                            logger.info(f"🧠 [GENDER] Updated AI context with detected gender")
+                                        except Exception as e:
+                                            logger.warning(f"[GENDER_CONVERSATION] Failed to update AI context: {e}")
+                                else:
+                                    logger.debug(f"[GENDER_CONVERSATION] No lead found for call_sid {self.call_sid[:8]}")
                             except Exception as e:
                                 logger.error(f"[GENDER_CONVERSATION] Error updating gender: {e}")
                                 logger.exception("Full traceback:")
@@ -8017,51 +8068,37 @@ class MediaStreamHandler:
                         if detected_name and self.call_sid:
                             # Name detected from conversation! Update Lead in database
                             try:
-                                from server.models_sql import CallLog, Lead
-                                app = _get_flask_app()
-                                with app.app_context():
-                                    # Find the lead associated with this call
-                                    call_log = CallLog.query.filter_by(call_sid=self.call_sid).first()
-                                    lead = None
-                                    
-                                    if call_log and call_log.lead_id:
-                                        lead = Lead.query.get(call_log.lead_id)
-                                    elif hasattr(self, 'outbound_lead_id') and self.outbound_lead_id:
-                                        # Outbound call - use outbound_lead_id
-                                        lead = Lead.query.get(self.outbound_lead_id)
+                                lead = await self._run_blocking(self._lookup_call_lead)
+                                if lead:
+                                    # Only update if lead doesn't have a name or has placeholder name
+                                    current_name = f"{lead['first_name'] or ''} {lead['last_name'] or ''}".strip()
+                                    should_update = (
+                                        not current_name or 
+                                        current_name in ['Customer', 'לקוח', 'ללא שם'] or
+                                        current_name.startswith('לקוח מטלפון')
+                                    )
                                     
-                                    if lead:
-                                        # Only update if lead doesn't have a name or has placeholder name
-                                        current_name = f"{lead.first_name or ''} {lead.last_name or ''}".strip()
-                                        should_update = (
-                                            not current_name or 
-                                            current_name in ['Customer', 'לקוח', 'ללא שם'] or
-                                            current_name.startswith('לקוח מטלפון')
-                                        )
+                                    if should_update:
+                                        # Buffer name update (will commit at call end)
+                                        old_name = current_name or 'None'
+                                        self.db_write_queue.append({
+                                            'type': 'lead_update',
+                                            'lead_id': lead['id'],
+                                            'updates': {'first_name': detected_name, 'last_name': None}
+                                        })
+                                        logger.info(f"[DB_BUFFER] Queued name update for lead {lead['id']}: '{detected_name}'")
                                         
-                                        if should_update:
-                                            # Buffer name update (will commit at call end)
-                                            old_name = current_name or 'None'
-                                            lead.first_name = detected_name
-                                            lead.last_name = None  # Clear last name since we only extract first name
-                                            self.db_write_queue.append({
-                                                'type': 'lead_update',
-                                                'lead_id': lead.id,
-                                                'updates': {'first_name': detected_name, 'last_name': None}
-                                            })
-                                            logger.info(f"[DB_BUFFER] Queued name update for lead {lead.id}: '{detected_name}'")
-                                            
-                                            logger.info(f"[NAME_CONVERSATION] Detected name for lead {lead.id}: '{old_name}' → '{detected_name}' (buffered)")
-                                            logger.info(f"📝 [NAME] Detected from conversation: '{detected_name}' (will save at call end)")
-                                            
-                                            # Update CRM context if it exists
-                                            if hasattr(self, 'crm_context') and self.crm_context:
-                                                self.crm_context.customer_name = detected_name
-                                                logger.info(f"📝 [NAME] Updated CRM context with detected name")
-                                        else:
-                                            logger.debug(f"[NAME_CONVERSATION] Lead {lead.id} already has valid name '{current_name}' - not overriding")
+                                        logger.info(f"[NAME_CONVERSATION] Detected name for lead {lead['id']}: '{old_name}' → '{detected_name}' (buffered)")
+                                        logger.info(f"📝 [NAME] Detected from conversation: '{detected_name}' (will save at call end)")
+                                        
+                                        # Update CRM context if it exists
+                                        if hasattr(self, 'crm_context') and self.crm_context:
+                                            self.crm_context.customer_name = detected_name
+                                            logger.info(f"📝 [NAME] Updated CRM context with detected name")
                                     else:
-                                        logger.debug(f"[NAME_CONVERSATION] No lead found for call_sid {self.call_sid[:8]}")
+                                        logger.debug(f"[NAME_CONVERSATION] Lead {lead['id']} already has valid name '{current_name}' - not overriding")
+                                else:
+                                    logger.debug(f"[NAME_CONVERSATION] No lead found for call_sid {self.call_sid[:8]}")
                             except Exception as e:
                                 logger.error(f"[NAME_CONVERSATION] Error updating name: {e}")
                                 logger.exception("Full traceback:")
@@ -9875,8 +9912,7 @@ class MediaStreamHandler:
             self.realtime_tx_bytes = 0
         
         # 🔥 PART C: Track first frame for diagnostics
-        _first_frame_logged = False
-        _frames_skipped_no_stream_sid = 0
+        chunk_state = {"first_frame_logged": False, "frames_skipped_no_stream_sid": 0}
         
         # 🎯 PROBE 4: Queue Flow Probe - Track enqueue rate every 1 second
         _enqueue_rate_counter = 0
@@ -9885,12 +9921,7 @@ class MediaStreamHandler:
         TWILIO_FRAME_SIZE = 160  # 20ms at 8kHz μ-law
         audio_buffer = b''  # Rolling buffer for incomplete frames
         
-        # 🔥 GEMINI FIX: Provider-aware startup logging
-        ai_provider = getattr(self, '_ai_provider', 'openai')
-        if ai_provider == 'gemini':
-            _orig_print(f"🔊 [AUDIO_OUT_LOOP] Started - waiting for GEMINI audio", flush=True)
-        else:
-            _orig_print(f"🔊 [AUDIO_OUT_LOOP] Started - waiting for OpenAI audio", flush=True)
+        self._audio_out_log_start()
         
         # 🔥 FIX #1: Continue until queue is empty OR sentinel received
         # 🔥 SESSION LIFECYCLE: Also check self.closed to exit immediately on session close
@@ -9914,33 +9945,8 @@ class MediaStreamHandler:
                 # 🎯 PROBE 4: Count frames dequeued from realtime_audio_out_queue
                 _enqueue_rate_counter += 1
                 
-                import base64
                 chunk_bytes = base64.b64decode(audio_b64)
-                self.realtime_tx_bytes += len(chunk_bytes)
-                
-                # 🔥 PART C: Log first frame and stream_sid state
-                if not _first_frame_logged:
-                    _orig_print(f"🔊 [AUDIO_OUT_LOOP] FIRST_CHUNK received! bytes={len(chunk_bytes)}, stream_sid={self.stream_sid}", flush=True)
-                    
-                    # 🔥 LARGE CHUNK WARNING: Flag if first chunk is abnormally large
-                    # Normal Gemini chunks should be ~1000-5000 bytes. >20000 suggests buffering issue
-                    if len(chunk_bytes) > 20000:
-                        logger.warning(f"⚠️ [AUDIO_OUT_LOOP] LARGE FIRST CHUNK: {len(chunk_bytes)} bytes - may indicate buffering/pacing issue")
-                        _orig_print(f"⚠️ [AUDIO_OUT_LOOP] Abnormally large first chunk ({len(chunk_bytes)} bytes) - will slice to 20ms frames", flush=True)
-                    
-                    _first_frame_logged = True
-                
-                # 🔥 RECORDING TRIGGER: Start recording when first audio sent (from TX loop flag)
-                # This is done here in background thread, NOT in TX loop itself
-                if getattr(self, '_first_audio_sent', False) and not getattr(self, '_recording_started', False):
-                    self._recording_started = True
-                    _orig_print(f"✅ [AUDIO_OUT_LOOP] Starting recording (triggered by FIRST_AUDIO_SENT flag)", flush=True)
-                    threading.Thread(target=self._start_call_recording, daemon=True).start()
-                
-                if not self.stream_sid:
-                    _frames_skipped_no_stream_sid += 1
-                    if _frames_skipped_no_stream_sid <= 3 or _frames_skipped_no_stream_sid % 50 == 0:
-                        _orig_print(f"⚠️ [AUDIO_OUT_LOOP] Skipping frame - no stream_sid (skipped={_frames_skipped_no_stream_sid})", flush=True)
+                if not self._audio_out_accept_chunk(chunk_bytes, chunk_state):
                     continue
                 
                 audio_buffer += chunk_bytes
@@ -9949,58 +9955,33 @@ class MediaStreamHandler:
                     frame_bytes = audio_buffer[:TWILIO_FRAME_SIZE]
                     audio_buffer = audio_buffer[TWILIO_FRAME_SIZE:]
                     
-                    frame_b64 = base64.b64encode(frame_bytes).decode('utf-8')
                     twilio_frame = {
                         "event": "media",
                         "streamSid": self.stream_sid,
-                        "media": {"payload": frame_b64}
+                        "media": {"payload": base64.b64encode(frame_bytes).decode('utf-8')}
                     }
                     
                     # ═══════════════════════════════════════════════════════════════════════
                     # 🔥 AUDIO BACKPRESSURE FIX: Pacing + Blocking put with timeout
                     # This prevents mid-sentence audio cutting by waiting instead of dropping frames
                     # ═══════════════════════════════════════════════════════════════════════
-                    # Get queue state once to avoid redundant system calls
                     queue_size = self.tx_q.qsize()
-                    queue_maxsize = self.tx_q.maxsize  # 400 frames = 8s
-                    
-                    # Thresholds for backpressure control
-                    PACING_THRESHOLD = 0.6  # Start pacing at 60% full
-                    BACKPRESSURE_THRESHOLD = 0.8  # Log warnings at 80% full
-                    
-                    pacing_threshold = int(queue_maxsize * PACING_THRESHOLD)  # 240 frames
-                    backpressure_threshold = int(queue_maxsize * BACKPRESSURE_THRESHOLD)  # 320 frames
-                    
-                    # Apply pacing when queue ≥60% full to slow production to TX rate
-                    if queue_size >= pacing_threshold:
+                    if self._audio_out_needs_pacing(queue_size):
                         time.sleep(0.02)  # 20ms = match TX loop pace (50 FPS)
                     
-                    # Log when queue is getting high (throttled)
-                    if queue_size >= backpressure_threshold:
-                        now = time.time()
-                        if not hasattr(self, '_last_backpressure_log') or now - self._last_backpressure_log > 5:
-                            logger.info(f"⏸️ [BACKPRESSURE] Queue high ({queue_size}/{queue_maxsize}), applying backpressure (blocking put)")
-                            self._last_backpressure_log = now
-                    
                     # 🔥 FIX: Use blocking put() with timeout instead of put_nowait()
                     # This applies true backpressure - we wait for TX to catch up instead of dropping frames
                     try:
                         self.tx_q.put(twilio_frame, timeout=0.5)  # Wait up to 500ms for space
                         self.realtime_tx_frames += 1
                     except queue.Full:
-                        # Queue is STILL full after 500ms timeout - this is exceptional
-                        # Only happens if TX thread is stalled/dead
-                        now = time.time()
-                        if not hasattr(self, '_last_full_error') or now - self._last_full_error > 5:
-                            logger.warning(f"⚠️ [AUDIO BACKPRESSURE TIMEOUT] Queue full for >500ms ({queue_size}/{queue_maxsize}) - TX thread may be stalled!")
-                            self._last_full_error = now
                         # Drop this ONE frame only as emergency measure
-                        pass
+                        self._audio_out_log_put_timeout(queue_size)
                     
             except queue.Empty:
                 # 🔥 FIX #1: If stop flag is set and queue is empty, we're done draining
                 if self.realtime_stop_flag:
-                    _orig_print(f"🔊 [AUDIO_OUT_LOOP] Stop flag set, queue empty - drain complete", flush=True)
+                    _orig_print("🔊 [AUDIO_OUT_LOOP] Stop flag set, queue empty - drain complete", flush=True)
                     break
                 continue
             except Exception as e:
@@ -10010,6 +9991,142 @@ class MediaStreamHandler:
         # 🔥 FIX #1: Log drain completion
         remaining = self.realtime_audio_out_queue.qsize()
         _orig_print(f"🔊 [AUDIO_OUT_LOOP] Exiting - frames_enqueued={self.realtime_tx_frames}, remaining_in_queue={remaining}", flush=True)
+    
+    async def _realtime_audio_out_loop_async(self):
+        """
+        🚀 ASYNC CALL ENGINE: _realtime_audio_out_loop as a task on the shared call loop
+        
+        Same slicing / backpressure as the thread version; waits with
+        get_async / put_async / asyncio.sleep instead of blocking the loop.
+        """
+        if not hasattr(self, 'realtime_tx_frames'):
+            self.realtime_tx_frames = 0
+        if not hasattr(self, 'realtime_tx_bytes'):
+            self.realtime_tx_bytes = 0
+        
+        chunk_state = {"first_frame_logged": False, "frames_skipped_no_stream_sid": 0}
+        TWILIO_FRAME_SIZE = 160  # 20ms at 8kHz μ-law
+        audio_buffer = b''
+        
+        self._audio_out_log_start()
+        
+        while (not self.realtime_stop_flag or not self.realtime_audio_out_queue.empty()) and not self.closed:
+            try:
+                audio_b64 = await self.realtime_audio_out_queue.get_async(timeout=0.1)
+                if audio_b64 is None:
+                    _orig_print(f"🔊 [AUDIO_OUT_LOOP] Received None sentinel - exiting loop (frames_enqueued={self.realtime_tx_frames})", flush=True)
+                    break
+                
+                chunk_bytes = base64.b64decode(audio_b64)
+                if not self._audio_out_accept_chunk(chunk_bytes, chunk_state):
+                    continue
+                
+                audio_buffer += chunk_bytes
+                
+                while len(audio_buffer) >= TWILIO_FRAME_SIZE:
+                    frame_bytes = audio_buffer[:TWILIO_FRAME_SIZE]
+                    audio_buffer = audio_buffer[TWILIO_FRAME_SIZE:]
+                    
+                    twilio_frame = {
+                        "event": "media",
+                        "streamSid": self.stream_sid,
+                        "media": {"payload": base64.b64encode(frame_bytes).decode('utf-8')}
+                    }
+                    
+                    queue_size = self.tx_q.qsize()
+                    if self._audio_out_needs_pacing(queue_size):
+                        await asyncio.sleep(0.02)
+                    
+                    try:
+                        await self.tx_q.put_async(twilio_frame, timeout=0.5)
+                        self.realtime_tx_frames += 1
+                    except queue.Full:
+                        self._audio_out_log_put_timeout(queue_size)
+                    
+            except queue.Empty:
+                if self.realtime_stop_flag:
+                    _orig_print("🔊 [AUDIO_OUT_LOOP] Stop flag set, queue empty - drain complete", flush=True)
+                    break
+                continue
+            except Exception as e:
+                logger.error(f"[AUDIO] Bridge error: {e}")
+                break
+        
+        remaining = self.realtime_audio_out_queue.qsize()
+        _orig_print(f"🔊 [AUDIO_OUT_LOOP] Exiting - frames_enqueued={self.realtime_tx_frames}, remaining_in_queue={remaining}", flush=True)
+    
+    def _audio_out_log_start(self):
+        # 🔥 GEMINI FIX: Provider-aware startup logging
+        ai_provider = getattr(self, '_ai_provider', 'openai')
+        if ai_provider == 'gemini':
+            _orig_print(f"🔊 [AUDIO_OUT_LOOP] Started - waiting for GEMINI audio", flush=True)
+        else:
+            _orig_print(f"🔊 [AUDIO_OUT_LOOP] Started - waiting for OpenAI audio", flush=True)
+    
+    def _audio_out_accept_chunk(self, chunk_bytes, chunk_state):
+        """
+        Per-chunk bookkeeping for the audio-out bridge
+        
+        Returns:
+            False if the chunk must be skipped (no stream_sid yet)
+        """
+        self.realtime_tx_bytes += len(chunk_bytes)
+        
+        # 🔥 PART C: Log first frame and stream_sid state
+        if not chunk_state["first_frame_logged"]:
+            _orig_print(f"🔊 [AUDIO_OUT_LOOP] FIRST_CHUNK received! bytes={len(chunk_bytes)}, stream_sid={self.stream_sid}", flush=True)
+            
+            # 🔥 LARGE CHUNK WARNING: Flag if first chunk is abnormally large
+            # Normal Gemini chunks should be ~1000-5000 bytes. >20000 suggests buffering issue
+            if len(chunk_bytes) > 20000:
+                logger.warning(f"⚠️ [AUDIO_OUT_LOOP] LARGE FIRST CHUNK: {len(chunk_bytes)} bytes - may indicate buffering/pacing issue")
+                _orig_print(f"⚠️ [AUDIO_OUT_LOOP] Abnormally large first chunk ({len(chunk_bytes)} bytes) - will slice to 20ms frames", flush=True)
+            
+            chunk_state["first_frame_logged"] = True
+        
+        # 🔥 RECORDING TRIGGER: Start recording when first audio sent (from TX loop flag)
+        # This is done here in background thread, NOT in TX loop itself
+        if getattr(self, '_first_audio_sent', False) and not getattr(self, '_recording_started', False):
+            self._recording_started = True
+            _orig_print(f"✅ [AUDIO_OUT_LOOP] Starting recording (triggered by FIRST_AUDIO_SENT flag)", flush=True)
+            threading.Thread(target=self._start_call_recording, daemon=True).start()
+        
+        if not self.stream_sid:
+            chunk_state["frames_skipped_no_stream_sid"] += 1
+            skipped = chunk_state["frames_skipped_no_stream_sid"]
+            if skipped <= 3 or skipped % 50 == 0:
+                _orig_print(f"⚠️ [AUDIO_OUT_LOOP] Skipping frame - no stream_sid (skipped={skipped})", flush=True)
+            return False
+        return True
+    
+    def _audio_out_needs_pacing(self, queue_size):
+        """Backpressure check for the audio-out bridge - True when the producer should wait 20ms"""
+        queue_maxsize = self.tx_q.maxsize  # 400 frames = 8s
+        
+        # Thresholds for backpressure control
+        PACING_THRESHOLD = 0.6  # Start pacing at 60% full
+        BACKPRESSURE_THRESHOLD = 0.8  # Log warnings at 80% full
+        
+        pacing_threshold = int(queue_maxsize * PACING_THRESHOLD)  # 240 frames
+        backpressure_threshold = int(queue_maxsize * BACKPRESSURE_THRESHOLD)  # 320 frames
+        
+        # Log when queue is getting high (throttled)
+        if queue_size >= backpressure_threshold:
+            now = time.time()
+            if not hasattr(self, '_last_backpressure_log') or now - self._last_backpressure_log > 5:
+                logger.info(f"⏸️ [BACKPRESSURE] Queue high ({queue_size}/{queue_maxsize}), applying backpressure (blocking put)")
+                self._last_backpressure_log = now
+        
+        # Apply pacing when queue ≥60% full to slow production to TX rate
+        return queue_size >= pacing_threshold
+    
+    def _audio_out_log_put_timeout(self, queue_size):
+        # Queue is STILL full after 500ms timeout - this is exceptional
+        # Only happens if TX loop is stalled/dead
+        now = time.time()
+        if not hasattr(self, '_last_full_error') or now - self._last_full_error > 5:
+            logger.warning(f"⚠️ [AUDIO BACKPRESSURE TIMEOUT] Queue full for >500ms ({queue_size}/{self.tx_q.maxsize}) - TX thread may be stalled!")
+            self._last_full_error = now
 
     def _calculate_and_log_cost(self):
         """💰 Calculate and log call cost - called at end of every call"""
@@ -10387,44 +10504,16 @@ class MediaStreamHandler:
         """
         import json
         
-        self.call_start_time = time.time()
-        self.rx_frames = 0
-        self.tx_frames = 0
-        
-        # ═══════════════════════════════════════════════════════════════════════════
-        # 🎯 [T0] WS_START - Mark WebSocket open time for timeout calculations
-        # ═══════════════════════════════════════════════════════════════════════════
-        self._ws_open_ts = time.time()
-        _orig_print(f"🎯 [T0] WS_START call_sid=pending ws_open_ts={self._ws_open_ts:.3f}", flush=True)
-        
-        # 🔥 CRITICAL: Unconditional logs at the very top (always printed!)
-        _orig_print(f"🔵 [REALTIME] MediaStreamHandler.run() ENTERED - waiting for START event...", flush=True)
-        logger.debug("[REALTIME] MediaStreamHandler.run() ENTERED - waiting for START event")
-        logger.debug(f"[REALTIME] USE_REALTIME_API={USE_REALTIME_API}, websocket_type={type(self.ws)}")
-        
-        # 🔥 REALTIME STABILITY: Track if START event was received
-        _start_event_received = False
+        self._begin_run()
         
         try:
             while True:
-                # 🔥 BUILD 331: Check if hard limit was exceeded - exit immediately
-                if self._limit_exceeded:
-                    logger.info(f"🛑 [BUILD 331] LIMIT_EXCEEDED flag detected in main loop - exiting immediately")
+                if self._reader_should_stop():
                     break
                 
-                # 🔥 CRITICAL FIX: Check if call ended externally (call_status webhook)
-                # This prevents WebSocket from staying open after call completes
-                if self.call_sid:
-                    session = stream_registry.get(self.call_sid)
-                    if session and session.get('ended'):
-                        end_reason = session.get('end_reason', 'external_signal')
-                        logger.info(f"🛑 [CALL_END] Call ended externally ({end_reason}) - closing WebSocket immediately")
-                        self.hangup_triggered = True
-                        self.call_state = CallState.ENDED
-                        break
-                
                 # COMPATIBILITY: Handle both EventLet and Flask-Sock WebSocket APIs
                 raw = None
+                frame_audio = None
                 try:
                     # Simplified WebSocket handling - no spam logs
                     ws_type = str(type(self.ws))
@@ -10460,11 +10549,15 @@ class MediaStreamHandler:
                         logger.info(f"🛑 [BUILD 331] LIMIT_EXCEEDED after receive - exiting main loop")
                         break
                         
-                    # Handle both string and bytes
-                    if isinstance(raw, bytes):
-                        raw = raw.decode('utf-8')
-                        
-                    evt = json.loads(raw)
+                    if isinstance(raw, MediaFrame):
+                        # ⚡ Decoded once on the event loop (MediaStreamBridge) - JSON and μ-law payload
+                        evt = raw.data
+                        frame_audio = raw.audio
+                    else:
+                        # Handle both string and bytes
+                        if isinstance(raw, bytes):
+                            raw = raw.decode('utf-8')
+                        evt = json.loads(raw)
                     et = evt.get("event")
                     
                 except json.JSONDecodeError as e:
@@ -10481,1064 +10574,1165 @@ class MediaStreamHandler:
                     # Try to continue, might be temporary - don't crash the connection
                     continue
 
-                # ═══════════════════════════════════════════════════════════════════════
-                # 🔥 FIX #1: IMPROVED START TIMEOUT HANDLING - Don't break too early!
-                # ═══════════════════════════════════════════════════════════════════════
-                # Strategy: Warn at timeout, but only break after 2x timeout (5 seconds total)
-                # This handles cases where START is delayed but arrives soon after
-                if not _start_event_received and et != "start":
-                    time_since_open = time.time() - self._ws_open_ts
-                    
-                    # First timeout: Log warning but CONTINUE waiting
-                    if time_since_open > self._twilio_start_timeout_sec and not hasattr(self, '_start_timeout_warning_logged'):
-                        duration_ms = int(time_since_open * 1000)
-                        _orig_print(f"⚠️ [REALTIME] SLOW_START_EVENT - no START after {duration_ms}ms (continuing to wait...)", flush=True)
-                        logger.warning(f"[REALTIME] SLOW_START_EVENT - WebSocket open for {duration_ms}ms without START event (continuing)")
-                        self._start_timeout_warning_logged = True
-                    
-                    # Hard timeout: Only break if START really never arrives (2x timeout = 5s)
-                    if time_since_open > (self._twilio_start_timeout_sec * 2.0):
-                        duration_ms = int(time_since_open * 1000)
-                        _orig_print(f"❌ [REALTIME] NO_START_EVENT_FROM_TWILIO (call_sid=pending, duration={duration_ms}ms) - giving up", flush=True)
-                        logger.warning(f"[REALTIME] NO_START_EVENT_FROM_TWILIO - WebSocket open for {duration_ms}ms without START event - giving up")
-                        
-                        # Mark realtime as failed
-                        self.realtime_failed = True
-                        self._realtime_failure_reason = "NO_START_EVENT"
-                        
-                        # Log metrics and break
-                        logger.debug(f"[METRICS] REALTIME_TIMINGS: openai_connect_ms=0, first_greeting_audio_ms=0, realtime_failed=True, reason=NO_START_EVENT")
-                        _orig_print(f"❌ [REALTIME_FALLBACK] Call pending handled without realtime (reason=NO_START_EVENT_FROM_TWILIO)", flush=True)
-                        break
+                if self._handle_twilio_event(evt, et, frame_audio):
+                    break
 
-                if et == "start":
-                    # 🔥 REALTIME STABILITY: Mark START event as received
-                    _start_event_received = True
-                    start_event_ts = time.time()
-                    start_delay_ms = int((start_event_ts - self._ws_open_ts) * 1000)
-                    
-                    # 🔥 BUILD 169: Generate unique session ID for logging
-                    import uuid
-                    self._call_session_id = f"SES-{uuid.uuid4().hex[:8]}"
-                    
-                    # 🔥 CRITICAL: Unconditional logs - Force print to bypass DEBUG override
-                    _orig_print(f"🎯 [REALTIME] START EVENT RECEIVED! session={self._call_session_id} (delay={start_delay_ms}ms from WS open)", flush=True)
-                    logger.debug(f"[REALTIME] [{self._call_session_id}] START EVENT RECEIVED - entering start handler")
-                    logger.debug(f"[REALTIME] [{self._call_session_id}] Event data keys: {list(evt.keys())}")
-                    
-                    # תמיכה בשני פורמטים: Twilio אמיתי ובדיקות
-                    if "start" in evt:
-                        # Twilio format: {"event": "start", "start": {"streamSid": "...", "callSid": "..."}}
-                        self.stream_sid = evt["start"]["streamSid"]
-                        self.call_sid = (
-                            evt["start"].get("callSid")
-                            or (evt["start"].get("customParameters") or {}).get("CallSid")
-                            or (evt["start"].get("customParameters") or {}).get("call_sid")
-                        )
-                        
-                        # ✅ זיהוי מספרי טלפון מ-customParameters
-                        custom_params = evt["start"].get("customParameters", {})
-                        self.phone_number = (
-                            custom_params.get("From") or
-                            custom_params.get("CallFrom") or  
-                            custom_params.get("from") or
-                            custom_params.get("phone_number")
-                        )
-                        # ✅ CRITICAL FIX: שמירת to_number למזהה עסק
-                        self.to_number = (
-                            evt["start"].get("to") or  # ✅ Twilio sends 'to' at start level
-                            custom_params.get("To") or
-                            custom_params.get("Called") or
-                            custom_params.get("to") or
-                            custom_params.get("called")
-                        )
-                        
-                        # 🔥 BUILD 174: Outbound call parameters
-                        # ⚠️ CRITICAL: call_direction is set ONCE at start and NEVER changed
-                        # 🔥 HARD LOCK: Prevent any attempt to change direction after initial set
-                        incoming_direction = custom_params.get("direction", "inbound")
-                        
-                        # Check if direction was already set (should never happen, but guard against it)
-                        if hasattr(self, 'call_direction') and self.call_direction:
-                            if self.call_direction != incoming_direction:
-                                # 🔥 CRITICAL ERROR: Attempt to change direction after it was set
-                                logger.error(f"❌ [CALL_DIRECTION_LOCK] ERROR: Attempt to change direction!")
-                                logger.info(f"   Current: {self.call_direction}, Attempted: {incoming_direction}")
-                                logger.info(f"   ⛔ BLOCKED - keeping original direction: {self.call_direction}")
-                                _orig_print(f"[ERROR] CALL_DIRECTION_CHANGE_BLOCKED call_sid={self.call_sid[:8]}... current={self.call_direction} attempted={incoming_direction}", flush=True)
-                            else:
-                                logger.info(f"✅ [CALL_DIRECTION_LOCK] Direction already set to {self.call_direction} (no change)")
-                        else:
-                            # First time setting direction - this is the ONLY allowed assignment
-                            self.call_direction = incoming_direction
-                            logger.info(f"🔒 [CALL_DIRECTION_SET] Locked to: {self.call_direction} (IMMUTABLE)")
-                            _orig_print(f"[CALL_DIRECTION_SET] call_sid={self.call_sid[:8]}... direction={self.call_direction} locked=True", flush=True)
-                        
-                        self.outbound_lead_id = custom_params.get("lead_id")
-                        self.outbound_lead_name = custom_params.get("lead_name")
-                        self.outbound_template_id = custom_params.get("template_id")
-                        self.outbound_business_id = custom_params.get("business_id")  # 🔒 SECURITY: Explicit business_id for outbound
-                        self.outbound_business_name = custom_params.get("business_name")
-                        
-                        # 🔥 CRITICAL DEBUG: Log all outbound parameters to verify they arrive
-                        # This proves whether lead_id/phone actually reach media_ws_ai.py
-                        logger.info(f"📞 [OUTBOUND_PARAMS] lead_id_raw={self.outbound_lead_id}, phone={self.phone_number}, call_sid={self.call_sid[:8] if self.call_sid else 'N/A'}...")
-                        logger.info(f"[OUTBOUND_PARAMS] lead_id={self.outbound_lead_id} phone={self.phone_number} call_sid={self.call_sid}")
-                        _orig_print(f"[OUTBOUND_PARAMS] lead_id_raw={self.outbound_lead_id} phone={self.phone_number} call_sid={self.call_sid[:8] if self.call_sid else 'N/A'}...", flush=True)
-                        
-                        # 🔥 DEBUG: Log outbound lead name explicitly
-                        if self.outbound_lead_name:
-                            logger.info(f"✅ [OUTBOUND] Lead name received: '{self.outbound_lead_name}'")
-                        else:
-                            logger.warning(f"⚠️ [OUTBOUND] No lead_name in customParameters!")
-                        
-                        # 🔥 OPTIMIZATION: Pre-load outbound greeting to avoid DB query in async loop
-                        if self.call_direction == "outbound" and self.outbound_template_id and self.outbound_lead_name:
-                            try:
-                                from server.models_sql import OutboundTemplate
-                                template = OutboundTemplate.query.get(self.outbound_template_id)
-                                if template and template.greeting_template:
-                                    biz_name = self.outbound_business_name or "העסק"
-                                    self.outbound_greeting_text = template.greeting_template.replace("{{lead_name}}", self.outbound_lead_name).replace("{{business_name}}", biz_name)
-                                    logger.info(f"✅ [OUTBOUND] Pre-loaded greeting: '{self.outbound_greeting_text[:50]}...'")
-                            except Exception as e:
-                                logger.error(f"⚠️ [OUTBOUND] Failed to pre-load greeting: {e}")
-                        
-                        # 🔍 DEBUG: Log phone numbers and outbound params
-                        logger.info(f"\n📞 START EVENT (customParameters path):")
-                        logger.info(f"   customParams.From: {custom_params.get('From')}")
-                        logger.info(f"   customParams.CallFrom: {custom_params.get('CallFrom')}")
-                        logger.info(f"   ✅ self.phone_number set to: '{self.phone_number}'")
-                        logger.info(f"   ✅ self.to_number set to: '{self.to_number}'")
-                        if self.call_direction == "outbound":
-                            logger.info(f"   📤 OUTBOUND CALL: lead={self.outbound_lead_name}, template={self.outbound_template_id}")
-                        
-                        # 🎯 DYNAMIC LEAD STATE: Add caller phone to lead capture state
-                        if self.phone_number:
-                            self._update_lead_capture_state('phone', self.phone_number)
-                        
-                        # 🔥 SESSION LIFECYCLE: Register handler for webhook-triggered close
-                        if self.call_sid:
-                            _register_handler(self.call_sid, self)
+        except ConnectionClosed as e:
+            logger.info(f"📞 WS_CLOSED sid={self.stream_sid} rx={self.rx} tx={self.tx} reason=ConnectionClosed")
+            # 🔥 SESSION LIFECYCLE: Call atomic close_session
+            self.close_session("ws_connection_closed")
+        except Exception as e:
+            self._record_run_exception(e)
+        finally:
+            self._end_run()
+
+    async def run_async(self):
+        """
+        Shared-loop reader (CALLS_ENGINE_MODE=async) - run() without a thread per call
+        
+        Frames are awaited from the MediaStreamBridge on the shared call loop and
+        handled one at a time, in arrival order. Media of a live realtime session
+        stays on the loop (gates, counters, put_nowait into realtime_audio_in_queue);
+        start / stop / dtmf / mark and legacy-pipeline media query the DB or block,
+        so they run on the loop's blocking pool.
+        """
+        call_loop = get_shared_call_loop()
+        self._begin_run()
+        
+        try:
+            stop = False
+            while not stop:
+                events = await self.ws.receive_batch()
+                if not events:
+                    logger.info("📞 WebSocket connection closed normally")
+                    break
+                
+                for evt, frame_audio in events:
+                    if self._reader_should_stop():
+                        stop = True
+                        break
+                    et = evt.get("event")
+                    if et == "media" and self._realtime_media_inline():
+                        stop = self._handle_twilio_event(evt, et, frame_audio)
                     else:
-                        # Direct format: {"event": "start", "streamSid": "...", "callSid": "..."}
-                        self.stream_sid = evt.get("streamSid")
-                        self.call_sid = evt.get("callSid")
-                        self.phone_number = evt.get("from") or evt.get("phone_number")
-                        self.to_number = evt.get("to") or evt.get("called")
-                        
-                        # 🔥 SESSION LIFECYCLE: Register handler for webhook-triggered close
-                        if self.call_sid:
-                            _register_handler(self.call_sid, self)
-                        
-                        # 🔥 BUILD 174: Outbound call parameters (direct format)
-                        # ⚠️ CRITICAL: call_direction is set ONCE at start and NEVER changed
-                        # 🔥 HARD LOCK: Prevent any attempt to change direction after initial set
-                        incoming_direction = evt.get("direction", "inbound")
-                        
-                        # Check if direction was already set (should never happen, but guard against it)
-                        if hasattr(self, 'call_direction') and self.call_direction:
-                            if self.call_direction != incoming_direction:
-                                # 🔥 CRITICAL ERROR: Attempt to change direction after it was set
-                                logger.error(f"❌ [CALL_DIRECTION_LOCK] ERROR: Attempt to change direction!")
-                                logger.info(f"   Current: {self.call_direction}, Attempted: {incoming_direction}")
-                                logger.info(f"   ⛔ BLOCKED - keeping original direction: {self.call_direction}")
-                                _orig_print(f"[ERROR] CALL_DIRECTION_CHANGE_BLOCKED call_sid={self.call_sid[:8]}... current={self.call_direction} attempted={incoming_direction}", flush=True)
-                            else:
-                                logger.info(f"✅ [CALL_DIRECTION_LOCK] Direction already set to {self.call_direction} (no change)")
-                        else:
-                            # First time setting direction - this is the ONLY allowed assignment
-                            self.call_direction = incoming_direction
-                            logger.info(f"🔒 [CALL_DIRECTION_SET] Locked to: {self.call_direction} (IMMUTABLE)")
-                            _orig_print(f"[CALL_DIRECTION_SET] call_sid={self.call_sid[:8]}... direction={self.call_direction} locked=True", flush=True)
-                        
-                        self.outbound_lead_id = evt.get("lead_id")
-                        self.outbound_lead_name = evt.get("lead_name")
-                        self.outbound_template_id = evt.get("template_id")
-                        self.outbound_business_id = evt.get("business_id")  # 🔒 SECURITY: Explicit business_id for outbound
-                        self.outbound_business_name = evt.get("business_name")
-                        
-                        # 🔥 OPTIMIZATION: Pre-load outbound greeting to avoid DB query in async loop
-                        if self.call_direction == "outbound" and self.outbound_template_id and self.outbound_lead_name:
-                            try:
-                                from server.models_sql import OutboundTemplate
-                                template = OutboundTemplate.query.get(self.outbound_template_id)
-                                if template and template.greeting_template:
-                                    biz_name = self.outbound_business_name or "העסק"
-                                    self.outbound_greeting_text = template.greeting_template.replace("{{lead_name}}", self.outbound_lead_name).replace("{{business_name}}", biz_name)
-                                    logger.info(f"✅ [OUTBOUND] Pre-loaded greeting: '{self.outbound_greeting_text[:50]}...'")
-                            except Exception as e:
-                                logger.error(f"⚠️ [OUTBOUND] Failed to pre-load greeting: {e}")
-                        
-                        # 🔍 DEBUG: Log phone number on start
-                        logger.info(f"\n📞 START EVENT - Phone numbers:")
-                        logger.info(f"   from field: {evt.get('from')}")
-                        logger.info(f"   phone_number field: {evt.get('phone_number')}")
-                        logger.info(f"   ✅ self.phone_number set to: '{self.phone_number}'")
-                        
-                        # 🎯 DYNAMIC LEAD STATE: Add caller phone to lead capture state
-                        if self.phone_number:
-                            self._update_lead_capture_state('phone', self.phone_number)
-                        
-                    self.last_rx_ts = time.time()
-                    self.last_keepalive_ts = time.time()  # ✅ התחל keepalive
-                    self.t0_connected = time.time()  # ⚡ [T0] WebSocket connected
-                    logger.info(f"🎯 [T0={time.time():.3f}] WS_START sid={self.stream_sid} call_sid={self.call_sid} from={self.phone_number} to={getattr(self, 'to_number', 'N/A')} mode={self.mode}")
-                    if self.call_sid:
-                        stream_registry.mark_start(self.call_sid)
-                        
-                        # 🔥 PRODUCTION LOG: [CALL_START] - Always logged (WARNING level)
-                        call_direction = getattr(self, 'call_direction', 'unknown')
-                        business_id = getattr(self, 'business_id', None) or getattr(self, 'outbound_business_id', None) or 'N/A'
-                        logger.warning(f"[CALL_START] call_sid={self.call_sid} biz={business_id} direction={call_direction}")
-                        
-                        # 🔥 GREETING PROFILER: Track WS connect time
-                        stream_registry.set_metric(self.call_sid, 'ws_connect_ts', self.t0_connected)
-                    
-                    # ═══════════════════════════════════════════════════════════════════════
-                    # ⛔ CRITICAL: VALIDATE BUSINESS_ID **BEFORE** STARTING OPENAI SESSION
-                    # This prevents OpenAI charges if business cannot be identified
-                    # ═══════════════════════════════════════════════════════════════════════
-                    logger.debug(f"[REALTIME] START event received: call_sid={self.call_sid}, to_number={getattr(self, 'to_number', 'N/A')}")
-                    
-                    # 🔥 STEP 1: IDENTIFY BUSINESS FIRST (before OpenAI connection)
-                    t_biz_start = time.time()
-                    try:
-                        app = _get_flask_app()
-                        with app.app_context():
-                            business_id, greet = self._identify_business_and_get_greeting()
-                            
-                            # ⛔ CRITICAL: business_id must be set - no fallback to prevent cross-business contamination
-                            if not self.business_id:
-                                if not business_id:
-                                    logger.error(f"❌ CRITICAL: Cannot identify business! call_sid={self.call_sid}, to={self.to_number}")
-                                    _orig_print(f"❌ [BUSINESS_ISOLATION] Call rejected - no business_id for to={self.to_number}", flush=True)
-                                    raise ValueError("CRITICAL: business_id required - call cannot proceed")
-                                self.business_id = business_id
-                            
-                            # ⛔ CRITICAL: Verify business_id is set before continuing
-                            if self.business_id is None:
-                                logger.error(f"❌ CRITICAL: business_id still None after DB query! to={self.to_number}, call_sid={self.call_sid}")
-                                _orig_print(f"❌ [BUSINESS_ISOLATION] Call rejected - business_id=None after query", flush=True)
-                                raise ValueError(f"CRITICAL: Cannot identify business for to_number={self.to_number}")
-                            
-                            business_id_safe = self.business_id
-                            call_direction = getattr(self, 'call_direction', 'inbound')
-                            
-                            # 🔒 LOG BUSINESS ISOLATION: Track which business is handling this call
-                            logger.info(f"[BUSINESS_ISOLATION] call_accepted business_id={business_id_safe} to={self.to_number} call_sid={self.call_sid}")
-                            _orig_print(f"✅ [BUSINESS_ISOLATION] Business validated: {business_id_safe}", flush=True)
-                            
-                            # 🔥 CRITICAL: Load ai_provider and voice BEFORE starting any AI service
-                            # This determines which pipeline to use: OpenAI Realtime OR Gemini (STT→LLM→TTS)
-                            from server.models_sql import Business
-                            from server.config.voice_catalog import is_valid_voice, default_voice
-                            
-                            business = Business.query.get(business_id_safe)
-                            if not business:
-                                logger.error(f"❌ CRITICAL: Business {business_id_safe} not found in DB!")
-                                raise ValueError(f"Business {business_id_safe} not found")
-                            
-                            # Get ai_provider (default to 'openai' if not set)
-                            ai_provider = getattr(business, 'ai_provider', 'openai') or 'openai'
-                            
-                            # Get voice_name from business settings
-                            voice_name = getattr(business, 'voice_name', None)
-                            if not voice_name:
-                                # Fallback to legacy fields
-                                voice_name = getattr(business, 'voice_id', None) or getattr(business, 'tts_voice_id', None)
-                            
-                            # Validate voice matches provider, use default if invalid
-                            if not voice_name or not is_valid_voice(voice_name, ai_provider):
-                                default = default_voice(ai_provider)
-                                if voice_name:
-                                    logger.warning(f"[VOICE_VALIDATION] Invalid voice '{voice_name}' for provider '{ai_provider}' - using default '{default}'")
-                                voice_name = default
-                            
-                            # Store provider and voice in instance for later use
-                            self._ai_provider = ai_provider
-                            self._voice_name = voice_name
-                            
-                            # 🔥 MANDATORY ROUTING LOG: This is the single source of truth for call routing
-                            logger.info(f"[CALL_ROUTING] business={business_id_safe} provider={ai_provider} voice={voice_name} direction={call_direction}")
-                            _orig_print(f"🎯 [CALL_ROUTING] provider={ai_provider} voice={voice_name}", flush=True)
-                            
-                            # 🔥 CRITICAL: Decide which pipeline to use based on ai_provider
-                            # - OpenAI: Use OpenAI Realtime API (bidirectional audio streaming)
-                            # - Gemini: Use Gemini Live API (bidirectional audio streaming) 
-                            # Both providers now use realtime streaming!
-                            use_realtime_for_this_call = True  # ✅ Both OpenAI and Gemini use realtime
-                            self._use_realtime_for_call = use_realtime_for_this_call
-                            
-                            # 🔥 CRITICAL: Set USE_REALTIME_API flag for this handler instance
-                            # This controls behavior throughout the call processing
-                            self._USE_REALTIME_API_OVERRIDE = use_realtime_for_this_call
-                            
-                            if ai_provider == 'gemini':
-                                logger.info(f"[GEMINI_LIVE] Call will use Gemini Live API (realtime audio streaming)")
-                                _orig_print(f"🔷 [GEMINI_LIVE] Realtime streaming enabled", flush=True)
-                            else:
-                                logger.info(f"[OPENAI_PIPELINE] Call will use OpenAI Realtime API")
-                            
-                            # 🔥 PART D: PRE-BUILD FULL BUSINESS prompt here (while we have app context!)
-                            # This eliminates redundant DB query later and enforces prompt separation.
-                            try:
-                                from server.services.realtime_prompt_builder import build_full_business_prompt
-                                self._prebuilt_prompt = build_full_business_prompt(business_id_safe, call_direction=call_direction)
-                                logger.info(f"✅ [PART D] Pre-built FULL BUSINESS prompt: {len(self._prebuilt_prompt)} chars")
-                            except Exception as prompt_err:
-                                logger.error(f"⚠️ [PART D] Failed to pre-build prompt: {prompt_err}")
-                                self._prebuilt_prompt = None  # Async loop will build it as fallback
-                            
-                        t_biz_end = time.time()
-                        logger.info(f"⚡ DB QUERY + PROMPT: business_id={business_id} in {(t_biz_end-t_biz_start)*1000:.0f}ms")
-                        logger.info(f"[CALL DEBUG] Business + prompt ready in {(t_biz_end-t_biz_start)*1000:.0f}ms")
-                        
-                        # 🔥 STEP 2: Now that business is validated, START AI SERVICE BASED ON PROVIDER
-                        # Connection happens ONLY AFTER business_id AND ai_provider are confirmed
-                        use_realtime = getattr(self, '_use_realtime_for_call', True)  # Default to True for safety
-                        logger.debug(f"[CALL_ROUTING] About to check if we should start AI service...")
-                        logger.debug(f"[CALL_ROUTING] ai_provider={getattr(self, '_ai_provider', 'unknown')}, use_realtime={use_realtime}, realtime_thread={getattr(self, 'realtime_thread', None)}")
-                        
-                        if use_realtime and not self.realtime_thread:
-                            logger.debug(f"[REALTIME] Condition passed - About to START realtime thread for call {self.call_sid}")
-                            t_realtime_start = time.time()
-                            delta_from_t0 = (t_realtime_start - self.t0_connected) * 1000
-                            
-                            if ai_provider == 'gemini':
-                                _orig_print(f"🚀 [GEMINI_LIVE] Starting Gemini Live API at T0+{delta_from_t0:.0f}ms (AFTER business validation!)", flush=True)
-                            else:
-                                _orig_print(f"🚀 [REALTIME] Starting OpenAI at T0+{delta_from_t0:.0f}ms (AFTER business validation!)", flush=True)
-                            
-                            logger.debug(f"[REALTIME] Creating realtime thread...")
-                            self.realtime_thread = threading.Thread(
-                                target=self._run_realtime_mode_thread,
-                                daemon=True
-                            )
-                            logger.debug(f"[REALTIME] Starting realtime thread...")
-                            self.realtime_thread.start()
-                            self.background_threads.append(self.realtime_thread)
-                            logger.debug(f"[REALTIME] Realtime thread started successfully!")
-                            
-                            logger.debug(f"[REALTIME] Creating realtime audio out thread...")
-                            # 🔥 NEW: DOUBLE LOOP GUARD - Ensure only ONE audio_out loop per call
-                            if not hasattr(self, '_realtime_audio_out_thread_started'):
-                                realtime_out_thread = threading.Thread(
-                                    target=self._realtime_audio_out_loop,
-                                    daemon=True,
-                                    name=f"AudioOut-{self.call_sid[:8] if self.call_sid else 'unknown'}"
-                                )
-                                realtime_out_thread.start()
-                                self.background_threads.append(realtime_out_thread)
-                                self._realtime_audio_out_thread_started = True
-                                logger.debug(f"[REALTIME] Audio out thread started (thread_id={realtime_out_thread.ident})")
-                            else:
-                                logger.warning(f"[REALTIME] Audio out thread already started - skipping duplicate start")
-                            logger.debug(f"[REALTIME] Both realtime threads started successfully!")
-                        else:
-                            logger.warning(f"[CALL_ROUTING] AI service thread NOT started! use_realtime={use_realtime}, realtime_thread exists={hasattr(self, 'realtime_thread') and self.realtime_thread is not None}")
-                        if not hasattr(self, 'bot_speaks_first'):
-                            self.bot_speaks_first = True
-                        
+                        stop = await call_loop.run_blocking(self._handle_twilio_event, evt, et, frame_audio)
+                    if stop:
+                        break
+        
+        except ConnectionClosed:
+            logger.info(f"📞 WS_CLOSED sid={self.stream_sid} rx={self.rx} tx={self.tx} reason=ConnectionClosed")
+            await call_loop.run_blocking(self.close_session, "ws_connection_closed")
+        except Exception as e:
+            self._record_run_exception(e)
+        finally:
+            await call_loop.run_blocking(self._end_run)
+
+    async def _run_blocking(self, func, *args, **kwargs):
+        """
+        DB / REST call from the realtime session
+
+        Async engine: on the shared loop's blocking pool (the loop must never block).
+        Thread engine: inline, the session already owns its thread and loop.
+        """
+        if self._async_engine:
+            return await get_shared_call_loop().run_blocking(func, *args, **kwargs)
+        return func(*args, **kwargs)
+
+    async def _run_in_app_context(self, func, *args, **kwargs):
+        """_run_blocking inside a Flask app context (pool threads have none)"""
+        def call():
+            with _get_flask_app().app_context():
+                return func(*args, **kwargs)
+        return await self._run_blocking(call)
+
+    def _lookup_call_lead(self):
+        """
+        Lead of this call: CallLog.lead_id, else outbound_lead_id
+
+        Returns {id, first_name, last_name, gender} or None. Plain values, so the
+        result outlives the app context (and the pool thread) it was read in.
+        """
+        from server.models_sql import CallLog, Lead
+        with _get_flask_app().app_context():
+            call_log = CallLog.query.filter_by(call_sid=self.call_sid).first()
+            lead = None
+            if call_log and call_log.lead_id:
+                lead = Lead.query.get(call_log.lead_id)
+            elif getattr(self, 'outbound_lead_id', None):
+                lead = Lead.query.get(self.outbound_lead_id)
+            if not lead:
+                return None
+            return {
+                'id': lead.id,
+                'first_name': lead.first_name,
+                'last_name': lead.last_name,
+                'gender': lead.gender,
+            }
+
+    def _realtime_media_inline(self) -> bool:
+        """Media of a live realtime session only touches per-call state and queues (never blocks)"""
+        use_realtime_for_this_call = getattr(self, '_USE_REALTIME_API_OVERRIDE', USE_REALTIME_API)
+        return bool(use_realtime_for_this_call and self.realtime_thread and self.realtime_thread.is_alive())
+
+    def _begin_run(self):
+        """Per-connection setup shared by run() and run_async()"""
+        self.call_start_time = time.time()
+        self.rx_frames = 0
+        self.tx_frames = 0
+        
+        # ═══════════════════════════════════════════════════════════════════════════
+        # 🎯 [T0] WS_START - Mark WebSocket open time for timeout calculations
+        # ═══════════════════════════════════════════════════════════════════════════
+        self._ws_open_ts = time.time()
+        _orig_print(f"🎯 [T0] WS_START call_sid=pending ws_open_ts={self._ws_open_ts:.3f}", flush=True)
+        
+        # 🔥 CRITICAL: Unconditional logs at the very top (always printed!)
+        _orig_print(f"🔵 [REALTIME] MediaStreamHandler.run() ENTERED - waiting for START event...", flush=True)
+        logger.debug("[REALTIME] MediaStreamHandler.run() ENTERED - waiting for START event")
+        logger.debug(f"[REALTIME] USE_REALTIME_API={USE_REALTIME_API}, websocket_type={type(self.ws)}")
+        
+        # 🔥 REALTIME STABILITY: Track if START event was received
+        self._start_event_received = False
+
+    def _reader_should_stop(self) -> bool:
+        """Checked before every inbound frame: usage limit hit, or call ended externally"""
+        # 🔥 BUILD 331: Check if hard limit was exceeded - exit immediately
+        if self._limit_exceeded:
+            logger.info(f"🛑 [BUILD 331] LIMIT_EXCEEDED flag detected in main loop - exiting immediately")
+            return True
+        
+        # 🔥 CRITICAL FIX: Check if call ended externally (call_status webhook)
+        # This prevents WebSocket from staying open after call completes
+        if self.call_sid:
+            session = stream_registry.get(self.call_sid)
+            if session and session.get('ended'):
+                end_reason = session.get('end_reason', 'external_signal')
+                logger.info(f"🛑 [CALL_END] Call ended externally ({end_reason}) - closing WebSocket immediately")
+                self.hangup_triggered = True
+                self.call_state = CallState.ENDED
+                return True
+        return False
+
+    def _handle_twilio_event(self, evt, et, frame_audio=None) -> bool:
+        """
+        One Twilio media-stream event (start / media / dtmf / mark / stop)
+        
+        Shared by the thread reader (run) and the shared-loop reader (run_async).
+        Returns True when the reader should stop.
+        """
+        # ═══════════════════════════════════════════════════════════════════════
+        # 🔥 FIX #1: IMPROVED START TIMEOUT HANDLING - Don't break too early!
+        # ═══════════════════════════════════════════════════════════════════════
+        # Strategy: Warn at timeout, but only break after 2x timeout (5 seconds total)
+        # This handles cases where START is delayed but arrives soon after
+        if not self._start_event_received and et != "start":
+            time_since_open = time.time() - self._ws_open_ts
+            
+            # First timeout: Log warning but CONTINUE waiting
+            if time_since_open > self._twilio_start_timeout_sec and not hasattr(self, '_start_timeout_warning_logged'):
+                duration_ms = int(time_since_open * 1000)
+                _orig_print(f"⚠️ [REALTIME] SLOW_START_EVENT - no START after {duration_ms}ms (continuing to wait...)", flush=True)
+                logger.warning(f"[REALTIME] SLOW_START_EVENT - WebSocket open for {duration_ms}ms without START event (continuing)")
+                self._start_timeout_warning_logged = True
+            
+            # Hard timeout: Only break if START really never arrives (2x timeout = 5s)
+            if time_since_open > (self._twilio_start_timeout_sec * 2.0):
+                duration_ms = int(time_since_open * 1000)
+                _orig_print(f"❌ [REALTIME] NO_START_EVENT_FROM_TWILIO (call_sid=pending, duration={duration_ms}ms) - giving up", flush=True)
+                logger.warning(f"[REALTIME] NO_START_EVENT_FROM_TWILIO - WebSocket open for {duration_ms}ms without START event - giving up")
+                
+                # Mark realtime as failed
+                self.realtime_failed = True
+                self._realtime_failure_reason = "NO_START_EVENT"
+                
+                # Log metrics and break
+                logger.debug(f"[METRICS] REALTIME_TIMINGS: openai_connect_ms=0, first_greeting_audio_ms=0, realtime_failed=True, reason=NO_START_EVENT")
+                _orig_print(f"❌ [REALTIME_FALLBACK] Call pending handled without realtime (reason=NO_START_EVENT_FROM_TWILIO)", flush=True)
+                return True
+
+        if et == "start":
+            # 🔥 REALTIME STABILITY: Mark START event as received
+            self._start_event_received = True
+            start_event_ts = time.time()
+            start_delay_ms = int((start_event_ts - self._ws_open_ts) * 1000)
+            
+            # 🔥 BUILD 169: Generate unique session ID for logging
+            import uuid
+            self._call_session_id = f"SES-{uuid.uuid4().hex[:8]}"
+            
+            # 🔥 CRITICAL: Unconditional logs - Force print to bypass DEBUG override
+            _orig_print(f"🎯 [REALTIME] START EVENT RECEIVED! session={self._call_session_id} (delay={start_delay_ms}ms from WS open)", flush=True)
+            logger.debug(f"[REALTIME] [{self._call_session_id}] START EVENT RECEIVED - entering start handler")
+            logger.debug(f"[REALTIME] [{self._call_session_id}] Event data keys: {list(evt.keys())}")
+            
+            # תמיכה בשני פורמטים: Twilio אמיתי ובדיקות
+            if "start" in evt:
+                # Twilio format: {"event": "start", "start": {"streamSid": "...", "callSid": "..."}}
+                self.stream_sid = evt["start"]["streamSid"]
+                self.call_sid = (
+                    evt["start"].get("callSid")
+                    or (evt["start"].get("customParameters") or {}).get("CallSid")
+                    or (evt["start"].get("customParameters") or {}).get("call_sid")
+                )
+                
+                # ✅ זיהוי מספרי טלפון מ-customParameters
+                custom_params = evt["start"].get("customParameters", {})
+                self.phone_number = (
+                    custom_params.get("From") or
+                    custom_params.get("CallFrom") or  
+                    custom_params.get("from") or
+                    custom_params.get("phone_number")
+                )
+                # ✅ CRITICAL FIX: שמירת to_number למזהה עסק
+                self.to_number = (
+                    evt["start"].get("to") or  # ✅ Twilio sends 'to' at start level
+                    custom_params.get("To") or
+                    custom_params.get("Called") or
+                    custom_params.get("to") or
+                    custom_params.get("called")
+                )
+                
+                # 🔥 BUILD 174: Outbound call parameters
+                # ⚠️ CRITICAL: call_direction is set ONCE at start and NEVER changed
+                # 🔥 HARD LOCK: Prevent any attempt to change direction after initial set
+                incoming_direction = custom_params.get("direction", "inbound")
+                
+                # Check if direction was already set (should never happen, but guard against it)
+                if hasattr(self, 'call_direction') and self.call_direction:
+                    if self.call_direction != incoming_direction:
+                        # 🔥 CRITICAL ERROR: Attempt to change direction after it was set
+                        logger.error(f"❌ [CALL_DIRECTION_LOCK] ERROR: Attempt to change direction!")
+                        logger.info(f"   Current: {self.call_direction}, Attempted: {incoming_direction}")
+                        logger.info(f"   ⛔ BLOCKED - keeping original direction: {self.call_direction}")
+                        _orig_print(f"[ERROR] CALL_DIRECTION_CHANGE_BLOCKED call_sid={self.call_sid[:8]}... current={self.call_direction} attempted={incoming_direction}", flush=True)
+                    else:
+                        logger.info(f"✅ [CALL_DIRECTION_LOCK] Direction already set to {self.call_direction} (no change)")
+                else:
+                    # First time setting direction - this is the ONLY allowed assignment
+                    self.call_direction = incoming_direction
+                    logger.info(f"🔒 [CALL_DIRECTION_SET] Locked to: {self.call_direction} (IMMUTABLE)")
+                    _orig_print(f"[CALL_DIRECTION_SET] call_sid={self.call_sid[:8]}... direction={self.call_direction} locked=True", flush=True)
+                
+                self.outbound_lead_id = custom_params.get("lead_id")
+                self.outbound_lead_name = custom_params.get("lead_name")
+                self.outbound_template_id = custom_params.get("template_id")
+                self.outbound_business_id = custom_params.get("business_id")  # 🔒 SECURITY: Explicit business_id for outbound
+                self.outbound_business_name = custom_params.get("business_name")
+                
+                # 🎯 CAPACITY: Heartbeat this call's ledger lease while the stream is up
+                # (released in the finally block; expires on its own if this process dies)
+                if self.call_sid:
+                    from server.services.capacity_ledger import keep_alive
+                    keep_alive(self.call_sid)
+                
+                # 🔥 CRITICAL DEBUG: Log all outbound parameters to verify they arrive
+                # This proves whether lead_id/phone actually reach media_ws_ai.py
+                logger.info(f"📞 [OUTBOUND_PARAMS] lead_id_raw={self.outbound_lead_id}, phone={self.phone_number}, call_sid={self.call_sid[:8] if self.call_sid else 'N/A'}...")
+                logger.info(f"[OUTBOUND_PARAMS] lead_id={self.outbound_lead_id} phone={self.phone_number} call_sid={self.call_sid}")
+                _orig_print(f"[OUTBOUND_PARAMS] lead_id_raw={self.outbound_lead_id} phone={self.phone_number} call_sid={self.call_sid[:8] if self.call_sid else 'N/A'}...", flush=True)
+                
+                # 🔥 DEBUG: Log outbound lead name explicitly
+                if self.outbound_lead_name:
+                    logger.info(f"✅ [OUTBOUND] Lead name received: '{self.outbound_lead_name}'")
+                else:
+                    logger.warning(f"⚠️ [OUTBOUND] No lead_name in customParameters!")
+                
+                # 🔥 OPTIMIZATION: Pre-load outbound greeting to avoid DB query in async loop
+                if self.call_direction == "outbound" and self.outbound_template_id and self.outbound_lead_name:
+                    try:
+                        from server.models_sql import OutboundTemplate
+                        template = OutboundTemplate.query.get(self.outbound_template_id)
+                        if template and template.greeting_template:
+                            biz_name = self.outbound_business_name or "העסק"
+                            self.outbound_greeting_text = template.greeting_template.replace("{{lead_name}}", self.outbound_lead_name).replace("{{business_name}}", biz_name)
+                            logger.info(f"✅ [OUTBOUND] Pre-loaded greeting: '{self.outbound_greeting_text[:50]}...'")
                     except Exception as e:
-                        import traceback
-                        logger.error(f"[CALL-ERROR] Business identification failed: {e}")
-                        logger.error(f"[CALL-ERROR] Traceback: {traceback.format_exc()}")
-                        
-                        # ⛔ CRITICAL: Cannot proceed without business_id - reject call immediately
-                        # Attempting to continue would risk cross-business contamination
-                        # Mask phone number for security (only show last 4 digits)
-                        to_num = getattr(self, 'to_number', 'unknown')
-                        to_num_masked = f"***{to_num[-4:]}" if to_num and len(to_num) >= 4 else "unknown"
-                        _orig_print(f"❌ [BUSINESS_ISOLATION] Call REJECTED - cannot identify business for to={to_num_masked}", flush=True)
-                        
-                        # Send immediate hangup to Twilio
-                        try:
-                            self._immediate_hangup(reason="business_identification_failed")
-                        except Exception as hangup_err:
-                            logger.error(f"[CALL-ERROR] Failed to send hangup: {hangup_err}")
-                        
-                        # Stop processing this call
-                        return
+                        logger.error(f"⚠️ [OUTBOUND] Failed to pre-load greeting: {e}")
+                
+                # 🔍 DEBUG: Log phone numbers and outbound params
+                logger.info(f"\n📞 START EVENT (customParameters path):")
+                logger.info(f"   customParams.From: {custom_params.get('From')}")
+                logger.info(f"   customParams.CallFrom: {custom_params.get('CallFrom')}")
+                logger.info(f"   ✅ self.phone_number set to: '{self.phone_number}'")
+                logger.info(f"   ✅ self.to_number set to: '{self.to_number}'")
+                if self.call_direction == "outbound":
+                    logger.info(f"   📤 OUTBOUND CALL: lead={self.outbound_lead_name}, template={self.outbound_template_id}")
+                
+                # 🎯 DYNAMIC LEAD STATE: Add caller phone to lead capture state
+                if self.phone_number:
+                    self._update_lead_capture_state('phone', self.phone_number)
+                
+                # 🔥 SESSION LIFECYCLE: Register handler for webhook-triggered close
+                if self.call_sid:
+                    _register_handler(self.call_sid, self)
+            else:
+                # Direct format: {"event": "start", "streamSid": "...", "callSid": "..."}
+                self.stream_sid = evt.get("streamSid")
+                self.call_sid = evt.get("callSid")
+                self.phone_number = evt.get("from") or evt.get("phone_number")
+                self.to_number = evt.get("to") or evt.get("called")
+                
+                # 🔥 SESSION LIFECYCLE: Register handler for webhook-triggered close
+                if self.call_sid:
+                    _register_handler(self.call_sid, self)
+                
+                # 🔥 BUILD 174: Outbound call parameters (direct format)
+                # ⚠️ CRITICAL: call_direction is set ONCE at start and NEVER changed
+                # 🔥 HARD LOCK: Prevent any attempt to change direction after initial set
+                incoming_direction = evt.get("direction", "inbound")
+                
+                # Check if direction was already set (should never happen, but guard against it)
+                if hasattr(self, 'call_direction') and self.call_direction:
+                    if self.call_direction != incoming_direction:
+                        # 🔥 CRITICAL ERROR: Attempt to change direction after it was set
+                        logger.error(f"❌ [CALL_DIRECTION_LOCK] ERROR: Attempt to change direction!")
+                        logger.info(f"   Current: {self.call_direction}, Attempted: {incoming_direction}")
+                        logger.info(f"   ⛔ BLOCKED - keeping original direction: {self.call_direction}")
+                        _orig_print(f"[ERROR] CALL_DIRECTION_CHANGE_BLOCKED call_sid={self.call_sid[:8]}... current={self.call_direction} attempted={incoming_direction}", flush=True)
+                    else:
+                        logger.info(f"✅ [CALL_DIRECTION_LOCK] Direction already set to {self.call_direction} (no change)")
+                else:
+                    # First time setting direction - this is the ONLY allowed assignment
+                    self.call_direction = incoming_direction
+                    logger.info(f"🔒 [CALL_DIRECTION_SET] Locked to: {self.call_direction} (IMMUTABLE)")
+                    _orig_print(f"[CALL_DIRECTION_SET] call_sid={self.call_sid[:8]}... direction={self.call_direction} locked=True", flush=True)
+                
+                self.outbound_lead_id = evt.get("lead_id")
+                self.outbound_lead_name = evt.get("lead_name")
+                self.outbound_template_id = evt.get("template_id")
+                self.outbound_business_id = evt.get("business_id")  # 🔒 SECURITY: Explicit business_id for outbound
+                self.outbound_business_name = evt.get("business_name")
+                
+                # 🔥 OPTIMIZATION: Pre-load outbound greeting to avoid DB query in async loop
+                if self.call_direction == "outbound" and self.outbound_template_id and self.outbound_lead_name:
+                    try:
+                        from server.models_sql import OutboundTemplate
+                        template = OutboundTemplate.query.get(self.outbound_template_id)
+                        if template and template.greeting_template:
+                            biz_name = self.outbound_business_name or "העסק"
+                            self.outbound_greeting_text = template.greeting_template.replace("{{lead_name}}", self.outbound_lead_name).replace("{{business_name}}", biz_name)
+                            logger.info(f"✅ [OUTBOUND] Pre-loaded greeting: '{self.outbound_greeting_text[:50]}...'")
+                    except Exception as e:
+                        logger.error(f"⚠️ [OUTBOUND] Failed to pre-load greeting: {e}")
+                
+                # 🔍 DEBUG: Log phone number on start
+                logger.info(f"\n📞 START EVENT - Phone numbers:")
+                logger.info(f"   from field: {evt.get('from')}")
+                logger.info(f"   phone_number field: {evt.get('phone_number')}")
+                logger.info(f"   ✅ self.phone_number set to: '{self.phone_number}'")
+                
+                # 🎯 DYNAMIC LEAD STATE: Add caller phone to lead capture state
+                if self.phone_number:
+                    self._update_lead_capture_state('phone', self.phone_number)
+                
+            self.last_rx_ts = time.time()
+            self.last_keepalive_ts = time.time()  # ✅ התחל keepalive
+            self.t0_connected = time.time()  # ⚡ [T0] WebSocket connected
+            logger.info(f"🎯 [T0={time.time():.3f}] WS_START sid={self.stream_sid} call_sid={self.call_sid} from={self.phone_number} to={getattr(self, 'to_number', 'N/A')} mode={self.mode}")
+            if self.call_sid:
+                stream_registry.mark_start(self.call_sid)
+                
+                # 🔥 PRODUCTION LOG: [CALL_START] - Always logged (WARNING level)
+                call_direction = getattr(self, 'call_direction', 'unknown')
+                business_id = getattr(self, 'business_id', None) or getattr(self, 'outbound_business_id', None) or 'N/A'
+                logger.warning(f"[CALL_START] call_sid={self.call_sid} biz={business_id} direction={call_direction}")
+                
+                # 🔥 GREETING PROFILER: Track WS connect time
+                stream_registry.set_metric(self.call_sid, 'ws_connect_ts', self.t0_connected)
+            
+            # ═══════════════════════════════════════════════════════════════════════
+            # ⛔ CRITICAL: VALIDATE BUSINESS_ID **BEFORE** STARTING OPENAI SESSION
+            # This prevents OpenAI charges if business cannot be identified
+            # ═══════════════════════════════════════════════════════════════════════
+            logger.debug(f"[REALTIME] START event received: call_sid={self.call_sid}, to_number={getattr(self, 'to_number', 'N/A')}")
+            
+            # 🔥 STEP 1: IDENTIFY BUSINESS FIRST (before OpenAI connection)
+            t_biz_start = time.time()
+            try:
+                app = _get_flask_app()
+                with app.app_context():
+                    business_id, greet = self._identify_business_and_get_greeting()
                     
-                    # ⚡ STREAMING STT: Already initialized above based on ai_provider
-                    # Removed duplicate initialization to prevent issues
+                    # ⛔ CRITICAL: business_id must be set - no fallback to prevent cross-business contamination
+                    if not self.business_id:
+                        if not business_id:
+                            logger.error(f"❌ CRITICAL: Cannot identify business! call_sid={self.call_sid}, to={self.to_number}")
+                            _orig_print(f"❌ [BUSINESS_ISOLATION] Call rejected - no business_id for to={self.to_number}", flush=True)
+                            raise ValueError("CRITICAL: business_id required - call cannot proceed")
+                        self.business_id = business_id
+                    
+                    # ⛔ CRITICAL: Verify business_id is set before continuing
+                    if self.business_id is None:
+                        logger.error(f"❌ CRITICAL: business_id still None after DB query! to={self.to_number}, call_sid={self.call_sid}")
+                        _orig_print(f"❌ [BUSINESS_ISOLATION] Call rejected - business_id=None after query", flush=True)
+                        raise ValueError(f"CRITICAL: Cannot identify business for to_number={self.to_number}")
+                    
+                    business_id_safe = self.business_id
+                    call_direction = getattr(self, 'call_direction', 'inbound')
                     
-                    # 🚀 DEFERRED: Call log creation (recording deferred until FIRST_AUDIO_SENT)
-                    def _deferred_call_setup():
-                        try:
-                            app = _get_flask_app()
-                            with app.app_context():
-                                if self.call_sid and not getattr(self, '_call_log_created', False):
-                                    self._create_call_log_on_start()
-                                    self._call_log_created = True
-                                    # 🔥 RECORDING DEFERRED: Will start after FIRST_AUDIO_SENT (in TX loop)
-                        except Exception as e:
-                            logger.error(f"⚠️ Deferred call setup failed: {e}")
+                    # 🔒 LOG BUSINESS ISOLATION: Track which business is handling this call
+                    logger.info(f"[BUSINESS_ISOLATION] call_accepted business_id={business_id_safe} to={self.to_number} call_sid={self.call_sid}")
+                    _orig_print(f"✅ [BUSINESS_ISOLATION] Business validated: {business_id_safe}", flush=True)
                     
-                    # Start deferred setup in background (doesn't block greeting)
-                    threading.Thread(target=_deferred_call_setup, daemon=True).start()
+                    # 🔥 CRITICAL: Load ai_provider and voice BEFORE starting any AI service
+                    # This determines which pipeline to use: OpenAI Realtime OR Gemini (STT→LLM→TTS)
+                    from server.models_sql import Business
+                    from server.config.voice_catalog import is_valid_voice, default_voice
                     
-                    # ═══════════════════════════════════════════════════════════════════════
-                    # 🔥 TX FIX: Ensure streamSid is set before starting TX loop
-                    # ═══════════════════════════════════════════════════════════════════════
-                    # Issue: TX loop sends to "air" if streamSid not set yet
-                    # Solution: Validate streamSid before starting TX thread
-                    # ═══════════════════════════════════════════════════════════════════════
-                    if not self.stream_sid:
-                        _orig_print(f"⚠️ [TX_FIX] streamSid not set yet - this should not happen! call_sid={self.call_sid}", flush=True)
-                        logger.warning(f"[TX_FIX] streamSid missing at TX start - audio may not be sent")
-                    else:
-                        _orig_print(f"✅ [TX_FIX] streamSid validated: {self.stream_sid[:16]}... - TX ready", flush=True)
+                    business = Business.query.get(business_id_safe)
+                    if not business:
+                        logger.error(f"❌ CRITICAL: Business {business_id_safe} not found in DB!")
+                        raise ValueError(f"Business {business_id_safe} not found")
+                    
+                    # Get ai_provider (default to 'openai' if not set)
+                    ai_provider = getattr(business, 'ai_provider', 'openai') or 'openai'
+                    
+                    # Get voice_name from business settings
+                    voice_name = getattr(business, 'voice_name', None)
+                    if not voice_name:
+                        # Fallback to legacy fields
+                        voice_name = getattr(business, 'voice_id', None) or getattr(business, 'tts_voice_id', None)
+                    
+                    # Validate voice matches provider, use default if invalid
+                    if not voice_name or not is_valid_voice(voice_name, ai_provider):
+                        default = default_voice(ai_provider)
+                        if voice_name:
+                            logger.warning(f"[VOICE_VALIDATION] Invalid voice '{voice_name}' for provider '{ai_provider}' - using default '{default}'")
+                        voice_name = default
+                    
+                    # Store provider and voice in instance for later use
+                    self._ai_provider = ai_provider
+                    self._voice_name = voice_name
+                    
+                    # 🔥 MANDATORY ROUTING LOG: This is the single source of truth for call routing
+                    logger.info(f"[CALL_ROUTING] business={business_id_safe} provider={ai_provider} voice={voice_name} direction={call_direction}")
+                    _orig_print(f"🎯 [CALL_ROUTING] provider={ai_provider} voice={voice_name}", flush=True)
+                    
+                    # 🔥 CRITICAL: Decide which pipeline to use based on ai_provider
+                    # - OpenAI: Use OpenAI Realtime API (bidirectional audio streaming)
+                    # - Gemini: Use Gemini Live API (bidirectional audio streaming) 
+                    # Both providers now use realtime streaming!
+                    use_realtime_for_this_call = True  # ✅ Both OpenAI and Gemini use realtime
+                    self._use_realtime_for_call = use_realtime_for_this_call
+                    
+                    # 🔥 CRITICAL: Set USE_REALTIME_API flag for this handler instance
+                    # This controls behavior throughout the call processing
+                    self._USE_REALTIME_API_OVERRIDE = use_realtime_for_this_call
                     
-                    # ✅ ברכה מיידית - בלי השהיה!
-                    # 🔥 NEW: DOUBLE LOOP GUARD - Ensure only ONE TX thread per call
-                    if not self.tx_running:
-                        # Verify thread hasn't started yet
-                        if self.tx_thread.is_alive():
-                            _orig_print(f"⚠️ [TX_GUARD] TX thread already running - skipping start", flush=True)
-                        else:
-                            self.tx_running = True
-                            self.tx_thread.start()
-                            _orig_print(f"🚀 [TX_LOOP] Started TX thread (streamSid={'SET' if self.stream_sid else 'MISSING'}, thread_id={self.tx_thread.ident})", flush=True)
+                    if ai_provider == 'gemini':
+                        logger.info(f"[GEMINI_LIVE] Call will use Gemini Live API (realtime audio streaming)")
+                        _orig_print(f"🔷 [GEMINI_LIVE] Realtime streaming enabled", flush=True)
                     else:
-                        _orig_print(f"⚠️ [TX_GUARD] TX loop already running - skipping duplicate start", flush=True)
-                    
-                    # 🔥 STEP 3: Store greeting and signal event (OpenAI thread is waiting!)
-                    # 🔥 Check per-call override (set based on ai_provider)
-                    use_realtime_for_this_call = getattr(self, '_USE_REALTIME_API_OVERRIDE', USE_REALTIME_API)
-                    if not self.greeting_sent and use_realtime_for_this_call:
-                        self.t1_greeting_start = time.time()
-                        if greet:
-                            logger.info(f"🎯 [T1={self.t1_greeting_start:.3f}] STORING GREETING FOR REALTIME!")
-                            self.greeting_text = greet
-                            if not hasattr(self, 'greeting_sent'):
-                                self.greeting_sent = False
-                            logger.info(f"✅ [REALTIME] Greeting stored: '{greet[:50]}...' (len={len(greet)})")
-                        else:
-                            logger.info(f"🎯 [T1={self.t1_greeting_start:.3f}] NO GREETING - AI will speak first!")
-                            self.greeting_text = None
-                            self.greeting_sent = True
-                    
-                    # 🚀 SIGNAL: Tell OpenAI thread that business info is ready!
-                    total_startup_ms = (time.time() - self.t0_connected) * 1000
-                    logger.info(f"🚀 [PARALLEL] Signaling business info ready at T0+{total_startup_ms:.0f}ms")
-                    self.business_info_ready_event.set()
-                    
-                    # Note: Realtime thread was already started above (BEFORE DB query)
-                    
-                    # 🎵 GEMINI/GOOGLE TTS: Send greeting via Gemini TTS if NOT using Realtime
-                    # 🔥 CRITICAL: Check per-call override (set based on ai_provider)
-                    use_realtime_for_this_call = getattr(self, '_USE_REALTIME_API_OVERRIDE', USE_REALTIME_API)
-                    if not self.greeting_sent and not use_realtime_for_this_call:
-                        self.t1_greeting_start = time.time()  # ⚡ [T1] Greeting start
-                        logger.info(f"🎯 [T1={self.t1_greeting_start:.3f}] SENDING IMMEDIATE GREETING! (Δ={(self.t1_greeting_start - self.t0_connected)*1000:.0f}ms from T0)")
-                        try:
-                            self._speak_greeting(greet)  # ✅ פונקציה מיוחדת לברכה ללא sleep!
-                            self.t2_greeting_end = time.time()  # ⚡ [T2] Greeting end
-                            logger.info(f"🎯 [T2={self.t2_greeting_end:.3f}] GREETING_COMPLETE! (Duration={(self.t2_greeting_end - self.t1_greeting_start)*1000:.0f}ms)")
-                            self.greeting_sent = True
-                        except Exception as e:
-                            logger.error(f"❌ CRITICAL ERROR sending greeting: {e}")
-                            import traceback
-                            traceback.print_exc()
-                    continue
-
-                if et == "media":
-                    self.rx += 1
-                    # 🔥 FIX: Count ALL frames received from Twilio (before any filtering)
-                    # This is the source of truth for "frames_in" - must happen here, not after filters
-                    # Counter initialized in __init__ - direct increment (no getattr masking)
-                    self.realtime_audio_in_chunks += 1
-                    
-                    # 🔥 CRITICAL FIX: Backpressure - drop media frames when processing turn
-                    # This prevents recv_queue overflow during Gemini LLM/TTS processing
-                    # Only drop media frames, not control events (start/stop)
-                    if getattr(self, 'is_processing_turn', False):
-                        # Track dropped frames for diagnostics
-                        if not hasattr(self, '_frames_dropped_by_processing'):
-                            self._frames_dropped_by_processing = 0
-                        self._frames_dropped_by_processing += 1
-                        
-                        # Log first few drops and then every 50 frames
-                        if self._frames_dropped_by_processing <= 3 or self._frames_dropped_by_processing % 50 == 0:
-                            logger.info(f"🛡️ [BACKPRESSURE] Dropping media frame during processing (total={self._frames_dropped_by_processing})")
-                        continue  # Skip processing this media frame
+                        logger.info(f"[OPENAI_PIPELINE] Call will use OpenAI Realtime API")
                     
-                    # 🔥 REMOVED: greeting_lock frame dropping - all frames are now processed
+                    # 🔥 PART D: PRE-BUILD FULL BUSINESS prompt here (while we have app context!)
+                    # This eliminates redundant DB query later and enforces prompt separation.
+                    try:
+                        from server.services.realtime_prompt_builder import build_full_business_prompt
+                        self._prebuilt_prompt = build_full_business_prompt(business_id_safe, call_direction=call_direction)
+                        logger.info(f"✅ [PART D] Pre-built FULL BUSINESS prompt: {len(self._prebuilt_prompt)} chars")
+                    except Exception as prompt_err:
+                        logger.error(f"⚠️ [PART D] Failed to pre-build prompt: {prompt_err}")
+                        self._prebuilt_prompt = None  # Async loop will build it as fallback
+                    
+                t_biz_end = time.time()
+                logger.info(f"⚡ DB QUERY + PROMPT: business_id={business_id} in {(t_biz_end-t_biz_start)*1000:.0f}ms")
+                logger.info(f"[CALL DEBUG] Business + prompt ready in {(t_biz_end-t_biz_start)*1000:.0f}ms")
+                
+                # 🔥 STEP 2: Now that business is validated, START AI SERVICE BASED ON PROVIDER
+                # Connection happens ONLY AFTER business_id AND ai_provider are confirmed
+                use_realtime = getattr(self, '_use_realtime_for_call', True)  # Default to True for safety
+                logger.debug(f"[CALL_ROUTING] About to check if we should start AI service...")
+                logger.debug(f"[CALL_ROUTING] ai_provider={getattr(self, '_ai_provider', 'unknown')}, use_realtime={use_realtime}, realtime_thread={getattr(self, 'realtime_thread', None)}")
+                
+                if use_realtime and not self.realtime_thread:
+                    logger.debug(f"[REALTIME] Condition passed - About to START realtime thread for call {self.call_sid}")
+                    t_realtime_start = time.time()
+                    delta_from_t0 = (t_realtime_start - self.t0_connected) * 1000
                     
-                    # 🔥 GEMINI COUNTER: Track incoming Twilio frames
-                    ai_provider = getattr(self, '_ai_provider', 'openai')
                     if ai_provider == 'gemini':
-                        self._gemini_twilio_frames_in += 1
-                    
-                    b64 = evt["media"]["payload"]
-                    mulaw = base64.b64decode(b64)
-                    # ⚡ SPEED: Fast μ-law decode using lookup table (~10-20x faster)
-                    pcm16 = mulaw_to_pcm16_fast(mulaw)
-                    self.last_rx_ts = time.time()
-                    if self.call_sid:
-                        stream_registry.touch_media(self.call_sid)
-                    
-                    # 🔥 BUILD 165: NOISE GATE BEFORE SENDING TO AI!
-                    # Calculate RMS first to decide if we should send audio at all
-                    rms = audioop.rms(pcm16, 2)
-                    
-                    # 🔥 VERIFICATION: Track VAD calibration in first 3 seconds
-                    if self._vad_calibration_start_ts is None:
-                        self._vad_calibration_start_ts = time.time()
-                        logger.info(f"🎯 [VAD_CALIBRATION] Started tracking first 3 seconds")
-                    
-                    if not self._vad_calibration_complete:
-                        calibration_elapsed = time.time() - self._vad_calibration_start_ts
-                        if calibration_elapsed <= 3.0:
-                            self._vad_frames_in_first_3s += 1
-                        elif calibration_elapsed > 3.0 and not self._vad_calibration_complete:
-                            # Calibration period ended - log results
-                            self._vad_calibration_complete = True
-                            self._vad_calibrated_noise_floor = getattr(self, '_recent_audio_rms', 0)
-                            self._vad_calibrated_threshold = getattr(self, 'vad_threshold', 0)
-                            logger.info(f"✅ [VAD_CALIBRATION] Complete after 3s:")
-                            logger.info(f"   noise_floor={self._vad_calibrated_noise_floor:.1f}")
-                            logger.info(f"   threshold={self._vad_calibrated_threshold:.1f}")
-                            logger.info(f"   vad_calibrated=True")
-                            logger.info(f"   frames_in_first_3s={self._vad_frames_in_first_3s}")
-                            logger.info(f"   speech_started_count_first_3s={self._vad_speech_started_count_first_3s}")
-                            if self._vad_speech_started_count_first_3s > 0 and self._vad_frames_in_first_3s < 50:
-                                # Warning: speech_started triggered very early (possible false trigger)
-                                logger.warning(
-                                    f"[VAD_WARNING] speech_started triggered {self._vad_speech_started_count_first_3s} times "
-                                    f"in first {self._vad_frames_in_first_3s} frames - possible false trigger!"
-                                )
+                        _orig_print(f"🚀 [GEMINI_LIVE] Starting Gemini Live API at T0+{delta_from_t0:.0f}ms (AFTER business validation!)", flush=True)
+                    else:
+                        _orig_print(f"🚀 [REALTIME] Starting OpenAI at T0+{delta_from_t0:.0f}ms (AFTER business validation!)", flush=True)
                     
-                    # 🔥 BUILD 170: Track recent RMS for silence gate in transcription handler
-                    # Use exponential moving average for smooth tracking
-                    if not hasattr(self, '_recent_audio_rms'):
-                        self._recent_audio_rms = rms
+                    logger.debug(f"[REALTIME] Creating realtime thread...")
+                    if self._async_engine:
+                        self.realtime_thread = get_shared_call_loop().task(
+                            self._run_realtime_mode,
+                            name=f"Realtime-{self.call_sid[:8] if self.call_sid else 'unknown'}"
+                        )
                     else:
-                        # EMA with alpha=0.3 for quick response
-                        self._recent_audio_rms = 0.3 * rms + 0.7 * self._recent_audio_rms
-                    
-                    # 🛡️ CRITICAL: Block pure noise BEFORE sending to OpenAI
-                    # This prevents Whisper/Realtime from hallucinating on background noise
-                    # 🔥 BUILD 166: BYPASS noise gate when OpenAI is actively processing speech
-                    # OpenAI needs continuous audio stream to detect speech end
-                    # Safety timeout: auto-reset if speech_stopped never arrives
-                    speech_bypass_active = self._realtime_speech_active
-                    if speech_bypass_active and self._realtime_speech_started_ts:
-                        elapsed = time.time() - self._realtime_speech_started_ts
-                        if elapsed > self._realtime_speech_timeout_sec:
-                            self._realtime_speech_active = False
-                            speech_bypass_active = False
-                            logger.info(f"⏱️ [BUILD 166] Speech timeout after {elapsed:.1f}s - noise gate RE-ENABLED")
-                    
-                    # 🔥 BUILD 302: BARGE-IN BYPASS - During barge-in, NEVER treat anything as noise
-                    # This ensures 100% of user's speech goes to OpenAI when they interrupt AI
-                    if self.barge_in_active:
-                        is_noise = False  # Force through during barge-in
+                        self.realtime_thread = threading.Thread(
+                            target=self._run_realtime_mode_thread,
+                            daemon=True
+                        )
+                    logger.debug(f"[REALTIME] Starting realtime thread...")
+                    self.realtime_thread.start()
+                    self.background_threads.append(self.realtime_thread)
+                    logger.debug(f"[REALTIME] Realtime thread started successfully!")
+                    
+                    logger.debug(f"[REALTIME] Creating realtime audio out thread...")
+                    # 🔥 NEW: DOUBLE LOOP GUARD - Ensure only ONE audio_out loop per call
+                    if not hasattr(self, '_realtime_audio_out_thread_started'):
+                        audio_out_name = f"AudioOut-{self.call_sid[:8] if self.call_sid else 'unknown'}"
+                        if self._async_engine:
+                            realtime_out_thread = get_shared_call_loop().task(
+                                self._realtime_audio_out_loop_async,
+                                name=audio_out_name
+                            )
+                        else:
+                            realtime_out_thread = threading.Thread(
+                                target=self._realtime_audio_out_loop,
+                                daemon=True,
+                                name=audio_out_name
+                            )
+                        realtime_out_thread.start()
+                        self.background_threads.append(realtime_out_thread)
+                        self._realtime_audio_out_thread_started = True
+                        logger.debug(f"[REALTIME] Audio out thread started (thread_id={realtime_out_thread.ident})")
+                    else:
+                        logger.warning(f"[REALTIME] Audio out thread already started - skipping duplicate start")
+                    logger.debug(f"[REALTIME] Both realtime threads started successfully!")
+                else:
+                    logger.warning(f"[CALL_ROUTING] AI service thread NOT started! use_realtime={use_realtime}, realtime_thread exists={hasattr(self, 'realtime_thread') and self.realtime_thread is not None}")
+                if not hasattr(self, 'bot_speaks_first'):
+                    self.bot_speaks_first = True
+                
+            except Exception as e:
+                import traceback
+                logger.error(f"[CALL-ERROR] Business identification failed: {e}")
+                logger.error(f"[CALL-ERROR] Traceback: {traceback.format_exc()}")
+                
+                # ⛔ CRITICAL: Cannot proceed without business_id - reject call immediately
+                # Attempting to continue would risk cross-business contamination
+                # Mask phone number for security (only show last 4 digits)
+                to_num = getattr(self, 'to_number', 'unknown')
+                to_num_masked = f"***{to_num[-4:]}" if to_num and len(to_num) >= 4 else "unknown"
+                _orig_print(f"❌ [BUSINESS_ISOLATION] Call REJECTED - cannot identify business for to={to_num_masked}", flush=True)
+                
+                # Send immediate hangup to Twilio
+                try:
+                    self._immediate_hangup(reason="business_identification_failed")
+                except Exception as hangup_err:
+                    logger.error(f"[CALL-ERROR] Failed to send hangup: {hangup_err}")
+                
+                # Stop processing this call
+                return True
+            
+            # ⚡ STREAMING STT: Already initialized above based on ai_provider
+            # Removed duplicate initialization to prevent issues
+            
+            # 🚀 DEFERRED: Call log creation (recording deferred until FIRST_AUDIO_SENT)
+            def _deferred_call_setup():
+                try:
+                    app = _get_flask_app()
+                    with app.app_context():
+                        if self.call_sid and not getattr(self, '_call_log_created', False):
+                            self._create_call_log_on_start()
+                            self._call_log_created = True
+                            # 🔥 RECORDING DEFERRED: Will start after FIRST_AUDIO_SENT (in TX loop)
+                except Exception as e:
+                    logger.error(f"⚠️ Deferred call setup failed: {e}")
+            
+            # Start deferred setup in background (doesn't block greeting)
+            threading.Thread(target=_deferred_call_setup, daemon=True).start()
+            
+            # ═══════════════════════════════════════════════════════════════════════
+            # 🔥 TX FIX: Ensure streamSid is set before starting TX loop
+            # ═══════════════════════════════════════════════════════════════════════
+            # Issue: TX loop sends to "air" if streamSid not set yet
+            # Solution: Validate streamSid before starting TX thread
+            # ═══════════════════════════════════════════════════════════════════════
+            if not self.stream_sid:
+                _orig_print(f"⚠️ [TX_FIX] streamSid not set yet - this should not happen! call_sid={self.call_sid}", flush=True)
+                logger.warning(f"[TX_FIX] streamSid missing at TX start - audio may not be sent")
+            else:
+                _orig_print(f"✅ [TX_FIX] streamSid validated: {self.stream_sid[:16]}... - TX ready", flush=True)
+            
+            # ✅ ברכה מיידית - בלי השהיה!
+            # 🔥 NEW: DOUBLE LOOP GUARD - Ensure only ONE TX thread per call
+            if not self.tx_running:
+                # Verify thread hasn't started yet
+                if self.tx_thread.is_alive():
+                    _orig_print(f"⚠️ [TX_GUARD] TX thread already running - skipping start", flush=True)
+                else:
+                    self.tx_running = True
+                    self.tx_thread.start()
+                    _orig_print(f"🚀 [TX_LOOP] Started TX thread (streamSid={'SET' if self.stream_sid else 'MISSING'}, thread_id={self.tx_thread.ident})", flush=True)
+            else:
+                _orig_print(f"⚠️ [TX_GUARD] TX loop already running - skipping duplicate start", flush=True)
+            
+            # 🔥 STEP 3: Store greeting and signal event (OpenAI thread is waiting!)
+            # 🔥 Check per-call override (set based on ai_provider)
+            use_realtime_for_this_call = getattr(self, '_USE_REALTIME_API_OVERRIDE', USE_REALTIME_API)
+            if not self.greeting_sent and use_realtime_for_this_call:
+                self.t1_greeting_start = time.time()
+                if greet:
+                    logger.info(f"🎯 [T1={self.t1_greeting_start:.3f}] STORING GREETING FOR REALTIME!")
+                    self.greeting_text = greet
+                    if not hasattr(self, 'greeting_sent'):
+                        self.greeting_sent = False
+                    logger.info(f"✅ [REALTIME] Greeting stored: '{greet[:50]}...' (len={len(greet)})")
+                else:
+                    logger.info(f"🎯 [T1={self.t1_greeting_start:.3f}] NO GREETING - AI will speak first!")
+                    self.greeting_text = None
+                    self.greeting_sent = True
+            
+            # 🚀 SIGNAL: Tell OpenAI thread that business info is ready!
+            total_startup_ms = (time.time() - self.t0_connected) * 1000
+            logger.info(f"🚀 [PARALLEL] Signaling business info ready at T0+{total_startup_ms:.0f}ms")
+            self.business_info_ready_event.set()
+            
+            # Note: Realtime thread was already started above (BEFORE DB query)
+            
+            # 🎵 GEMINI/GOOGLE TTS: Send greeting via Gemini TTS if NOT using Realtime
+            # 🔥 CRITICAL: Check per-call override (set based on ai_provider)
+            use_realtime_for_this_call = getattr(self, '_USE_REALTIME_API_OVERRIDE', USE_REALTIME_API)
+            if not self.greeting_sent and not use_realtime_for_this_call:
+                self.t1_greeting_start = time.time()  # ⚡ [T1] Greeting start
+                logger.info(f"🎯 [T1={self.t1_greeting_start:.3f}] SENDING IMMEDIATE GREETING! (Δ={(self.t1_greeting_start - self.t0_connected)*1000:.0f}ms from T0)")
+                try:
+                    self._speak_greeting(greet)  # ✅ פונקציה מיוחדת לברכה ללא sleep!
+                    self.t2_greeting_end = time.time()  # ⚡ [T2] Greeting end
+                    logger.info(f"🎯 [T2={self.t2_greeting_end:.3f}] GREETING_COMPLETE! (Duration={(self.t2_greeting_end - self.t1_greeting_start)*1000:.0f}ms)")
+                    self.greeting_sent = True
+                except Exception as e:
+                    logger.error(f"❌ CRITICAL ERROR sending greeting: {e}")
+                    import traceback
+                    traceback.print_exc()
+            return False
+
+        if et == "media":
+            self.rx += 1
+            # 🔥 FIX: Count ALL frames received from Twilio (before any filtering)
+            # This is the source of truth for "frames_in" - must happen here, not after filters
+            # Counter initialized in __init__ - direct increment (no getattr masking)
+            self.realtime_audio_in_chunks += 1
+            
+            # 🔥 CRITICAL FIX: Backpressure - drop media frames when processing turn
+            # This prevents recv_queue overflow during Gemini LLM/TTS processing
+            # Only drop media frames, not control events (start/stop)
+            if getattr(self, 'is_processing_turn', False):
+                # Track dropped frames for diagnostics
+                if not hasattr(self, '_frames_dropped_by_processing'):
+                    self._frames_dropped_by_processing = 0
+                self._frames_dropped_by_processing += 1
+                
+                # Log first few drops and then every 50 frames
+                if self._frames_dropped_by_processing <= 3 or self._frames_dropped_by_processing % 50 == 0:
+                    logger.info(f"🛡️ [BACKPRESSURE] Dropping media frame during processing (total={self._frames_dropped_by_processing})")
+                return False  # Skip processing this media frame
+            
+            # 🔥 REMOVED: greeting_lock frame dropping - all frames are now processed
+            
+            # 🔥 GEMINI COUNTER: Track incoming Twilio frames
+            ai_provider = getattr(self, '_ai_provider', 'openai')
+            if ai_provider == 'gemini':
+                self._gemini_twilio_frames_in += 1
+            
+            b64 = evt["media"]["payload"]
+            mulaw = frame_audio if frame_audio is not None else base64.b64decode(b64)
+            # ⚡ SPEED: Fast μ-law decode using lookup table (~10-20x faster)
+            pcm16_samples = ulaw_decode(mulaw)
+            pcm16 = pcm16_samples.tobytes()
+            self.last_rx_ts = time.time()
+            if self.call_sid:
+                stream_registry.touch_media(self.call_sid)
+            
+            # 🔥 BUILD 165: NOISE GATE BEFORE SENDING TO AI!
+            # Calculate RMS first to decide if we should send audio at all
+            rms = pcm16_rms(pcm16_samples)
+            
+            # 🔥 VERIFICATION: Track VAD calibration in first 3 seconds
+            if self._vad_calibration_start_ts is None:
+                self._vad_calibration_start_ts = time.time()
+                logger.info(f"🎯 [VAD_CALIBRATION] Started tracking first 3 seconds")
+            
+            if not self._vad_calibration_complete:
+                calibration_elapsed = time.time() - self._vad_calibration_start_ts
+                if calibration_elapsed <= 3.0:
+                    self._vad_frames_in_first_3s += 1
+                elif calibration_elapsed > 3.0 and not self._vad_calibration_complete:
+                    # Calibration period ended - log results
+                    self._vad_calibration_complete = True
+                    self._vad_calibrated_noise_floor = getattr(self, '_recent_audio_rms', 0)
+                    self._vad_calibrated_threshold = getattr(self, 'vad_threshold', 0)
+                    logger.info(f"✅ [VAD_CALIBRATION] Complete after 3s:")
+                    logger.info(f"   noise_floor={self._vad_calibrated_noise_floor:.1f}")
+                    logger.info(f"   threshold={self._vad_calibrated_threshold:.1f}")
+                    logger.info(f"   vad_calibrated=True")
+                    logger.info(f"   frames_in_first_3s={self._vad_frames_in_first_3s}")
+                    logger.info(f"   speech_started_count_first_3s={self._vad_speech_started_count_first_3s}")
+                    if self._vad_speech_started_count_first_3s > 0 and self._vad_frames_in_first_3s < 50:
+                        # Warning: speech_started triggered very early (possible false trigger)
+                        logger.warning(
+                            f"[VAD_WARNING] speech_started triggered {self._vad_speech_started_count_first_3s} times "
+                            f"in first {self._vad_frames_in_first_3s} frames - possible false trigger!"
+                        )
+            
+            # 🔥 BUILD 170: Track recent RMS for silence gate in transcription handler
+            # Use exponential moving average for smooth tracking
+            if not hasattr(self, '_recent_audio_rms'):
+                self._recent_audio_rms = rms
+            else:
+                # EMA with alpha=0.3 for quick response
+                self._recent_audio_rms = 0.3 * rms + 0.7 * self._recent_audio_rms
+            
+            # 🛡️ CRITICAL: Block pure noise BEFORE sending to OpenAI
+            # This prevents Whisper/Realtime from hallucinating on background noise
+            # 🔥 BUILD 166: BYPASS noise gate when OpenAI is actively processing speech
+            # OpenAI needs continuous audio stream to detect speech end
+            # Safety timeout: auto-reset if speech_stopped never arrives
+            speech_bypass_active = self._realtime_speech_active
+            if speech_bypass_active and self._realtime_speech_started_ts:
+                elapsed = time.time() - self._realtime_speech_started_ts
+                if elapsed > self._realtime_speech_timeout_sec:
+                    self._realtime_speech_active = False
+                    speech_bypass_active = False
+                    logger.info(f"⏱️ [BUILD 166] Speech timeout after {elapsed:.1f}s - noise gate RE-ENABLED")
+            
+            # 🔥 BUILD 302: BARGE-IN BYPASS - During barge-in, NEVER treat anything as noise
+            # This ensures 100% of user's speech goes to OpenAI when they interrupt AI
+            if self.barge_in_active:
+                is_noise = False  # Force through during barge-in
+            else:
+                is_noise = rms < RMS_SILENCE_THRESHOLD and not speech_bypass_active  # 40 RMS = pure noise
+            
+            # 🔥 BUILD 167: MUSIC GATE DISABLED - Hebrew speech was being blocked!
+            # Hebrew has sustained consonant clusters with RMS 200-350 which matched "music" pattern
+            # The noise gate (RMS < 120) is sufficient to block background noise
+            is_music = False  # ALWAYS FALSE - no music detection
+            
+            # 🔥 BUILD 165: CALIBRATION MUST RUN FOR ALL FRAMES (even noise!)
+            # This ensures VAD thresholds stay accurate
+            if not self.is_calibrated:
+                total_frames = getattr(self, '_total_calibration_attempts', 0) + 1
+                self._total_calibration_attempts = total_frames
+                
+                # Calibrate on pure noise frames
+                if is_noise:
+                    self.noise_floor = (self.noise_floor * self.calibration_frames + rms) / (self.calibration_frames + 1)
+                    self.calibration_frames += 1
+                
+                # Complete calibration after 40 quiet frames OR 4 seconds timeout
+                if self.calibration_frames >= 40 or total_frames >= 200:
+                    if self.calibration_frames < 10:
+                        # 🔥 BUILD 325: Use config constants for VAD thresholds
+                        self.vad_threshold = VAD_BASELINE_TIMEOUT  # 80.0 from config
+                        logger.warning(f"🎛️ [VAD] TIMEOUT - using baseline threshold={VAD_BASELINE_TIMEOUT}")
+                        logger.info(f"🎛️ VAD TIMEOUT - using baseline threshold={VAD_BASELINE_TIMEOUT}")
+                    else:
+                        # 🔥 BUILD 325: Adaptive: noise + offset, capped for quiet speakers
+                        self.vad_threshold = min(VAD_ADAPTIVE_CAP, self.noise_floor + VAD_ADAPTIVE_OFFSET)
+                        logger.info(f"✅ [VAD] Calibrated: noise={self.noise_floor:.1f}, threshold={self.vad_threshold:.1f}")
+                        logger.info(f"🎛️ VAD CALIBRATED (noise={self.noise_floor:.1f}, threshold={self.vad_threshold:.1f})")
+                    self.is_calibrated = True
+            
+            # 🚀 REALTIME API: Route audio to Realtime if enabled
+            # 🔥 Check per-call override (set based on ai_provider)
+            use_realtime_for_this_call = getattr(self, '_USE_REALTIME_API_OVERRIDE', USE_REALTIME_API)
+            if use_realtime_for_this_call and self.realtime_thread and self.realtime_thread.is_alive():
+                # 🔥 REMOVED: greeting_lock frame dropping - all frames are now processed
+                
+                if not self.barge_in_enabled_after_greeting:
+                    # 🔥 P0-4: Skip echo gate in SIMPLE_MODE (passthrough only)
+                    if SIMPLE_MODE:
+                        # SIMPLE_MODE = no guards, passthrough all audio + logs only
+                        pass  # Skip all echo gate logic
                     else:
-                        is_noise = rms < RMS_SILENCE_THRESHOLD and not speech_bypass_active  # 40 RMS = pure noise
-                    
-                    # 🔥 BUILD 167: MUSIC GATE DISABLED - Hebrew speech was being blocked!
-                    # Hebrew has sustained consonant clusters with RMS 200-350 which matched "music" pattern
-                    # The noise gate (RMS < 120) is sufficient to block background noise
-                    is_music = False  # ALWAYS FALSE - no music detection
-                    
-                    # 🔥 BUILD 165: CALIBRATION MUST RUN FOR ALL FRAMES (even noise!)
-                    # This ensures VAD thresholds stay accurate
-                    if not self.is_calibrated:
-                        total_frames = getattr(self, '_total_calibration_attempts', 0) + 1
-                        self._total_calibration_attempts = total_frames
+                        # 🔥 BUILD 304: ECHO GATE - Block echo while AI is speaking + 800ms after
+                        # This prevents OpenAI from transcribing its own voice output as user speech!
+                        # The AI's TTS audio echoes back through the phone line and causes hallucinations
+                        # 
+                        # CRITICAL: Echo can be HIGH RMS (2000+) because TTS plays loud through phone
+                        # So we can't just use RMS threshold - we must block ALL audio during AI speech
+                        # ONLY allow through if we have SUSTAINED high-RMS speech (5+ frames = 100ms)
                         
-                        # Calibrate on pure noise frames
-                        if is_noise:
-                            self.noise_floor = (self.noise_floor * self.calibration_frames + rms) / (self.calibration_frames + 1)
-                            self.calibration_frames += 1
+                        # Track consecutive high-RMS frames for barge-in detection
+                        if not hasattr(self, '_echo_gate_consec_frames'):
+                            self._echo_gate_consec_frames = 0
                         
-                        # Complete calibration after 40 quiet frames OR 4 seconds timeout
-                        if self.calibration_frames >= 40 or total_frames >= 200:
-                            if self.calibration_frames < 10:
-                                # 🔥 BUILD 325: Use config constants for VAD thresholds
-                                self.vad_threshold = VAD_BASELINE_TIMEOUT  # 80.0 from config
-                                logger.warning(f"🎛️ [VAD] TIMEOUT - using baseline threshold={VAD_BASELINE_TIMEOUT}")
-                                logger.info(f"🎛️ VAD TIMEOUT - using baseline threshold={VAD_BASELINE_TIMEOUT}")
-                            else:
-                                # 🔥 BUILD 325: Adaptive: noise + offset, capped for quiet speakers
-                                self.vad_threshold = min(VAD_ADAPTIVE_CAP, self.noise_floor + VAD_ADAPTIVE_OFFSET)
-                                logger.info(f"✅ [VAD] Calibrated: noise={self.noise_floor:.1f}, threshold={self.vad_threshold:.1f}")
-                                logger.info(f"🎛️ VAD CALIBRATED (noise={self.noise_floor:.1f}, threshold={self.vad_threshold:.1f})")
-                            self.is_calibrated = True
-                    
-                    # 🚀 REALTIME API: Route audio to Realtime if enabled
-                    # 🔥 Check per-call override (set based on ai_provider)
-                    use_realtime_for_this_call = getattr(self, '_USE_REALTIME_API_OVERRIDE', USE_REALTIME_API)
-                    if use_realtime_for_this_call and self.realtime_thread and self.realtime_thread.is_alive():
-                        # 🔥 REMOVED: greeting_lock frame dropping - all frames are now processed
+                        # Use calibrated noise floor for RMS-based speech detection
+                        # Note: self.noise_floor is RMS value (~100), self.vad_threshold is probability (0.85)!
+                        noise_floor_rms = getattr(self, 'noise_floor', 100.0)
+                        # 🔥 BUILD 325: Echo gate from config - prevents AI echo from triggering barge-in
+                        rms_speech_threshold = max(noise_floor_rms * 3.0, ECHO_GATE_MIN_RMS)
+                        is_above_speech = rms > rms_speech_threshold
                         
-                        if not self.barge_in_enabled_after_greeting:
-                            # 🔥 P0-4: Skip echo gate in SIMPLE_MODE (passthrough only)
-                            if SIMPLE_MODE:
-                                # SIMPLE_MODE = no guards, passthrough all audio + logs only
-                                pass  # Skip all echo gate logic
-                            else:
-                                # 🔥 BUILD 304: ECHO GATE - Block echo while AI is speaking + 800ms after
-                                # This prevents OpenAI from transcribing its own voice output as user speech!
-                                # The AI's TTS audio echoes back through the phone line and causes hallucinations
-                                # 
-                                # CRITICAL: Echo can be HIGH RMS (2000+) because TTS plays loud through phone
-                                # So we can't just use RMS threshold - we must block ALL audio during AI speech
-                                # ONLY allow through if we have SUSTAINED high-RMS speech (5+ frames = 100ms)
-                                
-                                # Track consecutive high-RMS frames for barge-in detection
-                                if not hasattr(self, '_echo_gate_consec_frames'):
-                                    self._echo_gate_consec_frames = 0
-                                
-                                # Use calibrated noise floor for RMS-based speech detection
-                                # Note: self.noise_floor is RMS value (~100), self.vad_threshold is probability (0.85)!
-                                noise_floor_rms = getattr(self, 'noise_floor', 100.0)
-                                # 🔥 BUILD 325: Echo gate from config - prevents AI echo from triggering barge-in
-                                rms_speech_threshold = max(noise_floor_rms * 3.0, ECHO_GATE_MIN_RMS)
-                                is_above_speech = rms > rms_speech_threshold
-                                
-                                # Count consecutive frames above RMS speech threshold
-                                if is_above_speech:
-                                    self._echo_gate_consec_frames += 1
-                                else:
-                                    # Reset quickly when audio drops - echo is intermittent
-                                    self._echo_gate_consec_frames = 0
-                                
-                                # ═══════════════════════════════════════════════════════════════
-                                # 🎯 P0-3: Stable Barge-In with Short Forwarding Window
-                                # ═══════════════════════════════════════════════════════════════
-                                # When AI is speaking:
-                                # 1. Block ALL audio by default (no echo to OpenAI)
-                                # 2. Local VAD runs continuously (RMS + consecutive frames)
-                                # 3. When VAD confirms real speech → open SHORT forwarding window (200-400ms)
-                                # 4. After window closes → back to blocking until next VAD confirmation
-                                # ═══════════════════════════════════════════════════════════════
-                                
-                                # STRICT barge-in detection: ECHO_GATE_MIN_FRAMES consecutive = real speech
-                                # Echo spikes are typically 1-3 frames, real speech is sustained
-                                # ECHO_GATE_MIN_FRAMES comes from config (default: 5 = 100ms)
-                                is_likely_real_speech = self._echo_gate_consec_frames >= ECHO_GATE_MIN_FRAMES
-                                
-                                # 🎯 P0-3: Short forwarding window (200-400ms) after VAD confirmation
-                                FORWARDING_WINDOW_MS = 300  # 300ms window after VAD confirms speech
-                                
-                                # Track forwarding window state
-                                if not hasattr(self, '_forwarding_window_open_ts'):
-                                    self._forwarding_window_open_ts = None
-                                
-                                # Open forwarding window when VAD confirms real speech
-                                if is_likely_real_speech and not self._forwarding_window_open_ts:
-                                    self._forwarding_window_open_ts = time.time()
-                                    logger.info(f"🔓 [P0-3] Opening {FORWARDING_WINDOW_MS}ms forwarding window - VAD confirmed speech")
-                                
-                                # Check if forwarding window is still open
-                                window_is_open = False
-                                if self._forwarding_window_open_ts:
-                                    elapsed_ms = (time.time() - self._forwarding_window_open_ts) * 1000
-                                    if elapsed_ms < FORWARDING_WINDOW_MS:
-                                        window_is_open = True
-                                    else:
-                                        # Window expired - close it
-                                        self._forwarding_window_open_ts = None
-                                        logger.info(f"🔒 [P0-3] Forwarding window closed after {elapsed_ms:.0f}ms")
-                                
-                                if self.is_ai_speaking_event.is_set():
-                                    # AI is actively speaking - block ALL audio UNLESS:
-                                    # 1. Barge-in already active (user confirmed to be speaking)
-                                    # 2. OpenAI speech detection active (bypass during user turn)
-                                    # 3. Forwarding window is open (short window after VAD confirmation)
-                                    if not self.barge_in_active and not self._realtime_speech_active and not window_is_open:
-                                        # Block - this is echo or noise
-                                        if not hasattr(self, '_echo_gate_logged') or not self._echo_gate_logged:
-                                            logger.info(f"🛡️ [P0-3] Blocking audio - AI speaking (rms={rms:.0f}, frames={self._echo_gate_consec_frames}/{ECHO_GATE_MIN_FRAMES}, window_open={window_is_open})")
-                                            self._echo_gate_logged = True
-                                        # 🔥 FIX: Track frame drop reason
-                                        self._stats_audio_blocked += 1
-                                        self._frames_dropped_by_filters += 1  # Dropped by echo gate filter
-                                        self._frames_dropped_by_reason[FrameDropReason.ECHO_GATE] += 1  # Detailed tracking
-                                        continue
-                                    elif window_is_open:
-                                        # Forwarding window is open - let audio through
-                                        if not hasattr(self, '_forwarding_window_logged'):
-                                            logger.info(f"📤 [P0-3] Forwarding audio through {FORWARDING_WINDOW_MS}ms window (frames={self._echo_gate_consec_frames})")
-                                            self._forwarding_window_logged = True
-                                
-                                # Check echo decay period (800ms after AI stops speaking)
-                                if hasattr(self, '_ai_finished_speaking_ts') and self._ai_finished_speaking_ts:
-                                    echo_decay_ms = (time.time() - self._ai_finished_speaking_ts) * 1000
-                                    if echo_decay_ms < POST_AI_COOLDOWN_MS:
-                                        # Still in echo decay period - block unless:
-                                        # 1. OpenAI speech detection active
-                                        # 2. Barge-in active
-                                        # 3. Forwarding window is open
-                                        if not self._realtime_speech_active and not self.barge_in_active and not window_is_open:
-                                            if not hasattr(self, '_echo_decay_logged') or not self._echo_decay_logged:
-                                                logger.info(f"🛡️ [P0-3] Blocking - echo decay ({echo_decay_ms:.0f}ms, window_open={window_is_open})")
-                                                self._echo_decay_logged = True
-                                            # 🔥 FIX: Track frame drop reason
-                                            self._stats_audio_blocked += 1
-                                            self._frames_dropped_by_filters += 1  # Dropped by echo decay filter
-                                            self._frames_dropped_by_reason[FrameDropReason.ECHO_DECAY] += 1  # Detailed tracking
-                                            continue
-                                    else:
-                                        # Echo decay complete - reset log flags for next AI response
-                                        self._echo_gate_logged = False
-                                        self._echo_decay_logged = False
-                                        self._forwarding_window_logged = False
-                                        self._echo_gate_consec_frames = 0
-                                        # Also close forwarding window
-                                        self._forwarding_window_open_ts = None
+                        # Count consecutive frames above RMS speech threshold
+                        if is_above_speech:
+                            self._echo_gate_consec_frames += 1
                         else:
-                            # Greeting finished - don't block user speech at all, let OpenAI detect barge-in
+                            # Reset quickly when audio drops - echo is intermittent
                             self._echo_gate_consec_frames = 0
                         
-                        # 🔥 BUILD 171: CONSECUTIVE FRAME REQUIREMENT
-                        # Track consecutive voice frames before considering it real speech
-                        # This prevents random noise spikes from triggering transcription
-                        # 🔥 BUILD 303: During barge-in, don't decay frames - let everything through!
-                        if not is_noise and rms >= MIN_SPEECH_RMS:
-                            self._consecutive_voice_frames += 1
-                        elif not self.barge_in_active:  # Only decay if NOT in barge-in mode
-                            # Reset on silence/noise - require sustained speech
-                            if self._consecutive_voice_frames > 0:
-                                self._consecutive_voice_frames = max(0, self._consecutive_voice_frames - 2)  # Decay slowly
+                        # ═══════════════════════════════════════════════════════════════
+                        # 🎯 P0-3: Stable Barge-In with Short Forwarding Window
+                        # ═══════════════════════════════════════════════════════════════
+                        # When AI is speaking:
+                        # 1. Block ALL audio by default (no echo to OpenAI)
+                        # 2. Local VAD runs continuously (RMS + consecutive frames)
+                        # 3. When VAD confirms real speech → open SHORT forwarding window (200-400ms)
+                        # 4. After window closes → back to blocking until next VAD confirmation
+                        # ═══════════════════════════════════════════════════════════════
                         
-                        # 🔥 BUILD 171: Only send audio if we have enough consecutive frames OR bypass is active
-                        # 🔥 BUILD 302/303: ALWAYS send during barge-in, even if noise/low RMS!
-                        has_sustained_speech = self._consecutive_voice_frames >= MIN_CONSECUTIVE_VOICE_FRAMES
+                        # STRICT barge-in detection: ECHO_GATE_MIN_FRAMES consecutive = real speech
+                        # Echo spikes are typically 1-3 frames, real speech is sustained
+                        # ECHO_GATE_MIN_FRAMES comes from config (default: 5 = 100ms)
+                        is_likely_real_speech = self._echo_gate_consec_frames >= ECHO_GATE_MIN_FRAMES
                         
-                        # ═══════════════════════════════════════════════════════════════════════
-                        # 🎯 P0-4: SIMPLE_MODE Must Be Passthrough (Master Instruction)
-                        # ═══════════════════════════════════════════════════════════════════════
-                        # ❌ NO guards in SIMPLE_MODE
-                        # ❌ NO frame dropping in SIMPLE_MODE  
-                        # ❌ NO echo_window in SIMPLE_MODE
-                        # ❌ NO hallucination filters in SIMPLE_MODE
-                        # ✅ Passthrough + logs only
-                        # ═══════════════════════════════════════════════════════════════════════
-                        if SIMPLE_MODE:
-                            # 🔥 P0-4: SIMPLE_MODE = passthrough ONLY, trust OpenAI completely
-                            should_send_audio = True  # ALWAYS send in SIMPLE_MODE
-                            is_noise = False  # Trust OpenAI's VAD for noise filtering
-                        elif self.barge_in_active or self._realtime_speech_active:
-                            should_send_audio = True  # Send EVERYTHING during barge-in or active speech
-                            is_noise = False  # Force override noise flag too
-                        else:
-                            should_send_audio = (has_sustained_speech or speech_bypass_active) and not is_noise
+                        # 🎯 P0-3: Short forwarding window (200-400ms) after VAD confirmation
+                        FORWARDING_WINDOW_MS = 300  # 300ms window after VAD confirms speech
                         
-                        # 🔥 BUILD 165: ONLY send audio above noise threshold AND sustained speech!
-                        if should_send_audio:
-                            try:
-                                # 🔍 DEBUG: Log first few frames from Twilio (only in development mode)
-                                if not hasattr(self, '_twilio_audio_chunks_sent'):
-                                    self._twilio_audio_chunks_sent = 0
-                                self._twilio_audio_chunks_sent += 1
-                                
-                                # 🎯 TASK A.2: Log SIMPLE MODE bypass confirmation (first 3 frames only in dev)
-                                # DEBUG=0 → development (verbose), DEBUG=1 → production (quiet)
-                                if not DEBUG and self._twilio_audio_chunks_sent <= 3:
-                                    # Only log first 3 frames in development mode
-                                    first5_bytes = ' '.join([f'{b:02x}' for b in mulaw[:5]])
-                                    mode_info = "SIMPLE_MODE" if SIMPLE_MODE else "FILTERED_MODE"
-                                    guard_status = "BYPASSED" if (SIMPLE_MODE and not getattr(self, '_audio_guard_enabled', False)) else "ACTIVE"
-                                    logger.info(f"🎤 [BUILD 166] Noise gate {guard_status} - sending ALL audio to OpenAI")
-                                    logger.info(f"[REALTIME] sending audio TO OpenAI: chunk#{self._twilio_audio_chunks_sent}, μ-law bytes={len(mulaw)}, first5={first5_bytes}, rms={rms:.0f}, mode={mode_info}")
-                                
-                                self.realtime_audio_in_queue.put_nowait(b64)
-                            except queue.Full:
-                                # 🔥 FIX: Track queue full drops
+                        # Track forwarding window state
+                        if not hasattr(self, '_forwarding_window_open_ts'):
+                            self._forwarding_window_open_ts = None
+                        
+                        # Open forwarding window when VAD confirms real speech
+                        if is_likely_real_speech and not self._forwarding_window_open_ts:
+                            self._forwarding_window_open_ts = time.time()
+                            logger.info(f"🔓 [P0-3] Opening {FORWARDING_WINDOW_MS}ms forwarding window - VAD confirmed speech")
+                        
+                        # Check if forwarding window is still open
+                        window_is_open = False
+                        if self._forwarding_window_open_ts:
+                            elapsed_ms = (time.time() - self._forwarding_window_open_ts) * 1000
+                            if elapsed_ms < FORWARDING_WINDOW_MS:
+                                window_is_open = True
+                            else:
+                                # Window expired - close it
+                                self._forwarding_window_open_ts = None
+                                logger.info(f"🔒 [P0-3] Forwarding window closed after {elapsed_ms:.0f}ms")
+                        
+                        if self.is_ai_speaking_event.is_set():
+                            # AI is actively speaking - block ALL audio UNLESS:
+                            # 1. Barge-in already active (user confirmed to be speaking)
+                            # 2. OpenAI speech detection active (bypass during user turn)
+                            # 3. Forwarding window is open (short window after VAD confirmation)
+                            if not self.barge_in_active and not self._realtime_speech_active and not window_is_open:
+                                # Block - this is echo or noise
+                                if not hasattr(self, '_echo_gate_logged') or not self._echo_gate_logged:
+                                    logger.info(f"🛡️ [P0-3] Blocking audio - AI speaking (rms={rms:.0f}, frames={self._echo_gate_consec_frames}/{ECHO_GATE_MIN_FRAMES}, window_open={window_is_open})")
+                                    self._echo_gate_logged = True
+                                # 🔥 FIX: Track frame drop reason
                                 self._stats_audio_blocked += 1
-                                self._frames_dropped_by_queue_full += 1
-                                self._frames_dropped_by_reason[FrameDropReason.QUEUE_FULL] += 1  # Detailed tracking
-                                # Rate-limit logging
-                                if not hasattr(self, '_queue_full_log_count'):
-                                    self._queue_full_log_count = 0
-                                self._queue_full_log_count += 1
-                                if self._queue_full_log_count % 50 == 1:
-                                    logger.warning(f"⚠️ [QUEUE_FULL] Dropped {self._queue_full_log_count} frames - realtime_audio_in_queue full")
-                                pass
-                        else:
-                            # 🔥 BUILD 171: Enhanced logging for debugging
-                            if not hasattr(self, '_noise_reject_count'):
-                                self._noise_reject_count = 0
-                            self._noise_reject_count += 1
-                            # Log every 100 rejected frames with more detail
-                            if self._noise_reject_count % 100 == 0:
-                                reason = "noise" if is_noise else f"insufficient_consec_frames({self._consecutive_voice_frames}/{MIN_CONSECUTIVE_VOICE_FRAMES})"
-                                logger.info(f"🔇 [AUDIO GATE] Blocked {self._noise_reject_count} frames (rms={rms:.0f}, reason={reason})")
-                    # ⚡ STREAMING STT: Legacy Google STT (DISABLED - not used for Gemini)
-                    # Gemini uses batch Whisper STT, not streaming
-                    # This code block is kept for historical reasons only
-                    use_realtime_for_this_call = getattr(self, '_USE_REALTIME_API_OVERRIDE', USE_REALTIME_API)
-                    if not use_realtime_for_this_call and self.call_sid and pcm16 and not is_noise:
-                        session = _get_session(self.call_sid)
-                        if session:
-                            session.push_audio(pcm16)
-                            # 🔥 FIX: Increment frames_forwarded counter for Gemini pipeline
-                            # This prevents FRAME_ACCOUNTING_ERROR when using Gemini provider
-                            self._stats_audio_sent += 1
-                            # Update session timestamp to prevent cleanup
-                            with _registry_lock:
-                                item = _sessions_registry.get(self.call_sid)
-                                if item:
-                                    item["ts"] = time.time()
-                        elif USE_STREAMING_STT:
-                            # ⚠️ Session should exist but doesn't!
-                            if not hasattr(self, '_session_warning_logged'):
-                                logger.warning(f"⚠️ [STT] No streaming session for {self.call_sid[:8]} - using fallback")
-                                self._session_warning_logged = True
-                    
-                    # 🔥 BUILD 165: RMS already calculated above at line 2937 (before noise gate)
-                    # No need to recalculate - reuse the 'rms' variable
-                    
-                    # 🔥 BUILD 165: BALANCED BARGE-IN - Filter noise while allowing speech
-                    # ✅ P0-2: Clean barge-in with local RMS VAD only (no duplex/guards)
-                    # 🔥 Check per-call override (set based on ai_provider)
-                    use_realtime_for_this_call = getattr(self, '_USE_REALTIME_API_OVERRIDE', USE_REALTIME_API)
-                    if use_realtime_for_this_call and self.realtime_thread and self.realtime_thread.is_alive():
-                        # 🔍 DEBUG: Log AI speaking state every 50 frames (~1 second)
-                        if not hasattr(self, '_barge_in_debug_counter'):
-                            self._barge_in_debug_counter = 0
-                        self._barge_in_debug_counter += 1
+                                self._frames_dropped_by_filters += 1  # Dropped by echo gate filter
+                                self._frames_dropped_by_reason[FrameDropReason.ECHO_GATE] += 1  # Detailed tracking
+                                return False
+                            elif window_is_open:
+                                # Forwarding window is open - let audio through
+                                if not hasattr(self, '_forwarding_window_logged'):
+                                    logger.info(f"📤 [P0-3] Forwarding audio through {FORWARDING_WINDOW_MS}ms window (frames={self._echo_gate_consec_frames})")
+                                    self._forwarding_window_logged = True
                         
-                        if self._barge_in_debug_counter % 50 == 0:
-                            # ✅ NEW REQ 3: Enhanced logging with rms, threshold, consec_frames for tuning (DEBUG only)
-                            current_threshold = MIN_SPEECH_RMS
-                            logger.debug(f"[BARGE-IN DEBUG] is_ai_speaking={self.is_ai_speaking_event.is_set()}, "
-                                  f"user_has_spoken={self.user_has_spoken}, waiting_for_dtmf={self.waiting_for_dtmf}, "
-                                  f"rms={rms:.0f}, threshold={current_threshold:.0f}, voice_frames={self.barge_in_voice_frames}/{BARGE_IN_VOICE_FRAMES}")
+                        # Check echo decay period (800ms after AI stops speaking)
+                        if hasattr(self, '_ai_finished_speaking_ts') and self._ai_finished_speaking_ts:
+                            echo_decay_ms = (time.time() - self._ai_finished_speaking_ts) * 1000
+                            if echo_decay_ms < POST_AI_COOLDOWN_MS:
+                                # Still in echo decay period - block unless:
+                                # 1. OpenAI speech detection active
+                                # 2. Barge-in active
+                                # 3. Forwarding window is open
+                                if not self._realtime_speech_active and not self.barge_in_active and not window_is_open:
+                                    if not hasattr(self, '_echo_decay_logged') or not self._echo_decay_logged:
+                                        logger.info(f"🛡️ [P0-3] Blocking - echo decay ({echo_decay_ms:.0f}ms, window_open={window_is_open})")
+                                        self._echo_decay_logged = True
+                                    # 🔥 FIX: Track frame drop reason
+                                    self._stats_audio_blocked += 1
+                                    self._frames_dropped_by_filters += 1  # Dropped by echo decay filter
+                                    self._frames_dropped_by_reason[FrameDropReason.ECHO_DECAY] += 1  # Detailed tracking
+                                    return False
+                            else:
+                                # Echo decay complete - reset log flags for next AI response
+                                self._echo_gate_logged = False
+                                self._echo_decay_logged = False
+                                self._forwarding_window_logged = False
+                                self._echo_gate_consec_frames = 0
+                                # Also close forwarding window
+                                self._forwarding_window_open_ts = None
+                else:
+                    # Greeting finished - don't block user speech at all, let OpenAI detect barge-in
+                    self._echo_gate_consec_frames = 0
+                
+                # 🔥 BUILD 171: CONSECUTIVE FRAME REQUIREMENT
+                # Track consecutive voice frames before considering it real speech
+                # This prevents random noise spikes from triggering transcription
+                # 🔥 BUILD 303: During barge-in, don't decay frames - let everything through!
+                if not is_noise and rms >= MIN_SPEECH_RMS:
+                    self._consecutive_voice_frames += 1
+                elif not self.barge_in_active:  # Only decay if NOT in barge-in mode
+                    # Reset on silence/noise - require sustained speech
+                    if self._consecutive_voice_frames > 0:
+                        self._consecutive_voice_frames = max(0, self._consecutive_voice_frames - 2)  # Decay slowly
+                
+                # 🔥 BUILD 171: Only send audio if we have enough consecutive frames OR bypass is active
+                # 🔥 BUILD 302/303: ALWAYS send during barge-in, even if noise/low RMS!
+                has_sustained_speech = self._consecutive_voice_frames >= MIN_CONSECUTIVE_VOICE_FRAMES
+                
+                # ═══════════════════════════════════════════════════════════════════════
+                # 🎯 P0-4: SIMPLE_MODE Must Be Passthrough (Master Instruction)
+                # ═══════════════════════════════════════════════════════════════════════
+                # ❌ NO guards in SIMPLE_MODE
+                # ❌ NO frame dropping in SIMPLE_MODE  
+                # ❌ NO echo_window in SIMPLE_MODE
+                # ❌ NO hallucination filters in SIMPLE_MODE
+                # ✅ Passthrough + logs only
+                # ═══════════════════════════════════════════════════════════════════════
+                if SIMPLE_MODE:
+                    # 🔥 P0-4: SIMPLE_MODE = passthrough ONLY, trust OpenAI completely
+                    should_send_audio = True  # ALWAYS send in SIMPLE_MODE
+                    is_noise = False  # Trust OpenAI's VAD for noise filtering
+                elif self.barge_in_active or self._realtime_speech_active:
+                    should_send_audio = True  # Send EVERYTHING during barge-in or active speech
+                    is_noise = False  # Force override noise flag too
+                else:
+                    should_send_audio = (has_sustained_speech or speech_bypass_active) and not is_noise
+                
+                # 🔥 BUILD 165: ONLY send audio above noise threshold AND sustained speech!
+                if should_send_audio:
+                    try:
+                        # 🔍 DEBUG: Log first few frames from Twilio (only in development mode)
+                        if not hasattr(self, '_twilio_audio_chunks_sent'):
+                            self._twilio_audio_chunks_sent = 0
+                        self._twilio_audio_chunks_sent += 1
                         
-                        # 🔥 FIX 2: Barge-in moved to speech_started ONLY
-                        # No RMS-based barge-in here - trust OpenAI VAD in speech_started event
-                        # This section previously had RMS-based barge-in logic (removed)
+                        # 🎯 TASK A.2: Log SIMPLE MODE bypass confirmation (first 3 frames only in dev)
+                        # DEBUG=0 → development (verbose), DEBUG=1 → production (quiet)
+                        if not DEBUG and self._twilio_audio_chunks_sent <= 3:
+                            # Only log first 3 frames in development mode
+                            first5_bytes = ' '.join([f'{b:02x}' for b in mulaw[:5]])
+                            mode_info = "SIMPLE_MODE" if SIMPLE_MODE else "FILTERED_MODE"
+                            guard_status = "BYPASSED" if (SIMPLE_MODE and not getattr(self, '_audio_guard_enabled', False)) else "ACTIVE"
+                            logger.info(f"🎤 [BUILD 166] Noise gate {guard_status} - sending ALL audio to OpenAI")
+                            logger.info(f"[REALTIME] sending audio TO OpenAI: chunk#{self._twilio_audio_chunks_sent}, μ-law bytes={len(mulaw)}, first5={first5_bytes}, rms={rms:.0f}, mode={mode_info}")
+                        
+                        self.realtime_audio_in_queue.put_nowait(b64)
+                    except queue.Full:
+                        # 🔥 FIX: Track queue full drops
+                        self._stats_audio_blocked += 1
+                        self._frames_dropped_by_queue_full += 1
+                        self._frames_dropped_by_reason[FrameDropReason.QUEUE_FULL] += 1  # Detailed tracking
+                        # Rate-limit logging
+                        if not hasattr(self, '_queue_full_log_count'):
+                            self._queue_full_log_count = 0
+                        self._queue_full_log_count += 1
+                        if self._queue_full_log_count % 50 == 1:
+                            logger.warning(f"⚠️ [QUEUE_FULL] Dropped {self._queue_full_log_count} frames - realtime_audio_in_queue full")
+                        pass
+                else:
+                    # 🔥 BUILD 171: Enhanced logging for debugging
+                    if not hasattr(self, '_noise_reject_count'):
+                        self._noise_reject_count = 0
+                    self._noise_reject_count += 1
+                    # Log every 100 rejected frames with more detail
+                    if self._noise_reject_count % 100 == 0:
+                        reason = "noise" if is_noise else f"insufficient_consec_frames({self._consecutive_voice_frames}/{MIN_CONSECUTIVE_VOICE_FRAMES})"
+                        logger.info(f"🔇 [AUDIO GATE] Blocked {self._noise_reject_count} frames (rms={rms:.0f}, reason={reason})")
+            # ⚡ STREAMING STT: Legacy Google STT (DISABLED - not used for Gemini)
+            # Gemini uses batch Whisper STT, not streaming
+            # This code block is kept for historical reasons only
+            use_realtime_for_this_call = getattr(self, '_USE_REALTIME_API_OVERRIDE', USE_REALTIME_API)
+            if not use_realtime_for_this_call and self.call_sid and pcm16 and not is_noise:
+                session = _get_session(self.call_sid)
+                if session:
+                    session.push_audio(pcm16)
+                    # 🔥 FIX: Increment frames_forwarded counter for Gemini pipeline
+                    # This prevents FRAME_ACCOUNTING_ERROR when using Gemini provider
+                    self._stats_audio_sent += 1
+                    # Update session timestamp to prevent cleanup
+                    with _registry_lock:
+                        item = _sessions_registry.get(self.call_sid)
+                        if item:
+                            item["ts"] = time.time()
+                elif USE_STREAMING_STT:
+                    # ⚠️ Session should exist but doesn't!
+                    if not hasattr(self, '_session_warning_logged'):
+                        logger.warning(f"⚠️ [STT] No streaming session for {self.call_sid[:8]} - using fallback")
+                        self._session_warning_logged = True
+            
+            # 🔥 BUILD 165: RMS already calculated above at line 2937 (before noise gate)
+            # No need to recalculate - reuse the 'rms' variable
+            
+            # 🔥 BUILD 165: BALANCED BARGE-IN - Filter noise while allowing speech
+            # ✅ P0-2: Clean barge-in with local RMS VAD only (no duplex/guards)
+            # 🔥 Check per-call override (set based on ai_provider)
+            use_realtime_for_this_call = getattr(self, '_USE_REALTIME_API_OVERRIDE', USE_REALTIME_API)
+            if use_realtime_for_this_call and self.realtime_thread and self.realtime_thread.is_alive():
+                # 🔍 DEBUG: Log AI speaking state every 50 frames (~1 second)
+                if not hasattr(self, '_barge_in_debug_counter'):
+                    self._barge_in_debug_counter = 0
+                self._barge_in_debug_counter += 1
+                
+                if self._barge_in_debug_counter % 50 == 0:
+                    # ✅ NEW REQ 3: Enhanced logging with rms, threshold, consec_frames for tuning (DEBUG only)
+                    current_threshold = MIN_SPEECH_RMS
+                    logger.debug(f"[BARGE-IN DEBUG] is_ai_speaking={self.is_ai_speaking_event.is_set()}, "
+                          f"user_has_spoken={self.user_has_spoken}, waiting_for_dtmf={self.waiting_for_dtmf}, "
+                          f"rms={rms:.0f}, threshold={current_threshold:.0f}, voice_frames={self.barge_in_voice_frames}/{BARGE_IN_VOICE_FRAMES}")
+                
+                # 🔥 FIX 2: Barge-in moved to speech_started ONLY
+                # No RMS-based barge-in here - trust OpenAI VAD in speech_started event
+                # This section previously had RMS-based barge-in logic (removed)
+            
+            # 🔥 BUILD 165: Calibration already done above (before audio routing)
+            # No duplicate calibration needed here
+            
+            # 🔥 BUILD 325: Voice detection with balanced threshold
+            if self.is_calibrated:
+                is_strong_voice = rms > self.vad_threshold
+            else:
+                # Before calibration - use MIN_SPEECH_RMS (60) - trust OpenAI VAD
+                is_strong_voice = rms > MIN_SPEECH_RMS
+            
+            # ✅ FIXED: Update last_voice_ts only with VERY strong voice
+            current_time = time.time()
+            # ✅ EXTRA CHECK: Only if RMS is significantly above threshold (use calibrated or MIN_SPEECH_RMS)
+            if is_strong_voice and rms > (getattr(self, 'vad_threshold', MIN_SPEECH_RMS) * 1.2):
+                self.last_voice_ts = current_time
+                # 🔧 Reduced logging spam - max once per 3 seconds
+                if not hasattr(self, 'last_debug_ts') or (current_time - self.last_debug_ts) > 3.0:
+                    logger.info(f"🎙️ REAL_VOICE: rms={rms:.1f} > threshold={getattr(self, 'vad_threshold', 'uncalibrated'):.1f}")
+                    self.last_debug_ts = current_time
+            
+            # חישוב דממה אמיתי - מאז הקול האחרון! 
+            # אם אין קול בכלל, דממה = 0 (כדי שלא נתקע)
+            silence_time = (current_time - self.last_voice_ts) if self.last_voice_ts > 0 else 0
+            
+            # ✅ לוגים נקיים - רק אירועים חשובים (לא כל frame)  
+            
+            # 🔒 BARGE-IN FIX: Audio now flows continuously to OpenAI for speech detection
+            # OpenAI's server_vad detects user speech and handles barge-in automatically
+            
+            # 🔥 BUILD 165: FALLBACK BARGE-IN - ONLY for non-Realtime API mode!
+            # Realtime API has its own barge-in handler above (lines 3010-3065)
+            # This is for Gemini pipeline only (not OpenAI Realtime)
+            use_realtime_for_this_call = getattr(self, '_USE_REALTIME_API_OVERRIDE', USE_REALTIME_API)
+            if ENABLE_BARGE_IN and not self.is_playing_greeting and not use_realtime_for_this_call:
+                # ספירת פריימים רצופים של קול חזק בלבד
+                if is_strong_voice:
+                    self.voice_in_row += 1
+                else:
+                    self.voice_in_row = max(0, self.voice_in_row - 2)  # קיזוז מהיר לרעשים
+
+                # ⚡ SIMPLIFIED BARGE-IN: Fast and speech-based
+                # Only trigger after user has spoken at least once (no false positives during greeting)
+                if self.speaking and not self.waiting_for_dtmf:
+                    # Do NOT allow barge-in before the user has ever spoken
+                    if not self.user_has_spoken:
+                        # User never spoke yet → do not treat noise as barge-in
+                        return False
                     
-                    # 🔥 BUILD 165: Calibration already done above (before audio routing)
-                    # No duplicate calibration needed here
+                    time_since_tts_start = current_time - self.speaking_start_ts
                     
-                    # 🔥 BUILD 325: Voice detection with balanced threshold
-                    if self.is_calibrated:
-                        is_strong_voice = rms > self.vad_threshold
-                    else:
-                        # Before calibration - use MIN_SPEECH_RMS (60) - trust OpenAI VAD
-                        is_strong_voice = rms > MIN_SPEECH_RMS
+                    # Short grace period (300ms) to avoid echo of our own TTS
+                    grace_period = 0.3
+                    if time_since_tts_start < grace_period:
+                        return False
                     
-                    # ✅ FIXED: Update last_voice_ts only with VERY strong voice
-                    current_time = time.time()
-                    # ✅ EXTRA CHECK: Only if RMS is significantly above threshold (use calibrated or MIN_SPEECH_RMS)
-                    if is_strong_voice and rms > (getattr(self, 'vad_threshold', MIN_SPEECH_RMS) * 1.2):
-                        self.last_voice_ts = current_time
-                        # 🔧 Reduced logging spam - max once per 3 seconds
-                        if not hasattr(self, 'last_debug_ts') or (current_time - self.last_debug_ts) > 3.0:
-                            logger.info(f"🎙️ REAL_VOICE: rms={rms:.1f} > threshold={getattr(self, 'vad_threshold', 'uncalibrated'):.1f}")
-                            self.last_debug_ts = current_time
-                    
-                    # חישוב דממה אמיתי - מאז הקול האחרון! 
-                    # אם אין קול בכלל, דממה = 0 (כדי שלא נתקע)
-                    silence_time = (current_time - self.last_voice_ts) if self.last_voice_ts > 0 else 0
-                    
-                    # ✅ לוגים נקיים - רק אירועים חשובים (לא כל frame)  
-                    
-                    # 🔒 BARGE-IN FIX: Audio now flows continuously to OpenAI for speech detection
-                    # OpenAI's server_vad detects user speech and handles barge-in automatically
-                    
-                    # 🔥 BUILD 165: FALLBACK BARGE-IN - ONLY for non-Realtime API mode!
-                    # Realtime API has its own barge-in handler above (lines 3010-3065)
-                    # This is for Gemini pipeline only (not OpenAI Realtime)
-                    use_realtime_for_this_call = getattr(self, '_USE_REALTIME_API_OVERRIDE', USE_REALTIME_API)
-                    if ENABLE_BARGE_IN and not self.is_playing_greeting and not use_realtime_for_this_call:
-                        # ספירת פריימים רצופים של קול חזק בלבד
-                        if is_strong_voice:
-                            self.voice_in_row += 1
-                        else:
-                            self.voice_in_row = max(0, self.voice_in_row - 2)  # קיזוז מהיר לרעשים
-
-                        # ⚡ SIMPLIFIED BARGE-IN: Fast and speech-based
-                        # Only trigger after user has spoken at least once (no false positives during greeting)
-                        if self.speaking and not self.waiting_for_dtmf:
-                            # Do NOT allow barge-in before the user has ever spoken
-                            if not self.user_has_spoken:
-                                # User never spoke yet → do not treat noise as barge-in
-                                continue
-                            
-                            time_since_tts_start = current_time - self.speaking_start_ts
-                            
-                            # Short grace period (300ms) to avoid echo of our own TTS
-                            grace_period = 0.3
-                            if time_since_tts_start < grace_period:
-                                continue
-                            
-                            # Use our calibrated speech threshold as barge-in trigger
-                            speech_threshold = getattr(self, "vad_threshold", None) or MIN_SPEECH_RMS
-                            
-                            if rms >= speech_threshold:
-                                logger.info(f"[BARGE-IN FALLBACK] User speech detected (rms={rms:.1f}, threshold={speech_threshold:.1f})")
-                                
-                                # Stop AI speaking
-                                self.speaking = False
-                                
-                                # Clean up state
-                                self.state = STATE_LISTEN
-                                self.processing = False
-                                self.buf.clear()
-                                self.last_voice_ts = current_time
-                                self.voice_in_row = 0
-                                
-                                logger.info("🎤 BARGE-IN -> LISTENING (user can speak now)")
-                                
-                                # Send clear to Twilio
-                                if not self.ws_connection_failed:
-                                    try:
-                                        self._tx_enqueue({"type": "clear"})
-                                    except:
-                                        pass
-                                continue
+                    # Use our calibrated speech threshold as barge-in trigger
+                    speech_threshold = getattr(self, "vad_threshold", None) or MIN_SPEECH_RMS
                     
-                    # ✅ איסוף אודיו עם זיהוי דממה תקין
-                    if not self.processing and self.state == STATE_LISTEN:
-                        # חלון רפרקטורי אחרי TTS
-                        if (current_time - self.last_tts_end_ts) < (REPLY_REFRACTORY_MS/1000.0):
-                            continue
+                    if rms >= speech_threshold:
+                        logger.info(f"[BARGE-IN FALLBACK] User speech detected (rms={rms:.1f}, threshold={speech_threshold:.1f})")
                         
-                        # אסוף אודיו רק כשיש קול או כשיש כבר דבר מה בבאפר
-                        if is_strong_voice or len(self.buf) > 0:
-                            # ⚡ STREAMING STT: Mark start of new utterance (once) + save partial text
-                            if len(self.buf) == 0 and is_strong_voice:
-                                # Callback to save BEST (longest) partial text for early EOU detection
-                                def save_partial(text):
-                                    # 🔥 FIX: Save LONGEST partial, not last! Google STT sometimes sends shorter corrections
-                                    current_best = getattr(self, "last_partial_text", "")
-                                    if len(text) > len(current_best):
-                                        self.last_partial_text = text
-                                        logger.info(f"🔊 PARTIAL (best): '{text}' ({len(text)} chars)")
-                                    else:
-                                        logger.info(f"🔊 PARTIAL (ignored): '{text}' ({len(text)} chars) - keeping '{current_best}' ({len(current_best)} chars)")
-                                
-                                self.last_partial_text = ""  # Reset
-                                self._utterance_begin(partial_cb=save_partial)
-                            
-                            self.buf.extend(pcm16)
-                            dur = len(self.buf) / (2 * SR)
-                            
-                            # ⚡ BUILD 107: ULTRA-LOW LATENCY - 0.5s silence for FAST responses
-                            # תגובות קצרות: min_silence קצר מאוד (0.5s) ⚡⚡⚡
-                            # משפטים ארוכים: min_silence קצר (1.8s במקום 3.0s)
-                            if dur < 2.0:
-                                min_silence = 0.5  # ⚡ תגובה קצרה - סופר מהר! (חצי שניה!)
-                            else:
-                                min_silence = 1.8  # ⚡ משפט ארוך - מהיר (במקום 3.0s)
-                            
-                            silent = silence_time >= min_silence  
-                            too_long = dur >= MAX_UTT_SEC
-                            min_duration = 0.6  # ⚡ BUILD 107: מינימום קצר יותר - 0.6s במקום 0.7s
-                            
-                            # ⚡ BUILD 107: באפר קטן יותר = תגובה מהירה יותר!
-                            buffer_big_enough = len(self.buf) > 8000  # ⚡ 0.5s במקום 0.8s - חוסך 300ms!
-                            
-                            # ⚡⚡⚡ BUILD 107: EARLY EOU - מענה מוקדם על partial חזק!
-                            # אם יש partial חזק (12+ תווים וסיום במשפט) + 0.35s דממה - קפיצה מיד!
-                            last_partial = getattr(self, "last_partial_text", "")
-                            high_conf_partial = (len(last_partial) >= 12) and any(last_partial.endswith(p) for p in (".", "?", "!", "…", ":", ";"))
-                            early_silence = silence_time >= 0.35  # דממה קצרצרה
-                            
-                            if high_conf_partial and early_silence and dur >= 0.5:
-                                logger.info(f"⚡⚡⚡ EARLY EOU on strong partial: '{last_partial}' ({dur:.1f}s, {silence_time:.2f}s silence)")
-                                # קפיצה מיידית לעיבוד!
-                                silent = True
-                                buffer_big_enough = True
-                            
-                            # סוף מבע: דממה מספקת OR זמן יותר מדי OR באפר גדול עם שקט
-                            if ((silent and buffer_big_enough) or too_long) and dur >= min_duration:
-                                logger.info(f"🎤 END OF UTTERANCE: {dur:.1f}s audio, conversation #{self.conversation_id}")
-                                
-                                # ✅ מדידת Turn Latency - התחלת מדידה
-                                self.eou_timestamp = time.time()
-                                
-                                # מעבר לעיבוד
-                                self.processing = True
-                                self.processing_start_ts = current_time
-                                self.state = STATE_THINK
-                                current_id = self.conversation_id
-                                self.conversation_id += 1
-                                
-                                # עיבוד במנותק
-                                utt_pcm = bytes(self.buf)
-                                self.buf.clear()
-                                self.last_voice_ts = 0  # אפס לסיבוב הבא
-                                
-                                logger.info(f"🧠 STATE -> PROCESSING | len={len(utt_pcm)} | silence_ms={silence_time*1000:.0f}")
-                                
-                                try:
-                                    self._process_utterance_safe(utt_pcm, current_id)
-                                except Exception as proc_err:
-                                    logger.error(f"❌ Audio processing failed for conversation #{current_id}: {proc_err}")
-                                    import traceback
-                                    traceback.print_exc()
-                                    # Continue without crashing WebSocket
-                                finally:
-                                    self.processing = False
-                                    if self.state == STATE_THINK:
-                                        self.state = STATE_LISTEN
-                                    logger.info(f"✅ Processing complete for conversation #{current_id}")
-                    
-                    # ✅ WebSocket Keepalive - מונע נפילות אחרי 5 דקות (DEBUG only)
-                    if current_time - self.last_keepalive_ts > self.keepalive_interval:
-                        self.last_keepalive_ts = current_time
-                        self.heartbeat_counter += 1
+                        # Stop AI speaking
+                        self.speaking = False
                         
-                        # שלח heartbeat mark event אם החיבור תקין
-                        if not self.ws_connection_failed:
-                            try:
-                                heartbeat_msg = {
-                                    "event": "mark",
-                                    "streamSid": self.stream_sid,
-                                    "mark": {"name": f"heartbeat_{self.heartbeat_counter}"}
-                                }
-                                success = self._ws_send(json.dumps(heartbeat_msg))
-                                if success:
-                                    logger.debug(f"WS_KEEPALIVE #{self.heartbeat_counter} (prevents 5min timeout)")
-                            except Exception as e:
-                                logger.debug(f"Keepalive failed: {e}")
-                        else:
-                            logger.debug(f"SKIPPING keepalive - WebSocket connection failed")
-                    
-                    # ✅ Watchdog: וודא שלא תקועים במצב + EOU כפויה
-                    if self.processing and (current_time - self.processing_start_ts) > 2.5:
-                        logger.warning("⚠️ PROCESSING TIMEOUT - forcing reset")
-                        self.processing = False
+                        # Clean up state
                         self.state = STATE_LISTEN
+                        self.processing = False
                         self.buf.clear()
+                        self.last_voice_ts = current_time
+                        self.voice_in_row = 0
+                        
+                        logger.info("🎤 BARGE-IN -> LISTENING (user can speak now)")
+                        
+                        # Send clear to Twilio
+                        if not self.ws_connection_failed:
+                            try:
+                                self._tx_enqueue({"type": "clear"})
+                            except:
+                                pass
+                        return False
+            
+            # ✅ איסוף אודיו עם זיהוי דממה תקין
+            if not self.processing and self.state == STATE_LISTEN:
+                # חלון רפרקטורי אחרי TTS
+                if (current_time - self.last_tts_end_ts) < (REPLY_REFRACTORY_MS/1000.0):
+                    return False
+                
+                # אסוף אודיו רק כשיש קול או כשיש כבר דבר מה בבאפר
+                if is_strong_voice or len(self.buf) > 0:
+                    # ⚡ STREAMING STT: Mark start of new utterance (once) + save partial text
+                    if len(self.buf) == 0 and is_strong_voice:
+                        # Callback to save BEST (longest) partial text for early EOU detection
+                        def save_partial(text):
+                            # 🔥 FIX: Save LONGEST partial, not last! Google STT sometimes sends shorter corrections
+                            current_best = getattr(self, "last_partial_text", "")
+                            if len(text) > len(current_best):
+                                self.last_partial_text = text
+                                logger.info(f"🔊 PARTIAL (best): '{text}' ({len(text)} chars)")
+                            else:
+                                logger.info(f"🔊 PARTIAL (ignored): '{text}' ({len(text)} chars) - keeping '{current_best}' ({len(current_best)} chars)")
+                        
+                        self.last_partial_text = ""  # Reset
+                        self._utterance_begin(partial_cb=save_partial)
                     
-                    # ✅ LONGER speaking timeout to prevent cutoff mid-sentence
-                    if self.speaking and (current_time - self.speaking_start_ts) > 15.0:
-                        logger.warning("⚠️ SPEAKING TIMEOUT - forcing reset after 15s")
-                        self.speaking = False
-                        self.state = STATE_LISTEN
+                    self.buf.extend(pcm16)
+                    dur = len(self.buf) / (2 * SR)
                     
-                    # ✅ EOU חירום: מכריח עיבוד אם הבאפר גדול מדי
-                    if (not self.processing and self.state == STATE_LISTEN and 
-                        len(self.buf) > 96000 and  # ✅ FIX: 6.0s של אודיו (לא קוטע משפטים ארוכים!)
-                        silence_time > 2.0):      # ✅ FIX: 2.0s שקט לחירום - שקט אמיתי!
-                        logger.info(f"🚨 EMERGENCY EOU: {len(self.buf)/(2*SR):.1f}s audio, silence={silence_time:.2f}s")
-                        # כפה EOU
+                    # ⚡ BUILD 107: ULTRA-LOW LATENCY - 0.5s silence for FAST responses
+                    # תגובות קצרות: min_silence קצר מאוד (0.5s) ⚡⚡⚡
+                    # משפטים ארוכים: min_silence קצר (1.8s במקום 3.0s)
+                    if dur < 2.0:
+                        min_silence = 0.5  # ⚡ תגובה קצרה - סופר מהר! (חצי שניה!)
+                    else:
+                        min_silence = 1.8  # ⚡ משפט ארוך - מהיר (במקום 3.0s)
+                    
+                    silent = silence_time >= min_silence  
+                    too_long = dur >= MAX_UTT_SEC
+                    min_duration = 0.6  # ⚡ BUILD 107: מינימום קצר יותר - 0.6s במקום 0.7s
+                    
+                    # ⚡ BUILD 107: באפר קטן יותר = תגובה מהירה יותר!
+                    buffer_big_enough = len(self.buf) > 8000  # ⚡ 0.5s במקום 0.8s - חוסך 300ms!
+                    
+                    # ⚡⚡⚡ BUILD 107: EARLY EOU - מענה מוקדם על partial חזק!
+                    # אם יש partial חזק (12+ תווים וסיום במשפט) + 0.35s דממה - קפיצה מיד!
+                    last_partial = getattr(self, "last_partial_text", "")
+                    high_conf_partial = (len(last_partial) >= 12) and any(last_partial.endswith(p) for p in (".", "?", "!", "…", ":", ";"))
+                    early_silence = silence_time >= 0.35  # דממה קצרצרה
+                    
+                    if high_conf_partial and early_silence and dur >= 0.5:
+                        logger.info(f"⚡⚡⚡ EARLY EOU on strong partial: '{last_partial}' ({dur:.1f}s, {silence_time:.2f}s silence)")
+                        # קפיצה מיידית לעיבוד!
+                        silent = True
+                        buffer_big_enough = True
+                    
+                    # סוף מבע: דממה מספקת OR זמן יותר מדי OR באפר גדול עם שקט
+                    if ((silent and buffer_big_enough) or too_long) and dur >= min_duration:
+                        logger.info(f"🎤 END OF UTTERANCE: {dur:.1f}s audio, conversation #{self.conversation_id}")
+                        
+                        # ✅ מדידת Turn Latency - התחלת מדידה
+                        self.eou_timestamp = time.time()
+                        
+                        # מעבר לעיבוד
                         self.processing = True
                         self.processing_start_ts = current_time
                         self.state = STATE_THINK
                         current_id = self.conversation_id
                         self.conversation_id += 1
                         
-                        utt_pcm = bytes(self.buf)
+                        # עיבוד במנותק
+                        utt_pcm = self.buf.snapshot()
                         self.buf.clear()
-                        self.last_voice_ts = 0
+                        self.last_voice_ts = 0  # אפס לסיבוב הבא
                         
-                        logger.info(f"🧠 EMERGENCY STATE -> PROCESSING | len={len(utt_pcm)} | silence_ms={silence_time*1000:.0f}")
+                        logger.info(f"🧠 STATE -> PROCESSING | len={len(utt_pcm)} | silence_ms={silence_time*1000:.0f}")
                         
                         try:
                             self._process_utterance_safe(utt_pcm, current_id)
                         except Exception as proc_err:
-                            logger.error(f"❌ Emergency audio processing failed for conversation #{current_id}: {proc_err}")
+                            logger.error(f"❌ Audio processing failed for conversation #{current_id}: {proc_err}")
                             import traceback
                             traceback.print_exc()
                             # Continue without crashing WebSocket
@@ -11546,273 +11740,339 @@ class MediaStreamHandler:
                             self.processing = False
                             if self.state == STATE_THINK:
                                 self.state = STATE_LISTEN
-                            logger.info(f"✅ Emergency processing complete for conversation #{current_id}")
-                    
-                    continue
-                
-                if et == "dtmf":
-                    # ⚡ BUILD 121: DTMF digit collection for phone number input
-                    digit = evt.get("dtmf", {}).get("digit", "")
-                    logger.info(f"📞 DTMF pressed: {digit} (buffer={self.dtmf_buffer})")
-                    
-                    if digit == "#":
-                        # End of input - process collected digits
-                        if not self.dtmf_buffer:
-                            # 🎯 תרחיש 1: סולמית בלבד = דילוג
-                            logger.info(f"⏭️ DTMF skip: empty buffer, user skipped phone input")
-                            self.waiting_for_dtmf = False
-                            
-                            # Inject skip message to AI
-                            skip_text = "אני מדלג על מתן המספר"
-                            logger.info(f"🎯 DTMF skip -> AI: '{skip_text}'")
-                            
-                            try:
-                                self._process_dtmf_skip()
-                            except Exception as e:
-                                logger.error(f"❌ DTMF skip processing failed: {e}")
-                                import traceback
-                                traceback.print_exc()
-                        
-                        elif len(self.dtmf_buffer) >= 9:
-                            # 🎯 תרחיש 2: ספרות + # = שליחה
-                            phone_number = self.dtmf_buffer
-                            logger.info(f"✅ DTMF phone collected: {phone_number}")
-                            
-                            # Clear buffer
-                            self.dtmf_buffer = ""
-                            self.waiting_for_dtmf = False
-                            
-                            # Inject as if customer said the number
-                            hebrew_text = f"המספר שלי הוא {phone_number}"
-                            logger.info(f"🎯 DTMF -> AI: '{hebrew_text}'")
-                            
-                            # Process as normal utterance (trigger AI response)
-                            try:
-                                self._process_dtmf_phone(phone_number)
-                            except Exception as e:
-                                logger.error(f"❌ DTMF processing failed: {e}")
-                                import traceback
-                                traceback.print_exc()
-                        else:
-                            # Buffer too short
-                            logger.warning(f"⚠️ DTMF input too short: {self.dtmf_buffer} (need 9+ digits)")
-                            # Speak error message
-                            self._speak_tts("המספר קצר מדי, נא להקיש 9 ספרות לפחות או לחץ סולמית כדי לדלג")
-                        
-                        # Reset buffer anyway
-                        self.dtmf_buffer = ""
-                        self.waiting_for_dtmf = False
-                        
-                    elif digit == "*":
-                        # Clear/restart input
-                        logger.info(f"🔄 DTMF cleared (was: {self.dtmf_buffer})")
-                        self.dtmf_buffer = ""
-                        # Don't speak - just clear buffer
-                        
-                    elif digit.isdigit():
-                        # Append digit
-                        self.dtmf_buffer += digit
-                        logger.info(f"📝 DTMF buffer: {self.dtmf_buffer}")
-                        
-                        # 🔥 AUTO-SUBMIT: If we have 10 digits (Israeli mobile), auto-process without waiting for #
-                        if len(self.dtmf_buffer) == 10:
-                            phone_number = self.dtmf_buffer
-                            logger.info(f"✅ DTMF auto-submit (10 digits): {phone_number}")
-                            
-                            # Clear buffer
-                            self.dtmf_buffer = ""
-                            self.waiting_for_dtmf = False
-                            
-                            # Process the phone number
-                            try:
-                                self._process_dtmf_phone(phone_number)
-                            except Exception as e:
-                                logger.error(f"❌ DTMF auto-submit processing failed: {e}")
-                                import traceback
-                                traceback.print_exc()
-                    
-                    continue
-
-                if et == "mark":
-                    # ✅ סימון TTS הושלם - חזור להאזנה
-                    mark_name = evt.get("mark", {}).get("name", "")
-                    if mark_name == "assistant_tts_end":
-                        logger.info("🎯 TTS_MARK_ACK: assistant_tts_end -> LISTENING")
-                        self.speaking = False
-                        self.state = STATE_LISTEN
-                        self.mark_pending = False
-                        self.last_tts_end_ts = time.time()
-                        # איפוס חשוב למערכת VAD
-                        self.last_voice_ts = 0
-                        self.voice_in_row = 0
-                        logger.info("🎤 STATE -> LISTENING | buffer_reset")
-                    elif mark_name.startswith("heartbeat_"):
-                        # אישור keepalive - התעלם
-                        pass
-                    continue
-
-                if et == "stop":
-                    logger.info(f"WS_STOP sid={self.stream_sid} rx={self.rx} tx={self.tx}")
-                    # ✅ CRITICAL: סיכום שיחה בסיום
-                    self._finalize_call_on_stop()
-                    # 🔥 SESSION LIFECYCLE: Call atomic close_session instead of manual cleanup
-                    self.close_session("twilio_stop_event")
-                    break
-
-        except ConnectionClosed as e:
-            logger.info(f"📞 WS_CLOSED sid={self.stream_sid} rx={self.rx} tx={self.tx} reason=ConnectionClosed")
-            # 🔥 SESSION LIFECYCLE: Call atomic close_session
-            self.close_session("ws_connection_closed")
-        except Exception as e:
-            # ═══════════════════════════════════════════════════════════════════════
-            # 🔥 REALTIME_FATAL: Unhandled exception in main run loop
-            # ═══════════════════════════════════════════════════════════════════════
-            import traceback
-            _orig_print(f"🔥 [REALTIME_FATAL] Unhandled exception in MediaStreamHandler.run: {e}", flush=True)
-            _orig_print(f"🔥 [REALTIME_FATAL] call_sid={self.call_sid}, stream_sid={self.stream_sid}", flush=True)
-            traceback.print_exc()
-            logger.error(f"[REALTIME_FATAL] Exception in run loop: {e}")
-            
-            # Mark realtime as failed
-            self.realtime_failed = True
-            self._realtime_failure_reason = f"RUN_EXCEPTION: {type(e).__name__}"
-        finally:
-            # 🔥 P3-1: Release capacity slot in finally block (always executes)
-            call_sid = getattr(self, 'call_sid', None)
-            if call_sid:
-                try:
-                    from server.services.calls_capacity import release_call_slot
-                    release_call_slot(call_sid)
-                except Exception as cap_err:
-                    logger.error(f"Failed to release capacity slot in finally: {cap_err}")
+                            logger.info(f"✅ Processing complete for conversation #{current_id}")
             
-            # 🔥 BUILD 169: Enhanced disconnect logging
-            session_id = getattr(self, '_call_session_id', 'N/A')
-            call_duration = time.time() - getattr(self, 'call_start_time', time.time())
-            business_id = getattr(self, 'business_id', 'N/A')
+            # ✅ WebSocket Keepalive - מונע נפילות אחרי 5 דקות (DEBUG only)
+            if current_time - self.last_keepalive_ts > self.keepalive_interval:
+                self.last_keepalive_ts = current_time
+                self.heartbeat_counter += 1
+                
+                # שלח heartbeat mark event אם החיבור תקין
+                if not self.ws_connection_failed:
+                    try:
+                        heartbeat_msg = {
+                            "event": "mark",
+                            "streamSid": self.stream_sid,
+                            "mark": {"name": f"heartbeat_{self.heartbeat_counter}"}
+                        }
+                        success = self._ws_send(json.dumps(heartbeat_msg))
+                        if success:
+                            logger.debug(f"WS_KEEPALIVE #{self.heartbeat_counter} (prevents 5min timeout)")
+                    except Exception as e:
+                        logger.debug(f"Keepalive failed: {e}")
+                else:
+                    logger.debug(f"SKIPPING keepalive - WebSocket connection failed")
             
-            # 🔥 PRODUCTION LOG: [CALL_END] - Always logged (WARNING level)
-            call_sid = getattr(self, 'call_sid', None)
-            if call_sid:
-                # Calculate warnings/errors
-                realtime_failed = getattr(self, 'realtime_failed', False)
-                failure_reason = getattr(self, '_realtime_failure_reason', None)
-                warnings_errors = []
-                if realtime_failed:
-                    warnings_errors.append(f"realtime_failed={failure_reason or 'unknown'}")
-                if self.tx == 0 and call_sid:
-                    warnings_errors.append("tx=0")
-                
-                warnings_str = ", ".join(warnings_errors) if warnings_errors else "none"
-                logger.warning(f"[CALL_END] call_sid={call_sid} duration={call_duration:.1f}s warnings={warnings_str}")
-            
-            logger.info(f"📞 [{session_id}] CALL ENDED - duration={call_duration:.1f}s, business_id={business_id}, rx={self.rx}, tx={self.tx}")
-            logger.info(f"[{session_id}] DISCONNECT - duration={call_duration:.1f}s, business={business_id}")
+            # ✅ Watchdog: וודא שלא תקועים במצב + EOU כפויה
+            if self.processing and (current_time - self.processing_start_ts) > 2.5:
+                logger.warning("⚠️ PROCESSING TIMEOUT - forcing reset")
+                self.processing = False
+                self.state = STATE_LISTEN
+                self.buf.clear()
             
-            # ═══════════════════════════════════════════════════════════════════════
-            # 🔥 REALTIME STABILITY: Final metrics logging for every call
-            # ═══════════════════════════════════════════════════════════════════════
-            # Log realtime timings for analysis
-            openai_connect_ms = getattr(self, '_metrics_openai_connect_ms', 0)
-            first_greeting_audio_ms = getattr(self, '_metrics_first_greeting_audio_ms', 0)
-            realtime_failed = getattr(self, 'realtime_failed', False)
-            failure_reason = getattr(self, '_realtime_failure_reason', None) or 'N/A'
+            # ✅ LONGER speaking timeout to prevent cutoff mid-sentence
+            if self.speaking and (current_time - self.speaking_start_ts) > 15.0:
+                logger.warning("⚠️ SPEAKING TIMEOUT - forcing reset after 15s")
+                self.speaking = False
+                self.state = STATE_LISTEN
             
-            # ═══════════════════════════════════════════════════════════════════════
-            # 🔥 PART B FIX: Distinguish GHOST SESSION from REAL CALL
-            # ═══════════════════════════════════════════════════════════════════════
-            # Ghost session criteria:
-            #   - call_sid is None (no START event received)
-            #   - rx == 0 and tx == 0 (no audio traffic)
-            #   - openai_connect_ms == 0 (never connected to OpenAI)
-            # These are Twilio preflight/probe connections - NOT actual failures!
-            # ═══════════════════════════════════════════════════════════════════════
-            is_ghost_session = (
-                self.call_sid is None and 
-                self.rx == 0 and 
-                self.tx == 0 and
-                openai_connect_ms == 0 and
-                first_greeting_audio_ms == 0
-            )
+            # ✅ EOU חירום: מכריח עיבוד אם הבאפר גדול מדי
+            if (not self.processing and self.state == STATE_LISTEN and 
+                len(self.buf) > 96000 and  # ✅ FIX: 6.0s של אודיו (לא קוטע משפטים ארוכים!)
+                silence_time > 2.0):      # ✅ FIX: 2.0s שקט לחירום - שקט אמיתי!
+                logger.info(f"🚨 EMERGENCY EOU: {len(self.buf)/(2*SR):.1f}s audio, silence={silence_time:.2f}s")
+                # כפה EOU
+                self.processing = True
+                self.processing_start_ts = current_time
+                self.state = STATE_THINK
+                current_id = self.conversation_id
+                self.conversation_id += 1
+                
+                utt_pcm = self.buf.snapshot()
+                self.buf.clear()
+                self.last_voice_ts = 0
+                
+                logger.info(f"🧠 EMERGENCY STATE -> PROCESSING | len={len(utt_pcm)} | silence_ms={silence_time*1000:.0f}")
+                
+                try:
+                    self._process_utterance_safe(utt_pcm, current_id)
+                except Exception as proc_err:
+                    logger.error(f"❌ Emergency audio processing failed for conversation #{current_id}: {proc_err}")
+                    import traceback
+                    traceback.print_exc()
+                    # Continue without crashing WebSocket
+                finally:
+                    self.processing = False
+                    if self.state == STATE_THINK:
+                        self.state = STATE_LISTEN
+                    logger.info(f"✅ Emergency processing complete for conversation #{current_id}")
             
-            if self.tx == 0 and not realtime_failed:
-                if is_ghost_session:
-                    # GHOST SESSION: WS opened but Twilio never sent START event
-                    # This is NOT a bug - just a preflight/probe connection
-                    # Do NOT log as failure, do NOT set realtime_failed
-                    _orig_print(f"📭 [REALTIME] Ghost WS session (no START, no traffic) – ignoring", flush=True)
-                else:
-                    # REAL CALL: START received (call_sid set) but tx=0 - this IS a bug!
-                    _orig_print(f"⚠️ [REALTIME] SILENT_FAILURE_DETECTED: tx=0 but realtime_failed=False!", flush=True)
-                    _orig_print(f"❌ [REALTIME_FALLBACK] Call {self.call_sid} had tx=0 (potential silent failure)", flush=True)
-                    # Mark as failed with clear reason for diagnostics
-                    realtime_failed = True
-                    failure_reason = "TX_ZERO_REAL_CALL"
-                    self.realtime_failed = True
-                    self._realtime_failure_reason = failure_reason
-            
-            # Log metrics - include is_ghost flag for monitoring
-            logger.debug(f"[METRICS] REALTIME_TIMINGS: call_sid={self.call_sid}, openai_connect_ms={openai_connect_ms}, first_greeting_audio_ms={first_greeting_audio_ms}, realtime_failed={realtime_failed}, reason={failure_reason}, tx={self.tx}, is_ghost={is_ghost_session}")
-            
-            # 🔥 GREETING OPTIMIZATION: Log complete timeline for latency analysis
-            # Get TwiML timing from stream registry (set by webhook)
-            twiml_ms = 0
-            ws_start_offset_ms = 0
-            call_direction = getattr(self, 'call_direction', 'unknown')
+            return False
+        
+        if et == "dtmf":
+            # ⚡ BUILD 121: DTMF digit collection for phone number input
+            digit = evt.get("dtmf", {}).get("digit", "")
+            logger.info(f"📞 DTMF pressed: {digit} (buffer={self.dtmf_buffer})")
             
-            if self.call_sid:
-                try:
-                    # Try to get webhook timing from stream registry
-                    twiml_ts = stream_registry.get_metric(self.call_sid, 'twiml_ready_ts')
-                    ws_connect_ts = stream_registry.get_metric(self.call_sid, 'ws_connect_ts')
+            if digit == "#":
+                # End of input - process collected digits
+                if not self.dtmf_buffer:
+                    # 🎯 תרחיש 1: סולמית בלבד = דילוג
+                    logger.info(f"⏭️ DTMF skip: empty buffer, user skipped phone input")
+                    self.waiting_for_dtmf = False
                     
-                    if twiml_ts and ws_connect_ts:
-                        ws_start_offset_ms = int((ws_connect_ts - twiml_ts) * 1000)
-                except Exception as e:
-                    pass
+                    # Inject skip message to AI
+                    skip_text = "אני מדלג על מתן המספר"
+                    logger.info(f"🎯 DTMF skip -> AI: '{skip_text}'")
+                    
+                    try:
+                        self._process_dtmf_skip()
+                    except Exception as e:
+                        logger.error(f"❌ DTMF skip processing failed: {e}")
+                        import traceback
+                        traceback.print_exc()
+                
+                elif len(self.dtmf_buffer) >= 9:
+                    # 🎯 תרחיש 2: ספרות + # = שליחה
+                    phone_number = self.dtmf_buffer
+                    logger.info(f"✅ DTMF phone collected: {phone_number}")
+                    
+                    # Clear buffer
+                    self.dtmf_buffer = ""
+                    self.waiting_for_dtmf = False
+                    
+                    # Inject as if customer said the number
+                    hebrew_text = f"המספר שלי הוא {phone_number}"
+                    logger.info(f"🎯 DTMF -> AI: '{hebrew_text}'")
+                    
+                    # Process as normal utterance (trigger AI response)
+                    try:
+                        self._process_dtmf_phone(phone_number)
+                    except Exception as e:
+                        logger.error(f"❌ DTMF processing failed: {e}")
+                        import traceback
+                        traceback.print_exc()
+                else:
+                    # Buffer too short
+                    logger.warning(f"⚠️ DTMF input too short: {self.dtmf_buffer} (need 9+ digits)")
+                    # Speak error message
+                    self._speak_tts("המספר קצר מדי, נא להקיש 9 ספרות לפחות או לחץ סולמית כדי לדלג")
+                
+                # Reset buffer anyway
+                self.dtmf_buffer = ""
+                self.waiting_for_dtmf = False
+                
+            elif digit == "*":
+                # Clear/restart input
+                logger.info(f"🔄 DTMF cleared (was: {self.dtmf_buffer})")
+                self.dtmf_buffer = ""
+                # Don't speak - just clear buffer
+                
+            elif digit.isdigit():
+                # Append digit
+                self.dtmf_buffer += digit
+                logger.info(f"📝 DTMF buffer: {self.dtmf_buffer}")
+                
+                # 🔥 AUTO-SUBMIT: If we have 10 digits (Israeli mobile), auto-process without waiting for #
+                if len(self.dtmf_buffer) == 10:
+                    phone_number = self.dtmf_buffer
+                    logger.info(f"✅ DTMF auto-submit (10 digits): {phone_number}")
+                    
+                    # Clear buffer
+                    self.dtmf_buffer = ""
+                    self.waiting_for_dtmf = False
+                    
+                    # Process the phone number
+                    try:
+                        self._process_dtmf_phone(phone_number)
+                    except Exception as e:
+                        logger.error(f"❌ DTMF auto-submit processing failed: {e}")
+                        import traceback
+                        traceback.print_exc()
             
-            # Calculate greeting SLA result
-            is_inbound = (call_direction == 'inbound')
-            greeting_threshold = 1600 if is_inbound else 2000
-            total_greeting_ms = openai_connect_ms + first_greeting_audio_ms
-            sla_met = total_greeting_ms <= greeting_threshold and total_greeting_ms > 0
+            return False
+
+        if et == "mark":
+            # ✅ סימון TTS הושלם - חזור להאזנה
+            mark_name = evt.get("mark", {}).get("name", "")
+            if mark_name == "assistant_tts_end":
+                logger.info("🎯 TTS_MARK_ACK: assistant_tts_end -> LISTENING")
+                self.speaking = False
+                self.state = STATE_LISTEN
+                self.mark_pending = False
+                self.last_tts_end_ts = time.time()
+                # איפוס חשוב למערכת VAD
+                self.last_voice_ts = 0
+                self.voice_in_row = 0
+                logger.info("🎤 STATE -> LISTENING | buffer_reset")
+            elif mark_name.startswith("heartbeat_"):
+                # אישור keepalive - התעלם
+                pass
+            return False
+
+        if et == "stop":
+            logger.info(f"WS_STOP sid={self.stream_sid} rx={self.rx} tx={self.tx}")
+            # ✅ CRITICAL: סיכום שיחה בסיום
+            self._finalize_call_on_stop()
+            # 🔥 SESSION LIFECYCLE: Call atomic close_session instead of manual cleanup
+            self.close_session("twilio_stop_event")
+            return True
+        
+        return False
+
+    def _record_run_exception(self, e):
+        """REALTIME_FATAL: unhandled exception in the reader (run / run_async)"""
+        # ═══════════════════════════════════════════════════════════════════════
+        # 🔥 REALTIME_FATAL: Unhandled exception in main run loop
+        # ═══════════════════════════════════════════════════════════════════════
+        import traceback
+        _orig_print(f"🔥 [REALTIME_FATAL] Unhandled exception in MediaStreamHandler.run: {e}", flush=True)
+        _orig_print(f"🔥 [REALTIME_FATAL] call_sid={self.call_sid}, stream_sid={self.stream_sid}", flush=True)
+        traceback.print_exc()
+        logger.error(f"[REALTIME_FATAL] Exception in run loop: {e}")
+        
+        # Mark realtime as failed
+        self.realtime_failed = True
+        self._realtime_failure_reason = f"RUN_EXCEPTION: {type(e).__name__}"
+
+    def _end_run(self):
+        """Reader teardown (always runs): capacity slot, call-end metrics, close_session"""
+        # 🔥 P3-1: Release capacity slot in finally block (always executes)
+        call_sid = getattr(self, 'call_sid', None)
+        if call_sid:
+            try:
+                from server.services.calls_capacity import release_call_slot
+                release_call_slot(call_sid)
+            except Exception as cap_err:
+                logger.error(f"Failed to release capacity slot in finally: {cap_err}")
+        
+        # 🔥 BUILD 169: Enhanced disconnect logging
+        session_id = getattr(self, '_call_session_id', 'N/A')
+        call_duration = time.time() - getattr(self, 'call_start_time', time.time())
+        business_id = getattr(self, 'business_id', 'N/A')
+        
+        # 🔥 PRODUCTION LOG: [CALL_END] - Always logged (WARNING level)
+        call_sid = getattr(self, 'call_sid', None)
+        if call_sid:
+            # Calculate warnings/errors
+            realtime_failed = getattr(self, 'realtime_failed', False)
+            failure_reason = getattr(self, '_realtime_failure_reason', None)
+            warnings_errors = []
+            if realtime_failed:
+                warnings_errors.append(f"realtime_failed={failure_reason or 'unknown'}")
+            if self.tx == 0 and call_sid:
+                warnings_errors.append("tx=0")
             
-            if not is_ghost_session and total_greeting_ms > 0:
-                # Log complete greeting timeline (only for real calls with greeting) - DEBUG ONLY
-                if sla_met:
-                    logger.debug(f"[GREETING_SLA_MET] {total_greeting_ms}ms (threshold={greeting_threshold}ms, direction={call_direction})")
-                else:
-                    logger.debug(f"[GREETING_SLA_FAILED] inbound={is_inbound} twiml_ms={twiml_ms} openai_ms={openai_connect_ms} greet_ms={first_greeting_audio_ms} total={total_greeting_ms}ms > {greeting_threshold}ms")
+            warnings_str = ", ".join(warnings_errors) if warnings_errors else "none"
+            logger.warning(f"[CALL_END] call_sid={call_sid} duration={call_duration:.1f}s warnings={warnings_str}")
+        
+        logger.info(f"📞 [{session_id}] CALL ENDED - duration={call_duration:.1f}s, business_id={business_id}, rx={self.rx}, tx={self.tx}")
+        logger.info(f"[{session_id}] DISCONNECT - duration={call_duration:.1f}s, business={business_id}")
+        
+        # ═══════════════════════════════════════════════════════════════════════
+        # 🔥 REALTIME STABILITY: Final metrics logging for every call
+        # ═══════════════════════════════════════════════════════════════════════
+        # Log realtime timings for analysis
+        openai_connect_ms = getattr(self, '_metrics_openai_connect_ms', 0)
+        first_greeting_audio_ms = getattr(self, '_metrics_first_greeting_audio_ms', 0)
+        realtime_failed = getattr(self, 'realtime_failed', False)
+        failure_reason = getattr(self, '_realtime_failure_reason', None) or 'N/A'
+        
+        # ═══════════════════════════════════════════════════════════════════════
+        # 🔥 PART B FIX: Distinguish GHOST SESSION from REAL CALL
+        # ═══════════════════════════════════════════════════════════════════════
+        # Ghost session criteria:
+        #   - call_sid is None (no START event received)
+        #   - rx == 0 and tx == 0 (no audio traffic)
+        #   - openai_connect_ms == 0 (never connected to OpenAI)
+        # These are Twilio preflight/probe connections - NOT actual failures!
+        # ═══════════════════════════════════════════════════════════════════════
+        is_ghost_session = (
+            self.call_sid is None and 
+            self.rx == 0 and 
+            self.tx == 0 and
+            openai_connect_ms == 0 and
+            first_greeting_audio_ms == 0
+        )
+        
+        if self.tx == 0 and not realtime_failed:
+            if is_ghost_session:
+                # GHOST SESSION: WS opened but Twilio never sent START event
+                # This is NOT a bug - just a preflight/probe connection
+                # Do NOT log as failure, do NOT set realtime_failed
+                _orig_print(f"📭 [REALTIME] Ghost WS session (no START, no traffic) – ignoring", flush=True)
+            else:
+                # REAL CALL: START received (call_sid set) but tx=0 - this IS a bug!
+                _orig_print(f"⚠️ [REALTIME] SILENT_FAILURE_DETECTED: tx=0 but realtime_failed=False!", flush=True)
+                _orig_print(f"❌ [REALTIME_FALLBACK] Call {self.call_sid} had tx=0 (potential silent failure)", flush=True)
+                # Mark as failed with clear reason for diagnostics
+                realtime_failed = True
+                failure_reason = "TX_ZERO_REAL_CALL"
+                self.realtime_failed = True
+                self._realtime_failure_reason = failure_reason
+        
+        # Log metrics - include is_ghost flag for monitoring
+        logger.debug(f"[METRICS] REALTIME_TIMINGS: call_sid={self.call_sid}, openai_connect_ms={openai_connect_ms}, first_greeting_audio_ms={first_greeting_audio_ms}, realtime_failed={realtime_failed}, reason={failure_reason}, tx={self.tx}, is_ghost={is_ghost_session}")
+        
+        # 🔥 GREETING OPTIMIZATION: Log complete timeline for latency analysis
+        # Get TwiML timing from stream registry (set by webhook)
+        twiml_ms = 0
+        ws_start_offset_ms = 0
+        call_direction = getattr(self, 'call_direction', 'unknown')
+        
+        if self.call_sid:
+            try:
+                # Try to get webhook timing from stream registry
+                twiml_ts = stream_registry.get_metric(self.call_sid, 'twiml_ready_ts')
+                ws_connect_ts = stream_registry.get_metric(self.call_sid, 'ws_connect_ts')
                 
-                # Unified timeline log for analysis - DEBUG ONLY
-                logger.debug(f"[GREETING_TIMELINE] inbound={is_inbound} twiml_ms={twiml_ms} ws_start_offset_ms={ws_start_offset_ms} openai_connect_ms={openai_connect_ms} first_greeting_audio_ms={first_greeting_audio_ms} total={total_greeting_ms}ms sla_met={sla_met}")
-                logger.info(f"[GREETING_TIMELINE] inbound={is_inbound} total={total_greeting_ms}ms sla_met={sla_met}")
-            
-            # ⚡ STREAMING STT: Close session at end of call
-            self._close_streaming_stt()
-            
-            # 🔥 SESSION LIFECYCLE: Use atomic close_session for cleanup
-            # This ensures single-source-of-truth cleanup even if finally block is hit without explicit close
-            if not self.closed:
-                self.close_session("finally_block_fallback")
-            
-            # 💰 CALCULATE AND LOG CALL COST
-            # 🔥 Check per-call override (set based on ai_provider)
-            use_realtime_for_this_call = getattr(self, '_USE_REALTIME_API_OVERRIDE', USE_REALTIME_API)
-            if use_realtime_for_this_call:
-                self._calculate_and_log_cost()
-            
-            # 🔥 BUILD 331: OPENAI_USAGE_GUARD - Final logging regardless of exit path
-            frames_sent = getattr(self, '_usage_guard_frames', 0)
-            seconds_used = getattr(self, '_usage_guard_seconds', 0.0)
-            limit_hit = getattr(self, '_usage_guard_limit_hit', False)
-            limit_exceeded_flag = getattr(self, '_limit_exceeded', False)
-            logger.info(f"🛡️ OPENAI_USAGE_GUARD: frames_sent={frames_sent}, estimated_seconds={seconds_used:.1f}, limit_exceeded={limit_hit or limit_exceeded_flag}")
+                if twiml_ts and ws_connect_ts:
+                    ws_start_offset_ms = int((ws_connect_ts - twiml_ts) * 1000)
+            except Exception as e:
+                pass
+        
+        # Calculate greeting SLA result
+        is_inbound = (call_direction == 'inbound')
+        greeting_threshold = 1600 if is_inbound else 2000
+        total_greeting_ms = openai_connect_ms + first_greeting_audio_ms
+        sla_met = total_greeting_ms <= greeting_threshold and total_greeting_ms > 0
+        
+        if not is_ghost_session and total_greeting_ms > 0:
+            # Log complete greeting timeline (only for real calls with greeting) - DEBUG ONLY
+            if sla_met:
+                logger.debug(f"[GREETING_SLA_MET] {total_greeting_ms}ms (threshold={greeting_threshold}ms, direction={call_direction})")
+            else:
+                logger.debug(f"[GREETING_SLA_FAILED] inbound={is_inbound} twiml_ms={twiml_ms} openai_ms={openai_connect_ms} greet_ms={first_greeting_audio_ms} total={total_greeting_ms}ms > {greeting_threshold}ms")
             
-            # 🔥 SESSION LIFECYCLE: close_session() already handled WebSocket close, no need to duplicate
-            # Mark as ended
-            if hasattr(self, 'call_sid') and self.call_sid:
-                stream_registry.clear(self.call_sid)
+            # Unified timeline log for analysis - DEBUG ONLY
+            logger.debug(f"[GREETING_TIMELINE] inbound={is_inbound} twiml_ms={twiml_ms} ws_start_offset_ms={ws_start_offset_ms} openai_connect_ms={openai_connect_ms} first_greeting_audio_ms={first_greeting_audio_ms} total={total_greeting_ms}ms sla_met={sla_met}")
+            logger.info(f"[GREETING_TIMELINE] inbound={is_inbound} total={total_greeting_ms}ms sla_met={sla_met}")
+        
+        # ⚡ STREAMING STT: Close session at end of call
+        self._close_streaming_stt()
+        
+        # 🔥 SESSION LIFECYCLE: Use atomic close_session for cleanup
+        # This ensures single-source-of-truth cleanup even if finally block is hit without explicit close
+        if not self.closed:
+            self.close_session("finally_block_fallback")
+        
+        # 💰 CALCULATE AND LOG CALL COST
+        # 🔥 Check per-call override (set based on ai_provider)
+        use_realtime_for_this_call = getattr(self, '_USE_REALTIME_API_OVERRIDE', USE_REALTIME_API)
+        if use_realtime_for_this_call:
+            self._calculate_and_log_cost()
+        
+        # 🔥 BUILD 331: OPENAI_USAGE_GUARD - Final logging regardless of exit path
+        frames_sent = getattr(self, '_usage_guard_frames', 0)
+        seconds_used = getattr(self, '_usage_guard_seconds', 0.0)
+        limit_hit = getattr(self, '_usage_guard_limit_hit', False)
+        limit_exceeded_flag = getattr(self, '_limit_exceeded', False)
+        logger.info(f"🛡️ OPENAI_USAGE_GUARD: frames_sent={frames_sent}, estimated_seconds={seconds_used:.1f}, limit_exceeded={limit_hit or limit_exceeded_flag}")
+        
+        # 🔥 SESSION LIFECYCLE: close_session() already handled WebSocket close, no need to duplicate
+        # Mark as ended
+        if hasattr(self, 'call_sid') and self.call_sid:
+            stream_registry.clear(self.call_sid)
         
         # Final cleanup
         logger.info(f"WS_DONE sid={self.stream_sid} rx={self.rx} tx={self.tx}")
@@ -12110,15 +12370,16 @@ class MediaStreamHandler:
             logger.info(f"📭 [REALTIME] Greeting queued or will be retried by async loop")
             return
         
-        # Google TTS (only when USE_REALTIME_API=False)
-        logger.info(f"🔊 GREETING_TTS_START (Google): '{text[:50]}...'")
+        # TTS cache (only when USE_REALTIME_API=False) - greetings are prewarmed on prompt save
+        logger.info(f"🔊 GREETING_TTS_START (cache): '{text[:50]}...'")
         
         try:
             # ⚡ בלי sleep - ברכה מיידית!
-            tts_audio = self._hebrew_tts(text)
+            from server.services.tts_cache import get_business_mulaw
+            tts_audio = get_business_mulaw(self.business_id, text)
             if tts_audio and len(tts_audio) > 1000:
                 logger.info(f"✅ GREETING_TTS_SUCCESS: {len(tts_audio)} bytes")
-                self._send_pcm16_as_mulaw_frames_with_mark(tts_audio)
+                self._send_mulaw_frames_with_mark(tts_audio)
             else:
                 logger.error("❌ GREETING_TTS_FAILED - NOT sending beep (per requirements)")
                 # 🔥 REQUIREMENT: Mark as failed, don't auto-beep
@@ -12378,23 +12639,13 @@ class MediaStreamHandler:
                 pass  # Allow clear/mark commands through
             else:
                 return  # Silently drop AI audio during barge-in
-        try:
-            self.tx_q.put_nowait(item)
-        except queue.Full:
-            # Drop oldest frame
-            try:
-                _ = self.tx_q.get_nowait()
-            except queue.Empty:
-                pass
-            # Try again
-            try:
-                self.tx_q.put_nowait(item)
-            except queue.Full:
-                # Throttled logging - max once per 2 seconds
-                now = time.monotonic()
-                if now - self._last_overflow_log > 2.0:
-                    logger.warning("⚠️ tx_q full (drop oldest)")
-                    self._last_overflow_log = now
+        # Atomic drop-oldest insert (single lock acquisition)
+        if self.tx_q.put_drop_oldest(item):
+            # Throttled logging - max once per 2 seconds
+            now = time.monotonic()
+            if now - self._last_overflow_log > 2.0:
+                logger.warning("⚠️ tx_q full (drop oldest)")
+                self._last_overflow_log = now
     
     def _finalize_speaking(self):
         """סיום דיבור עם חזרה להאזנה"""
@@ -12411,11 +12662,17 @@ class MediaStreamHandler:
         if not self.stream_sid or not pcm16_8k:
             self._finalize_speaking()
             return
+        self._send_mulaw_frames_with_mark(ulaw_encode(pcm16_8k).tobytes())
+
+    def _send_mulaw_frames_with_mark(self, mulaw: bytes):
+        """μ-law 8kHz (e.g. from the TTS cache) → tx_q frames + mark, with barge-in"""
+        if not self.stream_sid or not mulaw:
+            self._finalize_speaking()
+            return
             
         # CLEAR לפני שליחה
         self._ws_send(json.dumps({"event":"clear","streamSid":self.stream_sid}))
         
-        mulaw = audioop.lin2ulaw(pcm16_8k, 2)
         FR = 160  # 20ms @ 8kHz
         frames_sent = 0
         total_frames = len(mulaw) // FR
@@ -12479,7 +12736,7 @@ class MediaStreamHandler:
         # CLEAR לפני שליחה
         self._tx_enqueue({"type": "clear"})
         
-        mulaw = audioop.lin2ulaw(pcm16_8k, 2)
+        mulaw = ulaw_encode(pcm16_8k).tobytes()
         FR = 160  # 20ms @ 8kHz
         frames_sent = 0
         total_frames = len(mulaw) // FR
@@ -12722,51 +12979,9 @@ class MediaStreamHandler:
         
         try:
             # ✅ בדיקת איכות אודיו - מניעת עיבוד של רעש/שקט
-            import audioop
-            max_amplitude = audioop.max(pcm16_8k, 2)
-            rms = audioop.rms(pcm16_8k, 2)
-            duration = len(pcm16_8k) / (2 * 8000)
-            if DEBUG: logger.debug(f"📊 AUDIO_QUALITY_CHECK: max_amplitude={max_amplitude}, rms={rms}, duration={duration:.1f}s")
-            
-            # 🔥 BALANCED NOISE GATE - Filter noise, allow quiet speech
-            
-            # 1. Basic amplitude check
-            if max_amplitude < 100:
-                logger.info(f"🚫 STT_BLOCKED: Audio too quiet (max_amplitude={max_amplitude} < 100)")
-                return ""
-            
-            # 2. RMS energy check
-            if rms < 80:
-                logger.info(f"🚫 STT_BLOCKED: Audio below noise threshold (rms={rms} < 80)")
+            if not self._stt_audio_gate(pcm16_8k):
                 return ""
             
-            # 3. Duration check
-            if duration < 0.18:
-                logger.info(f"🚫 STT_BLOCKED: Audio too short ({duration:.2f}s < 0.18s)")
-                return ""
-            
-            # 4. Variance/ZCR noise detection
-            try:
-                import numpy as np
-                pcm_array = np.frombuffer(pcm16_8k, dtype=np.int16)
-                energy_variance = np.var(pcm_array.astype(np.float32))
-                zero_crossings = np.sum(np.diff(np.sign(pcm_array)) != 0) / len(pcm_array)
-                
-                if energy_variance < 200000:
-                    logger.info(f"🚫 STT_BLOCKED: Low energy variance - likely noise (variance={energy_variance:.0f})")
-                    return ""
-                
-                if zero_crossings < 0.01 or zero_crossings > 0.3:
-                    logger.info(f"🚫 STT_BLOCKED: Abnormal ZCR - likely noise/tone (zcr={zero_crossings:.3f})")
-                    return ""
-                
-                logger.info(f"✅ AUDIO_VALIDATED: amp={max_amplitude}, rms={rms}, var={int(energy_variance)}, zcr={zero_crossings:.3f}")
-                
-            except ImportError:
-                logger.warning("⚠️ numpy not available - skipping advanced audio validation")
-            except Exception as numpy_error:
-                logger.error(f"⚠️ Advanced audio analysis failed: {numpy_error} - using basic validation")
-            
             # 🔷 GEMINI: Use Whisper STT (OpenAI's Whisper API)
             # This avoids dependency on Google Cloud STT
             logger.info(f"[STT_ROUTING] provider=gemini -> whisper_api (auth: OPENAI_API_KEY)")
@@ -12789,6 +13004,54 @@ class MediaStreamHandler:
             logger.error(f"❌ STT_ERROR: {e}")
             return ""
     
+    def _stt_audio_gate(self, pcm16_8k: bytes) -> bool:
+        """Noise gate before batch STT: amplitude, RMS, duration, variance / ZCR"""
+        max_amplitude = pcm16_peak(pcm16_8k)
+        rms = pcm16_rms(pcm16_8k)
+        duration = len(pcm16_8k) / (2 * 8000)
+        if DEBUG: logger.debug(f"📊 AUDIO_QUALITY_CHECK: max_amplitude={max_amplitude}, rms={rms}, duration={duration:.1f}s")
+        
+        # 🔥 BALANCED NOISE GATE - Filter noise, allow quiet speech
+        
+        # 1. Basic amplitude check
+        if max_amplitude < 100:
+            logger.info(f"🚫 STT_BLOCKED: Audio too quiet (max_amplitude={max_amplitude} < 100)")
+            return False
+        
+        # 2. RMS energy check
+        if rms < 80:
+            logger.info(f"🚫 STT_BLOCKED: Audio below noise threshold (rms={rms} < 80)")
+            return False
+        
+        # 3. Duration check
+        if duration < 0.18:
+            logger.info(f"🚫 STT_BLOCKED: Audio too short ({duration:.2f}s < 0.18s)")
+            return False
+        
+        # 4. Variance/ZCR noise detection
+        try:
+            import numpy as np
+            pcm_array = np.frombuffer(pcm16_8k, dtype=np.int16)
+            energy_variance = np.var(pcm_array.astype(np.float32))
+            zero_crossings = np.sum(np.diff(np.sign(pcm_array)) != 0) / len(pcm_array)
+            
+            if energy_variance < 200000:
+                logger.info(f"🚫 STT_BLOCKED: Low energy variance - likely noise (variance={energy_variance:.0f})")
+                return False
+            
+            if zero_crossings < 0.01 or zero_crossings > 0.3:
+                logger.info(f"🚫 STT_BLOCKED: Abnormal ZCR - likely noise/tone (zcr={zero_crossings:.3f})")
+                return False
+            
+            logger.info(f"✅ AUDIO_VALIDATED: amp={max_amplitude}, rms={rms}, var={int(energy_variance)}, zcr={zero_crossings:.3f}")
+            
+        except ImportError:
+            logger.warning("⚠️ numpy not available - skipping advanced audio validation")
+        except Exception as numpy_error:
+            logger.error(f"⚠️ Advanced audio analysis failed: {numpy_error} - using basic validation")
+        
+        return True
+    
     def _whisper_stt_for_gemini(self, pcm16_8k: bytes) -> str:
         """
         🔷 Whisper STT for Gemini Provider
@@ -12807,8 +13070,7 @@ class MediaStreamHandler:
                 return ""
             
             # Resample to 16kHz for Whisper
-            import audioop
-            pcm16_16k = audioop.ratecv(pcm16_8k, 2, 1, 8000, 16000, None)[0]
+            pcm16_16k = ratecv_fast(pcm16_8k, 8000, 16000)
             logger.info(f"🔄 RESAMPLED: {len(pcm16_8k)} bytes @ 8kHz → {len(pcm16_16k)} bytes @ 16kHz")
             
             # Create WAV file for Whisper
@@ -12877,145 +13139,6 @@ class MediaStreamHandler:
                 except Exception as cleanup_error:
                     logger.warning(f"⚠️ [WHISPER_GEMINI] Failed to cleanup temp file: {cleanup_error}")
     
-    def _whisper_fallback_validated(self, pcm16_8k: bytes) -> str:
-        """🔥 BUILD 314: LEGACY CODE - Never used when use_realtime=True
-        OpenAI Realtime API handles ALL transcription via gpt-4o-transcribe.
-        This is kept only for backwards compatibility if someone sets use_realtime=False.
-        """
-        # 🚀 REALTIME API: Skip Whisper completely - use gpt-4o-transcribe via Realtime API
-        # 🔥 Check per-call override (set based on ai_provider)
-        use_realtime_for_this_call = getattr(self, '_USE_REALTIME_API_OVERRIDE', USE_REALTIME_API)
-        if use_realtime_for_this_call:
-            return ""
-        
-        try:
-            logger.info(f"🔄 WHISPER_VALIDATED: Processing {len(pcm16_8k)} bytes with fabrication prevention")
-            
-            # ✅ בדיקת איכות אודיו חמורה יותר
-            import audioop
-            max_amplitude = audioop.max(pcm16_8k, 2)
-            rms = audioop.rms(pcm16_8k, 2)
-            duration = len(pcm16_8k) / (2 * 8000)
-            if DEBUG: logger.debug(f"📊 AUDIO_VALIDATION: max_amplitude={max_amplitude}, rms={rms}, duration={duration:.1f}s")
-            
-            # 🔥 BUILD 164B: BALANCED noise gate for Whisper
-            if max_amplitude < 200 or rms < 120:  # Balanced thresholds - allow quiet speech
-                logger.info(f"🚫 WHISPER_BLOCKED: Audio too weak (amp={max_amplitude}<200, rms={rms}<120)")
-                return ""  # Don't let Whisper hallucinate!
-            
-            if duration < 0.3:  # Less than 300ms
-                logger.info("🚫 WHISPER_BLOCKED: Audio too short - likely noise")
-                return ""
-            
-            # Check for monotonic energy (noise vs speech)
-            try:
-                import numpy as np
-                pcm_array = np.frombuffer(pcm16_8k, dtype=np.int16)
-                energy_variance = np.var(pcm_array.astype(np.float32))
-                if energy_variance < 1000000:  # Balanced threshold
-                    logger.info(f"🚫 WHISPER_BLOCKED: Low energy variance ({energy_variance:.0f}) - background noise")
-                    return ""
-            except:
-                pass  # If check fails - continue
-            
-            from server.services.lazy_services import get_openai_client
-            client = get_openai_client()
-            if not client:
-                logger.error("❌ OpenAI client not available")
-                return ""
-            
-            # Resample to 16kHz for Whisper
-            pcm16_16k = audioop.ratecv(pcm16_8k, 2, 1, 8000, 16000, None)[0]
-            logger.info(f"🔄 RESAMPLED: {len(pcm16_8k)} bytes @ 8kHz → {len(pcm16_16k)} bytes @ 16kHz")
-            
-            # ✅ Whisper עם פרמטרים חמורים נגד המצאות
-            import tempfile
-            import wave
-            
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_wav:
-                with wave.open(temp_wav.name, 'wb') as wav_file:
-                    wav_file.setnchannels(1)
-                    wav_file.setsampwidth(2)
-                    wav_file.setframerate(16000)
-                    wav_file.writeframes(pcm16_16k)
-                
-                with open(temp_wav.name, 'rb') as audio_file:
-                    # ✅ FIXED: פרמטרים חמורים נגד המצאה
-                    transcript = client.audio.transcriptions.create(
-                        model="whisper-1",
-                        file=audio_file,
-                        language="he",  # חייב עברית
-                        prompt="זוהי שיחת טלפון בעברית. תמלל רק דיבור ברור. אם אין דיבור ברור - החזר ריק.",  # הנחיה חמורה!
-                        temperature=0.0  # 🔥 FIX: Temperature 0.0 for maximum accuracy
-                    )
-            
-            import os
-            os.unlink(temp_wav.name)
-            
-            result = transcript.text.strip()
-            
-            # ✅ FINAL validation - בדיקת תוצאה חשודה
-            if not result or len(result) < 2:
-                logger.info("✅ WHISPER_VALIDATED: Empty/minimal result - good!")
-                return ""
-            
-            # 🛡️ BUILD 149: ENGLISH HALLUCINATION FILTER (refined)
-            # Only block when text is PURELY English (hallucination) - allow mixed Hebrew/English
-            import re
-            hebrew_chars = len(re.findall(r'[\u0590-\u05FF]', result))
-            english_chars = len(re.findall(r'[a-zA-Z]', result))
-            total_chars = max(hebrew_chars + english_chars, 1)
-            
-            # If no Hebrew at all and has English - likely hallucination
-            if hebrew_chars == 0 and english_chars > 3:
-                logger.info(f"🚫 WHISPER_PURE_ENGLISH: '{result}' has no Hebrew - blocking fabrication")
-                return ""
-            
-            # 🛡️ Block PURE English fabrication phrases (only when no Hebrew present)
-            pure_english_hallucinations = [
-                "thank you", "i'll take", "pistol", "gun", "little pistol",
-                "right here", "just a moment"
-            ]
-            result_lower = result.lower()
-            if hebrew_chars == 0:
-                for hallucination in pure_english_hallucinations:
-                    if hallucination in result_lower:
-                        logger.info(f"🚫 WHISPER_ENGLISH_PHRASE: Found '{hallucination}' in '{result}' - blocking")
-                        return ""
-            
-            # 🔥 BUILD 164: ENHANCED anti-hallucination for Whisper
-            # Block ultra-short results (likely noise transcription)
-            if len(result) <= 1:
-                logger.info(f"🚫 WHISPER_TOO_SHORT: Result '{result}' - blocking")
-                return ""
-            
-            # Block common noise hallucinations (Hebrew + English)
-            noise_hallucinations = [
-                "uh", "eh", "mmm", "hmm", "אה", "הממ", "אמ", "הא",
-                ".", "..", "...", "-", "—", " "
-            ]
-            if result.lower().strip() in noise_hallucinations:
-                logger.info(f"🚫 WHISPER_NOISE_HALLUCINATION: '{result}' - blocking")
-                return ""
-            
-            # Block suspicious single Hebrew words that Whisper invents from noise
-            suspicious_single_words = [
-                "תודה", "נהדר", "נהדרת", "מעולה", "בראבו",
-                "כן", "לא", "אוקיי", "טוב", "סבבה",
-                "שלום", "היי", "ביי", "בסדר"
-            ]
-            words = result.split()
-            if len(words) == 1 and result.strip() in suspicious_single_words:
-                logger.info(f"🚫 WHISPER_SUSPICIOUS_SINGLE: '{result}' - likely fabrication")
-                return ""
-            
-            logger.info(f"✅ WHISPER_VALIDATED_SUCCESS: '{result}'")
-            return result
-            
-        except Exception as e:
-            logger.error(f"❌ WHISPER_VALIDATED_ERROR: {e}")
-            return ""
-    
     def _google_stt_batch(self, pcm16_8k: bytes) -> str:
         """
         🚫 DEPRECATED: This method is no longer used for Gemini provider!
@@ -14211,7 +14334,7 @@ class MediaStreamHandler:
             )
             from server.agent_tools.tools_calendar import FindSlotsInput, _calendar_find_slots_impl
 
-            policy = get_business_policy(business_id)
+            policy = await self._run_in_app_context(get_business_policy, business_id)
             tz = pytz.timezone(getattr(policy, "tz", "Asia/Jerusalem") or "Asia/Jerusalem")
             duration_min = int(getattr(policy, "slot_size_min", 30) or 30)
 
@@ -14281,24 +14404,26 @@ class MediaStreamHandler:
                 )
 
             # Check availability near the requested time; try all candidates (PM-first already).
-            chosen = None
-            alternatives: list[str] = []
-            for cand in time_candidates:
-                try:
-                    slots_res = _calendar_find_slots_impl(
-                        FindSlotsInput(
-                            business_id=business_id,
-                            date_iso=date_iso,
-                            duration_min=duration_min,
-                            preferred_time=cand,
+            def _find_slot():
+                alternatives: list[str] = []
+                for cand in time_candidates:
+                    try:
+                        slots_res = _calendar_find_slots_impl(
+                            FindSlotsInput(
+                                business_id=business_id,
+                                date_iso=date_iso,
+                                duration_min=duration_min,
+                                preferred_time=cand,
+                            )
                         )
-                    )
-                    alternatives = [s.start_display for s in (slots_res.slots or [])][:2]
-                    if slots_res.slots and any(s.start_display == cand for s in slots_res.slots):
-                        chosen = cand
-                        break
-                except Exception:
-                    continue
+                        alternatives = [s.start_display for s in (slots_res.slots or [])][:2]
+                        if slots_res.slots and any(s.start_display == cand for s in slots_res.slots):
+                            return cand, alternatives
+                    except Exception:
+                        continue
+                return None, alternatives
+
+            chosen, alternatives = await self._run_in_app_context(_find_slot)
 
             if not chosen:
                 if alternatives:
@@ -14317,7 +14442,8 @@ class MediaStreamHandler:
             if not phone:
                 phone = (getattr(self, "phone_number", "") or "").strip()
 
-            result = create_appointment_from_realtime(
+            result = await self._run_in_app_context(
+                create_appointment_from_realtime,
                 business_id=business_id,
                 customer_phone=phone,
                 customer_name=customer_name,
@@ -14947,7 +15073,7 @@ class MediaStreamHandler:
                     )
                     
                     # Get policy to determine duration
-                    policy = get_business_policy(business_id)
+                    policy = await self._run_in_app_context(get_business_policy, business_id)
                     duration_min = policy.slot_size_min  # Use business slot size
                     business_tz = pytz.timezone(policy.tz)
                     
@@ -15073,9 +15199,7 @@ class MediaStreamHandler:
                     )
                     
                     # 🔥 CRITICAL: Database queries need app_context in async/WebSocket context
-                    app = _get_flask_app()
-                    with app.app_context():
-                        result = _calendar_find_slots_impl(input_data)
+                    result = await self._run_in_app_context(_calendar_find_slots_impl, input_data)
                     
                     # Format response
                     if result.slots and len(result.slots) > 0:
@@ -15363,7 +15487,7 @@ class MediaStreamHandler:
                     )
                     
                     # Get policy and timezone
-                    policy = get_business_policy(business_id)
+                    policy = await self._run_in_app_context(get_business_policy, business_id)
                     tz = pytz.timezone(policy.tz)
                     
                     # Normalize date/time (server-side; do not rely on the model)
@@ -15520,16 +15644,15 @@ class MediaStreamHandler:
                         try:
                             preferred_for_refresh = time_res.candidates_hhmm[0] if time_res.candidates_hhmm else None
                             # 🔥 CRITICAL: Database queries need app_context in async/WebSocket context
-                            app = _get_flask_app()
-                            with app.app_context():
-                                slots_result = _calendar_find_slots_impl(
-                                    FindSlotsInput(
-                                        business_id=business_id,
-                                        date_iso=normalized_date_iso,
-                                        duration_min=policy.slot_size_min,
-                                        preferred_time=preferred_for_refresh,
-                                    )
+                            slots_result = await self._run_in_app_context(
+                                _calendar_find_slots_impl,
+                                FindSlotsInput(
+                                    business_id=business_id,
+                                    date_iso=normalized_date_iso,
+                                    duration_min=policy.slot_size_min,
+                                    preferred_time=preferred_for_refresh,
                                 )
+                            )
                             refreshed_slots = [s.start_display for s in (slots_result.slots or [])][:3]
                             self._last_availability = {
                                 "date_iso": normalized_date_iso,
@@ -15545,11 +15668,8 @@ class MediaStreamHandler:
                     
                     # 🔥 HARD RULE: availability check BEFORE creating appointment
                     duration_min = policy.slot_size_min
-                    chosen_time = None
-                    alternatives: list[str] = []
-                    # 🔥 CRITICAL: Database queries need app_context in async/WebSocket context
-                    app = _get_flask_app()
-                    with app.app_context():
+                    def _find_slot():
+                        alternatives: list[str] = []
                         for cand in time_res.candidates_hhmm:
                             try:
                                 slots_result = _calendar_find_slots_impl(
@@ -15562,10 +15682,13 @@ class MediaStreamHandler:
                                 )
                                 alternatives = [s.start_display for s in (slots_result.slots or [])][:2]
                                 if slots_result.slots and any(s.start_display == cand for s in slots_result.slots):
-                                    chosen_time = cand
-                                    break
+                                    return cand, alternatives
                             except Exception:
                                 continue
+                        return None, alternatives
+
+                    # 🔥 CRITICAL: Database queries need app_context in async/WebSocket context
+                    chosen_time, alternatives = await self._run_in_app_context(_find_slot)
                     
                     if not chosen_time:
                         logger.warning(f"⚠️ [APPOINTMENT] Slot not available: date={normalized_date_iso} time_candidates={time_res.candidates_hhmm} alternatives={alternatives}")
@@ -15647,17 +15770,18 @@ class MediaStreamHandler:
                             call_transcript = "\n".join(transcription_parts)
                             
                             if call_transcript:
-                                # Get business info for context
-                                business = Business.query.get(business_id)
-                                business_name = business.name if business else None
-                                
-                                # Generate AI summary
-                                call_sid = getattr(self, 'call_sid', None)
-                                call_summary = summarize_conversation(
-                                    transcription=call_transcript,
-                                    call_sid=call_sid,
-                                    business_name=business_name
-                                )
+                                def _summarize():
+                                    # Get business info for context
+                                    business = Business.query.get(business_id)
+                                    business_name = business.name if business else None
+                                    
+                                    # Generate AI summary
+                                    return summarize_conversation(
+                                        transcription=call_transcript,
+                                        call_sid=getattr(self, 'call_sid', None),
+                                        business_name=business_name
+                                    )
+                                call_summary = await self._run_in_app_context(_summarize)
                                 logger.info(f"✅ [APPOINTMENT] Call summary and transcript generated ({len(call_transcript)} chars)")
                     except Exception as e:
                         logger.error(f"⚠️ [APPOINTMENT] Failed to generate call summary: {e}")
@@ -15698,9 +15822,8 @@ class MediaStreamHandler:
                     
                     # Call unified implementation
                     # 🔥 CRITICAL: Database queries need app_context in async/WebSocket context
-                    app = _get_flask_app()
-                    with app.app_context():
-                        result = _calendar_create_appointment_impl(input_data, context=context, session=self)
+                    result = await self._run_in_app_context(
+                        _calendar_create_appointment_impl, input_data, context=context, session=self)
                     
                     # Handle result
                     if hasattr(result, 'appointment_id'):
@@ -17240,7 +17363,10 @@ class MediaStreamHandler:
     
     def _tx_loop(self):
         """
-        ✅ ZERO LOGS INSIDE: Clean TX loop - take frame, send to Twilio, sleep 20ms
+        ✅ ZERO LOGS INSIDE: Clean TX loop - take frame, wait for its 20ms slot, send to Twilio
+        
+        Slots come from FramePacer (absolute monotonic timeline): no drift after a
+        late wake-up, bounded catch-up, underrun / jitter counters per call and turn.
         
         🔥 FIX: Enhanced with resilience guards
         - Don't exit prematurely if frames are still being generated
@@ -17249,10 +17375,8 @@ class MediaStreamHandler:
         call_sid_short = self.call_sid[:8] if hasattr(self, 'call_sid') and self.call_sid else 'unknown'
         _orig_print(f"[AUDIO_TX_LOOP] started (call_sid={call_sid_short}, frame_pacing=20ms)", flush=True)
         
-        FRAME_INTERVAL = AUDIO_CONFIG["frame_pacing_ms"] / 1000.0  # 20ms
-        next_deadline = time.monotonic()
+        pacer = self._tx_pacer
         frames_sent_total = 0
-        _first_frame_sent = False
         idle_count = 0  # Track consecutive empty checks
         MAX_IDLE_BEFORE_EXIT = 10  # Allow 5 seconds of idle (10 * 0.5s timeout)
         
@@ -17271,95 +17395,195 @@ class MediaStreamHandler:
                 
                 # 🔥 FIX: Guard against sending after session closed
                 if self.closed or self._ws_closed:
-                    _orig_print(f"[TX_LOOP] Session closed - draining remaining {self.tx_q.qsize()} frames and exiting", flush=True)
-                    # Drain queue but don't send
-                    while not self.tx_q.empty():
-                        try:
-                            self.tx_q.get_nowait()
-                        except:
-                            break
+                    self._tx_drain_on_close()
                     break
                 
                 # Get frame
+                if self.tx_q.empty():
+                    delay = pacer.delay()
+                    if delay > 0:
+                        # Nothing can go out before the next 20ms slot anyway
+                        time.sleep(delay)
+                        continue
+                    # Slot reached with an empty queue - the spurt is starved
+                    pacer.starved()
                 try:
                     item = self.tx_q.get(timeout=0.5)
                 except queue.Empty:
-                    if not self.tx_running:
-                        continue
+                    self._tx_close_turn_if_idle()
                     continue
                 
-                if item.get("type") == "end":
-                    break
+                # ✅ Strict 20ms timing on an absolute timeline (no drift, bounded catch-up)
+                if self._tx_needs_slot(item):
+                    delay = pacer.delay()
+                    if delay > 0:
+                        time.sleep(delay)
                 
-                # Handle "clear" event - send to Twilio (NO LOGS)
-                if item.get("type") == "clear" and self.stream_sid:
-                    self._ws_send(json.dumps(clear_event_template))
-                    continue
+                result = self._tx_send_item(item, clear_event_template)
+                if result == "end":
+                    break
                 
-                # Handle "media" event - send audio to Twilio (NO LOGS)
-                if item.get("type") == "media" or item.get("event") == "media":
-                    # 🔥 NEW FIX: Skip sending audio if barge-in stop flag is set
-                    # This immediately stops all audio transmission when user interrupts
-                    if getattr(self, 'barge_in_stop_tx', False):
-                        # User is interrupting - drop this frame and continue
-                        # Don't send it, don't count it, just skip it
-                        continue
-                    
-                    # Send frame to Twilio WS (item already has correct format from enqueue)
-                    if item.get("event") == "media" and "media" in item:
-                        success = self._ws_send(json.dumps(item))
-                    else:
-                        # Old format - convert (pre-build dict to minimize work)
-                        payload = {"event": "media", "streamSid": self.stream_sid, "media": {"payload": item["payload"]}}
-                        success = self._ws_send(json.dumps(payload))
-                    
-                    if success:
-                        self.tx += 1
+                if result in ("sent", "failed"):
+                    if result == "sent":
                         frames_sent_total += 1
-                        
-                        # 🔥 GEMINI COUNTER: Track frames sent to Twilio
-                        ai_provider = getattr(self, '_ai_provider', 'openai')
-                        if ai_provider == 'gemini':
-                            self._gemini_twilio_frames_out += 1
-                            
-                            # Log frame milestones for Gemini
-                            if self._gemini_twilio_frames_out == 1:
-                                _orig_print(f"🎵 [GEMINI_TX] First frame sent to Twilio", flush=True)
-                                logger.info(f"🎵 [GEMINI_TX] First audio frame sent to Twilio successfully")
-                            elif self._gemini_twilio_frames_out % 100 == 0:
-                                # Log every 100 frames
-                                logger.info(f"📊 [GEMINI_TX] Frames sent: {self._gemini_twilio_frames_out}")
-                        
-                        if not _first_frame_sent:
-                            _first_frame_sent = True
-                            self._first_audio_sent = True
-                    
-                    # ✅ Strict 20ms timing - advance deadline and sleep
-                    next_deadline += FRAME_INTERVAL
-                    delay = next_deadline - time.monotonic()
+                    pacer.frame_sent(self.tx_q.qsize())
+        
+        except Exception as tx_loop_error:
+            # NO TRACEBACK - just log and re-raise
+            _orig_print(f"[TX_CRASH] {tx_loop_error}", flush=True)
+            raise
+        finally:
+            self._tx_loop_exit_log(frames_sent_total, call_sid_short)
+    
+    async def _tx_loop_async(self):
+        """
+        🚀 ASYNC CALL ENGINE: _tx_loop as a task on the shared call loop
+        
+        Same frame handling and 20ms pacing as _tx_loop; waits with
+        tx_q.get_async / asyncio.sleep so one loop paces every call in the process.
+        """
+        call_sid_short = self.call_sid[:8] if hasattr(self, 'call_sid') and self.call_sid else 'unknown'
+        _orig_print(f"[AUDIO_TX_LOOP] started async (call_sid={call_sid_short}, frame_pacing=20ms)", flush=True)
+        
+        pacer = self._tx_pacer
+        frames_sent_total = 0
+        idle_count = 0
+        MAX_IDLE_BEFORE_EXIT = 10  # Allow 5 seconds of idle (10 * 0.5s timeout)
+        
+        clear_event_template = {"event": "clear", "streamSid": self.stream_sid}
+        
+        try:
+            while self.tx_running or not self.tx_q.empty():
+                if not self.tx_running and self.tx_q.empty():
+                    idle_count += 1
+                    if idle_count >= MAX_IDLE_BEFORE_EXIT:
+                        break
+                else:
+                    idle_count = 0
+                
+                if self.closed or self._ws_closed:
+                    self._tx_drain_on_close()
+                    break
+                
+                if self.tx_q.empty():
+                    delay = pacer.delay()
                     if delay > 0:
-                        time.sleep(delay)
-                    else:
-                        # Missed deadline - resync to prevent catch-up bursts
-                        next_deadline = time.monotonic()
-                    
-                    # NO GAP LOGGING INSIDE LOOP - causes micro-blocks
+                        await asyncio.sleep(delay)
+                        continue
+                    pacer.starved()
+                try:
+                    item = await self.tx_q.get_async(timeout=0.5)
+                except queue.Empty:
+                    self._tx_close_turn_if_idle()
                     continue
                 
-                # Handle "mark" event (NO LOGS)
-                if item.get("type") == "mark" and self.stream_sid:
-                    mark_event = {"event": "mark", "streamSid": self.stream_sid, "mark": {"name": item.get("name", "mark")}}
-                    self._ws_send(json.dumps(mark_event))
+                if self._tx_needs_slot(item):
+                    delay = pacer.delay()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                
+                result = self._tx_send_item(item, clear_event_template)
+                if result == "end":
+                    break
+                
+                if result in ("sent", "failed"):
+                    if result == "sent":
+                        frames_sent_total += 1
+                    pacer.frame_sent(self.tx_q.qsize())
         
         except Exception as tx_loop_error:
-            # NO TRACEBACK - just log and re-raise
             _orig_print(f"[TX_CRASH] {tx_loop_error}", flush=True)
             raise
         finally:
-            # 🔥 FIX: Log warning if no frames sent despite audio being generated
-            if frames_sent_total == 0 and hasattr(self, '_first_audio_sent') and not self._first_audio_sent:
-                _orig_print(f"⚠️ [TX_WARNING] frames_sent=0 - possible premature close or audio not reaching queue", flush=True)
-            _orig_print(f"[AUDIO_TX_LOOP] exiting (frames_sent={frames_sent_total}, call_sid={call_sid_short})", flush=True)
+            self._tx_loop_exit_log(frames_sent_total, call_sid_short)
+    
+    def _tx_drain_on_close(self):
+        """Session closed - drop remaining TX frames without sending"""
+        _orig_print(f"[TX_LOOP] Session closed - draining remaining {self.tx_q.qsize()} frames and exiting", flush=True)
+        self.tx_q.clear()
+    
+    def _tx_needs_slot(self, item):
+        """True if `item` is a media frame that will be sent (waits for its 20ms slot)"""
+        is_media = item.get("type") == "media" or item.get("event") == "media"
+        return is_media and not getattr(self, 'barge_in_stop_tx', False)
+    
+    def _tx_send_item(self, item, clear_event_template):
+        """
+        Send one TX queue item to Twilio (NO LOGS on the hot path)
+        
+        Returns:
+            "end" for the end sentinel, "sent" / "failed" for a paced media frame,
+            None for control events and dropped frames (no pacing)
+        """
+        if item.get("type") == "end":
+            return "end"
+        
+        # Handle "clear" event - send to Twilio (NO LOGS)
+        if item.get("type") == "clear" and self.stream_sid:
+            self._ws_send(json.dumps(clear_event_template))
+            self._tx_pacer.reset()  # Twilio dropped buffered audio - next frame starts a new spurt
+            return None
+        
+        # Handle "media" event - send audio to Twilio (NO LOGS)
+        if item.get("type") == "media" or item.get("event") == "media":
+            # 🔥 NEW FIX: Skip sending audio if barge-in stop flag is set
+            # This immediately stops all audio transmission when user interrupts
+            if getattr(self, 'barge_in_stop_tx', False):
+                # User is interrupting - drop this frame and continue
+                # Don't send it, don't count it, just skip it
+                return None
+            
+            # Send frame to Twilio WS (item already has correct format from enqueue)
+            if item.get("event") == "media" and "media" in item:
+                success = self._ws_send(json.dumps(item))
+            else:
+                # Old format - convert (pre-build dict to minimize work)
+                payload = {"event": "media", "streamSid": self.stream_sid, "media": {"payload": item["payload"]}}
+                success = self._ws_send(json.dumps(payload))
+            
+            if not success:
+                return "failed"
+            
+            self.tx += 1
+            
+            # 🔥 GEMINI COUNTER: Track frames sent to Twilio
+            ai_provider = getattr(self, '_ai_provider', 'openai')
+            if ai_provider == 'gemini':
+                self._gemini_twilio_frames_out += 1
+                
+                # Log frame milestones for Gemini
+                if self._gemini_twilio_frames_out == 1:
+                    _orig_print(f"🎵 [GEMINI_TX] First frame sent to Twilio", flush=True)
+                    logger.info(f"🎵 [GEMINI_TX] First audio frame sent to Twilio successfully")
+                elif self._gemini_twilio_frames_out % 100 == 0:
+                    # Log every 100 frames
+                    logger.info(f"📊 [GEMINI_TX] Frames sent: {self._gemini_twilio_frames_out}")
+            
+            if not getattr(self, '_first_audio_sent', False):
+                self._first_audio_sent = True
+            return "sent"
+        
+        # Handle "mark" event (NO LOGS)
+        if item.get("type") == "mark" and self.stream_sid:
+            mark_event = {"event": "mark", "streamSid": self.stream_sid, "mark": {"name": item.get("name", "mark")}}
+            self._ws_send(json.dumps(mark_event))
+        return None
+    
+    def _tx_close_turn_if_idle(self):
+        """TX queue idle - emit the finished AI turn's pacing counters (off the hot path)"""
+        turn_stats = self._tx_pacer.end_turn_if_idle()
+        if turn_stats:
+            emit_turn_metrics(
+                barge_in=bool(getattr(self, 'barge_in_stop_tx', False)),
+                eou_reason="tx_drained",
+                pacer=turn_stats
+            )
+    
+    def _tx_loop_exit_log(self, frames_sent_total, call_sid_short):
+        # 🔥 FIX: Log warning if no frames sent despite audio being generated
+        if frames_sent_total == 0 and hasattr(self, '_first_audio_sent') and not self._first_audio_sent:
+            _orig_print(f"⚠️ [TX_WARNING] frames_sent=0 - possible premature close or audio not reaching queue", flush=True)
+        _orig_print(f"[AUDIO_TX_LOOP] exiting (frames_sent={frames_sent_total}, call_sid={call_sid_short})", flush=True)
     
     def _speak_with_breath(self, text: str):
         """דיבור עם נשימה אנושית ו-TX Queue - תמיד משדר משהו"""
@@ -17891,6 +18115,26 @@ class MediaStreamHandler:
             logger.info(f"   Audio pipeline: in={frames_in_from_twilio}, forwarded={frames_forwarded_to_realtime}, dropped_total={frames_dropped_total}")
             logger.info(f"   Drop breakdown: greeting_lock={frames_dropped_by_greeting_lock}, filters={frames_dropped_by_filters}, queue_full={frames_dropped_by_queue_full}")
             
+            # Per-call audio buffer memory (preallocated rings)
+            audio_mem = self._audio_memory_stats()
+            logger.info(
+                f"   Audio memory: allocated={audio_mem['allocated_bytes']}B, "
+                f"utt_high_water={audio_mem['utterance']['high_water_bytes']}B, "
+                f"utt_overwritten={audio_mem['utterance']['bytes_overwritten']}B, "
+                f"tx_high_water={audio_mem['tx']['high_water']} frames, "
+                f"tx_dropped={audio_mem['tx']['total_dropped']}"
+            )
+            
+            # Outbound 20ms pacing (absolute timeline, see frame_pacer.py)
+            tx_pacing = self._tx_pacer.stats()
+            logger.info(
+                f"   TX pacing: frames={tx_pacing['frames']}, "
+                f"jitter_p50={tx_pacing['jitter_p50_ms']}ms, jitter_p99={tx_pacing['jitter_p99_ms']}ms, "
+                f"jitter_max={tx_pacing['jitter_max_ms']}ms, late={tx_pacing['late_frames']}, "
+                f"resyncs={tx_pacing['resyncs']}, underruns={tx_pacing['underruns']}, "
+                f"queue_depth_avg={tx_pacing['queue_depth_avg']}, queue_depth_max={tx_pacing['queue_depth_max']}"
+            )
+            
             # 🔥 GEMINI AUDIO COUNTERS: Log audio flow for debugging (per requirements)
             ai_provider = getattr(self, '_ai_provider', 'openai')
             if ai_provider == 'gemini':
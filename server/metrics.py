@@ -61,12 +61,29 @@ WHATSAPP_INBOUND = "whatsapp_inbound_messages"
 WHATSAPP_OUTBOUND = "whatsapp_outbound_messages"
 WHATSAPP_ERRORS = "whatsapp_errors"
 
+# WhatsApp ingest streams (server/services/whatsapp_ingest.py)
+WA_INGEST_RETRIED = "wa_ingest_retried"  # entries left pending after a failed attempt
+WA_INGEST_DEAD_LETTERED = "wa_ingest_dead_lettered"  # moved to wa:ingest:dead after WA_INGEST_MAX_DELIVERIES
+WA_INGEST_OUTAGE_BACKOFFS = "wa_ingest_outage_backoffs"  # drains stopped by a DB / Redis outage
+WA_INGEST_STREAM_FULL = "wa_ingest_stream_full"  # webhooks processed inline, partition at WA_INGEST_STREAM_MAXLEN
+
 # Calls
 CALLS_STARTED = "calls_started"
 CALLS_COMPLETED = "calls_completed"
 CALLS_REJECTED = "calls_rejected_max_concurrent"
 CALLS_ERRORS = "calls_errors"
 CALLS_ACTIVE = "calls_active"  # gauge
+CALLS_ACTIVE_INBOUND = "calls_active_inbound"  # gauge
+CALLS_ACTIVE_OUTBOUND = "calls_active_outbound"  # gauge
+CALLS_CAPACITY_AVAILABLE = "calls_capacity_available"  # gauge
+CALLS_LEASES_RECLAIMED = "calls_leases_reclaimed"  # leases of calls whose handler stopped heartbeating
+
+# Twilio media stream bridge (server/services/media_bridge.py)
+WS_BRIDGE_STREAMS = "ws_bridge_streams"  # gauge
+WS_BRIDGE_RX_QUEUE_DEPTH = "ws_bridge_rx_queue_depth"  # gauge, deepest stream
+WS_BRIDGE_TX_QUEUE_DEPTH = "ws_bridge_tx_queue_depth"  # gauge, deepest stream
+WS_BRIDGE_RX_DROPPED = "ws_bridge_rx_dropped"  # inbound media frames dropped (handler too slow)
+WS_BRIDGE_TX_DROPPED = "ws_bridge_tx_dropped"  # outbound frames dropped (socket too slow)
 
 # Queue
 QUEUE_ENQUEUED = "queue_jobs_enqueued"
@@ -78,6 +95,28 @@ QUEUE_DEAD_LETTER = "queue_jobs_dead_letter"
 API_REQUESTS = "api_requests_total"
 API_ERRORS = "api_errors_total"
 
+# Caches (server/utils/cache.py) - suffixed per cache: "cache_hits.prompts"
+CACHE_HITS = "cache_hits"
+CACHE_MISSES = "cache_misses"
+CACHE_STALE_HITS = "cache_stale_hits"
+CACHE_L2_HITS = "cache_l2_hits"
+CACHE_LOADS = "cache_loads"
+CACHE_EVICTIONS = "cache_evictions"
+CACHE_INVALIDATIONS = "cache_invalidations"
+
+# TTS audio cache (server/services/tts_cache.py)
+TTS_CACHE_MEMORY_HITS = "tts_cache_memory_hits"
+TTS_CACHE_STORAGE_HITS = "tts_cache_storage_hits"
+TTS_CACHE_SYNTHESIZED = "tts_cache_synthesized"
+TTS_CACHE_FAILURES = "tts_cache_failures"
+
+# Outbound webhooks (server/services/webhook_delivery.py)
+WEBHOOKS_DELIVERED = "webhooks_delivered"
+WEBHOOKS_FAILED = "webhooks_failed"  # gave up: permanent error or attempts used up
+WEBHOOKS_RETRIED = "webhooks_retried"  # attempts that failed and were rescheduled
+WEBHOOKS_LATENCY_P50_MS = "webhooks_latency_p50_ms"  # gauge, last delivery run
+WEBHOOKS_LATENCY_P95_MS = "webhooks_latency_p95_ms"  # gauge, last delivery run
+
 
 def register_metrics_endpoint(app):
     """Register /metrics.json endpoint on a Flask app."""
@@ -94,6 +133,19 @@ def register_metrics_endpoint(app):
         if token and auth != f"Bearer {token}" and provided != token:
             return jsonify({"error": "unauthorized"}), 401
 
-        return jsonify(metrics.snapshot())
+        from server.utils.cache import cache_stats
+        from server.services.tts_cache import tts_cache_stats
+        from server.services.media_bridge import bridge_stats
+        try:
+            from server.services.capacity_ledger import publish_capacity_gauges
+            publish_capacity_gauges()
+        except Exception:
+            pass
+        ws_bridge = bridge_stats()
+        payload = metrics.snapshot()
+        payload["ws_bridge"] = ws_bridge
+        payload["caches"] = cache_stats()
+        payload["tts_cache"] = tts_cache_stats()
+        return jsonify(payload)
 
     return app
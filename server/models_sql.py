@@ -635,6 +635,26 @@ class Lead(db.Model):
                 return f"{phone[:3]}-{phone[3:6]}-{phone[6:]}"
         return self.phone_e164
 
+class LeadCounter(db.Model):
+    """
+    Lead count per tenant, status and source (Migration 150)
+    Kept in step with lead inserts/updates/deletes in the same transaction
+    (server/services/lead_counters.py) and recounted by a periodic reconciler
+
+    - status: lower(status), '' for NULL (the list filters status case-insensitively)
+    - source: source as stored, '' for NULL
+    """
+    __tablename__ = "lead_counters"
+
+    tenant_id = db.Column(db.Integer, db.ForeignKey("business.id", ondelete="CASCADE"), primary_key=True)
+    status = db.Column(db.String(32), primary_key=True)
+    source = db.Column(db.String(32), primary_key=True)
+    lead_count = db.Column(db.Integer, nullable=False, default=0)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    reconciled_at = db.Column(db.DateTime, nullable=True)  # NULL until the reconciler has recounted this tenant
+
+
 class LeadReminder(db.Model):
     """Reminders for leads - 'חזור אליי' functionality - now supports general business reminders"""
     __tablename__ = "lead_reminders"
@@ -2272,6 +2292,77 @@ class ReceiptSyncRun(db.Model):
     )
 
 
+class ReceiptExtraction(db.Model):
+    """
+    Content-addressed receipt parsing results (Migration 149)
+    Lets re-syncs and duplicate attachments skip PDF/HTML parsing
+
+    - kind='pdf':    key = sha256 of the PDF bytes -> PDF text + PDF confidence
+    - kind='fields': key = sha256 of every input of the extraction -> extracted fields
+    Keys include the extractor version (server/services/receipt_extraction.py)
+    """
+    __tablename__ = "receipt_extractions"
+
+    id = db.Column(db.Integer, primary_key=True)
+    business_id = db.Column(db.Integer, db.ForeignKey("business.id", ondelete="CASCADE"), nullable=False)
+    kind = db.Column(db.String(16), nullable=False)  # pdf|fields
+    content_hash = db.Column(db.String(64), nullable=False)  # sha256 hex
+    extractor_version = db.Column(db.Integer, nullable=False)
+
+    # Results
+    pdf_text = db.Column(db.Text, nullable=True)
+    confidence = db.Column(db.Integer, nullable=True)  # PDF confidence 0-100
+    fields = db.Column(db.JSON, nullable=True)  # {'extracted': {...}, 'html_extraction': {...}}
+    parse_ms = db.Column(db.Integer, nullable=True)  # Time the parse took (what a hit saves)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('business_id', 'kind', 'content_hash', name='uq_receipt_extraction_key'),
+        db.CheckConstraint("kind IN ('pdf', 'fields')", name='chk_receipt_extraction_kind'),
+    )
+
+
+class WebhookOutbox(db.Model):
+    """
+    Outbound webhooks queued for delivery (Migration 151)
+    Sent by server/services/webhook_delivery.py. Body and headers (signature
+    included) are stored exactly as sent, so every retry posts the same bytes
+
+    - status: pending -> delivering -> delivered | failed (back to pending on a retry)
+    - next_attempt_at: when a pending row is due; for a delivering row, when its
+      claim expires and another delivery job may take it over
+    """
+    __tablename__ = "webhook_outbox"
+
+    id = db.Column(db.Integer, primary_key=True)  # BIGSERIAL in the migration
+    business_id = db.Column(db.Integer, nullable=True)  # NULL for n8n events without a numeric business id
+    channel = db.Column(db.String(16), nullable=False)  # generic|status|n8n
+    event_type = db.Column(db.String(64), nullable=False)
+    url = db.Column(db.Text, nullable=False)
+    body = db.Column(db.Text, nullable=False)  # serialized JSON
+    headers = db.Column(db.JSON, nullable=True)
+    batchable = db.Column(db.Boolean, nullable=False, default=False)  # may be posted with other events to the same URL
+
+    # Delivery state
+    status = db.Column(db.String(16), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=8)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.Text, nullable=True)
+    last_status_code = db.Column(db.Integer, nullable=True)
+    last_latency_ms = db.Column(db.Integer, nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    delivered_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.CheckConstraint(
+            "status IN ('pending', 'delivering', 'delivered', 'failed')", name='chk_webhook_outbox_status'
+        ),
+    )
+
+
 class BackgroundJob(db.Model):
     """
     Background Jobs tracking for heavy batch operations
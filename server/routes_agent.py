@@ -3,12 +3,15 @@ Agent API Routes - Endpoints for AI Agent interactions
 Provides REST API for agent-powered conversations and actions
 """
 from flask import Blueprint, request, jsonify
-from server.agent_tools.agent_factory import get_agent, AGENTS_ENABLED
+from server.services.lazy_services import lazy_module
 from server.models_sql import db, Business
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Agents SDK (~1s) is imported on the first agent request, not at boot
+agent_factory = lazy_module("server.agent_tools.agent_factory")
+
 bp = Blueprint("agent_api", __name__, url_prefix="/api/agent")
 
 @bp.post("/booking")
@@ -34,7 +37,7 @@ def agent_booking():
         "agent_enabled": true
     }
     """
-    if not AGENTS_ENABLED:
+    if not agent_factory.AGENTS_ENABLED:
         return jsonify({
             "error": "Agents are disabled",
             "agent_enabled": False
@@ -66,7 +69,7 @@ def agent_booking():
         }
         
         # Get or create booking agent
-        agent = get_agent(agent_type="booking", business_name=business_name)
+        agent = agent_factory.get_agent(agent_type="booking", business_name=business_name)
         
         if not agent:
             return jsonify({
@@ -104,7 +107,7 @@ def agent_booking():
         traceback.print_exc()
         return jsonify({
             "error": str(e),
-            "agent_enabled": AGENTS_ENABLED
+            "agent_enabled": agent_factory.AGENTS_ENABLED
         }), 500
 
 
@@ -115,7 +118,7 @@ def agent_sales():
     
     Similar to /booking but uses sales-focused agent
     """
-    if not AGENTS_ENABLED:
+    if not agent_factory.AGENTS_ENABLED:
         return jsonify({
             "error": "Agents are disabled",
             "agent_enabled": False
@@ -146,7 +149,7 @@ def agent_sales():
         }
         
         # Get sales agent
-        agent = get_agent(agent_type="sales", business_name=business_name)
+        agent = agent_factory.get_agent(agent_type="sales", business_name=business_name)
         
         if not agent:
             return jsonify({
@@ -170,7 +173,7 @@ def agent_sales():
         logger.error(f"Sales agent error: {e}")
         return jsonify({
             "error": str(e),
-            "agent_enabled": AGENTS_ENABLED
+            "agent_enabled": agent_factory.AGENTS_ENABLED
         }), 500
 
 
@@ -178,6 +181,6 @@ def agent_sales():
 def agent_status():
     """Check if agents are enabled and available"""
     return jsonify({
-        "agents_enabled": AGENTS_ENABLED,
-        "available_types": ["booking", "sales"] if AGENTS_ENABLED else []
+        "agents_enabled": agent_factory.AGENTS_ENABLED,
+        "available_types": ["booking", "sales"] if agent_factory.AGENTS_ENABLED else []
     })
@@ -3,15 +3,18 @@ Agent Operations API - Unified endpoint for AgentKit full operations
 Handles appointments, leads, invoices, contracts, WhatsApp, and summaries
 """
 from flask import Blueprint, request, jsonify, g
-from server.agent_tools.agent_factory import create_ops_agent, get_agent
+from server.services.lazy_services import lazy_module
 from server.models_sql import db, AgentTrace
 from datetime import datetime
-from agents import Runner
 import logging
 import time
 
 logger = logging.getLogger(__name__)
 
+# Agents SDK (~1s) is imported on the first ops request, not at boot
+agent_factory = lazy_module("server.agent_tools.agent_factory")
+agents_sdk = lazy_module("agents")
+
 # Create blueprint
 ops_bp = Blueprint("agent_ops", __name__, url_prefix="/api/agent")
 
@@ -84,7 +87,7 @@ def agent_ops():
         business_name = business.name if business else "העסק"
         
         # Use ops agent
-        agent = get_agent(
+        agent = agent_factory.get_agent(
             agent_type="ops",
             business_name=business_name,
             business_id=business_id,
@@ -101,7 +104,7 @@ def agent_ops():
         messages = history + [{"role": "user", "content": user_text}]
         
         # Run agent with Runner.run_sync - pass messages list as input for full conversation context
-        result = Runner.run_sync(agent, input=messages, context=ctx)
+        result = agents_sdk.Runner.run_sync(agent, input=messages, context=ctx)
         
         # Extract response
         reply = result.output_text if hasattr(result, 'output_text') else str(result)
@@ -47,6 +47,9 @@ def save_prompt(tenant):
     except Exception as e:
         logger.error(f"Failed to invalidate cache: {e}")
     
+    from server.services.tts_cache import enqueue_prewarm
+    enqueue_prewarm(business_id)
+    
     return {"ok": True, "id": settings.tenant_id}
 
 def _get_whatsapp_prompt_with_priority(business, default_prompt):
@@ -281,6 +284,10 @@ def update_business_prompt(business_id):
             logger.error(f"❌ Failed to invalidate AI cache: {cache_error}")
             logger.error(f"❌ CACHE CLEAR FAILED: {cache_error}")
         
+        # 🔊 Greeting may have changed - synthesize it into the TTS cache before the next call
+        from server.services.tts_cache import enqueue_prewarm
+        enqueue_prewarm(business_id)
+        
         # Runtime Apply - לוג הוכחה לפי ההנחיות המדויקות
         logger.info(f"AI_PROMPT loaded tenant={business_id} v={next_version}")
         
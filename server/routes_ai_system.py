@@ -10,7 +10,7 @@ from server.utils.api_guard import api_handler
 from server.config.voices import OPENAI_VOICES, OPENAI_VOICES_METADATA, DEFAULT_VOICE
 from server.utils.cache import TTLCache
 from datetime import datetime
-from openai import OpenAI
+from server.services.lazy_services import lazy_module
 import logging
 import io
 import os
@@ -20,12 +20,15 @@ import traceback
 
 logger = logging.getLogger(__name__)
 
+openai = lazy_module("openai")  # OpenAI SDK is imported on first use
+
 ai_system_bp = Blueprint('ai_system', __name__)
 
 # 🔥 Cache for AI settings to prevent bottleneck at call start
 # TTL: 120 seconds (2 minutes) - balances freshness with performance
 # Max size: 2000 businesses - sufficient for most deployments
-_ai_settings_cache = TTLCache(ttl_seconds=120, max_size=2000)
+# Shared via Redis L2 and invalidated in every worker on update
+_ai_settings_cache = TTLCache(ttl_seconds=120, max_size=2000, name="ai_settings", l2=True)
 
 
 def get_cached_voice_for_business(business_id: int) -> str:
@@ -307,6 +310,10 @@ def update_business_ai_settings():
         except Exception as cache_err:
             # Non-critical - log warning but don't fail the request
             logger.warning(f"[AI_SETTINGS] ⚠️ Failed to invalidate business cache: {cache_err}")
+        
+        # 🔊 New voice → new TTS cache keys: synthesize the greeting before the next call
+        from server.services.tts_cache import enqueue_prewarm
+        enqueue_prewarm(business_id)
     except Exception as e:
         db.session.rollback()
         logger.error(f"[AI_SETTINGS] Failed to update AI settings: {e}")
@@ -559,7 +566,7 @@ def preview_tts():
             if preview_engine == "speech_create":
                 # Use standard speech.create API (fast, for compatible voices only)
                 # 🔥 Returns mp3 format
-                client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+                client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
                 
                 # Generate speech using TTS-1 model with specified voice
                 response = client.audio.speech.create(
@@ -591,7 +598,7 @@ def preview_tts():
                     # Check if voice is compatible with speech.create for fallback
                     if voice_id in SPEECH_CREATE_VOICES:
                         logger.info(f"[TTS_PREVIEW] Falling back to speech.create for voice '{voice_id}'")
-                        client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+                        client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
                         
                         response = client.audio.speech.create(
                             model="tts-1",
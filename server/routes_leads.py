@@ -8,7 +8,7 @@ from server.db import db
 from server.auth_api import require_api_auth
 from server.security.permissions import require_page_access
 from datetime import datetime, timezone, timedelta
-from sqlalchemy import or_, and_, func, desc
+from sqlalchemy import and_, func, desc
 from sqlalchemy.orm import joinedload
 import logging
 import os
@@ -44,6 +44,12 @@ from server.services.ai_service import invalidate_business_cache
 # Import push notification dispatcher
 from server.services.notifications.dispatcher import dispatch_push_for_reminder
 
+# Import index-backed lead search filter
+from server.services.search_service import lead_search_filter
+from server.services.lead_export_service import PHONE_SOURCES, WHATSAPP_SOURCES, normalize_source
+from server.services.lead_counters import LeadCounts, read_lead_counts
+from server.services.lead_list_service import keyset_page
+
 # Import psycopg2 for database error handling
 try:
     import psycopg2.errors
@@ -55,6 +61,12 @@ except ImportError:
 # Background job stale threshold - jobs stuck longer than this are marked as failed
 BACKGROUND_JOB_STALE_THRESHOLD_MINUTES = 10
 
+# ?source= values of the leads list and the Lead.source values each one matches
+SOURCE_FILTER_GROUPS = {
+    'phone': PHONE_SOURCES,
+    'whatsapp': WHATSAPP_SOURCES,
+}
+
 
 def check_and_handle_duplicate_background_job(job_type: str, business_id: int, error_message: str, return_existing: bool = False):
     """
@@ -205,25 +217,6 @@ def localize_datetime_to_israel(dt):
     return dt
 
 
-def normalize_source(source: str) -> str:
-    """
-    Normalize lead source to only 'phone' or 'whatsapp'
-    All phone-related sources (call, realtime_phone, phone_call, etc.) become 'phone'
-    All WhatsApp-related sources become 'whatsapp'
-    """
-    if not source:
-        return 'phone'
-    
-    source_lower = source.lower().strip()
-    
-    phone_sources = {'call', 'phone', 'phone_call', 'realtime_phone', 'ai_agent', 'form', 'manual'}
-    whatsapp_sources = {'whatsapp', 'wa', 'whats_app'}
-    
-    if source_lower in whatsapp_sources:
-        return 'whatsapp'
-    
-    return 'phone'
-
 def get_current_user():
     """
     BUILD 141 FIX: Get current user from g.user (populated by @require_api_auth)
@@ -357,6 +350,9 @@ def ensure_default_statuses_exist(business_id):
         db.session.add(status)
     
     db.session.commit()
+    
+    from server.services.status_catalog import invalidate_status_catalog
+    invalidate_status_catalog(business_id)
 
 def get_default_status_for_business(business_id):
     """Get default status for business with fallback to 'new'"""
@@ -431,6 +427,8 @@ def list_leads():
         # 🔥 FIX: Increase max page size to 10,000 for project creation
         # This allows fetching all leads for a project (up to 10,000 limit)
         page_size = min(int(request.args.get('pageSize', 50)), 10000)  # Max 10,000 per page
+        # Keyset paging: ?cursor= (first page) then ?cursor=<nextCursor>
+        cursor = request.args.get('cursor')
         
         # Apply filters
         if statuses_filter:
@@ -440,13 +438,9 @@ def list_leads():
             # ✅ FIXED: Case-insensitive status filtering for legacy compatibility
             query = query.filter(func.lower(Lead.status) == status_filter.lower())
         
-        if source_filter:
-            if source_filter == 'phone':
-                phone_sources = ['call', 'phone', 'phone_call', 'realtime_phone', 'ai_agent', 'form', 'manual']
-                query = query.filter(Lead.source.in_(phone_sources))
-            elif source_filter == 'whatsapp':
-                whatsapp_sources = ['whatsapp', 'wa', 'whats_app']
-                query = query.filter(Lead.source.in_(whatsapp_sources))
+        source_values = SOURCE_FILTER_GROUPS.get(source_filter)
+        if source_values:
+            query = query.filter(Lead.source.in_(source_values))
         
         if owner_filter:
             query = query.filter(Lead.owner_user_id == owner_filter)
@@ -461,15 +455,8 @@ def list_leads():
         if q_filter:
             # ✅ BUILD 170: Search only by name or phone number (partial match)
             # Remove email from search, phone partial match works (e.g., "075" finds any number containing "075")
-            search_term = f"%{q_filter}%"
-            query = query.filter(
-                or_(
-                    Lead.first_name.ilike(search_term),
-                    Lead.last_name.ilike(search_term),
-                    Lead.name.ilike(search_term),
-                    Lead.phone_e164.ilike(search_term)
-                )
-            )
+            # 🔍 Index-backed name/phone match (trigram, Hebrew-normalized, any phone format)
+            query = query.filter(lead_search_filter(q_filter))
         
         if from_date:
             try:
@@ -485,19 +472,37 @@ def list_leads():
             except ValueError:
                 pass
         
-        # Order by created_at DESC for faster sorting (indexed column)
-        # BUILD 174: Performance optimization - avoid ORDER BY on multiple columns
-        query = query.order_by(Lead.created_at.desc())
+        # Total from the maintained counters when only status/source filters apply
+        total = None
+        if not is_system_admin and not (owner_filter or outbound_list_id or q_filter or from_date or to_date
+                                        or (direction_filter and direction_filter != 'all')):
+            counts = read_lead_counts(tenant_id)
+            if counts is not None:
+                statuses = statuses_filter or ([status_filter] if status_filter else None)
+                total = counts.count(statuses=statuses, sources=source_values)
         
-        # Pagination - BUILD 174: Optimize count query
-        offset = (page - 1) * page_size
-        
-        # Use a lighter count query - only count IDs (faster)
-        count_query = query.with_entities(Lead.id)
-        total = count_query.count()
-        
-        # Fetch leads with pagination
-        leads = query.offset(offset).limit(page_size).all()
+        if cursor is not None:
+            try:
+                leads, next_cursor = keyset_page(query, cursor, page_size)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            if total is None and request.args.get('withTotal', '').lower() in ('1', 'true'):
+                total = query.with_entities(Lead.id).count()
+        else:
+            # Order by created_at DESC for faster sorting (indexed column)
+            # BUILD 174: Performance optimization - avoid ORDER BY on multiple columns
+            query = query.order_by(Lead.created_at.desc())
+            
+            # Pagination - BUILD 174: Optimize count query
+            offset = (page - 1) * page_size
+            
+            if total is None:
+                # Use a lighter count query - only count IDs (faster)
+                count_query = query.with_entities(Lead.id)
+                total = count_query.count()
+            
+            # Fetch leads with pagination
+            leads = query.offset(offset).limit(page_size).all()
         
         # Format response
         items = []
@@ -525,6 +530,14 @@ def list_leads():
                 "last_contact_at": lead.last_contact_at.isoformat() if lead.last_contact_at else None
             })
         
+        if cursor is not None:
+            return jsonify({
+                "items": items,
+                "total": total,  # None unless counters apply or withTotal=1
+                "pageSize": page_size,
+                "nextCursor": next_cursor
+            })
+        
         return jsonify({
             "items": items,
             "total": total,
@@ -546,6 +559,34 @@ def list_leads():
         log.error(f"❌ Unexpected error in list_leads: {e}")
         raise
 
+@leads_bp.route("/api/leads/counts", methods=["GET"])
+@require_api_auth()
+@require_page_access('crm_leads')
+def get_lead_counts():
+    """Lead counts per status and per source for the status tabs / kanban columns"""
+    tenant_id = get_current_tenant()
+    if not tenant_id:
+        return jsonify({"error": "No tenant access"}), 403
+
+    counts = read_lead_counts(tenant_id)
+    if counts is None:
+        # Counters not seeded yet - one grouped count
+        rows = db.session.query(
+            func.lower(func.coalesce(Lead.status, '')), func.coalesce(Lead.source, ''), func.count(Lead.id)
+        ).filter(Lead.tenant_id == tenant_id).group_by(
+            func.lower(func.coalesce(Lead.status, '')), func.coalesce(Lead.source, '')
+        ).all()
+        counts = LeadCounts({(status, source): n for status, source, n in rows})
+
+    by_source = counts.by_source()
+    return jsonify({
+        "total": counts.total,
+        "byStatus": counts.by_status(),
+        "bySource": by_source,
+        "bySourceGroup": {group: sum(by_source.get(s, 0) for s in values)
+                          for group, values in SOURCE_FILTER_GROUPS.items()}
+    })
+
 @leads_bp.route("/api/leads", methods=["POST"])
 @require_api_auth()  # BUILD 137: Use proper decorator that sets g.user and g.tenant
 def create_lead():
@@ -2988,15 +3029,8 @@ def select_lead_ids():
         
         # Apply search filter
         if search_query:
-            search_term = f"%{search_query}%"
-            query = query.filter(
-                or_(
-                    Lead.first_name.ilike(search_term),
-                    Lead.last_name.ilike(search_term),
-                    Lead.name.ilike(search_term),
-                    Lead.phone_e164.ilike(search_term)
-                )
-            )
+            # 🔍 Index-backed name/phone match (trigram, Hebrew-normalized, any phone format)
+            query = query.filter(lead_search_filter(search_query))
         
         # Get only IDs (efficient query)
         lead_ids = [lead_id for (lead_id,) in query.with_entities(Lead.id).all()]
@@ -3014,7 +3048,7 @@ def select_lead_ids():
 @require_page_access('crm_leads')
 def export_leads():
     """
-    Export leads to CSV with comprehensive filtering support
+    Export leads to CSV / XLSX with comprehensive filtering support
     
     Supports all the same filters as list_leads:
     - status: Single status filter
@@ -3027,12 +3061,22 @@ def export_leads():
     - from: Start date (ISO format)
     - to: End date (ISO format)
     
+    Export options:
+    - format: csv (default) or xlsx
+    - async: 1 → always run as a background job
+    
     Returns:
-    CSV file with all lead data including status, source, owner, etc.
+    Streamed CSV/XLSX file (server-side cursor, constant memory), or
+    202 {job_id} when the export runs as a background job
+    (async=1 or more than LEADS_EXPORT_ASYNC_THRESHOLD rows) -
+    poll /api/leads/export/jobs/<job_id> for the download link
     """
-    from flask import Response
-    import csv
-    import io
+    from flask import Response, stream_with_context
+    from server.config import LEADS_EXPORT_ASYNC_THRESHOLD
+    from server.services.lead_export_service import (
+        EXPORT_FORMATS, LeadExportFilters, count_export_rows, export_filename,
+        iter_csv_chunks, iter_export_rows, iter_file_chunks, write_export_tempfile,
+    )
     
     try:
         user = get_current_user()
@@ -3041,194 +3085,70 @@ def export_leads():
         # BUILD 135: ONLY system_admin can see ALL leads
         if is_system_admin:
             # System admin sees all leads across all businesses
-            query = Lead.query
             tenant_id = None
         else:
             # BUILD 135: owner/admin/agent see only their tenant's leads
             tenant_id = get_current_tenant()
             if not tenant_id:
                 return jsonify({"error": "No tenant access"}), 403
-            query = Lead.query.filter_by(tenant_id=tenant_id)
-        
-        # Parse query parameters (same as list_leads)
-        status_filter = request.args.get('status', '')
-        statuses_filter = request.args.getlist('statuses[]')
-        source_filter = request.args.get('source', '')
-        owner_filter = request.args.get('owner', '')
-        outbound_list_id = request.args.get('outbound_list_id', '')
-        direction_filter = request.args.get('direction', '')
-        q_filter = request.args.get('q', '')
-        from_date = request.args.get('from', '')
-        to_date = request.args.get('to', '')
-        
-        # Apply filters (same logic as list_leads)
-        if statuses_filter:
-            query = query.filter(func.lower(Lead.status).in_([s.lower() for s in statuses_filter]))
-        elif status_filter:
-            query = query.filter(func.lower(Lead.status) == status_filter.lower())
-        
-        if source_filter:
-            if source_filter == 'phone':
-                phone_sources = ['call', 'phone', 'phone_call', 'realtime_phone', 'ai_agent', 'form', 'manual']
-                query = query.filter(Lead.source.in_(phone_sources))
-            elif source_filter == 'whatsapp':
-                whatsapp_sources = ['whatsapp', 'wa', 'whats_app']
-                query = query.filter(Lead.source.in_(whatsapp_sources))
-        
-        if owner_filter:
-            query = query.filter(Lead.owner_user_id == owner_filter)
-        
-        if outbound_list_id:
-            query = query.filter(Lead.outbound_list_id == int(outbound_list_id))
-        
-        if direction_filter and direction_filter != 'all':
-            query = query.filter(Lead.last_call_direction == direction_filter)
-        
-        if q_filter:
-            search_term = f"%{q_filter}%"
-            query = query.filter(
-                or_(
-                    Lead.first_name.ilike(search_term),
-                    Lead.last_name.ilike(search_term),
-                    Lead.name.ilike(search_term),
-                    Lead.phone_e164.ilike(search_term)
-                )
-            )
         
-        if from_date:
-            try:
-                from_dt = datetime.fromisoformat(from_date.replace('Z', '+00:00'))
-                query = query.filter(Lead.created_at >= from_dt)
-            except ValueError:
-                pass
+        export_format = request.args.get('format', 'csv').lower()
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({"error": f"פורמט לא נתמך: {export_format}"}), 400
         
-        if to_date:
-            try:
-                to_dt = datetime.fromisoformat(to_date.replace('Z', '+00:00'))
-                query = query.filter(Lead.created_at <= to_dt)
-            except ValueError:
-                pass
-        
-        # Order by created_at DESC
-        query = query.order_by(Lead.created_at.desc())
-        
-        # Fetch all leads (no pagination for export)
-        leads = query.all()
+        # Parse query parameters (same as list_leads)
+        filters = LeadExportFilters.from_args(request.args)
         
-        # 🔥 FIX: Load status labels from LeadStatus table (Hebrew labels)
-        # Build a mapping of status name -> Hebrew label for this business
-        from server.models_sql import LeadStatus, OutboundLeadList
+        run_async = request.args.get('async', '').lower() in ('1', 'true')
+        if not run_async:
+            run_async = count_export_rows(tenant_id, filters) > LEADS_EXPORT_ASYNC_THRESHOLD
         
-        status_labels = {}
-        if tenant_id:
-            # Get all statuses for this business
-            business_statuses = LeadStatus.query.filter_by(
+        if run_async:
+            from server.services.jobs import enqueue
+            from server.jobs.export_leads_job import export_leads_job
+            
+            job_id = f"export_leads_{uuid.uuid4().hex}"
+            enqueue(
+                'maintenance',
+                export_leads_job,
+                filters=filters.to_dict(),
+                fmt=export_format,
                 business_id=tenant_id,
-                is_active=True
-            ).all()
-            for s in business_statuses:
-                status_labels[s.name.lower()] = s.label
-        
-        # Fallback labels for standard statuses (if not in DB)
-        fallback_labels = {
-            'new': 'חדש',
-            'attempting': 'מנסה ליצור קשר',
-            'contacted': 'יצרנו קשר',
-            'qualified': 'מתאים',
-            'won': 'נצחנו',
-            'lost': 'איבדנו',
-            'unqualified': 'לא מתאים',
-        }
+                requested_by=user.get('id') if user else None,
+                job_id=job_id,
+                timeout=3600,
+                ttl=3600,
+                result_ttl=86400,  # status endpoint re-signs the link from the stored result
+                retry=None,
+                description=f"Export leads ({export_format}) for business {tenant_id}"
+            )
+            log.info(f"📊 Export job {job_id} queued for tenant {tenant_id} (format={export_format})")
+            return jsonify({
+                "success": True,
+                "job_id": job_id,
+                "status": "queued",
+                "status_url": f"/api/leads/export/jobs/{job_id}"
+            }), 202
+        
+        filename = export_filename(export_format)
+        rows = iter_export_rows(tenant_id, filters)
+        
+        if export_format == 'xlsx':
+            # XLSX needs a finished zip container: write to disk, then stream the file
+            path, count = write_export_tempfile(rows, export_format)
+            body = iter_file_chunks(path)
+            log.info(f"📊 Exporting {count} leads for tenant {tenant_id} (xlsx, filters: {filters.to_dict()})")
+        else:
+            # Rows go straight from the server-side cursor into the response
+            body = stream_with_context(iter_csv_chunks(rows))
+            log.info(f"📊 Streaming leads CSV for tenant {tenant_id} (filters: {filters.to_dict()})")
         
-        # 🔥 FIX: Load outbound list names (not just IDs)
-        list_names = {}
-        if tenant_id:
-            lists = OutboundLeadList.query.filter_by(tenant_id=tenant_id).all()
-            for lst in lists:
-                list_names[lst.id] = lst.name
-        
-        # Create CSV in memory
-        output = io.StringIO()
-        
-        # Use UTF-8 with BOM for Excel Hebrew compatibility
-        writer = csv.writer(output)
-        
-        # 🔥 FIX: Write Hebrew headers matching UI
-        writer.writerow([
-            'מזהה',  # id
-            'שם מלא',  # full_name
-            'שם פרטי',  # first_name
-            'שם משפחה',  # last_name
-            'טלפון',  # phone
-            'אימייל',  # email
-            'סטטוס',  # status (Hebrew label)
-            'מקור',  # source
-            'אחראי',  # owner_user_id
-            'רשימת ייבוא',  # outbound_list_name (not ID)
-            'כיוון שיחה',  # last_call_direction
-            'סיכום',  # summary
-            'תגיות',  # tags
-            'תאריך יצירה',  # created_at
-            'תאריך עדכון',  # updated_at
-            'מועד שיחה אחרונה'  # last_contact_at
-        ])
-        
-        # Write lead rows
-        for lead in leads:
-            # 🔥 FIX: Get Hebrew status label
-            status_internal = (lead.status or '').lower()
-            status_display = status_labels.get(status_internal) or fallback_labels.get(status_internal) or lead.status or ''
-            
-            # 🔥 FIX: Get outbound list name (not just ID)
-            list_name = ''
-            if lead.outbound_list_id:
-                list_name = list_names.get(lead.outbound_list_id, f'רשימה {lead.outbound_list_id}')
-            
-            # 🔥 FIX: Format dates in Hebrew-friendly format (DD/MM/YYYY HH:MM)
-            def format_date(dt):
-                if not dt:
-                    return ''
-                try:
-                    return dt.strftime('%d/%m/%Y %H:%M')
-                except:
-                    return dt.isoformat() if dt else ''
-            
-            writer.writerow([
-                lead.id,
-                lead.full_name or '',
-                lead.first_name or '',
-                lead.last_name or '',
-                lead.phone_e164 or '',
-                lead.email or '',
-                status_display,  # 🔥 FIX: Hebrew label instead of internal enum
-                normalize_source(lead.source),
-                lead.owner_user_id or '',
-                list_name,  # 🔥 FIX: List name instead of ID
-                lead.last_call_direction or '',
-                lead.summary or '',
-                ','.join(lead.tags or []),
-                format_date(lead.created_at),
-                format_date(lead.updated_at),
-                format_date(lead.last_contact_at)
-            ])
-        
-        # Get CSV content with UTF-8 BOM
-        csv_content = '\ufeff' + output.getvalue()
-        output.close()
-        
-        # Generate filename
-        today = datetime.now().strftime('%Y-%m-%d')
-        filename = f"leads_export_{today}.csv"
-        
-        log.info(f"📊 Exporting {len(leads)} leads for tenant {tenant_id} (filters: status={status_filter}, source={source_filter}, list={outbound_list_id})")
-        
-        # Return CSV file
         return Response(
-            csv_content,
-            mimetype='text/csv; charset=utf-8',
+            body,
+            mimetype=EXPORT_FORMATS[export_format],
             headers={
                 'Content-Disposition': f'attachment; filename="{filename}"',
-                'Content-Type': 'text/csv; charset=utf-8'
+                'Content-Type': EXPORT_FORMATS[export_format]
             }
         )
         
@@ -3238,6 +3158,58 @@ def export_leads():
         traceback.print_exc()
         return jsonify({"error": f"שגיאה בייצוא: {str(e)}"}), 500
 
+
+@leads_bp.route("/api/leads/export/jobs/<job_id>", methods=["GET"])
+@require_api_auth()
+@require_page_access('crm_leads')
+def export_leads_job_status(job_id):
+    """
+    Status of a background lead export
+    
+    Returns:
+    status, processed rows and - once finished - a presigned download_url (1 hour)
+    """
+    from server.services.jobs import get_job_status
+    
+    if not job_id.startswith('export_leads_'):
+        return jsonify({"error": "Job not found"}), 404
+    
+    user = get_current_user()
+    is_system_admin = user.get('role') == 'system_admin' if user else False
+    
+    job = get_job_status(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    
+    # Tenant isolation: only the business that requested the export may see it
+    if not is_system_admin and job['meta'].get('business_id') != get_current_tenant():
+        return jsonify({"error": "Job not found"}), 404
+    
+    status = getattr(job['status'], 'value', job['status'])
+    response = {
+        "job_id": job_id,
+        "status": status,
+        "processed": job['meta'].get('processed', 0),
+    }
+    
+    if status == 'finished' and job['result']:
+        try:
+            from server.storage import get_storage_driver
+            result = job['result']
+            response.update({
+                "rows": result['rows'],
+                "filename": result['filename'],
+                "format": result['format'],
+                "download_url": get_storage_driver().presign_get(result['storage_key'], ttl_seconds=3600),
+            })
+        except Exception as e:
+            log.error(f"Error creating export download link for {job_id}: {e}")
+            return jsonify({"error": "שגיאה ביצירת קישור להורדה"}), 500
+    elif status == 'failed':
+        response["error"] = "הייצוא נכשל"
+    
+    return jsonify(response)
+
 @leads_bp.route("/api/webhooks/status/dispatch", methods=["POST"])
 @require_api_auth()
 @require_page_access('crm_leads')
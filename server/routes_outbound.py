@@ -22,6 +22,7 @@ from server.models_sql import db, CallLog, Lead, Business, OutboundCallTemplate,
 from server.auth_api import require_api_auth
 from server.security.permissions import require_page_access
 from server.services.call_limiter import check_call_limits, get_call_counts, MAX_TOTAL_CALLS_PER_BUSINESS, MAX_OUTBOUND_CALLS_PER_BUSINESS
+from server.services.capacity_ledger import OUTBOUND, acquire_lease, new_reservation, outbound_headroom, release_lease
 from twilio.rest import Client
 
 log = logging.getLogger(__name__)
@@ -596,6 +597,17 @@ def start_outbound_calls():
             normalized_phone = normalize_israeli_phone(lead.phone_e164)
             log.info(f"📞 Phone normalization: {lead.phone_e164} -> {normalized_phone}")
             
+            # 🎯 CAPACITY: Reserve the slot before dialing (bound to the call SID on success)
+            reservation = new_reservation()
+            if not acquire_lease(reservation, tenant_id, OUTBOUND).admitted:
+                results.append({
+                    "lead_id": lead.id,
+                    "lead_name": lead.full_name,
+                    "status": "failed",
+                    "error": "המערכת עמוסה כרגע, נסה שוב בעוד מספר דקות"
+                })
+                continue
+            
             try:
                 call_log = CallLog()
                 call_log.business_id = tenant_id
@@ -625,7 +637,8 @@ def start_outbound_calls():
                     host=host,
                     lead_id=lead.id,
                     business_name=business_name,
-                    lead_name=lead_name
+                    lead_name=lead_name,
+                    capacity_lease=reservation
                 )
                 
                 call_sid = result["call_sid"]
@@ -651,6 +664,7 @@ def start_outbound_calls():
             
             except Exception as e:
                 log.error(f"Failed to start call to lead {lead.id}: {e}")
+                release_lease(reservation)
                 db.session.rollback()
                 results.append({
                     "lead_id": lead.id,
@@ -3274,8 +3288,6 @@ def process_bulk_call_run(run_id: int):
                 db.session.commit()
                 return
             
-            # 🔒 CRITICAL: Import business-level limiter to prevent exceeding 3 calls per business
-            from server.services.call_limiter import count_active_outbound_calls, MAX_OUTBOUND_CALLS_PER_BUSINESS
             # 🔥 SEMAPHORE: Import Redis-based semaphore for hard 3-concurrent limit
             from server.services.outbound_semaphore import try_acquire_slot, release_slot
             
@@ -3327,6 +3339,12 @@ def process_bulk_call_run(run_id: int):
                         db.session.commit()
                     break
                 
+                # 🎯 CAPACITY: One ledger read - don't lock a job row while every slot is taken
+                # (global, per-business and outbound limits all count)
+                if outbound_headroom(run.business_id) <= 0:
+                    time.sleep(1)
+                    continue
+                
                 # 🔒 DB LOCK: Get next queued job with SELECT FOR UPDATE SKIP LOCKED
                 # This prevents multiple workers from picking the same job
                 # SKIP LOCKED means if another worker has locked a row, we skip it and get the next one
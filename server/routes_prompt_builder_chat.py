@@ -13,10 +13,12 @@ import logging
 import os
 import json
 from datetime import datetime
-from openai import OpenAI
+from server.services.lazy_services import lazy_module
 
 logger = logging.getLogger(__name__)
 
+openai = lazy_module("openai")  # OpenAI SDK is imported on first use
+
 prompt_builder_chat_bp = Blueprint('prompt_builder_chat', __name__)
 
 # Maximum conversation history to keep
@@ -237,7 +239,7 @@ def chat_message():
         
         # Call OpenAI
         try:
-            client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+            client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
             
             response = client.chat.completions.create(
                 model="gpt-4o",
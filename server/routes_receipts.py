@@ -2050,6 +2050,7 @@ def sync_receipts():
             from_date=from_date,
             to_date=to_date,
             months_back=months_back,
+            resume=not force,  # A forced rescan purged the range - never continue an old checkpoint
             job_timeout='1h',  # Max 1 hour for sync (3600 seconds)
             result_ttl=3600,  # Keep result for 1 hour
             failure_ttl=86400,  # Keep failure info for 24 hours
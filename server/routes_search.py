@@ -5,13 +5,20 @@ Supports multi-tenant with business_id filtering
 from flask import Blueprint, request, jsonify, session
 from server.auth_api import require_api_auth
 from server.db import db
-from server.models_sql import Lead, CallLog, WhatsAppConversation, User, Business
+from server.models_sql import User, Business
+from server.services.search_service import (
+    decode_cursor, escape_like, load_lead_names, parse_search_query,
+    search_calls, search_conversations, search_leads, search_messages,
+)
 from sqlalchemy import or_, and_, func
 from datetime import datetime
 import logging
 
 log = logging.getLogger(__name__)
 
+MAX_RESULTS_PER_TYPE = 50
+PAGED_TYPES = ('leads', 'calls', 'whatsapp', 'messages')
+
 search_api = Blueprint('search_api', __name__, url_prefix='/api')
 
 
@@ -24,8 +31,13 @@ def global_search():
     Query params:
     - q: search query (required, min 2 chars)
     - types: comma-separated list of types to search (optional)
-            valid types: leads, calls, whatsapp, contacts
-    - limit: max results per type (default: 5)
+            valid types: leads, calls, whatsapp, messages, contacts, pages, settings
+    - limit: max results per type (default: 5, max: 50)
+    - cursor: next_cursor value of a previous page (only with a single paged type)
+    
+    Leads / calls / WhatsApp are ranked and index-backed (see services/search_service.py):
+    Hebrew-normalized names, phone numbers in any format (050..., +972..., suffix),
+    full-text over notes, call summaries and WhatsApp message bodies.
     
     Returns:
     {
@@ -34,8 +46,10 @@ def global_search():
         "leads": [...],
         "calls": [...],
         "whatsapp": [...],
+        "messages": [...],
         "contacts": [...]
       },
+      "next_cursor": {"leads": "...", "calls": null, ...},
       "total": 15
     }
     """
@@ -90,67 +104,65 @@ def global_search():
                     'leads': [],
                     'calls': [],
                     'whatsapp': [],
+                    'messages': [],
                     'contacts': [],
                     'pages': [],
                     'settings': []
                 },
+                'next_cursor': {},
                 'total': 0
             })
         
-        # Sanitize query - prevent special SQL characters
-        # SQLAlchemy's ilike() uses parameterized queries, but we sanitize for extra safety
-        query = query.replace('%', '').replace('_', '').replace('\\', '')[:100]  # Max 100 chars
+        # Parse query once: Hebrew-normalized text, phone digit patterns, tsquery
+        # (LIKE metacharacters are escaped by search_service - no stripping needed)
+        terms = parse_search_query(query)
+        query = terms.raw
         
         # Parse types filter
         types_param = request.args.get('types', 'all')
         if types_param == 'all':
-            search_types = ['leads', 'calls', 'whatsapp', 'contacts', 'pages', 'settings']
+            search_types = ['leads', 'calls', 'whatsapp', 'messages', 'contacts', 'pages', 'settings']
         else:
             search_types = [t.strip() for t in types_param.split(',')]
-        limit = request.args.get('limit', 5, type=int)
+        limit = max(1, min(request.args.get('limit', 5, type=int), MAX_RESULTS_PER_TYPE))
+        
+        # Keyset pagination: `cursor` (from next_cursor) applies when exactly one
+        # paged type is requested, e.g. ?types=leads&cursor=...
+        cursor = None
+        paged_types = [t for t in search_types if t in PAGED_TYPES]
+        if request.args.get('cursor') and len(paged_types) == 1:
+            try:
+                cursor = decode_cursor(request.args.get('cursor'))
+            except ValueError:
+                return jsonify({'error': 'Invalid cursor'}), 400
+        
+        if business_id is None and user_role != 'system_admin':
+            log.error("Non-admin user attempting search without business_id")
+            return jsonify({'error': 'Business context required'}), 401
         
         results = {
             'leads': [],
             'calls': [],
             'whatsapp': [],
+            'messages': [],
             'contacts': [],
             'pages': [],
             'settings': []
         }
+        next_cursor = {}
         
-        # Search in Leads
+        # Search in Leads - ✅ Lead uses tenant_id (business filter applied in search_service)
         if 'leads' in search_types:
             try:
-                # ✅ CRITICAL: Always filter by tenant_id (not business_id) for Leads
-                leads_query = Lead.query
-                
-                # Apply business filter - Lead uses tenant_id field
-                if business_id:
-                    leads_query = leads_query.filter(Lead.tenant_id == business_id)
-                elif user_role != 'system_admin':
-                    # Non-admin without business_id - should not happen, but safety check
-                    log.error("Non-admin user attempting search without business_id")
-                    return jsonify({'error': 'Business context required'}), 401
-                
-                # Search by first_name, last_name, phone_e164, email, or notes
-                leads_query = leads_query.filter(
-                    or_(
-                        Lead.first_name.ilike(f'%{query}%'),
-                        Lead.last_name.ilike(f'%{query}%'),
-                        Lead.phone_e164.ilike(f'%{query}%'),
-                        Lead.email.ilike(f'%{query}%'),
-                        Lead.notes.ilike(f'%{query}%') if hasattr(Lead, 'notes') else False
-                    )
-                ).order_by(Lead.created_at.desc()).limit(limit)
-                
-                for lead in leads_query.all():
+                leads, next_cursor['leads'] = search_leads(terms, business_id, limit, cursor)
+                for lead in leads:
                     full_name = f"{lead.first_name or ''} {lead.last_name or ''}".strip()
                     results['leads'].append({
                         'id': lead.id,
                         'type': 'lead',
-                        'title': full_name or lead.phone_e164 or 'לא ידוע',
+                        'title': full_name or lead.name or lead.phone_e164 or 'לא ידוע',
                         'subtitle': lead.phone_e164,
-                        'description': lead.email or (lead.notes[:100] + '...' if hasattr(lead, 'notes') and lead.notes else ''),
+                        'description': lead.email or (lead.notes[:100] + '...' if lead.notes else ''),
                         'metadata': {
                             'phone': lead.phone_e164,
                             'email': lead.email,
@@ -160,38 +172,17 @@ def global_search():
                         }
                     })
             except Exception as e:
+                db.session.rollback()
                 log.error(f"Error searching leads: {e}", exc_info=True)
         
-        # Search in Calls
+        # Search in Calls (numbers, call SID, summary)
         if 'calls' in search_types:
             try:
-                # ✅ CRITICAL: Always filter by business_id for non-system_admin
-                calls_query = CallLog.query
-                
-                # Apply business filter
-                if business_id:
-                    calls_query = calls_query.filter(CallLog.business_id == business_id)
-                elif user_role != 'system_admin':
-                    log.error("Non-admin user attempting calls search without business_id")
-                    return jsonify({'error': 'Business context required'}), 401
-                
-                # Search by phone number or call SID
-                calls_query = calls_query.filter(
-                    or_(
-                        CallLog.from_number.ilike(f'%{query}%'),
-                        CallLog.to_number.ilike(f'%{query}%'),
-                        CallLog.call_sid.ilike(f'%{query}%')
-                    )
-                ).order_by(CallLog.created_at.desc()).limit(limit)
-                
-                for call in calls_query.all():
-                    # Get lead info if exists
-                    lead_name = None
-                    if call.lead_id:
-                        lead = Lead.query.get(call.lead_id)
-                        if lead:
-                            lead_name = lead.name
-                    
+                calls, next_cursor['calls'] = search_calls(terms, business_id, limit, cursor)
+                # ✅ One query for all lead names on the page (was Lead.query.get per call)
+                lead_names = load_lead_names(call.lead_id for call in calls)
+                for call in calls:
+                    lead_name = lead_names.get(call.lead_id)
                     results['calls'].append({
                         'id': call.id,
                         'type': 'call',
@@ -208,30 +199,14 @@ def global_search():
                         }
                     })
             except Exception as e:
+                db.session.rollback()
                 log.error(f"Error searching calls: {e}", exc_info=True)
         
-        # Search in WhatsApp Conversations
+        # Search in WhatsApp Conversations (customer number / name)
         if 'whatsapp' in search_types:
             try:
-                # ✅ CRITICAL: Always filter by business_id for non-system_admin
-                conversations_query = WhatsAppConversation.query
-                
-                # Apply business filter
-                if business_id:
-                    conversations_query = conversations_query.filter(WhatsAppConversation.business_id == business_id)
-                elif user_role != 'system_admin':
-                    log.error("Non-admin user attempting WhatsApp search without business_id")
-                    return jsonify({'error': 'Business context required'}), 401
-                
-                # Search by phone or customer name
-                conversations_query = conversations_query.filter(
-                    or_(
-                        WhatsAppConversation.customer_number.ilike(f'%{query}%'),
-                        WhatsAppConversation.customer_name.ilike(f'%{query}%')
-                    )
-                ).order_by(WhatsAppConversation.last_message_at.desc()).limit(limit)
-                
-                for conversation in conversations_query.all():
+                conversations, next_cursor['whatsapp'] = search_conversations(terms, business_id, limit, cursor)
+                for conversation in conversations:
                     results['whatsapp'].append({
                         'id': conversation.id,
                         'type': 'whatsapp',
@@ -247,8 +222,35 @@ def global_search():
                         }
                     })
             except Exception as e:
+                db.session.rollback()
                 log.error(f"Error searching WhatsApp conversations: {e}")
         
+        # Search in WhatsApp message bodies (full-text)
+        if 'messages' in search_types:
+            try:
+                messages, next_cursor['messages'] = search_messages(terms, business_id, limit, cursor)
+                lead_names = load_lead_names(message.lead_id for message in messages)
+                for message in messages:
+                    lead_name = lead_names.get(message.lead_id)
+                    body = message.body or ''
+                    results['messages'].append({
+                        'id': message.id,
+                        'type': 'whatsapp',
+                        'title': f"WhatsApp - {lead_name or message.to_number}",
+                        'subtitle': message.to_number,
+                        'description': body[:100] + ('...' if len(body) > 100 else ''),
+                        'metadata': {
+                            'phone': message.to_number,
+                            'direction': message.direction,
+                            'created_at': message.created_at.isoformat() if message.created_at else None,
+                            'conversation_id': message.conversation_id,
+                            'lead_id': message.lead_id
+                        }
+                    })
+            except Exception as e:
+                db.session.rollback()
+                log.error(f"Error searching WhatsApp messages: {e}")
+        
         # Search in Contacts/Users (optional - for internal team search)
         if 'contacts' in search_types:
             try:
@@ -265,8 +267,8 @@ def global_search():
                 # Search users in the same business
                 users_query = users_query.filter(
                     or_(
-                        User.name.ilike(f'%{query}%'),
-                        User.email.ilike(f'%{query}%')
+                        User.name.ilike(f'%{escape_like(query)}%'),
+                        User.email.ilike(f'%{escape_like(query)}%')
                     )
                 ).order_by(User.created_at.desc()).limit(limit)
                 
@@ -440,11 +442,12 @@ def global_search():
         # Calculate total results
         total = sum(len(results[t]) for t in results)
         
-        log.info(f"Search results for '{query}': {total} total (leads:{len(results['leads'])}, calls:{len(results['calls'])}, whatsapp:{len(results['whatsapp'])}, contacts:{len(results['contacts'])}, pages:{len(results['pages'])}, settings:{len(results['settings'])})")
+        log.info(f"Search results for '{query}': {total} total (leads:{len(results['leads'])}, calls:{len(results['calls'])}, whatsapp:{len(results['whatsapp'])}, messages:{len(results['messages'])}, contacts:{len(results['contacts'])}, pages:{len(results['pages'])}, settings:{len(results['settings'])})")
         
         return jsonify({
             'query': query,
             'results': results,
+            'next_cursor': next_cursor,
             'total': total
         })
         
@@ -6,6 +6,7 @@ from flask import Blueprint, request, jsonify, session, g
 from server.auth_api import require_api_auth
 from server.models_sql import LeadStatus, Lead, Business, ScheduledRuleStatus
 from server.db import db
+from server.services.status_catalog import invalidate_status_catalog
 from datetime import datetime
 import logging
 
@@ -62,6 +63,7 @@ def get_business_statuses():
                 db.session.add(status)
             
             db.session.commit()
+            invalidate_status_catalog(business_id)
             
             # Re-query to get the created statuses
             statuses = LeadStatus.query.filter_by(
@@ -225,6 +227,7 @@ def create_status():
         logging.info(f"[StatusAPI POST] Adding status to session: business_id={business_id}, label={status.label}, name={status.name}")
         db.session.add(status)
         db.session.commit()
+        invalidate_status_catalog(business_id)
         logging.info(f"[StatusAPI POST] SUCCESS! Created status ID={status.id}, label={status.label}")
         
         response_data = {
@@ -335,6 +338,7 @@ def update_status(status_id):
             
         status.updated_at = datetime.utcnow()
         db.session.commit()
+        invalidate_status_catalog(business_id)
         
         # 🔥 NEW: Invalidate cache when status labels change
         try:
@@ -426,6 +430,7 @@ def delete_status(status_id):
             # Safe to delete the status
             db.session.delete(status)
             db.session.commit()
+            invalidate_status_catalog(business_id)
             
             return jsonify({
                 'message': 'Status deleted successfully',
@@ -470,6 +475,7 @@ def reorder_statuses():
             status.updated_at = datetime.utcnow()
         
         db.session.commit()
+        invalidate_status_catalog(business_id)
         
         return jsonify({'message': 'Statuses reordered successfully'})
         
@@ -515,6 +521,7 @@ def initialize_default_statuses(business_id):
             db.session.add(status)
         
         db.session.commit()
+        invalidate_status_catalog(business_id)
         
         return jsonify({
             'message': f'Initialized {len(default_statuses)} default statuses for business',
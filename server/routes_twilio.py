@@ -668,70 +668,61 @@ def incoming_call():
             # Return graceful TwiML error instead of 500
             return create_twiml_error_response()
     
-    # 🔥 P3-1: GLOBAL CAPACITY CHECK (before business-specific limits)
-    # Check system-wide call capacity to prevent overload
-    try:
-        from server.services.calls_capacity import try_acquire_call_slot
-        if not try_acquire_call_slot(call_sid):
-            # At capacity - reject gracefully with Hebrew message
-            logger.warning(f"📵 INCOMING_CALL REJECTED: System at capacity call_sid={call_sid}")
-            vr = VoiceResponse()
-            vr.say(
-                "המערכת עמוסה כרגע. אנא נסו שוב בעוד מספר דקות או שלחו לנו הודעה בוואטסאפ.",
-                language="he-IL",
-                voice="Google.he-IL-Wavenet-C"
-            )
-            vr.hangup()
-            
-            # Log rejection event to DB if possible
-            try:
-                if call_sid and from_number:
-                    from server.tasks_recording import normalize_call_direction
-                    fallback_to = to_number or (business.phone_e164 if business else None) or "unknown"
-                    normalized_direction = normalize_call_direction(twilio_direction) if twilio_direction else "unknown"
-                    
-                    call_log = CallLog(
-                        call_sid=call_sid,
-                        from_number=from_number,
-                        to_number=fallback_to,
-                        business_id=business_id,
-                        direction=normalized_direction,
-                        twilio_direction=twilio_direction if twilio_direction else None,
-                        call_status="rejected_capacity",
-                        status="rejected_capacity"
-                    )
-                    db.session.add(call_log)
-                    db.session.commit()
-            except Exception as db_err:
-                logger.error(f"Failed to log capacity rejection: {db_err}")
-                db.session.rollback()
-            
-            return _twiml(vr)
-    except Exception as e:
-        # Capacity check failed - fail open (allow call)
-        logger.error(f"⚠️ Capacity check failed: {e} - allowing call")
-    
-    # BUILD 174: Check inbound call concurrency limits
-    if business_id:
+    # 🔥 CAPACITY LEDGER: global + per-business limits in one atomic admission
+    # The media stream heartbeats this lease; a crashed pod's slot expires on its own
+    admission = None
+    if call_sid:
         try:
-            from server.services.call_limiter import check_inbound_call_limit
-            allowed, reject_message = check_inbound_call_limit(business_id)
-            if not allowed:
-                logger.warning(f"📵 INCOMING_CALL REJECTED: business {business_id} at limit")
-                vr = VoiceResponse()
-                vr.say(reject_message, language="he-IL", voice="Google.he-IL-Wavenet-C")
-                vr.hangup()
-                
-                # 🔥 P3-1: Release capacity slot since we're rejecting
-                try:
-                    from server.services.calls_capacity import release_call_slot
-                    release_call_slot(call_sid)
-                except Exception:
-                    pass
-                
-                return _twiml(vr)
+            from server.services.capacity_ledger import acquire_lease, INBOUND
+            admission = acquire_lease(call_sid, business_id, INBOUND)
         except Exception as e:
-            logger.error(f"⚠️ Call limit check failed: {e} - allowing call")
+            # Capacity check failed - fail open (allow call)
+            logger.error(f"⚠️ Capacity check failed: {e} - allowing call")
+    
+    if admission is not None and not admission.admitted and admission.reason.startswith("business"):
+        # BUILD 174: business at its inbound + outbound concurrency limit
+        from server.services.call_limiter import INBOUND_LIMIT_MESSAGE
+        logger.warning(f"📵 INCOMING_CALL REJECTED: business {business_id} at limit ({admission.reason})")
+        vr = VoiceResponse()
+        vr.say(INBOUND_LIMIT_MESSAGE, language="he-IL", voice="Google.he-IL-Wavenet-C")
+        vr.hangup()
+        return _twiml(vr)
+    
+    if admission is not None and not admission.admitted:
+        # At capacity - reject gracefully with Hebrew message
+        logger.warning(f"📵 INCOMING_CALL REJECTED: System at capacity call_sid={call_sid}")
+        vr = VoiceResponse()
+        vr.say(
+            "המערכת עמוסה כרגע. אנא נסו שוב בעוד מספר דקות או שלחו לנו הודעה בוואטסאפ.",
+            language="he-IL",
+            voice="Google.he-IL-Wavenet-C"
+        )
+        vr.hangup()
+        
+        # Log rejection event to DB if possible
+        try:
+            if call_sid and from_number:
+                from server.tasks_recording import normalize_call_direction
+                fallback_to = to_number or (business.phone_e164 if business else None) or "unknown"
+                normalized_direction = normalize_call_direction(twilio_direction) if twilio_direction else "unknown"
+                
+                call_log = CallLog(
+                    call_sid=call_sid,
+                    from_number=from_number,
+                    to_number=fallback_to,
+                    business_id=business_id,
+                    direction=normalized_direction,
+                    twilio_direction=twilio_direction if twilio_direction else None,
+                    call_status="rejected_capacity",
+                    status="rejected_capacity"
+                )
+                db.session.add(call_log)
+                db.session.commit()
+        except Exception as db_err:
+            logger.error(f"Failed to log capacity rejection: {db_err}")
+            db.session.rollback()
+        
+        return _twiml(vr)
     
     if call_sid and from_number:
         try:
@@ -812,703 +812,720 @@ def save_whatsapp_prompt(business_id):
     
     return {"ok": True, "id": business_id, "prompt_length": len(settings.ai_prompt)}
 
+def _parse_baileys_message(msg, business_id, lid_cache, log):
+    """
+    Resolve one Baileys message into what the pipeline stores: phone / LID
+    identity, conversation_key, text and reply JID. Returns None to skip it.
+
+    lid_cache memoizes @lid resolution (Baileys resolver call + DB mapping) per
+    remoteJid for the batch - a history sync repeats the same few chats.
+    """
+    # 🔥 CRITICAL FIX: Extract FULL remoteJid - DO NOT strip domain!
+    # Android messages may come from @lid, @g.us (groups), or other formats
+    # We must reply to the EXACT remoteJid we received
+    remote_jid = msg.get('key', {}).get('remoteJid', '') or ''
+    baileys_message_id = msg.get('key', {}).get('id', '')
+    timestamp_ms = msg.get('messageTimestamp', 0)
+
+    # 🔥 BUG FIX: Create safe identifier for logging/DB from remoteJid
+    from_identifier = remote_jid.replace('@', '_').replace('.', '_') if remote_jid else 'unknown'
+
+    # 🔥 CRITICAL: Skip NON-PRIVATE messages - bot ONLY responds to private 1-on-1 chats!
+    # Groups: @g.us, Broadcast lists: @broadcast, Newsletters/Channels: @newsletter,
+    # Status updates: status@broadcast
+    if (remote_jid.endswith('@g.us') or
+        remote_jid.endswith('@broadcast') or
+        remote_jid.endswith('@newsletter') or
+        'status@broadcast' in remote_jid):
+        log.info(f"[WA-SKIP] Ignoring non-private message from {remote_jid} - bot only responds to private chats")
+        return None
+
+    # 🔥 LID FIX: Extract phone number with proper normalization and LID support
+    # remoteJid can be:
+    # - Standard: 972501234567@s.whatsapp.net
+    # - LID (Android/Business): 82399031480511@lid  (NOT a real phone!)
+    # - Participant (Groups): phone@s.whatsapp.net as participant
+    from_number_e164 = None
+    customer_external_id = None
+    remote_jid_alt = None  # Alternative JID for proper reply routing
+    phone_raw = None  # Raw phone for debugging
+
+    # 🆕 Extract pushName for name saving
+    push_name = msg.get('pushName', '')
+
+    # 🔥 LID FIX: Read _lid_metadata from Baileys (contains participant from all sources)
+    lid_meta = msg.get('_lid_metadata', {}) or {}
+    meta_participant_jid = lid_meta.get('participant_jid')
+    meta_resolved_jid = lid_meta.get('resolved_jid')
+    meta_resolved_phone = lid_meta.get('resolved_phone')  # Phone extracted by Baileys
+    meta_push_name = lid_meta.get('push_name')  # Push name from Baileys
+
+    if remote_jid.endswith('@lid'):
+        log.info(f"[WA-LID-META] Full _lid_metadata: {lid_meta}")
+
+    # 🔥 CRITICAL: If Baileys already resolved the phone, use it immediately!
+    if meta_resolved_phone:
+        from_number_e164 = meta_resolved_phone
+        log.info(f"[WA-LID] ✅ Using pre-resolved phone from Baileys: {meta_resolved_phone}")
+
+    if meta_push_name:
+        push_name = meta_push_name
+
+    # 🔥 FIX #3: Check for participant (sender_pn) first - this is the preferred reply address
+    # Priority: resolved_jid > _lid_metadata.participant_jid > key.participant
+    participant = msg.get('key', {}).get('participant')
+
+    # Build candidate JID: first valid @s.whatsapp.net wins
+    candidate_jid = None
+    candidate_source = None
+    if meta_resolved_jid and str(meta_resolved_jid).endswith('@s.whatsapp.net'):
+        candidate_jid = meta_resolved_jid
+        candidate_source = 'resolved_jid'
+    elif meta_participant_jid and str(meta_participant_jid).endswith('@s.whatsapp.net'):
+        candidate_jid = meta_participant_jid
+        candidate_source = 'participant_jid'
+    elif participant and participant.endswith('@s.whatsapp.net'):
+        candidate_jid = participant
+        candidate_source = 'key_participant'
+
+    if candidate_jid:
+        remote_jid_alt = candidate_jid
+        log.debug(f"[WA-LID] Found candidate JID: {candidate_jid} (source={candidate_source})")
+
+    if remote_jid.endswith('@s.whatsapp.net'):
+        # Standard WhatsApp user - extract and normalize phone
+        phone_raw = remote_jid.replace('@s.whatsapp.net', '')
+        from_number_e164 = normalize_phone(phone_raw)
+
+        if from_number_e164:
+            phone_for_ai_check = from_number_e164
+        else:
+            # Invalid phone format - treat as external ID
+            log.warning(f"[WA-INCOMING] Could not normalize phone from standard JID: {remote_jid}")
+            customer_external_id = remote_jid
+            phone_for_ai_check = remote_jid
+
+    elif remote_jid.endswith('@lid'):
+        # 🔥 LID FIX: NEVER extract phone from @lid digits - they are NOT real phones!
+        push_name = msg.get('pushName', 'Unknown')
+        log.info(f"[WA-INCOMING] @lid JID detected: {remote_jid}, pushName={push_name}")
+
+        # Store LID as external ID for this conversation
+        customer_external_id = remote_jid
+
+        # Strategy 0: Baileys already resolved the phone (HIGHEST PRIORITY!)
+        if not from_number_e164 and meta_resolved_phone:
+            from_number_e164 = meta_resolved_phone
+
+        # Strategy 1: Use candidate_jid (resolved_jid or participant_jid from Baileys)
+        if not from_number_e164 and candidate_jid:
+            phone_raw = candidate_jid.replace('@s.whatsapp.net', '')
+            from_number_e164 = normalize_phone(phone_raw)
+            if from_number_e164:
+                log.info(f"[WA-LID] lid detected; extracted_phone={from_number_e164} source={candidate_source}")
+            else:
+                log.warning(f"[WA-LID] Could not normalize phone from {candidate_source}: {candidate_jid}")
+
+        if remote_jid in lid_cache:
+            cached_phone, cached_push_name = lid_cache[remote_jid]
+            from_number_e164 = from_number_e164 or cached_phone
+            push_name = cached_push_name or push_name
+        else:
+            resolver_push_name = None
+
+            # Strategy 2: Try enhanced Baileys resolver (with WhatsApp queries)
+            if not from_number_e164:
+                try:
+                    resolver_url = f"{get_baileys_base_url(business_id)}/internal/resolve-jid"
+                    resolver_response = requests.post(resolver_url,
+                        json={
+                            'tenantId': f'business_{business_id}',
+                            'jid': remote_jid,
+                            'participant': candidate_jid,
+                            'pushName': push_name
+                        },
+                        headers={'X-Internal-Secret': INT_SECRET},
+                        timeout=5.0
+                    )
+
+                    if resolver_response.status_code == 200:
+                        resolver_data = resolver_response.json()
+                        if resolver_data.get('phone_e164'):
+                            from_number_e164 = resolver_data['phone_e164']
+                            log.info(f"[WA-LID] ✅ Enhanced resolver success: {from_number_e164} (source: {resolver_data.get('source')})")
+                        elif resolver_data.get('push_name') and resolver_data['push_name'] != '.':
+                            # Update push_name if resolver found a better one
+                            resolver_push_name = push_name = resolver_data['push_name']
+                            log.info(f"[WA-LID] Enhanced resolver found better push_name: {push_name}")
+                except Exception as resolver_err:
+                    log.warning(f"[WA-LID] Enhanced resolver failed: {resolver_err}")
+
+            # Strategy 3: DB mapping lookup (ContactIdentity table)
+            if not from_number_e164:
+                try:
+                    from server.services.contact_identity_service import ContactIdentityService
+                    mapped_phone = ContactIdentityService.lookup_phone_by_lid(
+                        business_id=business_id,
+                        lid_jid=remote_jid
+                    )
+                    if mapped_phone:
+                        from_number_e164 = mapped_phone
+                        log.info(f"[WA-LID] lid detected; extracted_phone={from_number_e164} source=db_mapping")
+                except Exception as db_err:
+                    log.warning(f"[WA-LID] DB mapping lookup failed: {db_err}")
+
+            # Strategy 4: Store LID→Phone mapping when we do resolve one
+            if from_number_e164:
+                try:
+                    from server.services.contact_identity_service import ContactIdentityService
+                    ContactIdentityService.store_lid_phone_mapping(
+                        business_id=business_id,
+                        lid_jid=remote_jid,
+                        phone_e164=from_number_e164,
+                        source='whatsapp_resolved'
+                    )
+                    log.info(f"[WA-LID] ✅ Stored LID→Phone mapping: {remote_jid} → {from_number_e164}")
+                except Exception as store_err:
+                    log.warning(f"[WA-LID] Failed to store LID mapping: {store_err}")
+
+            lid_cache[remote_jid] = (from_number_e164, resolver_push_name)
+
+        # No phone found - leave as None, never invent from LID digits
+        if not from_number_e164:
+            log.info(f"[WA-LID] lid detected; extracted_phone=none source=none")
+
+        # 🔥 FIX: Use resolved phone for conversation key when available
+        # This ensures WhatsApp chats page displays phone numbers instead of LID identifiers
+        phone_for_ai_check = from_number_e164 or customer_external_id
+
+    else:
+        # 🔥 FIX #6: Other non-standard JID - store as external ID
+        push_name = msg.get('pushName', 'Unknown')
+        log.warning(f"[WA-INCOMING] Non-standard JID {remote_jid}, pushName={push_name}")
+        customer_external_id = remote_jid
+        phone_for_ai_check = remote_jid
+
+    # 🔥 FIX #3: Create unified conversation_key for consistent history tracking
+    # This prevents context loss in LID/Android conversations where from_number_e164 can be None
+    conversation_key = normalize_conversation_key(
+        remote_jid=remote_jid,
+        from_number_e164=from_number_e164,
+        phone_for_ai_check=phone_for_ai_check
+    )
+
+    # 🔥 ANDROID FIX: Support ALL message formats (iPhone + Android)
+    # - iPhone: usually uses 'conversation'
+    # - Android: uses 'conversation', 'extendedTextMessage', or 'imageMessage' with caption
+    message_obj = msg.get('message', {}) or {}
+    message_text = None
+
+    # Try all possible text locations (order matters - most common first)
+    if message_obj.get('conversation'):
+        message_text = message_obj.get('conversation')
+    if not message_text and message_obj.get('extendedTextMessage'):
+        message_text = message_obj.get('extendedTextMessage', {}).get('text', '')
+    # 🔥 ANDROID FIX: Handle image/video/document messages with captions
+    if not message_text and message_obj.get('imageMessage'):
+        message_text = message_obj.get('imageMessage', {}).get('caption', '[תמונה]')
+    if not message_text and message_obj.get('videoMessage'):
+        message_text = message_obj.get('videoMessage', {}).get('caption', '[וידאו]')
+    if not message_text and message_obj.get('documentMessage'):
+        message_text = message_obj.get('documentMessage', {}).get('caption', '[מסמך]')
+    # 🔥 ANDROID FIX: Handle audio messages
+    if not message_text and message_obj.get('audioMessage'):
+        message_text = '[הודעה קולית]'
+
+    # 🔥 FIX D: Don't crash on empty/unknown message formats - just skip gracefully
+    if not message_text:
+        available_keys = list(message_obj.keys())
+        if not available_keys:
+            log.info(f"[WA-SKIP] Empty message object from {remote_jid} - skipping gracefully")
+            return None
+        log.info(f"[WA-SKIP] Unknown message format from {from_identifier} (remoteJid={remote_jid}), available keys: {available_keys}")
+        # Try to extract ANY text from ANY key as last resort
+        for key in available_keys:
+            if isinstance(message_obj[key], dict):
+                if 'text' in message_obj[key]:
+                    message_text = message_obj[key]['text']
+                    log.info(f"[WA-PARSE] Found text in '{key}.text'")
+                    break
+                if 'caption' in message_obj[key]:
+                    message_text = message_obj[key]['caption']
+                    log.info(f"[WA-PARSE] Found text in '{key}.caption'")
+                    break
+
+    if not remote_jid or not message_text:
+        log.info(f"[WA-SKIP] Missing remote_jid={bool(remote_jid)} or message_text={bool(message_text)} - skipping message")
+        return None
+
+    # 🔥 FIX #3: Calculate reply_jid - prefer @s.whatsapp.net over @lid
+    reply_jid = remote_jid
+    if remote_jid_alt and remote_jid_alt.endswith('@s.whatsapp.net'):
+        reply_jid = remote_jid_alt
+
+    if remote_jid.endswith('@lid'):
+        phone_status = f"✅ {from_number_e164}" if from_number_e164 else "❌ NO PHONE"
+        log.info(f"[WA-LID] 📋 LID message: incoming={remote_jid}, reply_to={reply_jid}, phone: {phone_status}, push_name={push_name or 'none'}")
+
+    # Message timestamp: lead contact time (local) and the retry dedupe window (UTC)
+    msg_timestamp = datetime.utcnow()
+    timestamp_utc = None
+    if timestamp_ms:
+        try:
+            msg_timestamp = datetime.fromtimestamp(int(timestamp_ms))
+            timestamp_utc = datetime.utcfromtimestamp(int(timestamp_ms))
+        except (ValueError, TypeError, OverflowError, OSError):
+            pass
+
+    log.info(f"[WA-INCOMING] biz={business_id}, from={from_number_e164}, remoteJid={remote_jid}, "
+             f"conversation_key={conversation_key[:30]}, text={message_text[:50]}...")
+
+    return {
+        'remote_jid': remote_jid,
+        'message_id': baileys_message_id or None,
+        'push_name': push_name,
+        'from_number_e164': from_number_e164,
+        'conversation_key': conversation_key,
+        'message_text': message_text,
+        'reply_jid': reply_jid,
+        'msg_timestamp': msg_timestamp,
+        'timestamp_utc': timestamp_utc,
+    }
+
+
+def _prepare_chat_rows(business_id, conversation_key, items, log):
+    """
+    Filter one chat's parsed messages (echoes of our own sends, webhook retries)
+    and build their WhatsAppMessage rows. The lead and the conversation session
+    are resolved once per chat with its newest message - same end state as
+    touching them for every message.
+
+    Returns:
+        [(row dict, parsed message, lead_id)] in arrival order
+    """
+    from sqlalchemy import or_
+    from server.services.contact_identity_service import ContactIdentityService
+
+    now = datetime.utcnow()
+    inbound = ['in', 'inbound']
+
+    # 🔥 CRITICAL FIX: Baileys sometimes sends the bot's outbound messages back as "incoming".
+    # Skip an EXACT echo of our last outbound message if it was sent in the last 10 seconds.
+    echo_body = None
+    recent_outbound = WhatsAppMessage.query.filter(
+        WhatsAppMessage.business_id == business_id,
+        WhatsAppMessage.to_number == conversation_key,
+        WhatsAppMessage.direction.in_(['out', 'outbound'])
+    ).order_by(WhatsAppMessage.created_at.desc()).first()
+    if recent_outbound and recent_outbound.body and recent_outbound.created_at \
+            and now - recent_outbound.created_at < timedelta(seconds=10):
+        echo_body = recent_outbound.body.strip()
+
+    # ✅ Retry dedupe for messages without a usable message_id match:
+    # 1. remote_jid + timestamp (row within 1s of the message timestamp)
+    # 2. same body received in the last 10 seconds
+    # One query per chat for both windows instead of two per message.
+    tolerance = timedelta(seconds=1)
+    stamps = [item['timestamp_utc'] for item in items if item['timestamp_utc']]
+    windows = [WhatsAppMessage.created_at >= now - timedelta(seconds=10)]
+    if stamps:
+        windows.append(WhatsAppMessage.created_at.between(min(stamps) - tolerance, max(stamps) + tolerance))
+    stored = db.session.query(WhatsAppMessage.created_at, WhatsAppMessage.body).filter(
+        WhatsAppMessage.business_id == business_id,
+        WhatsAppMessage.to_number == conversation_key,
+        WhatsAppMessage.direction.in_(inbound),
+        or_(*windows)
+    ).all()
+    stored_times = [row.created_at for row in stored if row.created_at]
+    recent_bodies = {row.body for row in stored if row.created_at and now - row.created_at < timedelta(seconds=10)}
+
+    accepted = []
+    for item in items:
+        message_text = item['message_text']
+        if echo_body is not None and message_text.strip() == echo_body:
+            logger.info(f"🚫 LOOP PREVENTED: Ignoring exact echo of our own message to {conversation_key[:30]}")
+            continue
+        stamp = item['timestamp_utc']
+        if stamp and any(abs(created - stamp) <= tolerance for created in stored_times):
+            log.info(f"⚠️ Duplicate by remote_jid+timestamp: {item['remote_jid']} @ {stamp}")
+            continue
+        if message_text in recent_bodies:
+            log.warning(f"⚠️ Duplicate by content within 10s: {message_text[:50]}...")
+            continue
+        recent_bodies.add(message_text)  # same text twice in one batch is a retry too
+        accepted.append(item)
+
+    if not accepted:
+        return []
+
+    newest = accepted[-1]
+    from_number_e164 = next((item['from_number_e164'] for item in reversed(accepted) if item['from_number_e164']), None)
+
+    # ✅ BUILD 200: ContactIdentityService prevents duplicate leads across WhatsApp and Phone channels
+    # 🔥 FIX 2: phone_e164_override - for @lid messages the participant phone overrides JID extraction
+    lead = ContactIdentityService.get_or_create_lead_for_whatsapp(
+        business_id=business_id,
+        remote_jid=newest['remote_jid'],
+        push_name=newest['push_name'],
+        phone_e164_override=from_number_e164,
+        message_text=newest['message_text'],
+        wa_message_id=newest['message_id'],
+        ts=newest['msg_timestamp']
+    )
+    # 🔥 FIX: Extract lead_id immediately to avoid DetachedInstanceError
+    lead_id = lead.id
+    log.info(f"✅ Lead resolved: lead_id={lead_id}, phone={lead.phone_e164 or 'N/A'}, "
+             f"name={lead.name or newest['push_name'] or 'N/A'}, jid={newest['remote_jid'][:30]}...")
+
+    # ✅ BUILD 162: Get or create conversation FIRST so message.conversation_id is set
+    conversation = None
+    try:
+        conversation = update_session_activity(
+            business_id=business_id,
+            customer_wa_id=conversation_key,
+            direction="in",
+            provider="baileys",
+            lead_id=lead_id,
+            phone_e164=from_number_e164
+        )
+    except Exception as e:
+        log.warning(f"⚠️ Session tracking failed: {e}")
+        db.session.rollback()
+
+        # 🔥 FALLBACK: message always gets a conversation_id even if session tracking fails
+        try:
+            from server.utils.whatsapp_utils import get_canonical_conversation_key
+            canonical_key = get_canonical_conversation_key(
+                business_id=business_id,
+                lead_id=lead_id,
+                phone_e164=from_number_e164
+            )
+            conversation = WhatsAppConversation.query.filter_by(
+                business_id=business_id,
+                canonical_key=canonical_key
+            ).first()
+        except Exception as fallback_err:
+            log.error(f"⚠️ Fallback conversation fetch failed: {fallback_err}")
+    conversation_id = conversation.id if conversation else None
+
+    # Each message keeps its own time (messageTimestamp, never in the future, else
+    # now); equal stamps - Baileys sends whole seconds - are nudged apart so the
+    # chat's created_at order stays its arrival order
+    created = []
+    for item in accepted:
+        stamp = min(item['timestamp_utc'], now) if item['timestamp_utc'] else now
+        if created and stamp <= created[-1]:
+            stamp = created[-1] + timedelta(microseconds=1)
+        created.append(stamp)
+
+    return [({
+        'business_id': business_id,
+        'to_number': conversation_key,  # unified conversation_key for consistent message grouping
+        'body': item['message_text'],
+        'message_type': 'text',
+        'direction': 'in',
+        'provider': 'baileys',
+        'status': 'received',
+        'provider_message_id': item['message_id'],
+        'lead_id': lead_id,
+        'conversation_id': conversation_id,
+        'source': 'customer',
+        'created_at': created_at,
+    }, item, lead_id) for item, created_at in zip(accepted, created)]
+
+
+def _insert_inbound_messages(rows):
+    """
+    Insert WhatsAppMessage rows in one statement and commit.
+
+    Rows whose (business_id, provider_message_id) already exists - another
+    process saved them first - are skipped by ON CONFLICT DO NOTHING against
+    the partial unique index from Migration 87.
+
+    Returns:
+        New ids aligned with rows (None = already saved)
+    """
+    ids = [None] * len(rows)
+    if not rows:
+        return ids
+    table = WhatsAppMessage.__table__
+    dialect = db.engine.dialect.name
+    keyed = [i for i, row in enumerate(rows) if row['provider_message_id']] \
+        if dialect in ('postgresql', 'sqlite') else []
+
+    if keyed:
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).values([rows[i] for i in keyed]).on_conflict_do_nothing(
+            index_elements=['business_id', 'provider_message_id'],
+            index_where=table.c.provider_message_id.isnot(None)
+        ).returning(table.c.id, table.c.provider_message_id)
+        saved = {row.provider_message_id: row.id for row in db.session.execute(stmt)}
+        for i in keyed:
+            ids[i] = saved.get(rows[i]['provider_message_id'])
+
+    # Rows without a message_id (nothing to conflict on) or other dialects: one by one
+    keyed = set(keyed)
+    for i, row in enumerate(rows):
+        if i in keyed:
+            continue
+        try:
+            with db.session.begin_nested():
+                wa_msg = WhatsAppMessage(**row)
+                db.session.add(wa_msg)
+            ids[i] = wa_msg.id
+        except Exception as integrity_err:
+            if row['provider_message_id'] and 'unique' in str(integrity_err).lower():
+                continue
+            raise
+    db.session.commit()
+    return ids
+
+
+def _send_fail_safe_reply(tenant_id, remote_jid, log):
+    """🔥 FAIL-SAFE: Tell the customer we got their message when processing crashed"""
+    try:
+        from server.whatsapp_provider import get_whatsapp_service
+        wa_service = get_whatsapp_service(tenant_id=tenant_id)
+        if wa_service and remote_jid:
+            log.info(f"[WA-FAIL-SAFE] Sending fallback message to {remote_jid[:30]}")
+            wa_service.send_message(remote_jid, "קיבלתי ✅ רגע בודק וחוזר אליך")
+    except Exception as fallback_err:
+        log.error(f"[WA-FAIL-SAFE] ❌ Could not send fallback: {fallback_err}")
+
+
+def _reset_session(log):
+    # 🔥 FIX: Rollback and clean up DB session to prevent "cursor already closed"
+    try:
+        db.session.rollback()
+        db.session.close()
+        db.session.remove()
+    except Exception as rollback_err:
+        log.error(f"[WA-ERROR] Rollback/cleanup failed: {rollback_err}")
+
+
+def process_baileys_messages(tenant_id, messages):
+    """
+    Inbound pipeline for one tenant's Baileys messages, in arrival order.
+
+    Called by the stream drain job (server/services/whatsapp_ingest.py) and by
+    the webhook itself when the stream is disabled or Redis is down:
+
+    1. one query for message_ids already saved, plus in-batch duplicates
+    2. parse every message (JID / LID resolution, text), grouped by chat
+    3. per chat: echo + retry dedupe, lead and session resolved once
+    4. one INSERT ... ON CONFLICT DO NOTHING for all new rows
+    5. per new message: appointment check, AI state, enqueue the AI response job
+
+    Returns:
+        Messages processed (duplicates count as processed), None if no business
+        resolves for the tenant
+    """
+    import time
+    import traceback
+    log = logging.getLogger(__name__)
+    overall_start = time.time()
+
+    # ✅ BUILD 91: Multi-tenant - זיהוי business לפי tenantId
+    from server.services.business_resolver import resolve_business_with_fallback
+    business_id, status = resolve_business_with_fallback('whatsapp', tenant_id)
+    if not business_id:
+        log.error(f"[WA-ERROR] No valid business_id found for tenant={tenant_id}")
+        return None
+    if status != 'found':
+        log.warning(f"[WA-INCOMING] Fallback biz={business_id} ({status}) for tenant={tenant_id}")
+
+    # 🔥 STRONG DEDUPE: message_ids already saved for this business, one query per 500
+    message_ids = list({(msg.get('key') or {}).get('id') for msg in messages if isinstance(msg, dict)} - {None, ''})
+    saved_ids = set()
+    for start in range(0, len(message_ids), 500):
+        saved_ids.update(row[0] for row in db.session.query(WhatsAppMessage.provider_message_id).filter(
+            WhatsAppMessage.business_id == business_id,
+            WhatsAppMessage.provider_message_id.in_(message_ids[start:start + 500])
+        ))
+
+    processed_count = 0
+    seen_ids = set()
+    lid_cache = {}
+    chats = {}  # conversation_key -> parsed messages, arrival order
+    for msg in messages:
+        remote_jid = None
+        try:
+            if not isinstance(msg, dict):
+                continue
+            key = msg.get('key') or {}
+            remote_jid = key.get('remoteJid', '')
+            message_id = key.get('id', '')
+            if message_id and (message_id in saved_ids or message_id in seen_ids):
+                log.info(f"[WA-DEDUPE] ⏭️ Skipping duplicate message_id={message_id[:20]}...")
+                processed_count += 1  # Count as processed (dedupe success)
+                continue
+            # 🔥 CRITICAL FIX: The bot should ONLY process messages from users, not its own
+            if key.get('fromMe', False):
+                continue
+            parsed = _parse_baileys_message(msg, business_id, lid_cache, log)
+            if not parsed:
+                continue
+            if message_id:
+                seen_ids.add(message_id)
+            chats.setdefault(parsed['conversation_key'], []).append(parsed)
+        except Exception as e:
+            log.error(f"[WA-ERROR] Processing message failed: {e}")
+            log.error(f"[WA-ERROR] Traceback: {traceback.format_exc()}")
+            _send_fail_safe_reply(tenant_id, remote_jid, log)
+            _reset_session(log)
+
+    pending = []
+    for conversation_key, items in chats.items():
+        try:
+            pending.extend(_prepare_chat_rows(business_id, conversation_key, items, log))
+        except Exception as e:
+            log.error(f"[WA-ERROR] Processing chat {conversation_key[:30]} failed: {e}")
+            log.error(f"[WA-ERROR] Traceback: {traceback.format_exc()}")
+            _send_fail_safe_reply(tenant_id, items[-1]['remote_jid'], log)
+            _reset_session(log)
+
+    try:
+        message_db_ids = _insert_inbound_messages([row for row, _, _ in pending])
+    except Exception as e:
+        log.error(f"[WA-ERROR] Saving {len(pending)} message(s) failed: {e}")
+        log.error(f"[WA-ERROR] Traceback: {traceback.format_exc()}")
+        _reset_session(log)
+        for remote_jid in {item['remote_jid'] for _, item, _ in pending}:
+            _send_fail_safe_reply(tenant_id, remote_jid, log)
+        return processed_count
+    log.info(f"[WA-SAVE] ✅ {sum(1 for i in message_db_ids if i)} of {len(pending)} message(s) saved for biz={business_id}")
+
+    ai_enabled_by_key = {}
+    for (row, item, lead_id), wa_msg_id in zip(pending, message_db_ids):
+        if not wa_msg_id:
+            log.info(f"⚠️ Message already saved by another process: {row['provider_message_id']}")
+            continue
+        conversation_key = item['conversation_key']
+        from_number_e164 = item['from_number_e164']
+        message_text = item['message_text']
+        try:
+            # ✅ BUILD 93: Check for appointment request FIRST
+            try:
+                from server.whatsapp_appointment_handler import process_incoming_whatsapp_message
+                appointment_result = process_incoming_whatsapp_message(
+                    phone_number=from_number_e164,
+                    message_text=message_text,
+                    message_id=wa_msg_id,
+                    business_id=business_id
+                )
+                if appointment_result.get('appointment_created'):
+                    log.info(f"📅 Appointment created for {from_number_e164}: {appointment_result.get('appointment_id')}")
+            except Exception as e:
+                log.warning(f"⚠️ Appointment check failed: {e}")
+
+            # ✅ BUILD 152: Check if AI is enabled for this conversation (default: enabled)
+            if conversation_key not in ai_enabled_by_key:
+                ai_enabled = True
+                try:
+                    conv_state = WhatsAppConversationState.query.filter_by(
+                        business_id=business_id,
+                        phone=conversation_key
+                    ).first()
+                    if conv_state:
+                        ai_enabled = conv_state.ai_active
+                except Exception as e:
+                    log.warning(f"[WA-WARN] Could not check AI state: {e}")
+                ai_enabled_by_key[conversation_key] = ai_enabled
+                log.info(f"[WA-INCOMING] 🤖 AI state for {conversation_key[:30]}: {'✅ ENABLED' if ai_enabled else '❌ DISABLED'}")
+
+            # User requirement: When AI is OFF, don't send ANY message at all
+            if not ai_enabled_by_key[conversation_key]:
+                continue
+
+            # 🔥 PERFORMANCE FIX: The AI job handles history, memory, AI, tools and sending
+            try:
+                from server.jobs.whatsapp_ai_response_job import whatsapp_ai_response_job
+                ai_job_id = enqueue_job(
+                    queue_name='default',
+                    func=whatsapp_ai_response_job,
+                    business_id=business_id,
+                    message_id=wa_msg_id,
+                    remote_jid=item['remote_jid'],
+                    conversation_key=conversation_key,
+                    message_text=message_text,
+                    from_number_e164=from_number_e164,
+                    lead_id=lead_id,
+                    timeout=180,  # 3 minutes for AI processing (includes tools!)
+                    retry=1,
+                    description=f"Process WhatsApp AI response for {conversation_key[:15]}"
+                )
+                log.info(f"[WA-ASYNC] ✅ Job enqueued: {ai_job_id} for message_id={wa_msg_id}, lead_id={lead_id}")
+            except Exception as enqueue_err:
+                log.error(f"[WA-ASYNC] ❌ Failed to enqueue AI job: {enqueue_err}")
+                continue
+
+            processed_count += 1
+        except Exception as e:
+            log.error(f"[WA-ERROR] Processing message failed: {e}")
+            log.error(f"[WA-ERROR] Traceback: {traceback.format_exc()}")
+            _send_fail_safe_reply(tenant_id, item['remote_jid'], log)
+            _reset_session(log)
+
+    log.info(f"[WA-INCOMING] Total processing: {time.time() - overall_start:.2f}s for {len(messages)} message(s)")
+    return processed_count
+
+
 @whatsapp_bp.route('/webhook/incoming', methods=['POST'])
 @csrf.exempt
 def baileys_webhook():
-    """🔴 CRITICAL: Webhook from Baileys for incoming WhatsApp messages"""
+    """
+    🔴 CRITICAL: Webhook from Baileys for incoming WhatsApp messages
+
+    Acks as soon as the messages are in the ingest streams - processing runs in
+    the partition drain jobs (server/services/whatsapp_ingest.py). With
+    WA_INGEST_STREAM_ENABLED off, or Redis down, it processes them in the request.
+    """
     import logging
     log = logging.getLogger(__name__)
-    
+
     try:
         # Verify internal secret
         if request.headers.get('X-Internal-Secret') != INT_SECRET:
             log.warning("[WA-ERROR] Unauthorized webhook request")
             return jsonify({"error": "unauthorized"}), 401
-        
-        data = request.get_json()
+
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({"error": "invalid_payload"}), 400
         tenant_id = data.get('tenantId')
         if not tenant_id:
             log.error("[WA-ERROR] No tenantId in webhook payload - cannot process!")
             return jsonify({"error": "missing_tenant_id"}), 400
-        payload = data.get('payload', {})
-        messages = payload.get('messages', [])
-        
+        payload = data.get('payload') or {}
+        messages = (payload.get('messages') or []) if isinstance(payload, dict) else []
+        if not isinstance(messages, list):
+            return jsonify({"error": "invalid_payload"}), 400
+
         log.info(f"[WA-INCOMING] biz={tenant_id}, msg_count={len(messages)}")
-        
+
         if not messages:
             return jsonify({"ok": True, "processed": 0}), 200
-        
-        # Process each incoming message
-        from server.services.customer_intelligence import CustomerIntelligence
-        from server.whatsapp_provider import get_whatsapp_service
-        
-        # ✅ BUILD 91: Multi-tenant - חכם! זיהוי business לפי tenantId
-        from server.services.business_resolver import resolve_business_with_fallback
-        business_id, status = resolve_business_with_fallback('whatsapp', tenant_id)
-        
-        # Get business name for clear logging (only on error)
-        from server.models_sql import Business
-        business = Business.query.filter_by(id=business_id).first() if business_id else None
-        business_name = business.name if business else "UNKNOWN"
-        
-        if status == 'found':
-            log.info(f"[WA-INCOMING] Resolved biz={business_id} from tenant={tenant_id}")
-        else:
-            log.warning(f"[WA-INCOMING] Fallback biz={business_id} ({status}) for tenant={tenant_id}")
-        
-        # ✅ Ensure business_id is valid
-        if not business_id:
-            log.error(f"[WA-ERROR] No valid business_id found for tenant={tenant_id}")
-            return jsonify({"ok": False, "error": "no_business"}), 400
-        
-        # ✅ BUILD 92: Process messages IMMEDIATELY (no threading) - זריזות מקסימלית!
-        import time
-        from datetime import datetime, timedelta
-        overall_start = time.time()
-        
-        wa_service = get_whatsapp_service(tenant_id=tenant_id)  # MULTI-TENANT: Pass tenant_id for correct WhatsApp session
-        processed_count = 0
-        
-        for msg in messages:
-            msg_start = time.time()
-            try:
-                # 🔥 CRITICAL FIX: Extract FULL remoteJid - DO NOT strip domain!
-                # Android messages may come from @lid, @g.us (groups), or other formats
-                # We must reply to the EXACT remoteJid we received
-                remote_jid = msg.get('key', {}).get('remoteJid', '')
-                
-                # 🔥 FIX: Extract message metadata early to avoid UnboundLocalError
-                baileys_message_id = msg.get('key', {}).get('id', '')
-                timestamp_ms = msg.get('messageTimestamp', 0)
-                
-                # 🔥 LID FIX: Enhanced logging for incoming message identification
-                message_id = baileys_message_id  # Use baileys_message_id for consistency
-                from_me = msg.get('key', {}).get('fromMe', False)
-                log.info(f"[WA-INCOMING] 🔵 Incoming chat_jid={remote_jid}, message_id={message_id}, from_me={from_me}")
-                
-                # 🔥 STRONG DEDUPE: Check if already processed by (business_id, message_id, remoteJid)
-                if message_id:
-                    from server.models_sql import WhatsAppMessage
-                    existing = WhatsAppMessage.query.filter_by(
-                        business_id=business_id,
-                        provider_message_id=message_id
-                    ).first()
-                    if existing:
-                        log.info(f"[WA-DEDUPE] ⏭️ Skipping duplicate message_id={message_id[:20]}...")
-                        processed_count += 1  # Count as processed (dedupe success)
-                        continue
-                
-                # 🔥 CRITICAL FIX: Skip messages from bot itself (fromMe=true)
-                # The bot should ONLY process messages from users, not its own messages
-                if from_me:
-                    log.info(f"[WA-SKIP] Ignoring message from bot itself (fromMe=true)")
-                    continue
-                
-                # 🔥 BUG FIX: Create safe identifier for logging/DB from remoteJid
-                # This prevents NameError when logging unknown message formats
-                from_identifier = remote_jid.replace('@', '_').replace('.', '_') if remote_jid else 'unknown'
-                
-                # 🔥 CRITICAL: Skip NON-PRIVATE messages - bot ONLY responds to private 1-on-1 chats!
-                # Groups: @g.us
-                # Broadcast lists: @broadcast
-                # Newsletters/Channels: @newsletter
-                # Status updates: status@broadcast
-                if (remote_jid.endswith('@g.us') or 
-                    remote_jid.endswith('@broadcast') or 
-                    remote_jid.endswith('@newsletter') or
-                    'status@broadcast' in remote_jid):
-                    log.info(f"[WA-SKIP] Ignoring non-private message from {remote_jid} - bot only responds to private chats")
-                    continue
-                
-                # 🔥 LID FIX: Extract phone number with proper normalization and LID support
-                # remoteJid can be:
-                # - Standard: 972501234567@s.whatsapp.net
-                # - LID (Android/Business): 82399031480511@lid  (NOT a real phone!)
-                # - Participant (Groups): phone@s.whatsapp.net as participant
-                from_number_e164 = None
-                customer_external_id = None
-                remote_jid_alt = None  # Alternative JID for proper reply routing
-                phone_raw = None  # Raw phone for debugging
-                push_name = None  # WhatsApp display name
-
-                # 🆕 Extract pushName for name saving
-                push_name = msg.get('pushName', '')
-                if push_name and push_name.lower() not in ['unknown', '']:
-                    log.debug(f"[WA-INCOMING] Extracted pushName: {push_name}")
-
-                # 🔥 LID FIX: Read _lid_metadata from Baileys (contains participant from all sources)
-                lid_meta = msg.get('_lid_metadata', {})
-                meta_participant_jid = lid_meta.get('participant_jid')
-                meta_resolved_jid = lid_meta.get('resolved_jid')
-                meta_resolved_phone = lid_meta.get('resolved_phone')  # 🔥 NEW: Phone extracted by Baileys
-                meta_push_name = lid_meta.get('push_name')  # 🔥 NEW: Push name from Baileys
-                
-                # 🔥 DEBUG: Log full metadata for LID messages
-                if remote_jid and remote_jid.endswith('@lid'):
-                    log.info(f"[WA-LID-META] Full _lid_metadata: {lid_meta}")
-                
-                # 🔥 CRITICAL: If Baileys already resolved the phone, use it immediately!
-                if meta_resolved_phone:
-                    from_number_e164 = meta_resolved_phone
-                    log.info(f"[WA-LID] ✅ Using pre-resolved phone from Baileys: {meta_resolved_phone}")
-                
-                # Use push_name from metadata if available
-                if meta_push_name:
-                    push_name = meta_push_name
-
-                # 🔥 FIX #3: Check for participant (sender_pn) first - this is the preferred reply address
-                # Priority: resolved_jid > _lid_metadata.participant_jid > key.participant
-                participant = msg.get('key', {}).get('participant')
-
-                # Build candidate JID: first valid @s.whatsapp.net wins
-                candidate_jid = None
-                candidate_source = None
-                if meta_resolved_jid and str(meta_resolved_jid).endswith('@s.whatsapp.net'):
-                    candidate_jid = meta_resolved_jid
-                    candidate_source = 'resolved_jid'
-                elif meta_participant_jid and str(meta_participant_jid).endswith('@s.whatsapp.net'):
-                    candidate_jid = meta_participant_jid
-                    candidate_source = 'participant_jid'
-                elif participant and participant.endswith('@s.whatsapp.net'):
-                    candidate_jid = participant
-                    candidate_source = 'key_participant'
-
-                if candidate_jid:
-                    remote_jid_alt = candidate_jid
-                    log.debug(f"[WA-LID] Found candidate JID: {candidate_jid} (source={candidate_source})")
-
-                # 🔥 CANONICAL JID: Establish single source of truth for JID
-                # For @lid messages: remoteJidAlt (if available) is the canonical JID for phone extraction
-                # For regular messages: remoteJid is the canonical JID
-                canonical_jid = remote_jid_alt if (remote_jid and remote_jid.endswith('@lid') and remote_jid_alt) else remote_jid
-                if canonical_jid != remote_jid:
-                    log.info(f"[WA-CANONICAL] Using canonical_jid={canonical_jid[:30]} (remoteJidAlt) instead of remoteJid={remote_jid[:30]}")
-
-                if remote_jid.endswith('@s.whatsapp.net'):
-                    # Standard WhatsApp user - extract and normalize phone
-                    phone_raw = remote_jid.replace('@s.whatsapp.net', '')
-                    from_number_e164 = normalize_phone(phone_raw)
-
-                    if from_number_e164:
-                        log.debug(f"[WA-INCOMING] Standard JID - phone normalized: {phone_raw} -> {from_number_e164}")
-                        phone_for_ai_check = from_number_e164
-                    else:
-                        # Invalid phone format - treat as external ID
-                        log.warning(f"[WA-INCOMING] Could not normalize phone from standard JID: {remote_jid}")
-                        customer_external_id = remote_jid
-                        phone_for_ai_check = remote_jid
-
-                elif remote_jid.endswith('@lid'):
-                    # 🔥 LID FIX: NEVER extract phone from @lid digits - they are NOT real phones!
-                    push_name = msg.get('pushName', 'Unknown')
-                    log.info(f"[WA-INCOMING] @lid JID detected: {remote_jid}, pushName={push_name}")
-
-                    # Store LID as external ID for this conversation
-                    customer_external_id = remote_jid
-
-                    # 🔥 NEW: Enhanced LID resolution with multiple strategies
-                    # Strategy 0: Check if Baileys already resolved the phone (HIGHEST PRIORITY!)
-                    if not from_number_e164 and meta_resolved_phone:
-                        from_number_e164 = meta_resolved_phone
-                        log.info(f"[WA-LID] ✅ Using pre-resolved phone from Baileys metadata: {from_number_e164}")
-
-                    # Strategy 1: Use candidate_jid (resolved_jid or participant_jid from Baileys)
-                    if not from_number_e164 and candidate_jid:
-                        phone_raw = candidate_jid.replace('@s.whatsapp.net', '')
-                        from_number_e164 = normalize_phone(phone_raw)
-                        if from_number_e164:
-                            log.info(f"[WA-LID] lid detected; extracted_phone={from_number_e164} source={candidate_source}")
-                        else:
-                            log.warning(f"[WA-LID] Could not normalize phone from {candidate_source}: {candidate_jid}")
-
-                    # Strategy 2: Try enhanced Baileys resolver (with WhatsApp queries)
-                    if not from_number_e164:
-                        try:
-                            # Call enhanced resolver with more strategies
-                            import requests
-                            resolver_url = f"{get_baileys_base_url(business_id)}/internal/resolve-jid"
-                            resolver_response = requests.post(resolver_url, 
-                                json={
-                                    'tenantId': f'business_{business_id}',
-                                    'jid': remote_jid,
-                                    'participant': candidate_jid,
-                                    'pushName': push_name
-                                },
-                                headers={'X-Internal-Secret': INT_SECRET},
-                                timeout=5.0
-                            )
-                            
-                            if resolver_response.status_code == 200:
-                                resolver_data = resolver_response.json()
-                                if resolver_data.get('phone_e164'):
-                                    from_number_e164 = resolver_data['phone_e164']
-                                    log.info(f"[WA-LID] ✅ Enhanced resolver success: {from_number_e164} (source: {resolver_data.get('source')})")
-                                elif resolver_data.get('push_name') and resolver_data['push_name'] != '.':
-                                    # Update push_name if resolver found a better one
-                                    push_name = resolver_data['push_name']
-                                    log.info(f"[WA-LID] Enhanced resolver found better push_name: {push_name}")
-                        except Exception as resolver_err:
-                            log.warning(f"[WA-LID] Enhanced resolver failed: {resolver_err}")
-
-                    # Strategy 3: DB mapping lookup (ContactIdentity table)
-                    if not from_number_e164:
-                        try:
-                            from server.services.contact_identity_service import ContactIdentityService
-                            mapped_phone = ContactIdentityService.lookup_phone_by_lid(
-                                business_id=business_id,
-                                lid_jid=remote_jid
-                            )
-                            if mapped_phone:
-                                from_number_e164 = mapped_phone
-                                log.info(f"[WA-LID] lid detected; extracted_phone={from_number_e164} source=db_mapping")
-                        except Exception as db_err:
-                            log.warning(f"[WA-LID] DB mapping lookup failed: {db_err}")
-
-                    # Strategy 4: 🔥 NEW - Store LID→Phone mapping when we do resolve one
-                    if from_number_e164:
-                        try:
-                            from server.services.contact_identity_service import ContactIdentityService
-                            ContactIdentityService.store_lid_phone_mapping(
-                                business_id=business_id,
-                                lid_jid=remote_jid,
-                                phone_e164=from_number_e164,
-                                source='whatsapp_resolved'
-                            )
-                            log.info(f"[WA-LID] ✅ Stored LID→Phone mapping: {remote_jid} → {from_number_e164}")
-                        except Exception as store_err:
-                            log.warning(f"[WA-LID] Failed to store LID mapping: {store_err}")
-
-                    # No phone found - leave as None, never invent from LID digits
-                    if not from_number_e164:
-                        log.info(f"[WA-LID] lid detected; extracted_phone=none source=none")
-
-                    # 🔥 FIX: Use resolved phone for conversation key when available
-                    # This ensures WhatsApp chats page displays phone numbers instead of LID identifiers
-                    if from_number_e164:
-                        phone_for_ai_check = from_number_e164
-                        log.info(f"[WA-LID] ✅ Using resolved phone for conversation key: {from_number_e164}")
-                    else:
-                        phone_for_ai_check = customer_external_id  # Fallback to LID only if no phone
 
-                else:
-                    # 🔥 FIX #6: Other non-standard JID - store as external ID
-                    push_name = msg.get('pushName', 'Unknown')
-                    log.warning(f"[WA-INCOMING] Non-standard JID {remote_jid}, pushName={push_name}")
-                    customer_external_id = remote_jid
-                    phone_for_ai_check = remote_jid
-                
-                log.info(f"[WA-INCOMING] Processed JIDs: remoteJid={(remote_jid or '')[:30]}, "
-                        f"remoteJidAlt={(remote_jid_alt or '')[:30]}, "
-                        f"phone_e164={from_number_e164}, external_id={(customer_external_id or '')[:30]}")
-                
-                # 🔥 FIX #3: Create unified conversation_key for consistent history tracking
-                # This prevents context loss in LID/Android conversations where from_number_e164 can be None
-                conversation_key = normalize_conversation_key(
-                    remote_jid=remote_jid,
-                    from_number_e164=from_number_e164,
-                    phone_for_ai_check=phone_for_ai_check
-                )
-                log.info(f"[WA-CONTEXT] Using conversation_key={conversation_key[:30]} for history/state tracking")
-                
-                # 🔥 ANDROID FIX: Support ALL message formats (iPhone + Android)
-                # Different devices send messages in different formats:
-                # - iPhone: usually uses 'conversation'
-                # - Android: uses 'conversation', 'extendedTextMessage', or 'imageMessage' with caption
-                message_obj = msg.get('message', {})
-                message_text = None
-                
-                # Try all possible text locations (order matters - most common first)
-                if not message_text and message_obj.get('conversation'):
-                    message_text = message_obj.get('conversation')
-                    log.debug(f"[WA-PARSE] Found text in 'conversation'")
-                
-                if not message_text and message_obj.get('extendedTextMessage'):
-                    message_text = message_obj.get('extendedTextMessage', {}).get('text', '')
-                    log.debug(f"[WA-PARSE] Found text in 'extendedTextMessage'")
-                
-                # 🔥 ANDROID FIX: Handle image/video/document messages with captions
-                if not message_text and message_obj.get('imageMessage'):
-                    message_text = message_obj.get('imageMessage', {}).get('caption', '[תמונה]')
-                    log.debug(f"[WA-PARSE] Found caption in 'imageMessage'")
-                
-                if not message_text and message_obj.get('videoMessage'):
-                    message_text = message_obj.get('videoMessage', {}).get('caption', '[וידאו]')
-                    log.debug(f"[WA-PARSE] Found caption in 'videoMessage'")
-                
-                if not message_text and message_obj.get('documentMessage'):
-                    message_text = message_obj.get('documentMessage', {}).get('caption', '[מסמך]')
-                    log.debug(f"[WA-PARSE] Found caption in 'documentMessage'")
-                
-                # 🔥 ANDROID FIX: Handle audio messages
-                if not message_text and message_obj.get('audioMessage'):
-                    message_text = '[הודעה קולית]'
-                    log.debug(f"[WA-PARSE] Found 'audioMessage'")
-                
-                # 🔥 FIX D: Don't crash on empty/unknown message formats - just skip gracefully
-                if not message_text:
-                    available_keys = list(message_obj.keys()) if message_obj else []
-                    if available_keys:
-                        log.info(f"[WA-SKIP] Unknown message format from {from_identifier} (remoteJid={remote_jid}), available keys: {available_keys}")
-                        log.debug(f"[WA-PARSE] Full message object: {str(message_obj)[:200]}...")
-                        # Try to extract ANY text from ANY key as last resort
-                        for key in available_keys:
-                            if isinstance(message_obj[key], dict):
-                                if 'text' in message_obj[key]:
-                                    message_text = message_obj[key]['text']
-                                    log.info(f"[WA-PARSE] Found text in '{key}.text'")
-                                    break
-                                if 'caption' in message_obj[key]:
-                                    message_text = message_obj[key]['caption']
-                                    log.info(f"[WA-PARSE] Found text in '{key}.caption'")
-                                    break
-                    else:
-                        # Empty message object - skip without error
-                        log.info(f"[WA-SKIP] Empty message object from {remote_jid} - skipping gracefully")
-                        continue
-                
-                # 🔥 FIX D: If still no message text after all attempts, skip gracefully (don't crash)
-                if not remote_jid or not message_text:
-                    log.info(f"[WA-SKIP] Missing remote_jid={bool(remote_jid)} or message_text={bool(message_text)} - skipping message")
-                    continue
-                
-                # 🔥 CRITICAL FIX: Check if this is our OWN message echoing back!
-                # Sometimes Baileys sends bot's outbound messages back as "incoming"
-                # 🔥 BUILD 180: Check both 'out' and 'outbound' for backwards compatibility
-                # 🔥 FIX #3: Use conversation_key for echo detection
-                # 🔥 FIX: Only check for EXACT match, not substring, to avoid false positives
-                recent_outbound = WhatsAppMessage.query.filter(
-                    WhatsAppMessage.business_id == business_id,
-                    WhatsAppMessage.to_number == conversation_key,  # 🔥 FIX #3: Use conversation_key
-                    WhatsAppMessage.direction.in_(['out', 'outbound'])
-                ).order_by(WhatsAppMessage.created_at.desc()).first()
-                
-                if recent_outbound:
-                    from datetime import datetime, timedelta
-                    time_diff = datetime.utcnow() - recent_outbound.created_at
-                    # If we sent the EXACT SAME message in the last 10 seconds, skip (likely echo)
-                    # 🔥 FIX: Changed from 30s to 10s and from substring to exact match
-                    if time_diff < timedelta(seconds=10):
-                        # Check if message content is EXACTLY the same (exact echo)
-                        # 🔥 FIX: Changed from "message_text in recent_outbound.body" to equality check
-                        if recent_outbound.body and message_text.strip() == recent_outbound.body.strip():
-                            logger.info(f"🚫 LOOP PREVENTED: Ignoring exact echo of our own message to {conversation_key[:30]}")
-                            log.warning(f"🚫 Ignoring bot echo (exact match): {message_text[:50]}...")
-                            continue
-                
-                log.info(f"[WA-INCOMING] biz={business_id}, from={from_number_e164}, remoteJid={remote_jid}, text={message_text[:50]}...")
-                
-                # 🔥 FIX #3: Calculate reply_jid - prefer @s.whatsapp.net over @lid
-                reply_jid = remote_jid  # Default: use remoteJid
-                if remote_jid_alt and remote_jid_alt.endswith('@s.whatsapp.net'):
-                    # Prefer participant/sender_pn if it's a standard WhatsApp number
-                    reply_jid = remote_jid_alt
-                    log.info(f"[WA-REPLY] 🎯 Using remote_jid_alt (participant) as reply target: {reply_jid}")
-                elif remote_jid:
-                    log.info(f"[WA-REPLY] 🎯 Using remote_jid as reply target: {reply_jid}")
-                
-                # 🔥 LID FIX: Log clear message for LID handling
-                if remote_jid.endswith('@lid'):
-                    phone_status = f"✅ {from_number_e164}" if from_number_e164 else "❌ NO PHONE"
-                    name_status = f"name='{push_name}'" if push_name else "no name"
-                    
-                    if reply_jid != remote_jid:
-                        log.info(f"[WA-LID] ✅ LID message: incoming={remote_jid}, reply_to={reply_jid} (using participant)")
-                    else:
-                        log.info(f"[WA-LID] ⚠️ LID message: incoming={remote_jid}, reply_to={reply_jid} (no participant available)")
-                    
-                    log.info(f"[WA-LID] 📋 Phone: {phone_status}, Push Name: {name_status}")
-                
-                # ✅ BUILD 200: Use ContactIdentityService for unified lead management
-                # This prevents duplicates across WhatsApp and Phone channels
-                from server.services.contact_identity_service import ContactIdentityService
-                from datetime import datetime
-                
-                # Prepare timestamp
-                msg_timestamp = None
-                if timestamp_ms:
-                    try:
-                        msg_timestamp = datetime.fromtimestamp(int(timestamp_ms))
-                    except (ValueError, TypeError):
-                        msg_timestamp = datetime.utcnow()
-                else:
-                    msg_timestamp = datetime.utcnow()
-                
-                # 🔥 FIX 2: Get or create lead with phone_e164_override (Baileys handler)
-                # For @lid messages, phone extracted from participant (from_number_e164) overrides JID extraction
-                lead = ContactIdentityService.get_or_create_lead_for_whatsapp(
-                    business_id=business_id,
-                    remote_jid=remote_jid,
-                    push_name=push_name,
-                    phone_e164_override=from_number_e164,  # Ensures phone is saved even for @lid JIDs
-                    message_text=message_text,
-                    wa_message_id=baileys_message_id,
-                    ts=msg_timestamp
-                )
-                
-                # 🔥 FIX: Extract lead_id immediately to avoid DetachedInstanceError
-                # This prevents issues when lead object is accessed after session operations
-                lead_id = lead.id
-                lead_phone_e164 = lead.phone_e164
-                lead_name = lead.name
-                
-                log.info(f"✅ Lead resolved: lead_id={lead_id}, phone={lead_phone_e164 or 'N/A'}, name={lead_name or push_name or 'N/A'}, jid={remote_jid[:30]}...")
-                
-                # Get customer for backwards compatibility (if exists)
-                from server.models_sql import Customer
-                customer = Customer.query.filter_by(
-                    business_id=business_id,
-                    phone_e164=lead_phone_e164
-                ).first() if lead_phone_e164 else None
-                
-                # ✅ Check if message already exists (prevent duplicates from webhook retries)
-                # 🔥 ENHANCED: Triple-check deduplication with message_id + remote_jid + timestamp
-                # This prevents:
-                # 1. Webhook retries (same message_id)
-                # 2. Multiple delivery attempts (same remote_jid + timestamp)
-                # 3. Content duplication (same body + phone within 10s)
-                existing_msg = None
-                
-                # First check: message_id (most reliable)
-                if baileys_message_id:
-                    existing_msg = WhatsAppMessage.query.filter(
-                        WhatsAppMessage.business_id == business_id,
-                        WhatsAppMessage.provider_message_id == baileys_message_id
-                    ).first()
-                    
-                    if existing_msg:
-                        log.info(f"⚠️ Duplicate by message_id: {baileys_message_id}")
-                        continue
-                
-                # Second check: remote_jid + timestamp (for messages without message_id)
-                # 🔥 FIX #3: Use conversation_key for deduplication
-                if not existing_msg and remote_jid and timestamp_ms:
-                    # Allow 1-second tolerance for timestamp matching
-                    timestamp_dt = datetime.utcfromtimestamp(timestamp_ms)
-                    time_tolerance = timedelta(seconds=1)
-                    
-                    existing_msg = WhatsAppMessage.query.filter(
-                        WhatsAppMessage.business_id == business_id,
-                        WhatsAppMessage.to_number == conversation_key,  # 🔥 FIX #3: Use conversation_key
-                        WhatsAppMessage.created_at >= timestamp_dt - time_tolerance,
-                        WhatsAppMessage.created_at <= timestamp_dt + time_tolerance,
-                        WhatsAppMessage.direction.in_(['in', 'inbound'])
-                    ).first()
-                    
-                    if existing_msg:
-                        log.info(f"⚠️ Duplicate by remote_jid+timestamp: {remote_jid} @ {timestamp_ms}")
-                        continue
-                
-                # Third check: body content + phone within 10 seconds (fallback)
-                # 🔥 FIX #3: Use conversation_key for deduplication
-                if not existing_msg:
-                    existing_msg = WhatsAppMessage.query.filter(
-                        WhatsAppMessage.business_id == business_id,
-                        WhatsAppMessage.to_number == conversation_key,  # 🔥 FIX #3: Use conversation_key
-                        WhatsAppMessage.body == message_text,
-                        WhatsAppMessage.direction.in_(['in', 'inbound'])
-                    ).order_by(WhatsAppMessage.created_at.desc()).first()
-                    
-                    # Skip if same message was received in last 10 seconds (webhook retry)
-                    if existing_msg:
-                        if (datetime.utcnow() - existing_msg.created_at) < timedelta(seconds=10):
-                            log.warning(f"⚠️ Duplicate by content within 10s: {message_text[:50]}...")
-                            continue
-                
-                # ✅ BUILD 162: Get or create conversation FIRST (before saving message)
-                # This ensures message.conversation_id is set for unified threading
-                conversation = None
-                try:
-                    conversation = update_session_activity(
-                        business_id=business_id,
-                        customer_wa_id=conversation_key,  # Use normalized conversation key for consistent session tracking
-                        direction="in",
-                        provider="baileys",
-                        lead_id=lead_id,  # 🔥 FIX: Use extracted lead_id to avoid DetachedInstanceError
-                        phone_e164=from_number_e164  # Pass phone for canonical_key generation
-                    )
-                    log.info(f"[WA-SESSION] ✅ Conversation tracked: conv_id={conversation.id if conversation else None}, lead_id={lead_id}")
-                except Exception as e:
-                    log.warning(f"⚠️ Session tracking failed: {e}")
-                    
-                    # 🔥 FALLBACK: Try to fetch existing conversation by canonical_key
-                    # This ensures message always has a conversation_id even if session tracking fails
-                    try:
-                        from server.utils.whatsapp_utils import get_canonical_conversation_key
-                        canonical_key = get_canonical_conversation_key(
-                            business_id=business_id,
-                            lead_id=lead_id,  # 🔥 FIX: Use extracted lead_id
-                            phone_e164=from_number_e164
-                        )
-                        conversation = WhatsAppConversation.query.filter_by(
-                            business_id=business_id,
-                            canonical_key=canonical_key
-                        ).first()
-                        if conversation:
-                            log.info(f"[WA-SESSION] ✅ Fallback: Found existing conversation conv_id={conversation.id}")
-                    except Exception as fallback_err:
-                        log.error(f"⚠️ Fallback conversation fetch failed: {fallback_err}")
-                
-                # Save incoming message to DB with message_id for deduplication
-                # Use ON CONFLICT DO NOTHING pattern for race condition protection
-                wa_msg = WhatsAppMessage()
-                wa_msg.business_id = business_id
-                wa_msg.to_number = conversation_key  # Use unified conversation_key for consistent message grouping
-                wa_msg.body = message_text
-                wa_msg.message_type = 'text'
-                wa_msg.direction = 'in'  # 🔥 BUILD 180: Consistent 'in'/'out' values
-                wa_msg.provider = 'baileys'
-                wa_msg.status = 'received'
-                wa_msg.provider_message_id = baileys_message_id if baileys_message_id else None
-                wa_msg.lead_id = lead_id  # 🔥 FIX: Use extracted lead_id to avoid DetachedInstanceError
-                wa_msg.conversation_id = conversation.id if conversation else None  # Link message to conversation for unified threading
-                wa_msg.source = 'customer'  # Mark as customer message for context
-                
-                try:
-                    db.session.add(wa_msg)
-                    db.session.commit()
-                    log.info(f"[WA-SAVE] ✅ Message saved: id={wa_msg.id}, conv_id={wa_msg.conversation_id}, lead_id={wa_msg.lead_id}")
-                except Exception as integrity_err:
-                    # Handle race condition: another thread/instance inserted same message_id
-                    db.session.rollback()
-                    if baileys_message_id and 'unique' in str(integrity_err).lower():
-                        log.info(f"⚠️ Message already saved by another process: {baileys_message_id}")
-                        continue
-                    else:
-                        # Unexpected error - re-raise
-                        raise
-                
-                # ✅ BUILD 93: Check for appointment request FIRST
-                appointment_created = False
-                try:
-                    from server.whatsapp_appointment_handler import process_incoming_whatsapp_message
-                    # ✅ BUILD 100.13: Pass business_id to appointment handler
-                    appointment_result = process_incoming_whatsapp_message(
-                        phone_number=from_number_e164,
-                        message_text=message_text,
-                        message_id=wa_msg.id,
-                        business_id=business_id  # ✅ FIX: Pass correct business_id
-                    )
-                    if appointment_result.get('appointment_created'):
-                        appointment_created = True
-                        log.info(f"📅 Appointment created for {from_number_e164}: {appointment_result.get('appointment_id')}")
-                except Exception as e:
-                    log.warning(f"⚠️ Appointment check failed: {e}")
-                
-                # ✅ BUILD 152: Check if AI is enabled for this conversation
-                # 🔥 FIX #3: Use conversation_key for consistent state management
-                ai_enabled = True  # Default to enabled
-                try:
-                    from server.models_sql import WhatsAppConversationState
-                    
-                    if not conversation_key:
-                        log.warning(f"[WA-INCOMING] No conversation_key for AI check - defaulting to enabled")
-                        ai_enabled = True  # Explicitly set to True
-                    else:
-                        conv_state = WhatsAppConversationState.query.filter_by(
-                            business_id=business_id,
-                            phone=conversation_key  # 🔥 FIX #3: Use conversation_key
-                        ).first()
-                        if conv_state:
-                            ai_enabled = conv_state.ai_active
-                            log.info(f"[WA-INCOMING] 🤖 AI state for {conversation_key[:30]}: {'✅ ENABLED' if ai_enabled else '❌ DISABLED'}")
-                        else:
-                            ai_enabled = True  # Explicitly set to True when no state found
-                            log.info(f"[WA-INCOMING] 🤖 No AI state found for {conversation_key[:30]} - defaulting to ENABLED")
-                except Exception as e:
-                    ai_enabled = True  # Explicitly set to True on error
-                    log.warning(f"[WA-WARN] Could not check AI state: {e}")
-                
-                # If AI is disabled, skip sending any response
-                # User requirement: When AI is OFF, don't send ANY message at all
-                if not ai_enabled:
-                    log.info(f"[WA-INCOMING] 🚫 AI disabled for {conversation_key[:30]} - skipping response (no message sent)")
-                    msg_duration = time.time() - msg_start
-                    log.info(f"[WA-INCOMING] Message processed (AI disabled, no response) in {msg_duration:.2f}s")
-                    continue
-                
-                # 🔥 PERFORMANCE FIX: Enqueue AI processing as background job (ACK < 1s!)
-                # Instead of processing AI synchronously (7+ seconds causing ECONNABORTED),
-                # we immediately enqueue a job and return 200 to Baileys
-                # The job will handle ALL heavy processing: history, memory, AI, tools, sending
-                log.info(f"[WA-ASYNC] 🚀 Enqueueing AI processing job for message_id={wa_msg.id}, lead_id={lead_id}")
-                
-                try:
-                    from server.services.jobs import enqueue_job
-                    from server.jobs.whatsapp_ai_response_job import whatsapp_ai_response_job
-                    
-                    ai_job_id = enqueue_job(
-                        queue_name='default',
-                        func=whatsapp_ai_response_job,
-                        business_id=business_id,
-                        message_id=wa_msg.id,
-                        remote_jid=remote_jid,
-                        conversation_key=conversation_key,
-                        message_text=message_text,
-                        from_number_e164=from_number_e164,
-                        lead_id=lead_id,  # 🔥 FIX: Use extracted lead_id
-                        timeout=180,  # 3 minutes for AI processing (includes tools!)
-                        retry=1,
-                        description=f"Process WhatsApp AI response for {conversation_key[:15]}"
-                    )
-                    
-                    log.info(f"[WA-ASYNC] ✅ Job enqueued: {ai_job_id} - webhook will return 200 immediately")
-                    log.info(f"[WA-ASYNC] 📊 Job will handle: AI + tools + memory + sending (all async)")
-                    
-                except Exception as enqueue_err:
-                    log.error(f"[WA-ASYNC] ❌ Failed to enqueue AI job: {enqueue_err}")
-                    # Don't crash - just skip this message
-                    continue
-                
-                # Mark as processed immediately (actual AI processing happens in background)
-                processed_count += 1
-                
-                msg_duration = time.time() - msg_start
-                log.info(f"[WA-ASYNC] ✅ Message enqueued in {msg_duration:.2f}s - returning ACK")
-                
-            except Exception as e:
-                import traceback
-                log.error(f"[WA-ERROR] Processing message failed: {e}")
-                log.error(f"[WA-ERROR] Traceback: {traceback.format_exc()}")
-                
-                # 🔥 FAIL-SAFE: Send fallback message to customer so they know we received it
-                try:
-                    if remote_jid and not from_me:
-                        fallback_msg = "קיבלתי ✅ רגע בודק וחוזר אליך"
-                        log.info(f"[WA-FAIL-SAFE] Sending fallback message to {remote_jid[:30]}")
-                        
-                        # Use WhatsApp service to send fallback
-                        if wa_service:
-                            wa_service.send_message(remote_jid, fallback_msg)
-                            log.info(f"[WA-FAIL-SAFE] ✅ Fallback sent successfully")
-                except Exception as fallback_err:
-                    log.error(f"[WA-FAIL-SAFE] ❌ Could not send fallback: {fallback_err}")
-                
-                # 🔥 FIX: Rollback and clean up DB session to prevent "cursor already closed"
-                try:
-                    db.session.rollback()
-                    db.session.close()
-                    db.session.remove()
-                except Exception as rollback_err:
-                    log.error(f"[WA-ERROR] Rollback/cleanup failed: {rollback_err}")
-        
-        overall_duration = time.time() - overall_start
-        log.info(f"[WA-INCOMING] Total processing: {overall_duration:.2f}s for {len(messages)} message(s)")
-        
-        processed = processed_count
-        
+        from server.config import WA_INGEST_STREAM_ENABLED
+        if WA_INGEST_STREAM_ENABLED:
+            from server.services.whatsapp_ingest import publish_baileys_messages
+            queued = publish_baileys_messages(tenant_id, messages)
+            if queued is not None:
+                return jsonify({"ok": True, "queued": queued}), 200
+
+        processed = process_baileys_messages(tenant_id, messages)
+        if processed is None:
+            return jsonify({"ok": False, "error": "no_business"}), 400
         return jsonify({"ok": True, "processed": processed}), 200
-        
+
     except Exception as e:
         import traceback
         log.error(f"[WA-ERROR] Baileys webhook error: {e}")
         log.error(f"[WA-ERROR] Traceback: {traceback.format_exc()}")
-        # 🔥 FIX: Rollback and clean up DB session to prevent "cursor already closed"
-        try:
-            db.session.rollback()
-            db.session.close()
-            db.session.remove()
-        except Exception as rollback_err:
-            log.error(f"[WA-ERROR] Rollback/cleanup failed: {rollback_err}")
+        _reset_session(log)
         return jsonify({"error": str(e)}), 500
 
 @whatsapp_bp.route('/send', methods=['POST'])
@@ -3878,7 +3895,7 @@ def create_broadcast():
                 }), 503
             
             # ✅ Use unified jobs wrapper
-            from server.services.jobs import enqueue, get_redis
+            from server.services.jobs import get_redis
             
             # Get Redis for BulkGate
             redis_conn = get_redis()
@@ -3904,20 +3921,12 @@ def create_broadcast():
             except Exception as e:
                 log.warning(f"BulkGate lock/record failed (proceeding anyway): {e}")
             
-            # Import and enqueue the job function with broadcast_id
-            from server.jobs.broadcast_job import process_broadcast_job
-            rq_job = enqueue(
-                'broadcasts',
-                process_broadcast_job,
-                broadcast.id,
-                business_id=business_id,
-                run_id=broadcast.id,
-                job_id=f"broadcast_{broadcast.id}",
-                timeout=1800,  # 30 minutes
-                ttl=3600
-            )
+            # Enqueue the broadcast job(s) - they share the recipients via SKIP LOCKED claims
+            from server.config import BROADCAST_JOBS_PER_CAMPAIGN
+            from server.jobs.broadcast_job import enqueue_broadcast_jobs
+            rq_jobs = enqueue_broadcast_jobs(broadcast.id, business_id, count=BROADCAST_JOBS_PER_CAMPAIGN)
             
-            log.info(f"🚀 [WA_BROADCAST] Enqueued RQ job for broadcast_id={broadcast.id}, rq_job_id={rq_job.id}")
+            log.info(f"🚀 [WA_BROADCAST] Enqueued {len(rq_jobs)} RQ job(s) for broadcast_id={broadcast.id}, rq_job_ids={[j.id for j in rq_jobs]}")
                 
         except Exception as worker_err:
             log.error(f"❌ [WA_BROADCAST] Failed to enqueue job: {worker_err}")
@@ -4113,6 +4122,10 @@ def stop_broadcast(broadcast_id):
         
         db.session.commit()
         
+        # Running workers poll the Redis flag (the DB flag is only re-read every few seconds)
+        from server.services.broadcast_dispatcher import request_broadcast_stop
+        request_broadcast_stop(broadcast_id)
+        
         log.info(f"[WA_BROADCAST] broadcast_id={broadcast_id} cancel requested by user_id={user_id}")
         
         return jsonify({
@@ -7,6 +7,13 @@ Scheduler Service - Periodic Job Enqueuing
 - Uses unified jobs.py wrapper (no inline Redis/Queue creation)
 - Lock extend mechanism if cycle takes longer than expected
 
+⏰ Due-time index (SCHEDULER_DUE_INDEX, see server/services/due_scheduler.py):
+- The leader renews an owner-tagged lock and keeps it between cycles
+- Periodic jobs are enqueued once per wall-clock minute
+- Scheduled messages / appointment automations are popped from the Redis
+  due index every SCHEDULER_DUE_POLL_MS and enqueued directly
+- The DB tick jobs only run every SCHEDULER_RECONCILE_MINUTES as a safety net
+
 ⚠️ CRITICAL: Only ONE scheduler instance should hold lock at any time
 """
 import os
@@ -66,6 +73,45 @@ def try_acquire_scheduler_lock(redis_client, lock_key: str, ttl_seconds: int = 9
         return False
 
 
+# Renew the lock if we own it, otherwise take it only if free (atomic)
+_HOLD_LOCK_LUA = """
+local current = redis.call('GET', KEYS[1])
+if current == ARGV[1] then
+    redis.call('EXPIRE', KEYS[1], tonumber(ARGV[2]))
+    return 1
+end
+if not current then
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', tonumber(ARGV[2]))
+    return 1
+end
+return 0
+"""
+
+
+def scheduler_owner_id() -> str:
+    """Lock value identifying this scheduler instance"""
+    import socket
+    import uuid
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def hold_scheduler_lock(redis_client, lock_key: str, owner: str, ttl_seconds: int = 90) -> bool:
+    """
+    Acquire or renew the scheduler lock for `owner`.
+    
+    Unlike try_acquire_scheduler_lock, the holder keeps leadership between cycles
+    (needed for the due-index loop, which runs continuously on the leader).
+    
+    Returns:
+        True if `owner` holds the lock, False if another instance holds it
+    """
+    try:
+        return bool(redis_client.eval(_HOLD_LOCK_LUA, 1, lock_key, owner, ttl_seconds))
+    except Exception as e:
+        logger.error(f"❌ Failed to hold lock: {e}")
+        return False
+
+
 def extend_scheduler_lock(redis_client, lock_key: str, ttl_seconds: int = 90) -> bool:
     """
     Extend scheduler lock if we still hold it.
@@ -92,11 +138,15 @@ def extend_scheduler_lock(redis_client, lock_key: str, ttl_seconds: int = 90) ->
         return False
 
 
-def enqueue_periodic_jobs():
+def enqueue_periodic_jobs(include_due_ticks: bool = True):
     """
     Enqueue all periodic jobs to RQ using unified jobs wrapper.
     
     ✅ Uses server/services/jobs.py - NO inline Redis/Queue creation!
+    
+    Args:
+        include_due_ticks: Enqueue the scheduled-messages / appointment-automation
+            DB ticks (with the due index enabled these only reconcile)
     """
     from server.services.jobs import enqueue
     
@@ -120,21 +170,22 @@ def enqueue_periodic_jobs():
     except Exception as e:
         logger.error(f"❌ Failed to enqueue reminders_tick_job: {e}")
     
-    # 2. Scheduled messages tick (every minute) - HIGH PRIORITY
-    try:
-        from server.jobs.scheduled_messages_tick_job import scheduled_messages_tick_job
-        enqueue(
-            'default',
-            scheduled_messages_tick_job,
-            job_id=f"scheduled_messages_tick_{int(time.time())}",
-            timeout=180,  # 3 minutes
-            retry=None,  # Don't retry - next tick will handle it
-            ttl=300
-        )
-        jobs_enqueued += 1
-        logger.info("✅ Enqueued: scheduled_messages_tick_job")
-    except Exception as e:
-        logger.error(f"❌ Failed to enqueue scheduled_messages_tick_job: {e}")
+    # 2. Scheduled messages tick (every minute, or reconcile interval with the due index) - HIGH PRIORITY
+    if include_due_ticks:
+        try:
+            from server.jobs.scheduled_messages_tick_job import scheduled_messages_tick_job
+            enqueue(
+                'default',
+                scheduled_messages_tick_job,
+                job_id=f"scheduled_messages_tick_{int(time.time())}",
+                timeout=180,  # 3 minutes
+                retry=None,  # Don't retry - next tick will handle it
+                ttl=300
+            )
+            jobs_enqueued += 1
+            logger.info("✅ Enqueued: scheduled_messages_tick_job")
+        except Exception as e:
+            logger.error(f"❌ Failed to enqueue scheduled_messages_tick_job: {e}")
     
     # 2a. Recurring scheduled messages (every hour at :00) - MEDIUM PRIORITY
     if current_minute == 0:
@@ -153,21 +204,22 @@ def enqueue_periodic_jobs():
         except Exception as e:
             logger.error(f"❌ Failed to enqueue recurring_scheduled_messages_job: {e}")
     
-    # 3. Appointment automation tick (every minute) - HIGH PRIORITY
-    try:
-        from server.jobs.appointment_automation_tick_job import appointment_automation_tick
-        enqueue(
-            'default',
-            appointment_automation_tick,
-            job_id=f"appointment_automation_tick_{int(time.time())}",
-            timeout=180,  # 3 minutes
-            retry=None,  # Don't retry - next tick will handle it
-            ttl=300
-        )
-        jobs_enqueued += 1
-        logger.info("✅ Enqueued: appointment_automation_tick")
-    except Exception as e:
-        logger.error(f"❌ Failed to enqueue appointment_automation_tick: {e}")
+    # 3. Appointment automation tick (every minute, or reconcile interval with the due index) - HIGH PRIORITY
+    if include_due_ticks:
+        try:
+            from server.jobs.appointment_automation_tick_job import appointment_automation_tick
+            enqueue(
+                'default',
+                appointment_automation_tick,
+                job_id=f"appointment_automation_tick_{int(time.time())}",
+                timeout=180,  # 3 minutes
+                retry=None,  # Don't retry - next tick will handle it
+                ttl=300
+            )
+            jobs_enqueued += 1
+            logger.info("✅ Enqueued: appointment_automation_tick")
+        except Exception as e:
+            logger.error(f"❌ Failed to enqueue appointment_automation_tick: {e}")
     
     # 4. WhatsApp sessions cleanup (every 5 minutes)
     if current_minute % 5 == 0:
@@ -219,21 +271,91 @@ def enqueue_periodic_jobs():
             logger.info("✅ Enqueued: cleanup_old_recordings_job")
         except Exception as e:
             logger.error(f"❌ Failed to enqueue cleanup_old_recordings_job: {e}")
-    
+
+    # 7. Lead counters reconcile (every LEAD_COUNTERS_RECONCILE_MINUTES)
+    from server.config import LEAD_COUNTERS_ENABLED, LEAD_COUNTERS_RECONCILE_MINUTES
+    if LEAD_COUNTERS_ENABLED and int(time.time() // 60) % LEAD_COUNTERS_RECONCILE_MINUTES == 0:
+        try:
+            from server.jobs.lead_counters_reconcile_job import lead_counters_reconcile_job
+            enqueue(
+                'maintenance',
+                lead_counters_reconcile_job,
+                job_id=f"lead_counters_reconcile_{int(time.time() // 60)}",
+                timeout=1800,  # 30 minutes
+                retry=None,  # Don't retry - next interval will handle it
+                ttl=600
+            )
+            jobs_enqueued += 1
+            logger.info("✅ Enqueued: lead_counters_reconcile_job")
+        except Exception as e:
+            logger.error(f"❌ Failed to enqueue lead_counters_reconcile_job: {e}")
+
+    # 8. WhatsApp ingest partitions left with messages but no drain job (every minute)
+    from server.config import WA_INGEST_STREAM_ENABLED
+    if WA_INGEST_STREAM_ENABLED:
+        try:
+            from server.services.whatsapp_ingest import kick_partitions
+            woken = kick_partitions()
+            jobs_enqueued += woken
+            if woken:
+                logger.info(f"✅ Enqueued: {woken} whatsapp_ingest_drain_job(s)")
+        except Exception as e:
+            logger.error(f"❌ Failed to kick WhatsApp ingest partitions: {e}")
+
+    # 9. Webhook outbox rows due (retries, dead delivery jobs) with no delivery job (every minute)
+    from server.config import WEBHOOK_OUTBOX_ENABLED
+    if WEBHOOK_OUTBOX_ENABLED:
+        try:
+            from server.services.webhook_delivery import kick_delivery
+            woken = kick_delivery()
+            jobs_enqueued += woken
+            if woken:
+                logger.info("✅ Enqueued: webhook_delivery_job")
+        except Exception as e:
+            logger.error(f"❌ Failed to kick webhook delivery: {e}")
+
     logger.info(f"📊 Enqueued {jobs_enqueued} jobs this cycle")
     return jobs_enqueued
 
 
+def due_index_step(redis_client, poll_seconds: float, now: float = None) -> tuple:
+    """
+    Pop and dispatch everything due in the due index.
+    
+    Returns:
+        (jobs_enqueued, sleep_seconds) - sleep until the next due item, at most poll_seconds
+    """
+    from server.services.due_scheduler import POP_BATCH, dispatch_due, pop_due, seconds_until_next_due
+    
+    now = time.time() if now is None else now
+    jobs_enqueued = 0
+    while True:
+        members = pop_due(redis_client, now=now)
+        if not members:
+            break
+        jobs_enqueued += dispatch_due(members)
+        if len(members) < POP_BATCH:
+            break
+    
+    next_due = seconds_until_next_due(redis_client, now=time.time())
+    sleep_seconds = poll_seconds if next_due is None else min(poll_seconds, next_due)
+    return jobs_enqueued, sleep_seconds
+
+
 def run_scheduler():
     """
     Main scheduler loop with proper lock handling.
     
     ✅ PRODUCTION-READY:
-    - Short tick interval (15s) for fast failover
+    - Short lock check interval (15s) for fast failover
     - Lock with TTL only (no manual release)
-    - Handles long-running cycles with lock extend
+    - Leader renews its own lock (owner-tagged) and keeps leadership
+    - Periodic jobs once per wall-clock minute
+    - Due index polled every SCHEDULER_DUE_POLL_MS (sub-second dispatch)
     - Graceful shutdown
     """
+    from server.config import SCHEDULER_DUE_INDEX, SCHEDULER_DUE_POLL_MS, SCHEDULER_RECONCILE_MINUTES
+    
     # Register signal handlers
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
@@ -241,13 +363,17 @@ def run_scheduler():
     # Get configuration
     lock_key = 'scheduler:global_lock'
     lock_ttl = 90  # 90 seconds TTL
-    tick_interval = 15  # ✅ Short interval (15s not 60s) for faster failover
+    tick_interval = 15  # ✅ Lock check interval (15s not 60s) for faster failover
+    poll_seconds = SCHEDULER_DUE_POLL_MS / 1000.0
+    owner = scheduler_owner_id()
     
     logger.info("🚀 Scheduler service starting")
     logger.info(f"📊 Configuration:")
-    logger.info(f"   Lock key: {lock_key}")
+    logger.info(f"   Lock key: {lock_key} (owner {owner})")
     logger.info(f"   Lock TTL: {lock_ttl}s")
     logger.info(f"   Tick interval: {tick_interval}s")
+    logger.info(f"   Due index: {'enabled' if SCHEDULER_DUE_INDEX else 'disabled'} "
+                f"(poll {SCHEDULER_DUE_POLL_MS}ms, reconcile every {SCHEDULER_RECONCILE_MINUTES}min)")
     
     # Get Redis connection via unified wrapper
     from server.services.jobs import get_redis
@@ -266,53 +392,67 @@ def run_scheduler():
     time.sleep(10)
     
     cycle_count = 0
+    is_leader = False
+    next_lock_check = 0.0
+    last_periodic_minute = None
     
     while not _shutdown_requested:
-        cycle_count += 1
-        cycle_start = time.time()
+        loop_start = time.time()
+        sleep_time = tick_interval
         
         try:
-            # ✅ CORRECT: Try to acquire lock (SET NX EX)
-            if not try_acquire_scheduler_lock(redis_client, lock_key, lock_ttl):
-                # Another instance holds the lock - skip this cycle
-                logger.debug(f"⏭️  Lock held by another instance, skipping cycle {cycle_count}")
-            else:
-                logger.info(f"🔒 Lock acquired for cycle {cycle_count}")
+            # ✅ Acquire or renew the lock every tick_interval
+            if loop_start >= next_lock_check:
+                was_leader = is_leader
+                is_leader = hold_scheduler_lock(redis_client, lock_key, owner, lock_ttl)
+                next_lock_check = loop_start + tick_interval
                 
-                try:
-                    # Enqueue jobs
-                    jobs_enqueued = enqueue_periodic_jobs()
-                    
-                    cycle_duration = time.time() - cycle_start
-                    
-                    # If cycle takes longer than expected, extend lock
-                    if cycle_duration > (lock_ttl * 0.7):  # If > 70% of TTL
-                        extend_scheduler_lock(redis_client, lock_key, lock_ttl)
-                    
-                    logger.info(f"✅ Cycle {cycle_count} completed in {cycle_duration:.2f}s: {jobs_enqueued} jobs enqueued")
-                    
-                except Exception as e:
-                    logger.error(f"❌ Error during cycle {cycle_count}: {e}")
-                    import traceback
-                    traceback.print_exc()
+                if is_leader and not was_leader:
+                    logger.info("🔒 Scheduler lock acquired - this instance is the leader")
+                    if SCHEDULER_DUE_INDEX:
+                        # Rows created while Redis was down / before the index existed
+                        try:
+                            from server.services.due_scheduler import reconcile_due_index
+                            reconcile_due_index(redis_client)
+                        except Exception as e:
+                            logger.error(f"❌ Due index reconciliation failed: {e}")
+                elif was_leader and not is_leader:
+                    logger.warning("⚠️ Scheduler lock lost - another instance is the leader")
+                elif not is_leader:
+                    logger.debug("⏭️  Lock held by another instance, standing by")
+            
+            if is_leader:
+                # Periodic jobs - once per wall-clock minute
+                current_minute = int(loop_start // 60)
+                if current_minute != last_periodic_minute:
+                    last_periodic_minute = current_minute
+                    cycle_count += 1
+                    include_due_ticks = (not SCHEDULER_DUE_INDEX
+                                         or current_minute % SCHEDULER_RECONCILE_MINUTES == 0)
+                    try:
+                        jobs_enqueued = enqueue_periodic_jobs(include_due_ticks=include_due_ticks)
+                        cycle_duration = time.time() - loop_start
+                        logger.info(f"✅ Cycle {cycle_count} completed in {cycle_duration:.2f}s: {jobs_enqueued} jobs enqueued")
+                    except Exception as e:
+                        logger.error(f"❌ Error during cycle {cycle_count}: {e}")
+                        import traceback
+                        traceback.print_exc()
                 
-                # ✅ CORRECT: NO manual release - let TTL handle it
-                # Lock will expire after TTL seconds automatically
+                if SCHEDULER_DUE_INDEX:
+                    dispatched, sleep_time = due_index_step(redis_client, poll_seconds)
+                    if dispatched:
+                        logger.info(f"⏰ Dispatched {dispatched} due job(s)")
         
         except Exception as e:
-            logger.error(f"❌ Fatal error in cycle {cycle_count}: {e}")
+            logger.error(f"❌ Fatal error in scheduler loop: {e}")
             import traceback
             traceback.print_exc()
+            sleep_time = poll_seconds if is_leader else tick_interval
         
-        # Calculate sleep time to maintain consistent interval
-        cycle_duration = time.time() - cycle_start
-        sleep_time = max(0, tick_interval - cycle_duration)
-        
+        # Never sleep past the next lock check (renewal must beat the TTL)
+        sleep_time = min(sleep_time, max(0.0, next_lock_check - time.time()))
         if sleep_time > 0:
-            logger.debug(f"⏳ Sleeping {sleep_time:.1f}s until next cycle...")
             time.sleep(sleep_time)
-        else:
-            logger.warning(f"⚠️ Cycle took {cycle_duration:.1f}s (longer than {tick_interval}s interval)")
     
     logger.info("🛑 Scheduler service shutting down gracefully")
     # ✅ CORRECT: NO lock cleanup on shutdown - let TTL handle it
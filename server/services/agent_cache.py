@@ -8,22 +8,24 @@ import time
 from typing import Optional, Dict, Any
 from datetime import datetime, timedelta
 
+from server.utils.cache import TTLCache
+
 logger = logging.getLogger(__name__)
 
 class AgentCache:
     """
-    Thread-safe cache for Agent instances
+    Thread-safe cache for Agent instances (shared TTLCache: LRU + cross-process
+    invalidation; agents are live objects, so no Redis L2)
     
     Key structure: "{business_id}:{channel}"
     - Reuses Agent across multiple turns for same business+channel
-    - Automatically expires agents after 30 minutes of inactivity
+    - Automatically expires agents after 30 minutes
     - Thread-safe for concurrent access
     """
     
-    def __init__(self, ttl_minutes: int = 30):
-        self._cache: Dict[str, Dict[str, Any]] = {}
-        self._lock = threading.RLock()
+    def __init__(self, ttl_minutes: int = 30, max_size: int = 1000):
         self.ttl_seconds = ttl_minutes * 60
+        self._cache = TTLCache(ttl_seconds=self.ttl_seconds, max_size=max_size, name="agents")
         logger.info(f"✅ AgentCache initialized (TTL: {ttl_minutes} minutes)")
     
     def _make_key(self, business_id: int, channel: str) -> str:
@@ -38,28 +40,16 @@ class AgentCache:
             Agent instance or None if not cached/expired
         """
         key = self._make_key(business_id, channel)
+        entry = self._cache.get(key)
+        if not entry:
+            logger.debug(f"❌ Cache MISS: {key}")
+            return None
         
-        with self._lock:
-            entry = self._cache.get(key)
-            
-            if not entry:
-                logger.debug(f"❌ Cache MISS: {key}")
-                return None
-            
-            # Check expiration
-            age_seconds = time.time() - entry['timestamp']
-            if age_seconds > self.ttl_seconds:
-                # Expired - remove from cache
-                logger.info(f"⏰ Cache EXPIRED: {key} (age: {age_seconds:.0f}s)")
-                del self._cache[key]
-                return None
-            
-            # Update last access time
-            entry['last_access'] = time.time()
-            entry['hits'] += 1
-            
-            logger.info(f"✅ Cache HIT: {key} (age: {age_seconds:.0f}s, hits: {entry['hits']})")
-            return entry['agent']
+        # Update last access time
+        entry['last_access'] = time.time()
+        entry['hits'] += 1
+        logger.debug(f"✅ Cache HIT: {key} (hits: {entry['hits']})")
+        return entry['agent']
     
     def set(self, business_id: int, channel: str, agent, business_name: str = ""):
         """
@@ -72,9 +62,27 @@ class AgentCache:
             business_name: Optional business name for logging
         """
         key = self._make_key(business_id, channel)
-        
-        with self._lock:
-            self._cache[key] = {
+        self._cache.set(key, {
+            'agent': agent,
+            'business_id': business_id,
+            'business_name': business_name,
+            'channel': channel,
+            'timestamp': time.time(),
+            'last_access': time.time(),
+            'hits': 0
+        })
+        logger.info(f"💾 Cache SET: {key} (business: {business_name}, total cached: {self._cache.size()})")
+    
+    def get_or_create(self, business_id: int, channel: str, factory, business_name: str = ""):
+        """
+        Get cached agent or build it with factory() - concurrent callers for the
+        same business+channel share one build. A factory returning None is not cached.
+        """
+        def load():
+            agent = factory()
+            if agent is None:
+                return None
+            return {
                 'agent': agent,
                 'business_id': business_id,
                 'business_name': business_name,
@@ -83,64 +91,55 @@ class AgentCache:
                 'last_access': time.time(),
                 'hits': 0
             }
-            logger.info(f"💾 Cache SET: {key} (business: {business_name}, total cached: {len(self._cache)})")
+        
+        entry = self._cache.get_or_load(self._make_key(business_id, channel), load)
+        if not entry:
+            return None
+        entry['last_access'] = time.time()
+        entry['hits'] += 1
+        return entry['agent']
     
     def invalidate(self, business_id: int, channel: str = None):
         """
-        Invalidate cached agent(s) for a business
+        Invalidate cached agent(s) for a business (in every process)
         
         Args:
             business_id: Business ID
             channel: If provided, only invalidate specific channel. If None, invalidate all channels for this business.
         """
-        with self._lock:
-            if channel:
-                # Invalidate specific channel
-                key = self._make_key(business_id, channel)
-                if key in self._cache:
-                    del self._cache[key]
-                    logger.info(f"🗑️  Cache INVALIDATED: {key}")
-            else:
-                # Invalidate all channels for this business
-                keys_to_remove = [k for k in self._cache.keys() if k.startswith(f"{business_id}:")]
-                for key in keys_to_remove:
-                    del self._cache[key]
-                    logger.info(f"🗑️  Cache INVALIDATED: {key}")
+        if channel:
+            self._cache.delete(self._make_key(business_id, channel))
+        else:
+            self._cache.delete_prefix(f"{business_id}:")
+        logger.info(f"🗑️  Cache INVALIDATED: {business_id}:{channel or '*'}")
     
     def cleanup_expired(self):
         """Remove all expired entries from cache"""
-        with self._lock:
-            now = time.time()
-            expired_keys = []
-            
-            for key, entry in self._cache.items():
-                age = now - entry['timestamp']
-                if age > self.ttl_seconds:
-                    expired_keys.append(key)
-            
-            for key in expired_keys:
-                del self._cache[key]
-            
-            if expired_keys:
-                logger.info(f"🧹 Cleaned up {len(expired_keys)} expired agents")
+        removed = self._cache.purge_expired()
+        if removed:
+            logger.info(f"🧹 Cleaned up {removed} expired agents")
     
     def get_stats(self) -> Dict[str, Any]:
         """Get cache statistics"""
-        with self._lock:
-            return {
-                'total_cached': len(self._cache),
-                'entries': [
-                    {
-                        'business_id': entry['business_id'],
-                        'business_name': entry['business_name'],
-                        'channel': entry['channel'],
-                        'age_seconds': int(time.time() - entry['timestamp']),
-                        'last_access_seconds': int(time.time() - entry['last_access']),
-                        'hits': entry['hits']
-                    }
-                    for entry in self._cache.values()
-                ]
-            }
+        entries = [entry for _, entry in self._cache.items()]
+        stats = self._cache.stats()
+        return {
+            'total_cached': len(entries),
+            'hits': stats['hits'],
+            'misses': stats['misses'],
+            'evictions': stats['evictions'],
+            'entries': [
+                {
+                    'business_id': entry['business_id'],
+                    'business_name': entry['business_name'],
+                    'channel': entry['channel'],
+                    'age_seconds': int(time.time() - entry['timestamp']),
+                    'last_access_seconds': int(time.time() - entry['last_access']),
+                    'hits': entry['hits']
+                }
+                for entry in entries
+            ]
+        }
 
 # Global singleton instance
 _agent_cache = None
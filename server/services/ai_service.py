@@ -11,12 +11,14 @@ import re
 import asyncio
 import json
 from typing import Dict, Any, Optional, List, Literal
-from openai import OpenAI
+from server.services.lazy_services import lazy_module
 from server.models_sql import BusinessSettings, PromptRevisions, Business, AgentTrace
 from server.db import db
-from datetime import datetime
+from server.utils.cache import TTLCache
 from server.services.unified_lead_context_service import UnifiedLeadContextPayload, UnifiedLeadContextService
 
+openai = lazy_module("openai")  # OpenAI SDK is imported on first use
+
 # 🔥 FIX E: LAZY agent imports to prevent schema errors from breaking WhatsApp
 # Agents are loaded on-demand, so WhatsApp still works even if agent schema fails
 AGENT_MODULES_LOADED = None  # None = not yet loaded, True = loaded, False = failed
@@ -300,9 +302,8 @@ def invalidate_business_cache(business_id: int):
         f"business_{business_id}_whatsapp"
     ]
     for key in cache_keys_to_remove:
-        if key in service._cache:
-            del service._cache[key]
-            logger.info(f"✅ Prompt cache invalidated: {key}")
+        service._cache.delete(key)  # broadcast - every worker drops its copy
+        logger.info(f"✅ Prompt cache invalidated: {key}")
     
     # 2. 🔥 CRITICAL: Clear PromptCache (realtime_prompt_builder)
     # This cache stores pre-built prompts for inbound/outbound calls
@@ -336,12 +337,12 @@ class AIService:
                         passed to methods that require it.
         """
         # ⚡ RELIABLE OpenAI client with production timeout
-        self.client = OpenAI(
+        self.client = openai.OpenAI(
             api_key=os.getenv("OPENAI_API_KEY"),
             timeout=2.5  # 🔥 REDUCED: 2.5s timeout for faster real-time conversations (was 3.5s)
         )
-        self._cache = {}  # קאש פרומפטים לביצועים
         self._cache_timeout = 30  # ⚡ 30 שניות - מתעדכן מהר כשמשנים פרומפט ב-DB
+        self._cache = TTLCache(ttl_seconds=self._cache_timeout, max_size=2000, name="ai_service_prompts")  # קאש פרומפטים לביצועים
         self.business_id = business_id  # 🔥 NEW: Store business context for live calls
         
         # 🔥 NEW: Gemini client (lazy loaded when needed)
@@ -381,14 +382,12 @@ class AIService:
         Falls back to BusinessSettings.ai_prompt if not set.
         """
         cache_key = f"business_{business_id}_{channel}"
-        now = datetime.now().timestamp()
         
         # בדיקת קאש
-        if cache_key in self._cache:
-            cached_data, timestamp = self._cache[cache_key]
-            if now - timestamp < self._cache_timeout:
-                logger.info(f"✅ CACHE_HIT: business {business_id} {channel}")
-                return cached_data
+        cached_data = self._cache.get(cache_key)
+        if cached_data is not None:
+            logger.debug(f"✅ CACHE_HIT: business {business_id} {channel}")
+            return cached_data
         
         try:
             # ⚡ CRITICAL: Measure DB query time
@@ -555,7 +554,7 @@ class AIService:
                 }
             
             # שמירה בקאש
-            self._cache[cache_key] = (prompt_data, now)
+            self._cache.set(cache_key, prompt_data)
             return prompt_data
             
         except Exception as e:
@@ -904,10 +903,8 @@ class AIService:
     
     def invalidate_cache(self, business_id: int):
         """מחיקת קאש עסק מסוים (לאחר עדכון פרומפט)"""
-        cache_key = f"business_{business_id}"
-        if cache_key in self._cache:
-            del self._cache[cache_key]
-            logger.info(f"Cache invalidated for business {business_id}")
+        self._cache.delete_prefix(f"business_{business_id}_")
+        logger.info(f"Cache invalidated for business {business_id}")
     
     def _generate_conversation_id(self, business_id: int, context: Optional[Dict[str, Any]], customer_phone: Optional[str]) -> str:
         """
@@ -45,6 +45,7 @@ from server.models_sql import (
 )
 from server.services.jobs import enqueue
 from server.jobs.send_appointment_confirmation_job import send_appointment_confirmation
+from server.services.due_scheduler import schedule_appointment_run
 
 logger = logging.getLogger(__name__)
 
@@ -239,6 +240,7 @@ def schedule_automation_jobs(
         scheduled_count = 0
         updated_count = 0
         skipped_count = 0
+        due_runs = []  # (run_id, scheduled_for) for the scheduler due index
         
         for automation in automations:
             schedule_offsets = automation.schedule_offsets or []
@@ -278,6 +280,7 @@ def schedule_automation_jobs(
                         # Update scheduled_for time
                         existing_run.scheduled_for = scheduled_for
                         db.session.add(existing_run)
+                        due_runs.append((existing_run.id, scheduled_for))
                         updated_count += 1
                         logger.info(f"Updated automation run {existing_run.id} to new time: {scheduled_for}")
                     else:
@@ -307,20 +310,18 @@ def schedule_automation_jobs(
                         business_id=business_id
                     )
                 else:
-                    # Schedule for future execution
-                    enqueue(
-                        'default',
-                        send_appointment_confirmation,
-                        run_id=run.id,
-                        business_id=business_id,
-                        scheduled_for=scheduled_for
-                    )
+                    # Future execution: registered in the scheduler due index after commit
+                    due_runs.append((run.id, scheduled_for))
                 
                 scheduled_count += 1
                 logger.info(f"Scheduled automation run {run.id} for {scheduled_for} (offset: {offset_sig})")
         
         db.session.commit()
         
+        # Re-registering a run moves its due time (force_reschedule)
+        for run_id, run_scheduled_for in due_runs:
+            schedule_appointment_run(run_id, business_id, run_scheduled_for)
+        
         return {
             'scheduled': scheduled_count,
             'updated': updated_count,
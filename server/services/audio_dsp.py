@@ -15,13 +15,25 @@ Design principles:
 - NO noise floor detection - keeps it simple
 - Fast execution - suitable for real-time telephony (20ms frames)
 - PER-CALL state - filter state is isolated per call instance
+
+Performance:
+- μ-law decode/encode are table lookups (256 / 65536 entries), no audioop round trip
+- High-pass runs as a block IIR (scipy.signal.lfilter with carried zi state),
+  bit-identical to the sample-by-sample recurrence
+- Benchmark: python scripts/bench_audio_dsp.py
 """
 import numpy as np
-import audioop
 import math
 import logging
 from typing import Optional
 
+try:
+    from scipy.signal import lfilter as _lfilter
+except ImportError:  # pragma: no cover - scipy is a hard dependency in production
+    _lfilter = None
+
+from server.services.mulaw_fast import MULAW_DECODE_TABLE, MULAW_ENCODE_TABLE
+
 # Get logger for this module
 logger = logging.getLogger(__name__)
 
@@ -50,6 +62,14 @@ RMS_LOG_INTERVAL_SEC = 10.0
 # Filter coefficient (computed once)
 _FILTER_ALPHA = math.exp(-2.0 * math.pi * HIGHPASS_CUTOFF_HZ / SAMPLE_RATE)
 
+# Block IIR coefficients, applied to the first difference d[n] = x[n] - x[n-1]:
+#   y[n] = d[n] - alpha * y[n-1]
+# Feeding lfilter the pre-differenced signal (instead of b=[1, -1]) keeps the
+# floating point operation order identical to the per-sample recurrence, so the
+# output is bit-identical to the original implementation.
+_HP_B = np.array([1.0])
+_HP_A = np.array([1.0, _FILTER_ALPHA])
+
 
 class AudioDSPProcessor:
     """
@@ -80,6 +100,7 @@ class AudioDSPProcessor:
         
         This is a simple recursive filter that removes DC offset and low frequencies.
         State is maintained across calls for frame continuity WITHIN a call.
+        Kept as the reference recurrence - process() uses _highpass_filter_block().
         
         Args:
             sample: Input sample (float)
@@ -96,6 +117,44 @@ class AudioDSPProcessor:
         
         return output
     
+    def _highpass_filter_block(self, samples: np.ndarray) -> np.ndarray:
+        """
+        Apply the 1st order high-pass filter to a whole frame at once
+        
+        Same recurrence as _highpass_filter_sample(), evaluated by a compiled
+        IIR kernel. The filter state (previous input/output) is carried between
+        frames, so consecutive frames are filtered exactly like one long stream.
+        
+        Args:
+            samples: Input samples (float64 array)
+        
+        Returns:
+            Filtered samples (new float64 array)
+        """
+        # First difference with the previous frame's last input sample
+        diff = np.empty_like(samples)
+        diff[0] = samples[0] - self._filter_prev_input
+        np.subtract(samples[1:], samples[:-1], out=diff[1:])
+        
+        if _lfilter is not None:
+            # Direct-form II transposed state: z = -alpha * y[n-1]
+            zi = np.array([-(_FILTER_ALPHA * self._filter_prev_output)])
+            output, _ = _lfilter(_HP_B, _HP_A, diff, zi=zi)
+        else:
+            # Fallback without scipy - same recurrence in a tight local loop
+            output = np.empty_like(diff)
+            prev = self._filter_prev_output
+            alpha = _FILTER_ALPHA
+            for i, d in enumerate(diff.tolist()):
+                prev = d - alpha * prev
+                output[i] = prev
+        
+        # Update state
+        self._filter_prev_input = float(samples[-1])
+        self._filter_prev_output = float(output[-1])
+        
+        return output
+    
     def _calculate_rms(self, pcm16_data: bytes) -> float:
         """
         Calculate RMS (Root Mean Square) of PCM16 audio
@@ -144,57 +203,46 @@ class AudioDSPProcessor:
         
         try:
             # ═══════════════════════════════════════════════════════════════════════
-            # STEP 1: μ-law → PCM16 (decode)
+            # STEP 1: μ-law → PCM16 (decode via 256-entry table)
             # ═══════════════════════════════════════════════════════════════════════
-            pcm16_data = audioop.ulaw2lin(mulaw_bytes, 2)  # 2 = 16-bit samples
+            pcm16_in = MULAW_DECODE_TABLE[np.frombuffer(mulaw_bytes, dtype=np.uint8)]
             
             # ═══════════════════════════════════════════════════════════════════════
             # STEP 2: High-pass filter + Soft limiter
             # ═══════════════════════════════════════════════════════════════════════
-            # Convert to numpy for efficient processing
-            samples = np.frombuffer(pcm16_data, dtype=np.int16).astype(np.float64)
-            
-            # Apply high-pass filter (sample-by-sample for state continuity)
-            # ⚠️ NOTE: IIR filter REQUIRES sequential processing to maintain state
-            # Each output sample depends on previous input/output (y[n] = f(x[n], x[n-1], y[n-1]))
-            # Vectorization would break filter continuity and cause artifacts
-            # Performance: ~0.04ms for 160 samples (acceptable for 20ms frames)
-            filtered_samples = np.empty_like(samples)
-            for i, sample in enumerate(samples):
-                filtered_samples[i] = self._highpass_filter_sample(sample)
+            samples = pcm16_in.astype(np.float64)
             
-            # Apply soft limiter (vectorized for performance)
-            abs_samples = np.abs(filtered_samples)
+            # Block IIR with carried state (bit-identical to the per-sample loop)
+            limited_samples = self._highpass_filter_block(samples)
             
-            # Vectorized soft limiter logic
-            # No limiting needed if below threshold
-            limited_samples = filtered_samples.copy()
+            # Apply soft limiter (vectorized, in place on the filter output)
+            abs_samples = np.abs(limited_samples)
             
             # Apply limiting only to samples above threshold
             needs_limiting = abs_samples > LIMITER_THRESHOLD
-            if np.any(needs_limiting):
+            if needs_limiting.any():
                 excess = abs_samples[needs_limiting] - LIMITER_THRESHOLD
                 compressed_excess = excess / LIMITER_RATIO
                 limited_abs = LIMITER_THRESHOLD + compressed_excess
                 # Preserve sign
-                limited_samples[needs_limiting] = np.sign(filtered_samples[needs_limiting]) * limited_abs
+                limited_samples[needs_limiting] = np.sign(limited_samples[needs_limiting]) * limited_abs
             
             # Convert back to int16
-            processed_samples = np.clip(limited_samples, -32768, 32767).astype(np.int16)
-            pcm16_processed = processed_samples.tobytes()
+            np.clip(limited_samples, -32768, 32767, out=limited_samples)
+            processed_samples = limited_samples.astype(np.int16)
             
             # ═══════════════════════════════════════════════════════════════════════
-            # STEP 3: PCM16 → μ-law (encode)
+            # STEP 3: PCM16 → μ-law (encode via 65536-entry table)
             # ═══════════════════════════════════════════════════════════════════════
-            mulaw_processed = audioop.lin2ulaw(pcm16_processed, 2)
+            mulaw_processed = MULAW_ENCODE_TABLE[processed_samples.view(np.uint16)].tobytes()
             
             # ═══════════════════════════════════════════════════════════════════════
             # LOGGING: RMS before/after (rate-limited to once per 10 seconds)
             # 🔥 PRODUCTION: This will NOT log at all (DEBUG level)
             # ═══════════════════════════════════════════════════════════════════════
             if logger.isEnabledFor(logging.DEBUG) and rl.every("dsp_rms", RMS_LOG_INTERVAL_SEC):
-                rms_before = self._calculate_rms(pcm16_data)
-                rms_after = self._calculate_rms(pcm16_processed)
+                rms_before = self._calculate_rms(pcm16_in.tobytes())
+                rms_after = self._calculate_rms(processed_samples.tobytes())
                 logger.debug(f"[DSP] RMS: before={rms_before:.1f}, after={rms_after:.1f}, delta={rms_after-rms_before:.1f}")
             
             return mulaw_processed
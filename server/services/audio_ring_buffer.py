@@ -0,0 +1,390 @@
+"""
+Preallocated per-call audio buffers - no per-frame allocation on the media path
+
+Two structures used by MediaStreamHandler:
+
+1. PCMRingBuffer - inbound utterance audio (VAD / barge-in / STT fallback)
+   - Fixed capacity, allocated once per call
+   - Mirrored storage (2x capacity) so ANY window of up to `capacity` bytes is a
+     contiguous memoryview - zero-copy reads, no reassembly on wrap-around
+   - bytearray-compatible surface (extend / clear / len / bytes()) so it is a
+     drop-in for the previous `self.buf = bytearray()`
+
+2. FrameRingQueue - outbound TX frame queue (_tx_enqueue / _tx_loop)
+   - queue.Queue-compatible API (put / get / qsize / maxsize / queue.Full / queue.Empty)
+   - Preallocated slot ring, single lock, atomic drop-oldest put
+   - Awaitable get_async / put_async for consumers on the shared call loop
+     (CALLS_ENGINE_MODE=async); producers may stay on plain threads
+
+Both expose memory_stats() for per-call accounting ([CALL_METRICS]).
+"""
+import asyncio
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+class PCMRingBuffer:
+    """
+    Fixed-capacity byte ring with zero-copy windowed reads
+
+    When full, the oldest bytes are overwritten (real-time > past) and counted
+    in `bytes_overwritten`.
+
+    Usage:
+        buf = PCMRingBuffer(capacity=192000)   # 12s of PCM16 @ 8kHz
+        buf.extend(pcm16_frame)
+        last_500ms = buf.window(8000)          # memoryview, no copy
+        utterance = buf.snapshot()             # one copy, for hand-off to STT
+        buf.clear()
+    """
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self._capacity = capacity
+        # Mirrored layout: mem[i] == mem[i + capacity] for every i < capacity
+        self._mem = bytearray(capacity * 2)
+        self._view = memoryview(self._mem)
+        self._head = 0      # next write position, in [0, capacity)
+        self._size = 0      # valid bytes
+
+        # Accounting
+        self.bytes_written = 0
+        self.bytes_overwritten = 0
+        self.high_water = 0
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes allocated for this buffer"""
+        return len(self._mem)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __bytes__(self) -> bytes:
+        return self.snapshot()
+
+    def _write_segment(self, pos: int, data: memoryview) -> None:
+        """Write one non-wrapping segment into both mirror halves"""
+        end = pos + len(data)
+        self._view[pos:end] = data
+        self._view[pos + self._capacity:end + self._capacity] = data
+
+    def extend(self, data) -> None:
+        """Append bytes, overwriting the oldest data if capacity is exceeded"""
+        n = len(data)
+        if n == 0:
+            return
+        src = memoryview(data)
+        if src.format != "B" or src.ndim != 1:
+            src = src.cast("B")
+        cap = self._capacity
+        if n > cap:
+            # Only the newest `capacity` bytes can survive
+            self.bytes_overwritten += n - cap
+            self.bytes_written += n - cap
+            src = src[n - cap:]
+            n = cap
+
+        first = min(n, cap - self._head)
+        self._write_segment(self._head, src[:first])
+        if first < n:
+            self._write_segment(0, src[first:])
+
+        self._head = (self._head + n) % cap
+        self.bytes_written += n
+        overflow = self._size + n - cap
+        if overflow > 0:
+            self.bytes_overwritten += overflow
+            self._size = cap
+        else:
+            self._size += n
+        if self._size > self.high_water:
+            self.high_water = self._size
+
+    # bytearray-compatible alias
+    write = extend
+
+    def window(self, length: Optional[int] = None, end_offset: int = 0) -> memoryview:
+        """
+        Zero-copy view of buffered audio
+
+        Args:
+            length: Bytes to return (default: everything buffered)
+            end_offset: Bytes to skip from the newest end (0 = up to latest write)
+
+        Returns:
+            Read-only contiguous memoryview. Valid until the next extend()/clear().
+        """
+        available = self._size - end_offset
+        if available <= 0:
+            return self._view[0:0].toreadonly()
+        if length is None or length > available:
+            length = available
+        start = (self._head - end_offset - length) % self._capacity
+        return self._view[start:start + length].toreadonly()
+
+    def snapshot(self) -> bytes:
+        """Copy of all buffered audio (oldest → newest)"""
+        return bytes(self.window())
+
+    def clear(self) -> None:
+        """Drop buffered audio; storage is kept for reuse"""
+        self._head = 0
+        self._size = 0
+
+    def memory_stats(self) -> Dict[str, int]:
+        return {
+            "allocated_bytes": self.nbytes,
+            "capacity_bytes": self._capacity,
+            "used_bytes": self._size,
+            "high_water_bytes": self.high_water,
+            "bytes_written": self.bytes_written,
+            "bytes_overwritten": self.bytes_overwritten,
+        }
+
+
+class FrameRingQueue:
+    """
+    Bounded FIFO of outbound frames over a preallocated slot ring
+
+    Drop-in for `queue.Queue(maxsize=N)` on the TX path (put / put_nowait /
+    get / get_nowait / qsize / empty / full / maxsize), plus:
+    - put_drop_oldest(): atomic "evict oldest if full, then insert"
+    - clear(): drain in one lock acquisition
+    - get_async() / put_async(): awaitable variants for a single asyncio
+      consumer / producer; wake-ups from other threads use call_soon_threadsafe
+    - memory_stats(): depth, high-water, drops and queued payload bytes
+
+    Args:
+        maxsize: Number of slots (frames)
+        sizeof: Optional callable returning the payload size of an item, used
+                for queued-bytes accounting
+    """
+
+    def __init__(self, maxsize: int, sizeof: Optional[Callable[[Any], int]] = None):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self._slots = [None] * maxsize
+        self._head = 0      # next slot to read
+        self._count = 0
+        self._sizeof = sizeof
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        # (loop, future) of an awaiting get_async / put_async, if any
+        self._get_waiter = None
+        self._put_waiter = None
+
+        # Accounting
+        self.queued_bytes = 0
+        self.high_water = 0
+        self.total_put = 0
+        self.total_dropped = 0
+
+    # ── internal (lock held) ────────────────────────────────────────────────
+    def _push(self, item) -> None:
+        self._slots[(self._head + self._count) % self.maxsize] = item
+        self._count += 1
+        self.total_put += 1
+        if self._count > self.high_water:
+            self.high_water = self._count
+        if self._sizeof is not None:
+            self.queued_bytes += self._sizeof(item)
+        self._not_empty.notify()
+        if self._get_waiter is not None:
+            self._get_waiter = _wake_waiter(self._get_waiter)
+
+    def _pop(self):
+        item = self._slots[self._head]
+        self._slots[self._head] = None  # release reference
+        self._head = (self._head + 1) % self.maxsize
+        self._count -= 1
+        if self._sizeof is not None:
+            self.queued_bytes -= self._sizeof(item)
+        self._not_full.notify()
+        if self._put_waiter is not None:
+            self._put_waiter = _wake_waiter(self._put_waiter)
+        return item
+
+    # ── queue.Queue API ─────────────────────────────────────────────────────
+    def qsize(self) -> int:
+        return self._count
+
+    def empty(self) -> bool:
+        return self._count == 0
+
+    def full(self) -> bool:
+        return self._count >= self.maxsize
+
+    def put(self, item, block: bool = True, timeout: Optional[float] = None) -> None:
+        with self._not_full:
+            if self._count >= self.maxsize:
+                if not block:
+                    raise queue.Full
+                if timeout is None:
+                    while self._count >= self.maxsize:
+                        self._not_full.wait()
+                else:
+                    deadline = time.monotonic() + timeout
+                    while self._count >= self.maxsize:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise queue.Full
+                        self._not_full.wait(remaining)
+            self._push(item)
+
+    def put_nowait(self, item) -> None:
+        self.put(item, block=False)
+
+    def get(self, block: bool = True, timeout: Optional[float] = None):
+        with self._not_empty:
+            if self._count == 0:
+                if not block:
+                    raise queue.Empty
+                if timeout is None:
+                    while self._count == 0:
+                        self._not_empty.wait()
+                else:
+                    deadline = time.monotonic() + timeout
+                    while self._count == 0:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise queue.Empty
+                        self._not_empty.wait(remaining)
+            return self._pop()
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    # ── asyncio API ─────────────────────────────────────────────────────────
+    async def get_async(self, timeout: Optional[float] = None):
+        """
+        Awaitable get() - never blocks the event loop
+
+        Raises:
+            queue.Empty: nothing arrived within `timeout` seconds
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            with self._lock:
+                if self._count:
+                    return self._pop()
+                waiter = loop.create_future()
+                self._get_waiter = (loop, waiter)
+            if not await _wait_waiter(loop, waiter, deadline):
+                with self._lock:
+                    self._get_waiter = None
+                    if self._count:
+                        return self._pop()
+                raise queue.Empty
+
+    async def put_async(self, item, timeout: Optional[float] = None) -> None:
+        """
+        Awaitable put() - waits for a free slot without blocking the event loop
+
+        Raises:
+            queue.Full: no slot freed within `timeout` seconds
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            with self._lock:
+                if self._count < self.maxsize:
+                    self._push(item)
+                    return
+                waiter = loop.create_future()
+                self._put_waiter = (loop, waiter)
+            if not await _wait_waiter(loop, waiter, deadline):
+                with self._lock:
+                    self._put_waiter = None
+                    if self._count < self.maxsize:
+                        self._push(item)
+                        return
+                raise queue.Full
+
+    # ── extensions ──────────────────────────────────────────────────────────
+    def put_drop_oldest(self, item) -> bool:
+        """
+        Insert without blocking; evict the oldest frame if the ring is full
+
+        Returns:
+            True if a frame was dropped to make room
+        """
+        with self._lock:
+            dropped = False
+            if self._count >= self.maxsize:
+                self._pop()
+                self.total_dropped += 1
+                dropped = True
+            self._push(item)
+            return dropped
+
+    def clear(self) -> int:
+        """Drop all queued frames; returns how many were dropped"""
+        with self._lock:
+            cleared = self._count
+            while self._count:
+                self._pop()
+            return cleared
+
+    def memory_stats(self) -> Dict[str, int]:
+        return {
+            "slots": self.maxsize,
+            "depth": self._count,
+            "high_water": self.high_water,
+            "queued_bytes": self.queued_bytes,
+            "total_put": self.total_put,
+            "total_dropped": self.total_dropped,
+        }
+
+
+def _wake_waiter(waiter) -> None:
+    """Resolve an async waiter from any thread (lock held); returns None to clear the slot"""
+    loop, fut = waiter
+    try:
+        loop.call_soon_threadsafe(_resolve_future, fut)
+    except RuntimeError:
+        pass  # loop already closed
+    return None
+
+
+def _resolve_future(fut) -> None:
+    if not fut.done():
+        fut.set_result(None)
+
+
+async def _wait_waiter(loop, fut, deadline) -> bool:
+    """Await a waiter future until `deadline` (loop.time()); False on timeout"""
+    if deadline is None:
+        await fut
+        return True
+    remaining = deadline - loop.time()
+    if remaining <= 0:
+        return False
+    handle = loop.call_at(deadline, _resolve_future, fut)
+    try:
+        await fut
+    finally:
+        handle.cancel()
+    return loop.time() < deadline
+
+
+def tx_item_size(item) -> int:
+    """Payload size of a TX queue item (base64 media payload length, 0 for control events)"""
+    if not isinstance(item, dict):
+        return 0
+    payload = item.get("payload")
+    if payload is None:
+        media = item.get("media")
+        if isinstance(media, dict):
+            payload = media.get("payload")
+    return len(payload) if payload else 0
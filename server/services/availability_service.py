@@ -0,0 +1,381 @@
+"""
+Availability Engine - interval index over booked appointments
+
+Slot search used to load every appointment of the day and rescan the whole list
+(localizing each row) for every candidate slot it tried. Instead:
+
+- BusyIndex: the day's appointments merged into sorted, disjoint busy intervals
+  (minutes from midnight, business-local) - a conflict check is one bisect
+- Free start ranges per (opening windows, duration) are derived once per index,
+  so "N nearest free slots to T" is a bisect plus N steps along the slot grid
+- Indexes are cached per (business, calendar, day) in the "availability" cache
+  (utils/cache.py: LRU + Redis L2 + cross-process invalidation)
+- Any committed insert/update/delete of an Appointment drops the business's
+  indexes (register_availability_listeners, called from create_app)
+
+⏰ Appointment datetimes are NAIVE business-local time, like the rest of the DB.
+"""
+import heapq
+import logging
+import math
+from bisect import bisect_left, bisect_right
+from datetime import date as date_type, datetime, timedelta
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import pytz
+
+from server.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+DAY_MINUTES = 24 * 60
+BUSY_STATUSES = ('scheduled', 'confirmed')
+
+# Invalidation is event-driven; the TTL only bounds staleness for writes that
+# bypass the ORM (raw SQL, bulk updates)
+AVAILABILITY_CACHE_TTL = 300
+AVAILABILITY_CACHE_MAX_SIZE = 5000
+
+WEEKDAY_KEYS = {0: "mon", 1: "tue", 2: "wed", 3: "thu", 4: "fri", 5: "sat", 6: "sun"}
+
+_availability_cache = TTLCache(
+    ttl_seconds=AVAILABILITY_CACHE_TTL,
+    max_size=AVAILABILITY_CACHE_MAX_SIZE,
+    name="availability",
+    l2=True,
+)
+
+Window = Tuple[int, int]
+
+
+class BusyIndex:
+    """
+    Booked time of one day as sorted, disjoint [start, end) minute intervals
+
+    Overlapping and touching appointments are merged on build, so both
+    `starts` and `ends` are strictly increasing and bisectable.
+    """
+
+    __slots__ = ('starts', 'ends', '_ranges')
+
+    def __init__(self, intervals: Iterable[Tuple[float, float]] = ()):
+        self.starts: List[float] = []
+        self.ends: List[float] = []
+        for start, end in sorted((max(0, s), min(DAY_MINUTES, e)) for s, e in intervals):
+            if end <= start:
+                continue
+            if self.ends and start <= self.ends[-1]:
+                self.ends[-1] = max(self.ends[-1], end)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+        self._ranges: Dict[Tuple, List[Tuple[int, int]]] = {}
+
+    def __getstate__(self):
+        # Derived ranges are rebuilt lazily - keep the L2 payload small
+        return self.starts, self.ends
+
+    def __setstate__(self, state):
+        self.starts, self.ends = state
+        self._ranges = {}
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @classmethod
+    def from_datetimes(cls, rows: Iterable[Tuple[datetime, datetime]], day_start: datetime) -> 'BusyIndex':
+        """Build from naive (start, end) pairs; intervals are clipped to the day"""
+        return cls(
+            ((start - day_start).total_seconds() / 60, (end - day_start).total_seconds() / 60)
+            for start, end in rows
+        )
+
+    def is_free(self, start: float, end: float) -> bool:
+        """True if [start, end) overlaps no busy interval"""
+        i = bisect_right(self.ends, start)  # first interval ending after `start`
+        return i == len(self.starts) or self.starts[i] >= end
+
+    def start_ranges(self, windows: Sequence[Window], duration: int) -> List[Tuple[int, int]]:
+        """
+        Sorted, disjoint [lo, hi] ranges of minutes at which a `duration`-minute
+        slot can start: inside a single opening window and clear of every
+        busy interval. Cached per (windows, duration).
+        """
+        cache_key = (tuple(windows), duration)
+        ranges = self._ranges.get(cache_key)
+        if ranges is not None:
+            return ranges
+
+        spans = []
+        for w_start, w_end in windows:
+            cursor = w_start
+            i = bisect_right(self.ends, w_start)
+            while cursor < w_end:
+                gap_end = w_end if i == len(self.starts) else min(w_end, self.starts[i])
+                lo, hi = math.ceil(cursor), math.floor(gap_end - duration)
+                if hi >= lo:
+                    spans.append((lo, hi))
+                if i == len(self.starts):
+                    break
+                cursor = self.ends[i]
+                i += 1
+
+        ranges = []
+        for lo, hi in sorted(spans):
+            if ranges and lo <= ranges[-1][1]:
+                ranges[-1] = (ranges[-1][0], max(ranges[-1][1], hi))
+            else:
+                ranges.append((lo, hi))
+        self._ranges[cache_key] = ranges
+        return ranges
+
+    def iter_slots_forward(self, windows: Sequence[Window], duration: int, slot_size: int,
+                           start_at: float = 0) -> Iterator[int]:
+        """Free grid-aligned slot starts >= start_at, ascending"""
+        ranges = self.start_ranges(windows, duration)
+        i = max(0, bisect_right(ranges, (math.ceil(start_at), DAY_MINUTES)) - 1)
+        for lo, hi in ranges[i:]:
+            minute = -(-max(lo, start_at) // slot_size) * slot_size
+            while minute <= hi:
+                yield int(minute)
+                minute += slot_size
+
+    def iter_slots_backward(self, windows: Sequence[Window], duration: int, slot_size: int,
+                            before: float, earliest: float = 0) -> Iterator[int]:
+        """Free grid-aligned slot starts < before (and >= earliest), descending"""
+        ranges = self.start_ranges(windows, duration)
+        i = bisect_left(ranges, (math.ceil(before), -1))
+        for lo, hi in reversed(ranges[:i]):
+            floor = max(lo, earliest)
+            minute = (min(hi, math.ceil(before) - 1) // slot_size) * slot_size
+            while minute >= floor:
+                yield int(minute)
+                minute -= slot_size
+            if hi < earliest:
+                return
+
+    def nearest_slots(self, target: float, duration: int, slot_size: int, windows: Sequence[Window],
+                      count: int = 2, earliest: float = 0) -> List[int]:
+        """
+        The `count` free slot starts closest to `target` (minutes from midnight),
+        ordered by distance - earlier first on ties. Starts before `earliest`
+        (minimum notice) are never returned.
+        """
+        forward = self.iter_slots_forward(windows, duration, slot_size, max(target, earliest))
+        backward = self.iter_slots_backward(windows, duration, slot_size, target, earliest)
+        merged = heapq.merge(forward, backward, key=lambda m: (abs(m - target), m - target))
+        return list(islice(merged, count))
+
+
+# ─── Policy helpers ──────────────────────────────────────
+
+def _parse_hhmm(value: str) -> int:
+    hour, minute = map(int, value.split(':'))
+    return hour * 60 + minute
+
+
+def opening_windows(policy, day: date_type) -> Tuple[Window, ...]:
+    """Opening windows for `day` as (start_min, end_min); the whole day when 24/7"""
+    if policy.allow_24_7:
+        return ((0, DAY_MINUTES),)
+    windows = []
+    for window in policy.opening_hours.get(WEEKDAY_KEYS[day.weekday()], []):
+        if not window or len(window) < 2:
+            continue
+        try:
+            windows.append((_parse_hhmm(window[0]), _parse_hhmm(window[1])))
+        except (ValueError, AttributeError):
+            logger.warning(f"[AVAILABILITY] Ignoring malformed opening window {window!r}")
+    return tuple(sorted(windows))
+
+
+def _local_now(policy, now: Optional[datetime]) -> datetime:
+    business_tz = pytz.timezone(policy.tz)
+    if now is None:
+        return datetime.now(business_tz).replace(tzinfo=None)
+    if now.tzinfo is not None:
+        return now.astimezone(business_tz).replace(tzinfo=None)
+    return now
+
+
+def _earliest_minute(policy, day: date_type, now: datetime) -> Optional[float]:
+    """Earliest bookable minute of `day` under min_notice; None if the day is over"""
+    earliest = now + timedelta(minutes=policy.min_notice_min)
+    if earliest.date() < day:
+        return 0
+    if earliest.date() > day:
+        return None
+    return earliest.hour * 60 + earliest.minute + (earliest.second + earliest.microsecond / 1e6) / 60
+
+
+# ─── Loading + cache ─────────────────────────────────────
+
+def _cache_key(business_id: int, calendar_id: Optional[int], day: date_type) -> str:
+    return f"{business_id}:{calendar_id or '*'}:{day.isoformat()}"
+
+
+def _to_local_naive(value: datetime, business_tz) -> datetime:
+    return value.astimezone(business_tz).replace(tzinfo=None) if value.tzinfo is not None else value
+
+
+def load_busy_indexes(business_id: int, days: Sequence[date_type], calendar_id: Optional[int] = None,
+                      tz: str = "Asia/Jerusalem") -> Dict[date_type, BusyIndex]:
+    """One query for the whole span of `days`, split into per-day indexes"""
+    from server.models_sql import Appointment
+
+    business_tz = pytz.timezone(tz)
+    first = datetime.combine(min(days), datetime.min.time())
+    last = datetime.combine(max(days), datetime.min.time()) + timedelta(days=1)
+
+    query = Appointment.query.with_entities(Appointment.start_time, Appointment.end_time).filter(
+        Appointment.business_id == business_id,
+        Appointment.start_time < last,
+        Appointment.end_time > first,
+        Appointment.status.in_(BUSY_STATUSES)
+    )
+    if calendar_id:
+        query = query.filter(Appointment.calendar_id == calendar_id)
+
+    by_day: Dict[date_type, List[Tuple[datetime, datetime]]] = {day: [] for day in days}
+    for start, end in query.all():
+        start, end = _to_local_naive(start, business_tz), _to_local_naive(end, business_tz)
+        day = start.date()
+        while day <= end.date():  # multi-day appointments block every day they touch
+            if day in by_day:
+                by_day[day].append((start, end))
+            day += timedelta(days=1)
+
+    return {
+        day: BusyIndex.from_datetimes(rows, datetime.combine(day, datetime.min.time()))
+        for day, rows in by_day.items()
+    }
+
+
+def get_busy_indexes(business_id: int, days: Sequence[date_type], calendar_id: Optional[int] = None,
+                     tz: str = "Asia/Jerusalem") -> Dict[date_type, BusyIndex]:
+    """Cached indexes for `days`; all misses are loaded with a single query"""
+    indexes = {}
+    missing = []
+    for day in days:
+        index = _availability_cache.get(_cache_key(business_id, calendar_id, day))
+        if index is None:
+            missing.append(day)
+        else:
+            indexes[day] = index
+    if missing:
+        loaded = load_busy_indexes(business_id, missing, calendar_id, tz)
+        for day, index in loaded.items():
+            _availability_cache.set(_cache_key(business_id, calendar_id, day), index)
+        indexes.update(loaded)
+    return indexes
+
+
+def get_busy_index(business_id: int, day: date_type, calendar_id: Optional[int] = None,
+                   tz: str = "Asia/Jerusalem") -> BusyIndex:
+    return _availability_cache.get_or_load(
+        _cache_key(business_id, calendar_id, day),
+        lambda: load_busy_indexes(business_id, [day], calendar_id, tz)[day]
+    )
+
+
+def invalidate_availability(business_id: int) -> int:
+    """Drop every cached index of a business (all calendars, all days)"""
+    return _availability_cache.delete_prefix(f"{business_id}:")
+
+
+# ─── Queries ─────────────────────────────────────────────
+
+def find_nearest_slots(business_id: int, day: date_type, duration_min: int, policy,
+                       target_minute: Optional[int] = None, count: int = 2,
+                       calendar_id: Optional[int] = None, now: Optional[datetime] = None) -> List[int]:
+    """
+    The `count` free slot starts (minutes from midnight) on `day` closest to
+    `target_minute`, honouring opening hours, slot grid and minimum notice.
+    Without a target the earliest bookable slots are returned, in order.
+    """
+    now = _local_now(policy, now)
+    earliest = _earliest_minute(policy, day, now)
+    windows = opening_windows(policy, day)
+    if earliest is None or not windows:
+        return []
+    index = get_busy_index(business_id, day, calendar_id, policy.tz)
+    if target_minute is None:
+        return list(islice(index.iter_slots_forward(windows, duration_min, policy.slot_size_min, earliest), count))
+    return index.nearest_slots(target_minute, duration_min, policy.slot_size_min, windows, count, earliest)
+
+
+def find_slots_in_range(business_id: int, start_day: date_type, days: int, duration_min: int, policy,
+                        count: int = 5, calendar_id: Optional[int] = None,
+                        now: Optional[datetime] = None) -> List[Tuple[date_type, int]]:
+    """
+    The first `count` free slots from `start_day` over `days` days, as
+    (day, minute) pairs in chronological order. Clamped to the booking window.
+    """
+    now = _local_now(policy, now)
+    last_day = min(start_day + timedelta(days=days - 1), now.date() + timedelta(days=policy.booking_window_days))
+    candidates = []
+    day = max(start_day, now.date())
+    while day <= last_day:
+        candidates.append(day)
+        day += timedelta(days=1)
+    if not candidates:
+        return []
+
+    indexes = get_busy_indexes(business_id, candidates, calendar_id, policy.tz)
+    found = []
+    for day in candidates:
+        earliest = _earliest_minute(policy, day, now)
+        windows = opening_windows(policy, day)
+        if earliest is None or not windows:
+            continue
+        slots = indexes[day].iter_slots_forward(windows, duration_min, policy.slot_size_min, earliest)
+        found.extend((day, minute) for minute in islice(slots, count - len(found)))
+        if len(found) >= count:
+            break
+    return found
+
+
+# ─── Invalidation ────────────────────────────────────────
+
+_SESSION_INFO_KEY = 'availability_dirty_businesses'
+_listeners_registered = False
+
+
+def _mark_dirty(mapper, connection, target):
+    from sqlalchemy.orm import object_session
+    session = object_session(target)
+    if session is not None and target.business_id is not None:
+        session.info.setdefault(_SESSION_INFO_KEY, set()).add(target.business_id)
+
+
+def _after_commit(session):
+    for business_id in session.info.pop(_SESSION_INFO_KEY, ()):
+        try:
+            invalidate_availability(business_id)
+        except Exception as e:
+            logger.warning(f"[AVAILABILITY] Failed to invalidate business {business_id}: {e}")
+
+
+def _after_rollback(session):
+    session.info.pop(_SESSION_INFO_KEY, None)
+
+
+def register_availability_listeners() -> bool:
+    """
+    Invalidate a business's indexes after any commit that inserted, updated or
+    deleted one of its appointments. Idempotent.
+    """
+    global _listeners_registered
+    if _listeners_registered:
+        return False
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session
+    from server.models_sql import Appointment
+
+    for name in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(Appointment, name, _mark_dirty)
+    event.listen(Session, 'after_commit', _after_commit)
+    event.listen(Session, 'after_rollback', _after_rollback)
+    _listeners_registered = True
+    return True
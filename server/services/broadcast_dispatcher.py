@@ -0,0 +1,607 @@
+"""
+WhatsApp Broadcast Dispatcher - concurrent, rate-shaped campaign sending
+
+BroadcastWorker used to load every queued recipient with .all(), send them one
+by one with a 3-4s sleep and refresh the broadcast row before every message -
+a 10k campaign held a broadcasts worker for ~10 hours. The dispatcher:
+
+- Claims recipients in pages with FOR UPDATE SKIP LOCKED (queued → processing),
+  so any number of RQ jobs can work the same campaign without double sends
+- Shapes throughput with token buckets in Redis, shared by every worker:
+  Baileys → per tenant (the WhatsApp number) + per shard, Meta → per tenant
+- Sends concurrently (BROADCAST_SEND_CONCURRENCY threads per worker)
+- Writes results in bulk: one executemany UPDATE per page, atomic counter
+  increments on the campaign row, history rows added in the same flush
+- Caches the stop flag in Redis (set by /broadcasts/<id>/stop) and only falls
+  back to the DB every STOP_DB_CHECK_SECONDS
+
+Delivery is at-least-once: recipients left in 'processing' by a crashed worker
+are re-queued when a job starts and no other worker holds a live lease.
+"""
+import base64
+import logging
+import math
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import text, update
+
+from server.config import (
+    BROADCAST_BAILEYS_SHARD_RATE,
+    BROADCAST_BAILEYS_TENANT_RATE,
+    BROADCAST_CLAIM_BATCH,
+    BROADCAST_META_TENANT_RATE,
+    BROADCAST_SEND_CONCURRENCY,
+)
+from server.db import db
+from server.models_sql import Attachment, Business, WhatsAppBroadcast, WhatsAppBroadcastRecipient, WhatsAppMessage
+
+logger = logging.getLogger(__name__)
+
+STOP_KEY = "broadcast:stop:{broadcast_id}"
+WORKERS_KEY = "broadcast:workers:{broadcast_id}"
+STOP_FLAG_TTL = 7 * 24 * 3600
+STOP_CACHE_SECONDS = 1.0       # how stale the cached Redis stop flag may be
+STOP_DB_CHECK_SECONDS = 15.0   # DB fallback (flag set while Redis was down)
+WORKER_LEASE_SECONDS = 300     # a worker that stops heartbeating is considered dead
+PAGE_SECONDS = 30.0            # claim at most ~30s of sending per page
+MAX_WAIT_SLICE = 1.0           # re-check the stop flag while waiting for a token
+MAX_RETRIES = 3
+BACKOFF_DELAYS = [1, 3, 10]    # seconds between send attempts
+SENT_STATUSES = ('sent', 'queued', 'accepted')
+TOKEN_EPSILON = 1e-9
+
+# Atomic multi-bucket token acquisition: either every bucket gives a token or
+# none is touched. Returns the seconds to wait (as a string, Lua numbers are
+# truncated to integers in replies) - "0" means the tokens were taken.
+# KEYS: bucket hashes, ARGV: rate1, burst1, rate2, burst2, ...
+_TOKEN_BUCKET_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local wait = 0
+local levels = {}
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[2 * i - 1])
+    local burst = tonumber(ARGV[2 * i])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local level = tonumber(state[1]) or burst
+    local ts = tonumber(state[2]) or now
+    level = math.min(burst, level + math.max(0, now - ts) * rate)
+    levels[i] = level
+    if level < 1 - 1e-9 then
+        wait = math.max(wait, (1 - level) / rate)
+    end
+end
+if wait == 0 then
+    for i, key in ipairs(KEYS) do
+        local rate = tonumber(ARGV[2 * i - 1])
+        local burst = tonumber(ARGV[2 * i])
+        redis.call('HSET', key, 'tokens', levels[i] - 1, 'ts', now)
+        redis.call('EXPIRE', key, math.ceil(burst / rate) + 60)
+    end
+end
+return tostring(wait)
+"""
+
+
+@dataclass(frozen=True)
+class RateBucket:
+    """Token bucket spec: `rate` tokens/sec, at most `burst` tokens saved up"""
+    key: str
+    rate: float
+    burst: float = 1.0
+
+
+def rate_buckets_for(provider: str, business_id: int, shard_id: int) -> List[RateBucket]:
+    """Buckets a single send must take a token from"""
+    if provider == 'meta':
+        return [
+            RateBucket(f"wa_rate:meta:{business_id}", BROADCAST_META_TENANT_RATE,
+                       burst=max(1.0, BROADCAST_META_TENANT_RATE)),
+        ]
+    return [
+        # burst=1: no catch-up bursts on a WhatsApp number
+        RateBucket(f"wa_rate:baileys:tenant:{business_id}", BROADCAST_BAILEYS_TENANT_RATE),
+        RateBucket(f"wa_rate:baileys:shard:{shard_id}", BROADCAST_BAILEYS_SHARD_RATE,
+                   burst=max(1.0, BROADCAST_BAILEYS_SHARD_RATE)),
+    ]
+
+
+class TokenBucket:
+    """In-process token bucket (same math as the Redis script)"""
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.ts = now
+
+    def refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + max(0.0, now - self.ts) * self.rate)
+        self.ts = now
+
+    def wait_time(self) -> float:
+        # Tolerance: refill arithmetic can land a hair below a whole token
+        return 0.0 if self.tokens >= 1 - TOKEN_EPSILON else (1 - self.tokens) / self.rate
+
+
+class LocalRateLimiter:
+    """Fallback when Redis is unavailable - only limits this process"""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def try_acquire(self, buckets: List[RateBucket]) -> float:
+        """Take one token from every bucket, or none. Returns seconds to wait (0 = acquired)"""
+        with self._lock:
+            now = self._clock()
+            states = []
+            for spec in buckets:
+                bucket = self._buckets.get(spec.key)
+                if bucket is None:
+                    bucket = self._buckets[spec.key] = TokenBucket(spec.rate, spec.burst, now)
+                bucket.rate, bucket.burst = spec.rate, spec.burst
+                bucket.refill(now)
+                states.append(bucket)
+            wait = max((b.wait_time() for b in states), default=0.0)
+            if wait == 0:
+                for bucket in states:
+                    bucket.tokens -= 1
+            return wait
+
+
+class RedisRateLimiter:
+    """Token buckets shared by all workers (see _TOKEN_BUCKET_LUA)"""
+
+    def __init__(self, redis_conn):
+        self._script = redis_conn.register_script(_TOKEN_BUCKET_LUA)
+
+    def try_acquire(self, buckets: List[RateBucket]) -> float:
+        args = []
+        for spec in buckets:
+            args += [spec.rate, spec.burst]
+        return float(self._script(keys=[spec.key for spec in buckets], args=args))
+
+
+def request_broadcast_stop(broadcast_id: int):
+    """Set the Redis stop flag so running workers stop within ~1s (DB cancel_requested stays SSOT)"""
+    try:
+        from server.services.jobs import get_redis
+        get_redis().set(STOP_KEY.format(broadcast_id=broadcast_id), 1, ex=STOP_FLAG_TTL)
+    except Exception as e:
+        logger.warning(f"[WA_BROADCAST] broadcast_id={broadcast_id} could not set Redis stop flag: {e}")
+
+
+class StopFlag:
+    """Stop flag with a cached Redis check and a rate-limited DB fallback"""
+
+    def __init__(self, broadcast_id: int, redis_conn, db_check: Callable[[], bool],
+                 clock: Callable[[], float] = time.monotonic):
+        self._key = STOP_KEY.format(broadcast_id=broadcast_id)
+        self._redis = redis_conn
+        self._db_check = db_check
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._redis_checked = float('-inf')
+        self._db_checked = clock()
+
+    def is_set(self, check_db: bool = False) -> bool:
+        """Cheap enough to call before every send; check_db only from the app-context owner thread"""
+        if self._stopped:
+            return True
+        with self._lock:
+            now = self._clock()
+            if self._redis is not None and now - self._redis_checked >= STOP_CACHE_SECONDS:
+                self._redis_checked = now
+                try:
+                    self._stopped = bool(self._redis.exists(self._key))
+                except Exception as e:
+                    logger.debug(f"[WA_BROADCAST] stop flag check failed: {e}")
+            if not self._stopped and check_db and now - self._db_checked >= STOP_DB_CHECK_SECONDS:
+                self._db_checked = now
+                self._stopped = self._db_check()
+            return self._stopped
+
+
+@dataclass
+class SendResult:
+    recipient_id: int
+    phone: str
+    status: str  # sent | failed | queued (not attempted - stop requested)
+    message_id: Optional[str] = None
+    error_message: Optional[str] = None
+    sent_at: Optional[datetime] = None
+
+
+def page_size(buckets: List[RateBucket], claim_batch: int = BROADCAST_CLAIM_BATCH) -> int:
+    """Recipients per claim: about PAGE_SECONDS of sending at the bottleneck rate"""
+    bottleneck = min((b.rate for b in buckets), default=1.0)
+    return max(1, min(claim_batch, int(math.ceil(bottleneck * PAGE_SECONDS))))
+
+
+def _media_type_for(mimetype: Optional[str]) -> str:
+    if mimetype:
+        if mimetype.startswith('image/'):
+            return 'image'
+        if mimetype.startswith('video/'):
+            return 'video'
+        if mimetype.startswith('audio/'):
+            return 'audio'
+        return 'document'
+    return 'image'
+
+
+def load_broadcast_media(broadcast: WhatsAppBroadcast):
+    """
+    Load the campaign attachment once (not per recipient)
+
+    Returns:
+        (media dict for send_message or None, media_type)
+    """
+    attachment_id = None
+    if broadcast.audience_filter and isinstance(broadcast.audience_filter, dict):
+        attachment_id = broadcast.audience_filter.get('attachment_id')
+    if not attachment_id:
+        return None, None
+
+    # 🔥 For R2 storage, download bytes instead of relying on signed URLs (no URL expiration issues)
+    try:
+        from server.services.attachment_service import get_attachment_service
+        attachment = Attachment.query.get(attachment_id)
+        if not attachment or not attachment.storage_path:
+            return None, None
+        filename, mimetype, data = get_attachment_service().open_file(
+            storage_key=attachment.storage_path,
+            filename=attachment.filename_original,
+            mime_type=attachment.mime_type
+        )
+    except Exception as e:
+        logger.error(f"[WA_BROADCAST] broadcast_id={broadcast.id} failed to load attachment bytes: {e}")
+        return None, None  # Continue without media
+
+    if not data:
+        return None, None
+    media_type = _media_type_for(mimetype)
+    logger.info(f"[WA_BROADCAST] broadcast_id={broadcast.id} loaded attachment {filename} ({len(data)} bytes, {media_type})")
+    return {
+        'data': base64.b64encode(data).decode('utf-8'),
+        'mimetype': mimetype or 'application/octet-stream',
+        'filename': filename or 'attachment'
+    }, media_type
+
+
+class BroadcastDispatcher:
+    """
+    Send one campaign's recipients until drained, stopped or `max_runtime` elapsed
+
+    Must be created inside an app context. Safe to run in several processes at
+    once for the same broadcast.
+    """
+
+    def __init__(self, broadcast_id: int, max_runtime: Optional[float] = None,
+                 concurrency: int = BROADCAST_SEND_CONCURRENCY, claim_batch: int = BROADCAST_CLAIM_BATCH,
+                 redis_conn=None, limiter=None):
+        from flask import current_app
+        self.broadcast_id = broadcast_id
+        self.max_runtime = max_runtime
+        self.concurrency = max(1, concurrency)
+        self.claim_batch = claim_batch
+        self.worker_id = uuid.uuid4().hex[:12]
+        self.app = current_app._get_current_object()
+        self.redis = redis_conn if redis_conn is not None else self._connect_redis()
+        self.limiter = limiter or (RedisRateLimiter(self.redis) if self.redis is not None else LocalRateLimiter())
+        self.stop = StopFlag(broadcast_id, self.redis, self._db_stop_requested)
+        self.totals = {'sent': 0, 'failed': 0}
+
+    @staticmethod
+    def _connect_redis():
+        try:
+            from server.services.jobs import get_redis
+            conn = get_redis()
+            conn.ping()
+            return conn
+        except Exception as e:
+            logger.warning(f"[WA_BROADCAST] Redis unavailable - per-process rate limits only: {e}")
+            return None
+
+    # ── lifecycle ──────────────────────────────────────────
+
+    def run(self) -> Dict:
+        """
+        Returns:
+            dict with outcome: completed | cancelled | continue (runtime cap, work left)
+            | idle (nothing to claim, other workers still sending) | not_found
+        """
+        broadcast = WhatsAppBroadcast.query.get(self.broadcast_id)
+        if not broadcast:
+            return {'outcome': 'not_found'}
+
+        business = Business.query.get(broadcast.business_id)
+        from server.whatsapp_shard_router import get_shard_id
+        shard_id = get_shard_id(broadcast.business_id, business.whatsapp_shard if business else None)
+        buckets = rate_buckets_for(broadcast.provider or 'baileys', broadcast.business_id, shard_id)
+        page = page_size(buckets, self.claim_batch)
+        media, media_type = load_broadcast_media(broadcast)
+        campaign = {
+            'business_id': broadcast.business_id,
+            'provider': broadcast.provider or 'baileys',
+            'message_type': broadcast.message_type,
+            'text': broadcast.message_text or '',
+            'media': media,
+            'media_type': media_type,
+        }
+        db.session.commit()  # end the read transaction before long-running sends
+
+        self._join()
+        logger.info(
+            f"[WA_BROADCAST] broadcast_id={self.broadcast_id} worker={self.worker_id} provider={campaign['provider']} "
+            f"shard={shard_id} rates={[(b.key, b.rate) for b in buckets]} page={page} concurrency={self.concurrency}"
+        )
+
+        start = time.monotonic()
+        outcome = 'drained'
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='wa-broadcast') as pool:
+                while True:
+                    if self.stop.is_set(check_db=True):
+                        outcome = 'cancelled'
+                        break
+                    if self.max_runtime and time.monotonic() - start > self.max_runtime:
+                        outcome = 'continue'
+                        break
+                    claimed = self._claim(page)
+                    if not claimed:
+                        break
+                    results = list(pool.map(lambda r: self._send(r, campaign, buckets), claimed))
+                    self._flush(results, campaign)
+                    self._heartbeat()
+        finally:
+            self._leave()
+
+        return self._finish(outcome)
+
+    def _join(self):
+        """Register this worker; re-queue orphaned claims when no other worker is alive"""
+        peers = 0
+        if self.redis is not None:
+            key = WORKERS_KEY.format(broadcast_id=self.broadcast_id)
+            now = time.time()
+            try:
+                pipe = self.redis.pipeline()
+                pipe.zremrangebyscore(key, 0, now - WORKER_LEASE_SECONDS)
+                pipe.zadd(key, {self.worker_id: now})
+                pipe.expire(key, WORKER_LEASE_SECONDS * 2)
+                pipe.zcard(key)
+                peers = pipe.execute()[-1] - 1
+            except Exception as e:
+                logger.warning(f"[WA_BROADCAST] worker lease failed: {e}")
+                peers = 1  # unknown - don't touch claims that may belong to a live worker
+        if peers == 0:
+            requeued = db.session.execute(
+                update(WhatsAppBroadcastRecipient)
+                .where(WhatsAppBroadcastRecipient.broadcast_id == self.broadcast_id,
+                       WhatsAppBroadcastRecipient.status == 'processing')
+                .values(status='queued')
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.session.commit()
+            if requeued:
+                logger.warning(f"[WA_BROADCAST] broadcast_id={self.broadcast_id} re-queued {requeued} orphaned recipients")
+
+    def _heartbeat(self):
+        if self.redis is not None:
+            try:
+                self.redis.zadd(WORKERS_KEY.format(broadcast_id=self.broadcast_id), {self.worker_id: time.time()})
+            except Exception:
+                pass
+
+    def _leave(self):
+        if self.redis is not None:
+            try:
+                self.redis.zrem(WORKERS_KEY.format(broadcast_id=self.broadcast_id), self.worker_id)
+            except Exception:
+                pass
+
+    def _db_stop_requested(self) -> bool:
+        row = db.session.query(WhatsAppBroadcast.cancel_requested, WhatsAppBroadcast.status).filter(
+            WhatsAppBroadcast.id == self.broadcast_id
+        ).first()
+        db.session.commit()
+        return bool(row and (row.cancel_requested or row.status in ('stopped', 'cancelled')))
+
+    # ── claiming / sending ─────────────────────────────────
+
+    def _claim(self, limit: int) -> List[tuple]:
+        """Claim the next page of queued recipients (skips rows other workers hold)"""
+        rows = db.session.execute(text("""
+            UPDATE whatsapp_broadcast_recipients SET status = 'processing'
+            WHERE id IN (
+                SELECT id FROM whatsapp_broadcast_recipients
+                WHERE broadcast_id = :broadcast_id AND status = 'queued'
+                ORDER BY id
+                LIMIT :limit
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id, phone
+        """), {'broadcast_id': self.broadcast_id, 'limit': limit}).fetchall()
+        db.session.commit()
+        return sorted((row.id, row.phone) for row in rows)
+
+    def _acquire_token(self, buckets: List[RateBucket]) -> bool:
+        """Block until every bucket gives a token. False if a stop was requested meanwhile"""
+        while not self.stop.is_set():
+            try:
+                wait = self.limiter.try_acquire(buckets)
+            except Exception as e:
+                logger.warning(f"[WA_BROADCAST] rate limiter error, falling back to local buckets: {e}")
+                self.limiter = LocalRateLimiter()
+                continue
+            if wait <= 0:
+                return True
+            # Slight jitter so concurrent waiters don't retry in lockstep
+            time.sleep(min(wait, MAX_WAIT_SLICE) * random.uniform(1.0, 1.2))
+        return False
+
+    def _send(self, claimed: tuple, campaign: Dict, buckets: List[RateBucket]) -> SendResult:
+        """Send to one recipient with retries (runs in a pool thread)"""
+        recipient_id, phone = claimed
+        if campaign['message_type'] == 'template':
+            return SendResult(recipient_id, phone, 'failed', error_message='Template sending not implemented')
+
+        from server.services.whatsapp_send_service import send_message
+        error = 'unknown'
+        with self.app.app_context():
+            for attempt in range(MAX_RETRIES):
+                if not self._acquire_token(buckets):
+                    return SendResult(recipient_id, phone, 'queued')
+                try:
+                    # retries=0: the dispatcher is the single retry layer
+                    result = send_message(
+                        business_id=campaign['business_id'],
+                        to_phone=phone,
+                        text=campaign['text'],
+                        media=campaign['media'],
+                        media_type=campaign['media_type'] if campaign['media'] else None,
+                        context='broadcast',
+                        retries=0
+                    )
+                    if result and result.get('status') in SENT_STATUSES:
+                        logger.info(f"✅ [WA_SEND] broadcast_id={self.broadcast_id} to={phone} status=sent")
+                        return SendResult(recipient_id, phone, 'sent',
+                                          message_id=result.get('sid') or result.get('message_id'),
+                                          sent_at=datetime.utcnow())
+                    error = result.get('error', 'unknown') if result else 'no_result'
+                except Exception as e:
+                    error = str(e)
+                if attempt < MAX_RETRIES - 1:
+                    logger.warning(f"⚠️ [WA_SEND] broadcast_id={self.broadcast_id} to={phone} attempt={attempt + 1}/{MAX_RETRIES} error={error[:100]} retry_in={BACKOFF_DELAYS[attempt]}s")
+                    time.sleep(BACKOFF_DELAYS[attempt])
+
+        logger.error(f"❌ [WA_SEND] broadcast_id={self.broadcast_id} to={phone} status=failed error={error[:100]}")
+        return SendResult(recipient_id, phone, 'failed',
+                          error_message=f"Failed after {MAX_RETRIES} attempts: {error}"[:500])
+
+    # ── bulk writes ────────────────────────────────────────
+
+    def _flush(self, results: List[SendResult], campaign: Dict):
+        """Write a page of results: one bulk UPDATE, atomic counters, history rows"""
+        from server.utils.whatsapp_utils import normalize_whatsapp_to
+
+        db.session.execute(update(WhatsAppBroadcastRecipient), [
+            {
+                'id': r.recipient_id,
+                'status': r.status,
+                'message_id': r.message_id,
+                'error_message': r.error_message,
+                'sent_at': r.sent_at,
+            }
+            for r in results
+        ])
+
+        sent = sum(1 for r in results if r.status == 'sent')
+        failed = sum(1 for r in results if r.status == 'failed')
+        if sent or failed:
+            # Increment in SQL - other workers update the same row
+            db.session.execute(
+                update(WhatsAppBroadcast)
+                .where(WhatsAppBroadcast.id == self.broadcast_id)
+                .values(
+                    sent_count=WhatsAppBroadcast.sent_count + sent,
+                    failed_count=WhatsAppBroadcast.failed_count + failed,
+                    processed_count=WhatsAppBroadcast.processed_count + sent + failed,
+                    updated_at=datetime.utcnow(),
+                )
+                .execution_options(synchronize_session=False)
+            )
+
+        # 🔥 CONTEXT FIX: Save broadcast messages to history for LLM context
+        for r in results:
+            if r.status != 'sent':
+                continue
+            try:
+                normalized_jid, _ = normalize_whatsapp_to(to=r.phone, business_id=campaign['business_id'])
+            except ValueError:
+                continue
+            db.session.add(WhatsAppMessage(
+                business_id=campaign['business_id'],
+                to_number=normalized_jid,  # Full JID for history matching
+                body=campaign['text'],
+                direction='out',
+                provider=campaign['provider'],
+                status='sent',
+                message_type=campaign['media_type'] if campaign['media'] else 'text',
+                source='automation',  # Broadcast campaign
+                provider_message_id=r.message_id
+            ))
+        db.session.commit()
+
+        self.totals['sent'] += sent
+        self.totals['failed'] += failed
+        logger.info(f"[WA_BROADCAST] broadcast_id={self.broadcast_id} worker={self.worker_id} page sent={sent} failed={failed} totals={self.totals}")
+
+    def _finish(self, outcome: str) -> Dict:
+        summary = {'outcome': outcome, 'worker_id': self.worker_id, **self.totals}
+        if outcome == 'continue':
+            return summary
+
+        Recipient = WhatsAppBroadcastRecipient
+        if outcome == 'cancelled':
+            cancelled = db.session.execute(
+                update(Recipient)
+                .where(Recipient.broadcast_id == self.broadcast_id, Recipient.status == 'queued')
+                .values(status='cancelled')
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.session.execute(
+                update(WhatsAppBroadcast)
+                .where(WhatsAppBroadcast.id == self.broadcast_id)
+                .values(
+                    cancelled_count=WhatsAppBroadcast.cancelled_count + cancelled,
+                    processed_count=WhatsAppBroadcast.processed_count + cancelled,
+                    status='cancelled',
+                    completed_at=datetime.utcnow(),
+                    updated_at=datetime.utcnow(),
+                )
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            logger.info(f"🛑 [WA_BROADCAST] broadcast_id={self.broadcast_id} cancelled ({cancelled} recipients not sent)")
+            return summary
+
+        # Drained: only the last worker (no claims in flight) finalizes
+        in_flight = Recipient.query.filter(
+            Recipient.broadcast_id == self.broadcast_id,
+            Recipient.status.in_(('queued', 'processing'))
+        ).count()
+        if in_flight:
+            summary['outcome'] = 'idle'
+            db.session.commit()
+            return summary
+
+        broadcast = WhatsAppBroadcast.query.get(self.broadcast_id)
+        if broadcast.failed_count == 0:
+            final_status = 'completed'
+        elif broadcast.sent_count > 0:
+            final_status = 'partial'
+        else:
+            final_status = 'failed'
+        db.session.execute(
+            update(WhatsAppBroadcast)
+            .where(WhatsAppBroadcast.id == self.broadcast_id, WhatsAppBroadcast.status == 'running')
+            .values(status=final_status, completed_at=datetime.utcnow(), updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        summary['outcome'] = 'completed'
+        summary['status'] = final_status
+        logger.info(f"🏁 [WA_BROADCAST] broadcast_id={self.broadcast_id} total={broadcast.total_recipients} sent={broadcast.sent_count} failed={broadcast.failed_count} status={final_status}")
+        return summary
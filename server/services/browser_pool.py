@@ -0,0 +1,277 @@
+"""
+Browser Pool - long-lived Chromium pages for HTML → PNG/PDF previews
+
+Receipt previews (generate_receipt_preview_png / generate_email_screenshot in
+gmail_sync_service.py, generate_html_preview in receipt_preview_service.py)
+used to start Playwright and launch a fresh Chromium for every render: about a
+second of startup and a few hundred MB of RSS per preview. BrowserPool keeps
+BROWSER_POOL_SIZE browsers alive per worker process instead. Each one is owned
+by its own render thread, because the Playwright sync API only works on the
+thread that started it.
+
+- render(fn) queues a job and a render thread calls fn(page) on its page.
+  At most BROWSER_POOL_QUEUE_SIZE jobs wait for a page.
+- Every job gets BROWSER_POOL_RENDER_TIMEOUT seconds, queue wait included.
+  After that the caller gets RenderTimeout and the late page is replaced.
+- A page's context is replaced after BROWSER_POOL_PAGES_PER_CONTEXT renders
+  and after any failed render; a browser that disconnected is relaunched.
+
+The pool lives as long as its process. server/worker.py runs jobs from
+RQ_IN_PROCESS_QUEUES (receipts, receipts_sync) in the worker process, so
+browsers are launched once per worker and shared by every receipt / preview
+job it runs. A job on a forking queue gets a fresh pool that only saves
+launches within that job.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Optional, Tuple
+
+from server.config import (
+    BROWSER_POOL_PAGES_PER_CONTEXT,
+    BROWSER_POOL_QUEUE_SIZE,
+    BROWSER_POOL_RENDER_TIMEOUT,
+    BROWSER_POOL_SIZE,
+)
+from server.services.lazy_services import lazy_module
+
+logger = logging.getLogger(__name__)
+
+playwright_api = lazy_module("playwright.sync_api")
+
+CHROMIUM_ARGS = [
+    # Automation flags
+    '--disable-blink-features=AutomationControlled',
+    '--no-first-run',
+    '--no-default-browser-check',
+    '--disable-extensions',
+    # Container/Docker stability flags
+    '--disable-dev-shm-usage',
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    # Resource management flags
+    '--disable-gpu',
+]
+
+
+class RenderTimeout(Exception):
+    """A render did not finish (or did not get a page) within its timeout"""
+
+
+def launch_chromium() -> Tuple[Any, Callable[[], None]]:
+    """Start Playwright on the calling thread and launch headless Chromium -> (browser, stop)"""
+    playwright = playwright_api.sync_playwright().start()
+    try:
+        browser = playwright.chromium.launch(headless=True, args=CHROMIUM_ARGS)
+    except Exception:
+        playwright.stop()
+        raise
+    return browser, playwright.stop
+
+
+def _settle(future: Future, result=None, exception: Optional[BaseException] = None) -> None:
+    try:
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        pass
+
+
+class _Job:
+    __slots__ = ('fn', 'future', 'abandoned')
+
+    def __init__(self, fn: Callable[[Any], Any]):
+        self.fn = fn
+        self.future: Future = Future()
+        self.abandoned = False  # the caller timed out while fn was running
+
+
+class _Renderer:
+    """One browser and one page, only ever touched by its render thread"""
+
+    def __init__(self, pool: 'BrowserPool'):
+        self.pool = pool
+        self.browser = None
+        self.stop_driver: Optional[Callable[[], None]] = None
+        self.context = None
+        self.page = None
+        self.renders = 0
+
+    def get_page(self):
+        if self.browser is None:
+            self.browser, self.stop_driver = self.pool.launcher()
+            self.pool._count('launches')
+        if self.page is None:
+            self.context = self.browser.new_context(ignore_https_errors=True)
+            self.page = self.context.new_page()
+            self.renders = 0
+        return self.page
+
+    def recycle_page(self) -> None:
+        context, self.context, self.page = self.context, None, None
+        if context is None:
+            return
+        self.pool._count('recycles')
+        try:
+            context.close()
+        except Exception as e:
+            logger.debug(f"[BROWSER_POOL] context close failed: {e}")
+
+    def connected(self) -> bool:
+        try:
+            return self.browser is not None and self.browser.is_connected()
+        except Exception:
+            return False
+
+    def close_browser(self) -> None:
+        self.recycle_page()
+        browser, stop_driver = self.browser, self.stop_driver
+        self.browser = self.stop_driver = None
+        for step in (getattr(browser, 'close', None), stop_driver):
+            if step is None:
+                continue
+            try:
+                step()
+            except Exception as e:
+                logger.debug(f"[BROWSER_POOL] browser shutdown step failed: {e}")
+
+
+class BrowserPool:
+    """
+    Bounded pool of long-lived Chromium pages
+
+    render(fn) runs fn(page) on a pooled Playwright page and returns its result
+    (exceptions from fn are re-raised). fn must leave nothing behind that the
+    next render could see: set_content() replaces the document, so the
+    capture functions only need to set the viewport and media they use.
+
+    launcher() -> (browser, stop) is called on a render thread; the default
+    starts Playwright and launches Chromium there.
+    """
+
+    def __init__(self, size: int = BROWSER_POOL_SIZE,
+                 pages_per_context: int = BROWSER_POOL_PAGES_PER_CONTEXT,
+                 queue_size: int = BROWSER_POOL_QUEUE_SIZE,
+                 timeout: float = BROWSER_POOL_RENDER_TIMEOUT,
+                 launcher: Callable[[], Tuple[Any, Callable[[], None]]] = launch_chromium):
+        self.size = max(1, size)
+        self.pages_per_context = max(1, pages_per_context)
+        self.timeout = timeout
+        self.launcher = launcher
+        self._queue: 'queue.Queue[Optional[_Job]]' = queue.Queue(maxsize=max(1, queue_size))
+        self._threads = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self.stats = {'renders': 0, 'errors': 0, 'timeouts': 0, 'rejected': 0,
+                      'launches': 0, 'recycles': 0, 'crashes': 0}
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self.stats[key] += n
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("browser pool is closed")
+            while len(self._threads) < self.size:
+                thread = threading.Thread(target=self._run, name=f"browser-pool-{len(self._threads)}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def render(self, fn: Callable[[Any], Any], timeout: Optional[float] = None) -> Any:
+        """fn(page) on a pooled page; RenderTimeout after `timeout` seconds (queue wait included)"""
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        self._start()
+
+        job = _Job(fn)
+        try:
+            self._queue.put(job, timeout=timeout)
+        except queue.Full:
+            self._count('rejected')
+            raise RenderTimeout(f"no page free within {timeout:.1f}s ({self._queue.maxsize} renders queued)")
+        try:
+            return job.future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeoutError:
+            if not job.future.cancel():  # already running: its page is replaced once fn returns
+                job.abandoned = True
+            self._count('timeouts')
+            raise RenderTimeout(f"render took longer than {timeout:.1f}s")
+
+    def _run(self) -> None:
+        renderer = _Renderer(self)
+        try:
+            while True:
+                job = self._queue.get()
+                if job is None:
+                    return
+                if not job.future.set_running_or_notify_cancel():
+                    continue  # the caller gave up while it was queued
+                try:
+                    result = job.fn(renderer.get_page())
+                except Exception as e:
+                    self._count('errors')
+                    renderer.recycle_page()
+                    if renderer.browser is not None and not renderer.connected():
+                        logger.warning(f"[BROWSER_POOL] browser disconnected, relaunching on next render: {e}")
+                        self._count('crashes')
+                        renderer.close_browser()
+                    _settle(job.future, exception=e)
+                    continue
+                renderer.renders += 1
+                self._count('renders')
+                _settle(job.future, result=result)
+                if job.abandoned or renderer.renders >= self.pages_per_context:
+                    renderer.recycle_page()
+        finally:
+            renderer.close_browser()
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Cancel queued renders, stop the render threads and close their browsers"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            threads = list(self._threads)
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                job.future.cancel()
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join(timeout=timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_pool: Optional[BrowserPool] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool() -> BrowserPool:
+    """Process-wide pool, created on first render (and again in a forked worker)"""
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _pool_lock:
+            if _pool is None or _pool_pid != pid:
+                _pool = BrowserPool()
+                _pool_pid = pid
+                atexit.register(_pool.close)
+    return _pool
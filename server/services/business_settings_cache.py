@@ -1,7 +1,7 @@
 """
 Business Settings Cache - In-memory cache for business settings
 🔥 PERFORMANCE OPTIMIZATION: Cache Business and BusinessSettings to reduce DB round trips
-Follows the same pattern as prompt_cache.py for consistency
+Built on server/utils/cache.py, same as prompt_cache.py
 """
 import time
 import logging
@@ -9,6 +9,8 @@ import threading
 from typing import Optional, Dict, Any, Tuple
 from dataclasses import dataclass
 
+from server.utils.cache import TTLCache
+
 logger = logging.getLogger(__name__)
 
 # Cache TTL in seconds (10 minutes - same as prompt cache)
@@ -34,7 +36,8 @@ class CachedBusinessSettings:
 
 class BusinessSettingsCache:
     """
-    Thread-safe in-memory cache for Business and BusinessSettings
+    Thread-safe cache for Business and BusinessSettings (shared TTLCache: LRU,
+    Redis L2, cross-process invalidation)
     
     Key: business_id (int)
     Value: CachedBusinessSettings with {business_data, settings_data}
@@ -43,9 +46,8 @@ class BusinessSettingsCache:
     """
     
     def __init__(self):
-        self._cache: Dict[int, CachedBusinessSettings] = {}
-        self._access_order: Dict[int, float] = {}  # For LRU tracking
-        self._lock = threading.RLock()
+        self._cache = TTLCache(ttl_seconds=CACHE_TTL_SECONDS, max_size=MAX_CACHE_SIZE,
+                               name="business_settings", l2=True)
         logger.info("📦 [BUSINESS_SETTINGS_CACHE] Initialized")
     
     def get(self, business_id: int) -> Optional[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]:
@@ -58,25 +60,12 @@ class BusinessSettingsCache:
         Returns:
             Tuple of (business_data, settings_data) if found and not expired, None otherwise
         """
-        with self._lock:
-            entry = self._cache.get(business_id)
-            if entry:
-                if entry.is_expired():
-                    # Expired - remove from cache
-                    del self._cache[business_id]
-                    if business_id in self._access_order:
-                        del self._access_order[business_id]
-                    logger.info(f"🗑️ [BUSINESS_SETTINGS_CACHE] Expired entry removed for business_id={business_id}")
-                    return None
-                else:
-                    # Valid cache hit - update access time for LRU
-                    self._access_order[business_id] = time.time()
-                    age = time.time() - entry.cached_at
-                    logger.info(f"✅ [BUSINESS_SETTINGS_CACHE] HIT for business_id={business_id} (age: {int(age)}s)")
-                    return (entry.business_data, entry.settings_data)
-            else:
-                logger.info(f"❌ [BUSINESS_SETTINGS_CACHE] MISS for business_id={business_id}")
-                return None
+        entry = self._cache.get(business_id)
+        if entry is None:
+            logger.debug(f"❌ [BUSINESS_SETTINGS_CACHE] MISS for business_id={business_id}")
+            return None
+        logger.debug(f"✅ [BUSINESS_SETTINGS_CACHE] HIT for business_id={business_id} (age: {int(time.time() - entry.cached_at)}s)")
+        return (entry.business_data, entry.settings_data)
     
     def set(self, business_id: int, business_data: Dict[str, Any], 
             settings_data: Optional[Dict[str, Any]] = None):
@@ -88,73 +77,40 @@ class BusinessSettingsCache:
             business_data: Serialized Business model data
             settings_data: Optional serialized BusinessSettings model data
         """
-        with self._lock:
-            # Check cache size and evict oldest if at limit (LRU)
-            if len(self._cache) >= MAX_CACHE_SIZE and business_id not in self._cache:
-                self._evict_oldest()
-            
-            entry = CachedBusinessSettings(
-                business_id=business_id,
-                business_data=business_data,
-                settings_data=settings_data,
-                cached_at=time.time()
-            )
-            self._cache[business_id] = entry
-            self._access_order[business_id] = time.time()
-            
-            has_settings = "with settings" if settings_data else "without settings"
-            logger.info(f"💾 [BUSINESS_SETTINGS_CACHE] SET for business_id={business_id} ({has_settings})")
+        entry = CachedBusinessSettings(
+            business_id=business_id,
+            business_data=business_data,
+            settings_data=settings_data,
+            cached_at=time.time()
+        )
+        # Module settings are read per call so they can be tuned at runtime
+        self._cache.max_size = MAX_CACHE_SIZE
+        self._cache.set(business_id, entry, ttl=CACHE_TTL_SECONDS)
+        
+        has_settings = "with settings" if settings_data else "without settings"
+        logger.debug(f"💾 [BUSINESS_SETTINGS_CACHE] SET for business_id={business_id} ({has_settings})")
     
     def invalidate(self, business_id: int):
         """
-        Invalidate cache entry for a business
+        Invalidate cache entry for a business (in every process)
         
         Args:
             business_id: Business ID to invalidate
         
         Call this when business or settings are updated
         """
-        with self._lock:
-            if business_id in self._cache:
-                del self._cache[business_id]
-                if business_id in self._access_order:
-                    del self._access_order[business_id]
-                logger.info(f"🗑️ [BUSINESS_SETTINGS_CACHE] Invalidated cache for business_id={business_id}")
+        self._cache.delete(business_id)
+        logger.info(f"🗑️ [BUSINESS_SETTINGS_CACHE] Invalidated cache for business_id={business_id}")
     
     def clear(self):
         """Clear all cache entries"""
-        with self._lock:
-            count = len(self._cache)
-            self._cache.clear()
-            self._access_order.clear()
-            logger.info(f"🗑️ [BUSINESS_SETTINGS_CACHE] Cleared {count} entries")
-    
-    def _evict_oldest(self):
-        """Evict the least recently used entry (LRU)"""
-        if not self._access_order:
-            return
-        
-        # Find the entry with the oldest access time
-        oldest_id = min(self._access_order.items(), key=lambda x: x[1])[0]
-        
-        if oldest_id in self._cache:
-            del self._cache[oldest_id]
-        if oldest_id in self._access_order:
-            del self._access_order[oldest_id]
-        
-        logger.info(f"🗑️ [BUSINESS_SETTINGS_CACHE] Evicted oldest entry: business_id={oldest_id}")
+        count = self._cache.size()
+        self._cache.clear()
+        logger.info(f"🗑️ [BUSINESS_SETTINGS_CACHE] Cleared {count} entries")
     
     def stats(self) -> Dict[str, Any]:
         """Get cache statistics"""
-        with self._lock:
-            total = len(self._cache)
-            expired = sum(1 for e in self._cache.values() if e.is_expired())
-            return {
-                "total_entries": total,
-                "expired_entries": expired,
-                "valid_entries": total - expired,
-                "max_size": MAX_CACHE_SIZE
-            }
+        return self._cache.stats()
 
 
 # Global singleton cache instance
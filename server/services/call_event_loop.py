@@ -0,0 +1,278 @@
+"""
+Shared per-process event loop for the async call engine (CALLS_ENGINE_MODE=async)
+
+In thread mode every call owns a Twilio reader thread, a realtime-provider
+thread (with its own asyncio loop), a TX pacer thread, an audio-out bridge
+thread and watchdog threads. In async mode those run as tasks on ONE asyncio
+loop per worker process, hosted by a single daemon thread:
+
+    loop = get_shared_call_loop()
+    task = loop.task(self._tx_loop_async, name="TX-CA1234")
+    task.start()
+    ...
+    task.join(timeout=2.0)
+
+CallTask mirrors the threading.Thread surface used by MediaStreamHandler
+(start / is_alive / join / name / ident), so task handles can live in
+`self.tx_thread` and `self.background_threads` unchanged.
+
+Blocking work (DB queries, REST calls, call start / stop) goes to a bounded
+pool shared by all calls - CALLS_ENGINE_BLOCKING_WORKERS threads, also the
+loop's default executor:
+
+    lead = await loop.run_blocking(self._lookup_call_lead)
+
+Tasks a call task spawns (asyncio.create_task) are cancelled when it returns,
+as asyncio.run did for the per-call loops.
+
+Rules for code running on the shared loop:
+- Never block: no time.sleep, no queue.get(timeout), no DB queries (run_blocking)
+- Waiting on per-call queues uses FrameRingQueue.get_async / put_async
+- Websocket sends must be non-blocking (MediaStreamBridge.send_nowait)
+- Never wait on a future of the loop itself (future.result() deadlocks)
+"""
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from server.config import CALLS_ENGINE_BLOCKING_WORKERS, CALLS_ENGINE_MODE
+
+logger = logging.getLogger(__name__)
+
+ENGINE_THREAD = "thread"
+ENGINE_ASYNC = "async"
+
+# Loop lag sampling (how late the loop wakes up vs. the requested sleep)
+_LAG_PROBE_INTERVAL = 0.1
+
+# Tasks created while a submitted coroutine runs (inherited by its child tasks)
+_task_scope: contextvars.ContextVar[Optional[Set[asyncio.Task]]] = contextvars.ContextVar(
+    "call_task_scope", default=None)
+
+
+def _scoped_task_factory(loop, coro, **kwargs):
+    task = asyncio.Task(coro, loop=loop, **kwargs)
+    scope = _task_scope.get()
+    if scope is not None:
+        scope.add(task)
+        task.add_done_callback(scope.discard)
+    return task
+
+
+def is_async_engine_enabled() -> bool:
+    """True when calls should run their reader / realtime / TX / audio-out / watchdog work on the shared loop"""
+    return CALLS_ENGINE_MODE == ENGINE_ASYNC
+
+
+class CallTask:
+    """
+    Thread-like handle for a coroutine scheduled on the shared call loop
+
+    Created unstarted (like threading.Thread) so it can be stored on the
+    handler in __init__ and started later.
+    """
+
+    def __init__(self, call_loop: "SharedCallLoop", target: Callable[[], Awaitable[Any]],
+                 name: Optional[str] = None):
+        self._call_loop = call_loop
+        self._target = target
+        self.name = name or getattr(target, "__name__", "CallTask")
+        self._future = None
+        self._started = False
+
+    @property
+    def ident(self) -> Optional[int]:
+        """Ident of the loop thread the task runs on (None before start)"""
+        return self._call_loop.thread_ident if self._started else None
+
+    def start(self) -> None:
+        if self._started:
+            raise RuntimeError("tasks can only be started once")
+        self._started = True
+        self._future = self._call_loop.submit(self._target(), name=self.name)
+
+    def is_alive(self) -> bool:
+        return self._future is not None and not self._future.done()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        """Wait for the task to finish; returns silently on timeout like Thread.join"""
+        if self._future is None:
+            raise RuntimeError("cannot join task before it is started")
+        if self._call_loop.in_loop_thread():
+            raise RuntimeError("cannot join a call task from the shared loop thread")
+        try:
+            self._future.result(timeout=timeout)
+        except FutureTimeoutError:
+            pass
+        except BaseException:
+            # Errors are logged by the loop's task wrapper
+            pass
+
+    def cancel(self) -> bool:
+        return self._future is not None and self._future.cancel()
+
+
+class SharedCallLoop:
+    """One asyncio event loop on a daemon thread, shared by all calls in the process"""
+
+    def __init__(self, name: str = "CallEventLoop", blocking_workers: int = CALLS_ENGINE_BLOCKING_WORKERS):
+        self._name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self.blocking_workers = blocking_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        # Accounting
+        self.tasks_started = 0
+        self.tasks_failed = 0
+        self.active_tasks = 0
+        self.blocking_calls = 0
+        self.active_blocking = 0
+        self.max_lag_ms = 0.0
+        self.last_lag_ms = 0.0
+
+    # ── lifecycle ───────────────────────────────────────────────────────────
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._ready.clear()
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.blocking_workers,
+                                                    thread_name_prefix=f"{self._name}-blocking")
+            self._thread = threading.Thread(target=self._run, daemon=True, name=self._name)
+            self._thread.start()
+        self._ready.wait()
+
+    def _run(self) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        loop.set_default_executor(self._executor)
+        loop.set_task_factory(_scoped_task_factory)
+        self._loop = loop
+        loop.create_task(self._lag_probe())
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            pending = asyncio.all_tasks(loop)
+            for task in pending:
+                task.cancel()
+            if pending:
+                loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            loop.close()
+            self._loop = None
+
+    def stop(self, timeout: float = 2.0) -> None:
+        loop, thread = self._loop, self._thread
+        if loop is not None and loop.is_running():
+            loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join(timeout=timeout)
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            self.start()
+        return self._loop
+
+    @property
+    def thread_ident(self) -> Optional[int]:
+        return self._thread.ident if self._thread is not None else None
+
+    def in_loop_thread(self) -> bool:
+        return self._thread is not None and threading.get_ident() == self._thread.ident
+
+    # ── scheduling ──────────────────────────────────────────────────────────
+    def task(self, target: Callable[[], Awaitable[Any]], name: Optional[str] = None) -> CallTask:
+        """Create an unstarted Thread-like handle for `target()`"""
+        return CallTask(self, target, name=name)
+
+    def submit(self, coro: Awaitable[Any], name: Optional[str] = None):
+        """Schedule a coroutine from any thread; returns a concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(self._guard(coro, name), self.loop)
+
+    async def _guard(self, coro: Awaitable[Any], name: Optional[str]):
+        self.tasks_started += 1
+        self.active_tasks += 1
+        children: Set[asyncio.Task] = set()
+        _task_scope.set(children)
+        try:
+            return await coro
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.tasks_failed += 1
+            logger.error(f"[CALL_LOOP] task {name or '?'} crashed: {e}")
+            raise
+        finally:
+            self.active_tasks -= 1
+            # Like asyncio.run: nothing the coroutine spawned outlives it
+            leftover = [task for task in children if not task.done()]
+            for task in leftover:
+                task.cancel()
+            if leftover:
+                await asyncio.gather(*leftover, return_exceptions=True)
+
+    async def run_blocking(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking call on the shared pool and await it (call on the loop)"""
+        self.blocking_calls += 1
+        self.active_blocking += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, functools.partial(func, *args, **kwargs))
+        finally:
+            self.active_blocking -= 1
+
+    async def _lag_probe(self) -> None:
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(_LAG_PROBE_INTERVAL)
+            lag_ms = max(0.0, (time.monotonic() - start - _LAG_PROBE_INTERVAL) * 1000.0)
+            self.last_lag_ms = lag_ms
+            if lag_ms > self.max_lag_ms:
+                self.max_lag_ms = lag_ms
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._loop is not None and self._loop.is_running(),
+            "active_tasks": self.active_tasks,
+            "tasks_started": self.tasks_started,
+            "tasks_failed": self.tasks_failed,
+            "blocking_workers": self.blocking_workers,
+            "blocking_calls": self.blocking_calls,
+            "active_blocking": self.active_blocking,
+            "last_lag_ms": round(self.last_lag_ms, 2),
+            "max_lag_ms": round(self.max_lag_ms, 2),
+        }
+
+
+_shared_loop: Optional[SharedCallLoop] = None
+_shared_loop_pid: Optional[int] = None
+_shared_loop_lock = threading.Lock()
+
+
+def get_shared_call_loop() -> SharedCallLoop:
+    """Process-wide call loop, started on first use (and again in a forked worker)"""
+    global _shared_loop, _shared_loop_pid
+    pid = os.getpid()
+    if _shared_loop is None or _shared_loop_pid != pid:
+        with _shared_loop_lock:
+            if _shared_loop is None or _shared_loop_pid != pid:
+                loop = SharedCallLoop()
+                loop.start()
+                _shared_loop = loop
+                _shared_loop_pid = pid
+    return _shared_loop
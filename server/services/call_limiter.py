@@ -6,6 +6,10 @@ Limits:
 - MAX_OUTBOUND_CALLS_PER_BUSINESS = 3 (max parallel outbound calls)
 - MAX_TOTAL_CALLS_PER_BUSINESS = 5 (inbound + outbound combined)
 
+Counts come from the capacity ledger (server/services/capacity_ledger.py) -
+one Redis round trip instead of a CallLog COUNT. The DB queries below are the
+fallback while Redis is unavailable.
+
 🔥 PRODUCTION LOGGING POLICY:
 - Only log when counts CHANGE (delta logging)
 - Don't log "0 active calls" repeatedly
@@ -13,13 +17,15 @@ Limits:
 """
 import logging
 from datetime import datetime, timedelta
-from typing import Tuple
+from typing import Optional, Tuple
+from server.config import MAX_CALLS_PER_BUSINESS, MAX_OUTBOUND_CALLS_PER_BUSINESS
 from server.models_sql import CallLog, db
 
 log = logging.getLogger(__name__)
 
-MAX_OUTBOUND_CALLS_PER_BUSINESS = 3
-MAX_TOTAL_CALLS_PER_BUSINESS = 5
+MAX_TOTAL_CALLS_PER_BUSINESS = MAX_CALLS_PER_BUSINESS
+
+INBOUND_LIMIT_MESSAGE = "כרגע כל הקווים של העסק תפוסים. נסה שוב בעוד מספר דקות, תודה."
 
 # 🔥 FIX: Terminal statuses for BOTH fields (status + call_status for backward compat)
 # These indicate the call has ended
@@ -33,6 +39,17 @@ MAX_CALL_AGE_MINUTES = 10
 _last_logged_counts = {}
 
 
+def _ledger_counts(business_id: int) -> Optional[dict]:
+    """This business's live lease counts, or None when only the local fallback ledger is available"""
+    try:
+        from server.services.capacity_ledger import capacity_usage
+        usage = capacity_usage(business_id)
+        return usage["business"] if usage["source"] == "redis" else None
+    except Exception as e:
+        log.warning(f"Capacity ledger unavailable for business {business_id}: {e}")
+        return None
+
+
 def count_active_calls(business_id: int) -> int:
     """
     Count total active calls (inbound + outbound) for a business
@@ -45,6 +62,9 @@ def count_active_calls(business_id: int) -> int:
     
     Note: We check status field (not deprecated call_status field)
     """
+    counts = _ledger_counts(business_id)
+    if counts is not None:
+        return counts["active"]
     try:
         cutoff_time = datetime.utcnow() - timedelta(minutes=MAX_CALL_AGE_MINUTES)
         
@@ -95,6 +115,9 @@ def count_active_outbound_calls(business_id: int) -> int:
     🔥 FIX: Use status as PRIMARY field (per models_sql.py)
     🔥 DELTA LOGGING: Only log when count changes
     """
+    counts = _ledger_counts(business_id)
+    if counts is not None:
+        return counts["outbound"]
     try:
         cutoff_time = datetime.utcnow() - timedelta(minutes=MAX_CALL_AGE_MINUTES)
         
@@ -147,8 +170,12 @@ def check_call_limits(business_id: int, num_new_outbound: int = 1) -> Tuple[bool
         Tuple of (allowed: bool, error_message: str)
         If allowed=True, error_message is empty
     """
-    active_total = count_active_calls(business_id)
-    active_outbound = count_active_outbound_calls(business_id)
+    counts = _ledger_counts(business_id)
+    if counts is not None:
+        active_total, active_outbound = counts["active"], counts["outbound"]
+    else:
+        active_total = count_active_calls(business_id)
+        active_outbound = count_active_outbound_calls(business_id)
     
     log.info(f"📊 Call limits check: business={business_id}, active_total={active_total}, active_outbound={active_outbound}, new={num_new_outbound}")
     
@@ -162,7 +189,7 @@ def check_call_limits(business_id: int, num_new_outbound: int = 1) -> Tuple[bool
     if active_outbound + num_new_outbound > MAX_OUTBOUND_CALLS_PER_BUSINESS:
         available = MAX_OUTBOUND_CALLS_PER_BUSINESS - active_outbound
         if available <= 0:
-            return False, "ניתן להוציא עד שלוש שיחות יוצאות במקביל. המתן לסיום שיחה פעילה ונסה שוב."
+            return False, f"ניתן להוציא עד {MAX_OUTBOUND_CALLS_PER_BUSINESS} שיחות יוצאות במקביל. המתן לסיום שיחה פעילה ונסה שוב."
         return False, f"ניתן להתחיל רק {available} שיחות יוצאות נוספות."
     
     return True, ""
@@ -179,7 +206,7 @@ def check_inbound_call_limit(business_id: int) -> Tuple[bool, str]:
     
     if active_total >= MAX_TOTAL_CALLS_PER_BUSINESS:
         log.warning(f"⚠️ Inbound call rejected: business {business_id} at limit ({active_total} active)")
-        return False, "כרגע כל הקווים של העסק תפוסים. נסה שוב בעוד מספר דקות, תודה."
+        return False, INBOUND_LIMIT_MESSAGE
     
     return True, ""
 
@@ -188,9 +215,10 @@ def get_call_counts(business_id: int) -> dict:
     """
     Get current call counts for UI display
     """
+    counts = _ledger_counts(business_id)
     return {
-        "active_total": count_active_calls(business_id),
-        "active_outbound": count_active_outbound_calls(business_id),
+        "active_total": counts["active"] if counts is not None else count_active_calls(business_id),
+        "active_outbound": counts["outbound"] if counts is not None else count_active_outbound_calls(business_id),
         "max_total": MAX_TOTAL_CALLS_PER_BUSINESS,
         "max_outbound": MAX_OUTBOUND_CALLS_PER_BUSINESS
     }
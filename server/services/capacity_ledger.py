@@ -0,0 +1,582 @@
+"""
+Call Capacity Ledger - one atomic admission decision per call
+
+Call admission used to be split across four mechanisms: a WATCH/MULTI counter
+(calls_state), an active-calls SET (calls_capacity), a per-business SET of
+outbound jobs (outbound_semaphore) and a CallLog COUNT query per check
+(call_limiter). A call start cost several round trips, and the counters
+drifted whenever a pod died mid-call.
+
+Every active call is now a *lease* in a few Redis sorted sets
+(member = lease id, score = expiry in ms):
+
+- cap:leases                        every call (MAX_ACTIVE_CALLS)
+- cap:dir:{direction}               inbound / outbound (MAX_ACTIVE_OUTBOUND_CALLS)
+- cap:biz:{business_id}             per business (MAX_CALLS_PER_BUSINESS)
+- cap:biz:{business_id}:{direction} per business and direction (MAX_OUTBOUND_CALLS_PER_BUSINESS)
+
+One Lua script prunes expired leases and checks every limit. It then adds the
+lease to all the sets, or to none of them. The process handling the call keeps
+its lease alive: keep_alive() registers it with a heartbeat thread. If that
+process dies, the lease expires after CALL_LEASE_TTL_SECONDS and the slot comes
+back on its own. No cleanup job is needed.
+
+Lease ids are call SIDs. Outbound calls reserve a slot before dialing, under
+outbound_job_lease(job_id) or a reservation id. create_outbound_call() then
+binds the reservation to the Twilio SID, so every later release or heartbeat
+only needs the SID.
+
+Without Redis (or while it is down) the ledger falls back to an in-process
+copy with the same semantics. That copy only limits this process.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from server.config import (
+    CALL_LEASE_HEARTBEAT_SECONDS,
+    CALL_LEASE_TTL_SECONDS,
+    MAX_ACTIVE_CALLS,
+    MAX_ACTIVE_OUTBOUND_CALLS,
+    MAX_CALLS_PER_BUSINESS,
+    MAX_OUTBOUND_CALLS_PER_BUSINESS,
+)
+
+logger = logging.getLogger(__name__)
+
+INBOUND = "inbound"
+OUTBOUND = "outbound"
+
+LEASES_KEY = "cap:leases"
+DIRECTION_KEY = "cap:dir:{direction}"
+BUSINESS_KEY = "cap:biz:{business_id}"
+BUSINESS_DIRECTION_KEY = "cap:biz:{business_id}:{direction}"
+LEASE_KEY = "cap:lease:{lease_id}"
+
+REDIS_RETRY_SECONDS = 30  # after a Redis error, use the local ledger for this long
+
+# Which limit refused the lease, by set position (see _lease_sets)
+_REASONS = ("global", "global_{direction}", "business", "business_{direction}")
+
+# KEYS[1]: lease hash, KEYS[2..]: lease sets
+# ARGV[1]: lease id, ARGV[2]: ttl ms, ARGV[3..]: limit per set (-1 = unlimited)
+# Returns {1, 0} admitted, {1, -1} already held (renewed), {0, i} set i is full
+_ACQUIRE_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local lease = ARGV[1]
+local ttl = tonumber(ARGV[2])
+for i = 2, #KEYS do
+    redis.call('ZREMRANGEBYSCORE', KEYS[i], '-inf', now)
+end
+if redis.call('ZSCORE', KEYS[2], lease) then
+    for i = 2, #KEYS do
+        redis.call('ZADD', KEYS[i], 'XX', now + ttl, lease)
+    end
+    redis.call('PEXPIRE', KEYS[1], ttl * 2)
+    return {1, -1}
+end
+for i = 2, #KEYS do
+    local limit = tonumber(ARGV[i + 1])
+    if limit >= 0 and redis.call('ZCARD', KEYS[i]) >= limit then
+        return {0, i - 1}
+    end
+end
+local sets = {}
+for i = 2, #KEYS do
+    redis.call('ZADD', KEYS[i], now + ttl, lease)
+    sets[#sets + 1] = KEYS[i]
+end
+redis.call('HSET', KEYS[1], 'sets', table.concat(sets, ' '))
+redis.call('PEXPIRE', KEYS[1], ttl * 2)
+return {1, 0}
+"""
+
+# KEYS[1]: lease hash, ARGV[1]: lease id. Returns 1 if the lease was held
+_RELEASE_LUA = """
+local sets = redis.call('HGET', KEYS[1], 'sets')
+if not sets then
+    return 0
+end
+local removed = 0
+for key in string.gmatch(sets, '%S+') do
+    removed = removed + redis.call('ZREM', key, ARGV[1])
+end
+redis.call('DEL', KEYS[1])
+if removed > 0 then
+    return 1
+end
+return 0
+"""
+
+# KEYS: lease hashes, ARGV[1]: ttl ms, ARGV[2..]: lease ids (same order)
+# Extends every live lease; returns the ids that are no longer held
+_RENEW_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local ttl = tonumber(ARGV[1])
+local gone = {}
+for i, hash in ipairs(KEYS) do
+    local lease = ARGV[i + 1]
+    local sets = redis.call('HGET', hash, 'sets')
+    local first = sets and string.match(sets, '%S+')
+    local score = first and redis.call('ZSCORE', first, lease)
+    if score and tonumber(score) > now then
+        for key in string.gmatch(sets, '%S+') do
+            redis.call('ZADD', key, 'XX', now + ttl, lease)
+        end
+        redis.call('PEXPIRE', hash, ttl * 2)
+    else
+        gone[#gone + 1] = lease
+    end
+end
+return gone
+"""
+
+# KEYS[1]: old lease hash, KEYS[2]: new lease hash
+# ARGV[1]: old id, ARGV[2]: new id, ARGV[3]: ttl ms. Returns 1 if the old lease existed
+_BIND_LUA = """
+local sets = redis.call('HGET', KEYS[1], 'sets')
+if not sets then
+    return 0
+end
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local ttl = tonumber(ARGV[3])
+local taken = redis.call('EXISTS', KEYS[2]) == 1
+for key in string.gmatch(sets, '%S+') do
+    redis.call('ZREM', key, ARGV[1])
+    if not taken then
+        redis.call('ZADD', key, now + ttl, ARGV[2])
+    end
+end
+redis.call('DEL', KEYS[1])
+if not taken then
+    redis.call('HSET', KEYS[2], 'sets', sets)
+    redis.call('PEXPIRE', KEYS[2], ttl * 2)
+end
+return 1
+"""
+
+# KEYS: lease sets. Returns the number of live leases in each
+_COUNT_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local counts = {}
+for i, key in ipairs(KEYS) do
+    counts[i] = redis.call('ZCOUNT', key, '(' .. now, '+inf')
+end
+return counts
+"""
+
+
+@dataclass(frozen=True)
+class Admission:
+    """Outcome of acquire_lease(); truthy when the call may proceed"""
+    admitted: bool
+    reason: str  # admitted | renewed | global | global_outbound | business | business_outbound | ...
+    source: str = "redis"
+
+    def __bool__(self):
+        return self.admitted
+
+
+def _limit(value: int) -> int:
+    return value if value and value > 0 else -1
+
+
+def _lease_sets(business_id: Optional[int], direction: str) -> Tuple[List[str], List[int]]:
+    """Sorted-set keys a lease lives in, with the limit enforced on each"""
+    keys = [LEASES_KEY, DIRECTION_KEY.format(direction=direction)]
+    limits = [_limit(MAX_ACTIVE_CALLS), _limit(MAX_ACTIVE_OUTBOUND_CALLS) if direction == OUTBOUND else -1]
+    if business_id:
+        keys += [BUSINESS_KEY.format(business_id=business_id),
+                 BUSINESS_DIRECTION_KEY.format(business_id=business_id, direction=direction)]
+        limits += [_limit(MAX_CALLS_PER_BUSINESS),
+                   _limit(MAX_OUTBOUND_CALLS_PER_BUSINESS) if direction == OUTBOUND else -1]
+    return keys, limits
+
+
+def _usage_keys(business_id: Optional[int]) -> List[str]:
+    keys = [LEASES_KEY, DIRECTION_KEY.format(direction=INBOUND), DIRECTION_KEY.format(direction=OUTBOUND)]
+    if business_id:
+        keys += [BUSINESS_KEY.format(business_id=business_id),
+                 BUSINESS_DIRECTION_KEY.format(business_id=business_id, direction=INBOUND),
+                 BUSINESS_DIRECTION_KEY.format(business_id=business_id, direction=OUTBOUND)]
+    return keys
+
+
+def _lease_key(lease_id: str) -> str:
+    return LEASE_KEY.format(lease_id=lease_id)
+
+
+class LocalLedger:
+    """In-process ledger (same semantics as the Lua scripts) - only limits this process"""
+
+    def __init__(self, clock=time.time):
+        self._clock = clock
+        self._sets: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._leases: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def _prune(self, key: str, now: float):
+        members = self._sets[key]
+        for lease, expiry in list(members.items()):
+            if expiry <= now:
+                del members[lease]
+
+    def _held(self, lease_id: str, now: float) -> bool:
+        keys = self._leases.get(lease_id)
+        return bool(keys) and self._sets[keys[0]].get(lease_id, 0) > now
+
+    def acquire(self, lease_id: str, keys: List[str], limits: List[int], ttl: float) -> Tuple[bool, int]:
+        with self._lock:
+            now = self._clock()
+            for key in keys:
+                self._prune(key, now)
+            if self._held(lease_id, now):
+                for key in self._leases[lease_id]:
+                    self._sets[key][lease_id] = now + ttl
+                return True, -1
+            for i, (key, limit) in enumerate(zip(keys, limits), start=1):
+                if limit >= 0 and len(self._sets[key]) >= limit:
+                    return False, i
+            for key in keys:
+                self._sets[key][lease_id] = now + ttl
+            self._leases[lease_id] = list(keys)
+            return True, 0
+
+    def release(self, lease_id: str) -> bool:
+        with self._lock:
+            keys = self._leases.pop(lease_id, None) or []
+            removed = [self._sets[key].pop(lease_id, None) for key in keys]
+            return any(expiry is not None for expiry in removed)
+
+    def renew(self, lease_ids: List[str], ttl: float) -> List[str]:
+        with self._lock:
+            now = self._clock()
+            gone = []
+            for lease_id in lease_ids:
+                if self._held(lease_id, now):
+                    for key in self._leases[lease_id]:
+                        self._sets[key][lease_id] = now + ttl
+                else:
+                    gone.append(lease_id)
+            return gone
+
+    def bind(self, old_id: str, new_id: str, ttl: float) -> bool:
+        with self._lock:
+            keys = self._leases.pop(old_id, None)
+            if keys is None:
+                return False
+            now = self._clock()
+            taken = new_id in self._leases
+            for key in keys:
+                self._sets[key].pop(old_id, None)
+                if not taken:
+                    self._sets[key][new_id] = now + ttl
+            if not taken:
+                self._leases[new_id] = keys
+            return True
+
+    def counts(self, keys: List[str]) -> List[int]:
+        with self._lock:
+            now = self._clock()
+            return [sum(1 for expiry in self._sets[key].values() if expiry > now) for key in keys]
+
+    def reclaim(self) -> int:
+        with self._lock:
+            now = self._clock()
+            before = len(self._sets[LEASES_KEY])
+            for key in list(self._sets):
+                self._prune(key, now)
+            for lease_id, keys in list(self._leases.items()):
+                if lease_id not in self._sets[keys[0]]:
+                    del self._leases[lease_id]
+            return before - len(self._sets[LEASES_KEY])
+
+
+class RedisLedger:
+    """The shared ledger: one Lua script per operation (see _ACQUIRE_LUA etc.)"""
+
+    def __init__(self, redis_conn):
+        self._redis = redis_conn
+        self._acquire = redis_conn.register_script(_ACQUIRE_LUA)
+        self._release = redis_conn.register_script(_RELEASE_LUA)
+        self._renew = redis_conn.register_script(_RENEW_LUA)
+        self._bind = redis_conn.register_script(_BIND_LUA)
+        self._count = redis_conn.register_script(_COUNT_LUA)
+
+    def acquire(self, lease_id: str, keys: List[str], limits: List[int], ttl: float) -> Tuple[bool, int]:
+        admitted, index = self._acquire(keys=[_lease_key(lease_id)] + keys,
+                                        args=[lease_id, int(ttl * 1000)] + limits)
+        return bool(int(admitted)), int(index)
+
+    def release(self, lease_id: str) -> bool:
+        return bool(int(self._release(keys=[_lease_key(lease_id)], args=[lease_id])))
+
+    def renew(self, lease_ids: List[str], ttl: float) -> List[str]:
+        if not lease_ids:
+            return []
+        gone = self._renew(keys=[_lease_key(lease_id) for lease_id in lease_ids],
+                           args=[int(ttl * 1000)] + list(lease_ids))
+        return [g.decode() if isinstance(g, bytes) else g for g in gone or []]
+
+    def bind(self, old_id: str, new_id: str, ttl: float) -> bool:
+        return bool(int(self._bind(keys=[_lease_key(old_id), _lease_key(new_id)],
+                                   args=[old_id, new_id, int(ttl * 1000)])))
+
+    def counts(self, keys: List[str]) -> List[int]:
+        return [int(c) for c in self._count(keys=keys)]
+
+    def reclaim(self) -> int:
+        now_ms = int(time.time() * 1000)
+        reclaimed = int(self._redis.zremrangebyscore(LEASES_KEY, '-inf', now_ms) or 0)
+        keys = [DIRECTION_KEY.format(direction=d) for d in (INBOUND, OUTBOUND)]
+        keys += list(self._redis.scan_iter(match="cap:biz:*", count=500))
+        for key in keys:
+            self._redis.zremrangebyscore(key, '-inf', now_ms)
+        return reclaimed
+
+
+_local = LocalLedger()
+_redis_ledger: Optional[RedisLedger] = None
+_redis_ledger_conn = None
+_redis_down_until = 0.0
+
+
+def _get_redis():
+    """Shared Redis connection, or None (no REDIS_URL or recently failed)"""
+    if not os.getenv("REDIS_URL") or time.time() < _redis_down_until:
+        return None
+    try:
+        from server.services.jobs import get_redis
+        return get_redis()
+    except Exception as e:
+        _redis_failed(e)
+        return None
+
+
+def _redis_failed(error: Exception):
+    global _redis_down_until
+    _redis_down_until = time.time() + REDIS_RETRY_SECONDS
+    logger.error(f"[CAPACITY] Redis unavailable, using the in-process ledger for {REDIS_RETRY_SECONDS}s: {error}")
+
+
+def _ledger():
+    """(ledger, source) - the Redis ledger when reachable, else the local one"""
+    global _redis_ledger, _redis_ledger_conn
+    redis_conn = _get_redis()
+    if redis_conn is None:
+        return _local, "local"
+    if _redis_ledger is None or _redis_ledger_conn is not redis_conn:
+        _redis_ledger, _redis_ledger_conn = RedisLedger(redis_conn), redis_conn
+    return _redis_ledger, "redis"
+
+
+def _call(method: str, *args):
+    """Run a ledger operation on Redis, falling back to the local ledger on errors"""
+    ledger, source = _ledger()
+    if ledger is not _local:
+        try:
+            return getattr(ledger, method)(*args), source
+        except Exception as e:
+            _redis_failed(e)
+    return getattr(_local, method)(*args), "local"
+
+
+def _metric(name: str, value: int = 1):
+    try:
+        from server.metrics import metrics
+        metrics.increment(name, value)
+    except Exception:
+        pass
+
+
+# ─── Leases ──────────────────────────────────────────────
+
+
+def outbound_job_lease(job_id: int) -> str:
+    """Lease id reserving a slot for an outbound job before it is dialed"""
+    return f"outbound_job:{job_id}"
+
+
+def new_reservation() -> str:
+    """Lease id for an outbound call that is not part of a queue run"""
+    return f"reservation:{uuid.uuid4().hex}"
+
+
+def acquire_lease(lease_id: str, business_id: Optional[int], direction: str, hold: bool = False) -> Admission:
+    """
+    Admit a call if every limit it counts against has room - atomically.
+
+    Acquiring a lease that is already held renews it (idempotent for webhook retries).
+    hold=True keeps it alive from this process (see keep_alive).
+    """
+    from server.metrics import CALLS_REJECTED, CALLS_STARTED
+    keys, limits = _lease_sets(business_id, direction)
+    (admitted, index), source = _call("acquire", lease_id, keys, limits, CALL_LEASE_TTL_SECONDS)
+    if not admitted:
+        reason = _REASONS[index - 1].format(direction=direction)
+        _metric(CALLS_REJECTED)
+        _metric(f"{CALLS_REJECTED}.{reason}")
+        logger.warning(f"[CAPACITY] REJECTED lease={lease_id} business_id={business_id} "
+                       f"direction={direction} limit={reason} source={source}")
+        return Admission(False, reason, source)
+    if index == 0:
+        _metric(CALLS_STARTED)
+        logger.info(f"[CAPACITY] ACQUIRED lease={lease_id} business_id={business_id} direction={direction}")
+    if hold:
+        keep_alive(lease_id)
+    return Admission(True, "renewed" if index == -1 else "admitted", source)
+
+
+def release_lease(lease_id: str) -> bool:
+    """Free a slot. Idempotent - safe from every call-end path"""
+    _keeper.drop(lease_id)
+    held, _ = _call("release", lease_id)
+    held = _local.release(lease_id) or held  # acquired while Redis was down
+    if held:
+        logger.info(f"[CAPACITY] RELEASED lease={lease_id}")
+    return held
+
+
+def bind_lease(reservation_id: str, call_sid: str) -> bool:
+    """Move a pre-dial reservation to the call SID (no-op if the reservation is gone)"""
+    bound, _ = _call("bind", reservation_id, call_sid, CALL_LEASE_TTL_SECONDS)
+    bound = _local.bind(reservation_id, call_sid, CALL_LEASE_TTL_SECONDS) or bound
+    if _keeper.drop(reservation_id):
+        _keeper.hold(call_sid)
+    return bound
+
+
+def renew_leases(lease_ids: Iterable[str]) -> List[str]:
+    """Heartbeat: extend the given leases. Returns the ids that are no longer held"""
+    lease_ids = list(lease_ids)
+    if not lease_ids:
+        return []
+    gone, source = _call("renew", lease_ids, CALL_LEASE_TTL_SECONDS)
+    if source == "redis":
+        # Leases taken during a Redis outage live in the local ledger
+        local_gone = set(_local.renew(gone, CALL_LEASE_TTL_SECONDS))
+        gone = [lease_id for lease_id in gone if lease_id in local_gone]
+    return gone
+
+
+def reclaim_expired() -> int:
+    """Drop expired leases (housekeeping - expired leases never count anyway)"""
+    reclaimed, _ = _call("reclaim")
+    reclaimed += _local.reclaim()
+    if reclaimed:
+        from server.metrics import CALLS_LEASES_RECLAIMED
+        _metric(CALLS_LEASES_RECLAIMED, reclaimed)
+        logger.warning(f"[CAPACITY] Reclaimed {reclaimed} expired call leases")
+    return reclaimed
+
+
+class _LeaseKeeper:
+    """Heartbeat thread renewing the leases this process is handling"""
+
+    def __init__(self):
+        self._held = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def hold(self, lease_id: str):
+        with self._lock:
+            self._held.add(lease_id)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="call-lease-keeper", daemon=True)
+                self._thread.start()
+
+    def drop(self, lease_id: str) -> bool:
+        with self._lock:
+            if lease_id in self._held:
+                self._held.discard(lease_id)
+                return True
+            return False
+
+    def held(self) -> List[str]:
+        with self._lock:
+            return list(self._held)
+
+    def tick(self):
+        gone = renew_leases(self.held())
+        if gone:
+            with self._lock:
+                self._held.difference_update(gone)
+        publish_capacity_gauges()
+
+    def _run(self):
+        while True:
+            time.sleep(CALL_LEASE_HEARTBEAT_SECONDS)
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"[CAPACITY] Lease heartbeat failed: {e}")
+
+
+_keeper = _LeaseKeeper()
+
+
+def keep_alive(lease_id: str):
+    """Heartbeat this lease from this process until release_lease() (or the lease is gone)"""
+    _keeper.hold(lease_id)
+
+
+# ─── Usage ───────────────────────────────────────────────
+
+
+def capacity_usage(business_id: Optional[int] = None) -> dict:
+    """Live lease counts - one round trip. source='local' means Redis is unavailable"""
+    counts, source = _call("counts", _usage_keys(business_id))
+    usage = {
+        "active": counts[0],
+        "inbound": counts[1],
+        "outbound": counts[2],
+        "max": MAX_ACTIVE_CALLS,
+        "source": source,
+    }
+    if business_id:
+        usage["business"] = {
+            "active": counts[3],
+            "inbound": counts[4],
+            "outbound": counts[5],
+            "max": MAX_CALLS_PER_BUSINESS,
+            "max_outbound": MAX_OUTBOUND_CALLS_PER_BUSINESS,
+        }
+    return usage
+
+
+def outbound_headroom(business_id: int, usage: Optional[dict] = None) -> int:
+    """How many more outbound calls this business may start right now"""
+    usage = usage or capacity_usage(business_id)
+    business = usage["business"]
+    room = []
+    for limit, used in ((MAX_ACTIVE_CALLS, usage["active"]),
+                        (MAX_ACTIVE_OUTBOUND_CALLS, usage["outbound"]),
+                        (MAX_CALLS_PER_BUSINESS, business["active"]),
+                        (MAX_OUTBOUND_CALLS_PER_BUSINESS, business["outbound"])):
+        if _limit(limit) >= 0:
+            room.append(limit - used)
+    return max(0, min(room)) if room else sys.maxsize
+
+
+def publish_capacity_gauges(usage: Optional[dict] = None) -> dict:
+    """Export global lease counts to server/metrics.py gauges"""
+    from server.metrics import (
+        CALLS_ACTIVE, CALLS_ACTIVE_INBOUND, CALLS_ACTIVE_OUTBOUND, CALLS_CAPACITY_AVAILABLE, metrics,
+    )
+    usage = usage or capacity_usage()
+    metrics.set_gauge(CALLS_ACTIVE, usage["active"])
+    metrics.set_gauge(CALLS_ACTIVE_INBOUND, usage["inbound"])
+    metrics.set_gauge(CALLS_ACTIVE_OUTBOUND, usage["outbound"])
+    if _limit(MAX_ACTIVE_CALLS) >= 0:
+        metrics.set_gauge(CALLS_CAPACITY_AVAILABLE, max(0, MAX_ACTIVE_CALLS - usage["active"]))
+    return usage
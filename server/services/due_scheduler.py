@@ -0,0 +1,239 @@
+"""
+Due-Time Scheduler Index - future work in a Redis sorted set
+
+Tick jobs used to scan the DB every cycle for scheduled WhatsApp messages and
+appointment automation runs that became due: up to a tick of latency per item
+and a constant query load even when nothing was due. Instead:
+
+- Services register work when they create it: schedule_due() → ZADD with the
+  due time as score (scheduled_messages_service, appointment automations)
+- The scheduler leader pops due members atomically (pop_due) every
+  SCHEDULER_DUE_POLL_MS and enqueues them directly (dispatch_due)
+- reconcile_due_index() re-registers every pending DB row - run on scheduler
+  startup; the tick jobs still run every SCHEDULER_RECONCILE_MINUTES as a net
+
+Members are "<kind>:<ids>", e.g. "scheduled_msg:42" or "appointment_run:7:1234".
+The DB row stays the source of truth: handlers claim/validate before sending, so
+a stale member (cancelled row) is a no-op.
+
+⏰ DB datetimes are NAIVE Israel time - scores are converted to epoch seconds.
+"""
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import pytz
+
+logger = logging.getLogger(__name__)
+
+DUE_KEY = "scheduler:due"
+POP_BATCH = 200           # members popped per round trip
+RECONCILE_CHUNK = 1000    # ZADD pipeline size during reconciliation
+
+KIND_SCHEDULED_MESSAGE = 'scheduled_msg'
+KIND_APPOINTMENT_RUN = 'appointment_run'
+
+ISRAEL_TZ = pytz.timezone('Asia/Jerusalem')
+
+# Pop all members with score <= now (at most ARGV[2]) and remove them in one step,
+# so two scheduler instances can never dispatch the same member.
+_POP_DUE_LUA = """
+local items = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+if #items > 0 then
+    redis.call('ZREM', KEYS[1], unpack(items))
+end
+return items
+"""
+
+
+def israel_to_epoch(dt: datetime) -> float:
+    """Naive Israel-time datetime (DB format) or aware datetime → epoch seconds"""
+    if dt.tzinfo is None:
+        dt = ISRAEL_TZ.localize(dt)
+    return dt.timestamp()
+
+
+def due_member(kind: str, *parts) -> str:
+    return ":".join([kind] + [str(p) for p in parts])
+
+
+def parse_member(member) -> Tuple[str, List[str]]:
+    if isinstance(member, bytes):
+        member = member.decode()
+    kind, *parts = member.split(":")
+    return kind, parts
+
+
+def _get_redis():
+    from server.services.jobs import get_redis
+    return get_redis()
+
+
+def schedule_due(items: Iterable[Tuple[str, datetime]], redis_conn=None, key: str = DUE_KEY) -> int:
+    """
+    Register (member, due_at) pairs. Re-registering a member moves it.
+
+    Never raises - if Redis is down the reconciliation tick still finds the rows.
+    Call after the DB commit so the handler can see the row when it fires.
+
+    Returns:
+        Number of members registered
+    """
+    mapping = {member: israel_to_epoch(due_at) for member, due_at in items if due_at is not None}
+    if not mapping:
+        return 0
+    try:
+        (redis_conn or _get_redis()).zadd(key, mapping)
+        return len(mapping)
+    except Exception as e:
+        logger.warning(f"[DUE-SCHED] Failed to register {len(mapping)} due item(s) (reconciliation will pick them up): {e}")
+        return 0
+
+
+def schedule_scheduled_messages(entries: Iterable[Tuple[int, datetime]], redis_conn=None) -> int:
+    """Register ScheduledMessagesQueue rows: [(message_id, scheduled_for)]"""
+    return schedule_due(((due_member(KIND_SCHEDULED_MESSAGE, message_id), scheduled_for)
+                         for message_id, scheduled_for in entries), redis_conn)
+
+
+def schedule_appointment_run(run_id: int, business_id: int, scheduled_for: datetime, redis_conn=None) -> int:
+    """Register an AppointmentAutomationRun"""
+    return schedule_due([(due_member(KIND_APPOINTMENT_RUN, business_id, run_id), scheduled_for)], redis_conn)
+
+
+def pop_due(redis_conn, now: Optional[float] = None, limit: int = POP_BATCH, key: str = DUE_KEY) -> List[str]:
+    """Atomically remove and return members due at `now` (epoch seconds)"""
+    now = time.time() if now is None else now
+    items = redis_conn.eval(_POP_DUE_LUA, 1, key, repr(now), limit)
+    return [item.decode() if isinstance(item, bytes) else item for item in items]
+
+
+def seconds_until_next_due(redis_conn, now: Optional[float] = None, key: str = DUE_KEY) -> Optional[float]:
+    """Seconds until the earliest member is due (0 if overdue), None if the index is empty"""
+    now = time.time() if now is None else now
+    head = redis_conn.zrange(key, 0, 0, withscores=True)
+    if not head:
+        return None
+    return max(0.0, head[0][1] - now)
+
+
+# ─── Handlers ──────────────────────────────────────────────
+
+def _dispatch_scheduled_messages(parts_list: List[List[str]]) -> int:
+    from server.services import scheduled_messages_service
+    from server.jobs.scheduled_messages_tick_job import enqueue_claimed_messages
+
+    message_ids = [int(parts[0]) for parts in parts_list]
+    # Same atomic claim as the tick - rows already sent/cancelled/claimed are skipped
+    messages = scheduled_messages_service.claim_pending_messages(
+        batch_size=len(message_ids), message_ids=message_ids
+    )
+    enqueued, _ = enqueue_claimed_messages(messages)
+    return enqueued
+
+
+def _dispatch_appointment_runs(parts_list: List[List[str]]) -> int:
+    from server.services.jobs import enqueue
+    from server.jobs.send_appointment_confirmation_job import send_appointment_confirmation
+
+    enqueued = 0
+    for business_id, run_id in parts_list:
+        try:
+            # The job re-checks status='pending' and weekday rules
+            enqueue(
+                'default',
+                send_appointment_confirmation,
+                run_id=int(run_id),
+                business_id=int(business_id)
+            )
+            enqueued += 1
+        except Exception as e:
+            logger.error(f"[DUE-SCHED] Failed to enqueue appointment run {run_id}: {e}")
+    return enqueued
+
+
+HANDLERS: Dict[str, Callable[[List[List[str]]], int]] = {
+    KIND_SCHEDULED_MESSAGE: _dispatch_scheduled_messages,
+    KIND_APPOINTMENT_RUN: _dispatch_appointment_runs,
+}
+
+
+def dispatch_due(members: List[str], handlers: Optional[Dict[str, Callable]] = None) -> int:
+    """
+    Enqueue popped members, one handler call per kind
+
+    Returns:
+        Number of jobs enqueued
+    """
+    handlers = handlers or HANDLERS
+    by_kind = defaultdict(list)
+    for member in members:
+        kind, parts = parse_member(member)
+        by_kind[kind].append(parts)
+
+    enqueued = 0
+    for kind, parts_list in by_kind.items():
+        handler = handlers.get(kind)
+        if handler is None:
+            logger.warning(f"[DUE-SCHED] No handler for kind '{kind}' - dropping {len(parts_list)} item(s)")
+            continue
+        try:
+            enqueued += handler(parts_list)
+        except Exception as e:
+            # The rows are still pending in the DB - the reconcile tick picks them up
+            logger.error(f"[DUE-SCHED] Handler '{kind}' failed for {len(parts_list)} item(s): {e}", exc_info=True)
+            try:
+                from server.db import db
+                db.session.rollback()
+            except Exception:
+                pass
+    return enqueued
+
+
+def reconcile_due_index(redis_conn=None) -> Dict[str, int]:
+    """
+    Register every pending DB row in the index (idempotent - ZADD just updates scores)
+
+    Run on scheduler startup: covers rows created while Redis was unavailable or
+    before the index existed.
+    """
+    from server.models_sql import AppointmentAutomationRun, ScheduledMessagesQueue
+
+    redis_conn = redis_conn or _get_redis()
+    counts = {KIND_SCHEDULED_MESSAGE: 0, KIND_APPOINTMENT_RUN: 0}
+
+    def flush(batch):
+        if batch:
+            redis_conn.zadd(DUE_KEY, dict(batch))
+            batch.clear()
+
+    batch = []
+    rows = ScheduledMessagesQueue.query.with_entities(
+        ScheduledMessagesQueue.id, ScheduledMessagesQueue.scheduled_for
+    ).filter(
+        ScheduledMessagesQueue.status == 'pending',
+        ScheduledMessagesQueue.locked_at.is_(None)
+    ).yield_per(RECONCILE_CHUNK)
+    for row in rows:
+        batch.append((due_member(KIND_SCHEDULED_MESSAGE, row.id), israel_to_epoch(row.scheduled_for)))
+        counts[KIND_SCHEDULED_MESSAGE] += 1
+        if len(batch) >= RECONCILE_CHUNK:
+            flush(batch)
+    flush(batch)
+
+    rows = AppointmentAutomationRun.query.with_entities(
+        AppointmentAutomationRun.id, AppointmentAutomationRun.business_id, AppointmentAutomationRun.scheduled_for
+    ).filter(
+        AppointmentAutomationRun.status == 'pending'
+    ).yield_per(RECONCILE_CHUNK)
+    for row in rows:
+        batch.append((due_member(KIND_APPOINTMENT_RUN, row.business_id, row.id), israel_to_epoch(row.scheduled_for)))
+        counts[KIND_APPOINTMENT_RUN] += 1
+        if len(batch) >= RECONCILE_CHUNK:
+            flush(batch)
+    flush(batch)
+
+    logger.info(f"[DUE-SCHED] Reconciled due index from DB: {counts}")
+    return counts
@@ -0,0 +1,173 @@
+"""
+Absolute-timeline pacer for outbound 20ms Twilio frames
+
+The TX loop used to sleep "20ms after the previous send" and re-anchor on every
+missed deadline, so each late wake-up pushed the whole stream back (drift) and
+playback turned bursty under CPU pressure.
+
+FramePacer schedules frame k of a talk-spurt at anchor + k * interval on a
+monotonic clock:
+- Slightly behind (≤ max_catchup_frames): the next frames are due immediately,
+  so the stream catches up with a short bounded burst (Twilio buffers it)
+- Far behind: the debt is dropped - the timeline is re-anchored at "now"
+  (counted in `resyncs`); audio frames themselves are never dropped here
+- Queue empty when a frame is due: the spurt is suspended. If audio resumes
+  within `turn_gap` it was an underrun (starvation mid-turn); otherwise the
+  AI turn ended and end_turn_if_idle() closes the per-turn counters
+
+The clock is injectable so pacing can be simulated deterministically:
+
+    pacer = FramePacer(clock=fake_clock)
+    pacer.frame_sent(queue_depth=tx_q.qsize())
+    time.sleep(pacer.delay())
+"""
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+
+class PacerCounters:
+    """Jitter / lateness / depth counters for one scope (call or turn)"""
+
+    def __init__(self, window: int = 3000):
+        self.frames = 0
+        self.late_frames = 0
+        self.resyncs = 0
+        self.underruns = 0
+        self.jitter_max = 0.0
+        self.jitter_sum = 0.0
+        self.queue_depth_max = 0
+        self.queue_depth_sum = 0
+        self._jitter_window = deque(maxlen=window)
+
+    def record(self, jitter: float, late: bool, queue_depth: int) -> None:
+        self.frames += 1
+        self.jitter_sum += jitter
+        if jitter > self.jitter_max:
+            self.jitter_max = jitter
+        self._jitter_window.append(jitter)
+        if late:
+            self.late_frames += 1
+        self.queue_depth_sum += queue_depth
+        if queue_depth > self.queue_depth_max:
+            self.queue_depth_max = queue_depth
+
+    def as_dict(self) -> Dict[str, float]:
+        window = sorted(self._jitter_window)
+
+        def pct(p: float) -> float:
+            if not window:
+                return 0.0
+            return window[min(len(window) - 1, int(p * len(window)))] * 1000.0
+
+        return {
+            "frames": self.frames,
+            "late_frames": self.late_frames,
+            "resyncs": self.resyncs,
+            "underruns": self.underruns,
+            "jitter_avg_ms": round(self.jitter_sum / self.frames * 1000.0, 2) if self.frames else 0.0,
+            "jitter_p50_ms": round(pct(0.50), 2),
+            "jitter_p99_ms": round(pct(0.99), 2),
+            "jitter_max_ms": round(self.jitter_max * 1000.0, 2),
+            "queue_depth_avg": round(self.queue_depth_sum / self.frames, 1) if self.frames else 0.0,
+            "queue_depth_max": self.queue_depth_max,
+        }
+
+
+class FramePacer:
+    """
+    Monotonic-clock frame scheduler with drift correction
+
+    Args:
+        interval: Frame period in seconds (AUDIO_CONFIG["frame_pacing_ms"] / 1000)
+        clock: Monotonic time source (injectable for simulation)
+        max_catchup_frames: How far behind (in frames) is caught up with a burst
+                            before the timeline is re-anchored
+        late_threshold: A frame sent this long after its due time counts as late
+        turn_gap: Silence that separates an underrun from the end of an AI turn
+    """
+
+    def __init__(self, interval: float = 0.02, clock: Callable[[], float] = time.monotonic,
+                 max_catchup_frames: int = 3, late_threshold: Optional[float] = None,
+                 turn_gap: float = 0.3):
+        self.interval = interval
+        self.clock = clock
+        self.max_catchup = max_catchup_frames * interval
+        self.late_threshold = interval / 4 if late_threshold is None else late_threshold
+        self.turn_gap = turn_gap
+
+        self._next_due: Optional[float] = None   # None = no active spurt
+        self._starved_at: Optional[float] = None  # queue ran dry at this time
+        self._turn_open = False
+
+        self.call = PacerCounters()
+        self.turn = PacerCounters()
+
+    @property
+    def active(self) -> bool:
+        """True while a talk-spurt is being paced"""
+        return self._next_due is not None
+
+    def delay(self) -> float:
+        """Seconds to wait before the next frame (0 when due, behind, or idle)"""
+        if self._next_due is None:
+            return 0.0
+        return max(0.0, self._next_due - self.clock())
+
+    def frame_sent(self, queue_depth: int = 0) -> None:
+        """Record a media frame just handed to the websocket and schedule the next one"""
+        now = self.clock()
+        if self._starved_at is not None:
+            if now - self._starved_at < self.turn_gap:
+                # Audio resumed quickly - the queue was starved mid-turn
+                self.call.underruns += 1
+                self.turn.underruns += 1
+            self._starved_at = None
+        if self._next_due is None:
+            self._next_due = now  # new spurt: this frame is the anchor
+        self._turn_open = True
+
+        lateness = now - self._next_due
+        jitter = abs(lateness)
+        late = lateness > self.late_threshold
+        self.call.record(jitter, late, queue_depth)
+        self.turn.record(jitter, late, queue_depth)
+
+        self._next_due += self.interval
+        if now - self._next_due > self.max_catchup:
+            # Too far behind to catch up with a short burst - drop the debt
+            self._next_due = now + self.interval
+            self.call.resyncs += 1
+            self.turn.resyncs += 1
+
+    def starved(self) -> None:
+        """Queue was empty when the next frame was due - suspend the spurt"""
+        if self._next_due is not None:
+            self._next_due = None
+            self._starved_at = self.clock()
+
+    def reset(self) -> None:
+        """Stream was cleared (barge-in / clear event) - next frame starts a new spurt"""
+        self._next_due = None
+        self._starved_at = None
+
+    def end_turn_if_idle(self) -> Optional[Dict[str, float]]:
+        """
+        Close the current AI turn once the queue has been idle for `turn_gap`
+
+        Returns:
+            The finished turn's counters, or None if no turn ended
+        """
+        if not self._turn_open or self._next_due is not None:
+            return None
+        if self._starved_at is not None and self.clock() - self._starved_at < self.turn_gap:
+            return None
+        self._turn_open = False
+        self._starved_at = None
+        stats = self.turn.as_dict()
+        self.turn = PacerCounters()
+        return stats
+
+    def stats(self) -> Dict[str, float]:
+        """Call-level counters"""
+        return self.call.as_dict()
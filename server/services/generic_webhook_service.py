@@ -262,29 +262,17 @@ def send_generic_webhook(
             logger.error(f"❌ [WEBHOOK] Failed to send {event_type} after {MAX_RETRIES} attempts")
             return False
         
-        # 🔥 REMOVED THREADING: Use RQ job for webhook sending with retry
-        try:
-            from server.services.jobs import enqueue_job
-            from server.jobs.send_webhook_job import send_webhook_job
-            
-            enqueue_job(
-                queue_name='default',
-                func=send_webhook_job,
-                url=url,
-                payload=payload_for_send,
-                event_type=event_type,
-                business_id=business_id,
-                secret=secret,
-                timeout=60,
-                retry=0,  # Job already has internal retry logic
-                description=f"Send {event_type} webhook"
-            )
-            logger.info(f"✅ [WEBHOOK] Webhook queued for sending via RQ worker")
+        # Outbox: delivery jobs send it with pooled connections and backoff retries
+        from server.services.webhook_delivery import CHANNEL_GENERIC, enqueue_webhook
+        outbox_id = enqueue_webhook(
+            CHANNEL_GENERIC, webhook_url, payload_json, headers, event_type, business_id=business_id
+        )
+        if outbox_id is not None:
+            logger.info(f"✅ [WEBHOOK] {event_type} queued for delivery (outbox #{outbox_id})")
             return True
-        except Exception as enqueue_error:
-            logger.error(f"[WEBHOOK] Failed to enqueue webhook job: {enqueue_error}")
-            # Fallback: try sending synchronously
-            return send_with_retry()
+
+        # Fallback: outbox disabled or unavailable - send synchronously
+        return send_with_retry()
         
     except Exception as e:
         logger.error(f"[WEBHOOK] ❌ Error sending webhook: {e}")
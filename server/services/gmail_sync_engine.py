@@ -0,0 +1,569 @@
+"""
+Gmail Sync Engine - pipelined, resumable receipt sync
+
+sync_gmail_receipts() decides WHAT to sync (date-range query, monthly
+backfill, history-ID incremental); this module decides HOW:
+
+1. listing    - messages.list pages (or a history.list id set) on the caller's
+                thread, kept GMAIL_SYNC_PREFETCH messages ahead of saving
+2. fetching   - thread pool: messages arrive GMAIL_SYNC_BATCH_SIZE per batch
+                request (format=full); receipt candidates get their PDF/image
+                attachments downloaded as separate tasks
+3. extracting - process pool (server/services/receipt_extraction.py): PDF text,
+                confidence and amount/vendor parsing of each candidate, or its
+                cached result when the same content was parsed before
+4. saving     - caller's thread, in listing order: process_single_receipt_message()
+                owns the DB session, previews and Receipt rows
+
+All Gmail calls of one mailbox share a GmailRateLimiter (quota units/sec).
+
+Checkpoints: every saved receipt is committed together with the run's position
+(current_month = segment label, last_page_token = token of the page being
+processed). The sync job resumes the business's latest unfinished run with the
+same parameters; the engine then re-lists that page and skips messages that
+already have a Receipt from this run.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from server.config import (
+    GMAIL_SYNC_BATCH_SIZE,
+    GMAIL_SYNC_FETCH_WORKERS,
+    GMAIL_SYNC_PREFETCH,
+    GMAIL_SYNC_RESUME_MAX_AGE_HOURS,
+    RECEIPT_EXTRACTION_CACHE,
+)
+from server.services.gmail_sync_service import (
+    ERROR_MESSAGE_MAX_LENGTH,
+    check_is_receipt_email,
+    extract_all_attachments,
+    extract_email_html,
+    process_single_receipt_message,
+    strip_null_bytes,
+)
+from server.services.receipt_extraction import (
+    ExtractionCache,
+    ExtractionPool,
+    ExtractionTimeout,
+    failed_extraction,
+    submit_extraction,
+)
+
+logger = logging.getLogger(__name__)
+
+# Same types process_single_receipt_message() saves
+DOWNLOADABLE_MIME_TYPES = ('application/pdf', 'image/jpeg', 'image/png', 'image/webp', 'image/gif')
+
+# messagesAdded entries with these labels are never receipts to import
+HISTORY_SKIP_LABELS = {'DRAFT', 'SPAM', 'TRASH'}
+
+LIST_PAGE_SIZE = 100
+CHECKPOINT_EVERY = 20  # messages between heartbeat / cancellation checks
+
+RESUMABLE_STATUSES = ('running', 'paused', 'failed')
+
+
+@dataclass
+class SyncSegment:
+    """One listing unit: a Gmail search query, or explicit message ids (history mode)"""
+    label: Optional[str] = None  # month (YYYY-MM) in backfill - stored as the run's current_month
+    query: Optional[str] = None
+    message_ids: Optional[List[str]] = None
+
+
+@dataclass
+class PrefetchedMessage:
+    """A listed message with everything the saving stage needs, fetched ahead of time"""
+    message_id: str
+    page_token: Optional[str] = None  # token of the page that listed it (checkpoint)
+    message: Optional[dict] = None
+    is_receipt: bool = False
+    confidence: int = 0
+    metadata: dict = field(default_factory=dict)
+    attachments: Dict[str, object] = field(default_factory=dict)  # attachment id -> Future[bytes]
+    extraction: Optional[object] = None  # Future[dict] from the extraction stage
+    extraction_key: Optional[str] = None  # cache key for a freshly parsed result
+    ready: threading.Event = field(default_factory=threading.Event)  # downloads done, extraction submitted
+    error: Optional[Exception] = None
+
+
+class MessagePrefetcher:
+    """
+    Fetch stage of the pipeline - no DB access, usable on its own (bench, tests)
+
+    iter_messages() takes (message_id, page_token) pairs and yields
+    PrefetchedMessage in the same order, with up to `window` messages being
+    fetched in the background. Receipt candidates are handed to the
+    extraction stage as soon as their attachments are downloaded; pass an
+    ExtractionCache to reuse earlier results.
+    """
+
+    def __init__(self, gmail, fetch_workers: int = None, extract_workers: int = None,
+                 batch_size: int = None, window: int = None, extraction_cache: ExtractionCache = None):
+        self.gmail = gmail
+        self.batch_size = batch_size or GMAIL_SYNC_BATCH_SIZE
+        self.window = max(window or GMAIL_SYNC_PREFETCH, self.batch_size)
+        self.extraction_pool = ExtractionPool(workers=extract_workers)
+        self.extraction_cache = extraction_cache
+        self._fetch_pool = ThreadPoolExecutor(max_workers=fetch_workers or GMAIL_SYNC_FETCH_WORKERS,
+                                              thread_name_prefix='gmail-fetch')
+        self.stats = {'batches': 0, 'messages': 0, 'attachments': 0, 'extractions': 0, 'wait_seconds': 0.0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._fetch_pool.shutdown(wait=True, cancel_futures=True)
+        self.extraction_pool.close()
+
+    def iter_messages(self, listed: Iterable[Tuple[str, Optional[str]]]) -> Iterator[PrefetchedMessage]:
+        source = iter(listed)
+        pending = deque()  # (future of List[PrefetchedMessage], size) in listing order
+        in_flight = 0
+        batch = []
+        exhausted = False
+
+        while True:
+            # Keep the window full: listing runs here, fetching in the pool
+            while not exhausted and in_flight + len(batch) < self.window:
+                try:
+                    batch.append(next(source))
+                except StopIteration:
+                    exhausted = True
+                    break
+                if len(batch) >= self.batch_size:
+                    pending.append((self._fetch_pool.submit(self._fetch_batch, batch), len(batch)))
+                    in_flight += len(batch)
+                    batch = []
+            if batch and (exhausted or not pending):
+                pending.append((self._fetch_pool.submit(self._fetch_batch, batch), len(batch)))
+                in_flight += len(batch)
+                batch = []
+            if not pending:
+                return
+
+            future, size = pending.popleft()
+            waited = time.monotonic()
+            items = future.result()
+            self.stats['wait_seconds'] += time.monotonic() - waited
+            self.stats['batches'] += 1 if size > 1 else 0
+            in_flight -= size
+            for item in items:
+                if item.is_receipt and item.error is None:
+                    waited = time.monotonic()
+                    item.ready.wait()
+                    self.stats['wait_seconds'] += time.monotonic() - waited
+                self.stats['messages'] += 1
+                self.stats['attachments'] += len(item.attachments)
+                self.stats['extractions'] += 1 if item.extraction is not None else 0
+                yield item
+
+    def _fetch_batch(self, listed: List[Tuple[str, Optional[str]]]) -> List[PrefetchedMessage]:
+        message_ids = [message_id for message_id, _ in listed]
+        fetched = {}
+        if len(message_ids) > 1:
+            try:
+                fetched = self.gmail.batch_get_messages(message_ids)
+            except Exception as e:
+                logger.warning(f"⚠️ Batch fetch of {len(message_ids)} messages failed, fetching one by one: {e}")
+
+        items = []
+        for message_id, page_token in listed:
+            item = PrefetchedMessage(message_id=message_id, page_token=page_token)
+            try:
+                message = fetched.get(message_id)
+                if not isinstance(message, dict):
+                    # Not batched, or this part failed (e.g. 429 inside the batch) - get() retries
+                    message = self.gmail.get_message(message_id)
+                item.message = message
+                item.is_receipt, item.confidence, item.metadata = check_is_receipt_email(message)
+                if item.is_receipt:
+                    self._start_downloads(item)
+            except Exception as e:
+                item.error = e
+            items.append(item)
+        return items
+
+    def _start_downloads(self, item: PrefetchedMessage):
+        pdf_ids = []
+        for att in extract_all_attachments(item.message):
+            if att['mime_type'] not in DOWNLOADABLE_MIME_TYPES or not att['id'] or att['id'] in item.attachments:
+                continue
+            if att['mime_type'] == 'application/pdf':
+                pdf_ids.append(att['id'])
+            item.attachments[att['id']] = self._fetch_pool.submit(self.gmail.get_attachment, item.message_id, att['id'])
+        if not item.attachments:
+            self._start_extraction(item, pdf_ids)
+            return
+
+        remaining = [len(item.attachments)]
+        lock = threading.Lock()
+
+        def downloaded(_future):
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                self._start_extraction(item, pdf_ids)
+
+        for future in list(item.attachments.values()):
+            future.add_done_callback(downloaded)
+
+    def _start_extraction(self, item: PrefetchedMessage, pdf_ids: List[str]):
+        """Runs on the thread that finished the last download"""
+        try:
+            futures = item.attachments.values()
+            if any(future.cancelled() or future.exception() is not None for future in futures):
+                return  # process_single_receipt_message() downloads and extracts this one itself
+            html = extract_email_html(item.message)
+            item.extraction, item.extraction_key = submit_extraction(
+                self.extraction_pool, self.extraction_cache,
+                pdfs=[item.attachments[attachment_id].result() for attachment_id in pdf_ids],
+                html=strip_null_bytes(html) if html else '',
+                subject=item.metadata.get('subject', ''),
+                from_domain=item.metadata.get('from_domain', ''),
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Could not start receipt extraction for {item.message_id}, extracting inline: {e}")
+        finally:
+            item.ready.set()
+
+
+class _PrefetchedGmail:
+    """Gmail client for process_single_receipt_message(): serves prefetched attachments first"""
+
+    def __init__(self, gmail, attachments: Dict[str, bytes]):
+        self._gmail = gmail
+        self._attachments = attachments
+
+    def get_attachment(self, message_id: str, attachment_id: str) -> bytes:
+        data = self._attachments.get(attachment_id)
+        return data if data is not None else self._gmail.get_attachment(message_id, attachment_id)
+
+    def __getattr__(self, name):
+        return getattr(self._gmail, name)
+
+
+def list_history_message_ids(gmail, start_history_id: str) -> List[str]:
+    """Ids of messages added to the mailbox since start_history_id, oldest first"""
+    message_ids = []
+    seen = set()
+    page_token = None
+    while True:
+        page = gmail.list_history(start_history_id, page_token=page_token)
+        for record in page.get('history', []):
+            for added in record.get('messagesAdded', []):
+                message = added.get('message', {})
+                message_id = message.get('id')
+                if not message_id or message_id in seen or HISTORY_SKIP_LABELS & set(message.get('labelIds', [])):
+                    continue
+                seen.add(message_id)
+                message_ids.append(message_id)
+        page_token = page.get('nextPageToken')
+        if not page_token:
+            return message_ids
+
+
+def current_history_id(gmail) -> Optional[str]:
+    """Mailbox history position now, or None if the profile can't be read"""
+    try:
+        history_id = gmail.get_profile().get('historyId')
+        return str(history_id) if history_id else None
+    except Exception as e:
+        logger.warning(f"⚠️ Could not read Gmail historyId, next incremental sync will use a date query: {e}")
+        return None
+
+
+def has_checkpoint(sync_run) -> bool:
+    """True if the run already made progress (a resumed run, not a fresh one)"""
+    return bool(sync_run.messages_scanned or sync_run.current_month or sync_run.last_page_token)
+
+
+def restore_counters(sync_run, result: dict):
+    """Continue a resumed run's counters instead of starting them from zero"""
+    result['pages_scanned'] = sync_run.pages_scanned or 0
+    result['messages_scanned'] = sync_run.messages_scanned or 0
+    result['candidate_receipts'] = sync_run.candidate_receipts or 0
+    result['saved_receipts'] = result['new_count'] = sync_run.saved_receipts or 0
+    result['errors'] = sync_run.errors_count or 0
+
+
+def find_resumable_sync_run(business_id: int, mode: str, from_date: str = None, to_date: str = None,
+                            months_back: int = None):
+    """
+    The business's latest run, if it stopped before finishing with the same parameters
+
+    Call only while holding the business's sync lock: a 'running' run found
+    here is the orphan of a killed worker, not a live sync.
+    """
+    from server.models_sql import ReceiptSyncRun
+
+    latest = ReceiptSyncRun.query.filter_by(business_id=business_id).order_by(ReceiptSyncRun.id.desc()).first()
+    if not latest or latest.status not in RESUMABLE_STATUSES:
+        return None
+
+    from_date_obj = datetime.strptime(from_date, '%Y-%m-%d').date() if from_date else None
+    to_date_obj = datetime.strptime(to_date, '%Y-%m-%d').date() if to_date else None
+    if (latest.mode, latest.from_date, latest.to_date, latest.months_back) != (mode, from_date_obj, to_date_obj, months_back):
+        return None
+
+    started_at = latest.started_at
+    if started_at and started_at.tzinfo is None:
+        started_at = started_at.replace(tzinfo=timezone.utc)
+    if started_at and datetime.now(timezone.utc) - started_at > timedelta(hours=GMAIL_SYNC_RESUME_MAX_AGE_HOURS):
+        return None
+    return latest
+
+
+class GmailSyncEngine:
+    """
+    Saving stage + checkpoints for one sync run
+
+    run() returns why it stopped early - 'paused' (per-run message/time
+    budget), 'cancelled' or 'max_messages' - or None when every segment
+    was processed.
+    """
+
+    def __init__(self, gmail, business_id: int, sync_run, result: dict, attachment_service, *,
+                 max_messages: int = None, run_to_completion: bool = False, max_messages_per_run: int = None,
+                 max_seconds_per_run: int = None, start_time: float = None, heartbeat_callback=None,
+                 resumed: bool = False):
+        self.gmail = gmail
+        self.business_id = business_id
+        self.sync_run = sync_run
+        self.result = result
+        self.attachment_service = attachment_service
+        self.max_messages = max_messages
+        self.run_to_completion = run_to_completion
+        self.max_messages_per_run = max_messages_per_run
+        self.max_seconds_per_run = max_seconds_per_run
+        self.start_time = start_time or time.time()
+        self.heartbeat_callback = heartbeat_callback
+        self.resumed = resumed
+        self.scanned = 0  # messages scanned by this invocation (budgets count these, not the run total)
+        self.cache = None
+        self.stats = {}
+
+    def run(self, segments: List[SyncSegment]) -> Optional[str]:
+        from server.db import db
+
+        started = time.monotonic()
+        self.cache = ExtractionCache(self.business_id, db.engine) if RECEIPT_EXTRACTION_CACHE else None
+        prefetcher = MessagePrefetcher(self.gmail, extraction_cache=self.cache)
+        try:
+            for segment, page_token in self._from_checkpoint(segments):
+                if self._cancelled():
+                    return 'cancelled'
+                if segment.label:
+                    logger.info(f"📅 Processing month: {segment.label}")
+                self._checkpoint(segment, page_token)
+                self._commit()
+
+                stop = self._run_segment(prefetcher, segment, page_token)
+                if stop:
+                    return stop
+                if segment.label:
+                    self.result['months_processed'] += 1
+            return None
+        finally:
+            prefetcher.close()
+            self.stats = dict(prefetcher.stats, retries=getattr(self.gmail, 'retries', 0),
+                              seconds=round(time.monotonic() - started, 1),
+                              extraction_timeouts=prefetcher.extraction_pool.stats['timeouts'])
+            if self.cache is not None:
+                self.stats['extraction_cache_hits'] = self.cache.stats['hits']
+            self.stats['wait_seconds'] = round(self.stats['wait_seconds'], 1)
+
+    def _from_checkpoint(self, segments: List[SyncSegment]) -> List[Tuple[SyncSegment, Optional[str]]]:
+        if not self.resumed:
+            return [(segment, None) for segment in segments]
+        for idx, segment in enumerate(segments):
+            if segment.label == self.sync_run.current_month:
+                logger.info(f"⏯️ RESUME: run_id={self.sync_run.id}, segment={segment.label or 'all'}, "
+                            f"page_token={'yes' if self.sync_run.last_page_token else 'first page'}")
+                return [(segment, self.sync_run.last_page_token)] + [(s, None) for s in segments[idx + 1:]]
+        logger.info(f"⏯️ RESUME: run_id={self.sync_run.id}, checkpoint {self.sync_run.current_month} not in this sync - starting over")
+        return [(segment, None) for segment in segments]
+
+    def _run_segment(self, prefetcher: MessagePrefetcher, segment: SyncSegment, page_token: Optional[str]) -> Optional[str]:
+        for item in prefetcher.iter_messages(self._list(segment, page_token)):
+            stop = self._budget_exhausted()
+            if stop:
+                if stop == 'paused':
+                    self._pause(segment, item.page_token)
+                return stop
+
+            self.scanned += 1
+            self.result['messages_scanned'] += 1
+            self._checkpoint(segment, item.page_token)
+
+            if self.scanned % CHECKPOINT_EVERY == 0:
+                self._commit()
+                if self.heartbeat_callback:
+                    self.heartbeat_callback()
+                if self._cancelled():
+                    return 'cancelled'
+                if self.scanned % (CHECKPOINT_EVERY * 5) == 0:
+                    logger.info(
+                        f"📊 RUN_PROGRESS: run_id={self.sync_run.id}, "
+                        f"messages_scanned={self.result['messages_scanned']}, "
+                        f"saved={self.result['saved_receipts']}, "
+                        f"skipped_non_receipts={self.result.get('skipped_non_receipts', 0)}, "
+                        f"errors={self.result['errors']}"
+                    )
+
+            self._save(item, prefetcher.extraction_pool)
+        return None
+
+    def _list(self, segment: SyncSegment, page_token: Optional[str]) -> Iterator[Tuple[str, Optional[str]]]:
+        if segment.message_ids is not None:
+            for message_id in self._skip_saved(segment.message_ids):
+                yield message_id, None
+            return
+
+        while True:
+            page = self.gmail.list_messages(query=segment.query, max_results=LIST_PAGE_SIZE, page_token=page_token)
+            self.result['pages_scanned'] += 1
+            message_ids = [m['id'] for m in page.get('messages', [])]
+            next_token = page.get('nextPageToken')
+            logger.info(f"📄 PAGE_FETCH: page={self.result['pages_scanned']}, messages={len(message_ids)}, has_next={bool(next_token)}")
+
+            for message_id in self._skip_saved(message_ids):
+                yield message_id, page_token
+            if not message_ids or not next_token:
+                return
+            page_token = next_token
+
+    def _skip_saved(self, message_ids: List[str]) -> List[str]:
+        """On resume, drop messages this run already saved a Receipt for"""
+        if not self.resumed or not message_ids:
+            return message_ids
+        from server.models_sql import Receipt
+
+        saved = set()
+        for start in range(0, len(message_ids), 500):
+            saved.update(row.gmail_message_id for row in Receipt.query.with_entities(Receipt.gmail_message_id).filter(
+                Receipt.business_id == self.business_id,
+                Receipt.gmail_message_id.in_(message_ids[start:start + 500]),
+                Receipt.created_at >= self.sync_run.started_at,
+            ))
+        if saved:
+            self.result['resume_skipped'] = self.result.get('resume_skipped', 0) + len(saved)
+        return [message_id for message_id in message_ids if message_id not in saved]
+
+    def _budget_exhausted(self) -> Optional[str]:
+        if not self.run_to_completion:
+            if self.max_messages_per_run and self.scanned >= self.max_messages_per_run:
+                logger.info(f"⏸️ Reached MAX_MESSAGES_PER_RUN ({self.max_messages_per_run}), pausing for resume")
+                return 'paused'
+            if self.max_seconds_per_run and time.time() - self.start_time >= self.max_seconds_per_run:
+                logger.info(f"⏸️ Reached MAX_SECONDS_PER_RUN ({self.max_seconds_per_run}s), pausing for auto-resume")
+                logger.info(f"   Progress: {self.result['messages_scanned']} messages, {self.result['saved_receipts']} receipts")
+                return 'paused'
+        if self.max_messages and self.scanned >= self.max_messages:
+            logger.info(f"Reached max_messages limit ({self.max_messages})")
+            return 'max_messages'
+        return None
+
+    def _save(self, item: PrefetchedMessage, extraction_pool: ExtractionPool):
+        from server.db import db
+
+        message_id = item.message_id
+        try:
+            if item.error:
+                raise item.error
+            self.result['processed'] += 1
+            if item.is_receipt:
+                self.result['candidate_receipts'] += 1
+
+            receipt = process_single_receipt_message(
+                message_id=message_id,
+                gmail=_PrefetchedGmail(self.gmail, self._attachment_data(item)),
+                business_id=self.business_id,
+                attachment_service=self.attachment_service,
+                result=self.result,
+                sync_run=self.sync_run,
+                message=item.message,
+                is_receipt=item.is_receipt,
+                confidence=item.confidence,
+                metadata=item.metadata,
+                extraction=self._extraction(item, extraction_pool),
+            )
+            if receipt:
+                # The receipt and the checkpoint that covers it land in one transaction
+                self._commit()
+        except Exception as e:
+            # Per-message error handling: rollback and continue to next message
+            logger.error(f"❌ Error processing message {message_id}: {e}", exc_info=True)
+            try:
+                db.session.rollback()  # Rollback failed transaction
+            except Exception as rollback_err:
+                logger.error(f"❌ Rollback failed: {rollback_err}")
+            self.result['errors'] += 1
+            self.sync_run.error_message = f"{message_id}: {str(e)[:ERROR_MESSAGE_MAX_LENGTH]}"  # Track last error
+
+    @staticmethod
+    def _attachment_data(item: PrefetchedMessage) -> Dict[str, bytes]:
+        data = {}
+        for attachment_id, future in item.attachments.items():
+            if future.done() and not future.cancelled() and future.exception() is None:
+                data[attachment_id] = future.result()
+        return data
+
+    def _extraction(self, item: PrefetchedMessage, extraction_pool: ExtractionPool) -> Optional[dict]:
+        if item.extraction is None:
+            return None
+        try:
+            result = extraction_pool.result(item.extraction)
+        except ExtractionTimeout as e:
+            logger.warning(f"⚠️ {e} for {item.message_id} - saving without parsed fields")
+            return failed_extraction(item.metadata.get('subject', ''), item.metadata.get('from_domain', ''),
+                                     'extraction_timeout')
+        except Exception as e:
+            logger.warning(f"⚠️ Receipt extraction failed for {item.message_id}, extracting inline: {e}")
+            return None
+        if item.extraction_key and self.cache is not None:
+            self.cache.store(item.extraction_key, result)
+        return result
+
+    def _checkpoint(self, segment: SyncSegment, page_token: Optional[str]):
+        """Record the position (committed with the next receipt / checkpoint commit)"""
+        run = self.sync_run
+        run.current_month = segment.label
+        run.last_page_token = page_token
+        run.pages_scanned = self.result['pages_scanned']
+        run.messages_scanned = self.result['messages_scanned']
+        run.candidate_receipts = self.result['candidate_receipts']
+        run.saved_receipts = self.result['saved_receipts']
+        run.errors_count = self.result['errors']
+
+    def _commit(self):
+        from server.db import db
+
+        now = datetime.now(timezone.utc)
+        self.sync_run.last_heartbeat_at = now
+        self.sync_run.updated_at = now
+        db.session.commit()
+
+    def _pause(self, segment: SyncSegment, page_token: Optional[str]):
+        self._checkpoint(segment, page_token)
+        self.sync_run.status = 'paused'
+        self._commit()
+
+    def _cancelled(self) -> bool:
+        from server.db import db
+
+        db.session.refresh(self.sync_run)
+        if self.sync_run.status == 'cancelled' or self.sync_run.cancel_requested:
+            logger.info(f"⛔ Sync {self.sync_run.id} cancelled")
+            return True
+        return False
@@ -24,19 +24,28 @@ Security:
 
 import logging
 import base64
+import json
 import os
 import re
 import threading
+import time
+import uuid
 from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Optional, Tuple
 from email.utils import parsedate_to_datetime
 
-# Try importing Playwright at module level for efficiency
-try:
-    from playwright.sync_api import sync_playwright
-    PLAYWRIGHT_AVAILABLE = True
-except ImportError:
-    PLAYWRIGHT_AVAILABLE = False
+from server.config import (
+    GMAIL_API_ROOT,
+    GMAIL_SYNC_HISTORY_ENABLED,
+    GMAIL_SYNC_MAX_RETRIES,
+    GMAIL_SYNC_QUOTA_UNITS_PER_SEC,
+)
+from server.services.browser_pool import RenderTimeout, get_browser_pool
+from server.services.lazy_services import sdk_available
+
+# Playwright (and its driver) is imported on the first render, not at boot.
+# Renders run on the pooled Chromium pages of get_browser_pool().
+PLAYWRIGHT_AVAILABLE = sdk_available("playwright")
 
 logger = logging.getLogger(__name__)
 
@@ -59,9 +68,6 @@ except (ValueError, TypeError):
     logger.warning(f"Invalid MAX_SECONDS_PER_RUN value, using default 120")
     MAX_SECONDS_PER_RUN = 120  # Default 2 minutes per run
 
-# Semaphore to limit concurrent Playwright instances
-playwright_semaphore = threading.Semaphore(2)  # Max 2 concurrent browsers
-
 # Screenshot viewport configuration
 SCREENSHOT_DEFAULT_WIDTH = 1280
 SCREENSHOT_DEFAULT_HEIGHT = 720
@@ -347,39 +353,188 @@ def get_gmail_service(business_id: int):
             raise ValueError("No access token received")
         
         # Return a simple API wrapper instead of full Google client library
-        return GmailApiClient(access_token)
+        # Quota is per Gmail user, so the rate limiter is keyed by the mailbox
+        return GmailApiClient(access_token, account_key=connection.email_address or f"business:{business_id}")
         
     except Exception as e:
         logger.error(f"Failed to get Gmail service: {e}")
         raise
 
 
+class GmailApiError(Exception):
+    """Gmail API returned an error status (str() keeps the 'Gmail API error: <status>' form)"""
+    
+    def __init__(self, status_code: int, detail: str = ''):
+        super().__init__(f"Gmail API error: {status_code}")
+        self.status_code = status_code
+        self.detail = detail
+
+
+# Quota units per call - https://developers.google.com/gmail/api/reference/quota
+QUOTA_MESSAGES_LIST = 5
+QUOTA_MESSAGES_GET = 5
+QUOTA_ATTACHMENTS_GET = 5
+QUOTA_HISTORY_LIST = 2
+QUOTA_GET_PROFILE = 1
+
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+
+
+class GmailRateLimiter:
+    """
+    Token bucket in Gmail quota units - one per mailbox, shared by all threads
+    
+    acquire() blocks until the units are available. A call bigger than the
+    bucket (a large batch request) goes through once the bucket is full and
+    leaves it negative, so the following callers wait it off. penalize() is
+    called on a 429 so every thread backs off, not only the one that got it.
+    """
+    
+    def __init__(self, units_per_sec: float):
+        self.rate = float(units_per_sec)
+        self.capacity = max(self.rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self, units: float = 1) -> float:
+        """Take `units` from the bucket, sleeping as needed; returns seconds waited"""
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                needed = min(units, self.capacity)
+                if self._tokens >= needed:
+                    self._tokens -= units
+                    return waited
+                delay = (needed - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+    
+    def penalize(self, seconds: float):
+        """Empty the bucket so nobody calls the account for `seconds`"""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self._tokens = min(self._tokens, -seconds * self.rate)
+            self._updated = time.monotonic()
+
+
+_rate_limiters: Dict[str, GmailRateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(account_key: str) -> GmailRateLimiter:
+    """Process-wide rate limiter for a Gmail account (one sync per business runs at a time)"""
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(account_key)
+        if limiter is None:
+            limiter = _rate_limiters[account_key] = GmailRateLimiter(GMAIL_SYNC_QUOTA_UNITS_PER_SEC)
+        return limiter
+
+
+def parse_batch_response(content_type: str, body: bytes) -> Dict[str, Tuple[int, dict]]:
+    """
+    Split a Gmail batch (multipart/mixed) response into {content_id: (status, json)}
+    
+    Each part is an embedded HTTP response; its Content-ID is "response-" plus
+    the Content-ID of the request part.
+    """
+    match = re.search(r'boundary="?([^";]+)"?', content_type or '')
+    if not match:
+        raise GmailApiError(502, f"batch response without boundary: {content_type}")
+    boundary = b'--' + match.group(1).encode()
+    
+    parts = {}
+    for raw in body.replace(b'\r\n', b'\n').split(boundary):
+        raw = raw.strip()
+        if not raw or raw == b'--':
+            continue
+        mime_headers, _, http_response = raw.partition(b'\n\n')
+        content_id = re.search(rb'content-id:\s*<?response-([^>\s]+)>?', mime_headers, re.IGNORECASE)
+        if not content_id:
+            continue
+        status_line, _, rest = http_response.partition(b'\n')
+        status_match = re.match(rb'HTTP/[\d.]+\s+(\d+)', status_line)
+        status = int(status_match.group(1)) if status_match else 502
+        _, _, payload = (b'\n' + rest).partition(b'\n\n')  # headers may be absent
+        try:
+            data = json.loads(payload.decode('utf-8')) if payload.strip() else {}
+        except ValueError:
+            data = {}
+        parts[content_id.group(1).decode()] = (status, data)
+    return parts
+
+
 class GmailApiClient:
-    """Simple Gmail API client using REST"""
+    """
+    Simple Gmail API client using REST
+    
+    Thread-safe: one HTTP session per thread, and every call is metered by the
+    account's GmailRateLimiter when account_key is given. 429 / 5xx responses
+    are retried with exponential backoff (Retry-After wins when sent).
+    """
     
-    def __init__(self, access_token: str):
+    def __init__(self, access_token: str, account_key: Optional[str] = None, api_root: Optional[str] = None):
         self.access_token = access_token
-        self.base_url = 'https://gmail.googleapis.com/gmail/v1'
+        self.api_root = (api_root or GMAIL_API_ROOT).rstrip('/')
+        self.base_url = f'{self.api_root}/gmail/v1'
+        self.batch_url = f'{self.api_root}/batch/gmail/v1'
         self.headers = {
             'Authorization': f'Bearer {access_token}',
             'Content-Type': 'application/json'
         }
+        self.rate_limiter = get_rate_limiter(account_key) if account_key else None
+        self.retries = 0  # 429 / 5xx responses retried, for sync stats
+        self._local = threading.local()
     
-    def _request(self, method: str, endpoint: str, **kwargs) -> dict:
-        """Make API request"""
+    def _session(self):
         import requests
         
-        url = f"{self.base_url}{endpoint}"
-        kwargs['headers'] = self.headers
-        kwargs['timeout'] = 30
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+    
+    def _send(self, method: str, url: str, quota_units: float, **kwargs):
+        """Send one request through the rate limiter, retrying 429 / 5xx"""
+        import random
+        
+        kwargs['headers'] = {**self.headers, **kwargs.get('headers', {})}
+        kwargs.setdefault('timeout', 30)
         
-        response = requests.request(method, url, **kwargs)
+        attempt = 0
+        while True:
+            if self.rate_limiter:
+                self.rate_limiter.acquire(quota_units)
+            response = self._session().request(method, url, **kwargs)
+            if response.status_code not in RETRYABLE_STATUS or attempt >= GMAIL_SYNC_MAX_RETRIES:
+                break
+            
+            try:
+                delay = float(response.headers.get('Retry-After'))
+            except (TypeError, ValueError):
+                delay = min(2 ** attempt, 32) + random.uniform(0, 1)
+            if response.status_code == 429 and self.rate_limiter:
+                self.rate_limiter.penalize(delay)
+            attempt += 1
+            self.retries += 1
+            logger.warning(f"⚠️ Gmail API {response.status_code}, retry {attempt}/{GMAIL_SYNC_MAX_RETRIES} in {delay:.1f}s")
+            time.sleep(delay)
         
         if response.status_code >= 400:
             logger.error(f"Gmail API error: {response.status_code} - {response.text[:200]}")
-            raise Exception(f"Gmail API error: {response.status_code}")
+            raise GmailApiError(response.status_code, response.text[:200])
         
-        return response.json()
+        return response
+    
+    def _request(self, method: str, endpoint: str, quota_units: float = QUOTA_MESSAGES_GET, **kwargs) -> dict:
+        """Make API request"""
+        return self._send(method, f"{self.base_url}{endpoint}", quota_units, **kwargs).json()
     
     def list_messages(self, query: str = '', max_results: int = None, page_token: str = None) -> dict:
         """
@@ -401,20 +556,72 @@ class GmailApiClient:
         if page_token:
             params['pageToken'] = page_token
         
-        result = self._request('GET', '/users/me/messages', params=params)
+        result = self._request('GET', '/users/me/messages', quota_units=QUOTA_MESSAGES_LIST, params=params)
         return result
     
     def get_message(self, message_id: str, format: str = 'full') -> dict:
         """Get single message"""
         return self._request('GET', f'/users/me/messages/{message_id}', params={'format': format})
     
+    def batch_get_messages(self, message_ids: List[str], format: str = 'full') -> Dict[str, object]:
+        """
+        Get up to 100 messages in one HTTP request (Gmail batch endpoint)
+        
+        Returns:
+            {message_id: message dict, or GmailApiError for parts that failed}.
+            Each part still costs its own quota units.
+        """
+        if not message_ids:
+            return {}
+        boundary = f"batch_{uuid.uuid4().hex}"
+        lines = []
+        for idx, message_id in enumerate(message_ids):
+            lines += [
+                f'--{boundary}',
+                'Content-Type: application/http',
+                f'Content-ID: <item{idx}>',
+                '',
+                f'GET /gmail/v1/users/me/messages/{message_id}?format={format}',
+                '',
+            ]
+        lines += [f'--{boundary}--', '']
+        response = self._send(
+            'POST', self.batch_url, QUOTA_MESSAGES_GET * len(message_ids),
+            data='\r\n'.join(lines).encode('utf-8'),
+            headers={'Content-Type': f'multipart/mixed; boundary={boundary}'}
+        )
+        
+        parts = parse_batch_response(response.headers.get('Content-Type', ''), response.content)
+        messages = {}
+        for idx, message_id in enumerate(message_ids):
+            status, data = parts.get(f'item{idx}', (502, {}))
+            messages[message_id] = data if status < 400 else GmailApiError(status, json.dumps(data)[:200])
+        return messages
+    
     def get_attachment(self, message_id: str, attachment_id: str) -> bytes:
         """Get attachment data"""
-        result = self._request('GET', f'/users/me/messages/{message_id}/attachments/{attachment_id}')
+        result = self._request('GET', f'/users/me/messages/{message_id}/attachments/{attachment_id}',
+                               quota_units=QUOTA_ATTACHMENTS_GET)
         
         data = result.get('data', '')
         # Gmail uses URL-safe base64
         return base64.urlsafe_b64decode(data)
+    
+    def get_profile(self) -> dict:
+        """Mailbox profile - 'historyId' is the mailbox's current position for history.list"""
+        return self._request('GET', '/users/me/profile', quota_units=QUOTA_GET_PROFILE)
+    
+    def list_history(self, start_history_id: str, page_token: str = None) -> dict:
+        """
+        Mailbox changes since start_history_id (messageAdded only)
+        
+        Raises GmailApiError(404) when start_history_id is too old (Gmail keeps
+        roughly a week of history) - callers fall back to a query sync.
+        """
+        params = {'startHistoryId': start_history_id, 'historyTypes': 'messageAdded', 'maxResults': 500}
+        if page_token:
+            params['pageToken'] = page_token
+        return self._request('GET', '/users/me/history', quota_units=QUOTA_HISTORY_LIST, params=params)
 
 
 def extract_all_attachments(message: dict) -> list:
@@ -1285,7 +1492,8 @@ def process_single_receipt_message(
     message=None,
     is_receipt: bool = None,
     confidence: int = None,
-    metadata: dict = None
+    metadata: dict = None,
+    extraction: Optional[dict] = None
 ) -> Optional['Receipt']:
     """
     Process a single Gmail message as a potential receipt
@@ -1313,13 +1521,14 @@ def process_single_receipt_message(
         is_receipt: Optional pre-computed receipt flag
         confidence: Optional pre-computed confidence
         metadata: Optional pre-computed metadata
+        extraction: Optional result of the sync engine's extraction stage
+            (receipt_extraction.extract_receipt_fields) - skips PDF/HTML parsing here
         
     Returns:
         Receipt object if successfully saved, None if skipped/failed
     """
     from server.db import db
     from server.models_sql import Receipt, Attachment
-    import time
     
     # Fetch message if not provided
     # CRITICAL: Uses format='full' by default to get complete payload.parts with attachment data
@@ -1397,7 +1606,7 @@ def process_single_receipt_message(
                 logger.info(f"✅ Downloaded {len(att_data)} bytes for {att['filename']}")
                 
                 # Extract PDF text if applicable (only for first PDF for performance)
-                if att['mime_type'] == 'application/pdf' and not pdf_text:
+                if att['mime_type'] == 'application/pdf' and not pdf_text and extraction is None:
                     pdf_text = extract_pdf_text(att_data)
                     pdf_confidence = calculate_pdf_confidence(pdf_text)
                     confidence = min(confidence + pdf_confidence, 100)
@@ -1443,42 +1652,41 @@ def process_single_receipt_message(
                 
                 logger.info(f"✅ Saved attachment {att_idx+1}: ID={attachment.id}, size={file_size}")
                 
-                # Generate preview from FIRST attachment only (for performance)
-                if att_idx == 0 and not preview_generated:
+                # Fast path: the first PDF/image attachment that rasterizes is the preview,
+                # in-process - the email HTML then never goes to the browser pool
+                if not preview_generated:
                     try:
                         from server.services.receipt_preview_service import generate_pdf_thumbnail, generate_image_thumbnail, save_preview_attachment
                         
-                        # Acquire semaphore before heavy Playwright/PDF operations
-                        with playwright_semaphore:
-                            preview_data = None
-                            if att['mime_type'] == 'application/pdf':
-                                preview_data = generate_pdf_thumbnail(att_data)
-                                time.sleep(0.1)  # Small delay after PDF processing
-                            elif att['mime_type'].startswith('image/'):
-                                preview_data = generate_image_thumbnail(att_data, att['mime_type'])
-                            
-                            if preview_data:
-                                # Save preview even if it might be blank - better to have something than nothing
-                                # User can review and decide if it's valid
-                                preview_attachment_id = save_preview_attachment(
-                                    preview_data=preview_data,
-                                    business_id=business_id,
-                                    original_filename=att['filename'] or 'receipt',
-                                    purpose='receipt_preview'
-                                )
-                                if preview_attachment_id:
-                                    preview_generated = True
-                                    
-                                    # Check if preview looks blank and log warning for review
-                                    from server.services.receipt_preview_service import is_image_blank_or_white
-                                    if is_image_blank_or_white(preview_data):
-                                        logger.warning(f"⚠️ Preview may be blank/low quality - saved but flagged for review")
-                                        preview_error_msg = f"Preview may be blank - needs review"
-                                    else:
-                                        logger.info(f"✅ Preview generated from first attachment")
-                            else:
-                                logger.warning(f"⚠️ Preview generation returned None for {att['mime_type']}")
-                                preview_error_msg = f"Preview generation returned None for {att['mime_type']}"
+                        preview_data = None
+                        if att['mime_type'] == 'application/pdf':
+                            preview_data = generate_pdf_thumbnail(att_data)
+                        elif att['mime_type'].startswith('image/'):
+                            preview_data = generate_image_thumbnail(att_data, att['mime_type'])
+                        
+                        if preview_data:
+                            # Save preview even if it might be blank - better to have something than nothing
+                            # User can review and decide if it's valid
+                            preview_attachment_id = save_preview_attachment(
+                                preview_data=preview_data,
+                                business_id=business_id,
+                                original_filename=att['filename'] or 'receipt',
+                                purpose='receipt_preview'
+                            )
+                            if preview_attachment_id:
+                                preview_generated = True
+                                
+                                # Check if preview looks blank and log warning for review
+                                from server.services.receipt_preview_service import is_image_blank_or_white
+                                if is_image_blank_or_white(preview_data):
+                                    logger.warning(f"⚠️ Preview may be blank/low quality - saved but flagged for review")
+                                    preview_error_msg = f"Preview may be blank - needs review"
+                                else:
+                                    logger.info(f"✅ Preview generated from attachment {att_idx+1}")
+                                    preview_error_msg = None  # an earlier attachment may have failed
+                        else:
+                            logger.warning(f"⚠️ Preview generation returned None for {att['mime_type']}")
+                            preview_error_msg = f"Preview generation returned None for {att['mime_type']}"
                     except Exception as preview_err:
                         preview_error_msg = str(preview_err)[:ERROR_MESSAGE_MAX_LENGTH]
                         logger.warning(f"⚠️ Preview generation failed: {preview_err}", exc_info=True)
@@ -1492,6 +1700,10 @@ def process_single_receipt_message(
     if saved_attachments:
         logger.info(f"✅ RULE 5: Saved {len(saved_attachments)} attachments: {saved_attachments}")
     
+    if extraction is not None:
+        pdf_text = extraction['pdf_text']
+        confidence = min(confidence + extraction['pdf_confidence'], 100)
+    
     # ==================================================================================
     # CRITICAL: PNG PREVIEW GENERATION WITH FULL HTML
     # ==================================================================================
@@ -1500,32 +1712,29 @@ def process_single_receipt_message(
     
     if email_html_full and not preview_generated:
         try:
-            # Acquire semaphore before Playwright screenshot
-            with playwright_semaphore:
-                preview_result = generate_receipt_preview_png(
-                    email_html=email_html_full,  # Use FULL HTML, not truncated snippet!
-                    business_id=business_id,
-                    receipt_id=None
-                )
+            # Bounded by the browser pool (BROWSER_POOL_SIZE pages per worker)
+            preview_result = generate_receipt_preview_png(
+                email_html=email_html_full,  # Use FULL HTML, not truncated snippet!
+                business_id=business_id,
+                receipt_id=None
+            )
+            
+            if preview_result:
+                preview_attachment_id, preview_file_size = preview_result
+                preview_generated = True
                 
-                if preview_result:
-                    preview_attachment_id, preview_file_size = preview_result
-                    preview_generated = True
-                    
-                    # Check if preview is suspiciously small but still save it
-                    MIN_PREVIEW_SIZE = 10 * 1024  # 10KB threshold
-                    if preview_file_size < MIN_PREVIEW_SIZE:
-                        preview_error_msg = f"Preview small ({preview_file_size} bytes) - may indicate blocked/empty content"
-                        logger.warning(f"⚠️ {preview_error_msg} - saved but flagged for review")
-                    else:
-                        logger.info(f"✅ PNG preview generated successfully: {preview_file_size} bytes")
-                    
-                    time.sleep(0.1)  # Small delay after Playwright
+                # Check if preview is suspiciously small but still save it
+                MIN_PREVIEW_SIZE = 10 * 1024  # 10KB threshold
+                if preview_file_size < MIN_PREVIEW_SIZE:
+                    preview_error_msg = f"Preview small ({preview_file_size} bytes) - may indicate blocked/empty content"
+                    logger.warning(f"⚠️ {preview_error_msg} - saved but flagged for review")
                 else:
-                    # Preview generation failed
-                    logger.error(f"❌ Preview generation failed for receipt")
-                    preview_error_msg = "PNG preview generation failed"
-                    
+                    logger.info(f"✅ PNG preview generated successfully: {preview_file_size} bytes")
+            else:
+                # Preview generation failed
+                logger.error(f"❌ Preview generation failed for receipt")
+                preview_error_msg = "PNG preview generation failed"
+                
         except Exception as e:
             preview_error_msg = str(e)[:ERROR_MESSAGE_MAX_LENGTH]
             logger.error(f"❌ Preview generation exception: {e}", exc_info=True)
@@ -1578,12 +1787,17 @@ def process_single_receipt_message(
         return None
     
     # Use merged extraction (PDF + HTML + Subject priority)
-    extracted = extract_amount_merged(
-        pdf_text=pdf_text,
-        html_content=email_html_snippet,
-        subject=metadata.get('subject', ''),
-        metadata=metadata
-    )
+    if extraction is not None:
+        extracted = extraction['extracted']
+        html_extraction = extraction['html_extraction']
+    else:
+        extracted = extract_amount_merged(
+            pdf_text=pdf_text,
+            html_content=email_html_snippet,
+            subject=metadata.get('subject', ''),
+            metadata=metadata
+        )
+        html_extraction = extract_amount_from_html(email_html_snippet, metadata) if email_html_snippet else None
     
     # Parse received date
     received_at = None
@@ -1654,7 +1868,7 @@ def process_single_receipt_message(
         'metadata': metadata,
         'extracted': extracted,
         'pdf_text_preview': pdf_text[:500] if pdf_text else None,
-        'html_extraction': extract_amount_from_html(email_html_snippet, metadata) if email_html_snippet else None
+        'html_extraction': html_extraction
     }
     # CRITICAL: Use robust NULL byte stripping
     try:
@@ -1665,6 +1879,8 @@ def process_single_receipt_message(
     
     # CRITICAL: Validation - track why extraction failed and add to JSON
     extraction_warnings = []
+    if extraction is not None and extraction.get('error'):
+        extraction_warnings.append(extraction['error'])  # e.g. extraction_timeout
     
     # Add validation errors to extraction warnings
     if validation_failed:
@@ -1790,7 +2006,12 @@ def sync_gmail_receipts(business_id: int, mode: str = 'incremental', max_message
     📅 DATE RANGE PRIORITY:
     1. If from_date OR to_date specified → use exact date range (ignore mode)
     2. If mode='full_backfill' → use monthly backfill logic
-    3. If mode='incremental' → use last_sync_at with 30-day overlap
+    3. If mode='incremental' → mailbox history since connection.last_history_id,
+       or last_sync_at with 30-day overlap when there is none / it expired
+    
+    Messages are fetched, downloaded and PDF-extracted ahead of saving by the
+    sync engine (gmail_sync_engine.py). A sync_run that already made progress
+    (resumed by the job) continues from its checkpoint.
     
     📅 GMAIL QUERY FORMAT:
     - after:YYYY/MM/DD (inclusive - messages ON or AFTER this date)
@@ -1811,10 +2032,13 @@ def sync_gmail_receipts(business_id: int, mode: str = 'incremental', max_message
         Sync results with detailed counters
     """
     from server.db import db
-    from server.models_sql import GmailConnection, Receipt, Attachment, ReceiptSyncRun
+    from server.models_sql import GmailConnection, Attachment, ReceiptSyncRun
     from server.services.attachment_service import get_attachment_service
+    from server.services.gmail_sync_engine import (
+        GmailSyncEngine, SyncSegment, current_history_id, has_checkpoint,
+        list_history_message_ids, restore_counters,
+    )
     from dateutil.relativedelta import relativedelta
-    import time
     
     # Start time tracking for MAX_SECONDS_PER_RUN
     start_time = time.time()
@@ -1878,9 +2102,21 @@ def sync_gmail_receipts(business_id: int, mode: str = 'incremental', max_message
         'total_months': 0
     }
     
+    # A run handed over by the job may be a resumed one (see find_resumable_sync_run)
+    resumed = has_checkpoint(sync_run)
+    if resumed:
+        restore_counters(sync_run, result)
+        logger.info(f"⏯️ RUN_RESUME: run_id={sync_run.id}, month={sync_run.current_month}, messages_scanned={result['messages_scanned']}, saved={result['saved_receipts']}")
+    
     try:
         gmail = get_gmail_service(business_id)
         connection = GmailConnection.query.filter_by(business_id=business_id).first()
+        attachment_service = get_attachment_service()
+        
+        # Mailbox position before listing - becomes the next history sync's start
+        # point once a sync that reaches "now" completes
+        start_history_id = current_history_id(gmail)
+        syncs_to_now = True
         
         # ========================================================================
         # PRIORITY 1: Custom date range ALWAYS wins (overrides mode)
@@ -1912,6 +2148,7 @@ def sync_gmail_receipts(business_id: int, mode: str = 'incremental', max_message
                 months_to_go_back = months_back if months_back else 12
                 start_dt = end_dt - relativedelta(months=months_to_go_back)
                 logger.info(f"📅 Last {months_to_go_back} months up to {to_date} (only to_date specified, using months_back={months_to_go_back})")
+            syncs_to_now = to_date is None
             
             # Build Gmail query with custom dates
             query_parts = []
@@ -1940,158 +2177,7 @@ def sync_gmail_receipts(business_id: int, mode: str = 'incremental', max_message
             logger.info(f"📧 This will fetch emails from {start_dt.strftime('%Y/%m/%d')} up to AND INCLUDING {end_dt.strftime('%Y/%m/%d')}")
             logger.info(f"📧 Query includes keyword filter OR attachments to maximize receipt detection")
             
-            # Use simple pagination (not monthly chunks) for custom date range
-            attachment_service = get_attachment_service()
-            page_token = None
-            
-            while True:
-                # Check for cancellation
-                db.session.refresh(sync_run)
-                if sync_run.status == 'cancelled':
-                    logger.info(f"⛔ Sync {sync_run.id} cancelled by user")
-                    result['cancelled'] = True
-                    break
-                
-                result['pages_scanned'] += 1
-                sync_run.pages_scanned = result['pages_scanned']
-                
-                try:
-                    page_result = gmail.list_messages(
-                        query=query,
-                        max_results=100,
-                        page_token=page_token
-                    )
-                except Exception as api_error:
-                    if '429' in str(api_error) or 'rate' in str(api_error).lower():
-                        logger.warning(f"⚠️ Rate limit hit, sleeping 10 seconds...")
-                        time.sleep(10)
-                        continue
-                    else:
-                        raise
-                
-                messages = page_result.get('messages', [])
-                page_token = page_result.get('nextPageToken')
-                
-                logger.info(f"📄 PAGE_FETCH: page={result['pages_scanned']}, messages={len(messages)}, has_next={bool(page_token)}")
-                
-                # Update heartbeat at page boundary
-                sync_run.last_heartbeat_at = datetime.now(timezone.utc)
-                sync_run.pages_scanned = result['pages_scanned']
-                sync_run.updated_at = datetime.now(timezone.utc)
-                db.session.commit()
-                
-                if not messages:
-                    break
-                
-                # Process messages
-                for msg_info in messages:
-                    message_id = msg_info['id']
-                    result['messages_scanned'] += 1
-                    sync_run.messages_scanned = result['messages_scanned']
-                    
-                    # CHECK 1: Max messages limit (skip if run_to_completion mode)
-                    if not run_to_completion and result['messages_scanned'] >= MAX_MESSAGES_PER_RUN:
-                        logger.info(f"⏸️ Reached MAX_MESSAGES_PER_RUN ({MAX_MESSAGES_PER_RUN}), pausing for resume")
-                        sync_run.status = 'paused'
-                        sync_run.last_page_token = page_token
-                        sync_run.updated_at = datetime.now(timezone.utc)
-                        db.session.commit()
-                        page_token = None
-                        break
-                    
-                    # CHECK 2: Max time limit (skip if run_to_completion mode)
-                    if not run_to_completion:
-                        elapsed_seconds = time.time() - start_time
-                        if elapsed_seconds >= MAX_SECONDS_PER_RUN:
-                            logger.info(f"⏸️ Reached MAX_SECONDS_PER_RUN ({MAX_SECONDS_PER_RUN}s), pausing for auto-resume")
-                            logger.info(f"   Progress: {result['messages_scanned']} messages, {result['saved_receipts']} receipts")
-                            sync_run.status = 'paused'
-                            sync_run.last_page_token = page_token
-                            sync_run.updated_at = datetime.now(timezone.utc)
-                            db.session.commit()
-                            page_token = None
-                            break
-                    
-                    if max_messages and result['messages_scanned'] >= max_messages:
-                        logger.info(f"Reached max_messages limit ({max_messages})")
-                        page_token = None
-                        break
-                    
-                    # Check for cancellation and update heartbeat every 20 messages
-                    if result['messages_scanned'] % 20 == 0:
-                        # Update heartbeat for stale run detection
-                        sync_run.last_heartbeat_at = datetime.now(timezone.utc)
-                        sync_run.updated_at = datetime.now(timezone.utc)
-                        db.session.commit()
-                        
-                        # Check for cancellation
-                        db.session.refresh(sync_run)
-                        if sync_run.status == 'cancelled':
-                            logger.info(f"⛔ Sync {sync_run.id} cancelled")
-                            result['cancelled'] = True
-                            page_token = None
-                            break
-                        
-                        # Log progress every 50 messages
-                        if result['messages_scanned'] % 50 == 0:
-                            logger.info(
-                                f"📊 RUN_PROGRESS: run_id={sync_run.id}, "
-                                f"messages_scanned={result['messages_scanned']}, "
-                                f"saved={result['saved_receipts']}, "
-                                f"skipped_non_receipts={result.get('skipped_non_receipts', 0)}, "
-                                f"errors={result['errors']}"
-                            )
-                    
-                    # REMOVED: Duplicate checking - per requirement, extract everything including duplicates
-                    # This allows re-processing of all emails in date range even if previously synced
-                    
-                    try:
-                        # Process receipt using extracted helper function
-                        receipt = process_single_receipt_message(
-                            message_id=message_id,
-                            gmail=gmail,
-                            business_id=business_id,
-                            attachment_service=attachment_service,
-                            result=result,
-                            sync_run=sync_run
-                        )
-                        
-                        # Commit every 10 receipts (no sleep)
-                        if receipt and result['saved_receipts'] % 20 == 0:
-                            sync_run.updated_at = datetime.now(timezone.utc)
-                            db.session.commit()
-                            # Call heartbeat callback if provided
-                            if heartbeat_callback:
-                                heartbeat_callback()
-                        
-                    except Exception as e:
-                        # Per-message error handling: rollback and continue to next message
-                        logger.error(f"❌ Error processing message {message_id}: {e}", exc_info=True)
-                        try:
-                            db.session.rollback()  # Rollback failed transaction
-                        except Exception as rollback_err:
-                            logger.error(f"❌ Rollback failed: {rollback_err}")
-                        result['errors'] += 1
-                        sync_run.errors_count = result['errors']
-                        sync_run.error_message = f"{message_id}: {str(e)[:ERROR_MESSAGE_MAX_LENGTH]}"  # Track last error
-                        # Continue to next message - don't fail entire sync
-                
-                if not page_token:
-                    break
-                
-                time.sleep(0.2)  # 200ms between pages
-                
-                sync_run.last_page_token = page_token
-                sync_run.updated_at = datetime.now(timezone.utc)
-                db.session.commit()
-            
-            # Check if cancelled
-            if result.get('cancelled'):
-                sync_run.status = 'cancelled'
-                sync_run.finished_at = datetime.now(timezone.utc)
-                db.session.commit()
-                logger.info(f"Gmail sync cancelled: {result}")
-                return result
+            segments = [SyncSegment(query=query)]
         
         # ========================================================================
         # PRIORITY 2: Mode-based logic (only if no custom dates)
@@ -2104,8 +2190,15 @@ def sync_gmail_receipts(business_id: int, mode: str = 'incremental', max_message
             start_dt = end_dt - relativedelta(months=months_back)
             logger.info(f"📅 Date range: {start_dt.strftime('%Y-%m-%d')} to {end_dt.strftime('%Y-%m-%d')}")
             
-            # Generate list of months to process (from oldest to newest)
-            months_to_process = []
+            # Add keyword filters for receipt/invoice detection
+            keyword_filter = ' OR '.join([
+                f'subject:"{kw}"' for kw in ['קבלה', 'חשבונית', 'invoice', 'receipt', 'payment', 'bill']
+            ] + [
+                f'"{kw}"' for kw in ['קבלת תשלום', 'חשבונית מס', 'tax invoice']
+            ])
+            
+            # One segment per month (from oldest to newest) - the month is the resume checkpoint
+            segments = []
             current_month_dt = start_dt.replace(day=1)  # Start at first day of month
             
             while current_month_dt <= end_dt:
@@ -2117,45 +2210,45 @@ def sync_gmail_receipts(business_id: int, mode: str = 'incremental', max_message
                 if month_end > end_dt:
                     month_end = end_dt
                 
-                months_to_process.append({
-                    'start': month_start,
-                    'end': month_end,
-                    'label': current_month_dt.strftime('%Y-%m')
-                })
+                # Gmail's "before" is EXCLUSIVE - the day after month_end keeps the last day in
+                query = (f'after:{month_start.strftime("%Y/%m/%d")} '
+                         f'before:{(month_end + timedelta(days=1)).strftime("%Y/%m/%d")} ({keyword_filter})')
+                segments.append(SyncSegment(label=current_month_dt.strftime('%Y-%m'), query=query))
                 
                 current_month_dt = current_month_dt + relativedelta(months=1)
             
-            result['total_months'] = len(months_to_process)
-            logger.info(f"📅 Processing {len(months_to_process)} months: {months_to_process[0]['label']} to {months_to_process[-1]['label']}")
+            result['total_months'] = len(segments)
+            logger.info(f"📅 Processing {len(segments)} months: {segments[0].label} to {segments[-1].label}")
+        
+        else:
+            # Incremental mode - mailbox history since the last completed sync,
+            # or a date query (first sync / history expired)
+            segments = None
             
-            # Process each month sequentially
-            attachment_service = get_attachment_service()
+            if GMAIL_SYNC_HISTORY_ENABLED and connection and connection.last_history_id:
+                try:
+                    message_ids = list_history_message_ids(gmail, connection.last_history_id)
+                    segments = [SyncSegment(message_ids=message_ids)]
+                    logger.info(f"📅 History sync since historyId={connection.last_history_id}: {len(message_ids)} new messages")
+                except GmailApiError as e:
+                    if e.status_code != 404:
+                        raise
+                    logger.info(f"📅 historyId={connection.last_history_id} expired - falling back to date query")
             
-            for month_info in months_to_process:
-                # Check for cancellation at start of each month
-                db.session.refresh(sync_run)
-                if sync_run.status == 'cancelled':
-                    logger.info(f"⛔ Sync {sync_run.id} cancelled by user")
-                    result['cancelled'] = True
-                    break
-                
-                month_label = month_info['label']
-                month_start = month_info['start']
-                month_end = month_info['end']
-                
-                logger.info(f"📅 Processing month: {month_label} ({month_start.strftime('%Y/%m/%d')} to {month_end.strftime('%Y/%m/%d')})")
-                
-                # Update current_month in sync_run for checkpoint
-                sync_run.current_month = month_label
-                sync_run.updated_at = datetime.now(timezone.utc)
-                db.session.commit()
-                
-                # Build Gmail query for this specific month
+            if segments is None:
+                # Build search query based on last sync time
                 query_parts = []
-                query_parts.append(f'after:{month_start.strftime("%Y/%m/%d")}')
-                query_parts.append(f'before:{month_end.strftime("%Y/%m/%d")}')
                 
-                # Add keyword filters for receipt/invoice detection
+                if connection and connection.last_sync_at:
+                    cutoff = connection.last_sync_at - timedelta(days=30)
+                    date_str = cutoff.strftime('%Y/%m/%d')
+                    query_parts.append(f'after:{date_str}')
+                    logger.info(f"📅 Incremental sync from: {date_str}")
+                else:
+                    query_parts.append('newer_than:1y')
+                    logger.info("📅 First sync - going back 1 year")
+                
+                # Add keyword filters
                 keyword_filter = ' OR '.join([
                     f'subject:"{kw}"' for kw in ['קבלה', 'חשבונית', 'invoice', 'receipt', 'payment', 'bill']
                 ] + [
@@ -2163,358 +2256,31 @@ def sync_gmail_receipts(business_id: int, mode: str = 'incremental', max_message
                 ])
                 
                 query = f"{' '.join(query_parts)} ({keyword_filter})"
-                logger.info(f"  Query: {query}")
-                
-                # Paginate through all messages for this month
-                page_token = None
-                month_messages = 0
-                month_receipts = 0
-                
-                while True:
-                    # Check for cancellation every page
-                    db.session.refresh(sync_run)
-                    if sync_run.status == 'cancelled':
-                        logger.info(f"⛔ Sync {sync_run.id} cancelled during month {month_label}")
-                        result['cancelled'] = True
-                        break
-                    
-                    result['pages_scanned'] += 1
-                    sync_run.pages_scanned = result['pages_scanned']
-                    
-                    # Get page of messages
-                    try:
-                        page_result = gmail.list_messages(
-                            query=query,
-                            max_results=100,  # Max per page
-                            page_token=page_token
-                        )
-                    except Exception as api_error:
-                        # Handle rate limiting with exponential backoff
-                        if '429' in str(api_error) or 'rate' in str(api_error).lower():
-                            logger.warning(f"⚠️ Rate limit hit, sleeping 10 seconds...")
-                            time.sleep(10)
-                            continue
-                        else:
-                            raise
-                    
-                    messages = page_result.get('messages', [])
-                    page_token = page_result.get('nextPageToken')
-                    
-                    logger.info(f"  Page {result['pages_scanned']}: {len(messages)} messages")
-                    month_messages += len(messages)
-                    
-                    if not messages:
-                        break
-                    
-                    # Process messages in this page
-                    for msg_info in messages:
-                        message_id = msg_info['id']
-                        result['messages_scanned'] += 1
-                        sync_run.messages_scanned = result['messages_scanned']
-                        
-                        # CHECK 1: Max messages limit (skip if run_to_completion mode)
-                        if not run_to_completion and result['messages_scanned'] >= MAX_MESSAGES_PER_RUN:
-                            logger.info(f"⏸️ Reached MAX_MESSAGES_PER_RUN ({MAX_MESSAGES_PER_RUN}), pausing for resume")
-                            sync_run.status = 'paused'
-                            sync_run.last_page_token = page_token
-                            sync_run.current_month = month_label
-                            sync_run.updated_at = datetime.now(timezone.utc)
-                            db.session.commit()
-                            page_token = None
-                            break
-                        
-                        # CHECK 2: Max time limit (skip if run_to_completion mode)
-                        if not run_to_completion:
-                            elapsed_seconds = time.time() - start_time
-                            if elapsed_seconds >= MAX_SECONDS_PER_RUN:
-                                logger.info(f"⏸️ Reached MAX_SECONDS_PER_RUN ({MAX_SECONDS_PER_RUN}s), pausing for auto-resume")
-                                logger.info(f"   Progress: {result['messages_scanned']} messages, {result['saved_receipts']} receipts")
-                                sync_run.status = 'paused'
-                                sync_run.last_page_token = page_token
-                                sync_run.current_month = month_label
-                                sync_run.updated_at = datetime.now(timezone.utc)
-                                db.session.commit()
-                                page_token = None
-                                break
-                        
-                        # Check max_messages limit
-                        if max_messages and result['messages_scanned'] >= max_messages:
-                            logger.info(f"Reached max_messages limit ({max_messages})")
-                            page_token = None  # Stop pagination
-                            break
-                        
-                        # Check for cancellation every 10 messages
-                        if result['messages_scanned'] % 20 == 0:
-                            db.session.refresh(sync_run)
-                            if sync_run.status == 'cancelled':
-                                logger.info(f"⛔ Sync {sync_run.id} cancelled")
-                                result['cancelled'] = True
-                                page_token = None
-                                break
-                        
-                        # REMOVED: Duplicate checking - per requirement, extract everything including duplicates
-                        # This allows re-processing of all emails in monthly backfill even if previously synced
-                        
-                        try:
-                            # Process receipt using extracted helper function
-                            receipt = process_single_receipt_message(
-                                message_id=message_id,
-                                gmail=gmail,
-                                business_id=business_id,
-                                attachment_service=attachment_service,
-                                result=result,
-                                sync_run=sync_run
-                            )
-                            
-                            if receipt:
-                                month_receipts += 1
-                            
-                            # Commit every 10 receipts (no sleep)
-                            if result['saved_receipts'] % 20 == 0:
-                                sync_run.updated_at = datetime.now(timezone.utc)
-                                db.session.commit()
-                                # Call heartbeat callback if provided
-                                if heartbeat_callback:
-                                    heartbeat_callback()
-                            
-                        except Exception as e:
-                            # Per-message error handling: rollback and continue to next message
-                            logger.error(f"❌ Error processing message {message_id}: {e}", exc_info=True)
-                            try:
-                                db.session.rollback()  # Rollback failed transaction
-                            except Exception as rollback_err:
-                                logger.error(f"❌ Rollback failed: {rollback_err}")
-                            result['errors'] += 1
-                            sync_run.errors_count = result['errors']
-                            sync_run.error_message = f"{message_id}: {str(e)[:ERROR_MESSAGE_MAX_LENGTH]}"  # Track last error
-                            # Continue to next message - don't fail entire sync
-                    
-                    # Check if should continue to next page
-                    if not page_token:
-                        break
-                    
-                    # Sleep between pages to avoid rate limits
-                    time.sleep(0.2)  # 200ms between pages
-                    
-                    # Update checkpoint
-                    sync_run.last_page_token = page_token
-                    sync_run.current_month = month_label  # Add this
-                    sync_run.updated_at = datetime.now(timezone.utc)
-                    # Note: skipped_count no longer tracked separately (duplicates removed as per requirement)
-                    db.session.commit()
-                
-                # Month complete - commit all changes for this month
-                result['months_processed'] += 1
-                logger.info(f"✅ Month {month_label} complete: {month_messages} messages, {month_receipts} receipts")
-                db.session.commit()
-                
-                # Check if cancelled after month completion
-                if result.get('cancelled'):
-                    break
-            
-            # All months processed or cancelled
-            if result.get('cancelled'):
-                sync_run.status = 'cancelled'
-                sync_run.finished_at = datetime.now(timezone.utc)
-                db.session.commit()
-                logger.info(f"Gmail sync cancelled: {result}")
-                return result
+                logger.info(f"Gmail query: {query}")
+                segments = [SyncSegment(query=query)]
+        
+        # Fetch / extract / save pipeline (server/services/gmail_sync_engine.py)
+        engine = GmailSyncEngine(
+            gmail, business_id, sync_run, result, attachment_service,
+            max_messages=max_messages,
+            run_to_completion=run_to_completion,
+            max_messages_per_run=MAX_MESSAGES_PER_RUN,
+            max_seconds_per_run=MAX_SECONDS_PER_RUN,
+            start_time=start_time,
+            heartbeat_callback=heartbeat_callback,
+            resumed=resumed,
+        )
+        stop_reason = engine.run(segments)
+        result['pipeline'] = engine.stats
         
-        else:
-            # Incremental mode - use original logic (single query with pagination)
-            # Build search query based on last sync time
-            query_parts = []
-            
-            if connection and connection.last_sync_at:
-                cutoff = connection.last_sync_at - timedelta(days=30)
-                date_str = cutoff.strftime('%Y/%m/%d')
-                query_parts.append(f'after:{date_str}')
-                logger.info(f"📅 Incremental sync from: {date_str}")
-            else:
-                query_parts.append('newer_than:1y')
-                logger.info("📅 First sync - going back 1 year")
-            
-            # Add keyword filters
-            keyword_filter = ' OR '.join([
-                f'subject:"{kw}"' for kw in ['קבלה', 'חשבונית', 'invoice', 'receipt', 'payment', 'bill']
-            ] + [
-                f'"{kw}"' for kw in ['קבלת תשלום', 'חשבונית מס', 'tax invoice']
-            ])
-            
-            query = f"{' '.join(query_parts)} ({keyword_filter})"
-            logger.info(f"Gmail query: {query}")
-            
-            attachment_service = get_attachment_service()
-            page_token = None
-            
-            # Pagination loop - same logic as before but without monthly division
-            while True:
-                db.session.refresh(sync_run)
-                if sync_run.status == 'cancelled':
-                    logger.info(f"⛔ Sync {sync_run.id} cancelled")
-                    result['cancelled'] = True
-                    break
-                
-                result['pages_scanned'] += 1
-                sync_run.pages_scanned = result['pages_scanned']
-                
-                try:
-                    page_result = gmail.list_messages(
-                        query=query,
-                        max_results=100,
-                        page_token=page_token
-                    )
-                except Exception as api_error:
-                    if '429' in str(api_error) or 'rate' in str(api_error).lower():
-                        logger.warning(f"⚠️ Rate limit hit, sleeping 10 seconds...")
-                        time.sleep(10)
-                        continue
-                    else:
-                        raise
-                
-                messages = page_result.get('messages', [])
-                page_token = page_result.get('nextPageToken')
-                
-                logger.info(f"Page {result['pages_scanned']}: {len(messages)} messages")
-                
-                if not messages:
-                    break
-                
-                # Process messages (same logic as monthly mode)
-                for msg_info in messages:
-                    message_id = msg_info['id']
-                    result['messages_scanned'] += 1
-                    sync_run.messages_scanned = result['messages_scanned']
-                    
-                    if max_messages and result['messages_scanned'] >= max_messages:
-                        logger.info(f"Reached max_messages limit ({max_messages})")
-                        page_token = None
-                        break
-                    
-                    if result['messages_scanned'] % 20 == 0:
-                        db.session.refresh(sync_run)
-                        if sync_run.status == 'cancelled':
-                            logger.info(f"⛔ Sync {sync_run.id} cancelled")
-                            result['cancelled'] = True
-                            page_token = None
-                            break
-                    
-                    # REMOVED: Duplicate checking - per requirement, extract everything including duplicates
-                    # This allows re-processing of all emails in incremental sync even if previously synced
-                    
-                    try:
-                        # Fetch message with format='full' to get complete payload with attachments
-                        message = gmail.get_message(message_id)  # format='full' by default
-                        result['processed'] += 1
-                        
-                        is_receipt, confidence, metadata = check_is_receipt_email(message)
-                        
-                        if is_receipt:
-                            result['candidate_receipts'] += 1
-                            sync_run.candidate_receipts = result['candidate_receipts']
-                        
-                        if not is_receipt:
-                            result['skipped_non_receipts'] += 1
-                            result['skipped'] += 1  # Keep for backward compatibility
-                            continue
-                        
-                        # Process receipt (same logic as before - extracted for brevity)
-                        email_html_snippet = extract_email_html(message)
-                        attachment_id = None
-                        pdf_text = ''
-                        
-                        # ... (same attachment processing as in monthly mode)
-                        
-                        # Extract and save receipt
-                        extracted = extract_receipt_data(pdf_text, metadata)
-                        
-                        received_at = None
-                        if metadata.get('date'):
-                            try:
-                                received_at = parsedate_to_datetime(metadata['date'])
-                            except Exception:
-                                received_at = datetime.now(timezone.utc)
-                        else:
-                            received_at = datetime.now(timezone.utc)
-                        
-                        status = 'approved' if confidence >= REVIEW_THRESHOLD else 'pending_review'
-                        
-                        invoice_date = None
-                        if extracted.get('invoice_date'):
-                            try:
-                                invoice_date = datetime.strptime(extracted['invoice_date'], '%Y-%m-%d').date()
-                            except ValueError:
-                                pass
-                        
-                        # Create receipt record with sanitized JSON (no NUL characters for PostgreSQL)
-                        raw_json_data = {
-                            'metadata': metadata,
-                            'extracted': extracted,
-                            'pdf_text_preview': pdf_text[:500] if pdf_text else None
-                        }
-                        # Sanitize to remove \x00 and other PostgreSQL-incompatible characters
-                        sanitized_json = sanitize_for_postgres(raw_json_data)
-                        
-                        receipt = Receipt(
-                            business_id=business_id,
-                            source='gmail',
-                            gmail_message_id=message_id,
-                            gmail_thread_id=message.get('threadId'),
-                            from_email=metadata.get('from_email'),
-                            subject=metadata.get('subject', '')[:500],
-                            received_at=received_at,
-                            email_subject=metadata.get('subject', '')[:500],
-                            email_from=metadata.get('from_email'),
-                            email_date=received_at,
-                            email_html_snippet=email_html_snippet,
-                            vendor_name=extracted.get('vendor_name'),
-                            amount=extracted.get('amount'),
-                            currency=extracted.get('currency', 'ILS'),
-                            invoice_number=extracted.get('invoice_number'),
-                            invoice_date=invoice_date,
-                            confidence=confidence,
-                            raw_extraction_json=sanitized_json,
-                            status=status,
-                            attachment_id=attachment_id
-                        )
-                        
-                        db.session.add(receipt)
-                        result['new_count'] += 1
-                        result['saved_receipts'] += 1
-                        sync_run.saved_receipts = result['saved_receipts']
-                        
-                        if result['new_count'] % 20 == 0:
-                            sync_run.updated_at = datetime.now(timezone.utc)
-                            db.session.commit()
-                            # Call heartbeat callback if provided
-                            if heartbeat_callback:
-                                heartbeat_callback()
-                        
-                    except Exception as e:
-                        # Per-message error handling: rollback and continue to next message
-                        logger.error(f"❌ Error processing message {message_id}: {e}", exc_info=True)
-                        db.session.rollback()  # Rollback failed transaction
-                        result['errors'] += 1
-                        sync_run.errors_count = result['errors']
-                        sync_run.error_message = f"{message_id}: {str(e)[:ERROR_MESSAGE_MAX_LENGTH]}"  # Track last error
-                        # Continue to next message - don't fail entire sync
-                
-                if not page_token:
-                    break
-                
-                time.sleep(0.2)  # 200ms between pages
-                
-                sync_run.last_page_token = page_token
-                sync_run.updated_at = datetime.now(timezone.utc)
-                db.session.commit()
-            
-            # Check if cancelled
-            if result.get('cancelled'):
-                sync_run.status = 'cancelled'
-                sync_run.finished_at = datetime.now(timezone.utc)
-                db.session.commit()
-                logger.info(f"Gmail sync cancelled: {result}")
-                return result
+        # Check if cancelled
+        if stop_reason == 'cancelled':
+            result['cancelled'] = True
+            sync_run.status = 'cancelled'
+            sync_run.finished_at = datetime.now(timezone.utc)
+            db.session.commit()
+            logger.info(f"Gmail sync cancelled: {result}")
+            return result
         
         # Final commit
         db.session.commit()
@@ -2522,11 +2288,13 @@ def sync_gmail_receipts(business_id: int, mode: str = 'incremental', max_message
         # Update connection last sync time
         if connection:
             connection.last_sync_at = datetime.now(timezone.utc)
+            if stop_reason is None and syncs_to_now and start_history_id:
+                connection.last_history_id = start_history_id
             db.session.commit()
         
         # Mark sync run as completed (even if there were errors)
         # The UI will check errors_count to determine if there were issues
-        if sync_run.status not in ('paused', 'cancelled'):
+        if stop_reason != 'paused':
             sync_run.status = 'completed'
         sync_run.finished_at = datetime.now(timezone.utc)
         sync_run.pages_scanned = result['pages_scanned']
@@ -2555,6 +2323,7 @@ def sync_gmail_receipts(business_id: int, mode: str = 'incremental', max_message
         logger.info(f"   Candidate receipts: {result.get('candidate_receipts', 0)}")
         logger.info(f"   Errors: {result.get('errors', 0)}")
         logger.info(f"   Receipts/Emails ratio: {receipts_to_emails_ratio:.1f}%")
+        logger.info(f"   Pipeline: {result.get('pipeline', {})}")
         if receipts_to_emails_ratio > 60:
             logger.warning(f"⚠️ High ratio ({receipts_to_emails_ratio:.1f}%) - possible false positives!")
         logger.info("=" * 80)
@@ -2610,7 +2379,7 @@ def sync_gmail_receipts(business_id: int, mode: str = 'incremental', max_message
         Sync results with detailed counters
     """
     from server.db import db
-    from server.models_sql import GmailConnection, Receipt, Attachment, ReceiptSyncRun
+    from server.models_sql import GmailConnection, Attachment, ReceiptSyncRun
     from server.services.attachment_service import get_attachment_service
     
     logger.info(f"Starting Gmail sync for business {business_id}, mode={mode}")
@@ -2814,7 +2583,7 @@ def sync_gmail_receipts(business_id: int, mode: str = 'incremental', max_message
         
         # Mark sync run as completed (even if there were errors)
         # The UI will check errors_count to determine if there were issues
-        if sync_run.status not in ('paused', 'cancelled'):
+        if stop_reason != 'paused':
             sync_run.status = 'completed'
         sync_run.finished_at = datetime.now(timezone.utc)
         db.session.commit()
@@ -2877,6 +2646,211 @@ def _convert_png_to_pdf(png_path: str) -> bytes:
             os.unlink(pdf_path)
 
 
+def _capture_receipt_png(page, email_html: str, viewport_width: int, viewport_height: int,
+                         retry_attempt: int) -> bytes:
+    """
+    Load email HTML into a pooled Playwright page and take the PNG screenshot
+    
+    Runs on a BrowserPool render thread (server/services/browser_pool.py).
+    Returns the PNG bytes; raises if not even a viewport screenshot works.
+    """
+    # Pooled page: same viewport as a fresh one (the pool's contexts ignore SSL errors)
+    page.set_viewport_size({'width': viewport_width, 'height': viewport_height})
+    
+    # Set screen media (not print)
+    page.emulate_media(media='screen')
+    
+    # STRATEGY 1: Try loading with content and waiting
+    # Use progressively longer timeouts on retries
+    base_timeout = 30000
+    timeout_ms = base_timeout + (retry_attempt * 15000)  # 30s, 45s, 60s
+    
+    logger.info(f"Loading HTML content (timeout: {timeout_ms}ms)...")
+    
+    try:
+        # Set content with networkidle wait
+        page.set_content(email_html, wait_until='networkidle', timeout=timeout_ms)
+    except Exception as e:
+        logger.warning(f"networkidle failed: {e}, trying with domcontentloaded")
+        try:
+            # Fallback: just wait for DOM
+            page.set_content(email_html, wait_until='domcontentloaded', timeout=timeout_ms)
+        except Exception as e2:
+            logger.warning(f"domcontentloaded failed: {e2}, trying without wait")
+            # Last resort: no wait condition
+            page.set_content(email_html, timeout=timeout_ms)
+    
+    # STRATEGY 2: Wait for content to stabilize (best effort)
+    # Don't fail if any of these timeout - just log and continue
+    
+    # Wait for network to be idle (best effort)
+    try:
+        page.wait_for_load_state('networkidle', timeout=10000)
+        logger.debug("Network idle achieved")
+    except:
+        logger.debug("Network idle timeout (continuing)")
+    
+    # Wait for fonts (best effort)
+    try:
+        page.evaluate("() => document.fonts && document.fonts.ready", timeout=5000)
+        logger.debug("Fonts ready")
+    except:
+        logger.debug("Fonts wait failed (continuing)")
+    
+    # Wait for images (best effort)
+    try:
+        page.evaluate("""
+            () => {
+                const imgs = Array.from(document.images || []);
+                return Promise.all(imgs.map(img => 
+                    img.complete ? Promise.resolve() : 
+                    new Promise(res => {
+                        img.addEventListener('load', res);
+                        img.addEventListener('error', res);
+                        setTimeout(res, 5000);  // Max 5s per image
+                    })
+                ));
+            }
+        """, timeout=15000)
+        logger.debug("Images loaded")
+    except:
+        logger.debug("Image loading wait failed (continuing)")
+    
+    # Final stabilization wait
+    try:
+        page.wait_for_timeout(2000)  # 2 second buffer
+    except:
+        pass
+    
+    # CRITICAL: Verify content actually loaded before screenshot
+    # This prevents capturing empty pages, headers only, or loading screens
+    logger.info("Verifying content loaded...")
+    
+    try:
+        # Check that body has meaningful content
+        content_check = page.evaluate("""
+            () => {
+                const body = document.body;
+                if (!body) return { loaded: false, reason: 'no body' };
+                
+                // Get visible text content (excluding scripts/styles)
+                const textContent = body.innerText || body.textContent || '';
+                const textLength = textContent.trim().length;
+                
+                // Count visible elements
+                const visibleElements = Array.from(document.querySelectorAll('*')).filter(el => {
+                    const style = window.getComputedStyle(el);
+                    return style.display !== 'none' && style.visibility !== 'hidden' && style.opacity !== '0';
+                }).length;
+                
+                // Check for common email content indicators
+                const hasTables = document.querySelectorAll('table').length > 0;
+                const hasDivs = document.querySelectorAll('div').length > 3;
+                const hasParagraphs = document.querySelectorAll('p').length > 0;
+                const hasImages = document.querySelectorAll('img').length > 0;
+                
+                // Must have substantial content
+                const hasContent = textLength > 50 || hasTables || (hasDivs && hasParagraphs) || hasImages;
+                
+                return {
+                    loaded: hasContent && visibleElements > 5,
+                    textLength: textLength,
+                    visibleElements: visibleElements,
+                    hasTables: hasTables,
+                    hasDivs: hasDivs,
+                    hasParagraphs: hasParagraphs,
+                    hasImages: hasImages,
+                    reason: hasContent ? 'ok' : 'insufficient content'
+                };
+            }
+        """, timeout=5000)
+        
+        logger.info(f"Content check: {content_check}")
+        
+        # If content not loaded, wait longer
+        if not content_check.get('loaded'):
+            logger.warning(f"Content not fully loaded ({content_check.get('reason')}), waiting additional 3 seconds...")
+            page.wait_for_timeout(3000)
+            
+            # Check again
+            content_check2 = page.evaluate("""
+                () => {
+                    const body = document.body;
+                    const textContent = (body.innerText || body.textContent || '').trim();
+                    return {
+                        loaded: textContent.length > 30,
+                        textLength: textContent.length
+                    };
+                }
+            """, timeout=5000)
+            
+            logger.info(f"Second content check: {content_check2}")
+            
+            if not content_check2.get('loaded'):
+                logger.warning(f"Content still minimal after wait (text length: {content_check2.get('textLength')})")
+        
+    except Exception as e:
+        logger.warning(f"Content verification failed: {e}, proceeding with screenshot anyway")
+    
+    # Additional wait for dynamic content to settle
+    try:
+        page.wait_for_timeout(1500)  # Extra 1.5s for any dynamic loading
+    except:
+        pass
+    
+    # STRATEGY 3: Inject CSS to improve rendering
+    try:
+        page.add_style_tag(content="""
+            body {
+                max-width: 100%;
+                background: white !important;
+                color: black !important;
+                font-size: 14px;
+                line-height: 1.4;
+                padding: 20px;
+                overflow-x: hidden;
+            }
+            * {
+                max-width: 100% !important;
+                box-sizing: border-box;
+            }
+            img {
+                max-width: 100% !important;
+                height: auto !important;
+                display: block;
+            }
+            table {
+                max-width: 100% !important;
+                border-collapse: collapse;
+            }
+        """)
+    except Exception as e:
+        logger.debug(f"CSS injection failed (continuing): {e}")
+    
+    # STRATEGY 4: Take screenshot with error handling
+    logger.info("Taking screenshot...")
+    
+    try:
+        # Try full page screenshot first
+        return page.screenshot(
+            full_page=True, 
+            type='png',
+            timeout=30000
+        )
+    except Exception as e:
+        logger.warning(f"Full page screenshot failed: {e}, trying viewport screenshot")
+        try:
+            # Fallback: viewport only screenshot
+            return page.screenshot(
+                full_page=False,
+                type='png',
+                timeout=30000
+            )
+        except Exception as e2:
+            logger.error(f"Viewport screenshot also failed: {e2}")
+            raise  # Can't continue without screenshot
+
+
 def generate_receipt_preview_png(email_html: str, business_id: int, receipt_id: Optional[int] = None, 
                                   viewport_width: int = SCREENSHOT_DEFAULT_WIDTH, 
                                   viewport_height: int = SCREENSHOT_DEFAULT_HEIGHT,
@@ -2891,6 +2865,9 @@ def generate_receipt_preview_png(email_html: str, business_id: int, receipt_id:
     4. Uses conservative timeouts to prevent hangs
     5. Cleans up resources even on failure
     
+    Rendering runs on a pooled, long-lived Chromium page (browser_pool.py);
+    a render that exceeds BROWSER_POOL_RENDER_TIMEOUT is not retried.
+    
     Args:
         email_html: FULL HTML content of the email
         business_id: Business ID for storage
@@ -2937,371 +2914,124 @@ def generate_receipt_preview_png(email_html: str, business_id: int, receipt_id:
     except Exception as e:
         logger.warning(f"HTML sanitization failed: {e}, using original")
     
-    browser = None
-    page = None
-    screenshot_path = None
-    
     try:
-        import tempfile
-        import os
-        
         logger.info(f"📸 [Attempt {retry_attempt + 1}/3] Generating PNG preview for receipt {receipt_id or 'unknown'}")
         
-        with sync_playwright() as p:
-            # Launch browser with robust settings
-            browser = p.chromium.launch(
-                headless=True,
-                args=[
-                    # Automation flags
-                    '--disable-blink-features=AutomationControlled',
-                    '--no-first-run',
-                    '--no-default-browser-check',
-                    '--disable-extensions',
-                    # Container/Docker stability flags
-                    '--disable-dev-shm-usage',  # Prevent shared memory issues in containers
-                    '--no-sandbox',  # Required in Docker/containerized environments
-                    '--disable-setuid-sandbox',
-                    # Resource management flags
-                    '--disable-gpu',  # Disable GPU for stability
-                ]
-            )
-            
-            # Create page with fixed viewport
-            page = browser.new_page(
-                viewport={'width': viewport_width, 'height': viewport_height},
-                ignore_https_errors=True  # Don't fail on SSL errors in embedded content
-            )
-            
-            # Set screen media (not print)
-            page.emulate_media(media='screen')
-            
-            # STRATEGY 1: Try loading with content and waiting
-            # Use progressively longer timeouts on retries
-            base_timeout = 30000
-            timeout_ms = base_timeout + (retry_attempt * 15000)  # 30s, 45s, 60s
-            
-            logger.info(f"Loading HTML content (timeout: {timeout_ms}ms)...")
-            
-            try:
-                # Set content with networkidle wait
-                page.set_content(email_html, wait_until='networkidle', timeout=timeout_ms)
-            except Exception as e:
-                logger.warning(f"networkidle failed: {e}, trying with domcontentloaded")
-                try:
-                    # Fallback: just wait for DOM
-                    page.set_content(email_html, wait_until='domcontentloaded', timeout=timeout_ms)
-                except Exception as e2:
-                    logger.warning(f"domcontentloaded failed: {e2}, trying without wait")
-                    # Last resort: no wait condition
-                    page.set_content(email_html, timeout=timeout_ms)
-            
-            # STRATEGY 2: Wait for content to stabilize (best effort)
-            # Don't fail if any of these timeout - just log and continue
-            
-            # Wait for network to be idle (best effort)
-            try:
-                page.wait_for_load_state('networkidle', timeout=10000)
-                logger.debug("Network idle achieved")
-            except:
-                logger.debug("Network idle timeout (continuing)")
-            
-            # Wait for fonts (best effort)
-            try:
-                page.evaluate("() => document.fonts && document.fonts.ready", timeout=5000)
-                logger.debug("Fonts ready")
-            except:
-                logger.debug("Fonts wait failed (continuing)")
-            
-            # Wait for images (best effort)
-            try:
-                page.evaluate("""
-                    () => {
-                        const imgs = Array.from(document.images || []);
-                        return Promise.all(imgs.map(img => 
-                            img.complete ? Promise.resolve() : 
-                            new Promise(res => {
-                                img.addEventListener('load', res);
-                                img.addEventListener('error', res);
-                                setTimeout(res, 5000);  // Max 5s per image
-                            })
-                        ));
-                    }
-                """, timeout=15000)
-                logger.debug("Images loaded")
-            except:
-                logger.debug("Image loading wait failed (continuing)")
-            
-            # Final stabilization wait
-            try:
-                page.wait_for_timeout(2000)  # 2 second buffer
-            except:
-                pass
-            
-            # CRITICAL: Verify content actually loaded before screenshot
-            # This prevents capturing empty pages, headers only, or loading screens
-            logger.info("Verifying content loaded...")
-            
-            try:
-                # Check that body has meaningful content
-                content_check = page.evaluate("""
-                    () => {
-                        const body = document.body;
-                        if (!body) return { loaded: false, reason: 'no body' };
-                        
-                        // Get visible text content (excluding scripts/styles)
-                        const textContent = body.innerText || body.textContent || '';
-                        const textLength = textContent.trim().length;
-                        
-                        // Count visible elements
-                        const visibleElements = Array.from(document.querySelectorAll('*')).filter(el => {
-                            const style = window.getComputedStyle(el);
-                            return style.display !== 'none' && style.visibility !== 'hidden' && style.opacity !== '0';
-                        }).length;
-                        
-                        // Check for common email content indicators
-                        const hasTables = document.querySelectorAll('table').length > 0;
-                        const hasDivs = document.querySelectorAll('div').length > 3;
-                        const hasParagraphs = document.querySelectorAll('p').length > 0;
-                        const hasImages = document.querySelectorAll('img').length > 0;
-                        
-                        // Must have substantial content
-                        const hasContent = textLength > 50 || hasTables || (hasDivs && hasParagraphs) || hasImages;
-                        
-                        return {
-                            loaded: hasContent && visibleElements > 5,
-                            textLength: textLength,
-                            visibleElements: visibleElements,
-                            hasTables: hasTables,
-                            hasDivs: hasDivs,
-                            hasParagraphs: hasParagraphs,
-                            hasImages: hasImages,
-                            reason: hasContent ? 'ok' : 'insufficient content'
-                        };
-                    }
-                """, timeout=5000)
-                
-                logger.info(f"Content check: {content_check}")
-                
-                # If content not loaded, wait longer
-                if not content_check.get('loaded'):
-                    logger.warning(f"Content not fully loaded ({content_check.get('reason')}), waiting additional 3 seconds...")
-                    page.wait_for_timeout(3000)
-                    
-                    # Check again
-                    content_check2 = page.evaluate("""
-                        () => {
-                            const body = document.body;
-                            const textContent = (body.innerText || body.textContent || '').trim();
-                            return {
-                                loaded: textContent.length > 30,
-                                textLength: textContent.length
-                            };
-                        }
-                    """, timeout=5000)
-                    
-                    logger.info(f"Second content check: {content_check2}")
-                    
-                    if not content_check2.get('loaded'):
-                        logger.warning(f"Content still minimal after wait (text length: {content_check2.get('textLength')})")
-                
-            except Exception as e:
-                logger.warning(f"Content verification failed: {e}, proceeding with screenshot anyway")
-            
-            # Additional wait for dynamic content to settle
-            try:
-                page.wait_for_timeout(1500)  # Extra 1.5s for any dynamic loading
-            except:
-                pass
-            
-            # STRATEGY 3: Inject CSS to improve rendering
-            try:
-                page.add_style_tag(content="""
-                    body {
-                        max-width: 100%;
-                        background: white !important;
-                        color: black !important;
-                        font-size: 14px;
-                        line-height: 1.4;
-                        padding: 20px;
-                        overflow-x: hidden;
-                    }
-                    * {
-                        max-width: 100% !important;
-                        box-sizing: border-box;
-                    }
-                    img {
-                        max-width: 100% !important;
-                        height: auto !important;
-                        display: block;
-                    }
-                    table {
-                        max-width: 100% !important;
-                        border-collapse: collapse;
-                    }
-                """)
-            except Exception as e:
-                logger.debug(f"CSS injection failed (continuing): {e}")
-            
-            # STRATEGY 4: Take screenshot with error handling
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as tmp:
-                screenshot_path = tmp.name
-            
-            logger.info("Taking screenshot...")
-            
-            try:
-                # Try full page screenshot first
-                page.screenshot(
-                    path=screenshot_path, 
-                    full_page=True, 
-                    type='png',
-                    timeout=30000
-                )
-            except Exception as e:
-                logger.warning(f"Full page screenshot failed: {e}, trying viewport screenshot")
-                try:
-                    # Fallback: viewport only screenshot
-                    page.screenshot(
-                        path=screenshot_path,
-                        full_page=False,
-                        type='png',
-                        timeout=30000
-                    )
-                except Exception as e2:
-                    logger.error(f"Viewport screenshot also failed: {e2}")
-                    raise  # Can't continue without screenshot
-            
-            # Close browser before processing file
-            browser.close()
-            browser = None
-            page = None
-            
-            # Read and validate PNG
-            with open(screenshot_path, 'rb') as f:
-                png_data = f.read()
-            
-            # Clean up temp file
-            os.unlink(screenshot_path)
-            screenshot_path = None
-            
-            png_size = len(png_data)
-            logger.info(f"Screenshot captured: {png_size} bytes")
-            
-            # STRATEGY 5: Smart retry logic with quality checks
-            from server.services.receipt_preview_service import is_image_blank_or_white
-            
-            is_blank = is_image_blank_or_white(png_data)
-            MIN_PNG_SIZE = 10 * 1024  # 10KB threshold
-            
-            # Determine if we should retry
-            should_retry = False
-            retry_reason = None
-            
-            if is_blank and retry_attempt < 2:
-                should_retry = True
-                retry_reason = "blank image"
-            elif png_size < MIN_PNG_SIZE and retry_attempt < 2:
-                should_retry = True
-                retry_reason = f"small size ({png_size} bytes)"
-            
-            if should_retry:
-                logger.warning(f"⚠️ Screenshot quality issue: {retry_reason} - retrying (attempt {retry_attempt + 2}/3)")
-                
-                # Try different viewport size on second retry
-                new_width = viewport_width
-                new_height = viewport_height
-                if retry_attempt == 1:
-                    new_width = SCREENSHOT_RETRY_WIDTH
-                    new_height = SCREENSHOT_RETRY_HEIGHT
-                    logger.info(f"Using larger viewport for retry: {new_width}x{new_height}")
-                
-                retry_result = generate_receipt_preview_png(
-                    email_html=email_html,
-                    business_id=business_id,
-                    receipt_id=receipt_id,
-                    viewport_width=new_width,
-                    viewport_height=new_height,
-                    retry_attempt=retry_attempt + 1
-                )
-                
-                # Use retry result if it's better, otherwise use current
-                if retry_result:
-                    logger.info("✅ Retry produced better result")
-                    return retry_result
-                else:
-                    logger.warning("🔄 Retry didn't improve quality - using current screenshot")
-            
-            # Save screenshot (even if not perfect)
-            if not png_data:
-                logger.error("No PNG data to save")
-                return None
-            
-            # Save to storage as PNG preview
-            from server.services.attachment_service import get_attachment_service
-            from server.models_sql import Attachment
-            from server.db import db
-            from werkzeug.datastructures import FileStorage
-            from io import BytesIO
-            
-            attachment_service = get_attachment_service()
-            
-            file_storage = FileStorage(
-                stream=BytesIO(png_data),
-                filename='receipt_preview.png',
-                content_type='image/png'
-            )
-            
-            # Create attachment record
-            attachment = Attachment(
-                business_id=business_id,
-                filename_original='receipt_preview.png',
-                mime_type='image/png',
-                file_size=0,
-                storage_path='',
-                purpose='receipt_preview',
-                origin_module='receipts',
-                channel_compatibility={'email': True, 'whatsapp': True, 'broadcast': True}
+        try:
+            png_data = get_browser_pool().render(
+                lambda page: _capture_receipt_png(page, email_html, viewport_width, viewport_height, retry_attempt)
             )
-            db.session.add(attachment)
-            db.session.flush()
-            
-            # Save file
-            storage_key, file_size = attachment_service.save_file(
-                file=file_storage,
+        except RenderTimeout as e:
+            # The pool already waited its full budget - another attempt would only queue again
+            logger.error(f"❌ Screenshot render timed out for receipt {receipt_id or 'unknown'}: {e}")
+            return None
+        
+        png_size = len(png_data)
+        logger.info(f"Screenshot captured: {png_size} bytes")
+        
+        # STRATEGY 5: Smart retry logic with quality checks
+        from server.services.receipt_preview_service import is_image_blank_or_white
+        
+        is_blank = is_image_blank_or_white(png_data)
+        MIN_PNG_SIZE = 10 * 1024  # 10KB threshold
+        
+        # Determine if we should retry
+        should_retry = False
+        retry_reason = None
+        
+        if is_blank and retry_attempt < 2:
+            should_retry = True
+            retry_reason = "blank image"
+        elif png_size < MIN_PNG_SIZE and retry_attempt < 2:
+            should_retry = True
+            retry_reason = f"small size ({png_size} bytes)"
+        
+        if should_retry:
+            logger.warning(f"⚠️ Screenshot quality issue: {retry_reason} - retrying (attempt {retry_attempt + 2}/3)")
+            
+            # Try different viewport size on second retry
+            new_width = viewport_width
+            new_height = viewport_height
+            if retry_attempt == 1:
+                new_width = SCREENSHOT_RETRY_WIDTH
+                new_height = SCREENSHOT_RETRY_HEIGHT
+                logger.info(f"Using larger viewport for retry: {new_width}x{new_height}")
+            
+            retry_result = generate_receipt_preview_png(
+                email_html=email_html,
                 business_id=business_id,
-                attachment_id=attachment.id,
-                purpose='receipt_preview'
+                receipt_id=receipt_id,
+                viewport_width=new_width,
+                viewport_height=new_height,
+                retry_attempt=retry_attempt + 1
             )
             
-            attachment.storage_path = storage_key
-            attachment.file_size = file_size
-            db.session.commit()
-            
-            # Log result
-            if is_blank:
-                logger.warning(f"⚠️ Screenshot may be blank but saved: attachment_id={attachment.id}, size={file_size} bytes")
-            elif file_size < MIN_PNG_SIZE:
-                logger.warning(f"⚠️ Small screenshot saved: attachment_id={attachment.id}, size={file_size} bytes")
+            # Use retry result if it's better, otherwise use current
+            if retry_result:
+                logger.info("✅ Retry produced better result")
+                return retry_result
             else:
-                logger.info(f"✅ Screenshot generated successfully: attachment_id={attachment.id}, size={file_size} bytes")
+                logger.warning("🔄 Retry didn't improve quality - using current screenshot")
+        
+        # Save screenshot (even if not perfect)
+        if not png_data:
+            logger.error("No PNG data to save")
+            return None
+        
+        # Save to storage as PNG preview
+        from server.services.attachment_service import get_attachment_service
+        from server.models_sql import Attachment
+        from server.db import db
+        from werkzeug.datastructures import FileStorage
+        from io import BytesIO
+        
+        attachment_service = get_attachment_service()
+        
+        file_storage = FileStorage(
+            stream=BytesIO(png_data),
+            filename='receipt_preview.png',
+            content_type='image/png'
+        )
+        
+        # Create attachment record
+        attachment = Attachment(
+            business_id=business_id,
+            filename_original='receipt_preview.png',
+            mime_type='image/png',
+            file_size=0,
+            storage_path='',
+            purpose='receipt_preview',
+            origin_module='receipts',
+            channel_compatibility={'email': True, 'whatsapp': True, 'broadcast': True}
+        )
+        db.session.add(attachment)
+        db.session.flush()
+        
+        # Save file
+        storage_key, file_size = attachment_service.save_file(
+            file=file_storage,
+            business_id=business_id,
+            attachment_id=attachment.id,
+            purpose='receipt_preview'
+        )
+        
+        attachment.storage_path = storage_key
+        attachment.file_size = file_size
+        db.session.commit()
+        
+        # Log result
+        if is_blank:
+            logger.warning(f"⚠️ Screenshot may be blank but saved: attachment_id={attachment.id}, size={file_size} bytes")
+        elif file_size < MIN_PNG_SIZE:
+            logger.warning(f"⚠️ Small screenshot saved: attachment_id={attachment.id}, size={file_size} bytes")
+        else:
+            logger.info(f"✅ Screenshot generated successfully: attachment_id={attachment.id}, size={file_size} bytes")
+        
+        return (attachment.id, file_size)
             
-            return (attachment.id, file_size)
-                
     except Exception as e:
         logger.error(f"❌ Screenshot generation failed after {retry_attempt + 1} attempts: {e}", exc_info=True)
         
-        # Clean up resources
-        if browser:
-            try:
-                browser.close()
-            except:
-                pass
-        
-        if screenshot_path and os.path.exists(screenshot_path):
-            try:
-                os.unlink(screenshot_path)
-            except:
-                pass
-        
         # If we haven't exhausted retries, try again
         if retry_attempt < 2:
             logger.info(f"🔄 Retrying screenshot generation (attempt {retry_attempt + 2}/3)")
@@ -3317,6 +3047,110 @@ def generate_receipt_preview_png(email_html: str, business_id: int, receipt_id:
         return None
 
 
+def _capture_snapshot_pdf(page, email_html: str) -> bytes:
+    """Load email HTML into a pooled Playwright page and print it as an A4 PDF"""
+    page.set_viewport_size({'width': 800, 'height': 1200})
+    
+    page.emulate_media(media='screen')
+    
+    # Progressive loading with fallbacks (same as PNG)
+    try:
+        page.set_content(email_html, wait_until='networkidle', timeout=30000)
+    except Exception as e:
+        logger.warning(f"networkidle failed: {e}, trying domcontentloaded")
+        try:
+            page.set_content(email_html, wait_until='domcontentloaded', timeout=30000)
+        except Exception as e2:
+            logger.warning(f"domcontentloaded failed: {e2}, trying without wait")
+            page.set_content(email_html, timeout=30000)
+    
+    # Wait for resources (best effort)
+    try:
+        page.wait_for_load_state('networkidle', timeout=10000)
+    except:
+        pass
+    
+    try:
+        page.evaluate("() => document.fonts && document.fonts.ready", timeout=5000)
+    except:
+        pass
+    
+    try:
+        page.wait_for_timeout(1500)
+    except:
+        pass
+    
+    # CRITICAL: Verify content loaded (same as PNG)
+    logger.info("Verifying content loaded for PDF generation...")
+    try:
+        content_check = page.evaluate("""
+            () => {
+                const body = document.body;
+                if (!body) return { loaded: false, reason: 'no body' };
+                const textContent = (body.innerText || body.textContent || '').trim();
+                const textLength = textContent.length;
+                const visibleElements = Array.from(document.querySelectorAll('*')).filter(el => {
+                    const style = window.getComputedStyle(el);
+                    return style.display !== 'none' && style.visibility !== 'hidden';
+                }).length;
+                const hasContent = textLength > 30 || visibleElements > 5;
+                return { loaded: hasContent, textLength: textLength, visibleElements: visibleElements };
+            }
+        """, timeout=5000)
+        
+        logger.info(f"Content check for PDF: {content_check}")
+        
+        if not content_check.get('loaded'):
+            logger.warning(f"Content not fully loaded, waiting additional 3 seconds...")
+            page.wait_for_timeout(3000)
+    except Exception as e:
+        logger.warning(f"Content verification failed: {e}, proceeding anyway")
+    
+    # Inject CSS for better rendering
+    try:
+        page.add_style_tag(content="""
+            body {
+                max-width: 100%;
+                background: white !important;
+                color: black !important;
+                font-size: 14px;
+                padding: 20px;
+            }
+            img {
+                max-width: 100% !important;
+                height: auto !important;
+                display: block;
+            }
+            table {
+                max-width: 100% !important;
+                border-collapse: collapse;
+            }
+        """)
+    except Exception as e:
+        logger.debug(f"CSS injection failed: {e}")
+    
+    # Generate PDF directly
+    return page.pdf(
+        format='A4',
+        print_background=True,
+        display_header_footer=False
+    )
+
+
+def _capture_snapshot_png(page, email_html: str) -> bytes:
+    """Fallback for _capture_snapshot_pdf: plain full-page PNG of the email HTML"""
+    page.set_viewport_size({'width': 800, 'height': 1200})
+    page.emulate_media(media='screen')
+    page.set_content(email_html, wait_until='domcontentloaded', timeout=30000)
+    
+    try:
+        page.wait_for_load_state('networkidle', timeout=15000)
+    except Exception as wait_error:
+        logger.warning(f"networkidle timeout in fallback, proceeding: {wait_error}")
+    
+    return page.screenshot(full_page=True)
+
+
 def generate_email_screenshot(email_html: str, business_id: int, receipt_id: int = None) -> Optional[int]:
     """
     Generate a PDF screenshot from email HTML content with BULLETPROOF error handling
@@ -3372,135 +3206,88 @@ def generate_email_screenshot(email_html: str, business_id: int, receipt_id: int
         # Method 1: Try using Playwright to generate PDF directly
         if PLAYWRIGHT_AVAILABLE:
             try:
-                import tempfile
-                import os
-                
                 logger.info(f"📄 Generating HTML snapshot as PDF with Playwright for receipt {receipt_id or 'unknown'}")
                 
-                with sync_playwright() as p:
-                    # Launch with robust settings (same as PNG)
-                    browser = p.chromium.launch(
-                        headless=True,
-                        args=[
-                            # Automation flags
-                            '--disable-blink-features=AutomationControlled',
-                            '--no-first-run',
-                            '--no-default-browser-check',
-                            '--disable-extensions',
-                            # Container/Docker stability flags
-                            '--disable-dev-shm-usage',
-                            '--no-sandbox',
-                            '--disable-setuid-sandbox',
-                            # Resource management flags
-                            '--disable-gpu',
-                        ]
-                    )
+                pdf_data = get_browser_pool().render(lambda page: _capture_snapshot_pdf(page, email_html))
+                
+                if pdf_data:
+                    # Save to storage
+                    from server.services.attachment_service import get_attachment_service
+                    from server.models_sql import Attachment
+                    from server.db import db
+                    from werkzeug.datastructures import FileStorage
+                    from io import BytesIO
                     
-                    page = browser.new_page(
-                        viewport={'width': 800, 'height': 1200},
-                        ignore_https_errors=True
-                    )
+                    attachment_service = get_attachment_service()
                     
-                    page.emulate_media(media='screen')
+                    # CRITICAL: Filename must be email_snapshot.pdf (Rule 3)
+                    file_storage = FileStorage(
+                        stream=BytesIO(pdf_data),
+                        filename='email_snapshot.pdf',
+                        content_type='application/pdf'
+                    )
                     
-                    # Progressive loading with fallbacks (same as PNG)
-                    try:
-                        page.set_content(email_html, wait_until='networkidle', timeout=30000)
-                    except Exception as e:
-                        logger.warning(f"networkidle failed: {e}, trying domcontentloaded")
-                        try:
-                            page.set_content(email_html, wait_until='domcontentloaded', timeout=30000)
-                        except Exception as e2:
-                            logger.warning(f"domcontentloaded failed: {e2}, trying without wait")
-                            page.set_content(email_html, timeout=30000)
+                    # Create attachment record
+                    attachment = Attachment(
+                        business_id=business_id,
+                        filename_original='email_snapshot.pdf',
+                        mime_type='application/pdf',
+                        file_size=0,
+                        storage_path='',
+                        purpose='receipt_source',
+                        origin_module='receipts',
+                        channel_compatibility={'email': True, 'whatsapp': False, 'broadcast': False}
+                    )
+                    db.session.add(attachment)
+                    db.session.flush()
                     
-                    # Wait for resources (best effort)
-                    try:
-                        page.wait_for_load_state('networkidle', timeout=10000)
-                    except:
-                        pass
+                    # Save file
+                    storage_key, file_size = attachment_service.save_file(
+                        file=file_storage,
+                        business_id=business_id,
+                        attachment_id=attachment.id,
+                        purpose='receipt_source'
+                    )
                     
-                    try:
-                        page.evaluate("() => document.fonts && document.fonts.ready", timeout=5000)
-                    except:
-                        pass
+                    attachment.storage_path = storage_key
+                    attachment.file_size = file_size
+                    db.session.commit()
                     
-                    try:
-                        page.wait_for_timeout(1500)
-                    except:
-                        pass
+                    # Check for suspiciously small PDF (< 5KB indicates empty/blocked page)
+                    MIN_PDF_SIZE = 5 * 1024  # 5KB threshold
+                    if file_size < MIN_PDF_SIZE:
+                        logger.warning(
+                            f"⚠️ Small PDF detected ({file_size} bytes < {MIN_PDF_SIZE} bytes) - "
+                            f"likely empty/blocked page. Attachment ID: {attachment.id}"
+                        )
+                        # Return attachment_id but also return error info in tuple
+                        # This allows caller to save preview_failure_reason
+                        return (attachment.id, f"PDF too small ({file_size} bytes) - likely empty/blocked page")
                     
-                    # CRITICAL: Verify content loaded (same as PNG)
-                    logger.info("Verifying content loaded for PDF generation...")
-                    try:
-                        content_check = page.evaluate("""
-                            () => {
-                                const body = document.body;
-                                if (!body) return { loaded: false, reason: 'no body' };
-                                const textContent = (body.innerText || body.textContent || '').trim();
-                                const textLength = textContent.length;
-                                const visibleElements = Array.from(document.querySelectorAll('*')).filter(el => {
-                                    const style = window.getComputedStyle(el);
-                                    return style.display !== 'none' && style.visibility !== 'hidden';
-                                }).length;
-                                const hasContent = textLength > 30 || visibleElements > 5;
-                                return { loaded: hasContent, textLength: textLength, visibleElements: visibleElements };
-                            }
-                        """, timeout=5000)
-                        
-                        logger.info(f"Content check for PDF: {content_check}")
-                        
-                        if not content_check.get('loaded'):
-                            logger.warning(f"Content not fully loaded, waiting additional 3 seconds...")
-                            page.wait_for_timeout(3000)
-                    except Exception as e:
-                        logger.warning(f"Content verification failed: {e}, proceeding anyway")
+                    logger.info(f"✅ Email snapshot PDF generated with Playwright: attachment_id={attachment.id}, size={file_size}")
+                    return attachment.id
                     
-                    # Inject CSS for better rendering
-                    try:
-                        page.add_style_tag(content="""
-                            body {
-                                max-width: 100%;
-                                background: white !important;
-                                color: black !important;
-                                font-size: 14px;
-                                padding: 20px;
-                            }
-                            img {
-                                max-width: 100% !important;
-                                height: auto !important;
-                                display: block;
-                            }
-                            table {
-                                max-width: 100% !important;
-                                border-collapse: collapse;
-                            }
-                        """)
-                    except Exception as e:
-                        logger.debug(f"CSS injection failed: {e}")
+            except Exception as e:
+                logger.warning(f"Playwright PDF generation failed: {e}, trying PNG-to-PDF fallback")
+                # Fallback: Generate PNG then convert to PDF
+                try:
+                    import tempfile
+                    import os
                     
-                    # Create temp PDF file
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp:
-                        pdf_path = tmp.name
+                    logger.info(f"📄 Fallback: Generating PNG then converting to PDF")
                     
-                    # Generate PDF directly
-                    page.pdf(
-                        path=pdf_path,
-                        format='A4',
-                        print_background=True,
-                        display_header_footer=False
-                    )
-                    browser.close()
+                    png_data = get_browser_pool().render(lambda page: _capture_snapshot_png(page, email_html))
+                    with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as tmp:
+                        tmp.write(png_data)
+                        screenshot_path = tmp.name
                     
-                    # Read the PDF
-                    with open(pdf_path, 'rb') as f:
-                        pdf_data = f.read()
+                    # Convert PNG to PDF using helper function
+                    pdf_data = _convert_png_to_pdf(screenshot_path)
                     
-                    # Clean up temp file
-                    os.unlink(pdf_path)
+                    # Clean up temp PNG file
+                    os.unlink(screenshot_path)
                     
                     if pdf_data:
-                        # Save to storage
                         from server.services.attachment_service import get_attachment_service
                         from server.models_sql import Attachment
                         from server.db import db
@@ -3509,14 +3296,12 @@ def generate_email_screenshot(email_html: str, business_id: int, receipt_id: int
                         
                         attachment_service = get_attachment_service()
                         
-                        # CRITICAL: Filename must be email_snapshot.pdf (Rule 3)
                         file_storage = FileStorage(
                             stream=BytesIO(pdf_data),
                             filename='email_snapshot.pdf',
                             content_type='application/pdf'
                         )
                         
-                        # Create attachment record
                         attachment = Attachment(
                             business_id=business_id,
                             filename_original='email_snapshot.pdf',
@@ -3530,7 +3315,6 @@ def generate_email_screenshot(email_html: str, business_id: int, receipt_id: int
                         db.session.add(attachment)
                         db.session.flush()
                         
-                        # Save file
                         storage_key, file_size = attachment_service.save_file(
                             file=file_storage,
                             business_id=business_id,
@@ -3550,102 +3334,10 @@ def generate_email_screenshot(email_html: str, business_id: int, receipt_id: int
                                 f"likely empty/blocked page. Attachment ID: {attachment.id}"
                             )
                             # Return attachment_id but also return error info in tuple
-                            # This allows caller to save preview_failure_reason
                             return (attachment.id, f"PDF too small ({file_size} bytes) - likely empty/blocked page")
                         
-                        logger.info(f"✅ Email snapshot PDF generated with Playwright: attachment_id={attachment.id}, size={file_size}")
+                        logger.info(f"✅ Email snapshot PDF generated via PNG conversion: attachment_id={attachment.id}, size={file_size}")
                         return attachment.id
-                        
-            except Exception as e:
-                logger.warning(f"Playwright PDF generation failed: {e}, trying PNG-to-PDF fallback")
-                # Fallback: Generate PNG then convert to PDF
-                try:
-                    import tempfile
-                    import os
-                    
-                    logger.info(f"📄 Fallback: Generating PNG then converting to PDF")
-                    
-                    with sync_playwright() as p:
-                        browser = p.chromium.launch(
-                            headless=True,
-                            args=[
-                                '--disable-blink-features=AutomationControlled',
-                                '--no-first-run',
-                                '--no-default-browser-check',
-                                '--disable-extensions'
-                            ]
-                        )
-                        page = browser.new_page(viewport={'width': 800, 'height': 1200})
-                        page.set_content(email_html, wait_until='domcontentloaded', timeout=30000)
-                        
-                        try:
-                            page.wait_for_load_state('networkidle', timeout=15000)
-                        except Exception as wait_error:
-                            logger.warning(f"networkidle timeout in fallback, proceeding: {wait_error}")
-                        
-                        # Take PNG screenshot
-                        with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as tmp:
-                            screenshot_path = tmp.name
-                        page.screenshot(path=screenshot_path, full_page=True)
-                        browser.close()
-                        
-                        # Convert PNG to PDF using helper function
-                        pdf_data = _convert_png_to_pdf(screenshot_path)
-                        
-                        # Clean up temp PNG file
-                        os.unlink(screenshot_path)
-                        
-                        if pdf_data:
-                            from server.services.attachment_service import get_attachment_service
-                            from server.models_sql import Attachment
-                            from server.db import db
-                            from werkzeug.datastructures import FileStorage
-                            from io import BytesIO
-                            
-                            attachment_service = get_attachment_service()
-                            
-                            file_storage = FileStorage(
-                                stream=BytesIO(pdf_data),
-                                filename='email_snapshot.pdf',
-                                content_type='application/pdf'
-                            )
-                            
-                            attachment = Attachment(
-                                business_id=business_id,
-                                filename_original='email_snapshot.pdf',
-                                mime_type='application/pdf',
-                                file_size=0,
-                                storage_path='',
-                                purpose='receipt_source',
-                                origin_module='receipts',
-                                channel_compatibility={'email': True, 'whatsapp': False, 'broadcast': False}
-                            )
-                            db.session.add(attachment)
-                            db.session.flush()
-                            
-                            storage_key, file_size = attachment_service.save_file(
-                                file=file_storage,
-                                business_id=business_id,
-                                attachment_id=attachment.id,
-                                purpose='receipt_source'
-                            )
-                            
-                            attachment.storage_path = storage_key
-                            attachment.file_size = file_size
-                            db.session.commit()
-                            
-                            # Check for suspiciously small PDF (< 5KB indicates empty/blocked page)
-                            MIN_PDF_SIZE = 5 * 1024  # 5KB threshold
-                            if file_size < MIN_PDF_SIZE:
-                                logger.warning(
-                                    f"⚠️ Small PDF detected ({file_size} bytes < {MIN_PDF_SIZE} bytes) - "
-                                    f"likely empty/blocked page. Attachment ID: {attachment.id}"
-                                )
-                                # Return attachment_id but also return error info in tuple
-                                return (attachment.id, f"PDF too small ({file_size} bytes) - likely empty/blocked page")
-                            
-                            logger.info(f"✅ Email snapshot PDF generated via PNG conversion: attachment_id={attachment.id}, size={file_size}")
-                            return attachment.id
                 except Exception as fallback_err:
                     logger.error(f"PNG-to-PDF fallback failed: {fallback_err}")
         else:
@@ -11,7 +11,8 @@ This service:
 import logging
 from typing import Dict, Any, Optional, List
 from server.db import db
-from server.models_sql import LeadStatus, BusinessSettings
+from server.models_sql import BusinessSettings
+from server.services.status_catalog import get_status_catalog
 
 logger = logging.getLogger(__name__)
 
@@ -54,11 +55,8 @@ class HebrewLabelService:
             }
         
         try:
-            # Priority 1: Query LeadStatus table for this business
-            lead_status = LeadStatus.query.filter_by(
-                business_id=self.business_id,
-                name=status_code
-            ).first()
+            # Priority 1: LeadStatus table for this business (compiled status catalog, cached per tenant)
+            lead_status = get_status_catalog(self.business_id).by_name.get(status_code)
             
             if lead_status:
                 return {
@@ -235,9 +233,7 @@ class HebrewLabelService:
             List of dicts with status_id, status_code, status_label_he
         """
         try:
-            statuses = LeadStatus.query.filter_by(
-                business_id=self.business_id
-            ).order_by(LeadStatus.order_index).all()
+            statuses = get_status_catalog(self.business_id).entries
             
             return [
                 {
@@ -146,6 +146,7 @@ def enqueue(
     timeout: int = 300,
     retry: Optional[int] = 3,
     description: Optional[str] = None,
+    result_ttl: Optional[int] = None,
     **kwargs
 ) -> Job:
     """
@@ -165,6 +166,7 @@ def enqueue(
         timeout: Job execution timeout in seconds
         retry: Number of retry attempts (None = no retry)
         description: Human-readable job description
+        result_ttl: How long the job result is kept in seconds (None = RQ default)
         **kwargs: Keyword arguments for func
     
     Returns:
@@ -225,6 +227,8 @@ def enqueue(
     # Add retry if specified
     if retry is not None:
         job_kwargs['retry'] = Retry(max=retry)
+    if result_ttl is not None:
+        job_kwargs['result_ttl'] = result_ttl
     
     # Log enqueue
     log_context = f"[JOB-ENQUEUE] queue={queue_name} func={func_name} job_id={job_id[:8] if len(job_id) > 8 else job_id}"
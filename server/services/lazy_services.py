@@ -6,6 +6,8 @@ import os
 import json
 import time
 import logging
+import importlib
+import importlib.util
 import threading
 from functools import wraps
 
@@ -46,10 +48,70 @@ def lazy_singleton(service_name):
         return wrapper
     return decorator
 
+# Heavy SDKs (OpenAI, Playwright, Google) imported on first use, not at boot
+_import_lock = threading.RLock()
+_lazy_modules = {}
+_sdk_import_ms = {}
+
+
+class LazyModule:
+    """
+    Module proxy that imports a heavy SDK on first attribute access.
+
+    Usage:
+        openai = lazy_module("openai")
+        client = openai.OpenAI(timeout=3.5)   # "import openai" happens here
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            with _import_lock:
+                if self._module is None:
+                    started = time.perf_counter()
+                    module = importlib.import_module(self._name)
+                    _sdk_import_ms[self._name] = round((time.perf_counter() - started) * 1000, 1)
+                    log.info(f"📦 {self._name} imported on first use ({_sdk_import_ms[self._name]}ms)")
+                    self._module = module
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "deferred"
+        return f"<LazyModule {self._name} ({state})>"
+
+
+def lazy_module(name):
+    """Shared LazyModule proxy for `name` (one per module name)"""
+    with _import_lock:
+        proxy = _lazy_modules.get(name)
+        if proxy is None:
+            proxy = _lazy_modules[name] = LazyModule(name)
+        return proxy
+
+
+def sdk_available(name):
+    """True if `name` is installed - checked without importing it"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def get_sdk_imports():
+    """SDKs imported through lazy_module so far, with their import time in ms"""
+    return dict(_sdk_import_ms)
+
+
 @lazy_singleton("openai_client")
 def get_openai_client():
     """⚡ FAST OpenAI client with short timeout"""
-    import openai
+    openai = lazy_module("openai")
     
     if not os.getenv("OPENAI_API_KEY"):
         log.warning("OPENAI_API_KEY missing")
@@ -8,6 +8,9 @@ import logging
 import re
 from typing import Optional, Tuple
 
+from server.services.status_catalog import StatusCatalog, get_status_catalog
+from server.utils.aho_corasick import KeywordAutomaton
+
 log = logging.getLogger(__name__)
 
 # Configuration constants
@@ -40,6 +43,107 @@ STATUS_PROGRESSION_SCORE = {
     'NEW': 0  # Starting point
 }
 
+# Semantic groups for matching a business's statuses (name + Hebrew label)
+STATUS_GROUP_SYNONYMS = {
+    'APPOINTMENT_SET': ['qualified', 'appointment', 'meeting', 'נקבע', 'פגישה', 'סגירה', 'פגישה קבועה', 'נקבעה פגישה'],
+    'HOT_INTERESTED': ['interested', 'hot', 'מעוניין', 'חם', 'מתעניין', 'המשך טיפול', 'פוטנציאל', 'warm', 'רותח'],
+    'FOLLOW_UP': ['follow_up', 'callback', 'חזרה', 'תזכורת', 'תחזור', 'מאוחר יותר', 'לחזור', 'תזמון מחדש'],
+    'NOT_RELEVANT': ['not_relevant', 'not_interested', 'לא רלוונטי', 'לא מעוניין', 'להסיר', 'חסום', 'דחייה', 'סירוב'],
+    'NO_ANSWER': ['no_answer', 'אין מענה', 'לא ענה', 'לא נענה', 'תא קולי', 'busy', 'תפוס', 'failed', 'נכשל', 'קו תפוס', 'משיבון'],
+}
+
+# Keyword scoring of call text: (group, priority, keywords) - lower priority number wins,
+# ties on priority go to the higher keyword count
+KEYWORD_GROUPS = [
+    # Not interested / Not relevant (contains negations - "לא מעוניין" must not count as interested)
+    ('NOT_RELEVANT', 4, [
+        'לא מעוניין', 'לא רלוונטי', 'להסיר', 'תפסיקו', 'לא מתאים',
+        'not interested', 'not relevant', 'remove me', 'stop calling',
+        'תמחקו אותי', 'אל תתקשרו', 'לא צריך', 'תורידו אותי', 'להפסיק',
+        'לא מתאים לי', 'זה לא בשבילי', 'אני לא צריך', 'אין לי עניין'
+    ]),
+    # Appointment / Meeting scheduled (HIGHEST PRIORITY)
+    ('APPOINTMENT_SET', 1, [
+        'קבענו פגישה', 'נקבע', 'פגישה', 'meeting', 'appointment', 'scheduled', 'confirmed',
+        'בוקר מתאים', 'אחר הצהריים מתאים', 'ביום', 'בשעה', 'נפגש',
+        'נקבעה פגישה', 'קבעתי פגישה', 'מתאים לי', 'אשמח להיפגש', 'בואו נפגש'
+    ]),
+    # Hot / Interested - only counted when NOT_RELEVANT did not score
+    ('HOT_INTERESTED', 2, [
+        'מעוניין', 'כן רוצה', 'תשלח פרטים', 'תשלחו פרטים', 'דברו איתי', 'מתאים לי',
+        'interested', 'yes please', 'send details', 'call me back', 'sounds good', 'sounds interesting',
+        'אני רוצה', 'נשמע טוב', 'נשמע מעניין', 'בואו נדבר', 'יכול להיות מעניין',
+        'תן הצעה', 'תתקשרו', 'כן', 'נשמע', 'יפה', 'אשמח לשמוע', 'תספר לי עוד',
+        'אני מתעניין', 'אני מתעניינת', 'זה מעניין', 'רוצה לשמוע', 'אשמח למידע'
+    ]),
+    # Follow up / Call back later
+    ('FOLLOW_UP', 3, [
+        'תחזרו', 'תחזור', 'מאוחר יותר', 'שבוע הבא', 'חודש הבא', 'תתקשרו שוב',
+        'call back', 'follow up', 'later', 'next week', 'next month',
+        'בעוד כמה ימים', 'אחרי החגים', 'אחרי החג', 'בשבוע הבא', 'תזכיר לי',
+        'חזור אליי', 'תחזרו מחר', 'בוא נדבר אחר כך', 'לא עכשיו', 'לא זמין עכשיו'
+    ]),
+    # No answer / Voicemail / Busy / Failed (LOWEST PRIORITY)
+    ('NO_ANSWER', 5, [
+        'לא ענה', 'אין מענה', 'תא קולי', 'לא זמין', 'לא פנוי',
+        'no answer', 'voicemail', 'not available', 'unavailable',
+        'מכשיר כבוי', 'לא משיב', 'מספר לא זמין',
+        'קו תפוס', 'busy', 'line busy', 'תפוס',
+        'שיחה נכשלה', 'call failed', 'failed', 'נכשל',
+        'לא נענה', 'לא השיב', 'לא הגיב', 'משיבון'
+    ]),
+]
+
+# Keywords identifying a business's no-answer statuses (name, label or description)
+NO_ANSWER_STATUS_KEYWORDS = [
+    'no_answer', 'no answer', 'אין מענה', 'לא ענה', 'לא נענה',
+    'busy', 'תפוס', 'קו תפוס', 'failed', 'נכשל', 'שיחה נכשלה',
+    'unanswered', 'not answered', 'didnt answer', "didn't answer"
+]
+
+# AI label variants that mean "no answer" (e.g. "no_answer_2", "אין מענה 2")
+NO_ANSWER_LABEL_PATTERNS = ['no_answer', 'no answer', 'אין מענה', 'לא ענה', 'לא נענה']
+
+# Synonyms for mapping an AI label to a status that is not named after it
+LABEL_SYNONYM_GROUPS = {
+    'voicemail': ['voicemail', 'תא קולי', 'משיבון'],
+    'busy': ['busy', 'תפוס', 'קו תפוס'],
+    'interested': ['interested', 'מעוניין', 'מתעניין', 'hot', 'חם'],
+    'not_interested': ['not_interested', 'לא מעוניין', 'not_relevant', 'לא רלוונטי'],
+    'follow_up': ['follow_up', 'callback', 'חזרה', 'לחזור'],
+}
+
+
+def _compile_groups(groups):
+    """One automaton over every keyword of every group + keyword index → group"""
+    patterns, group_of = [], []
+    for group, keywords in groups:
+        patterns.extend(keywords)
+        group_of.extend([group] * len(keywords))
+    return KeywordAutomaton(patterns), group_of
+
+
+# Compiled once per process - every keyword list is scanned in a single pass over the text
+_KEYWORD_AUTOMATON, _KEYWORD_GROUP_OF = _compile_groups((g, kws) for g, _, kws in KEYWORD_GROUPS)
+_KEYWORD_PRIORITY = {group: priority for group, priority, _ in KEYWORD_GROUPS}
+_FAMILY_AUTOMATON, _FAMILY_OF = _compile_groups(STATUS_FAMILIES.items())
+_NO_ANSWER_STATUS_AUTOMATON = KeywordAutomaton(NO_ANSWER_STATUS_KEYWORDS)
+
+
+def keyword_family(status_lower: str) -> Optional[str]:
+    """First STATUS_FAMILIES family (in definition order) with a pattern in the lowercased status"""
+    first = _FAMILY_AUTOMATON.first(status_lower)
+    return _FAMILY_OF[first] if first >= 0 else None
+
+
+def score_keywords(text_lower: str) -> dict:
+    """{group: number of the group's keywords present in the lowercased text}"""
+    counts = {}
+    for index in _KEYWORD_AUTOMATON.find(text_lower):
+        group = _KEYWORD_GROUP_OF[index]
+        counts[group] = counts.get(group, 0) + 1
+    return counts
+
 
 class LeadAutoStatusService:
     """
@@ -98,46 +202,29 @@ class LeadAutoStatusService:
         
         return suggested
     
+    def _catalog(self, tenant_id: int) -> StatusCatalog:
+        """Compiled status catalog for tenant (cached, invalidated on status CRUD)"""
+        return get_status_catalog(tenant_id)
+    
     def _get_valid_statuses(self, tenant_id: int) -> set:
         """Get set of valid status names for tenant"""
-        from server.models_sql import LeadStatus
-        
-        statuses = LeadStatus.query.filter_by(
-            business_id=tenant_id,
-            is_active=True
-        ).order_by(LeadStatus.order_index).all()
-        
-        return {s.name for s in statuses}
+        return set(self._catalog(tenant_id).active_names)
     
     def _get_valid_statuses_dict(self, tenant_id: int) -> dict:
         """
         Get dictionary of valid statuses for tenant with descriptions
         Returns: {status_name: status_description}
         """
-        from server.models_sql import LeadStatus
-        
-        statuses = LeadStatus.query.filter_by(
-            business_id=tenant_id,
-            is_active=True
-        ).order_by(LeadStatus.order_index).all()
-        
-        return {s.name: (s.description or s.name) for s in statuses}
+        return self._catalog(tenant_id).active_dict()
     
     def _get_valid_statuses_full(self, tenant_id: int) -> list:
         """
         Get full status objects for tenant (including name, label, description)
         Used for smart matching against Hebrew/multilingual labels
         
-        Returns: List of LeadStatus objects
+        Returns: List of StatusEntry snapshots (same fields as LeadStatus), ordered by order_index
         """
-        from server.models_sql import LeadStatus
-        
-        statuses = LeadStatus.query.filter_by(
-            business_id=tenant_id,
-            is_active=True
-        ).order_by(LeadStatus.order_index).all()
-        
-        return statuses
+        return self._catalog(tenant_id).active
     
     def _extract_recommendation_from_summary(
         self, 
@@ -173,21 +260,14 @@ class LeadAutoStatusService:
             recommended_label = match.group(1).strip()
             log.info(f"[AutoStatus] 🎯 Found recommendation: '{recommended_label}'")
             
-            # Get full status objects to map Hebrew label to status_id
-            full_statuses = self._get_valid_statuses_full(tenant_id)
+            # Mapping Hebrew label (and lowercase variant) -> status_id, precompiled per tenant
+            catalog = self._catalog(tenant_id)
             
-            if not full_statuses:
+            if not catalog.active:
                 log.warning(f"[AutoStatus] No statuses found for tenant {tenant_id}")
                 return None
             
-            # Build mapping: Hebrew label -> status_id
-            label_to_status_id = {}
-            for status in full_statuses:
-                status_id = status.name
-                label_he = (status.label or status.name).strip()
-                label_to_status_id[label_he] = status_id
-                # Also add lowercase variant for case-insensitive match
-                label_to_status_id[label_he.lower()] = status_id
+            label_to_status_id = catalog.label_to_name
             
             # Try exact match first
             if recommended_label in label_to_status_id:
@@ -235,8 +315,9 @@ class LeadAutoStatusService:
         if not label_or_variant:
             return None
             
-        # Get full status objects with labels
-        full_statuses = self._get_valid_statuses_full(tenant_id)
+        # Full status entries with labels (lowercased forms and numbers precomputed)
+        catalog = self._catalog(tenant_id)
+        full_statuses = catalog.active
         if not full_statuses:
             return None
         
@@ -244,12 +325,12 @@ class LeadAutoStatusService:
         
         # Strategy 1: Exact match on name (already checked, but for completeness)
         for status in full_statuses:
-            if status.name.lower() == label_lower:
+            if status.name_lower == label_lower:
                 return status.name
         
         # Strategy 2: Exact match on label (Hebrew display name)
         for status in full_statuses:
-            if status.label and status.label.lower() == label_lower:
+            if status.label and status.label_lower == label_lower:
                 log.info(f"[AutoStatus] Label match: '{label_lower}' → '{status.name}' (label='{status.label}')")
                 return status.name
         
@@ -257,7 +338,7 @@ class LeadAutoStatusService:
         # Handle cases like "אין מענה 2" matching status with label "אין מענה 2"
         for status in full_statuses:
             if status.label:
-                status_label_lower = status.label.lower()
+                status_label_lower = status.label_lower
                 # Check if labels are semantically similar
                 if (label_lower in status_label_lower or 
                     status_label_lower in label_lower):
@@ -266,55 +347,41 @@ class LeadAutoStatusService:
         
         # Strategy 4: Pattern-based mapping for common cases
         # Handle "no_answer_2" style variants
-        no_answer_patterns = ['no_answer', 'no answer', 'אין מענה', 'לא ענה', 'לא נענה']
-        is_no_answer_variant = any(p in label_lower for p in no_answer_patterns)
+        is_no_answer_variant = any(p in label_lower for p in NO_ANSWER_LABEL_PATTERNS)
         
         if is_no_answer_variant:
             # Extract number if present (e.g., "no_answer_2" → 2)
-            import re
             numbers = re.findall(r'\d+', label_lower)
             target_number = int(numbers[-1]) if numbers else None
             
             if target_number:
                 # Look for status with that number in name or label
                 for status in full_statuses:
-                    status_name_lower = status.name.lower()
-                    status_label_lower = (status.label or "").lower()
-                    
                     # Check if this status has the same number
-                    name_numbers = re.findall(r'\d+', status_name_lower)
-                    label_numbers = re.findall(r'\d+', status_label_lower)
-                    
-                    if ((name_numbers and int(name_numbers[-1]) == target_number) or
-                        (label_numbers and int(label_numbers[-1]) == target_number)):
+                    if ((status.name_numbers and status.name_numbers[-1] == target_number) or
+                        (status.label_numbers and status.label_numbers[-1] == target_number)):
                         # Verify it's a no-answer type status
-                        if any(p in status_name_lower or p in status_label_lower for p in no_answer_patterns):
+                        if any(p in status.name_lower or p in status.label_lower for p in NO_ANSWER_LABEL_PATTERNS):
                             log.info(f"[AutoStatus] Number pattern match: '{label_lower}' → '{status.name}' (target_num={target_number})")
                             return status.name
             
             # Fallback: return base no_answer status if exists
             for status in full_statuses:
-                if status.name.lower() in ['no_answer', 'אין מענה']:
+                if status.name_lower in ['no_answer', 'אין מענה']:
                     log.info(f"[AutoStatus] Fallback to base no_answer: '{label_lower}' → '{status.name}'")
                     return status.name
         
-        # Strategy 5: Synonym-based matching
-        synonym_groups = {
-            'voicemail': ['voicemail', 'תא קולי', 'משיבון'],
-            'busy': ['busy', 'תפוס', 'קו תפוס'],
-            'interested': ['interested', 'מעוניין', 'מתעניין', 'hot', 'חם'],
-            'not_interested': ['not_interested', 'לא מעוניין', 'not_relevant', 'לא רלוונטי'],
-            'follow_up': ['follow_up', 'callback', 'חזרה', 'לחזור'],
-        }
-        
-        for base_status, synonyms in synonym_groups.items():
+        # Strategy 5: Synonym-based matching (first status per synonym group, once per catalog)
+        for base_status, synonyms in LABEL_SYNONYM_GROUPS.items():
             if any(syn in label_lower for syn in synonyms):
                 # Find matching status
-                for status in full_statuses:
-                    if any(syn in status.name.lower() or syn in (status.label or "").lower() 
-                           for syn in synonyms):
-                        log.info(f"[AutoStatus] Synonym match: '{label_lower}' → '{status.name}'")
-                        return status.name
+                matched = catalog.memo(('synonym_status', base_status), lambda synonyms=synonyms: next(
+                    (status.name for status in full_statuses
+                     if any(syn in status.name_lower or syn in status.label_lower for syn in synonyms)),
+                    None))
+                if matched:
+                    log.info(f"[AutoStatus] Synonym match: '{label_lower}' → '{matched}'")
+                    return matched
         
         return None
     
@@ -379,28 +446,22 @@ class LeadAutoStatusService:
         Returns:
             dict mapping group names to available status names for that group
         """
-        # Get full status objects with labels
-        full_statuses = self._get_valid_statuses_full(tenant_id)
-        
-        # Define status synonyms for each semantic group (Hebrew + English)
-        groups = {
-            'APPOINTMENT_SET': ['qualified', 'appointment', 'meeting', 'נקבע', 'פגישה', 'סגירה', 'פגישה קבועה', 'נקבעה פגישה'],
-            'HOT_INTERESTED': ['interested', 'hot', 'מעוניין', 'חם', 'מתעניין', 'המשך טיפול', 'פוטנציאל', 'warm', 'רותח'],
-            'FOLLOW_UP': ['follow_up', 'callback', 'חזרה', 'תזכורת', 'תחזור', 'מאוחר יותר', 'לחזור', 'תזמון מחדש'],
-            'NOT_RELEVANT': ['not_relevant', 'not_interested', 'לא רלוונטי', 'לא מעוניין', 'להסיר', 'חסום', 'דחייה', 'סירוב'],
-            'NO_ANSWER': ['no_answer', 'אין מענה', 'לא ענה', 'לא נענה', 'תא קולי', 'busy', 'תפוס', 'failed', 'נכשל', 'קו תפוס', 'משיבון'],
-        }
-        
+        # Same statuses → same groups: computed once per catalog version
+        catalog = self._catalog(tenant_id)
+        return catalog.memo('status_groups', lambda: self._compute_status_groups(catalog))
+    
+    def _compute_status_groups(self, catalog: StatusCatalog) -> dict:
+        """Match the catalog's active statuses against STATUS_GROUP_SYNONYMS"""
         result = {}
-        for group_name, synonyms in groups.items():
+        for group_name, synonyms in STATUS_GROUP_SYNONYMS.items():
             # Find which statuses from this business match this group
             # 🆕 CRITICAL: Check BOTH name AND label (label is in Hebrew!)
             matching = []
-            for status_obj in full_statuses:
+            for status_obj in catalog.active:
                 # Combine name + label for searching
-                searchable_text = status_obj.name.lower() if status_obj.name else ""
+                searchable_text = status_obj.name_lower
                 if status_obj.label:
-                    searchable_text += " " + status_obj.label.lower()
+                    searchable_text += " " + status_obj.label_lower
                 
                 # Check if any synonym matches
                 for syn in synonyms:
@@ -446,68 +507,17 @@ class LeadAutoStatusService:
         # Build status groups from available statuses WITH HEBREW LABELS
         status_groups = self._build_status_groups(valid_statuses, tenant_id)
         
-        # Score each pattern group (higher score = stronger match)
+        # Score each pattern group (higher score = stronger match) - one pass over the text
+        counts = score_keywords(text_lower)
         scores = {}
         
-        # Pattern 4: Not interested / Not relevant (CHECK FIRST - contains negations)
-        # Must check before interested keywords to catch "לא מעוניין"
-        not_relevant_keywords = [
-            'לא מעוניין', 'לא רלוונטי', 'להסיר', 'תפסיקו', 'לא מתאים',
-            'not interested', 'not relevant', 'remove me', 'stop calling',
-            'תמחקו אותי', 'אל תתקשרו', 'לא צריך', 'תורידו אותי', 'להפסיק',
-            'לא מתאים לי', 'זה לא בשבילי', 'אני לא צריך', 'אין לי עניין'
-        ]
-        not_relevant_score = sum(1 for kw in not_relevant_keywords if kw in text_lower)
-        if not_relevant_score > 0 and 'NOT_RELEVANT' in status_groups:
-            scores['NOT_RELEVANT'] = (4, not_relevant_score)  # Priority 4
-        
-        # Pattern 1: Appointment / Meeting scheduled (HIGHEST PRIORITY)
-        appointment_keywords = [
-            'קבענו פגישה', 'נקבע', 'פגישה', 'meeting', 'appointment', 'scheduled', 'confirmed',
-            'בוקר מתאים', 'אחר הצהריים מתאים', 'ביום', 'בשעה', 'נפגש',
-            'נקבעה פגישה', 'קבעתי פגישה', 'מתאים לי', 'אשמח להיפגש', 'בואו נפגש'
-        ]
-        appointment_score = sum(1 for kw in appointment_keywords if kw in text_lower)
-        if appointment_score > 0 and 'APPOINTMENT_SET' in status_groups:
-            scores['APPOINTMENT_SET'] = (1, appointment_score)  # Priority 1
-        
-        # Pattern 2: Hot / Interested (SECOND PRIORITY)
-        # Only count if NOT_RELEVANT wasn't already scored (to avoid "לא מעוניין" matching "מעוניין")
-        if 'NOT_RELEVANT' not in scores:
-            interested_keywords = [
-                'מעוניין', 'כן רוצה', 'תשלח פרטים', 'תשלחו פרטים', 'דברו איתי', 'מתאים לי',
-                'interested', 'yes please', 'send details', 'call me back', 'sounds good', 'sounds interesting',
-                'אני רוצה', 'נשמע טוב', 'נשמע מעניין', 'בואו נדבר', 'יכול להיות מעניין',
-                'תן הצעה', 'תתקשרו', 'כן', 'נשמע', 'יפה', 'אשמח לשמוע', 'תספר לי עוד',
-                'אני מתעניין', 'אני מתעניינת', 'זה מעניין', 'רוצה לשמוע', 'אשמח למידע'
-            ]
-            interested_score = sum(1 for kw in interested_keywords if kw in text_lower)
-            if interested_score > 0 and 'HOT_INTERESTED' in status_groups:
-                scores['HOT_INTERESTED'] = (2, interested_score)  # Priority 2
-        
-        # Pattern 3: Follow up / Call back later (THIRD PRIORITY)
-        follow_up_keywords = [
-            'תחזרו', 'תחזור', 'מאוחר יותר', 'שבוע הבא', 'חודש הבא', 'תתקשרו שוב',
-            'call back', 'follow up', 'later', 'next week', 'next month',
-            'בעוד כמה ימים', 'אחרי החגים', 'אחרי החג', 'בשבוע הבא', 'תזכיר לי',
-            'חזור אליי', 'תחזרו מחר', 'בוא נדבר אחר כך', 'לא עכשיו', 'לא זמין עכשיו'
-        ]
-        follow_up_score = sum(1 for kw in follow_up_keywords if kw in text_lower)
-        if follow_up_score > 0 and 'FOLLOW_UP' in status_groups:
-            scores['FOLLOW_UP'] = (3, follow_up_score)  # Priority 3
-        
-        # Pattern 5: No answer / Voicemail / Busy (LOWEST PRIORITY)
-        no_answer_keywords = [
-            'לא ענה', 'אין מענה', 'תא קולי', 'לא זמין', 'לא פנוי',
-            'no answer', 'voicemail', 'not available', 'unavailable',
-            'מכשיר כבוי', 'לא משיב', 'מספר לא זמין',
-            'קו תפוס', 'busy', 'line busy', 'תפוס',  # 🆕 CRITICAL FIX: Include busy!
-            'שיחה נכשלה', 'call failed', 'failed', 'נכשל',  # 🆕 Include failed calls
-            'לא נענה', 'לא השיב', 'לא הגיב', 'משיבון'
-        ]
-        no_answer_score = sum(1 for kw in no_answer_keywords if kw in text_lower)
-        if no_answer_score > 0 and 'NO_ANSWER' in status_groups:
-            scores['NO_ANSWER'] = (5, no_answer_score)  # Priority 5
+        for group, _, _ in KEYWORD_GROUPS:
+            # Hot/Interested only counts if NOT_RELEVANT wasn't already scored
+            # (to avoid "לא מעוניין" matching "מעוניין")
+            if group == 'HOT_INTERESTED' and 'NOT_RELEVANT' in scores:
+                continue
+            if counts.get(group) and group in status_groups:
+                scores[group] = (_KEYWORD_PRIORITY[group], counts[group])
         
         # No matches found
         if not scores:
@@ -556,58 +566,14 @@ class LeadAutoStatusService:
         
         valid_statuses_set = set(valid_statuses_dict.keys())
         
-        # 🆕 CRITICAL FIX: Get full status objects to check ALL fields (name, label, description)
-        full_statuses = self._get_valid_statuses_full(tenant_id)
-        
-        # Find available no-answer statuses in this business
+        # 🆕 CRITICAL FIX: Check ALL fields (name, label, description) of the tenant's statuses
+        # Find available no-answer statuses in this business (once per catalog version)
         # Check for: no_answer, no_answer_1, no_answer_2, no_answer_3, אין מענה, אין מענה 2, אין מענה 3
         # 🆕 ALSO include: busy, תפוס, failed, נכשל (they're all types of no-answer!)
-        # 🆕 SMART: Check name, label, AND description fields!
-        available_no_answer_statuses = []
-        status_match_info = {}  # Track which field matched for logging
-        
-        # Keywords to search for across all fields
-        no_answer_keywords = [
-            'no_answer', 'no answer', 'אין מענה', 'לא ענה', 'לא נענה',
-            'busy', 'תפוס', 'קו תפוס', 'failed', 'נכשל', 'שיחה נכשלה',
-            'unanswered', 'not answered', 'didnt answer', "didn't answer"
-        ]
-        
-        for status in full_statuses:
-            # Combine all searchable text: name, label, description
-            searchable_text = ""
-            matched_in = []
-            
-            # Check name field
-            if status.name:
-                name_lower = status.name.lower()
-                if any(kw in name_lower for kw in no_answer_keywords):
-                    matched_in.append("name")
-                searchable_text += name_lower + " "
-            
-            # 🆕 CRITICAL: Check label field (user-visible text, often in Hebrew!)
-            if status.label:
-                label_lower = status.label.lower()
-                if any(kw in label_lower for kw in no_answer_keywords):
-                    matched_in.append("label")
-                searchable_text += label_lower + " "
-            
-            # Check description field
-            if status.description:
-                desc_lower = status.description.lower()
-                if any(kw in desc_lower for kw in no_answer_keywords):
-                    matched_in.append("description")
-                searchable_text += desc_lower
-            
-            # If any field matched, add this status
-            if matched_in:
-                available_no_answer_statuses.append(status.name)
-                status_match_info[status.name] = {
-                    'fields': matched_in,
-                    'label': status.label,
-                    'name': status.name
-                }
-                log.info(f"[AutoStatus] 🎯 Found no-answer status: '{status.name}' (label: '{status.label}', matched in: {', '.join(matched_in)})")
+        catalog = self._catalog(tenant_id)
+        available_no_answer_statuses, no_answer_by_attempt = catalog.memo(
+            'no_answer_statuses', lambda: self._compute_no_answer_statuses(catalog)
+        )
         
         if not available_no_answer_statuses:
             log.warning(f"[AutoStatus] ⚠️ No 'no_answer' status available for business {tenant_id}!")
@@ -645,7 +611,7 @@ class LeadAutoStatusService:
             log.info(f"[AutoStatus] 🔢 Found {no_answer_call_count} previous no-answer calls for lead {lead_id}")
             
             # Get lead's current status to check if it's already a no-answer variant
-            from server.models_sql import Lead, LeadStatus
+            from server.models_sql import Lead
             lead = Lead.query.filter_by(id=lead_id).first()
             
             # Determine next attempt based on BOTH history and current status
@@ -654,11 +620,7 @@ class LeadAutoStatusService:
             if lead and lead.status:
                 # 🆕 CRITICAL: Check if current status is a no-answer status
                 # Need to check BOTH the status name AND its label
-                current_status_obj = LeadStatus.query.filter_by(
-                    business_id=tenant_id,
-                    name=lead.status,
-                    is_active=True
-                ).first()
+                current_status_obj = catalog.get_active(lead.status)
                 
                 is_no_answer_status = False
                 current_attempt = 1
@@ -716,33 +678,8 @@ class LeadAutoStatusService:
                     next_attempt = 1
                 log.info(f"[AutoStatus] ⚠️  Lead {lead_id} has no status yet, using attempt: {next_attempt}")
             
-            # 🆕 SMART NUMBER EXTRACTION: Extract numbers from both name AND label
-            # Build map: {attempt_number: status_name}
-            status_by_attempt = {}
-            
-            for status_name in available_no_answer_statuses:
-                # Get the full status object to check label
-                status_obj = next((s for s in full_statuses if s.name == status_name), None)
-                if not status_obj:
-                    continue
-                
-                # Extract numbers from name AND label
-                numbers_in_name = re.findall(r'\d+', status_name)
-                numbers_in_label = re.findall(r'\d+', status_obj.label or '')
-                
-                # Combine all found numbers (prefer label over name)
-                all_numbers = numbers_in_label + numbers_in_name
-                
-                if all_numbers:
-                    # Take the first (or last) number found - represents the attempt
-                    attempt_num = int(all_numbers[0])
-                    status_by_attempt[attempt_num] = status_name
-                    log.info(f"[AutoStatus] 🔢 Mapped attempt {attempt_num} → status '{status_name}' (label: '{status_obj.label}')")
-                else:
-                    # No number in name or label - this is the base status (attempt 1)
-                    if 1 not in status_by_attempt:
-                        status_by_attempt[1] = status_name
-                        log.info(f"[AutoStatus] 🔢 Mapped base status (attempt 1) → '{status_name}' (label: '{status_obj.label}')")
+            # 🆕 SMART NUMBER EXTRACTION: {attempt_number: status_name} from name AND label numbers
+            status_by_attempt = no_answer_by_attempt
             
             log.info(f"[AutoStatus] 📊 Available attempt mapping: {status_by_attempt}")
             
@@ -780,6 +717,52 @@ class LeadAutoStatusService:
         
         return None
     
+    def _compute_no_answer_statuses(self, catalog: StatusCatalog) -> Tuple[list, dict]:
+        """
+        No-answer statuses of a catalog and their attempt numbers
+        
+        Returns:
+            ([status names in order], {attempt_number: status_name})
+        """
+        available_no_answer_statuses = []
+        for status in catalog.active:
+            matched_in = []
+            # Check name field
+            if status.name and _NO_ANSWER_STATUS_AUTOMATON.contains_any(status.name_lower):
+                matched_in.append("name")
+            # 🆕 CRITICAL: Check label field (user-visible text, often in Hebrew!)
+            if status.label and _NO_ANSWER_STATUS_AUTOMATON.contains_any(status.label_lower):
+                matched_in.append("label")
+            # Check description field
+            if status.description and _NO_ANSWER_STATUS_AUTOMATON.contains_any(status.description.lower()):
+                matched_in.append("description")
+            
+            # If any field matched, add this status
+            if matched_in:
+                available_no_answer_statuses.append(status.name)
+                log.info(f"[AutoStatus] 🎯 Found no-answer status: '{status.name}' (label: '{status.label}', matched in: {', '.join(matched_in)})")
+        
+        status_by_attempt = {}
+        for status_name in available_no_answer_statuses:
+            status_obj = catalog.by_name[status_name]
+            
+            # Extract numbers from name AND label - prefer label over name
+            all_numbers = (re.findall(r'\d+', status_obj.label or '') +
+                           re.findall(r'\d+', status_name))
+            
+            if all_numbers:
+                # Take the first number found - represents the attempt
+                attempt_num = int(all_numbers[0])
+                status_by_attempt[attempt_num] = status_name
+                log.info(f"[AutoStatus] 🔢 Mapped attempt {attempt_num} → status '{status_name}' (label: '{status_obj.label}')")
+            else:
+                # No number in name or label - this is the base status (attempt 1)
+                if 1 not in status_by_attempt:
+                    status_by_attempt[1] = status_name
+                    log.info(f"[AutoStatus] 🔢 Mapped base status (attempt 1) → '{status_name}' (label: '{status_obj.label}')")
+        
+        return available_no_answer_statuses, status_by_attempt
+    
     def _handle_mid_length_disconnect(self, valid_statuses_dict: dict, call_duration: int) -> Optional[str]:
         """
         🆕 Handle short-mid calls (20-30 seconds) without summary
@@ -941,15 +924,19 @@ class LeadAutoStatusService:
         if not status_name:
             return None
         
-        status_lower = status_name.lower()
-        
         # 🔥 STEP 1: Quick keyword check for common cases (performance optimization)
-        # This handles 90% of cases instantly without AI call
-        for family_name, patterns in STATUS_FAMILIES.items():
-            for pattern in patterns:
-                # More precise matching: pattern must be contained in status name
-                if pattern in status_lower:
-                    return family_name
+        # This handles 90% of cases instantly without AI call - one automaton pass,
+        # first family in STATUS_FAMILIES order wins
+        family_name = keyword_family(status_name.lower())
+        if family_name:
+            return family_name
+        
+        # AI classifications are kept on the tenant's catalog (dropped when statuses change)
+        catalog = self._catalog(tenant_id) if tenant_id else None
+        if catalog is not None:
+            cached = catalog.recall(('ai_family', status_name))
+            if cached is not None:
+                return cached or None
         
         # 🔥 STEP 2: AI-powered semantic classification for unknown/custom statuses
         # This is the MAGIC that makes it work with ANY status name!
@@ -1018,9 +1005,13 @@ class LeadAutoStatusService:
             
             if family in valid_families:
                 log.info(f"[StatusFamily] ✅ AI classified '{status_text}' → {family}")
+                if catalog is not None:
+                    catalog.remember(('ai_family', status_name), family)
                 return family
             elif family == 'UNKNOWN':
                 log.info(f"[StatusFamily] ⚪ AI couldn't classify '{status_text}' (ambiguous)")
+                if catalog is not None:
+                    catalog.remember(('ai_family', status_name), '')
                 return None
             else:
                 log.warning(f"[StatusFamily] ⚠️ AI returned invalid family: '{family}' for '{status_text}'")
@@ -1294,13 +1285,7 @@ class LeadAutoStatusService:
         Returns:
             Dict with status info or None
         """
-        from server.models_sql import LeadStatus
-        
-        status_obj = LeadStatus.query.filter_by(
-            business_id=tenant_id,
-            name=status_name,
-            is_active=True
-        ).first()
+        status_obj = self._catalog(tenant_id).get_active(status_name)
         
         if status_obj:
             return {
@@ -0,0 +1,398 @@
+"""
+Lead Counters - per-tenant lead counts by (status, source)
+Used by the leads list and kanban totals (routes_leads.py)
+
+GET /api/leads used to run an exact count() over the filtered query on every
+page and every filter change. When the only filters are status and source the
+total is now a sum over a handful of lead_counters rows (LeadCounter):
+
+- Mapper listeners on Lead collect +1/-1 per (tenant, status, source) for
+  inserts, deletes and status/source changes. That covers
+  unified_status_service, lead_status_update_service, the bulk update/delete
+  jobs and every other ORM write. after_flush buffers the deltas on the
+  session (per savepoint); after_commit applies them in a short transaction of
+  their own, one UPSERT per key in key order. The counter rows are locked for
+  that statement only, not for the rest of the caller's transaction, so
+  concurrent lead writes of a tenant don't queue behind each other. Rolled
+  back transactions / savepoints drop their deltas.
+- Query.update()/delete() and raw SQL bypass the listeners, so
+  reconcile_lead_counters() recounts every tenant from leads every
+  LEAD_COUNTERS_RECONCILE_MINUTES and rewrites the rows.
+- A delta that fails to apply after commit, or one that lands after a
+  reconcile already recounted its lead, leaves drift until the next reconcile.
+- A tenant's counters are only trusted once the reconciler has seeded them
+  (reconciled_at set). Until then read_lead_counts() returns None and the
+  caller runs the exact count.
+"""
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+
+log = logging.getLogger(__name__)
+
+CounterKey = Tuple[int, str, str]  # (tenant_id, status, source)
+
+_SESSION_INFO_KEY = 'lead_counter_deltas'  # collected by the mapper listeners during a flush
+_PENDING_INFO_KEY = 'lead_counter_pending'  # flushed, waiting for the commit
+_TRACKED_ATTRS = ('tenant_id', 'status', 'source')
+_listeners_registered = False
+
+_APPLY_DELTA_SQL = text("""
+    INSERT INTO lead_counters (tenant_id, status, source, lead_count, updated_at)
+    VALUES (:tenant_id, :status, :source, :delta, :now)
+    ON CONFLICT (tenant_id, status, source)
+    DO UPDATE SET lead_count = lead_counters.lead_count + EXCLUDED.lead_count,
+                  updated_at = EXCLUDED.updated_at
+""")
+
+_SET_COUNT_SQL = text("""
+    INSERT INTO lead_counters (tenant_id, status, source, lead_count, updated_at, reconciled_at)
+    VALUES (:tenant_id, :status, :source, :lead_count, :now, :now)
+    ON CONFLICT (tenant_id, status, source)
+    DO UPDATE SET lead_count = EXCLUDED.lead_count,
+                  updated_at = EXCLUDED.updated_at,
+                  reconciled_at = EXCLUDED.reconciled_at
+""")
+
+_RECOUNT_SQL = text("""
+    SELECT lower(coalesce(status, '')) AS status, coalesce(source, '') AS source, count(*) AS lead_count
+    FROM leads
+    WHERE tenant_id = :tenant_id
+    GROUP BY lower(coalesce(status, '')), coalesce(source, '')
+""")
+
+
+def counter_key(tenant_id: int, status: Optional[str], source: Optional[str]) -> CounterKey:
+    """Mirror of the reconciler's GROUP BY: lower(status), NULL → ''"""
+    return int(tenant_id), (status or '').lower(), source or ''
+
+
+# ============================================================================
+# Reads
+# ============================================================================
+
+@dataclass(frozen=True)
+class LeadCounts:
+    """One tenant's counters: {(status, source): count}"""
+    counts: Dict[Tuple[str, str], int]
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def by_status(self) -> Dict[str, int]:
+        result: Dict[str, int] = {}
+        for (status, _source), n in self.counts.items():
+            result[status] = result.get(status, 0) + n
+        return result
+
+    def by_source(self) -> Dict[str, int]:
+        result: Dict[str, int] = {}
+        for (_status, source), n in self.counts.items():
+            result[source] = result.get(source, 0) + n
+        return result
+
+    def count(self, statuses: Optional[Iterable[str]] = None,
+              sources: Optional[Iterable[str]] = None) -> int:
+        """
+        Leads matching lower(status) IN statuses AND source IN sources
+        (None = no filter on that column, same semantics as the list query)
+        """
+        status_set = None if statuses is None else {(s or '').lower() for s in statuses}
+        source_set = None if sources is None else set(sources)
+        return sum(
+            n for (status, source), n in self.counts.items()
+            if (status_set is None or status in status_set)
+            and (source_set is None or source in source_set)
+        )
+
+
+def counters_enabled() -> bool:
+    from server.config import LEAD_COUNTERS_ENABLED
+    return LEAD_COUNTERS_ENABLED and _listeners_registered
+
+
+def read_lead_counts(tenant_id: int, session=None) -> Optional[LeadCounts]:
+    """
+    The tenant's counters, or None when they cannot be trusted (disabled, not
+    seeded by the reconciler yet, or the read failed) - run the exact count then
+    """
+    if not counters_enabled():
+        return None
+    from server.db import db
+    session = session or db.session
+    try:
+        rows = session.execute(
+            text("SELECT status, source, lead_count, reconciled_at FROM lead_counters WHERE tenant_id = :tenant_id"),
+            {'tenant_id': tenant_id},
+        ).all()
+    except Exception as e:
+        log.warning(f"[LEAD_COUNTERS] Read failed for tenant {tenant_id}: {e}")
+        return None
+    if not any(row.reconciled_at is not None for row in rows):
+        return None
+    # A delta applied to a row the reconciler has not seen yet can go negative
+    return LeadCounts({(row.status, row.source): max(0, row.lead_count) for row in rows})
+
+
+# ============================================================================
+# Write path (ORM listeners)
+# ============================================================================
+
+def _add_delta(target, key: Optional[CounterKey], delta: int):
+    from sqlalchemy.orm import object_session
+    session = object_session(target)
+    if session is None or key is None:
+        return
+    deltas = session.info.setdefault(_SESSION_INFO_KEY, {})
+    deltas[key] = deltas.get(key, 0) + delta
+
+
+def _current_key(target) -> Optional[CounterKey]:
+    if target.tenant_id is None:
+        return None
+    return counter_key(target.tenant_id, target.status, target.source)
+
+
+def _previous_key(target) -> Optional[CounterKey]:
+    """The key the row was counted under before this flush"""
+    from sqlalchemy import inspect
+    state = inspect(target)
+    values = []
+    for name in _TRACKED_ATTRS:
+        history = state.attrs[name].history
+        if history.unchanged:
+            values.append(history.unchanged[0])
+        elif history.has_changes():
+            # active_history (see register_lead_counter_listeners) loads the old
+            # value on set, so an empty `deleted` means it was NULL
+            values.append(history.deleted[0] if history.deleted else None)
+        else:
+            values.append(getattr(target, name))
+    tenant_id, status, source = values
+    if tenant_id is None:
+        return None
+    return counter_key(tenant_id, status, source)
+
+
+def _after_insert(mapper, connection, target):
+    _add_delta(target, _current_key(target), 1)
+
+
+def _after_update(mapper, connection, target):
+    previous, current = _previous_key(target), _current_key(target)
+    if previous != current:
+        _add_delta(target, previous, -1)
+        _add_delta(target, current, 1)
+
+
+def _after_delete(mapper, connection, target):
+    _add_delta(target, _previous_key(target), -1)
+
+
+def _pending(session) -> Dict:
+    """{innermost savepoint (None = the transaction itself): {CounterKey: delta}}"""
+    return session.info.setdefault(_PENDING_INFO_KEY, {})
+
+
+def _merge(into: Dict[CounterKey, int], deltas: Dict[CounterKey, int]):
+    for key, delta in deltas.items():
+        into[key] = into.get(key, 0) + delta
+
+
+def _enclosing_savepoint(transaction):
+    parent = transaction.parent
+    while parent is not None and not parent.nested:
+        parent = parent.parent
+    return parent
+
+
+def _after_flush(session, flush_context):
+    deltas = session.info.pop(_SESSION_INFO_KEY, None)
+    if deltas:
+        _merge(_pending(session).setdefault(session.get_nested_transaction(), {}), deltas)
+
+
+def _after_commit(session):
+    savepoint = session.get_nested_transaction()
+    if savepoint is not None:
+        # Released savepoint: its deltas now belong to the enclosing transaction
+        pending = session.info.get(_PENDING_INFO_KEY)
+        deltas = pending.pop(savepoint, None) if pending else None
+        if deltas:
+            _merge(pending.setdefault(_enclosing_savepoint(savepoint), {}), deltas)
+        return
+    pending = session.info.pop(_PENDING_INFO_KEY, None)
+    if not pending:
+        return
+    deltas: Dict[CounterKey, int] = {}
+    for bucket in pending.values():
+        _merge(deltas, bucket)
+    _apply_deltas(session, deltas)
+
+
+def _apply_deltas(session, deltas: Dict[CounterKey, int]):
+    """One short transaction on its own connection - the caller's has already committed"""
+    now = datetime.utcnow()
+    rows = [
+        {'tenant_id': key[0], 'status': key[1], 'source': key[2], 'delta': delta, 'now': now}
+        for key, delta in sorted(deltas.items()) if delta
+    ]
+    if not rows:
+        return
+    try:
+        with session.get_bind().begin() as connection:
+            connection.execute(_APPLY_DELTA_SQL, rows)
+    except Exception as e:
+        log.warning(f"[LEAD_COUNTERS] Applying {len(rows)} counter delta(s) failed, "
+                    f"the reconciler will correct them: {e}")
+
+
+def _after_rollback(session):
+    session.info.pop(_SESSION_INFO_KEY, None)
+    savepoint = session.get_nested_transaction()
+    if savepoint is None:
+        session.info.pop(_PENDING_INFO_KEY, None)
+        return
+    pending = session.info.get(_PENDING_INFO_KEY)
+    if pending:
+        pending.pop(savepoint, None)  # released inner savepoints were merged into it
+
+
+def _after_transaction_end(session, transaction):
+    if transaction.parent is None:
+        # Session.close() ends the transaction without after_rollback
+        session.info.pop(_PENDING_INFO_KEY, None)
+
+
+def _load_old_value(target, value, oldvalue, initiator):
+    pass  # registered with active_history=True, which is the point
+
+
+def register_lead_counter_listeners(engine=None) -> bool:
+    """
+    Keep lead_counters in step with Lead writes. Idempotent.
+    Skipped (returns False) when disabled or the table is missing (Migration 150
+    not applied yet), so a flush never fails on the counters.
+    """
+    global _listeners_registered
+    from server.config import LEAD_COUNTERS_ENABLED
+    if _listeners_registered or not LEAD_COUNTERS_ENABLED:
+        return False
+    from sqlalchemy import event, inspect
+    from sqlalchemy.orm import Session
+    from server.models_sql import Lead
+
+    if engine is not None and not inspect(engine).has_table('lead_counters'):
+        log.warning("[LEAD_COUNTERS] lead_counters table missing - counters disabled (run migrations)")
+        return False
+
+    for name in _TRACKED_ATTRS:
+        event.listen(getattr(Lead, name), 'set', _load_old_value, active_history=True)
+    event.listen(Lead, 'after_insert', _after_insert)
+    event.listen(Lead, 'after_update', _after_update)
+    event.listen(Lead, 'after_delete', _after_delete)
+    event.listen(Session, 'after_flush', _after_flush)
+    event.listen(Session, 'after_commit', _after_commit)
+    event.listen(Session, 'after_rollback', _after_rollback)
+    event.listen(Session, 'after_transaction_end', _after_transaction_end)
+    _listeners_registered = True
+    return True
+
+
+def unregister_lead_counter_listeners():
+    """Tests only - detach the listeners installed by register_lead_counter_listeners()"""
+    global _listeners_registered
+    if not _listeners_registered:
+        return
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session
+    from server.models_sql import Lead
+
+    for name in _TRACKED_ATTRS:
+        event.remove(getattr(Lead, name), 'set', _load_old_value)
+    event.remove(Lead, 'after_insert', _after_insert)
+    event.remove(Lead, 'after_update', _after_update)
+    event.remove(Lead, 'after_delete', _after_delete)
+    event.remove(Session, 'after_flush', _after_flush)
+    event.remove(Session, 'after_commit', _after_commit)
+    event.remove(Session, 'after_rollback', _after_rollback)
+    event.remove(Session, 'after_transaction_end', _after_transaction_end)
+    _listeners_registered = False
+
+
+# ============================================================================
+# Reconciler
+# ============================================================================
+
+def reconcile_tenant(tenant_id: int, session=None) -> int:
+    """
+    Recount one tenant's leads and rewrite its counters (commits).
+    Returns how many leads the counters were off by in total (0 = no drift).
+
+    The tenant's counter rows are locked first, so a delta applied during the
+    recount waits and lands on top of the recounted value.
+    """
+    from server.db import db
+    session = session or db.session
+    lock = " FOR UPDATE" if session.get_bind().dialect.name == 'postgresql' else ""
+    try:
+        existing = {
+            (row.status, row.source): row.lead_count
+            for row in session.execute(
+                text(f"SELECT status, source, lead_count FROM lead_counters WHERE tenant_id = :tenant_id{lock}"),
+                {'tenant_id': tenant_id},
+            )
+        }
+        actual = {
+            (row.status, row.source): row.lead_count
+            for row in session.execute(_RECOUNT_SQL, {'tenant_id': tenant_id})
+        }
+        now = datetime.utcnow()
+        if actual:
+            session.execute(_SET_COUNT_SQL, [
+                {'tenant_id': tenant_id, 'status': status, 'source': source, 'lead_count': n, 'now': now}
+                for (status, source), n in sorted(actual.items())
+            ])
+        for status, source in sorted(existing.keys() - actual.keys()):
+            session.execute(
+                text("DELETE FROM lead_counters WHERE tenant_id = :tenant_id AND status = :status AND source = :source"),
+                {'tenant_id': tenant_id, 'status': status, 'source': source},
+            )
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+
+    drift = sum(abs(actual.get(key, 0) - existing.get(key, 0)) for key in existing.keys() | actual.keys())
+    if drift and existing:
+        log.warning(f"[LEAD_COUNTERS] Tenant {tenant_id} counters were off by {drift} lead(s) - reconciled")
+    return drift
+
+
+def reconcile_lead_counters(tenant_ids: Optional[List[int]] = None, session=None) -> Dict[str, int]:
+    """Reconcile the given tenants (default: every tenant with leads or counters)"""
+    from server.db import db
+    session = session or db.session
+    if tenant_ids is None:
+        tenant_ids = [row[0] for row in session.execute(text(
+            "SELECT DISTINCT tenant_id FROM leads UNION SELECT DISTINCT tenant_id FROM lead_counters"
+        ))]
+        session.commit()
+
+    stats = {'tenants': 0, 'drifted': 0, 'drift': 0, 'failed': 0}
+    for tenant_id in sorted(tenant_ids):
+        try:
+            drift = reconcile_tenant(tenant_id, session=session)
+        except Exception as e:
+            stats['failed'] += 1
+            log.error(f"[LEAD_COUNTERS] Reconcile failed for tenant {tenant_id}: {e}")
+            continue
+        stats['tenants'] += 1
+        if drift:
+            stats['drifted'] += 1
+            stats['drift'] += drift
+    return stats
@@ -0,0 +1,336 @@
+"""
+Lead Export Service - streaming CSV / XLSX export for /api/leads/export
+
+The old export loaded every lead with query.all(), built the whole CSV in a
+StringIO and returned it as one string - memory grew with the tenant size and
+big exports timed out. Here rows flow through generators end to end:
+
+    query (server-side cursor, yield_per) → row tuples → CSV chunks / XLSX rows
+
+so memory stays flat regardless of row count:
+- CSV: streamed straight into the HTTP response (stream_with_context)
+- XLSX: openpyxl write_only workbook into a temp file, then streamed from disk
+- Very large exports: export_leads_job (RQ) writes the file to the storage
+  driver and the UI polls for a presigned download link
+
+Filters are the same as the lead list endpoint (LeadExportFilters.from_args).
+"""
+import csv
+import io
+import logging
+import os
+import tempfile
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import func
+
+from server.models_sql import Lead, LeadStatus, OutboundLeadList
+from server.services.search_service import lead_search_filter
+
+logger = logging.getLogger(__name__)
+
+EXPORT_BATCH_SIZE = 1000      # rows per server-side cursor fetch
+CSV_FLUSH_ROWS = 500          # rows per streamed CSV chunk
+FILE_CHUNK_SIZE = 64 * 1024   # bytes per chunk when streaming a temp file
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+PHONE_SOURCES = ['call', 'phone', 'phone_call', 'realtime_phone', 'ai_agent', 'form', 'manual']
+WHATSAPP_SOURCES = ['whatsapp', 'wa', 'whats_app']
+
+# 🔥 Hebrew headers matching the UI
+EXPORT_HEADERS = [
+    'מזהה',  # id
+    'שם מלא',  # full_name
+    'שם פרטי',  # first_name
+    'שם משפחה',  # last_name
+    'טלפון',  # phone
+    'אימייל',  # email
+    'סטטוס',  # status (Hebrew label)
+    'מקור',  # source
+    'אחראי',  # owner_user_id
+    'רשימת ייבוא',  # outbound_list_name (not ID)
+    'כיוון שיחה',  # last_call_direction
+    'סיכום',  # summary
+    'תגיות',  # tags
+    'תאריך יצירה',  # created_at
+    'תאריך עדכון',  # updated_at
+    'מועד שיחה אחרונה'  # last_contact_at
+]
+
+# Fallback labels for standard statuses (if not in DB)
+FALLBACK_STATUS_LABELS = {
+    'new': 'חדש',
+    'attempting': 'מנסה ליצור קשר',
+    'contacted': 'יצרנו קשר',
+    'qualified': 'מתאים',
+    'won': 'נצחנו',
+    'lost': 'איבדנו',
+    'unqualified': 'לא מתאים',
+}
+
+# Only the columns the export needs - no ORM objects / identity map growth
+EXPORT_COLUMNS = (
+    Lead.id, Lead.name, Lead.first_name, Lead.last_name, Lead.phone_e164, Lead.email,
+    Lead.status, Lead.source, Lead.owner_user_id, Lead.outbound_list_id,
+    Lead.last_call_direction, Lead.summary, Lead.tags,
+    Lead.created_at, Lead.updated_at, Lead.last_contact_at,
+)
+
+
+def normalize_source(source: str) -> str:
+    """
+    Normalize lead source to only 'phone' or 'whatsapp'
+    All phone-related sources (call, realtime_phone, phone_call, etc.) become 'phone'
+    All WhatsApp-related sources become 'whatsapp'
+    """
+    if not source:
+        return 'phone'
+
+    if source.lower().strip() in WHATSAPP_SOURCES:
+        return 'whatsapp'
+
+    return 'phone'
+
+
+@dataclass
+class LeadExportFilters:
+    """Lead list filters (same query params as list_leads), JSON-serializable for RQ"""
+    status: str = ''
+    statuses: List[str] = field(default_factory=list)
+    source: str = ''
+    owner: str = ''
+    outbound_list_id: str = ''
+    direction: str = ''
+    q: str = ''
+    from_date: str = ''
+    to_date: str = ''
+
+    @classmethod
+    def from_args(cls, args) -> 'LeadExportFilters':
+        return cls(
+            status=args.get('status', ''),
+            statuses=args.getlist('statuses[]'),
+            source=args.get('source', ''),
+            owner=args.get('owner', ''),
+            outbound_list_id=args.get('outbound_list_id', ''),
+            direction=args.get('direction', ''),
+            q=args.get('q', ''),
+            from_date=args.get('from', ''),
+            to_date=args.get('to', ''),
+        )
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    def apply(self, query):
+        """Apply filters (same logic as list_leads)"""
+        if self.statuses:
+            query = query.filter(func.lower(Lead.status).in_([s.lower() for s in self.statuses]))
+        elif self.status:
+            query = query.filter(func.lower(Lead.status) == self.status.lower())
+
+        if self.source == 'phone':
+            query = query.filter(Lead.source.in_(PHONE_SOURCES))
+        elif self.source == 'whatsapp':
+            query = query.filter(Lead.source.in_(WHATSAPP_SOURCES))
+
+        if self.owner:
+            query = query.filter(Lead.owner_user_id == self.owner)
+
+        if self.outbound_list_id:
+            query = query.filter(Lead.outbound_list_id == int(self.outbound_list_id))
+
+        if self.direction and self.direction != 'all':
+            query = query.filter(Lead.last_call_direction == self.direction)
+
+        if self.q:
+            query = query.filter(lead_search_filter(self.q))
+
+        if self.from_date:
+            try:
+                from_dt = datetime.fromisoformat(self.from_date.replace('Z', '+00:00'))
+                query = query.filter(Lead.created_at >= from_dt)
+            except ValueError:
+                pass
+
+        if self.to_date:
+            try:
+                to_dt = datetime.fromisoformat(self.to_date.replace('Z', '+00:00'))
+                query = query.filter(Lead.created_at <= to_dt)
+            except ValueError:
+                pass
+
+        return query
+
+
+def build_export_query(tenant_id: Optional[int], filters: LeadExportFilters):
+    """Filtered lead query (tenant_id=None → all businesses, system_admin only)"""
+    query = Lead.query
+    if tenant_id:
+        query = query.filter(Lead.tenant_id == tenant_id)
+    return filters.apply(query)
+
+
+def count_export_rows(tenant_id: Optional[int], filters: LeadExportFilters) -> int:
+    return build_export_query(tenant_id, filters).order_by(None).count()
+
+
+def _load_labels(tenant_id: Optional[int]):
+    """Status name → Hebrew label and outbound list id → name (small per-business tables)"""
+    status_labels, list_names = {}, {}
+    if tenant_id:
+        for s in LeadStatus.query.filter_by(business_id=tenant_id, is_active=True).all():
+            status_labels[s.name.lower()] = s.label
+        for lst in OutboundLeadList.query.filter_by(tenant_id=tenant_id).all():
+            list_names[lst.id] = lst.name
+    return status_labels, list_names
+
+
+def _format_date(dt) -> str:
+    """Hebrew-friendly DD/MM/YYYY HH:MM"""
+    if not dt:
+        return ''
+    try:
+        return dt.strftime('%d/%m/%Y %H:%M')
+    except (AttributeError, ValueError):
+        return dt.isoformat()
+
+
+def _full_name(row) -> str:
+    # Same precedence as Lead.full_name
+    if row.name:
+        return row.name
+    if row.first_name and row.last_name:
+        return f"{row.first_name} {row.last_name}"
+    return row.first_name or row.last_name or "ללא שם"
+
+
+def iter_export_rows(tenant_id: Optional[int], filters: LeadExportFilters,
+                     batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[list]:
+    """
+    Yield one export row (list of cell values) per lead
+
+    yield_per() makes psycopg2 use a named server-side cursor, so at most
+    `batch_size` rows are held in memory at any time.
+    """
+    status_labels, list_names = _load_labels(tenant_id)
+    query = (
+        build_export_query(tenant_id, filters)
+        .with_entities(*EXPORT_COLUMNS)
+        .order_by(Lead.created_at.desc(), Lead.id.desc())
+        .yield_per(batch_size)
+    )
+    for row in query:
+        status_internal = (row.status or '').lower()
+        status_display = status_labels.get(status_internal) or FALLBACK_STATUS_LABELS.get(status_internal) or row.status or ''
+        list_name = ''
+        if row.outbound_list_id:
+            list_name = list_names.get(row.outbound_list_id, f'רשימה {row.outbound_list_id}')
+        yield [
+            row.id,
+            _full_name(row),
+            row.first_name or '',
+            row.last_name or '',
+            row.phone_e164 or '',
+            row.email or '',
+            status_display,
+            normalize_source(row.source),
+            row.owner_user_id or '',
+            list_name,
+            row.last_call_direction or '',
+            row.summary or '',
+            ','.join(row.tags or []),
+            _format_date(row.created_at),
+            _format_date(row.updated_at),
+            _format_date(row.last_contact_at),
+        ]
+
+
+def iter_csv_chunks(rows: Iterable[list], flush_rows: int = CSV_FLUSH_ROWS) -> Iterator[bytes]:
+    """CSV (UTF-8 with BOM for Excel Hebrew compatibility) as a stream of byte chunks"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(EXPORT_HEADERS)
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= flush_rows:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue().encode('utf-8')
+
+
+def write_export(rows: Iterable[list], fileobj, fmt: str,
+                 on_progress: Optional[Callable[[int], None]] = None) -> int:
+    """
+    Write an export to a binary file object
+
+    Returns:
+        Number of lead rows written
+    """
+    count = 0
+
+    def counted():
+        nonlocal count
+        for row in rows:
+            count += 1
+            if on_progress and count % EXPORT_BATCH_SIZE == 0:
+                on_progress(count)
+            yield row
+
+    if fmt == 'xlsx':
+        from openpyxl import Workbook
+        # write_only: rows are serialized to a temp file as they are appended
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet('לידים')
+        sheet.sheet_view.rightToLeft = True
+        sheet.append(EXPORT_HEADERS)
+        for row in counted():
+            sheet.append(row)
+        workbook.save(fileobj)
+    else:
+        for chunk in iter_csv_chunks(counted()):
+            fileobj.write(chunk)
+    return count
+
+
+def iter_file_chunks(path: str, chunk_size: int = FILE_CHUNK_SIZE) -> Iterator[bytes]:
+    """Stream a temp file from disk and delete it afterwards"""
+    try:
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def write_export_tempfile(rows: Iterable[list], fmt: str,
+                          on_progress: Optional[Callable[[int], None]] = None):
+    """Write an export to a named temp file. Returns (path, row_count) - caller deletes"""
+    fd, path = tempfile.mkstemp(prefix='leads_export_', suffix=f'.{fmt}')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            count = write_export(rows, f, fmt, on_progress=on_progress)
+    except Exception:
+        os.unlink(path)
+        raise
+    return path, count
+
+
+def export_filename(fmt: str) -> str:
+    return f"leads_export_{datetime.now().strftime('%Y-%m-%d')}.{fmt}"
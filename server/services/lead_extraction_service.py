@@ -6,10 +6,12 @@ import os
 import logging
 import json
 from typing import Dict, Any, Optional
-from openai import OpenAI
+from server.services.lazy_services import lazy_module
 
 logger = logging.getLogger(__name__)
 
+openai = lazy_module("openai")  # OpenAI SDK is imported on first use
+
 # 🔥 REMOVED: Business vocabulary hardcoding removed - let Whisper work naturally!
 # Hardcoded vocabulary can cause incorrect word substitutions and confuse the model.
 # Better to let the model transcribe accurately without biasing it toward specific terms.
@@ -136,7 +138,7 @@ def extract_city_and_service_from_summary(summary_text: str) -> dict:
         logger.info(f"[OFFLINE_EXTRACT] Starting extraction from summary, length: {len(summary_text)} chars")
         
         # Get OpenAI client - reuse existing infrastructure
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
         
         # Build prompt - focused on summary extraction
         system_prompt = """Extract data from Hebrew call summaries.
@@ -300,7 +302,7 @@ def extract_lead_from_transcript(transcript: str, business_prompt: Optional[str]
         logger.info(f"[OFFLINE_EXTRACT] Starting extraction for business {business_id}, transcript length: {len(transcript)} chars")
         
         # Get OpenAI client
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
         
         # Build system prompt - Hebrew-focused with business context
         system_prompt = """You are an extraction engine for Hebrew phone call transcripts.
@@ -423,6 +425,123 @@ Return JSON with three fields: service, city, confidence.
         return {}
 
 
+def transcribe_audio_with_openai(file_path: str, call_sid: str) -> Optional[str]:
+    """
+    One transcription request for an audio file: GPT-4o transcribe, whisper-1 fallback
+
+    Returns the raw text (possibly short or empty), or None if every model failed.
+    Used for whole recordings and for the segments of recording_pipeline.py.
+    """
+    # Get OpenAI client
+    client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    
+    # Try GPT-4o-transcribe first (highest quality), fallback to whisper-1
+    models_to_try = [
+        ("gpt-4o-transcribe", "GPT-4o transcribe (highest quality)"),
+        ("whisper-1", "Whisper-1 (fallback)")
+    ]
+    
+    transcript_text = None
+    last_error = None
+    
+    for model, model_desc in models_to_try:
+        try:
+            logger.info(f"[OFFLINE_STT] Trying model: {model}")
+            logger.info(f"[OFFLINE_STT] Attempting transcription with {model_desc}")
+            
+            # 🔥 CLEAN & SIMPLE: Natural Hebrew prompt without hardcoded vocabulary
+            # Let Whisper transcribe accurately without biasing toward specific terms
+            clean_hebrew_prompt = (
+                "זוהי שיחת טלפון בעברית ישראלית. "
+                "תמלל בדיוק מילה במילה כפי שנאמר, בעברית תקנית עם פיסוק מדויק. "
+                "אל תשנה, תתקן או תמציא מילים - תמלל בדיוק מה שנשמע."
+            )
+            
+            # 🔥 MODEL-SPECIFIC FORMAT: Different models support different response formats
+            # gpt-4o-transcribe: supports "json" or "text" (NOT verbose_json)
+            # whisper-1: supports "verbose_json" for enhanced quality with timestamps
+            
+            try:
+                if model == "gpt-4o-transcribe":
+                    # gpt-4o-transcribe uses "json" format (not verbose_json)
+                    logger.info(f"[OFFLINE_STT] Using 'json' format for {model}")
+                    with open(file_path, 'rb') as audio_file:
+                        transcript_response = client.audio.transcriptions.create(
+                            model=model,
+                            file=audio_file,
+                            language="he",
+                            temperature=0,
+                            response_format="json",
+                            prompt=clean_hebrew_prompt
+                        )
+                else:
+                    # whisper-1 supports verbose_json with enhanced quality
+                    # Try with segment-level timestamps for maximum accuracy
+                    try:
+                        with open(file_path, 'rb') as audio_file:
+                            transcript_response = client.audio.transcriptions.create(
+                                model=model,
+                                file=audio_file,
+                                language="he",
+                                temperature=0,
+                                response_format="verbose_json",
+                                prompt=clean_hebrew_prompt,
+                                timestamp_granularities=["segment"]
+                            )
+                        logger.info(f"[OFFLINE_STT] Using timestamp_granularities for enhanced accuracy")
+                    except Exception:
+                        # Fallback: timestamp_granularities not supported, use basic verbose_json
+                        logger.info(f"[OFFLINE_STT] timestamp_granularities not supported, using basic verbose_json")
+                        with open(file_path, 'rb') as audio_file:
+                            transcript_response = client.audio.transcriptions.create(
+                                model=model,
+                                file=audio_file,
+                                language="he",
+                                temperature=0,
+                                response_format="verbose_json",
+                                prompt=clean_hebrew_prompt
+                            )
+            except Exception as file_error:
+                logger.error(f"[OFFLINE_STT] File handling error: {file_error}")
+                raise
+            
+            # Extract text from verbose_json response
+            if isinstance(transcript_response, str):
+                transcript_text = transcript_response.strip()
+            elif hasattr(transcript_response, 'text'):
+                transcript_text = transcript_response.text.strip()
+            elif hasattr(transcript_response, 'segments'):
+                # Build transcript from segments for maximum accuracy
+                segments = transcript_response.segments
+                transcript_text = " ".join(seg.get('text', '').strip() for seg in segments).strip()
+                logger.info(f"[OFFLINE_STT] Reconstructed from {len(segments)} segments")
+            else:
+                transcript_text = str(transcript_response).strip()
+            
+            # Success with this model!
+            logger.info(f"[OFFLINE_STT] ✅ Success with {model}: {len(transcript_text)} chars")
+            logger.info(f"[OFFLINE_STT] ✅ Transcript obtained with {model} ({len(transcript_text)} chars) for {call_sid}")
+            logger.info(f"[OFFLINE_STT] Preview: {transcript_text[:120]!r}")
+            break
+            
+        except Exception as model_error:
+            last_error = model_error
+            error_msg = str(model_error).lower()
+            
+            # Check if model not found - try fallback
+            if "model" in error_msg and ("not found" in error_msg or "does not exist" in error_msg):
+                logger.warning(f"[OFFLINE_STT] Model {model} not available, trying fallback...")
+                logger.warning(f"⚠️ [OFFLINE_STT] {model} not available, trying fallback...")
+                continue
+            else:
+                # Other error - log but try fallback anyway
+                logger.warning(f"[OFFLINE_STT] Error with {model}: {model_error}")
+                logger.error(f"⚠️ [OFFLINE_STT] Error with {model}, trying fallback...")
+                continue
+    
+    return transcript_text
+
+
 def transcribe_recording_with_whisper(audio_file_path: str, call_sid: str) -> Optional[str]:
     """
     תמלול הקלטה מלאה בעברית - איכות מקסימלית עם GPT-4o Transcribe.
@@ -519,112 +638,7 @@ def transcribe_recording_with_whisper(audio_file_path: str, call_sid: str) -> Op
                     pass
             converted_file = None
         
-        # Get OpenAI client
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        
-        # Try GPT-4o-transcribe first (highest quality), fallback to whisper-1
-        models_to_try = [
-            ("gpt-4o-transcribe", "GPT-4o transcribe (highest quality)"),
-            ("whisper-1", "Whisper-1 (fallback)")
-        ]
-        
-        transcript_text = None
-        last_error = None
-        
-        for model, model_desc in models_to_try:
-            try:
-                logger.info(f"[OFFLINE_STT] Trying model: {model}")
-                logger.info(f"[OFFLINE_STT] Attempting transcription with {model_desc}")
-                
-                # 🔥 CLEAN & SIMPLE: Natural Hebrew prompt without hardcoded vocabulary
-                # Let Whisper transcribe accurately without biasing toward specific terms
-                clean_hebrew_prompt = (
-                    "זוהי שיחת טלפון בעברית ישראלית. "
-                    "תמלל בדיוק מילה במילה כפי שנאמר, בעברית תקנית עם פיסוק מדויק. "
-                    "אל תשנה, תתקן או תמציא מילים - תמלל בדיוק מה שנשמע."
-                )
-                
-                # 🔥 MODEL-SPECIFIC FORMAT: Different models support different response formats
-                # gpt-4o-transcribe: supports "json" or "text" (NOT verbose_json)
-                # whisper-1: supports "verbose_json" for enhanced quality with timestamps
-                
-                try:
-                    if model == "gpt-4o-transcribe":
-                        # gpt-4o-transcribe uses "json" format (not verbose_json)
-                        logger.info(f"[OFFLINE_STT] Using 'json' format for {model}")
-                        with open(file_to_transcribe, 'rb') as audio_file:
-                            transcript_response = client.audio.transcriptions.create(
-                                model=model,
-                                file=audio_file,
-                                language="he",
-                                temperature=0,
-                                response_format="json",
-                                prompt=clean_hebrew_prompt
-                            )
-                    else:
-                        # whisper-1 supports verbose_json with enhanced quality
-                        # Try with segment-level timestamps for maximum accuracy
-                        try:
-                            with open(file_to_transcribe, 'rb') as audio_file:
-                                transcript_response = client.audio.transcriptions.create(
-                                    model=model,
-                                    file=audio_file,
-                                    language="he",
-                                    temperature=0,
-                                    response_format="verbose_json",
-                                    prompt=clean_hebrew_prompt,
-                                    timestamp_granularities=["segment"]
-                                )
-                            logger.info(f"[OFFLINE_STT] Using timestamp_granularities for enhanced accuracy")
-                        except Exception:
-                            # Fallback: timestamp_granularities not supported, use basic verbose_json
-                            logger.info(f"[OFFLINE_STT] timestamp_granularities not supported, using basic verbose_json")
-                            with open(file_to_transcribe, 'rb') as audio_file:
-                                transcript_response = client.audio.transcriptions.create(
-                                    model=model,
-                                    file=audio_file,
-                                    language="he",
-                                    temperature=0,
-                                    response_format="verbose_json",
-                                    prompt=clean_hebrew_prompt
-                                )
-                except Exception as file_error:
-                    logger.error(f"[OFFLINE_STT] File handling error: {file_error}")
-                    raise
-                
-                # Extract text from verbose_json response
-                if isinstance(transcript_response, str):
-                    transcript_text = transcript_response.strip()
-                elif hasattr(transcript_response, 'text'):
-                    transcript_text = transcript_response.text.strip()
-                elif hasattr(transcript_response, 'segments'):
-                    # Build transcript from segments for maximum accuracy
-                    segments = transcript_response.segments
-                    transcript_text = " ".join(seg.get('text', '').strip() for seg in segments).strip()
-                    logger.info(f"[OFFLINE_STT] Reconstructed from {len(segments)} segments")
-                else:
-                    transcript_text = str(transcript_response).strip()
-                
-                # Success with this model!
-                logger.info(f"[OFFLINE_STT] ✅ Success with {model}: {len(transcript_text)} chars")
-                logger.info(f"[OFFLINE_STT] ✅ Transcript obtained with {model} ({len(transcript_text)} chars) for {call_sid}")
-                logger.info(f"[OFFLINE_STT] Preview: {transcript_text[:120]!r}")
-                break
-                
-            except Exception as model_error:
-                last_error = model_error
-                error_msg = str(model_error).lower()
-                
-                # Check if model not found - try fallback
-                if "model" in error_msg and ("not found" in error_msg or "does not exist" in error_msg):
-                    logger.warning(f"[OFFLINE_STT] Model {model} not available, trying fallback...")
-                    logger.warning(f"⚠️ [OFFLINE_STT] {model} not available, trying fallback...")
-                    continue
-                else:
-                    # Other error - log but try fallback anyway
-                    logger.warning(f"[OFFLINE_STT] Error with {model}: {model_error}")
-                    logger.error(f"⚠️ [OFFLINE_STT] Error with {model}, trying fallback...")
-                    continue
+        transcript_text = transcribe_audio_with_openai(file_to_transcribe, call_sid)
         
         # Check if we got a valid transcript
         if not transcript_text or len(transcript_text) < 10:
@@ -0,0 +1,66 @@
+"""
+Lead list paging - keyset cursor over (created_at, id) DESC
+Used by GET /api/leads (routes_leads.py) next to the page/pageSize API
+
+OFFSET paging makes Postgres walk and discard every row before the page, so
+deep pages of a large tenant get slower page by page. A cursor page instead
+seeks to (created_at, id) < (last created_at, last id) on
+idx_leads_tenant_created_id (db_indexes.py) and reads only `limit + 1` rows.
+
+Leads with a NULL created_at (legacy rows) are not reachable through the row
+comparison; they come after all dated leads, ordered by id DESC.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import tuple_
+
+from server.models_sql import Lead
+
+ListPosition = Tuple[Optional[datetime], int]  # (created_at, id) of the last lead on the page
+
+
+def encode_list_cursor(created_at: Optional[datetime], lead_id: int) -> str:
+    stamp = created_at.isoformat() if created_at else None
+    payload = json.dumps([stamp, int(lead_id)], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_list_cursor(cursor: Optional[str]) -> Optional[ListPosition]:
+    """Raises ValueError on a malformed cursor"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        stamp, lead_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return (datetime.fromisoformat(stamp) if stamp else None), int(lead_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid leads cursor: {e}") from e
+
+
+def keyset_page(query, cursor: Optional[str], limit: int) -> Tuple[List[Lead], Optional[str]]:
+    """
+    One page of `query` (filtered, not ordered) after `cursor`, newest first,
+    plus the cursor of the next page (None on the last page)
+    """
+    position = decode_list_cursor(cursor)
+    rows: List[Lead] = []
+
+    if position is None or position[0] is not None:
+        dated = query.filter(Lead.created_at.isnot(None))
+        if position is not None:
+            dated = dated.filter(tuple_(Lead.created_at, Lead.id) < tuple_(position[0], position[1]))
+        rows = dated.order_by(Lead.created_at.desc(), Lead.id.desc()).limit(limit + 1).all()
+
+    if len(rows) <= limit:
+        undated = query.filter(Lead.created_at.is_(None))
+        if position is not None and position[0] is None:
+            undated = undated.filter(Lead.id < position[1])
+        rows += undated.order_by(Lead.id.desc()).limit(limit + 1 - len(rows)).all()
+
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_list_cursor(rows[-1].created_at, rows[-1].id)
@@ -276,13 +276,10 @@ class LeadStatusUpdateService:
         Returns:
             Status ID (name) or None if no match found
         """
-        from server.models_sql import LeadStatus
+        from server.services.status_catalog import get_status_catalog
         
-        # Get all active statuses for the business
-        statuses = LeadStatus.query.filter_by(
-            business_id=business_id,
-            is_active=True
-        ).all()
+        # Active statuses for the business, labels pre-normalized (cached per tenant)
+        statuses = get_status_catalog(business_id).active
         
         if not statuses:
             log.warning(f"[StatusUpdate] No active statuses found for business {business_id}")
@@ -293,14 +290,13 @@ class LeadStatusUpdateService:
         
         # Try exact match first
         for status in statuses:
-            status_label_normalized = self._normalize_label(status.label)
-            if label_normalized == status_label_normalized:
+            if label_normalized == status.label_normalized:
                 log.info(f"[StatusUpdate] Exact match: '{label}' → '{status.name}'")
                 return status.name
         
         # Try partial match (label contains or is contained in status label)
         for status in statuses:
-            status_label_normalized = self._normalize_label(status.label)
+            status_label_normalized = status.label_normalized
             if label_normalized in status_label_normalized or status_label_normalized in label_normalized:
                 log.info(f"[StatusUpdate] Partial match: '{label}' ≈ '{status.label}' → '{status.name}'")
                 return status.name
@@ -318,20 +314,10 @@ class LeadStatusUpdateService:
         Returns:
             Normalized label (lowercase, trimmed, normalized whitespace/quotes)
         """
-        if not label:
-            return ""
-        
-        # Trim and normalize whitespace
-        normalized = ' '.join(label.split())
-        
-        # Normalize quotes
-        normalized = normalized.replace('"', '"').replace('"', '"')
-        normalized = normalized.replace("'", "'").replace("'", "'")
-        
-        # Lowercase for case-insensitive matching
-        normalized = normalized.lower()
+        from server.services.status_catalog import normalize_label
         
-        return normalized
+        # Same form the status catalog precomputes for every status label
+        return normalize_label(label)
     
     def _send_push_notification(
         self,
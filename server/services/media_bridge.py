@@ -0,0 +1,455 @@
+"""
+Native async bridge between the Starlette websocket and the sync MediaStreamHandler
+
+The previous SyncWebSocketWrapper (asgi.py) moved every 20ms Twilio frame
+through asyncio queues with run_coroutine_threadsafe - one cross-thread
+round trip per frame in each direction, plus a json.dumps / json.loads pair
+per inbound frame.
+
+MediaStreamBridge keeps the event loop and the handler thread decoupled:
+
+- RX: the loop decodes each message once (JSON, and base64 for media) into a
+  pooled MediaFrame and appends it to a deque. The handler thread takes
+  everything queued in one lock acquisition (batch) and is only woken when it
+  is actually waiting
+- TX: handler sends append to a deque; the loop is woken (call_soon_threadsafe)
+  only if the sender is idle. Each wake-up drains the whole backlog, and media
+  frames queued before a "clear" are dropped instead of being sent for Twilio
+  to discard
+- Backpressure: bounded both ways. A full RX queue pauses the websocket reader
+  (up to RX_FULL_WAIT, then media frames are dropped - control events never
+  are). A full TX queue blocks send() up to TX_FULL_WAIT; send_nowait() drops
+- Queue depths / drops per bridge (stats()) and across the process (bridge_stats())
+
+Handler contract (MediaStreamHandler.run):
+    frame = bridge.receive()        # MediaFrame, or None when the stream is over
+    evt = frame.data                # parsed Twilio event (a fresh dict, safe to keep)
+    mulaw = frame.audio             # decoded media payload (None for non-media)
+The MediaFrame itself is recycled on the next receive() - do not keep it.
+
+Async engine (MediaStreamHandler.run_async, CALLS_ENGINE_MODE=async) - the
+reader is a coroutine on the shared call loop, not the loop that runs the pumps:
+    for evt, mulaw in await bridge.receive_batch():   # [] when the stream is over
+        ...
+"""
+import asyncio
+import base64
+import binascii
+import json
+import logging
+import re
+import threading
+import time
+import weakref
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+RX_MAX_FRAMES = 500        # ~10s of inbound audio
+TX_MAX_FRAMES = 600        # ~12s of outbound audio (absorbs AI latency bursts)
+RX_FULL_WAIT = 1.0         # seconds the reader pauses on a full RX queue before dropping
+TX_FULL_WAIT = 2.0         # seconds send() blocks on a full TX queue before dropping
+RECEIVE_TIMEOUT = 120.0    # handler receive() gives up (stream considered dead)
+POOL_SIZE = 64             # preallocated MediaFrame objects per bridge
+MAX_SEND_ERRORS = 10
+
+# Event name of an outbound message - json.dumps output with either spacing
+# ('{"event": "clear", ...}' or compact '{"event":"clear",...}'), event key first
+_EVENT_RE = re.compile(r'\{\s*"event"\s*:\s*"(\w+)"')
+
+
+class MediaFrame:
+    """One decoded Twilio message (pooled - see module docstring)"""
+
+    __slots__ = ("event", "data", "audio", "received_at")
+
+    def __init__(self):
+        self.event = None
+        self.data = None
+        self.audio = None
+        self.received_at = 0.0
+
+
+class FramePool:
+    """Free list of MediaFrame objects; acquire on the loop, release from the handler thread"""
+
+    def __init__(self, size: int = POOL_SIZE):
+        self._free = deque(MediaFrame() for _ in range(size))
+        self._size = size
+        self.allocated = size
+
+    def acquire(self) -> MediaFrame:
+        try:
+            return self._free.pop()
+        except IndexError:
+            self.allocated += 1
+            return MediaFrame()
+
+    def release(self, frame: MediaFrame) -> None:
+        frame.data = None
+        frame.audio = None
+        if len(self._free) < self._size:
+            self._free.append(frame)
+
+
+def decode_frame(text: str, frame: MediaFrame) -> bool:
+    """Fill `frame` from one Twilio JSON message. False if the message is not valid"""
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return False
+    if not isinstance(data, dict):
+        return False
+    frame.data = data
+    frame.event = data.get("event")
+    frame.audio = None
+    frame.received_at = time.monotonic()
+    if frame.event == "media":
+        try:
+            frame.audio = base64.b64decode(data["media"]["payload"])
+        except (KeyError, TypeError, binascii.Error):
+            return False
+    return True
+
+
+def _wake(waiter: Optional[asyncio.Future]) -> None:
+    """Resolve a receive_batch() waiter from any thread (it belongs to another loop)"""
+    if waiter is None:
+        return
+    try:
+        waiter.get_loop().call_soon_threadsafe(_resolve, waiter)
+    except RuntimeError:
+        pass  # Reader loop closed
+
+
+def _resolve(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+def _event_of(data) -> Optional[str]:
+    if not isinstance(data, str):
+        return None
+    match = _EVENT_RE.match(data)
+    return match.group(1) if match else None
+
+
+def coalesce(batch: List[str]) -> List[str]:
+    """
+    Drop outbound media frames that a later "clear" in the same batch discards anyway
+
+    Marks and other control events are kept in order (the handler tracks marks).
+    """
+    last_clear = -1
+    for i, data in enumerate(batch):
+        if _event_of(data) == "clear":
+            last_clear = i
+    if last_clear <= 0:
+        return batch
+    head = [data for data in batch[:last_clear] if _event_of(data) != "media"]
+    return head + batch[last_clear:]
+
+
+class MediaStreamBridge:
+    """
+    Websocket <-> MediaStreamHandler bridge for one Twilio media stream
+
+    Usage (asgi.py):
+        bridge = MediaStreamBridge(websocket)
+        bridge.bind_loop(asyncio.get_running_loop())
+        await asyncio.gather(bridge.pump_in(on_start=...), bridge.pump_out())
+        # handler thread: MediaStreamHandler(bridge).run()
+    """
+
+    def __init__(self, websocket, rx_max: int = RX_MAX_FRAMES, tx_max: int = TX_MAX_FRAMES,
+                 pool_size: int = POOL_SIZE):
+        self._ws = websocket
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.running = True
+        self._pool = FramePool(pool_size)
+
+        # RX: loop -> handler thread
+        self.rx_max = rx_max
+        self._rx = deque()
+        self._rx_cond = threading.Condition()
+        self._rx_batch = deque()        # handler-thread-local: taken from _rx in one go
+        self._rx_last: Optional[MediaFrame] = None
+        self._rx_space: Optional[asyncio.Event] = None
+        self._rx_reader_waiting = False
+        self._rx_waiter: Optional[asyncio.Future] = None   # receive_batch() parked on another loop
+
+        # TX: any thread -> loop
+        self.tx_max = tx_max
+        self._tx = deque()
+        self._tx_cond = threading.Condition()
+        self._tx_wake: Optional[asyncio.Event] = None
+        self._tx_sender_idle = False
+
+        self.counters: Dict[str, int] = {
+            "rx_frames": 0, "rx_batches": 0, "rx_dropped": 0, "rx_invalid": 0, "rx_depth_max": 0,
+            "tx_frames": 0, "tx_wakeups": 0, "tx_dropped": 0, "tx_cleared": 0, "tx_depth_max": 0,
+        }
+        _register(self)
+
+    def bind_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Attach to the loop running pump_in / pump_out (must be called on that loop)"""
+        self._loop = loop
+        self._rx_space = asyncio.Event()
+        self._tx_wake = asyncio.Event()
+
+    # ─── Handler side (sync, handler thread) ─────────────────
+
+    def receive(self, timeout: float = RECEIVE_TIMEOUT) -> Optional[MediaFrame]:
+        """Next inbound frame, or None when the stream is over (or nothing arrived within timeout)"""
+        if self._rx_last is not None:
+            self._pool.release(self._rx_last)
+            self._rx_last = None
+        if not self._rx_batch:
+            with self._rx_cond:
+                if not self._rx and self.running:
+                    self._rx_cond.wait_for(lambda: self._rx or not self.running, timeout=timeout)
+                if not self._rx:
+                    return None
+                self._rx_batch, self._rx = self._rx, self._rx_batch
+                self.counters["rx_batches"] += 1
+                wake_reader = self._rx_reader_waiting
+                self._rx_reader_waiting = False
+            if wake_reader:
+                self._call_soon(self._rx_space.set)
+        frame = self._rx_batch.popleft()
+        self._rx_last = frame
+        return frame
+
+    async def receive_batch(self, timeout: float = RECEIVE_TIMEOUT) -> List[Tuple[dict, Optional[bytes]]]:
+        """
+        Everything queued as (event, audio) pairs - [] when the stream is over (or on timeout)
+
+        Awaited from any loop (the shared call loop); frames go back to the pool here.
+        """
+        with self._rx_cond:
+            waiter = None
+            if not self._rx and self.running:
+                waiter = asyncio.get_running_loop().create_future()
+                self._rx_waiter = waiter
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(waiter, timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._rx_cond:
+                    if self._rx_waiter is waiter:
+                        self._rx_waiter = None
+        with self._rx_cond:
+            if not self._rx:
+                return []
+            batch, self._rx = self._rx, deque()
+            self.counters["rx_batches"] += 1
+            wake_reader = self._rx_reader_waiting
+            self._rx_reader_waiting = False
+        if wake_reader:
+            self._call_soon(self._rx_space.set)
+        events = [(frame.data, frame.audio) for frame in batch]
+        for frame in batch:
+            self._pool.release(frame)
+        return events
+
+    def send(self, data) -> None:
+        """Queue one outbound message; blocks up to TX_FULL_WAIT when the queue is full"""
+        self._enqueue(data, wait=TX_FULL_WAIT)
+
+    def send_nowait(self, data) -> None:
+        """Queue one outbound message without ever blocking (shared call loop - CALLS_ENGINE_MODE=async)"""
+        self._enqueue(data, wait=0)
+
+    def _enqueue(self, data, wait: float) -> None:
+        if not self.running or self._loop is None:
+            return
+        with self._tx_cond:
+            if len(self._tx) >= self.tx_max and wait:
+                self._tx_cond.wait_for(lambda: len(self._tx) < self.tx_max or not self.running, timeout=wait)
+            if len(self._tx) >= self.tx_max or not self.running:
+                self.counters["tx_dropped"] += 1
+                _increment_metric("tx_dropped")
+                return
+            self._tx.append(data)
+            depth = len(self._tx)
+            if depth > self.counters["tx_depth_max"]:
+                self.counters["tx_depth_max"] = depth
+            wake_sender = self._tx_sender_idle
+            self._tx_sender_idle = False
+        if wake_sender:
+            self._call_soon(self._tx_wake.set)
+
+    def stop(self) -> None:
+        """Stop both directions (safe from any thread, idempotent)"""
+        if not self.running:
+            return
+        self.running = False
+        with self._rx_cond:
+            self._rx_cond.notify_all()
+            waiter, self._rx_waiter = self._rx_waiter, None
+        _wake(waiter)
+        with self._tx_cond:
+            self._tx_cond.notify_all()
+        if self._loop is not None:
+            self._call_soon(self._rx_space.set)
+            self._call_soon(self._tx_wake.set)
+
+    def _call_soon(self, callback: Callable[[], None]) -> None:
+        try:
+            self._loop.call_soon_threadsafe(callback)
+        except RuntimeError:
+            pass  # Loop closed - connection is gone
+
+    # ─── Loop side ───────────────────────────────────────────
+
+    async def pump_in(self, on_start: Optional[Callable[[], None]] = None) -> None:
+        """Websocket -> handler: decode each message once, hand over pooled frames"""
+        try:
+            while self.running:
+                message = await self._ws.receive()
+                if message.get("type") == "websocket.disconnect":
+                    break
+                text = message.get("text")
+                if text is None:
+                    raw = message.get("bytes")
+                    text = raw.decode("utf-8", "replace") if raw else ""
+                frame = self._pool.acquire()
+                if not decode_frame(text, frame):
+                    self._pool.release(frame)
+                    self.counters["rx_invalid"] += 1
+                    continue
+                if frame.event == "start" and on_start is not None:
+                    on_start()
+                await self._deliver(frame)
+        except Exception as e:
+            if self.running:
+                logger.error(f"[WS_BRIDGE] Receive error after {self.counters['rx_frames']} frames: {e}")
+        finally:
+            self.stop()
+
+    async def _deliver(self, frame: MediaFrame) -> None:
+        with self._rx_cond:
+            full = len(self._rx) >= self.rx_max
+            if full:
+                self._rx_reader_waiting = True
+                self._rx_space.clear()
+        if full:
+            # Backpressure: stop reading the socket until the handler catches up
+            try:
+                await asyncio.wait_for(self._rx_space.wait(), timeout=RX_FULL_WAIT)
+            except asyncio.TimeoutError:
+                pass
+        with self._rx_cond:
+            if len(self._rx) >= self.rx_max and frame.event == "media":
+                self._rx_reader_waiting = False
+                self.counters["rx_dropped"] += 1
+                _increment_metric("rx_dropped")
+                self._pool.release(frame)
+                return
+            self._rx.append(frame)
+            self.counters["rx_frames"] += 1
+            depth = len(self._rx)
+            if depth > self.counters["rx_depth_max"]:
+                self.counters["rx_depth_max"] = depth
+            self._rx_cond.notify()
+            waiter, self._rx_waiter = self._rx_waiter, None
+        _wake(waiter)
+
+    async def pump_out(self) -> None:
+        """Handler -> websocket: one wake-up drains (and coalesces) the whole backlog"""
+        errors = 0
+        try:
+            while errors < MAX_SEND_ERRORS:
+                with self._tx_cond:
+                    batch, self._tx = self._tx, deque()
+                    if batch:
+                        self._tx_cond.notify_all()  # room for producers blocked in send()
+                    elif not self.running:
+                        break
+                    else:
+                        self._tx_sender_idle = True
+                        self._tx_wake.clear()
+                if not batch:
+                    await self._tx_wake.wait()
+                    continue
+
+                self.counters["tx_wakeups"] += 1
+                batch = list(batch)
+                to_send = coalesce(batch)
+                if len(to_send) != len(batch):
+                    self.counters["tx_cleared"] += len(batch) - len(to_send)
+                for data in to_send:
+                    try:
+                        if isinstance(data, str):
+                            await self._ws.send_text(data)
+                        else:
+                            await self._ws.send_bytes(data)
+                        self.counters["tx_frames"] += 1
+                        errors = 0
+                    except Exception as e:
+                        errors += 1
+                        if errors == 1:
+                            logger.error(f"[WS_BRIDGE] Send error: {e}")
+                        if errors >= MAX_SEND_ERRORS:
+                            break
+        finally:
+            self.stop()
+
+    # ─── Stats ───────────────────────────────────────────────
+
+    def queue_depths(self) -> Dict[str, int]:
+        return {"rx": len(self._rx) + len(self._rx_batch), "tx": len(self._tx)}
+
+    def stats(self) -> Dict[str, int]:
+        stats = dict(self.counters)
+        depths = self.queue_depths()
+        stats["rx_depth"] = depths["rx"]
+        stats["tx_depth"] = depths["tx"]
+        stats["frames_allocated"] = self._pool.allocated
+        return stats
+
+
+# ─── Process-wide view (for /metrics.json) ───────────────
+
+_bridges = weakref.WeakSet()
+_bridges_lock = threading.Lock()
+
+
+def _register(bridge: MediaStreamBridge) -> None:
+    with _bridges_lock:
+        _bridges.add(bridge)
+
+
+def _increment_metric(name: str) -> None:
+    try:
+        from server.metrics import WS_BRIDGE_RX_DROPPED, WS_BRIDGE_TX_DROPPED, metrics
+        metrics.increment(WS_BRIDGE_RX_DROPPED if name == "rx_dropped" else WS_BRIDGE_TX_DROPPED)
+    except Exception:
+        pass
+
+
+def bridge_stats() -> Dict[str, int]:
+    """Live bridges and their queue depths; also published as gauges"""
+    with _bridges_lock:
+        bridges = [b for b in _bridges if b.running]
+    depths = [b.queue_depths() for b in bridges]
+    stats = {
+        "streams": len(bridges),
+        "rx_depth_total": sum(d["rx"] for d in depths),
+        "rx_depth_max": max((d["rx"] for d in depths), default=0),
+        "tx_depth_total": sum(d["tx"] for d in depths),
+        "tx_depth_max": max((d["tx"] for d in depths), default=0),
+    }
+    try:
+        from server.metrics import (
+            WS_BRIDGE_RX_QUEUE_DEPTH, WS_BRIDGE_STREAMS, WS_BRIDGE_TX_QUEUE_DEPTH, metrics,
+        )
+        metrics.set_gauge(WS_BRIDGE_STREAMS, stats["streams"])
+        metrics.set_gauge(WS_BRIDGE_RX_QUEUE_DEPTH, stats["rx_depth_max"])
+        metrics.set_gauge(WS_BRIDGE_TX_QUEUE_DEPTH, stats["tx_depth_max"])
+    except Exception:
+        pass
+    return stats
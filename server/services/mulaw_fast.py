@@ -1,84 +1,263 @@
 """
-Ultra-fast μ-law to PCM conversion using lookup table
-O(1) conversion per byte - critical for low latency
+Ultra-fast μ-law/PCM16 codec using NumPy lookup tables
+O(1) conversion per sample - critical for low latency
+
+Drop-in, bit-exact replacement for the audioop calls on the media and batch
+STT paths (audioop is removed in Python 3.13):
+- μ-law → PCM16:  256-entry table, np.take       (audioop.ulaw2lin)
+- PCM16 → μ-law:  65536-entry table, np.take     (audioop.lin2ulaw)
+- Resample:       vectorized ratecv              (audioop.ratecv(..., None)[0])
+- RMS:            vectorized                     (audioop.rms)
+- Peak:           vectorized                     (audioop.max)
+
+Array functions accept an optional ``out=`` buffer so per-call code can reuse
+preallocated arrays instead of allocating per 20ms frame.
+
+Benchmark: python scripts/bench_mulaw_codec.py
 """
-import array
+import binascii
 import logging
+import math
+from functools import lru_cache
+from typing import Optional, Tuple, Union
+
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
+BytesLike = Union[bytes, bytearray, memoryview]
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# G.711 μ-law tables (bit-exact with audioop)
+# ═══════════════════════════════════════════════════════════════════════════════
+_ULAW_BIAS = 0x84
+_ULAW_CLIP = 8159
+_ULAW_SEG_END = np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF], dtype=np.int32)
+
+
+def _build_decode_table() -> np.ndarray:
+    """μ-law byte → int16 sample (256 entries)"""
+    u = ~np.arange(256, dtype=np.int32) & 0xFF  # Invert all bits
+    t = ((u & 0x0F) << 3) + _ULAW_BIAS
+    t <<= (u & 0x70) >> 4
+    return np.where(u & 0x80, _ULAW_BIAS - t, t - _ULAW_BIAS).astype(np.int16)
+
+
+def _build_encode_table() -> np.ndarray:
+    """
+    int16 sample → μ-law byte (65536 entries)
+
+    Indexed by the sample's uint16 bit pattern, i.e. ``table[samples.view(np.uint16)]``.
+    """
+    pcm = np.arange(65536, dtype=np.uint16).view(np.int16).astype(np.int32) >> 2
+    mask = np.where(pcm < 0, 0x7F, 0xFF)
+    mag = np.minimum(np.abs(pcm), _ULAW_CLIP) + (_ULAW_BIAS >> 2)
+    seg = np.searchsorted(_ULAW_SEG_END, mag, side='left')
+    uval = (seg << 4) | ((mag >> (seg + 1)) & 0x0F)
+    uval = np.where(seg >= 8, 0x7F, uval)  # out of range → maximum value
+    return ((uval ^ mask) & 0xFF).astype(np.uint8)
+
+
+# Computed once at module load (~65KB), read-only afterwards
+MULAW_DECODE_TABLE = _build_decode_table()
+MULAW_ENCODE_TABLE = _build_encode_table()
+MULAW_DECODE_TABLE.setflags(write=False)
+MULAW_ENCODE_TABLE.setflags(write=False)
+
+# Twilio media frame: 20ms @ 8kHz = 160 μ-law bytes
+MULAW_FRAME_BYTES = 160
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Array API (zero-allocation when out= is given)
+# ═══════════════════════════════════════════════════════════════════════════════
+def ulaw_decode(mulaw: BytesLike, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Decode μ-law bytes to int16 samples
+
+    Args:
+        mulaw: μ-law encoded audio
+        out: Optional int16 buffer of exactly len(mulaw) samples to write into
+
+    Returns:
+        int16 array (``out`` when given)
+    """
+    idx = np.frombuffer(mulaw, dtype=np.uint8)
+    if out is None:
+        return MULAW_DECODE_TABLE.take(idx)
+    return MULAW_DECODE_TABLE.take(idx, out=out)
+
+
+def ulaw_encode(pcm16: Union[BytesLike, np.ndarray], out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Encode int16 samples to μ-law bytes
+
+    Args:
+        pcm16: PCM16 little-endian bytes or int16 array
+        out: Optional uint8 buffer of exactly len(samples) entries to write into
+
+    Returns:
+        uint8 array (``out`` when given)
+    """
+    if isinstance(pcm16, np.ndarray):
+        idx = pcm16.view(np.uint16)
+    else:
+        idx = np.frombuffer(pcm16, dtype=np.uint16)
+    if out is None:
+        return MULAW_ENCODE_TABLE.take(idx)
+    return MULAW_ENCODE_TABLE.take(idx, out=out)
+
+
+def b64_mulaw_decode(payload: Union[str, bytes], out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Fused base64 decode + μ-law → PCM16 for Twilio ``media`` payloads
+
+    Args:
+        payload: base64 string from ``evt["media"]["payload"]``
+        out: Optional int16 buffer; the first N samples are written and a view
+             of that slice is returned (N = decoded byte count)
 
-# Pre-computed μ-law to 16-bit PCM lookup table
-# This eliminates slow audioop.ulaw2lin() calls
-_MULAW_TO_PCM16_TABLE = None
-
-def _init_mulaw_table():
-    """Initialize μ-law to PCM16 lookup table (256 entries)"""
-    global _MULAW_TO_PCM16_TABLE
-    if _MULAW_TO_PCM16_TABLE is not None:
-        return
-    
-    # μ-law decompression formula (ITU-T G.711)
-    table = []
-    for i in range(256):
-        mulaw_val = i ^ 0xFF  # Invert all bits
-        sign = mulaw_val & 0x80
-        exponent = (mulaw_val >> 4) & 0x07
-        mantissa = mulaw_val & 0x0F
-        
-        # Calculate PCM value
-        pcm = (mantissa << (exponent + 3)) + (0x84 << exponent) - 0x84
-        if sign:
-            pcm = -pcm
-        
-        # Clamp to 16-bit range
-        pcm = max(-32768, min(32767, pcm))
-        table.append(pcm)
-    
-    _MULAW_TO_PCM16_TABLE = array.array('h', table)  # signed short
-
-def mulaw_to_pcm16_fast(mulaw_bytes: bytes) -> bytes:
+    Returns:
+        int16 array of decoded samples
+    """
+    raw = binascii.a2b_base64(payload)
+    if out is not None:
+        out = out[:len(raw)]
+    return ulaw_decode(raw, out=out)
+
+
+@lru_cache(maxsize=64)
+def _resample_plan(n_in: int, inrate: int, outrate: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, int]:
+    """
+    Index/weight plan for resample_pcm16 (cached per frame size and rate pair)
+
+    ratecv emits output m from input n = ceil(m*in/out) with weight d = n*out - m*in:
+        y[m] = trunc((x[n-1]*d + x[n]*(out-d)) / out)
+    """
+    g = math.gcd(inrate, outrate)
+    inrate //= g
+    outrate //= g
+    n_out = (n_in - 1) * outrate // inrate + 1
+    m = np.arange(n_out, dtype=np.int64)
+    n = -((-m * inrate) // outrate)
+    d = n * outrate - m * inrate
+    # d == 0 whenever n == 0, so clamping the previous index never changes the result
+    prev_idx = np.maximum(n - 1, 0)
+    return n, prev_idx, d.astype(np.float64), (outrate - d).astype(np.float64), outrate
+
+
+def resample_pcm16(pcm16: Union[BytesLike, np.ndarray], inrate: int, outrate: int) -> np.ndarray:
+    """
+    Resample mono int16 audio, bit-exact with ``audioop.ratecv(data, 2, 1, inrate, outrate, None)[0]``
+
+    Stateless (every call starts from a fresh filter state), which matches how
+    the media path calls ratecv on each chunk.
+
+    Args:
+        pcm16: PCM16 little-endian bytes or int16 array
+        inrate: Input sample rate (e.g. 8000)
+        outrate: Output sample rate (e.g. 16000)
+
+    Returns:
+        int16 array of resampled audio
+    """
+    if isinstance(pcm16, np.ndarray):
+        x = pcm16
+    else:
+        x = np.frombuffer(pcm16, dtype=np.int16)
+    n_in = len(x)
+    if n_in == 0 or inrate == outrate:
+        return x.astype(np.int16, copy=True)
+
+    cur_idx, prev_idx, w_prev, w_cur, out_scale = _resample_plan(n_in, inrate, outrate)
+
+    # ratecv works on 32-bit scaled samples (x << 16) and shifts back at the end
+    xs = x.astype(np.float64)
+    xs *= 65536.0
+    val = xs[prev_idx] * w_prev
+    val += xs[cur_idx] * w_cur
+    val /= out_scale
+    np.trunc(val, out=val)
+    return (val.astype(np.int64) >> 16).astype(np.int16)
+
+
+def pcm16_rms(pcm16: Union[BytesLike, np.ndarray]) -> int:
+    """
+    RMS of int16 audio, same value as ``audioop.rms(data, 2)``
+
+    Args:
+        pcm16: PCM16 little-endian bytes or int16 array
+
+    Returns:
+        RMS as int (0 for empty input)
+    """
+    if isinstance(pcm16, np.ndarray):
+        x = pcm16
+    else:
+        x = np.frombuffer(pcm16, dtype=np.int16)
+    if len(x) == 0:
+        return 0
+    xf = x.astype(np.float64)
+    return int(math.sqrt(float(np.dot(xf, xf)) / len(xf)))
+
+
+def pcm16_peak(pcm16: Union[BytesLike, np.ndarray]) -> int:
+    """
+    Peak absolute sample of int16 audio, same value as ``audioop.max(data, 2)``
+
+    Args:
+        pcm16: PCM16 little-endian bytes or int16 array
+
+    Returns:
+        Peak as int (0 for empty input; 32768 for a -32768 sample)
+    """
+    if isinstance(pcm16, np.ndarray):
+        x = pcm16
+    else:
+        x = np.frombuffer(pcm16, dtype=np.int16)
+    if len(x) == 0:
+        return 0
+    # int32 first: abs(-32768) overflows int16
+    return int(np.abs(x.astype(np.int32)).max())
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# bytes API (drop-in for audioop call sites)
+# ═══════════════════════════════════════════════════════════════════════════════
+def mulaw_to_pcm16_fast(mulaw_bytes: BytesLike) -> bytes:
     """
     Convert μ-law bytes to PCM16 using vectorized lookup
-    ~10-20x faster than audioop.ulaw2lin()
-    
+    Same output as audioop.ulaw2lin(mulaw_bytes, 2)
+
     Args:
         mulaw_bytes: μ-law encoded audio
-    
+
     Returns:
         PCM16 little-endian bytes
     """
-    if _MULAW_TO_PCM16_TABLE is None:
-        _init_mulaw_table()
-    
-    # Vectorized lookup - O(n) where n is number of bytes
-    pcm_array = array.array('h', (_MULAW_TO_PCM16_TABLE[b] for b in mulaw_bytes))
-    return pcm_array.tobytes()
-
-# Initialize table at module load
-_init_mulaw_table()
-
-if __name__ == "__main__":
-    import time
-    import audioop
-    import random
-    
-    # Test correctness and speed
-    test_data = bytes([random.randint(0, 255) for _ in range(8000)])  # 1 second @ 8kHz
-    
-    # Test fast version
-    start = time.perf_counter()
-    for _ in range(100):
-        result_fast = mulaw_to_pcm16_fast(test_data)
-    fast_time = (time.perf_counter() - start) / 100
-    
-    # Test audioop (slow)
-    start = time.perf_counter()
-    for _ in range(100):
-        result_audioop = audioop.ulaw2lin(test_data, 2)
-    audioop_time = (time.perf_counter() - start) / 100
-    
-    logger.info(f"✅ Fast lookup: {fast_time*1000:.3f}ms per 1s audio")
-    logger.error(f"❌ audioop.ulaw2lin: {audioop_time*1000:.3f}ms per 1s audio")
-    logger.info(f"🚀 Speedup: {audioop_time/fast_time:.1f}x faster")
-    logger.info(f"📊 Results match: {result_fast == result_audioop}")
+    return ulaw_decode(mulaw_bytes).tobytes()
+
+
+def pcm16_to_mulaw_fast(pcm16_bytes: BytesLike) -> bytes:
+    """
+    Convert PCM16 bytes to μ-law using vectorized lookup
+    Same output as audioop.lin2ulaw(pcm16_bytes, 2)
+
+    Args:
+        pcm16_bytes: PCM16 little-endian audio
+
+    Returns:
+        μ-law encoded bytes
+    """
+    return ulaw_encode(pcm16_bytes).tobytes()
+
+
+def b64_mulaw_to_pcm16(payload: Union[str, bytes]) -> bytes:
+    """Fused base64 decode + μ-law → PCM16 (bytes in, bytes out)"""
+    return b64_mulaw_decode(payload).tobytes()
+
+
+def ratecv_fast(pcm16_bytes: BytesLike, inrate: int, outrate: int) -> bytes:
+    """Same output as audioop.ratecv(pcm16_bytes, 2, 1, inrate, outrate, None)[0]"""
+    return resample_pcm16(pcm16_bytes, inrate, outrate).tobytes()
+
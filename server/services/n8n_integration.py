@@ -87,33 +87,32 @@ def send_event_to_n8n(
         params["token"] = N8N_WEBHOOK_SECRET
     
     if async_send:
-        # ⚡ REMOVED THREADING: Use RQ job for n8n webhook sending
-        try:
-            from server.services.jobs import enqueue_job
-            from server.jobs.send_webhook_job import send_webhook_job
-            
-            # Convert params to URL query string
-            import urllib.parse
-            webhook_url = N8N_WEBHOOK_URL
-            if params:
-                webhook_url += "?" + urllib.parse.urlencode(params)
-            
-            enqueue_job(
-                queue_name='default',
-                func=send_webhook_job,
-                url=webhook_url,
-                payload=event_data,
-                event_type=event_type,
-                business_id=event_data.get('business_id'),
-                timeout=30,
-                retry=2,
-                description=f"Send n8n {event_type}"
-            )
-            return {"status": "queued", "event_type": event_type}
-        except Exception as e:
-            logger.error(f"Failed to enqueue n8n webhook: {e}")
-            # Fallback to sync send
-            return _send_to_n8n(event_data, params)
+        # Queue in the webhook outbox - delivery jobs send it over pooled connections
+        # with retries (and batched with other events when N8N_BATCH_MAX_EVENTS > 1)
+        import json
+        import urllib.parse
+        from server.services.webhook_delivery import CHANNEL_N8N, enqueue_webhook
+
+        webhook_url = N8N_WEBHOOK_URL
+        headers = {"Content-Type": "application/json"}
+        if params:
+            headers["X-N8N-Token"] = params["token"]
+            # Token in the query too, as the sync path sends it (backward compatibility)
+            webhook_url += ("&" if "?" in webhook_url else "?") + urllib.parse.urlencode(params)
+
+        outbox_id = enqueue_webhook(
+            CHANNEL_N8N,
+            webhook_url,
+            json.dumps(event_data, default=str),
+            headers,
+            event_type,
+            business_id=event_data.get('business_id'),
+            batchable=True,
+        )
+        if outbox_id is not None:
+            return {"status": "queued", "event_type": event_type, "outbox_id": outbox_id}
+        # Fallback to sync send
+        return _send_to_n8n(event_data, params)
     else:
         return _send_to_n8n(event_data, params)
 
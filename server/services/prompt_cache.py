@@ -1,6 +1,7 @@
 """
-Prompt Cache - In-memory cache for business prompts and greetings
+Prompt Cache - Cache for business prompts and greetings
 🔥 GREETING OPTIMIZATION: Pre-compute and cache prompts to eliminate DB/prompt building latency
+Built on server/utils/cache.py: shared via Redis L2 and invalidated in all processes
 """
 import time
 import logging
@@ -8,11 +9,16 @@ import threading
 from typing import Optional, Dict, Any
 from dataclasses import dataclass
 
+from server.utils.cache import TTLCache
+
 logger = logging.getLogger(__name__)
 
 # Cache TTL in seconds (5-10 minutes)
 CACHE_TTL_SECONDS = 600  # 10 minutes
 
+# Maximum cache size (2 directions per business)
+MAX_CACHE_SIZE = 2000
+
 
 @dataclass
 class CachedPrompt:
@@ -32,7 +38,8 @@ class CachedPrompt:
 
 class PromptCache:
     """
-    Thread-safe in-memory cache for business prompts
+    Thread-safe cache for business prompts (shared TTLCache: LRU, Redis L2,
+    cross-process invalidation)
     
     Key: f"{business_id}:{direction}" (e.g., "123:inbound" or "123:outbound")
     Value: CachedPrompt with {system_prompt, greeting_text, language_config}
@@ -40,8 +47,7 @@ class PromptCache:
     """
     
     def __init__(self):
-        self._cache: Dict[str, CachedPrompt] = {}
-        self._lock = threading.RLock()
+        self._cache = TTLCache(ttl_seconds=CACHE_TTL_SECONDS, max_size=MAX_CACHE_SIZE, name="prompts", l2=True)
         logger.info("📦 [PROMPT_CACHE] Initialized")
     
     def _make_cache_key(self, business_id: int, direction: str = "inbound") -> str:
@@ -60,22 +66,12 @@ class PromptCache:
             CachedPrompt if found and not expired, None otherwise
         """
         cache_key = self._make_cache_key(business_id, direction)
-        with self._lock:
-            entry = self._cache.get(cache_key)
-            if entry:
-                if entry.is_expired():
-                    # Expired - remove from cache
-                    del self._cache[cache_key]
-                    logger.info(f"🗑️ [PROMPT_CACHE] Expired entry removed for {cache_key}")
-                    return None
-                else:
-                    # Valid cache hit
-                    age = time.time() - entry.cached_at
-                    logger.info(f"✅ [PROMPT_CACHE] HIT for {cache_key} (age: {int(age)}s)")
-                    return entry
-            else:
-                logger.info(f"❌ [PROMPT_CACHE] MISS for {cache_key}")
-                return None
+        entry = self._cache.get(cache_key)
+        if entry:
+            logger.debug(f"✅ [PROMPT_CACHE] HIT for {cache_key} (age: {int(time.time() - entry.cached_at)}s)")
+        else:
+            logger.debug(f"❌ [PROMPT_CACHE] MISS for {cache_key}")
+        return entry
     
     def set(self, business_id: int, system_prompt: str, greeting_text: str, 
             direction: str = "inbound", language_config: Optional[Dict[str, Any]] = None):
@@ -90,21 +86,20 @@ class PromptCache:
             language_config: Optional language configuration
         """
         cache_key = self._make_cache_key(business_id, direction)
-        with self._lock:
-            entry = CachedPrompt(
-                business_id=business_id,
-                direction=direction,
-                system_prompt=system_prompt,
-                greeting_text=greeting_text,
-                language_config=language_config or {},
-                cached_at=time.time()
-            )
-            self._cache[cache_key] = entry
-            logger.info(f"💾 [PROMPT_CACHE] SET for {cache_key} (prompt: {len(system_prompt)} chars, greeting: {len(greeting_text)} chars)")
+        entry = CachedPrompt(
+            business_id=business_id,
+            direction=direction,
+            system_prompt=system_prompt,
+            greeting_text=greeting_text,
+            language_config=language_config or {},
+            cached_at=time.time()
+        )
+        self._cache.set(cache_key, entry, ttl=CACHE_TTL_SECONDS)
+        logger.info(f"💾 [PROMPT_CACHE] SET for {cache_key} (prompt: {len(system_prompt)} chars, greeting: {len(greeting_text)} chars)")
     
     def invalidate(self, business_id: int, direction: Optional[str] = None):
         """
-        Invalidate cache entry for a business
+        Invalidate cache entry for a business (in every process)
         
         Args:
             business_id: Business ID
@@ -113,38 +108,21 @@ class PromptCache:
         
         Call this when business settings change
         """
-        with self._lock:
-            if direction:
-                # Invalidate specific direction
-                cache_key = self._make_cache_key(business_id, direction)
-                if cache_key in self._cache:
-                    del self._cache[cache_key]
-                    logger.info(f"🗑️ [PROMPT_CACHE] Invalidated cache for {cache_key}")
-            else:
-                # Invalidate both directions
-                for dir_name in ["inbound", "outbound"]:
-                    cache_key = self._make_cache_key(business_id, dir_name)
-                    if cache_key in self._cache:
-                        del self._cache[cache_key]
-                        logger.info(f"🗑️ [PROMPT_CACHE] Invalidated cache for {cache_key}")
+        if direction:
+            self._cache.delete(self._make_cache_key(business_id, direction))
+        else:
+            self._cache.delete_prefix(f"{business_id}:")
+        logger.info(f"🗑️ [PROMPT_CACHE] Invalidated cache for {business_id}:{direction or '*'}")
     
     def clear(self):
         """Clear all cache entries"""
-        with self._lock:
-            count = len(self._cache)
-            self._cache.clear()
-            logger.info(f"🗑️ [PROMPT_CACHE] Cleared {count} entries")
+        count = self._cache.size()
+        self._cache.clear()
+        logger.info(f"🗑️ [PROMPT_CACHE] Cleared {count} entries")
     
     def stats(self) -> Dict[str, Any]:
         """Get cache statistics"""
-        with self._lock:
-            total = len(self._cache)
-            expired = sum(1 for e in self._cache.values() if e.is_expired())
-            return {
-                "total_entries": total,
-                "expired_entries": expired,
-                "valid_entries": total - expired
-            }
+        return self._cache.stats()
 
 
 # Global singleton cache instance
@@ -0,0 +1,370 @@
+"""
+Receipt Extraction Stage - receipt parsing in a process pool, cached by content hash
+
+Parsing a receipt is pure CPU: PDF text (PyPDF2/pdfminer), PDF confidence, and
+the amount/currency/vendor regexes over PDF text and email HTML
+(extract_amount_merged / extract_amount_from_html in gmail_sync_service.py).
+The Gmail sync ran all of it inline on the RQ worker's only thread; the sync
+engine now submits one job per receipt to ExtractionPool and waits at most
+RECEIPT_EXTRACTION_TIMEOUT seconds for it.
+
+Results are stored per business in receipt_extractions (ReceiptExtraction):
+- kind='pdf'    key = sha256(version, PDF bytes)      -> PDF text + PDF confidence
+- kind='fields' key = sha256(version, every input)    -> extracted fields
+A re-sync of the same mail hits 'fields' and parses nothing; the same PDF
+attached to another mail hits 'pdf' and only runs the (cheap) regex part.
+Bump EXTRACTOR_VERSION whenever the extraction rules change.
+"""
+import hashlib
+import json
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from server.config import RECEIPT_EXTRACTION_TIMEOUT, RECEIPT_EXTRACTION_WORKERS
+
+logger = logging.getLogger(__name__)
+
+EXTRACTOR_VERSION = 1
+
+KIND_PDF = 'pdf'
+KIND_FIELDS = 'fields'
+
+
+class ExtractionTimeout(Exception):
+    """A document took longer than RECEIPT_EXTRACTION_TIMEOUT - its worker was killed"""
+
+
+# ─── Keys ─────────────────────────────────────────────────
+
+def pdf_hash(pdf_data: bytes) -> str:
+    digest = hashlib.sha256(f"v{EXTRACTOR_VERSION}:".encode())
+    digest.update(pdf_data)
+    return digest.hexdigest()
+
+
+def fields_hash(pdf_hashes: List[str], html: str, subject: str, from_domain: str) -> str:
+    """Everything extract_receipt_fields() output depends on"""
+    payload = json.dumps([EXTRACTOR_VERSION, pdf_hashes, html or '', subject or '', from_domain or ''],
+                         ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8', 'surrogatepass')).hexdigest()
+
+
+# ─── Worker ───────────────────────────────────────────────
+
+def extract_receipt_fields(pdfs: List[Tuple[str, Optional[bytes]]], html: str, subject: str, from_domain: str,
+                           known_pdfs: Optional[Dict[str, dict]] = None) -> dict:
+    """
+    Parse one receipt - runs in a worker process, so no DB / app context
+
+    Same rules process_single_receipt_message() applies inline: the text of
+    the first PDF that has any, its confidence, then extract_amount_merged()
+    (PDF -> HTML -> subject) and extract_amount_from_html() for the raw JSON.
+
+    Args:
+        pdfs: (pdf_hash, bytes) of the message's PDFs in order; bytes may be
+            None for hashes found in known_pdfs
+        html: email HTML snippet (as stored on the Receipt)
+        subject: email subject
+        from_domain: sender domain (vendor fallback)
+        known_pdfs: {pdf_hash: {'pdf_text', 'confidence'}} from the cache
+
+    Returns:
+        {'pdf_text', 'pdf_confidence', 'extracted', 'html_extraction',
+         'parsed_pdfs': {pdf_hash: {'pdf_text', 'confidence', 'parse_ms'}}, 'parse_ms'}
+    """
+    from server.services.gmail_sync_service import (
+        calculate_pdf_confidence, extract_amount_from_html, extract_amount_merged, extract_pdf_text,
+    )
+
+    started = time.perf_counter()
+    known_pdfs = known_pdfs or {}
+    metadata = {'from_domain': from_domain}
+    pdf_text = ''
+    pdf_confidence = 0
+    parsed = {}
+    for digest, data in pdfs:
+        known = known_pdfs.get(digest) or parsed.get(digest)
+        if known is None:
+            pdf_started = time.perf_counter()
+            text = extract_pdf_text(data) if data else ''
+            known = parsed[digest] = {
+                'pdf_text': text,
+                'confidence': calculate_pdf_confidence(text),
+                'parse_ms': int((time.perf_counter() - pdf_started) * 1000),
+            }
+        if known['pdf_text']:
+            pdf_text = known['pdf_text']
+            pdf_confidence = known['confidence'] or 0
+            break
+
+    return {
+        'pdf_text': pdf_text,
+        'pdf_confidence': pdf_confidence,
+        'extracted': extract_amount_merged(pdf_text=pdf_text, html_content=html, subject=subject, metadata=metadata),
+        'html_extraction': extract_amount_from_html(html, metadata) if html else None,
+        'parsed_pdfs': parsed,
+        'parse_ms': int((time.perf_counter() - started) * 1000),
+    }
+
+
+def failed_extraction(subject: str, from_domain: str, reason: str) -> dict:
+    """Stand-in result for a document that timed out: vendor from the domain, nothing parsed"""
+    from server.services.gmail_sync_service import extract_amount_merged
+
+    return {
+        'pdf_text': '',
+        'pdf_confidence': 0,
+        'extracted': extract_amount_merged(pdf_text='', html_content='', subject=subject,
+                                           metadata={'from_domain': from_domain}),
+        'html_extraction': None,
+        'parsed_pdfs': {},
+        'error': reason,
+    }
+
+
+# ─── Pool ─────────────────────────────────────────────────
+
+class ExtractionPool:
+    """
+    Spawn process pool for extract_receipt_fields()
+
+    submit() returns a Future that survives worker crashes: a job whose
+    worker died (BrokenProcessPool) is resubmitted once to a fresh pool.
+    result() enforces the per-document timeout; a document that exceeds it
+    cannot be cancelled inside its process, so the pool's processes are
+    killed and replaced (other in-flight jobs are resubmitted).
+
+    workers=0 runs jobs inline on the submitting thread.
+    """
+
+    def __init__(self, workers: int = None, timeout: float = None):
+        self.workers = RECEIPT_EXTRACTION_WORKERS if workers is None else workers
+        self.timeout = RECEIPT_EXTRACTION_TIMEOUT if timeout is None else timeout
+        self._pool = None
+        self._lock = threading.Lock()
+        self.stats = {'submitted': 0, 'timeouts': 0, 'restarts': 0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, *args) -> Future:
+        outer = Future()
+        self.stats['submitted'] += 1
+        if self.workers <= 0:
+            try:
+                outer.set_result(extract_receipt_fields(*args))
+            except Exception as e:
+                outer.set_exception(e)
+            return outer
+        self._run(outer, args, retries=1)
+        return outer
+
+    def result(self, future: Future, timeout: float = None) -> dict:
+        """The job's result; raises ExtractionTimeout, or the job's own exception"""
+        try:
+            return future.result(timeout=self.timeout if timeout is None else timeout)
+        except FutureTimeoutError:
+            future.cancel()  # never "running", so this works - and keeps _finished() from resubmitting it
+            self.stats['timeouts'] += 1
+            self._restart()
+            raise ExtractionTimeout(f"receipt extraction exceeded {self.timeout:g}s")
+
+    def _run(self, outer: Future, args: tuple, retries: int):
+        pool = self._executor()
+        try:
+            inner = pool.submit(extract_receipt_fields, *args)
+        except BrokenProcessPool as e:
+            self._restart(pool)
+            if retries <= 0:
+                _settle(outer, error=e)
+                return
+            return self._run(outer, args, retries - 1)
+        except Exception as e:
+            _settle(outer, error=e)
+            return
+        inner.add_done_callback(lambda done: self._finished(outer, args, pool, done, retries))
+
+    def _finished(self, outer: Future, args: tuple, pool: ProcessPoolExecutor, inner: Future, retries: int):
+        if outer.done():  # timed out and abandoned
+            return
+        if inner.cancelled():
+            outer.cancel()
+            return
+        error = inner.exception()
+        if error is None:
+            _settle(outer, result=inner.result())
+        elif isinstance(error, BrokenProcessPool) and retries > 0:
+            logger.warning("⚠️ Receipt extraction worker died, resubmitting the document")
+            self._restart(pool)
+            self._run(outer, args, retries - 1)
+        else:
+            _settle(outer, error=error)
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn: the RQ work-horse has DB connections and threads a fork would copy
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def _restart(self, broken: ProcessPoolExecutor = None):
+        """Kill the current workers; the next submit starts new ones"""
+        with self._lock:
+            if self._pool is None or (broken is not None and self._pool is not broken):
+                return  # already replaced
+            pool, self._pool = self._pool, None
+        self.stats['restarts'] += 1
+        logger.warning("⚠️ Restarting receipt extraction workers")
+        for process in list((getattr(pool, '_processes', None) or {}).values()):
+            try:
+                process.terminate()
+            except Exception:
+                pass
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _settle(future: Future, result=None, error: BaseException = None):
+    """Complete a future unless a timeout already abandoned it"""
+    try:
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        pass
+
+
+# ─── Cache ────────────────────────────────────────────────
+
+class ExtractionCache:
+    """
+    receipt_extractions reads/writes for one business
+
+    Reads run on the sync engine's fetch threads, so they use the engine's
+    connection pool directly (no Flask session / app context). Any DB error
+    is logged and treated as a miss - the cache never fails a sync.
+    """
+
+    def __init__(self, business_id: int, engine):
+        from server.models_sql import ReceiptExtraction
+
+        self.business_id = business_id
+        self.engine = engine
+        self.table = ReceiptExtraction.__table__
+        self._stored = set()  # (kind, key) written by this instance
+        self.stats = {'hits': 0, 'misses': 0, 'stored': 0}
+
+    def get_many(self, kind: str, keys: Iterable[str]) -> Dict[str, dict]:
+        from sqlalchemy import select
+
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        table = self.table
+        try:
+            with self.engine.connect() as conn:
+                rows = conn.execute(select(table.c.content_hash, table.c.pdf_text, table.c.confidence, table.c.fields).where(
+                    table.c.business_id == self.business_id,
+                    table.c.kind == kind,
+                    table.c.content_hash.in_(keys),
+                )).fetchall()
+        except Exception as e:
+            logger.warning(f"⚠️ Receipt extraction cache read failed: {e}")
+            return {}
+        found = {row.content_hash: {'pdf_text': row.pdf_text or '', 'confidence': row.confidence or 0,
+                                    'fields': row.fields} for row in rows}
+        self.stats['hits'] += len(found)
+        self.stats['misses'] += len(keys) - len(found)
+        return found
+
+    def get(self, kind: str, key: str) -> Optional[dict]:
+        return self.get_many(kind, [key]).get(key)
+
+    def store(self, fields_key: str, result: dict):
+        """Persist a fresh extract_receipt_fields() result (its new PDFs and its fields)"""
+        rows = [
+            {'kind': KIND_PDF, 'content_hash': digest, 'pdf_text': parsed['pdf_text'],
+             'confidence': parsed['confidence'], 'fields': None, 'parse_ms': parsed.get('parse_ms')}
+            for digest, parsed in result.get('parsed_pdfs', {}).items()
+        ]
+        rows.append({'kind': KIND_FIELDS, 'content_hash': fields_key, 'pdf_text': result['pdf_text'],
+                     'confidence': result['pdf_confidence'], 'parse_ms': result.get('parse_ms'),
+                     'fields': {'extracted': result['extracted'], 'html_extraction': result['html_extraction']}})
+        rows = [row for row in rows if (row['kind'], row['content_hash']) not in self._stored]
+        if not rows:
+            return
+        from server.services.gmail_sync_service import strip_null_bytes
+
+        for row in rows:
+            row.update(business_id=self.business_id, extractor_version=EXTRACTOR_VERSION)
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(self._insert_ignore(), strip_null_bytes(rows))
+        except Exception as e:
+            logger.warning(f"⚠️ Receipt extraction cache write failed: {e}")
+            return
+        self._stored.update((row['kind'], row['content_hash']) for row in rows)
+        self.stats['stored'] += len(rows)
+
+    def _insert_ignore(self):
+        dialect = self.engine.dialect.name
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            return self.table.insert()
+        return insert(self.table).on_conflict_do_nothing(index_elements=['business_id', 'kind', 'content_hash'])
+
+    @staticmethod
+    def as_result(cached: dict) -> dict:
+        """A kind='fields' row in extract_receipt_fields() result shape"""
+        fields = cached.get('fields') or {}
+        return {
+            'pdf_text': cached['pdf_text'],
+            'pdf_confidence': cached['confidence'],
+            'extracted': fields.get('extracted') or {},
+            'html_extraction': fields.get('html_extraction'),
+            'parsed_pdfs': {},
+            'cached': True,
+        }
+
+
+def submit_extraction(pool: ExtractionPool, cache: Optional[ExtractionCache], pdfs: List[bytes], html: str,
+                      subject: str, from_domain: str) -> Tuple[Future, Optional[str]]:
+    """
+    Start (or short-circuit from the cache) one receipt's extraction
+
+    Returns (future of the result, fields key to store the result under -
+    None when the result came from the cache or caching is off).
+    """
+    digests = [pdf_hash(data) for data in pdfs]
+    key = fields_hash(digests, html, subject, from_domain)
+    known_pdfs = {}
+    if cache is not None:
+        cached = cache.get(KIND_FIELDS, key)
+        if cached is not None:
+            done = Future()
+            done.set_result(ExtractionCache.as_result(cached))
+            return done, None
+        known_pdfs = {digest: {'pdf_text': row['pdf_text'], 'confidence': row['confidence']}
+                      for digest, row in cache.get_many(KIND_PDF, digests).items()}
+
+    jobs = [(digest, None if digest in known_pdfs else data) for digest, data in zip(digests, pdfs)]
+    return pool.submit(jobs, html, subject, from_domain, known_pdfs), (key if cache is not None else None)
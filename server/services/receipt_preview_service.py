@@ -5,6 +5,7 @@ Features:
 - PDF thumbnail generation (first page as PNG)
 - Image thumbnail generation (resize to thumbnail size)
 - HTML→PNG rendering for emails without attachments using Playwright
+  (pooled Chromium pages, see browser_pool.py)
 - Integration with unified attachment service
 
 Requirements:
@@ -124,8 +125,10 @@ def generate_pdf_thumbnail(pdf_data: bytes) -> Optional[bytes]:
         first_page = pdf_document[0]
         
         # Render page to pixmap (image)
-        # Scale to get higher quality thumbnail
-        zoom = 2.0  # 2x zoom for better quality
+        # 2x the thumbnail size is enough for a sharp downscale; a full 2x zoom
+        # of an A4 page rasterizes ~2.7x more pixels only to throw them away
+        page_size = max(first_page.rect.width, first_page.rect.height) or 1
+        zoom = min(2.0, 2 * max(THUMBNAIL_MAX_WIDTH, THUMBNAIL_MAX_HEIGHT) / page_size)
         mat = fitz.Matrix(zoom, zoom)
         pix = first_page.get_pixmap(matrix=mat)
         
@@ -210,6 +213,145 @@ def generate_image_thumbnail(image_data: bytes, mime_type: str) -> Optional[byte
         return None
 
 
+def _render_html_preview(page, html_content: str, width: int, height: int) -> bytes:
+    """Load HTML into a pooled Playwright page and screenshot its main content (PNG bytes)"""
+    from playwright.sync_api import TimeoutError as PlaywrightTimeout
+    
+    # Fixed viewport size for consistent rendering
+    page.set_viewport_size({'width': width, 'height': height})
+    
+    # CRITICAL: Emulate screen media (not print)
+    page.emulate_media(media='screen')
+    
+    # Set HTML content and wait for network to be idle
+    page.set_content(html_content, wait_until='networkidle', timeout=30000)
+    
+    # ========================================================================
+    # CRITICAL WAITING SEQUENCE (per specification)
+    # ========================================================================
+    
+    # Wait 1: Network idle
+    try:
+        page.wait_for_load_state('networkidle', timeout=12000)
+        logger.debug("  ✓ networkidle complete")
+    except Exception as e:
+        logger.warning(f"  ⚠️  networkidle timeout (continuing): {e}")
+    
+    # Wait 2: Try to wait for content indicators (with timeout)
+    # This ensures we're not just capturing a logo
+    content_selectors = [
+        'text=/Total|Amount|Paid|סה"כ|סכום|שולם/i',  # Text indicators
+        '[data-testid*="total"]',  # Common test IDs
+        '[data-testid*="amount"]',
+        'table:has-text("Total")',  # Tables with totals
+        'table:has-text("Amount")',
+        '.receipt-total',  # Common class names
+        '.invoice-total',
+        '#total',
+        '#amount',
+    ]
+    
+    content_found = False
+    for selector in content_selectors:
+        try:
+            page.wait_for_selector(selector, timeout=3000)
+            logger.debug(f"  ✓ Found content indicator: {selector}")
+            content_found = True
+            break
+        except PlaywrightTimeout:
+            continue
+        except Exception:
+            continue
+    
+    if not content_found:
+        logger.debug("  ℹ️  No specific content indicators found - using full page")
+    
+    # Wait 3: Extra buffer for late-loading UI (per specification: 600ms)
+    try:
+        page.wait_for_timeout(600)
+        logger.debug("  ✓ Buffer wait complete (600ms)")
+    except Exception as e:
+        logger.warning(f"  ⚠️  Buffer wait failed: {e}")
+    
+    # Wait 4: Fonts ready
+    try:
+        page.evaluate("document.fonts && document.fonts.ready")
+        logger.debug("  ✓ Fonts ready")
+    except Exception as e:
+        logger.warning(f"  ⚠️  Fonts ready check failed: {e}")
+    
+    # Wait 5: All images loaded
+    try:
+        page.evaluate("""
+            async () => {
+                const imgs = Array.from(document.images || []);
+                await Promise.all(imgs.map(img => img.complete ? Promise.resolve() : new Promise(res => {
+                    img.addEventListener('load', res);
+                    img.addEventListener('error', res);
+                })));
+            }
+        """)
+        logger.debug("  ✓ Images loaded")
+    except Exception as e:
+        logger.warning(f"  ⚠️  Image loading wait failed: {e}")
+    
+    # Inject wrapper CSS for better rendering
+    try:
+        page.add_style_tag(content="""
+            body {
+                max-width: 100%;
+                background: white !important;
+                font-size: 14px;
+                padding: 20px;
+            }
+            img {
+                max-width: 100% !important;
+                height: auto !important;
+            }
+        """)
+    except Exception as e:
+        logger.warning(f"  ⚠️  CSS injection failed: {e}")
+    
+    # Try to identify and screenshot main content area (not just logo)
+    screenshot_bytes = None
+    try:
+        # Try to find main content container
+        main_selectors = [
+            'main',
+            'article',
+            '[role="main"]',
+            '.content',
+            '.main-content',
+            '#content',
+            'body > div:first-child',  # Common pattern
+        ]
+    
+        main_element = None
+        for selector in main_selectors:
+            try:
+                main_element = page.query_selector(selector)
+                if main_element:
+                    # Check if element has reasonable size
+                    box = main_element.bounding_box()
+                    if box and box['height'] > 100:  # At least 100px tall
+                        logger.debug(f"  ✓ Found main content: {selector}")
+                        screenshot_bytes = main_element.screenshot(type='png')
+                        break
+            except Exception:
+                continue
+    
+        # If no main element found, use full page
+        if not screenshot_bytes:
+            logger.debug("  ℹ️  No main content container found - using full page")
+            screenshot_bytes = page.screenshot(type='png', full_page=True)
+    
+    except Exception as e:
+        logger.warning(f"  ⚠️  Content area detection failed, using full page: {e}")
+        screenshot_bytes = page.screenshot(type='png', full_page=True)
+    
+    return screenshot_bytes
+
+
 def generate_html_preview(html_content: str, width: int = 1280, height: int = 720) -> Optional[bytes]:
     """
     Render HTML content to PNG image using Playwright with enhanced waiting
@@ -230,175 +372,39 @@ def generate_html_preview(html_content: str, width: int = 1280, height: int = 72
     Returns:
         PNG image bytes or None if rendering fails
     """
+    from server.services.lazy_services import sdk_available
+    
+    if not sdk_available("playwright"):
+        logger.error("Playwright not installed. Install with: pip install playwright && playwright install chromium")
+        return None
+    
     try:
-        from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeout
-        
-        with sync_playwright() as p:
-            # Launch browser (headless)
-            browser = p.chromium.launch(
-                headless=True,
-                args=[
-                    '--disable-blink-features=AutomationControlled',
-                    '--no-first-run',
-                    '--no-default-browser-check',
-                    '--disable-extensions'
-                ]
-            )
-            
-            # Create page with fixed viewport size for consistent rendering
-            page = browser.new_page(viewport={'width': width, 'height': height})
-            
-            # CRITICAL: Emulate screen media (not print)
-            page.emulate_media(media='screen')
-            
-            # Set HTML content and wait for network to be idle
-            page.set_content(html_content, wait_until='networkidle', timeout=30000)
-            
-            # ========================================================================
-            # CRITICAL WAITING SEQUENCE (per specification)
-            # ========================================================================
-            
-            # Wait 1: Network idle
-            try:
-                page.wait_for_load_state('networkidle', timeout=12000)
-                logger.debug("  ✓ networkidle complete")
-            except Exception as e:
-                logger.warning(f"  ⚠️  networkidle timeout (continuing): {e}")
-            
-            # Wait 2: Try to wait for content indicators (with timeout)
-            # This ensures we're not just capturing a logo
-            content_selectors = [
-                'text=/Total|Amount|Paid|סה"כ|סכום|שולם/i',  # Text indicators
-                '[data-testid*="total"]',  # Common test IDs
-                '[data-testid*="amount"]',
-                'table:has-text("Total")',  # Tables with totals
-                'table:has-text("Amount")',
-                '.receipt-total',  # Common class names
-                '.invoice-total',
-                '#total',
-                '#amount',
-            ]
-            
-            content_found = False
-            for selector in content_selectors:
-                try:
-                    page.wait_for_selector(selector, timeout=3000)
-                    logger.debug(f"  ✓ Found content indicator: {selector}")
-                    content_found = True
-                    break
-                except PlaywrightTimeout:
-                    continue
-                except Exception:
-                    continue
-            
-            if not content_found:
-                logger.debug("  ℹ️  No specific content indicators found - using full page")
-            
-            # Wait 3: Extra buffer for late-loading UI (per specification: 600ms)
-            try:
-                page.wait_for_timeout(600)
-                logger.debug("  ✓ Buffer wait complete (600ms)")
-            except Exception as e:
-                logger.warning(f"  ⚠️  Buffer wait failed: {e}")
-            
-            # Wait 4: Fonts ready
-            try:
-                page.evaluate("document.fonts && document.fonts.ready")
-                logger.debug("  ✓ Fonts ready")
-            except Exception as e:
-                logger.warning(f"  ⚠️  Fonts ready check failed: {e}")
-            
-            # Wait 5: All images loaded
-            try:
-                page.evaluate("""
-                    async () => {
-                        const imgs = Array.from(document.images || []);
-                        await Promise.all(imgs.map(img => img.complete ? Promise.resolve() : new Promise(res => {
-                            img.addEventListener('load', res);
-                            img.addEventListener('error', res);
-                        })));
-                    }
-                """)
-                logger.debug("  ✓ Images loaded")
-            except Exception as e:
-                logger.warning(f"  ⚠️  Image loading wait failed: {e}")
-            
-            # Inject wrapper CSS for better rendering
-            try:
-                page.add_style_tag(content="""
-                    body {
-                        max-width: 100%;
-                        background: white !important;
-                        font-size: 14px;
-                        padding: 20px;
-                    }
-                    img {
-                        max-width: 100% !important;
-                        height: auto !important;
-                    }
-                """)
-            except Exception as e:
-                logger.warning(f"  ⚠️  CSS injection failed: {e}")
-            
-            # Try to identify and screenshot main content area (not just logo)
-            screenshot_bytes = None
-            try:
-                # Try to find main content container
-                main_selectors = [
-                    'main',
-                    'article',
-                    '[role="main"]',
-                    '.content',
-                    '.main-content',
-                    '#content',
-                    'body > div:first-child',  # Common pattern
-                ]
-                
-                main_element = None
-                for selector in main_selectors:
-                    try:
-                        main_element = page.query_selector(selector)
-                        if main_element:
-                            # Check if element has reasonable size
-                            box = main_element.bounding_box()
-                            if box and box['height'] > 100:  # At least 100px tall
-                                logger.debug(f"  ✓ Found main content: {selector}")
-                                screenshot_bytes = main_element.screenshot(type='png')
-                                break
-                    except Exception:
-                        continue
-                
-                # If no main element found, use full page
-                if not screenshot_bytes:
-                    logger.debug("  ℹ️  No main content container found - using full page")
-                    screenshot_bytes = page.screenshot(type='png', full_page=True)
-            
-            except Exception as e:
-                logger.warning(f"  ⚠️  Content area detection failed, using full page: {e}")
-                screenshot_bytes = page.screenshot(type='png', full_page=True)
-            
-            # Close browser
-            browser.close()
-            
-            # CRITICAL: Validate screenshot is not blank/white/logo-only
-            if is_image_blank_or_white(screenshot_bytes):
-                logger.error("  ❌ Screenshot validation failed - image appears blank/white")
-                return None
-            
-            # Resize to thumbnail size using PIL
-            from PIL import Image
-            
-            img = Image.open(BytesIO(screenshot_bytes))
-            img.thumbnail((THUMBNAIL_MAX_WIDTH, THUMBNAIL_MAX_HEIGHT), Image.Resampling.LANCZOS)
-            
-            # Save as PNG
-            output = BytesIO()
-            img.save(output, format='PNG', optimize=True)
-            
-            logger.info(f"  ✅ Generated HTML preview: {img.size}")
-            
-            return output.getvalue()
-            
+        from server.services.browser_pool import get_browser_pool
+        
+        # Long-lived pooled page - no browser launch per preview
+        screenshot_bytes = get_browser_pool().render(
+            lambda page: _render_html_preview(page, html_content, width, height)
+        )
+        
+        # CRITICAL: Validate screenshot is not blank/white/logo-only
+        if is_image_blank_or_white(screenshot_bytes):
+            logger.error("  ❌ Screenshot validation failed - image appears blank/white")
+            return None
+        
+        # Resize to thumbnail size using PIL
+        from PIL import Image
+        
+        img = Image.open(BytesIO(screenshot_bytes))
+        img.thumbnail((THUMBNAIL_MAX_WIDTH, THUMBNAIL_MAX_HEIGHT), Image.Resampling.LANCZOS)
+        
+        # Save as PNG
+        output = BytesIO()
+        img.save(output, format='PNG', optimize=True)
+        
+        logger.info(f"  ✅ Generated HTML preview: {img.size}")
+        
+        return output.getvalue()
+        
     except ImportError:
         logger.error("Playwright not installed. Install with: pip install playwright && playwright install chromium")
         return None
@@ -0,0 +1,295 @@
+"""
+Recording Pipeline - post-call transcription in silence-split segments
+
+process_recording_async used to send the whole recording as one
+transcription request (transcribe_recording_with_whisper), after ffmpeg had
+written a full-length WAV copy. Time-to-summary grew with call length. Now:
+
+1. decode  - ffmpeg streams 16kHz mono PCM through a pipe. Without ffmpeg, a
+             16-bit PCM WAV is read with the wave module and downmixed with numpy
+2. split   - the PCM is cut at pauses into RECORDING_SEGMENT_MIN_SEC..MAX_SEC
+             segments; each one is written to its own small WAV as soon as it ends
+3. STT     - every segment goes to a RECORDING_STT_WORKERS thread pool the moment
+             it is written, so decoding and transcription overlap
+4. stitch  - segment transcripts are joined in recording order
+
+Segments without speech are dropped (Whisper invents text for silence). If the
+recording cannot be decoded or has no speech above RECORDING_SILENCE_DBFS, it
+goes through transcribe_recording_with_whisper as one file, as before.
+"""
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from server.config import (
+    RECORDING_CHUNKED_STT,
+    RECORDING_SEGMENT_MAX_SEC,
+    RECORDING_SEGMENT_MIN_SEC,
+    RECORDING_SILENCE_DBFS,
+    RECORDING_SILENCE_MIN_MS,
+    RECORDING_STT_WORKERS,
+)
+from server.services.lead_extraction_service import transcribe_audio_with_openai, transcribe_recording_with_whisper
+
+logger = logging.getLogger(__name__)
+
+STT_SAMPLE_RATE = 16000  # what ffmpeg decodes to - the rate the STT models work at
+FRAME_MS = 20  # loudness is measured per 20ms frame
+MIN_VOICED_MS = 300  # segments with less speech than this are not transcribed
+READ_CHUNK_SEC = 1  # PCM read per step (≈32KB at 16kHz)
+
+
+class AudioDecodeError(Exception):
+    """The recording could not be decoded to PCM"""
+
+
+@dataclass
+class Segment:
+    index: int
+    path: str
+    start_sec: float
+    end_sec: float
+    voiced_sec: float
+
+
+# ─── Decode ───────────────────────────────────────────────
+
+def pcm_stream(audio_path: str) -> Tuple[int, Iterator[bytes]]:
+    """(sample_rate, mono signed 16-bit little-endian PCM chunks) for any recording"""
+    if shutil.which('ffmpeg'):
+        return STT_SAMPLE_RATE, _ffmpeg_pcm(audio_path)
+    try:
+        wav = wave.open(audio_path, 'rb')
+    except (wave.Error, EOFError) as e:
+        raise AudioDecodeError(f"no ffmpeg and not a PCM WAV: {e}")
+    if wav.getsampwidth() != 2:
+        wav.close()
+        raise AudioDecodeError(f"no ffmpeg and {wav.getsampwidth() * 8}-bit WAV")
+    return wav.getframerate(), _wave_pcm(wav)
+
+
+def _ffmpeg_pcm(audio_path: str) -> Iterator[bytes]:
+    process = subprocess.Popen(
+        ['ffmpeg', '-nostdin', '-v', 'error', '-i', audio_path,
+         '-ac', '1', '-ar', str(STT_SAMPLE_RATE), '-f', 's16le', '-'],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+    produced = 0
+    try:
+        while True:
+            chunk = process.stdout.read(STT_SAMPLE_RATE * 2 * READ_CHUNK_SEC)
+            if not chunk:
+                break
+            produced += len(chunk)
+            yield chunk
+    finally:
+        process.stdout.close()
+        if process.poll() is None:
+            process.kill()
+        returncode = process.wait()
+    if returncode != 0:
+        if not produced:
+            raise AudioDecodeError(f"ffmpeg exited with {returncode}")
+        logger.warning(f"[OFFLINE_STT] ffmpeg exited with {returncode} after {produced} bytes - using what was decoded")
+
+
+def _wave_pcm(wav) -> Iterator[bytes]:
+    channels = wav.getnchannels()
+    frames_per_read = wav.getframerate() * READ_CHUNK_SEC
+    try:
+        while True:
+            data = wav.readframes(frames_per_read)
+            if not data:
+                return
+            if channels > 1:  # dual-channel recordings: customer and agent on separate tracks
+                samples = np.frombuffer(data, dtype='<i2').reshape(-1, channels)
+                data = samples.mean(axis=1).astype('<i2').tobytes()
+            yield data
+    finally:
+        wav.close()
+
+
+# ─── Split ────────────────────────────────────────────────
+
+class _SegmentWriter:
+    """The segment being written: a mono 16-bit WAV in out_dir"""
+
+    def __init__(self, out_dir: str, index: int, sample_rate: int, start_frame: int):
+        self.path = os.path.join(out_dir, f"segment_{index:04d}.wav")
+        self.index = index
+        self.sample_rate = sample_rate
+        self.start_frame = start_frame
+        self.frames = 0
+        self.voiced = 0
+        self.silence_run = 0
+        self._wav = wave.open(self.path, 'wb')
+        self._wav.setnchannels(1)
+        self._wav.setsampwidth(2)
+        self._wav.setframerate(sample_rate)
+
+    def write(self, pcm: bytes) -> None:
+        self._wav.writeframes(pcm)
+
+    def close(self) -> Optional[Segment]:
+        """The finished Segment, or None (file removed) when it has no speech"""
+        self._wav.close()
+        if self.voiced * FRAME_MS < MIN_VOICED_MS:
+            os.unlink(self.path)
+            return None
+        return Segment(index=self.index, path=self.path,
+                       start_sec=self.start_frame * FRAME_MS / 1000,
+                       end_sec=(self.start_frame + self.frames) * FRAME_MS / 1000,
+                       voiced_sec=self.voiced * FRAME_MS / 1000)
+
+
+def split_on_silence(sample_rate: int, chunks: Iterable[bytes], out_dir: str,
+                     min_sec: float = RECORDING_SEGMENT_MIN_SEC,
+                     max_sec: float = RECORDING_SEGMENT_MAX_SEC,
+                     silence_ms: int = RECORDING_SILENCE_MIN_MS,
+                     silence_dbfs: float = RECORDING_SILENCE_DBFS) -> Iterator[Segment]:
+    """
+    Cut mono 16-bit PCM into WAV segments, yielding each one as soon as it ends
+
+    A segment ends at the first pause of silence_ms once it is min_sec long,
+    or at max_sec regardless. Only one segment is in memory/open at a time.
+    """
+    frame_samples = max(1, sample_rate * FRAME_MS // 1000)
+    frame_bytes = frame_samples * 2
+    min_frames = max(1, int(min_sec * 1000 / FRAME_MS))
+    max_frames = max(min_frames, int(max_sec * 1000 / FRAME_MS))
+    silence_frames = max(1, silence_ms // FRAME_MS)
+    threshold = 32768.0 * 10 ** (silence_dbfs / 20)
+
+    index, position = 0, 0
+    segment = _SegmentWriter(out_dir, index, sample_rate, position)
+    pending = b''
+    for chunk in chunks:
+        data = pending + chunk
+        usable = len(data) - len(data) % frame_bytes
+        pending = data[usable:]
+        if not usable:
+            continue
+        samples = np.frombuffer(data, dtype='<i2', count=usable // 2).reshape(-1, frame_samples)
+        rms = np.sqrt(np.mean(np.square(samples, dtype=np.float64), axis=1))
+
+        written = 0
+        for frame, loudness in enumerate(rms.tolist()):
+            segment.frames += 1
+            if loudness < threshold:
+                segment.silence_run += 1
+            else:
+                segment.silence_run = 0
+                segment.voiced += 1
+            if (segment.frames >= min_frames and segment.silence_run >= silence_frames) or segment.frames >= max_frames:
+                segment.write(data[written * frame_bytes:(frame + 1) * frame_bytes])
+                written = frame + 1
+                position += segment.frames
+                finished = segment.close()
+                if finished:
+                    yield finished
+                index += 1
+                segment = _SegmentWriter(out_dir, index, sample_rate, position)
+        segment.write(data[written * frame_bytes:usable])
+
+    if pending:
+        segment.write(pending[:len(pending) - len(pending) % 2])
+    finished = segment.close()
+    if finished:
+        yield finished
+
+
+# ─── Transcribe ───────────────────────────────────────────
+
+def _transcribe_segment(transcribe_fn: Callable[[str], Optional[str]], segment: Segment, retries: int) -> Optional[str]:
+    for attempt in range(retries + 1):
+        try:
+            text = transcribe_fn(segment.path)
+        except Exception as e:
+            logger.warning(f"[OFFLINE_STT] Segment {segment.index} attempt {attempt + 1} failed: {e}")
+            continue
+        if text is not None:
+            return text
+    return None
+
+
+def transcribe_segments(segments: Iterable[Segment], transcribe_fn: Callable[[str], Optional[str]],
+                        workers: int = RECORDING_STT_WORKERS, retries: int = 1) -> Optional[str]:
+    """
+    Transcribe segments while they are still being produced, stitch the texts in order
+
+    Returns None if any segment fails after `retries` more attempts - a
+    transcript with a hole in it is worse than the realtime fallback.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='recording-stt') as pool:
+        futures = [pool.submit(_transcribe_segment, transcribe_fn, segment, retries) for segment in segments]
+        texts: List[str] = []
+        for index, future in enumerate(futures):
+            text = future.result()
+            if text is None:
+                logger.error(f"[OFFLINE_STT] Segment {index} could not be transcribed - dropping the chunked transcript")
+                for pending in futures[index + 1:]:
+                    pending.cancel()
+                return None
+            texts.append(text.strip())
+    return ' '.join(text for text in texts if text)
+
+
+def transcribe_recording_chunked(audio_path: str, call_sid: str,
+                                 transcribe_fn: Optional[Callable[[str], Optional[str]]] = None,
+                                 workers: int = RECORDING_STT_WORKERS) -> Optional[str]:
+    """
+    Full-recording transcript via the segment pipeline (drop-in for transcribe_recording_with_whisper)
+
+    transcribe_fn(segment_path) -> text is the STT backend; default is
+    transcribe_audio_with_openai (GPT-4o transcribe, whisper-1 fallback).
+    """
+    if not RECORDING_CHUNKED_STT:
+        return transcribe_recording_with_whisper(audio_path, call_sid)
+    if not audio_path or not os.path.exists(audio_path):
+        logger.error(f"[OFFLINE_STT] Audio file not found: {audio_path}")
+        return None
+    if transcribe_fn is None:
+        transcribe_fn = lambda path: transcribe_audio_with_openai(path, call_sid)  # noqa: E731
+
+    started = time.monotonic()
+    segments: List[Segment] = []
+
+    def produced(stream: Iterable[Segment]) -> Iterator[Segment]:
+        for segment in stream:
+            segments.append(segment)
+            yield segment
+
+    with tempfile.TemporaryDirectory(prefix=f"stt-{call_sid}-") as work_dir:
+        try:
+            sample_rate, chunks = pcm_stream(audio_path)
+            transcript = transcribe_segments(
+                produced(split_on_silence(sample_rate, chunks, work_dir)), transcribe_fn, workers
+            )
+        except AudioDecodeError as e:
+            if segments:
+                logger.error(f"[OFFLINE_STT] Decoding {call_sid} failed after {len(segments)} segments: {e}")
+                return None
+            logger.warning(f"[OFFLINE_STT] Cannot split {call_sid} ({e}) - transcribing as one file")
+            return transcribe_recording_with_whisper(audio_path, call_sid)
+
+    if not segments:
+        logger.warning(f"[OFFLINE_STT] No speech found in {call_sid} - transcribing as one file")
+        return transcribe_recording_with_whisper(audio_path, call_sid)
+
+    audio_sec = segments[-1].end_sec
+    elapsed = time.monotonic() - started
+    logger.info(
+        f"[OFFLINE_STT] {call_sid}: {len(segments)} segments, {audio_sec:.0f}s audio, "
+        f"{sum(s.voiced_sec for s in segments):.0f}s speech, transcribed in {elapsed:.1f}s "
+        f"({len(transcript or '')} chars)"
+    )
+    return transcript
@@ -10,6 +10,7 @@ import requests
 import time
 import fcntl
 from typing import Optional, Set, Dict
+from server.config import RECORDING_DOWNLOAD_CHUNK_BYTES
 from server.models_sql import CallLog
 from flask import current_app, has_app_context
 import threading
@@ -230,41 +231,33 @@ def get_recording_file_for_call(call_log: CallLog) -> Optional[str]:
             
             # ✅ Use EXACT same logic as UI (routes_calls.py download_recording)
             # This is the single source of truth for downloading recordings
+            # 3. Stream straight to local disk (no full copy in memory)
             try:
-                recording_content = _download_from_twilio(
+                bytes_written = _download_from_twilio(
                     call_log.recording_url,
                     account_sid,
                     auth_token,
-                    call_sid
+                    call_sid,
+                    local_path
                 )
             except Exception as e:
                 log.error(f"[RECORDING_SERVICE] Exception during Twilio download for {call_sid}: {e}")
                 return None
             
-            if not recording_content:
+            if not bytes_written:
                 log.error(f"[RECORDING_SERVICE] Failed to download recording for {call_sid}")
                 _record_failure(call_sid)  # 🔥 CIRCUIT_BREAKER: Record failure
                 return None
             
-            # 3. Save to local disk
-            try:
-                with open(local_path, "wb") as f:
-                    f.write(recording_content)
-                
-                download_time = time.time() - download_start
-                log.info(f"[RECORDING_SERVICE] ✅ Recording saved: {local_path} ({len(recording_content)} bytes) - took {download_time:.2f}s")
-                
-                if download_time > 10:
-                    log.warning(f"[RECORDING_SERVICE] ⚠️  Slow download detected ({download_time:.2f}s) - consider pre-downloading in webhook/worker to avoid 502")
-                
-                download_success = True  # 🔥 FIX: Mark successful download
-                _record_success(call_sid)  # 🔥 CIRCUIT_BREAKER: Record success, reset failures
-                return local_path
-                
-            except Exception as e:
-                log.error(f"[RECORDING_SERVICE] Failed to save recording to disk: {e}")
-                _record_failure(call_sid)  # 🔥 CIRCUIT_BREAKER: Record failure
-                return None
+            download_time = time.time() - download_start
+            log.info(f"[RECORDING_SERVICE] ✅ Recording saved: {local_path} ({bytes_written} bytes) - took {download_time:.2f}s")
+            
+            if download_time > 10:
+                log.warning(f"[RECORDING_SERVICE] ⚠️  Slow download detected ({download_time:.2f}s) - consider pre-downloading in webhook/worker to avoid 502")
+            
+            download_success = True  # 🔥 FIX: Mark successful download
+            _record_success(call_sid)  # 🔥 CIRCUIT_BREAKER: Record success, reset failures
+            return local_path
         
         finally:
             # Always release file lock and cleanup
@@ -289,7 +282,7 @@ def get_recording_file_for_call(call_log: CallLog) -> Optional[str]:
             mark_download_finished(call_sid)
 
 
-def _download_from_twilio(recording_url: str, account_sid: str, auth_token: str, call_sid: str) -> Optional[bytes]:
+def _download_from_twilio(recording_url: str, account_sid: str, auth_token: str, call_sid: str, dest_path: str) -> int:
     """
     ✅ BUILD 342: Download recording in best quality format
     Priority: Dual-channel WAV > Mono WAV > MP3
@@ -304,21 +297,24 @@ def _download_from_twilio(recording_url: str, account_sid: str, auth_token: str,
         account_sid: Twilio account SID
         auth_token: Twilio auth token
         call_sid: Call SID for logging
+        dest_path: File to write the recording to. The body is streamed in
+            RECORDING_DOWNLOAD_CHUNK_BYTES chunks to dest_path + '.part' and
+            renamed into place once complete, so readers never see half a file
         
     Returns:
-        bytes: Recording content, or None if failed
+        int: Bytes written to dest_path, or 0 if failed
     """
     try:
         # 🔥 FIX 502: Validate inputs before attempting download
         if not recording_url:
             log.error(f"[RECORDING_SERVICE] Missing recording_url for call_sid={call_sid}")
-            return None
+            return 0
         if not account_sid:
             log.error(f"[RECORDING_SERVICE] Missing TWILIO_ACCOUNT_SID for call_sid={call_sid}")
-            return None
+            return 0
         if not auth_token:
             log.error(f"[RECORDING_SERVICE] Missing TWILIO_AUTH_TOKEN for call_sid={call_sid}")
-            return None
+            return 0
         
         # Handle .json URLs from Twilio properly (same as UI)
         base_url = recording_url
@@ -346,38 +342,43 @@ def _download_from_twilio(recording_url: str, account_sid: str, auth_token: str,
                 log.debug(f"[RECORDING_SERVICE] Trying format {attempt}/{len(urls_to_try)}: {format_desc}")
                 log.debug(f"[RECORDING_SERVICE] URL: {try_url[:80]}...")
                 
-                # 🔥 FIX 502: Add timeout to prevent hanging requests
-                response = requests.get(try_url, auth=auth, timeout=30)
-                
-                log.debug(f"[RECORDING_SERVICE] Status: {response.status_code}, bytes: {len(response.content)}")
-                
-                # Check for 404 - might need to wait for Twilio processing
-                if response.status_code == 404:
-                    # 🔥 PERFORMANCE FIX: Reduce wait time from 5s to 2s
-                    if attempt == 1:
-                        log.debug("[RECORDING_SERVICE] Got 404, waiting 2s before next format...")
-                        time.sleep(2)
-                    continue
-                
-                # 🔥 FIX 502: Handle other error codes explicitly
-                if response.status_code == 401:
-                    log.error(f"[RECORDING_SERVICE] Authentication failed (401) for {call_sid}")
-                    return None
-                elif response.status_code == 403:
-                    log.error(f"[RECORDING_SERVICE] Access forbidden (403) for {call_sid}")
-                    return None
-                elif response.status_code >= 500:
-                    log.warning(f"[RECORDING_SERVICE] Twilio server error ({response.status_code}) for {call_sid}")
-                    if attempt < len(urls_to_try):
-                        continue  # Try next format
-                    return None
+                # 🔥 FIX 502: Add timeout to prevent hanging requests (connect + per-read, not whole body)
+                with requests.get(try_url, auth=auth, timeout=30, stream=True) as response:
+                    log.debug(f"[RECORDING_SERVICE] Status: {response.status_code}")
+                    
+                    # Check for 404 - might need to wait for Twilio processing
+                    if response.status_code == 404:
+                        # 🔥 PERFORMANCE FIX: Reduce wait time from 5s to 2s
+                        if attempt == 1:
+                            log.debug("[RECORDING_SERVICE] Got 404, waiting 2s before next format...")
+                            time.sleep(2)
+                        continue
+                    
+                    # 🔥 FIX 502: Handle other error codes explicitly
+                    if response.status_code == 401:
+                        log.error(f"[RECORDING_SERVICE] Authentication failed (401) for {call_sid}")
+                        return 0
+                    elif response.status_code == 403:
+                        log.error(f"[RECORDING_SERVICE] Access forbidden (403) for {call_sid}")
+                        return 0
+                    elif response.status_code >= 500:
+                        log.warning(f"[RECORDING_SERVICE] Twilio server error ({response.status_code}) for {call_sid}")
+                        if attempt < len(urls_to_try):
+                            continue  # Try next format
+                        return 0
+                    
+                    if response.status_code != 200:
+                        log.debug(f"[RECORDING_SERVICE] URL returned {response.status_code}")
+                        continue
+                    
+                    bytes_written = _stream_to_file(response, dest_path)
                 
                 # Success!
-                if response.status_code == 200 and len(response.content) > 1000:
-                    log.info(f"[RECORDING_SERVICE] ✅ Successfully downloaded {len(response.content)} bytes using {format_desc}")
-                    return response.content
-                else:
-                    log.debug(f"[RECORDING_SERVICE] URL returned {response.status_code} or too small ({len(response.content)} bytes)")
+                if bytes_written > 1000:
+                    log.info(f"[RECORDING_SERVICE] ✅ Successfully downloaded {bytes_written} bytes using {format_desc}")
+                    return bytes_written
+                log.debug(f"[RECORDING_SERVICE] URL returned too small a file ({bytes_written} bytes)")
+                os.remove(dest_path)
                     
             except requests.Timeout as e:
                 log.warning(f"[RECORDING_SERVICE] Timeout downloading from Twilio for {call_sid}: {e}")
@@ -394,11 +395,31 @@ def _download_from_twilio(recording_url: str, account_sid: str, auth_token: str,
         
         # All attempts failed
         log.error(f"[RECORDING_SERVICE] All download attempts failed for {call_sid}. Last error: {last_error}")
-        return None
+        return 0
         
     except Exception as e:
         log.error(f"[RECORDING_SERVICE] Download error for {call_sid}: {e}")
-        return None
+        return 0
+
+
+def _stream_to_file(response, dest_path: str) -> int:
+    """Write a streamed response body to dest_path via a .part file -> bytes written"""
+    part_path = f"{dest_path}.part"
+    bytes_written = 0
+    try:
+        with open(part_path, "wb") as f:
+            for chunk in response.iter_content(chunk_size=RECORDING_DOWNLOAD_CHUNK_BYTES):
+                if chunk:
+                    f.write(chunk)
+                    bytes_written += len(chunk)
+        os.replace(part_path, dest_path)
+    except BaseException:
+        try:
+            os.remove(part_path)
+        except OSError:
+            pass
+        raise
+    return bytes_written
 
 
 def check_local_recording_exists(call_sid: str) -> bool:
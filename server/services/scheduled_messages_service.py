@@ -722,6 +722,7 @@ def create_scheduled_tasks_for_lead(rule_id: int, lead_id: int, triggered_at: Op
     # Use provided triggered_at or default to now
     now = triggered_at if triggered_at is not None else get_israel_now()
     created_count = 0
+    due_entries = []  # (message_id, scheduled_for) for the scheduler due index
     
     # Helper function to check if a date falls on an active weekday
     def is_active_on_weekday(scheduled_datetime: datetime, active_weekdays: list) -> bool:
@@ -805,6 +806,7 @@ def create_scheduled_tasks_for_lead(rule_id: int, lead_id: int, triggered_at: Op
                 db.session.add(queue_entry)
                 db.session.flush()
                 created_count += 1
+                due_entries.append((queue_entry.id, queue_entry.scheduled_for))
                 logger.info(f"[SCHEDULED-MSG] Scheduled immediate message {queue_entry.id} for lead {lead_id}")
 
             except Exception as e:
@@ -863,6 +865,7 @@ def create_scheduled_tasks_for_lead(rule_id: int, lead_id: int, triggered_at: Op
             db.session.add(queue_entry)
             db.session.flush()
             created_count += 1
+            due_entries.append((queue_entry.id, queue_entry.scheduled_for))
             logger.info(f"[SCHEDULED-MSG] Scheduled step {step.id} message {queue_entry.id} for lead {lead_id}, send at {scheduled_for}")
             
         except Exception as e:
@@ -876,6 +879,11 @@ def create_scheduled_tasks_for_lead(rule_id: int, lead_id: int, triggered_at: Op
     if created_count > 0:
         db.session.commit()
         logger.info(f"[SCHEDULED-MSG] Created {created_count} scheduled task(s) for lead {lead_id}, rule {rule_id}")
+        
+        # Register due times so the scheduler fires them on time (after commit - the
+        # dispatcher must see the rows)
+        from server.services.due_scheduler import schedule_scheduled_messages
+        schedule_scheduled_messages(due_entries)
     
     return created_count
 
@@ -960,7 +968,7 @@ def render_message_template(
     return rendered
 
 
-def claim_pending_messages(batch_size: int = 50) -> List[ScheduledMessagesQueue]:
+def claim_pending_messages(batch_size: int = 50, message_ids: Optional[List[int]] = None) -> List[ScheduledMessagesQueue]:
     """
     Claim pending messages that are ready to send (atomic operation).
     
@@ -969,6 +977,7 @@ def claim_pending_messages(batch_size: int = 50) -> List[ScheduledMessagesQueue]
     
     Args:
         batch_size: Maximum number of messages to claim
+        message_ids: Only claim these messages (due-index dispatch); None → any due message
     
     Returns:
         List of claimed ScheduledMessagesQueue entries (filtered by weekday rules)
@@ -985,17 +994,24 @@ def claim_pending_messages(batch_size: int = 50) -> List[ScheduledMessagesQueue]
             WHERE status = 'pending'
               AND scheduled_for <= :now
               AND locked_at IS NULL
+              {ids_filter}
             ORDER BY scheduled_for ASC
             LIMIT :batch_size
             FOR UPDATE SKIP LOCKED
         )
         RETURNING id
-    """)
+    """.format(ids_filter="AND id = ANY(:message_ids)" if message_ids is not None else ""))
     
-    result = db.session.execute(query, {
+    params = {
         'now': now,
         'batch_size': batch_size
-    })
+    }
+    if message_ids is not None:
+        if not message_ids:
+            return []
+        params['message_ids'] = list(message_ids)
+    
+    result = db.session.execute(query, params)
     
     claimed_ids = [row[0] for row in result]
     
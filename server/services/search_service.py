@@ -0,0 +1,411 @@
+"""
+Search Service - ranked, index-backed search for leads, calls and WhatsApp
+Used by /api/search (routes_search.py) and the lead list filters (routes_leads.py)
+
+The previous implementation OR'd ilike('%q%') over raw columns, which Postgres
+can only answer with a sequential scan per keystroke. Here every match runs
+against an expression that has a matching GIN index in db_indexes.py:
+
+- Names / emails: Hebrew-normalized text + pg_trgm (LIKE '%q%' and fuzzy `<%`)
+- Phone numbers: digits-only expression + pg_trgm, IL-aware (050… / +972… / suffix)
+- Notes, call summaries, WhatsApp bodies: to_tsvector('simple', …) prefix queries
+
+⚠️ The *_sql() builders below are the single source of the indexed expressions.
+The index definitions in db_indexes.py must contain them verbatim, otherwise the
+planner will not use the index (tests/test_search_service.py checks this).
+
+Results are ranked (phone suffix > name prefix > similarity) and paged with an
+opaque (score, id) keyset cursor; related rows are loaded in one batch per page.
+"""
+import base64
+import json
+import logging
+import re
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Numeric, and_, case, cast, func, literal, literal_column, or_, select
+
+from server.db import db
+from server.models_sql import CallLog, Lead, WhatsAppConversation, WhatsAppMessage
+
+log = logging.getLogger(__name__)
+
+MAX_QUERY_LENGTH = 100
+MIN_FUZZY_LENGTH = 3       # pg_trgm needs at least one full trigram
+MIN_PHONE_DIGITS = 3
+FULL_NATIONAL_DIGITS = 8   # IL national numbers are 8-9 digits without the leading 0
+IL_COUNTRY_CODE = "972"
+TS_CONFIG = "simple"       # Postgres has no Hebrew dictionary - exact token/prefix match
+
+_NIQQUD_RE = re.compile("[\u0591-\u05C7]")
+_HEBREW_FINALS = str.maketrans("ךםןףץ", "כמנפצ", "׳״")
+_PHONE_INPUT_RE = re.compile(r"^[\d\s+\-().]+$")
+_NON_DIGIT_RE = re.compile(r"\D")
+_TOKEN_RE = re.compile(r"[^\W_]+")
+_CALL_SID_RE = re.compile(r"^CA[0-9a-fA-F]{6,32}$")
+
+
+# ============================================================================
+# Normalization
+# ============================================================================
+
+def normalize_search_text(text: Optional[str]) -> str:
+    """
+    Python mirror of sql_normalized(): lowercase, strip niqqud/cantillation,
+    fold final letters (ך→כ, ם→מ, ן→נ, ף→פ, ץ→צ) and drop geresh/gershayim
+    """
+    if not text:
+        return ""
+    text = _NIQQUD_RE.sub("", text.lower()).translate(_HEBREW_FINALS)
+    return " ".join(text.split())
+
+
+def phone_search_digits(raw: Optional[str]) -> Tuple[str, ...]:
+    """
+    Digit patterns to look for inside stored phone numbers
+
+    - "050-123-4567" / "+972 50 1234567" → national part, matches both
+      "+972501234567" and "0501234567" storage
+    - "075" (partial local prefix) → "075" or "97275"
+    - "4567" (suffix) → "4567"
+    """
+    digits = _NON_DIGIT_RE.sub("", raw or "")
+    if digits.startswith("00"):
+        digits = digits[2:]
+    if digits.startswith(IL_COUNTRY_CODE):
+        national = digits[len(IL_COUNTRY_CODE):]
+        return (national,) if len(national) >= FULL_NATIONAL_DIGITS else (digits,)
+    if digits.startswith("0"):
+        national = digits[1:]
+        if len(national) >= FULL_NATIONAL_DIGITS:
+            return (national,)
+        return (digits, IL_COUNTRY_CODE + national) if national else (digits,)
+    return (digits,) if digits else ()
+
+
+@dataclass(frozen=True)
+class SearchTerms:
+    """A parsed /api/search query"""
+    raw: str
+    text: str                  # normalized free text
+    phones: Tuple[str, ...]    # digit patterns (empty when the query is not phone-like)
+    tsquery: str               # prefix tsquery over the normalized tokens ('' if none)
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.text or self.phones)
+
+
+def parse_search_query(query: Optional[str]) -> SearchTerms:
+    raw = (query or "").strip()[:MAX_QUERY_LENGTH]
+    text = normalize_search_text(raw)
+    phones: Tuple[str, ...] = ()
+    if _PHONE_INPUT_RE.match(raw) and len(_NON_DIGIT_RE.sub("", raw)) >= MIN_PHONE_DIGITS:
+        phones = phone_search_digits(raw)
+    tsquery = " & ".join(f"{token}:*" for token in _TOKEN_RE.findall(text))
+    return SearchTerms(raw=raw, text=text, phones=phones, tsquery=tsquery)
+
+
+def escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+# ============================================================================
+# Indexed SQL expressions (must match db_indexes.py verbatim)
+# ============================================================================
+
+def _col(table: Optional[str], column: str) -> str:
+    return f"{table}.{column}" if table else column
+
+
+def sql_normalized(expr: str) -> str:
+    return f"translate(regexp_replace(lower({expr}), '[\\u0591-\\u05C7]', '', 'g'), 'ךםןףץ׳״', 'כמנפצ')"
+
+
+def sql_digits(column: str) -> str:
+    return f"regexp_replace(coalesce({column}, ''), '[^0-9]', '', 'g')"
+
+
+def sql_tsvector(column: str) -> str:
+    normalized = sql_normalized(f"coalesce({column}, '')")
+    return f"to_tsvector('{TS_CONFIG}', {normalized})"
+
+
+def lead_name_sql(table: Optional[str] = "leads") -> str:
+    parts = " || ' ' || ".join(
+        f"coalesce({_col(table, c)}, '')" for c in ("first_name", "last_name", "name")
+    )
+    return sql_normalized(parts)
+
+
+def lead_email_sql(table: Optional[str] = "leads") -> str:
+    return f"lower(coalesce({_col(table, 'email')}, ''))"
+
+
+def lead_phone_sql(table: Optional[str] = "leads") -> str:
+    return sql_digits(_col(table, "phone_e164"))
+
+
+def lead_notes_tsv_sql(table: Optional[str] = "leads") -> str:
+    return sql_tsvector(_col(table, "notes"))
+
+
+def call_from_sql(table: Optional[str] = "call_log") -> str:
+    return sql_digits(_col(table, "from_number"))
+
+
+def call_to_sql(table: Optional[str] = "call_log") -> str:
+    return sql_digits(_col(table, "to_number"))
+
+
+def call_summary_tsv_sql(table: Optional[str] = "call_log") -> str:
+    return sql_tsvector(_col(table, "summary"))
+
+
+def wa_conv_phone_sql(table: Optional[str] = "whatsapp_conversation") -> str:
+    return sql_digits(_col(table, "customer_number"))
+
+
+def wa_conv_name_sql(table: Optional[str] = "whatsapp_conversation") -> str:
+    return sql_normalized(f"coalesce({_col(table, 'customer_name')}, '')")
+
+
+def wa_message_tsv_sql(table: Optional[str] = "whatsapp_message") -> str:
+    return sql_tsvector(_col(table, "body"))
+
+
+# ============================================================================
+# Match / rank building blocks
+# ============================================================================
+
+def _text_match(expr_sql: str, terms: SearchTerms, fuzzy: bool = True):
+    expr = literal_column(expr_sql)
+    pattern = escape_like(terms.text)
+    conditions = [expr.like(literal(f"%{pattern}%"))]
+    if fuzzy and len(terms.text) >= MIN_FUZZY_LENGTH:
+        conditions.append(literal(terms.text).op("<%")(expr))
+    score = case((expr.like(literal(f"{pattern}%")), 1.0), else_=0.0) + func.word_similarity(terms.text, expr)
+    return conditions, score
+
+
+def _phone_match(expr_sql: str, terms: SearchTerms):
+    expr = literal_column(expr_sql)
+    conditions = [expr.like(literal(f"%{digits}%")) for digits in terms.phones]
+    score = case(
+        *[(expr.like(literal(f"%{digits}")), 2.0) for digits in terms.phones],
+        else_=1.0,
+    )
+    return conditions, case((or_(*conditions), score), else_=0.0)
+
+
+def _fts_match(tsv_sql: str, terms: SearchTerms):
+    tsv = literal_column(tsv_sql)
+    tsq = func.to_tsquery(TS_CONFIG, terms.tsquery)
+    return [tsv.op("@@")(tsq)], func.ts_rank(tsv, tsq)
+
+
+def _combine(parts) -> Tuple[list, object]:
+    conditions, score = [], literal(0.0)
+    for part_conditions, part_score in parts:
+        conditions.extend(part_conditions)
+        score = score + part_score
+    return conditions, func.round(cast(score, Numeric), 4)
+
+
+def _ranked_select(id_column, scope, conditions, score, limit: int, cursor=None):
+    """SELECT id, score of matching rows ordered by (score, id) DESC after `cursor`"""
+    ranked = (
+        select(id_column.label("id"), score.label("score"))
+        .where(*scope, or_(*conditions))
+        .subquery("ranked")
+    )
+    stmt = select(ranked.c.id, ranked.c.score)
+    if cursor is not None:
+        cursor_score, cursor_id = cursor
+        stmt = stmt.where(or_(
+            ranked.c.score < cursor_score,
+            and_(ranked.c.score == cursor_score, ranked.c.id < cursor_id),
+        ))
+    return stmt.order_by(ranked.c.score.desc(), ranked.c.id.desc()).limit(limit + 1)
+
+
+def _match_parts(terms: SearchTerms, text=(), phones=(), fts=(), fuzzy=True):
+    parts = []
+    if terms.text:
+        parts.extend(_text_match(expr, terms, fuzzy=fuzzy) for expr in text)
+    if terms.phones:
+        parts.extend(_phone_match(expr, terms) for expr in phones)
+    if terms.tsquery:
+        parts.extend(_fts_match(expr, terms) for expr in fts)
+    return parts
+
+
+# ============================================================================
+# Keyset cursor
+# ============================================================================
+
+def encode_cursor(score, row_id: int) -> str:
+    payload = json.dumps([str(score), int(row_id)], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[Decimal, int]]:
+    """Raises ValueError on a malformed cursor"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        score, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return Decimal(score), int(row_id)
+    except (ValueError, TypeError, InvalidOperation) as e:
+        raise ValueError(f"Invalid search cursor: {e}") from e
+
+
+def _page(rows, limit: int) -> Tuple[list, Optional[str]]:
+    rows = list(rows)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last.score, last.id)
+
+
+def _load_by_ids(model, ids: Sequence[int]) -> Dict[int, object]:
+    """One IN (...) query for a whole result page"""
+    if not ids:
+        return {}
+    return {obj.id: obj for obj in model.query.filter(model.id.in_(list(ids))).all()}
+
+
+# ============================================================================
+# Ranked selects (plain Core - also used by scripts/bench_search.py)
+# ============================================================================
+
+def lead_search_select(terms: SearchTerms, business_id: Optional[int], limit: int, cursor=None):
+    table = Lead.__table__
+    conditions, score = _combine(_match_parts(
+        terms,
+        text=(lead_name_sql(), lead_email_sql()),
+        phones=(lead_phone_sql(),),
+        fts=(lead_notes_tsv_sql(),),
+    ))
+    scope = [table.c.tenant_id == business_id] if business_id else []
+    return _ranked_select(table.c.id, scope, conditions, score, limit, cursor)
+
+
+def call_search_select(terms: SearchTerms, business_id: Optional[int], limit: int, cursor=None):
+    table = CallLog.__table__
+    parts = _match_parts(
+        terms,
+        phones=(call_from_sql(), call_to_sql()),
+        fts=(call_summary_tsv_sql(),),
+    )
+    if _CALL_SID_RE.match(terms.raw):
+        sid_match = table.c.call_sid == terms.raw
+        parts.append(([sid_match], case((sid_match, 3.0), else_=0.0)))
+    conditions, score = _combine(parts)
+    scope = [table.c.business_id == business_id] if business_id else []
+    return _ranked_select(table.c.id, scope, conditions, score, limit, cursor)
+
+
+def conversation_search_select(terms: SearchTerms, business_id: Optional[int], limit: int, cursor=None):
+    table = WhatsAppConversation.__table__
+    conditions, score = _combine(_match_parts(
+        terms,
+        text=(wa_conv_name_sql(),),
+        phones=(wa_conv_phone_sql(),),
+    ))
+    scope = [table.c.business_id == business_id] if business_id else []
+    return _ranked_select(table.c.id, scope, conditions, score, limit, cursor)
+
+
+def message_search_select(terms: SearchTerms, business_id: Optional[int], limit: int, cursor=None):
+    table = WhatsAppMessage.__table__
+    conditions, score = _combine(_match_parts(terms, fts=(wa_message_tsv_sql(),)))
+    scope = [table.c.business_id == business_id] if business_id else []
+    return _ranked_select(table.c.id, scope, conditions, score, limit, cursor)
+
+
+# ============================================================================
+# Public search API
+# ============================================================================
+
+def _run(select_fn, model, terms: SearchTerms, business_id, limit, cursor):
+    if terms.is_empty:
+        return [], None
+    stmt = select_fn(terms, business_id, limit, cursor)
+    if stmt is None:
+        return [], None
+    rows, next_cursor = _page(db.session.execute(stmt).all(), limit)
+    objects = _load_by_ids(model, [row.id for row in rows])
+    return [objects[row.id] for row in rows if row.id in objects], next_cursor
+
+
+def search_leads(terms: SearchTerms, business_id: Optional[int], limit: int = 5,
+                 cursor=None) -> Tuple[List[Lead], Optional[str]]:
+    """Ranked leads (name / email / phone / notes) + next-page cursor"""
+    return _run(lead_search_select, Lead, terms, business_id, limit, cursor)
+
+
+def search_calls(terms: SearchTerms, business_id: Optional[int], limit: int = 5,
+                 cursor=None) -> Tuple[List[CallLog], Optional[str]]:
+    """Ranked calls (from/to number, call SID, summary) + next-page cursor"""
+    if not (terms.phones or terms.tsquery or _CALL_SID_RE.match(terms.raw)):
+        return [], None
+    return _run(call_search_select, CallLog, terms, business_id, limit, cursor)
+
+
+def search_conversations(terms: SearchTerms, business_id: Optional[int], limit: int = 5,
+                         cursor=None) -> Tuple[List[WhatsAppConversation], Optional[str]]:
+    """Ranked WhatsApp conversations (customer number / name) + next-page cursor"""
+    return _run(conversation_search_select, WhatsAppConversation, terms, business_id, limit, cursor)
+
+
+def search_messages(terms: SearchTerms, business_id: Optional[int], limit: int = 5,
+                    cursor=None) -> Tuple[List[WhatsAppMessage], Optional[str]]:
+    """Ranked WhatsApp message bodies + next-page cursor"""
+    if not terms.tsquery:
+        return [], None
+    return _run(message_search_select, WhatsAppMessage, terms, business_id, limit, cursor)
+
+
+def load_lead_names(lead_ids) -> Dict[int, str]:
+    """Batch lookup of display names for the leads referenced by a result page"""
+    ids = {lead_id for lead_id in lead_ids if lead_id}
+    if not ids:
+        return {}
+    rows = db.session.query(Lead.id, Lead.name, Lead.first_name, Lead.last_name).filter(Lead.id.in_(ids)).all()
+    return {
+        row.id: row.name or f"{row.first_name or ''} {row.last_name or ''}".strip() or None
+        for row in rows
+    }
+
+
+def lead_search_filter(query: str):
+    """
+    Name / phone filter for lead list endpoints (drop-in for the OR'd ilike)
+
+    Same contains semantics as before (no fuzzy matching, email excluded) but on
+    the indexed expressions. Non-Postgres databases (tests) keep plain ilike.
+    Digit queries shorter than MIN_PHONE_DIGITS still match phone_e164 with a
+    plain LIKE, as the old filter did.
+    """
+    bind = db.session.get_bind()
+    if bind is None or bind.dialect.name != "postgresql":
+        search_term = f"%{query}%"
+        return or_(
+            Lead.first_name.ilike(search_term),
+            Lead.last_name.ilike(search_term),
+            Lead.name.ilike(search_term),
+            Lead.phone_e164.ilike(search_term),
+        )
+    terms = parse_search_query(query)
+    conditions, _ = _combine(_match_parts(
+        terms, text=(lead_name_sql(),), phones=(lead_phone_sql(),), fuzzy=False,
+    ))
+    digits = _NON_DIGIT_RE.sub("", terms.raw)
+    if digits and not terms.phones and _PHONE_INPUT_RE.match(terms.raw):
+        conditions.append(Lead.phone_e164.like(f"%{digits}%"))
+    return or_(*conditions) if conditions else literal(False)
@@ -0,0 +1,183 @@
+"""
+Status Catalog - compiled, versioned per-tenant view of LeadStatus
+🔥 PERFORMANCE OPTIMIZATION: one query per tenant instead of several per call-end decision
+Built on server/utils/cache.py, same as business_settings_cache.py
+
+The catalog is loaded once per tenant and holds plain StatusEntry rows (safe to
+share between requests and threads - no ORM instances) with the lookups the
+auto-status and label services need precomputed: lowercased / normalized labels,
+numbers in names and labels, label → name map. Service-specific derived data
+(status groups, families, no-answer progression) is memoized on the catalog with
+memo(), so it is computed once per catalog version and dropped with it.
+
+Invalidation: invalidate_status_catalog(business_id) after every LeadStatus
+change (routes_status_management.py, default status seeding) - broadcast to all
+processes. The TTL bounds staleness for writes that bypass those paths.
+"""
+import hashlib
+import logging
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from server.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Cache TTL in seconds (10 minutes - same as business settings cache)
+CACHE_TTL_SECONDS = 600
+
+# Maximum number of cached tenants
+MAX_CACHE_SIZE = 1000
+
+_NUMBER_RE = re.compile(r'\d+')
+
+
+def normalize_label(label: Optional[str]) -> str:
+    """Trim, collapse whitespace and lowercase (label matching form)"""
+    if not label:
+        return ""
+    return ' '.join(label.split()).lower()
+
+
+@dataclass(frozen=True)
+class StatusEntry:
+    """Immutable snapshot of one LeadStatus row plus precomputed matching forms"""
+    id: int
+    name: str
+    label: Optional[str]
+    description: Optional[str]
+    order_index: int
+    is_active: bool
+    is_default: bool
+    name_lower: str
+    label_lower: str  # "" when the status has no label
+    label_normalized: str
+    name_numbers: Tuple[int, ...]
+    label_numbers: Tuple[int, ...]
+
+    @classmethod
+    def from_row(cls, row) -> "StatusEntry":
+        name = row.name or ""
+        label_lower = row.label.lower() if row.label else ""
+        return cls(
+            id=row.id,
+            name=name,
+            label=row.label,
+            description=row.description,
+            order_index=row.order_index or 0,
+            is_active=bool(row.is_active),
+            is_default=bool(row.is_default),
+            name_lower=name.lower(),
+            label_lower=label_lower,
+            label_normalized=normalize_label(row.label),
+            name_numbers=tuple(int(n) for n in _NUMBER_RE.findall(name.lower())),
+            label_numbers=tuple(int(n) for n in _NUMBER_RE.findall(label_lower)),
+        )
+
+
+@dataclass
+class StatusCatalog:
+    """All statuses of one tenant, ordered by order_index"""
+    business_id: int
+    entries: List[StatusEntry]
+    version: str
+    active: List[StatusEntry] = field(init=False)
+    by_name: Dict[str, StatusEntry] = field(init=False)
+    active_names: frozenset = field(init=False)
+    label_to_name: Dict[str, str] = field(init=False)
+    _memo: Dict[Any, Any] = field(init=False, repr=False)
+    _memo_lock: Any = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.active = [e for e in self.entries if e.is_active]
+        self.by_name = {e.name: e for e in self.entries}
+        self.active_names = frozenset(e.name for e in self.active)
+        # Hebrew label (and its lowercase form) → status name, last active status wins
+        self.label_to_name = {}
+        for entry in self.active:
+            label = (entry.label or entry.name).strip()
+            self.label_to_name[label] = entry.name
+            self.label_to_name[label.lower()] = entry.name
+        self._memo = {}
+        self._memo_lock = threading.Lock()
+
+    def get_active(self, name: str) -> Optional[StatusEntry]:
+        """Active status by name, or None"""
+        entry = self.by_name.get(name)
+        return entry if entry is not None and entry.is_active else None
+
+    def active_dict(self) -> Dict[str, str]:
+        """{status_name: description or name} for active statuses"""
+        return {e.name: (e.description or e.name) for e in self.active}
+
+    def memo(self, key: Any, builder: Callable[[], Any]) -> Any:
+        """Value derived from this catalog version, built once"""
+        try:
+            return self._memo[key]
+        except KeyError:
+            pass
+        value = builder()
+        with self._memo_lock:
+            return self._memo.setdefault(key, value)
+
+    def recall(self, key: Any) -> Any:
+        """Value stored with memo() / remember(), or None"""
+        return self._memo.get(key)
+
+    def remember(self, key: Any, value: Any) -> None:
+        """Store a derived value computed outside memo() (e.g. an AI classification)"""
+        with self._memo_lock:
+            self._memo[key] = value
+
+
+def _version(entries: List[StatusEntry]) -> str:
+    """Fingerprint of the status rows - changes whenever anything matching reads changes"""
+    digest = hashlib.sha1()
+    for e in entries:
+        digest.update(repr((e.id, e.name, e.label, e.description, e.order_index,
+                            e.is_active, e.is_default)).encode('utf-8'))
+    return digest.hexdigest()[:12]
+
+
+def load_status_catalog(business_id: int) -> StatusCatalog:
+    """Build a tenant's catalog from the database (one query)"""
+    from server.models_sql import LeadStatus
+
+    rows = LeadStatus.query.filter_by(
+        business_id=business_id
+    ).order_by(LeadStatus.order_index, LeadStatus.id).all()
+    entries = [StatusEntry.from_row(row) for row in rows]
+    catalog = StatusCatalog(business_id=business_id, entries=entries, version=_version(entries))
+    logger.debug(f"📚 [STATUS_CATALOG] Loaded {len(entries)} statuses for business_id={business_id} "
+                 f"(version {catalog.version})")
+    return catalog
+
+
+_cache = TTLCache(ttl_seconds=CACHE_TTL_SECONDS, max_size=MAX_CACHE_SIZE, name="status_catalog")
+
+
+def get_status_catalog(business_id: int) -> StatusCatalog:
+    """Compiled status catalog for a tenant (loaded on first use, then cached)"""
+    return _cache.get_or_load(int(business_id), lambda: load_status_catalog(business_id))
+
+
+def invalidate_status_catalog(business_id: int) -> None:
+    """
+    Drop a tenant's catalog (in every process)
+
+    Call this after creating, updating, deleting or reordering statuses
+    """
+    _cache.delete(int(business_id))
+    logger.info(f"🗑️ [STATUS_CATALOG] Invalidated catalog for business_id={business_id}")
+
+
+def clear_status_catalogs() -> None:
+    """Drop every cached catalog (tests / admin)"""
+    _cache.clear()
+
+
+def status_catalog_stats() -> Dict[str, Any]:
+    """Cache statistics"""
+    return _cache.stats()
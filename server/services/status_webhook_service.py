@@ -133,16 +133,25 @@ def dispatch_lead_status_webhook(
         # In production, you might want a dedicated secret per business
         signature = generate_signature(str(business_id), payload_json)
         
-        # Send webhook asynchronously (in a real implementation, use a task queue)
         headers = {
             'Content-Type': 'application/json; charset=utf-8',
             'X-ProSaaS-Signature': signature,
             'X-ProSaaS-Event': 'lead.status_changed',
         }
         
+        # Queue in the outbox - delivery jobs send it with retries
+        from server.services.webhook_delivery import CHANNEL_STATUS, enqueue_webhook
+        outbox_id = enqueue_webhook(
+            CHANNEL_STATUS, settings.status_webhook_url, payload_json, headers,
+            'lead.status_changed', business_id=business_id
+        )
+        if outbox_id is not None:
+            log.info(f"Status webhook for lead {lead_id} queued: {old_status} → {new_status} (outbox #{outbox_id})")
+            return True
+        
         log.info(f"Sending status webhook for lead {lead_id}: {old_status} → {new_status}")
         
-        # Send with timeout and retries
+        # Fallback: outbox disabled or unavailable - send in the request
         response = requests.post(
             settings.status_webhook_url,
             data=payload_json.encode('utf-8'),
@@ -21,18 +21,32 @@ import threading
 import numpy as np
 import json
 from typing import Dict, List, Optional, Tuple
-from openai import OpenAI
+from server.services.lazy_services import lazy_module
 from server.models_sql import BusinessTopic, BusinessAISettings, db
+from server.utils.aho_corasick import KeywordAutomaton
+from server.utils.cache import TTLCache
 import logging
 
 logger = logging.getLogger(__name__)
 
+openai = lazy_module("openai")  # OpenAI SDK is imported on first use
+
 
 # Configuration
 TOPIC_CACHE_TTL_SECONDS = int(os.getenv("TOPIC_CACHE_TTL_SEC", "1800"))  # 30 minutes default
+TOPIC_CACHE_STALE_SECONDS = 300  # serve a stale index for up to 5 minutes while reloading
+TOPIC_CACHE_MAX_SIZE = 1000
 EMBEDDING_MODEL = "text-embedding-3-small"  # Fixed model, not configurable
 DEFAULT_THRESHOLD = 0.78
 DEFAULT_TOP_K = 3
+EMBEDDING_BATCH_SIZE = 256  # texts per embeddings request in classify_texts
+
+# Words ignored by the multi-keyword match
+STOP_WORDS = frozenset({"של", "את", "עם", "על", "אל", "מה", "איך", "למה", "איפה", "מתי", "אני", "אתה", "הוא", "היא", "אנחנו", "אתם", "הם"})
+
+# Keyword-layer match kinds, in the order they are checked within one topic
+_MATCH_NAME = 0
+_MATCH_SYNONYM = 1
 
 
 def _normalize_text_for_matching(text: str) -> str:
@@ -73,12 +87,97 @@ def _normalize_synonyms_list(synonyms: List[str]) -> List[str]:
     return [_normalize_text_for_matching(s) for s in synonyms if s]
 
 
+def _extract_keywords(text: str) -> set:
+    """Extract keywords from text (lowercase, split by whitespace, no stop words / single chars)"""
+    return set(w for w in text.lower().split() if w not in STOP_WORDS and len(w) > 1)
+
+
+class TopicKeywordIndex:
+    """
+    Compiled keyword/synonym layer for one business's topics
+    
+    - One Aho-Corasick automaton over every normalized topic name and synonym:
+      a single pass over the text finds all name/synonym hits
+    - Inverted index keyword → topics for the multi-keyword match
+    
+    match() returns the same topic / method / score as checking the topics one
+    by one in list order (name, then synonyms, then keywords per topic).
+    """
+    
+    def __init__(self, topics: List[Dict]):
+        self.topics = topics
+        patterns = []
+        self._targets = []  # pattern index → (topic index, match kind, synonym index)
+        self._keyword_sets = []  # topic index → its keyword set
+        self.keyword_index: Dict[str, List[int]] = {}
+        
+        for t, topic in enumerate(topics):
+            name_normalized = _normalize_text_for_matching(topic['name'])
+            patterns.append(name_normalized)
+            self._targets.append((t, _MATCH_NAME, 0))
+            
+            synonyms_normalized = topic.get('synonyms_normalized') or []
+            if synonyms_normalized and topic.get('synonyms'):
+                for i, synonym_normalized in enumerate(synonyms_normalized):
+                    patterns.append(synonym_normalized)
+                    self._targets.append((t, _MATCH_SYNONYM, i))
+            
+            keywords = _extract_keywords(name_normalized)
+            for syn in synonyms_normalized:
+                if syn:
+                    keywords.update(_extract_keywords(syn))
+            self._keyword_sets.append(keywords)
+            for keyword in keywords:
+                self.keyword_index.setdefault(keyword, []).append(t)
+        
+        self.automaton = KeywordAutomaton(patterns)  # empty names/synonyms never match
+    
+    def match(self, text_normalized: str, text_keywords: set) -> Optional[Tuple[int, str, float, float]]:
+        """
+        First matching topic for normalized text
+        
+        Returns:
+            (topic index, method, score, detail) or None - detail is the synonym
+            index for "synonym", the keyword match ratio for "multi_keyword"
+        """
+        best = None
+        for pattern in self.automaton.find(text_normalized):
+            target = self._targets[pattern]
+            if best is None or target < best:
+                best = target
+        
+        # Multi-keyword: topics sharing at least 2 keywords with the text, covering >= 50% of theirs
+        limit = best[0] if best is not None else len(self.topics)
+        counts: Dict[int, int] = {}
+        for keyword in text_keywords:
+            for t in self.keyword_index.get(keyword, ()):
+                if t < limit:
+                    counts[t] = counts.get(t, 0) + 1
+        for t in sorted(counts):
+            if counts[t] >= 2 and counts[t] / len(self._keyword_sets[t]) >= 0.5:
+                match_ratio = counts[t] / len(self._keyword_sets[t])
+                return t, "multi_keyword", 0.85 + (match_ratio * 0.05), match_ratio
+        
+        if best is None:
+            return None
+        t, kind, i = best
+        if kind == _MATCH_NAME:
+            return t, "keyword", 0.95, 0
+        return t, "synonym", 0.93, i
+    
+    def matching_keywords(self, t: int, text_keywords: set) -> set:
+        """Keywords of topic t present in the text (for logging)"""
+        return text_keywords & self._keyword_sets[t]
+
+
 class TopicCacheEntry:
     """Single business topic cache entry"""
     def __init__(self, business_id: int, topics: List[Dict], embeddings: np.ndarray):
         self.business_id = business_id
         self.topics = topics  # List of {id, name, synonyms, keywords}
         self.embeddings = embeddings  # 2D numpy array [n_topics, embedding_dim]
+        self.embedding_norms = np.linalg.norm(embeddings, axis=1) if embeddings.ndim == 2 else None
+        self.keyword_index = TopicKeywordIndex(topics)  # compiled once per index load
         self.timestamp = time.time()
     
     def is_expired(self) -> bool:
@@ -96,10 +195,20 @@ class TopicClassifier:
             with cls._lock:
                 if cls._instance is None:
                     cls._instance = super().__new__(cls)
-                    cls._instance._cache = {}
-                    cls._instance._cache_lock = threading.Lock()
-                    cls._instance._client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+                    # Stale entries are served while the index reloads in the background
+                    cls._instance._cache = TTLCache(
+                        ttl_seconds=TOPIC_CACHE_TTL_SECONDS, max_size=TOPIC_CACHE_MAX_SIZE,
+                        name="topics", stale_seconds=TOPIC_CACHE_STALE_SECONDS
+                    )
+                    cls._instance._openai_client = None
         return cls._instance
+
+    @property
+    def _client(self):
+        """OpenAI client, created on the first embedding request (keeps the SDK out of boot)"""
+        if self._openai_client is None:
+            self._openai_client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        return self._openai_client
     
     def _generate_embeddings(self, texts: List[str]) -> np.ndarray:
         """Generate embeddings for list of texts using OpenAI API"""
@@ -118,88 +227,53 @@ class TopicClassifier:
     
     def _extract_keywords(self, text: str) -> set:
         """Extract keywords from text (lowercase, split by whitespace)"""
-        # Remove common stop words
-        stop_words = {"של", "את", "עם", "על", "אל", "מה", "איך", "למה", "איפה", "מתי", "אני", "אתה", "הוא", "היא", "אנחנו", "אתם", "הם"}
-        words = text.lower().split()
-        return set(w for w in words if w not in stop_words and len(w) > 1)
+        return _extract_keywords(text)
     
-    def _keyword_match(self, text: str, topics: List[Dict]) -> Optional[Dict]:
+    def _keyword_match(self, text: str, topics: List[Dict], index: Optional[TopicKeywordIndex] = None) -> Optional[Dict]:
         """
         LAYER 1: Fast keyword/synonym matching (free, instant)
         Returns topic with high confidence if exact match found.
         
         Uses normalized text (niqqud/punctuation removed, lowercase) for matching.
-        Synonyms are pre-normalized at load time for efficiency.
+        Names and synonyms are pre-normalized and compiled into the topic index
+        (TopicCacheEntry.keyword_index) - matching is one pass over the text.
         """
+        if index is None:
+            index = TopicKeywordIndex(topics)
+        
         # Normalize text for matching
         text_normalized = _normalize_text_for_matching(text)
-        text_keywords = self._extract_keywords(text_normalized)
+        text_keywords = _extract_keywords(text_normalized)
         
-        for topic in topics:
-            # Check exact name match (normalized)
-            topic_name_normalized = _normalize_text_for_matching(topic['name'])
-            if topic_name_normalized and topic_name_normalized in text_normalized:
-                logger.info(f"🎯 KEYWORD MATCH (name): '{topic['name']}' found in text")
-                return {
-                    "topic_id": topic['id'],
-                    "topic_name": topic['name'],
-                    "score": 0.95,  # High confidence for exact match
-                    "method": "keyword",
-                    "top_matches": [{
-                        "topic_id": topic['id'],
-                        "topic_name": topic['name'],
-                        "score": 0.95
-                    }]
-                }
-            
-            # Check synonyms match using pre-normalized synonyms
-            if topic.get('synonyms_normalized') and topic.get('synonyms'):
-                synonyms_normalized = topic['synonyms_normalized']
-                synonyms_original = topic['synonyms']
-                
-                for i, synonym_normalized in enumerate(synonyms_normalized):
-                    # Use 'contains' check to catch "מנול" in "התקנת מנול."
-                    if synonym_normalized and synonym_normalized in text_normalized:
-                        # Get original synonym for logging (safe access with fallback)
-                        original_synonym = synonyms_original[i] if i < len(synonyms_original) else synonym_normalized
-                        logger.info(f"🎯 SYNONYM MATCH: '{original_synonym}' (normalized: '{synonym_normalized}') → topic: {topic['name']}")
-                        return {
-                            "topic_id": topic['id'],
-                            "topic_name": topic['name'],
-                            "score": 0.93,  # Slightly lower than exact name match
-                            "method": "synonym",
-                            "top_matches": [{
-                                "topic_id": topic['id'],
-                                "topic_name": topic['name'],
-                                "score": 0.93
-                            }]
-                        }
-            
-            # Check multi-keyword match (at least 2 keywords must match)
-            topic_keywords = self._extract_keywords(topic_name_normalized)
-            if topic.get('synonyms_normalized'):
-                for syn in topic['synonyms_normalized']:
-                    if syn:
-                        topic_keywords.update(self._extract_keywords(syn))
-            
-            matching_keywords = text_keywords & topic_keywords
-            if len(matching_keywords) >= 2 and len(topic_keywords) > 0:
-                match_ratio = len(matching_keywords) / len(topic_keywords)
-                if match_ratio >= 0.5:  # At least 50% of topic keywords must appear
-                    logger.info(f"🎯 MULTI-KEYWORD MATCH: {matching_keywords} (topic: {topic['name']}, ratio: {match_ratio:.2f})")
-                    return {
-                        "topic_id": topic['id'],
-                        "topic_name": topic['name'],
-                        "score": 0.85 + (match_ratio * 0.05),  # 0.85-0.90 based on match ratio
-                        "method": "multi_keyword",
-                        "top_matches": [{
-                            "topic_id": topic['id'],
-                            "topic_name": topic['name'],
-                            "score": 0.85 + (match_ratio * 0.05)
-                        }]
-                    }
-        
-        return None
+        match = index.match(text_normalized, text_keywords)
+        if match is None:
+            return None
+        
+        t, method, score, detail = match
+        topic = index.topics[t]
+        if method == "keyword":
+            logger.info(f"🎯 KEYWORD MATCH (name): '{topic['name']}' found in text")
+        elif method == "synonym":
+            synonym_normalized = topic['synonyms_normalized'][detail]
+            # Get original synonym for logging (safe access with fallback)
+            synonyms_original = topic['synonyms']
+            original_synonym = synonyms_original[detail] if detail < len(synonyms_original) else synonym_normalized
+            logger.info(f"🎯 SYNONYM MATCH: '{original_synonym}' (normalized: '{synonym_normalized}') → topic: {topic['name']}")
+        else:
+            matching_keywords = index.matching_keywords(t, text_keywords)
+            logger.info(f"🎯 MULTI-KEYWORD MATCH: {matching_keywords} (topic: {topic['name']}, ratio: {detail:.2f})")
+        
+        return {
+            "topic_id": topic['id'],
+            "topic_name": topic['name'],
+            "score": score,
+            "method": method,
+            "top_matches": [{
+                "topic_id": topic['id'],
+                "topic_name": topic['name'],
+                "score": score
+            }]
+        }
     
     def _load_business_topics(self, business_id: int) -> Tuple[List[Dict], np.ndarray, BusinessAISettings]:
         """Load topics from DB and generate embeddings if needed"""
@@ -283,39 +357,22 @@ class TopicClassifier:
         return topic_data, embeddings, ai_settings
     
     def get_or_build_topics_index(self, business_id: int) -> Optional[TopicCacheEntry]:
-        """Get topics from cache or load from DB"""
-        with self._cache_lock:
-            entry = self._cache.get(business_id)
-            
-            if entry and not entry.is_expired():
-                logger.info(f"♻️  TOPIC CACHE HIT for business {business_id}")
-                return entry
-            
-            if entry:
-                logger.info(f"⏰ Topic cache EXPIRED for business {business_id}, reloading...")
-            else:
-                logger.info(f"🆕 Topic cache MISS for business {business_id}, loading...")
-        
+        """Get topics from cache or load from DB (one load per business at a time)"""
+        return self._cache.get_or_load(business_id, lambda: self._build_topics_index(business_id))
+    
+    def _build_topics_index(self, business_id: int) -> Optional[TopicCacheEntry]:
+        logger.info(f"🆕 Topic cache MISS for business {business_id}, loading...")
         topics, embeddings, ai_settings = self._load_business_topics(business_id)
         
         if not topics or embeddings.size == 0:
             return None
         
-        entry = TopicCacheEntry(business_id, topics, embeddings)
-        
-        with self._cache_lock:
-            self._cache[business_id] = entry
-        
-        return entry
+        return TopicCacheEntry(business_id, topics, embeddings)
     
     def invalidate_cache(self, business_id: int):
-        """Invalidate cache for a business (call after topic CRUD operations)"""
-        with self._cache_lock:
-            if business_id in self._cache:
-                del self._cache[business_id]
-                logger.info(f"🗑️  Topic cache INVALIDATED for business {business_id}")
-            else:
-                logger.info(f"ℹ️  No topic cache to invalidate for business {business_id}")
+        """Invalidate cache for a business (call after topic CRUD operations) - all processes"""
+        self._cache.delete(business_id)
+        logger.info(f"🗑️  Topic cache INVALIDATED for business {business_id}")
     
     def classify_text(self, business_id: int, text: str) -> Optional[Dict]:
         """
@@ -360,7 +417,7 @@ class TopicClassifier:
         log.info(f"[TOPIC_CLASSIFY] business_id={business_id} | Starting classification | text_length={len(text)} chars | topics_loaded={len(entry.topics)} | threshold={threshold}")
         
         # LAYER 1: Try keyword/synonym matching first (FREE & INSTANT)
-        keyword_result = self._keyword_match(text, entry.topics)
+        keyword_result = self._keyword_match(text, entry.topics, entry.keyword_index)
         if keyword_result:
             elapsed = (time.time() - start) * 1000
             log.info(f"[TOPIC_CLASSIFY] business_id={business_id} | ✅ LAYER 1 SUCCESS | method={keyword_result['method']} | topic='{keyword_result['topic_name']}' | score={keyword_result['score']:.3f} | elapsed={elapsed:.0f}ms")
@@ -379,20 +436,8 @@ class TopicClassifier:
             logger.error("⚠️ Failed to generate query embedding")
             return None
         
-        # Calculate cosine similarity
-        similarities = np.dot(entry.embeddings, query_embedding[0])
-        similarities = similarities / (np.linalg.norm(entry.embeddings, axis=1) * np.linalg.norm(query_embedding[0]))
-        
-        # Get top K matches
-        top_indices = np.argsort(similarities)[::-1][:top_k]
-        top_matches = [
-            {
-                "topic_id": entry.topics[idx]["id"],
-                "topic_name": entry.topics[idx]["name"],
-                "score": float(similarities[idx])
-            }
-            for idx in top_indices
-        ]
+        # Cosine similarity → top K matches
+        top_matches = self._embedding_top_matches(entry, query_embedding[0], top_k)
         
         best_match = top_matches[0]
         best_score = best_match["score"]
@@ -421,6 +466,92 @@ class TopicClassifier:
             "top_matches": top_matches
         }
     
+    def _embedding_top_matches(self, entry: TopicCacheEntry, query_vector: np.ndarray, top_k: int) -> List[Dict]:
+        """Top K topics by cosine similarity to one query embedding"""
+        norms = entry.embedding_norms if entry.embedding_norms is not None else np.linalg.norm(entry.embeddings, axis=1)
+        similarities = np.dot(entry.embeddings, query_vector)
+        similarities = similarities / (norms * np.linalg.norm(query_vector))
+        
+        top_indices = np.argsort(similarities)[::-1][:top_k]
+        return [
+            {
+                "topic_id": entry.topics[idx]["id"],
+                "topic_name": entry.topics[idx]["name"],
+                "score": float(similarities[idx])
+            }
+            for idx in top_indices
+        ]
+    
+    def classify_texts(self, business_id: int, texts: List[str]) -> List[Optional[Dict]]:
+        """
+        Classify many texts of one business (backfills, re-classification, message batches)
+        
+        Same results as classify_text() per text, with the topic index and AI
+        settings loaded once, the keyword layer run on the compiled index and
+        all texts that need LAYER 2 embedded in batched requests.
+        
+        Args:
+            business_id: Business ID
+            texts: Texts to classify
+        
+        Returns:
+            One classify_text()-shaped dict (or None) per input text, in order
+        """
+        results: List[Optional[Dict]] = [None] * len(texts)
+        if not any(text and text.strip() for text in texts):
+            return results
+        
+        start = time.time()
+        entry = self.get_or_build_topics_index(business_id)
+        if not entry or len(entry.topics) == 0:
+            logger.warning(f"⚠️ No topics available for business {business_id}")
+            return results
+        
+        ai_settings = BusinessAISettings.query.filter_by(business_id=business_id).first()
+        if not ai_settings:
+            logger.warning(f"⚠️ No AI settings found for business {business_id}")
+            return results
+        
+        threshold = ai_settings.embedding_threshold
+        top_k = ai_settings.embedding_top_k
+        
+        # LAYER 1: keyword/synonym matching on the compiled index
+        pending = []
+        for i, text in enumerate(texts):
+            if not text or not text.strip():
+                continue
+            results[i] = self._keyword_match(text, entry.topics, entry.keyword_index)
+            if results[i] is None:
+                pending.append(i)
+        keyword_matched = sum(1 for r in results if r)
+        
+        # LAYER 2: embeddings for the rest, EMBEDDING_BATCH_SIZE texts per request
+        for offset in range(0, len(pending), EMBEDDING_BATCH_SIZE):
+            chunk = pending[offset:offset + EMBEDDING_BATCH_SIZE]
+            query_embeddings = self._generate_embeddings([texts[i] for i in chunk])
+            if query_embeddings.size == 0:
+                logger.error("⚠️ Failed to generate query embeddings")
+                continue
+            
+            for i, query_vector in zip(chunk, query_embeddings):
+                top_matches = self._embedding_top_matches(entry, query_vector, top_k)
+                best_match = top_matches[0]
+                if best_match["score"] < threshold:
+                    continue
+                results[i] = {
+                    "topic_id": best_match["topic_id"],
+                    "topic_name": best_match["topic_name"],
+                    "score": best_match["score"],
+                    "method": "embedding",
+                    "top_matches": top_matches
+                }
+        
+        elapsed = (time.time() - start) * 1000
+        logger.info(f"[TOPIC_CLASSIFY] business_id={business_id} | batch of {len(texts)} | "
+                    f"keyword={keyword_matched} | embedded={len(pending)} | "
+                    f"matched={sum(1 for r in results if r)} | elapsed={elapsed:.0f}ms")
+        return results
+    
     def rebuild_all_embeddings(self, business_id: int) -> Dict:
         """
         Rebuild embeddings for all topics of a business
@@ -446,9 +577,7 @@ class TopicClassifier:
             
             # Save to cache
             if embeddings.size > 0:
-                entry = TopicCacheEntry(business_id, topics, embeddings)
-                with self._cache_lock:
-                    self._cache[business_id] = entry
+                self._cache.set(business_id, TopicCacheEntry(business_id, topics, embeddings))
             
             return {
                 "success": True,
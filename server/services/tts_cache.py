@@ -0,0 +1,365 @@
+"""
+TTS Audio Cache - content-addressed μ-law 8 kHz audio for phone playback
+
+Greetings and fixed phrases were synthesized again on every call although the
+text for a business + voice rarely changes. Audio is now cached by
+sha256(provider, voice, speed, language, text), already converted to what
+Twilio plays (μ-law 8 kHz, padded to whole 20ms frames):
+
+- Tier 1: in-process LRU ("tts_audio" TTLCache, TTS_CACHE_MEMORY_ENTRIES)
+- Tier 2: the storage driver under tts-cache/ - shared by all workers/replicas,
+  survives deploys
+- Miss: synthesize (tts_provider), convert, write both tiers. Concurrent misses
+  for the same key synthesize once (single-flight).
+
+prewarm_business() synthesizes a business's greeting, closing sentence and the
+fixed phrases ahead of time; enqueue_prewarm() runs it as a low-priority job
+after a prompt / voice save.
+
+tts_cache_stats() reports hit rate per tier and the time-to-first-audio saved
+(hits × mean synthesis latency - lookup time).
+"""
+import hashlib
+import io
+import json
+import logging
+import threading
+import time
+import wave
+from typing import Dict, Iterator, Optional, Tuple
+
+from server.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+STORAGE_PREFIX = "tts-cache"
+FRAME_BYTES = 160            # 20ms @ 8kHz μ-law
+MULAW_SILENCE = b'\xff'
+TELEPHONY_RATE = 8000
+OPENAI_PCM_RATE = 24000      # speech.create response_format="pcm"
+STORAGE_RETRY_SECONDS = 60   # back-off after the storage driver failed to initialize
+
+# Phrases the call flow speaks verbatim (tts_gcp greetings, error fallbacks)
+FIXED_PHRASES: Dict[str, tuple] = {
+    "he-IL": (
+        "שלום, איך אוכל לעזור לך היום?",
+        "שלום, אנא המתן רגע.",
+        "מצטערת, לא שמעתי טוב. אפשר לחזור שוב בבקשה?",
+        "לא הבנתי, אפשר לחזור?",
+        "איך אוכל לעזור?",
+    ),
+}
+
+
+def _memory_entries() -> int:
+    from server.config import TTS_CACHE_MEMORY_ENTRIES
+    return TTS_CACHE_MEMORY_ENTRIES
+
+
+# Content-addressed: an entry never goes stale, the TTL only reclaims memory
+_memory = TTLCache(ttl_seconds=24 * 3600, max_size=_memory_entries(), name="tts_audio")
+
+
+class _Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.storage_hits = 0
+        self.synthesized = 0
+        self.failures = 0
+        self.synth_ms_total = 0.0
+        self.hit_ms_total = 0.0
+
+    def record(self, outcome: str, elapsed_ms: float):
+        from server.metrics import (
+            metrics, TTS_CACHE_MEMORY_HITS, TTS_CACHE_STORAGE_HITS, TTS_CACHE_SYNTHESIZED, TTS_CACHE_FAILURES,
+        )
+        with self._lock:
+            if outcome == "memory":
+                self.memory_hits += 1
+                self.hit_ms_total += elapsed_ms
+            elif outcome == "storage":
+                self.storage_hits += 1
+                self.hit_ms_total += elapsed_ms
+            elif outcome == "synthesized":
+                self.synthesized += 1
+                self.synth_ms_total += elapsed_ms
+            else:
+                self.failures += 1
+        metrics.increment({
+            "memory": TTS_CACHE_MEMORY_HITS,
+            "storage": TTS_CACHE_STORAGE_HITS,
+            "synthesized": TTS_CACHE_SYNTHESIZED,
+        }.get(outcome, TTS_CACHE_FAILURES))
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            hits = self.memory_hits + self.storage_hits
+            lookups = hits + self.synthesized + self.failures
+            mean_synth_ms = self.synth_ms_total / self.synthesized if self.synthesized else None
+            return {
+                "memory_hits": self.memory_hits,
+                "storage_hits": self.storage_hits,
+                "synthesized": self.synthesized,
+                "failures": self.failures,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "mean_synth_ms": round(mean_synth_ms, 1) if mean_synth_ms is not None else None,
+                "mean_hit_ms": round(self.hit_ms_total / hits, 2) if hits else None,
+                # Unknown until this process has timed at least one synthesis
+                "ttfa_saved_ms": (round(max(0.0, hits * mean_synth_ms - self.hit_ms_total), 1)
+                                  if mean_synth_ms is not None else None),
+                "memory_entries": _memory.size(),
+            }
+
+
+_stats = _Stats()
+
+
+def tts_cache_stats() -> Dict:
+    return _stats.snapshot()
+
+
+def tts_cache_key(provider: str, voice_id: str, speed: float, language: str, text: str) -> str:
+    """sha256 over the synthesis parameters; whitespace in the text is normalized"""
+    payload = json.dumps([provider, voice_id, round(float(speed), 2), language, " ".join(text.split())],
+                         ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def storage_key(provider: str, digest: str) -> str:
+    return f"{STORAGE_PREFIX}/{provider}/{digest[:2]}/{digest}.ulaw"
+
+
+def iter_frames(mulaw: bytes) -> Iterator[bytes]:
+    """20ms Twilio media frames (cached audio is already frame-aligned)"""
+    for i in range(0, len(mulaw), FRAME_BYTES):
+        yield mulaw[i:i + FRAME_BYTES]
+
+
+# ─── Conversion ──────────────────────────────────────────
+
+def pcm16_to_telephony(pcm16: bytes, sample_rate: int) -> bytes:
+    """PCM16 mono at any rate → μ-law 8 kHz padded to whole frames"""
+    from server.services.mulaw_fast import pcm16_to_mulaw_fast, ratecv_fast
+
+    if sample_rate != TELEPHONY_RATE:
+        pcm16 = ratecv_fast(pcm16, sample_rate, TELEPHONY_RATE)
+    mulaw = pcm16_to_mulaw_fast(pcm16)
+    remainder = len(mulaw) % FRAME_BYTES
+    if remainder:
+        mulaw += MULAW_SILENCE * (FRAME_BYTES - remainder)
+    return mulaw
+
+
+def synthesize_mulaw(text: str, provider: str, voice_id: str, language: str, speed: float) -> Optional[bytes]:
+    """Synthesize with the provider and convert to telephony audio (no caching)"""
+    from server.services import tts_provider
+
+    if provider == "gemini":
+        audio, content_type = tts_provider.synthesize_gemini(text, voice_id, language, speed)
+        if audio is None:
+            logger.warning(f"[TTS_CACHE] Gemini synthesis failed: {content_type}")
+            return None
+        with wave.open(io.BytesIO(audio), "rb") as wav:
+            return pcm16_to_telephony(wav.readframes(wav.getnframes()), wav.getframerate())
+
+    audio, content_type = tts_provider.synthesize_openai(text, voice_id, speed, response_format="pcm")
+    if audio is None:
+        logger.warning(f"[TTS_CACHE] OpenAI synthesis failed: {content_type}")
+        return None
+    return pcm16_to_telephony(audio, OPENAI_PCM_RATE)
+
+
+# ─── Storage tier ────────────────────────────────────────
+
+_storage_driver = None
+_storage_failed_at = 0.0
+
+
+def _get_storage():
+    """Storage driver, or None while it is not configured (memory-only caching)"""
+    global _storage_driver, _storage_failed_at
+    if _storage_driver is not None:
+        return _storage_driver
+    if time.time() - _storage_failed_at < STORAGE_RETRY_SECONDS:
+        return None
+    try:
+        from server.storage import get_storage_driver
+        _storage_driver = get_storage_driver()
+        return _storage_driver
+    except Exception as e:
+        _storage_failed_at = time.time()
+        logger.info(f"[TTS_CACHE] Storage tier unavailable, caching in memory only: {e}")
+        return None
+
+
+def _storage_get(key: str) -> Optional[bytes]:
+    storage = _get_storage()
+    if storage is None:
+        return None
+    try:
+        return storage.get_bytes(key)
+    except Exception as e:
+        logger.warning(f"[TTS_CACHE] Storage read failed for {key}: {e}")
+        return None
+
+
+def _storage_put(key: str, mulaw: bytes, metadata: Dict[str, str]):
+    storage = _get_storage()
+    if storage is None:
+        return
+    try:
+        storage.put_bytes(key, mulaw, content_type="audio/basic", metadata=metadata)
+    except Exception as e:
+        logger.warning(f"[TTS_CACHE] Storage write failed for {key}: {e}")
+
+
+# ─── Lookup ──────────────────────────────────────────────
+
+def get_mulaw(text: str, provider: str = "openai", voice_id: Optional[str] = None,
+              language: str = "he-IL", speed: float = 1.0) -> Optional[bytes]:
+    """
+    Telephony audio for `text` - memory, then storage, then synthesis
+
+    Returns:
+        μ-law 8 kHz bytes (multiple of FRAME_BYTES), or None if synthesis failed
+    """
+    return _lookup(text, provider, voice_id, language, speed)[0]
+
+
+def _lookup(text: str, provider: str, voice_id: Optional[str], language: str,
+            speed: float) -> Tuple[Optional[bytes], str]:
+    """(audio, outcome) - outcome is memory / storage / synthesized / failure"""
+    if not text or not text.strip():
+        return None, "failure"
+    from server.config import TTS_CACHE_ENABLED
+    from server.services.tts_provider import get_default_voice
+
+    voice_id = voice_id or get_default_voice(provider)
+    if not TTS_CACHE_ENABLED:
+        mulaw = synthesize_mulaw(text, provider, voice_id, language, speed)
+        return mulaw, "synthesized" if mulaw else "failure"
+
+    started = time.perf_counter()
+    digest = tts_cache_key(provider, voice_id, speed, language, text)
+    cached = _memory.get(digest)
+    if cached is not None:
+        _stats.record("memory", (time.perf_counter() - started) * 1000)
+        return cached, "memory"
+
+    key = storage_key(provider, digest)
+    loaded = {}
+
+    def load() -> Optional[bytes]:
+        stored = _storage_get(key)
+        if stored:
+            loaded["outcome"] = "storage"
+            return stored
+        synth_started = time.perf_counter()
+        mulaw = synthesize_mulaw(text, provider, voice_id, language, speed)
+        if mulaw:
+            loaded["outcome"] = "synthesized"
+            loaded["synth_ms"] = (time.perf_counter() - synth_started) * 1000
+            _storage_put(key, mulaw, {"provider": provider, "voice": voice_id, "language": language})
+        return mulaw
+
+    mulaw = _memory.get_or_load(digest, load)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if mulaw is None:
+        outcome = "failure"
+    else:
+        # No outcome: a concurrent caller loaded it (single-flight) - a memory hit for us
+        outcome = loaded.get("outcome", "memory")
+    _stats.record(outcome, loaded["synth_ms"] if outcome == "synthesized" else elapsed_ms)
+    return mulaw, outcome
+
+
+# ─── Business voice + prewarm ────────────────────────────
+
+def business_voice(business) -> Dict:
+    """Synthesis parameters for a business - same resolution as the AI settings API"""
+    from server.config.voice_catalog import default_voice, is_valid_voice
+
+    provider = getattr(business, 'ai_provider', None) or "openai"
+    voice_id = (getattr(business, 'voice_name', None) or getattr(business, 'tts_voice_id', None)
+                or getattr(business, 'voice_id', None))
+    if not voice_id or not is_valid_voice(voice_id, provider):
+        voice_id = default_voice(provider)
+    return {
+        "provider": provider,
+        "voice_id": voice_id,
+        "language": getattr(business, 'tts_language', None) or "he-IL",
+        "speed": getattr(business, 'tts_speed', None) or 1.0,
+    }
+
+
+def render_greeting(greeting: str, business_name: str) -> str:
+    """Same placeholder substitution as the call start"""
+    return greeting.replace("{{business_name}}", business_name).replace("{{BUSINESS_NAME}}", business_name)
+
+
+def get_business_mulaw(business_id: int, text: str) -> Optional[bytes]:
+    """Telephony audio for `text` in the business's configured voice"""
+    from server.models_sql import Business
+
+    business = Business.query.get(business_id) if business_id else None
+    voice = business_voice(business) if business else {}
+    return get_mulaw(text, **voice)
+
+
+def prewarm_business(business_id: int) -> Dict[str, int]:
+    """
+    Synthesize (or confirm cached) the greeting, closing sentence and fixed
+    phrases for a business's current voice
+
+    Returns:
+        {"phrases": n, "cached": hits, "synthesized": misses, "failed": failures}
+    """
+    from server.models_sql import Business, BusinessSettings
+
+    business = Business.query.get(business_id)
+    if not business:
+        return {"phrases": 0, "cached": 0, "synthesized": 0, "failed": 0}
+    settings = BusinessSettings.query.filter_by(tenant_id=business_id).first()
+    voice = business_voice(business)
+    business_name = business.name or "העסק שלנו"
+
+    phrases = []
+    if business.greeting_message:
+        phrases.append(render_greeting(business.greeting_message, business_name))
+    closing = getattr(settings, 'closing_sentence', None) if settings else None
+    if closing:
+        phrases.append(closing)
+    phrases.extend(FIXED_PHRASES.get(voice["language"], ()))
+
+    unique = list(dict.fromkeys(p for p in phrases if p and p.strip()))
+    summary = {"phrases": len(unique), "cached": 0, "synthesized": 0, "failed": 0}
+    for phrase in unique:
+        _, outcome = _lookup(phrase, voice["provider"], voice["voice_id"], voice["language"], voice["speed"])
+        summary["failed" if outcome == "failure" else
+                "synthesized" if outcome == "synthesized" else "cached"] += 1
+    logger.info(f"[TTS_CACHE] Prewarmed business {business_id} ({voice['provider']}/{voice['voice_id']}): {summary}")
+    return summary
+
+
+def enqueue_prewarm(business_id: int) -> bool:
+    """Queue prewarm_business on the low queue (after a prompt / voice save). Never raises."""
+    from server.config import TTS_CACHE_ENABLED, TTS_CACHE_PREWARM
+    if not (TTS_CACHE_ENABLED and TTS_CACHE_PREWARM):
+        return False
+    try:
+        from server.services.jobs import enqueue
+        from server.jobs.prewarm_tts_job import prewarm_tts_job
+        enqueue(
+            'low',
+            prewarm_tts_job,
+            business_id=business_id,
+            job_id=f"tts_prewarm_{business_id}",
+            timeout=300,
+            retry=1,
+            description=f"Prewarm TTS cache for business {business_id}"
+        )
+        return True
+    except Exception as e:
+        logger.warning(f"[TTS_CACHE] Failed to enqueue prewarm for business {business_id}: {e}")
+        return False
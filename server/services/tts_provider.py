@@ -133,7 +133,8 @@ def is_gemini_available() -> bool:
 def synthesize_openai(
     text: str,
     voice_id: str = "alloy",
-    speed: float = 1.0
+    speed: float = 1.0,
+    response_format: str = "mp3"
 ) -> Tuple[Optional[bytes], str]:
     """
     Synthesize speech using OpenAI TTS API.
@@ -143,6 +144,7 @@ def synthesize_openai(
         voice_id: The OpenAI voice ID (e.g., 'alloy', 'echo', 'shimmer').
                   Invalid voices fall back to 'alloy'.
         speed: Speaking speed from 0.25 to 4.0 (default 1.0).
+        response_format: "mp3" (default) or "pcm" (raw 24kHz 16-bit mono, for telephony).
     
     Returns:
         Tuple of (audio_bytes, content_type) on success,
@@ -174,14 +176,14 @@ def synthesize_openai(
             voice=voice_id,
             input=text,
             speed=speed,
-            response_format="mp3"
+            response_format=response_format
         )
         
         # Get audio content
         audio_bytes = response.content
         
         logger.info(f"OpenAI TTS: Synthesized {len(audio_bytes)} bytes with voice={voice_id}")
-        return audio_bytes, "audio/mpeg"
+        return audio_bytes, "audio/pcm" if response_format == "pcm" else "audio/mpeg"
         
     except Exception as e:
         # 🔒 Security: Log full error server-side, return generic message to client
@@ -11,6 +11,8 @@ import uuid
 from typing import Dict, Any, Optional
 from sqlalchemy import text
 
+from server.services.capacity_ledger import bind_lease, outbound_job_lease, release_lease
+
 log = logging.getLogger(__name__)
 
 # 🔒 ATOMIC DEDUPLICATION: In-memory set for fast check (Layer 1)
@@ -143,7 +145,8 @@ def create_outbound_call(
     template_id: Optional[int] = None,
     job_id: Optional[int] = None,
     business_name: Optional[str] = None,
-    lead_name: Optional[str] = None
+    lead_name: Optional[str] = None,
+    capacity_lease: Optional[str] = None
 ) -> Dict[str, Any]:
     """
     Create a single outbound Twilio call with atomic deduplication.
@@ -163,6 +166,9 @@ def create_outbound_call(
         template_id: Optional template ID
         job_id: Optional job ID for bulk calls
         business_name: Optional business name for webhook
+        capacity_lease: Optional capacity ledger reservation for this call
+            (bulk jobs use outbound_job_lease(job_id)); bound to the call SID
+            once Twilio accepts the call so the call-end paths release it
         
     Returns:
         Dict with call_sid, status, and is_duplicate flag
@@ -179,6 +185,9 @@ def create_outbound_call(
     
     if existing_call_sid:
         log.info(f"[DEDUP] Returning existing call: {existing_call_sid}")
+        if capacity_lease:
+            # The existing call already holds its own slot
+            release_lease(capacity_lease)
         return {
             "call_sid": existing_call_sid,
             "status": "duplicate",
@@ -237,6 +246,11 @@ def create_outbound_call(
         # 🔒 ATOMIC: Mark call as created in memory
         _recent_calls[dedup_key] = (time.time(), call_sid)
         
+        # 🎯 CAPACITY: The reserved slot now belongs to the call SID
+        lease_id = capacity_lease or (outbound_job_lease(job_id) if job_id else None)
+        if lease_id:
+            bind_lease(lease_id, call_sid)
+        
         # 🔥 TRACE LOGGING: Log success
         log.info(f"[OUTBOUND][REQ={req_uuid}] twilio_ok call_sid={call_sid}")
         log.info(f"[TWILIO_CALL] ✅ Call created: call_sid={call_sid}, dedup_key={dedup_key}, recording_mode=OFF (will be set to RECORDING_API when recording starts)")
@@ -0,0 +1,564 @@
+"""
+Webhook Delivery - durable outbox and pooled sender for outbound webhooks
+
+Customer webhooks (call.completed, lead.created, lead.status_changed, ...) and
+n8n events used to be posted from the code that produced them: a fresh TCP/TLS
+connection per event, up to 30s timeouts with time.sleep() retries inside the
+request or job, and nothing left to retry once those were used up. Instead:
+
+- enqueue_webhook() stores the signed body and headers in webhook_outbox (own
+  connection - the caller's transaction is untouched) and wakes the delivery job
+- deliver_due() claims due rows (FOR UPDATE SKIP LOCKED, so delivery jobs never
+  share rows) and posts them from a thread pool:
+  * one requests.Session per endpoint host, its connection pool sized to
+    WEBHOOK_DELIVERY_PER_ENDPOINT - keep-alive instead of a handshake per event
+  * at most WEBHOOK_DELIVERY_PER_ENDPOINT requests in flight per host; rows for a
+    saturated host wait in the dispatcher, not in a pool thread, so one slow
+    endpoint cannot starve the others
+  * redirects followed manually so POST stays POST (as before)
+  * 2xx = delivered; 4xx other than 408/425/429 = failed (retrying won't help);
+    anything else is retried with exponential backoff + full jitter, honouring
+    Retry-After, until max_attempts
+  * n8n rows to the same URL go out together as {"events": [...]} when
+    N8N_BATCH_MAX_EVENTS > 1
+- kick_delivery() (scheduler, every minute) wakes the job for retries that came
+  due after it stopped, and for rows whose delivery job died mid-claim
+
+When the outbox is disabled or unavailable enqueue_webhook() returns None and
+the caller falls back to sending the webhook itself.
+"""
+import email.utils
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from urllib.parse import urljoin, urlsplit
+
+import requests
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_GENERIC = 'generic'
+CHANNEL_STATUS = 'status'
+CHANNEL_N8N = 'n8n'
+
+WAKE_KEY = "webhooks:delivery:wake"
+PRUNE_KEY = "webhooks:delivery:pruned"
+WAKE_TTL_SECONDS = 300      # a delivery job is queued or running; expires if its worker died
+PRUNE_INTERVAL_SECONDS = 3600
+IDLE_WAIT_SECONDS = 5.0     # keep running for retries due this soon instead of waiting for the scheduler
+CLAIM_IDLE_SECONDS = 0.25   # after a short claim, look again at most this often while requests run
+PRUNE_CHUNK = 5000
+
+MAX_REDIRECTS = 5
+REDIRECT_CODES = (301, 302, 307, 308)
+RETRYABLE_4XX = (408, 425, 429)
+
+_UPDATE_SQL = text("""
+    UPDATE webhook_outbox
+    SET status = :status, attempts = attempts + :attempted, next_attempt_at = :next_attempt_at,
+        last_error = :last_error, last_status_code = :last_status_code,
+        last_latency_ms = :last_latency_ms, delivered_at = :delivered_at
+    WHERE id = :id
+""")
+
+
+@dataclass
+class DeliveryResult:
+    """Outcome of one POST (redirects included)"""
+    ok: bool
+    status_code: Optional[int] = None
+    error: Optional[str] = None
+    permanent: bool = False
+    retry_after: Optional[float] = None
+    latency_ms: int = 0
+
+
+class EndpointPools:
+    """One keep-alive session per endpoint host, pool sized to its concurrency cap"""
+
+    def __init__(self, per_endpoint: int):
+        self.per_endpoint = per_endpoint
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, requests.Session] = {}
+
+    def session(self, host: str) -> requests.Session:
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                # max_retries=0: the outbox is the only retry layer
+                adapter = requests.adapters.HTTPAdapter(
+                    pool_connections=1, pool_maxsize=self.per_endpoint, max_retries=0
+                )
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._sessions[host] = session
+            return session
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+def endpoint_of(url: str) -> str:
+    """Concurrency / pooling key of a URL: scheme + host[:port]"""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc.lower()}"
+
+
+def _get_redis():
+    from server.services.jobs import get_redis
+    return get_redis()
+
+
+# ─── Enqueue ───────────────────────────────────────────────
+
+def enqueue_webhook(
+    channel: str,
+    url: str,
+    body: str,
+    headers: Dict[str, str],
+    event_type: str,
+    business_id=None,
+    batchable: bool = False,
+) -> Optional[int]:
+    """
+    Queue a webhook for delivery and wake the delivery job.
+
+    Args:
+        body: Serialized JSON, posted as-is (signatures in headers must match it)
+        business_id: Stored for lookups; non-numeric ids (n8n 'business_1') are kept as NULL
+
+    Returns:
+        Outbox row id, or None if the outbox is disabled or the insert failed
+        (the caller sends the webhook itself)
+    """
+    from server.config import WEBHOOK_OUTBOX_ENABLED, WEBHOOK_DELIVERY_MAX_ATTEMPTS
+    if not WEBHOOK_OUTBOX_ENABLED:
+        return None
+
+    try:
+        business_id = int(business_id) if business_id is not None else None
+    except (TypeError, ValueError):
+        business_id = None
+
+    try:
+        from server.db import db
+        from server.models_sql import WebhookOutbox
+        now = datetime.utcnow()
+        # Own connection: commits now without committing (or waiting for) the caller's session
+        with db.engine.begin() as conn:
+            outbox_id = conn.execute(
+                WebhookOutbox.__table__.insert().values(
+                    business_id=business_id,
+                    channel=channel,
+                    event_type=(event_type or '')[:64],
+                    url=url,
+                    body=body,
+                    headers=headers,
+                    batchable=batchable,
+                    status='pending',
+                    attempts=0,
+                    max_attempts=WEBHOOK_DELIVERY_MAX_ATTEMPTS,
+                    next_attempt_at=now,
+                    created_at=now,
+                ).returning(WebhookOutbox.__table__.c.id)
+            ).scalar()
+    except Exception as e:
+        logger.warning(f"[WEBHOOK-DELIVERY] Outbox insert failed for {event_type}, sending inline: {e}")
+        return None
+
+    wake_delivery()
+    return outbox_id
+
+
+def wake_delivery(redis_conn=None) -> bool:
+    """Enqueue a delivery job unless one is already queued or running"""
+    try:
+        redis_conn = redis_conn or _get_redis()
+        if not redis_conn.set(WAKE_KEY, 1, nx=True, ex=WAKE_TTL_SECONDS):
+            return False
+    except Exception as e:
+        # The row is stored - the scheduler kick delivers it within a minute
+        logger.warning(f"[WEBHOOK-DELIVERY] Wake failed: {e}")
+        return False
+    return enqueue_delivery(redis_conn)
+
+
+def enqueue_delivery(redis_conn=None) -> bool:
+    """Enqueue the delivery job; frees the wake key if that fails"""
+    from server.config import WEBHOOK_DELIVERY_MAX_SECONDS, WEBHOOK_DELIVERY_TIMEOUT
+    try:
+        from server.services.jobs import enqueue
+        from server.jobs.webhook_delivery_job import webhook_delivery_job
+        enqueue(
+            'default',
+            webhook_delivery_job,
+            job_id=f"webhook_delivery_{uuid.uuid4().hex[:12]}",
+            timeout=int(WEBHOOK_DELIVERY_MAX_SECONDS + WEBHOOK_DELIVERY_TIMEOUT * (MAX_REDIRECTS + 1)) + 60,
+            retry=None,  # rows stay in the outbox - kick_delivery() re-wakes it
+            ttl=WAKE_TTL_SECONDS,
+            description="Deliver outbound webhooks"
+        )
+        return True
+    except Exception as e:
+        logger.error(f"[WEBHOOK-DELIVERY] Failed to enqueue delivery job: {e}")
+        try:
+            (redis_conn or _get_redis()).delete(WAKE_KEY)
+        except Exception:
+            pass
+        return False
+
+
+def kick_delivery(session=None, redis_conn=None) -> int:
+    """Scheduler hook: wake the delivery job if rows are due and none is queued. Returns 1 if one was enqueued"""
+    due_in = next_due_in(session)
+    if due_in is None or due_in > 0:
+        return 0
+    return 1 if wake_delivery(redis_conn) else 0
+
+
+# ─── Sending ───────────────────────────────────────────────
+
+def _retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Retry-After header as seconds (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+        return max(0.0, when.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def post_webhook(session: requests.Session, url: str, body: bytes, headers: Dict[str, str],
+                 timeout: float) -> DeliveryResult:
+    """POST once, following redirects with the same method and body"""
+    start = time.perf_counter()
+
+    def done(**kwargs) -> DeliveryResult:
+        return DeliveryResult(latency_ms=int((time.perf_counter() - start) * 1000), **kwargs)
+
+    current_url = url
+    try:
+        for _ in range(MAX_REDIRECTS + 1):
+            response = session.post(current_url, data=body, headers=headers, timeout=timeout,
+                                    allow_redirects=False)
+            status = response.status_code
+            if status in REDIRECT_CODES:
+                location = response.headers.get('Location')
+                response.close()
+                if not location:
+                    return done(ok=False, status_code=status, error="redirect without Location", permanent=True)
+                current_url = urljoin(current_url, location)
+                logger.warning(f"[WEBHOOK-DELIVERY] {url[:60]} redirects ({status}) to {current_url[:60]} - "
+                               f"update the webhook URL to avoid the extra round trip")
+                continue
+            if 200 <= status < 300:
+                response.content  # drain so the connection goes back to the pool
+                return done(ok=True, status_code=status)
+            error = f"HTTP {status}: {response.text[:200]}"
+            if 400 <= status < 500 and status not in RETRYABLE_4XX:
+                return done(ok=False, status_code=status, error=error, permanent=True)
+            return done(ok=False, status_code=status, error=error,
+                        retry_after=_retry_after_seconds(response.headers.get('Retry-After')))
+        return done(ok=False, error=f"more than {MAX_REDIRECTS} redirects", permanent=True)
+    except requests.exceptions.Timeout:
+        return done(ok=False, error=f"timeout after {timeout}s")
+    except requests.exceptions.RequestException as e:
+        return done(ok=False, error=str(e)[:500])
+
+
+def backoff_seconds(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Delay before retry number `attempt` (1-based): full jitter, at least Retry-After"""
+    from server.config import WEBHOOK_RETRY_BASE_SECONDS, WEBHOOK_RETRY_MAX_SECONDS
+    delay = random.uniform(0, min(WEBHOOK_RETRY_MAX_SECONDS, WEBHOOK_RETRY_BASE_SECONDS * (2 ** (attempt - 1))))
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, WEBHOOK_RETRY_MAX_SECONDS))
+    return delay
+
+
+# ─── Delivery engine ───────────────────────────────────────
+
+@dataclass
+class _Send:
+    """One POST: a single outbox row, or several batched n8n rows"""
+    rows: list
+    url: str
+    body: bytes
+    headers: Dict[str, str]
+    endpoint: str
+
+
+def _claim(session, limit: int, lease_seconds: float) -> list:
+    """Claim due rows (pending, or delivering with an expired claim) for this job"""
+    now = datetime.utcnow()
+    lock = " FOR UPDATE SKIP LOCKED" if session.get_bind().dialect.name == 'postgresql' else ""
+    rows = session.execute(text(f"""
+        UPDATE webhook_outbox SET status = 'delivering', next_attempt_at = :lease_until
+        WHERE id IN (
+            SELECT id FROM webhook_outbox
+            WHERE status IN ('pending', 'delivering') AND next_attempt_at <= :now
+            ORDER BY next_attempt_at
+            LIMIT :limit{lock}
+        )
+        RETURNING id, channel, event_type, url, body, headers, batchable, attempts, max_attempts
+    """), {'now': now, 'lease_until': now + timedelta(seconds=lease_seconds), 'limit': limit}).fetchall()
+    session.commit()
+    return sorted(rows, key=lambda row: row.id)
+
+
+def _build_sends(rows: list, batch_max: int) -> List[_Send]:
+    """Group batchable rows per URL (up to batch_max), everything else one row per POST"""
+    sends: List[_Send] = []
+    batches: Dict[str, list] = {}
+    for row in rows:
+        headers = row.headers if isinstance(row.headers, dict) else json.loads(row.headers or '{}')
+        if batch_max > 1 and row.batchable:
+            group = batches.setdefault(row.url, [])
+            group.append((row, headers))
+            if len(group) >= batch_max:
+                sends.append(_batched_send(batches.pop(row.url)))
+            continue
+        sends.append(_Send([row], row.url, row.body.encode('utf-8'), headers, endpoint_of(row.url)))
+    for group in batches.values():
+        sends.append(_batched_send(group) if len(group) > 1 else
+                     _Send([group[0][0]], group[0][0].url, group[0][0].body.encode('utf-8'),
+                           group[0][1], endpoint_of(group[0][0].url)))
+    return sends
+
+
+def _batched_send(group: list) -> _Send:
+    rows = [row for row, _ in group]
+    # Bodies are already JSON - splice them instead of parsing and re-serializing
+    body = '{"events":[' + ','.join(row.body for row in rows) + ']}'
+    headers = dict(group[0][1])
+    headers.pop('X-ProSaaS-Event', None)
+    return _Send(rows, rows[0].url, body.encode('utf-8'), headers, endpoint_of(rows[0].url))
+
+
+def _outcome_params(row, result: DeliveryResult, now: datetime) -> Dict:
+    """UPDATE parameters for a row after a POST, plus the outcome name"""
+    attempts = row.attempts + 1
+    params = {
+        'id': row.id, 'attempted': 1, 'last_status_code': result.status_code,
+        'last_latency_ms': result.latency_ms, 'last_error': result.error, 'delivered_at': None,
+    }
+    if result.ok:
+        params.update(status='delivered', next_attempt_at=now, delivered_at=now, last_error=None)
+        return params, 'delivered'
+    if result.permanent or attempts >= row.max_attempts:
+        params.update(status='failed', next_attempt_at=now)
+        return params, 'failed'
+    params.update(status='pending',
+                  next_attempt_at=now + timedelta(seconds=backoff_seconds(attempts, result.retry_after)))
+    return params, 'retried'
+
+
+def _release_params(row, now: datetime) -> Dict:
+    """Hand an unsent claimed row back (no attempt counted)"""
+    return {'id': row.id, 'attempted': 0, 'status': 'pending', 'next_attempt_at': now,
+            'last_error': None, 'last_status_code': None, 'last_latency_ms': None, 'delivered_at': None}
+
+
+def deliver_due(session=None, max_seconds: Optional[float] = None, workers: Optional[int] = None,
+                per_endpoint: Optional[int] = None, pools: Optional[EndpointPools] = None,
+                post=None, redis_conn=None) -> Dict:
+    """
+    Deliver due outbox rows until none are left or max_seconds have passed.
+
+    Returns:
+        Stats dict - status is 'drained' (nothing due) or 'yield' (time is up,
+        rows may remain: the caller re-enqueues), plus delivered / failed /
+        retried counts and latency p50/p95 in ms
+    """
+    from server.config import (
+        N8N_BATCH_MAX_EVENTS, WEBHOOK_DELIVERY_MAX_SECONDS, WEBHOOK_DELIVERY_PER_ENDPOINT,
+        WEBHOOK_DELIVERY_TIMEOUT, WEBHOOK_DELIVERY_WORKERS,
+    )
+    from server.db import db
+
+    session = session or db.session
+    max_seconds = WEBHOOK_DELIVERY_MAX_SECONDS if max_seconds is None else max_seconds
+    workers = workers or WEBHOOK_DELIVERY_WORKERS
+    per_endpoint = per_endpoint or WEBHOOK_DELIVERY_PER_ENDPOINT
+    own_pools = pools is None
+    pools = pools or EndpointPools(per_endpoint)
+    post = post or post_webhook
+    timeout = WEBHOOK_DELIVERY_TIMEOUT
+    # A claim outlives the whole run, so no other job takes rows this one still holds
+    lease_seconds = max_seconds + timeout * (MAX_REDIRECTS + 1) + 30
+
+    stats = {'status': 'drained', 'delivered': 0, 'failed': 0, 'retried': 0, 'requests': 0}
+    latencies: List[int] = []
+    backlog: deque = deque()            # sends waiting for a free slot on their endpoint
+    in_flight: Dict[str, int] = {}      # endpoint -> requests running
+    futures = {}
+    pending_updates: List[Dict] = []
+    deadline = time.monotonic() + max_seconds
+    next_claim_at = 0.0
+    woke_cleared = False
+
+    def send(item: _Send) -> DeliveryResult:
+        return post(pools.session(item.endpoint), item.url, item.body, item.headers, timeout)
+
+    def flush_updates():
+        if pending_updates:
+            session.execute(_UPDATE_SQL, pending_updates)
+            session.commit()
+            pending_updates.clear()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="webhook-delivery") as executor:
+        while True:
+            out_of_time = time.monotonic() >= deadline
+
+            # Top up: claim while the dispatcher has less than a round of work queued
+            if not out_of_time and len(backlog) < workers and (not futures or time.monotonic() >= next_claim_at):
+                want = workers * 4 - len(backlog)
+                claimed = _claim(session, want, lease_seconds)
+                backlog.extend(_build_sends(claimed, N8N_BATCH_MAX_EVENTS))
+                if len(claimed) < want:
+                    next_claim_at = time.monotonic() + CLAIM_IDLE_SECONDS
+                if not claimed and not backlog and not futures and not woke_cleared:
+                    # Caught up: free the wake key, then look once more so a row
+                    # inserted in between is either seen here or wakes a new job
+                    _clear_wake(redis_conn)
+                    woke_cleared = True
+                    continue
+
+            # Dispatch everything whose endpoint has a free slot
+            deferred = deque()
+            while backlog and not out_of_time and len(futures) < workers:
+                item = backlog.popleft()
+                if in_flight.get(item.endpoint, 0) >= per_endpoint:
+                    deferred.append(item)
+                    continue
+                in_flight[item.endpoint] = in_flight.get(item.endpoint, 0) + 1
+                futures[executor.submit(send, item)] = item
+            backlog.extendleft(reversed(deferred))
+
+            if not futures:
+                if backlog and not out_of_time:
+                    continue
+                break
+
+            done, _ = wait(list(futures), timeout=CLAIM_IDLE_SECONDS, return_when=FIRST_COMPLETED)
+            now = datetime.utcnow()
+            for future in done:
+                item = futures.pop(future)
+                in_flight[item.endpoint] -= 1
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = DeliveryResult(ok=False, error=str(e)[:500])
+                stats['requests'] += 1
+                latencies.append(result.latency_ms)
+                for row in item.rows:
+                    params, outcome = _outcome_params(row, result, now)
+                    pending_updates.append(params)
+                    stats[outcome] += 1
+                if not result.ok:
+                    logger.warning(f"[WEBHOOK-DELIVERY] {item.rows[0].event_type} x{len(item.rows)} to "
+                                   f"{item.endpoint} failed: {result.error}")
+            flush_updates()
+
+    if backlog:
+        # Time is up with claimed rows still unsent: hand them back for the next job
+        now = datetime.utcnow()
+        pending_updates.extend(_release_params(row, now) for item in backlog for row in item.rows)
+        flush_updates()
+        stats['status'] = 'yield'
+    elif time.monotonic() >= deadline and not woke_cleared:
+        stats['status'] = 'yield'
+
+    if own_pools:
+        pools.close()
+    _record_metrics(stats, latencies)
+    return stats
+
+
+def _clear_wake(redis_conn=None):
+    try:
+        (redis_conn or _get_redis()).delete(WAKE_KEY)
+    except Exception as e:
+        logger.warning(f"[WEBHOOK-DELIVERY] Could not clear wake key: {e}")
+
+
+def _percentile(samples: List[int], q: float) -> int:
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def _record_metrics(stats: Dict, latencies: List[int]):
+    from server.metrics import (
+        WEBHOOKS_DELIVERED, WEBHOOKS_FAILED, WEBHOOKS_RETRIED,
+        WEBHOOKS_LATENCY_P50_MS, WEBHOOKS_LATENCY_P95_MS, metrics,
+    )
+    metrics.increment(WEBHOOKS_DELIVERED, stats['delivered'])
+    metrics.increment(WEBHOOKS_FAILED, stats['failed'])
+    metrics.increment(WEBHOOKS_RETRIED, stats['retried'])
+    if latencies:
+        latencies.sort()
+        stats['p50_ms'] = _percentile(latencies, 0.50)
+        stats['p95_ms'] = _percentile(latencies, 0.95)
+        metrics.set_gauge(WEBHOOKS_LATENCY_P50_MS, stats['p50_ms'])
+        metrics.set_gauge(WEBHOOKS_LATENCY_P95_MS, stats['p95_ms'])
+
+
+def next_due_in(session=None) -> Optional[float]:
+    """Seconds until the next pending row is due (0 if overdue), None if nothing is pending"""
+    from server.db import db
+    session = session or db.session
+    next_at = session.execute(text(
+        "SELECT MIN(next_attempt_at) FROM webhook_outbox WHERE status IN ('pending', 'delivering')"
+    )).scalar()
+    session.commit()
+    if next_at is None:
+        return None
+    if isinstance(next_at, str):  # SQLite
+        next_at = datetime.fromisoformat(next_at)
+    return max(0.0, (next_at - datetime.utcnow()).total_seconds())
+
+
+def prune_outbox(session=None, retention_days: Optional[int] = None) -> int:
+    """Delete delivered/failed rows past retention, in chunks. Returns rows deleted"""
+    from server.config import WEBHOOK_OUTBOX_RETENTION_DAYS
+    from server.db import db
+    session = session or db.session
+    cutoff = datetime.utcnow() - timedelta(days=retention_days or WEBHOOK_OUTBOX_RETENTION_DAYS)
+    deleted = 0
+    while True:
+        result = session.execute(text("""
+            DELETE FROM webhook_outbox WHERE id IN (
+                SELECT id FROM webhook_outbox
+                WHERE status IN ('delivered', 'failed') AND created_at < :cutoff
+                LIMIT :limit
+            )
+        """), {'cutoff': cutoff, 'limit': PRUNE_CHUNK})
+        session.commit()
+        deleted += result.rowcount or 0
+        if (result.rowcount or 0) < PRUNE_CHUNK:
+            return deleted
+
+
+def maybe_prune(redis_conn=None) -> int:
+    """prune_outbox() at most once per PRUNE_INTERVAL_SECONDS across workers"""
+    try:
+        if not (redis_conn or _get_redis()).set(PRUNE_KEY, 1, nx=True, ex=PRUNE_INTERVAL_SECONDS):
+            return 0
+    except Exception:
+        return 0
+    return prune_outbox()
@@ -0,0 +1,524 @@
+"""
+WhatsApp Ingest - ack-first Baileys webhook with ordered per-chat processing
+
+The Baileys webhook used to run the whole pipeline (business lookup, LID
+resolution, lead upsert, message insert, AI enqueue) inside the HTTP request,
+one commit per message. A history sync after reconnect posts hundreds of
+messages at once; the request outlived the Node side's 10s timeout and Baileys
+retried, doubling the work. Instead:
+
+- publish_baileys_messages() drops what the pipeline skips anyway (fromMe,
+  groups / broadcasts / newsletters, no JID), appends the rest to the stream
+  wa:ingest:<p>, p = crc32(tenant|chat JID) % WA_INGEST_PARTITIONS, in one
+  pipelined round trip and wakes the partition's drain job - then the webhook acks
+- drain_partition() runs with an owner-tagged per-partition lock, so there is
+  one reader per stream: it reads batches with XREADGROUP, hands each tenant's
+  messages to routes_whatsapp.process_baileys_messages (bulk dedupe, one INSERT
+  per batch) and XACK + XDELs them afterwards
+- kick_partitions() (scheduler, every minute) wakes partitions holding entries
+  without a drain job - e.g. after a worker died mid-drain
+
+A chat always hashes to the same partition, so its messages are processed in
+arrival order while different partitions drain in parallel on separate workers.
+Entries are acked only after processing; the next drainer re-reads a crashed
+one's pending entries first. Re-processing is safe - messages are deduplicated
+by (business_id, provider_message_id).
+
+Failures are isolated and retried with backoff:
+- A tenant whose messages fail is retried one message at a time; the messages
+  that still fail stay pending with a failure count and a retry time in
+  wa:ingest:retry:<p> (WA_INGEST_RETRY_BACKOFF_SECONDS, doubling) while the rest
+  of the partition is acked. After WA_INGEST_MAX_DELIVERIES failed attempts an
+  entry moves to the wa:ingest:dead stream (logged + counted per entry);
+  scripts/replay_whatsapp_dead_letters.py puts them back.
+- DB / Redis outages (is_transient_error) are not the message's fault: the drain
+  stops without counting a failure and holds the wake key for the backoff, so
+  publishes don't restart it every request; kick_partitions() retries afterwards.
+
+Streams are never trimmed by length - entries leave only by XACK + XDEL. A
+partition holding WA_INGEST_STREAM_MAXLEN entries makes the webhook process its
+messages in the request instead.
+
+The tenant id stands in for the business: it maps to exactly one business, and
+resolving it is a DB query the webhook no longer makes.
+"""
+import json
+import logging
+import time
+import uuid
+import zlib
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+STREAM_PREFIX = "wa:ingest:"
+DEAD_LETTER_STREAM = "wa:ingest:dead"  # not trimmed - replayed or deleted by an operator
+WAKE_PREFIX = "wa:ingest:wake:"
+LOCK_PREFIX = "wa:ingest:lock:"
+RETRY_PREFIX = "wa:ingest:retry:"      # hash: entry id -> {"failures", "retry_at"}
+OUTAGE_PREFIX = "wa:ingest:outage:"    # consecutive drains stopped by an outage (backoff exponent)
+GROUP = "wa-ingest"
+CONSUMER = "drain"        # one reader per partition (the lock holder), so one name is enough
+WAKE_TTL_SECONDS = 300    # a drain job is queued or running; expires if its worker died
+LOCK_TTL_MS = 30000       # renewed after every batch
+LOCK_WAIT_SECONDS = 35.0  # a second drain job waits this long for the current holder
+
+NON_PRIVATE_SUFFIXES = ('@g.us', '@broadcast', '@newsletter')
+
+# Release / renew the partition lock only if we still own it
+_RELEASE_LOCK_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+_RENEW_LOCK_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+def _get_redis():
+    from server.services.jobs import get_redis
+    return get_redis()
+
+
+def _partitions() -> int:
+    from server.config import WA_INGEST_PARTITIONS
+    return WA_INGEST_PARTITIONS
+
+
+def stream_key(partition: int) -> str:
+    return f"{STREAM_PREFIX}{partition}"
+
+
+def partition_for(tenant_id: str, chat_jid: str, partitions: Optional[int] = None) -> int:
+    """Stable partition of a chat - the same for every process (crc32, not hash())"""
+    partitions = partitions or _partitions()
+    return zlib.crc32(f"{tenant_id}|{chat_jid}".encode()) % partitions
+
+
+def ingestible_chat(msg) -> Optional[str]:
+    """
+    Chat JID of a message the pipeline would process, None for ones it always
+    skips: not a dict, no remoteJid, fromMe, groups / broadcasts / newsletters.
+    """
+    if not isinstance(msg, dict):
+        return None
+    key = msg.get('key')
+    if not isinstance(key, dict) or key.get('fromMe'):
+        return None
+    remote_jid = key.get('remoteJid')
+    if not remote_jid or not isinstance(remote_jid, str):
+        return None
+    if remote_jid.endswith(NON_PRIVATE_SUFFIXES) or 'status@broadcast' in remote_jid:
+        return None
+    return remote_jid
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def publish_baileys_messages(tenant_id: str, messages: Iterable[dict], redis_conn=None) -> Optional[int]:
+    """
+    Append a webhook's messages to their chat partitions and wake the drain jobs.
+
+    Returns:
+        Number of messages queued, or None if Redis is unavailable or a partition
+        already holds WA_INGEST_STREAM_MAXLEN entries (the caller processes the
+        messages in the request instead)
+    """
+    from server.config import WA_INGEST_STREAM_MAXLEN
+
+    partitions = _partitions()
+    entries: List[Tuple[int, dict]] = []
+    for msg in messages:
+        chat_jid = ingestible_chat(msg)
+        if chat_jid:
+            entries.append((partition_for(tenant_id, chat_jid, partitions), msg))
+    if not entries:
+        return 0
+    touched = sorted({partition for partition, _ in entries})
+
+    try:
+        redis_conn = redis_conn or _get_redis()
+        # No MAXLEN on the XADD - trimming would evict entries the drain has not read
+        pipe = redis_conn.pipeline(transaction=False)
+        for partition in touched:
+            pipe.xlen(stream_key(partition))
+        full = [partition for partition, length in zip(touched, pipe.execute()) if length >= WA_INGEST_STREAM_MAXLEN]
+        if full:
+            logger.warning(f"[WA-INGEST] Partition(s) {full} hold {WA_INGEST_STREAM_MAXLEN}+ entries, "
+                           f"processing {len(entries)} message(s) of tenant={tenant_id} inline")
+            from server.metrics import WA_INGEST_STREAM_FULL, metrics
+            metrics.increment(WA_INGEST_STREAM_FULL)
+            return None
+
+        pipe = redis_conn.pipeline(transaction=False)
+        for partition, msg in entries:
+            pipe.xadd(stream_key(partition),
+                      {'tenant': str(tenant_id), 'msg': json.dumps(msg, separators=(',', ':'))})
+        # Wake after the XADDs: a drainer that cleared the key re-reads the stream once
+        # more, so it either sees these entries or the key is free and we enqueue one
+        for partition in touched:
+            pipe.set(f"{WAKE_PREFIX}{partition}", 1, nx=True, ex=WAKE_TTL_SECONDS)
+        woke = pipe.execute()[len(entries):]
+    except Exception as e:
+        logger.warning(f"[WA-INGEST] Stream append failed for tenant={tenant_id}, processing inline: {e}")
+        return None
+
+    for partition, was_set in zip(touched, woke):
+        if was_set:
+            enqueue_drain(partition, redis_conn)
+    return len(entries)
+
+
+def enqueue_drain(partition: int, redis_conn=None) -> bool:
+    """Enqueue the drain job of a partition; frees the wake key if that fails"""
+    try:
+        from server.services.jobs import enqueue
+        from server.jobs.whatsapp_ingest_job import whatsapp_ingest_drain_job
+        enqueue(
+            'high',
+            whatsapp_ingest_drain_job,
+            partition=partition,
+            job_id=f"wa_ingest_drain_{partition}_{uuid.uuid4().hex[:12]}",
+            timeout=int(LOCK_WAIT_SECONDS + _drain_max_seconds()) + 60,
+            retry=None,  # entries stay in the stream - kick_partitions() re-wakes it
+            ttl=WAKE_TTL_SECONDS,
+            description=f"Drain WhatsApp ingest partition {partition}"
+        )
+        return True
+    except Exception as e:
+        logger.error(f"[WA-INGEST] Failed to enqueue drain for partition {partition}: {e}")
+        try:
+            (redis_conn or _get_redis()).delete(f"{WAKE_PREFIX}{partition}")
+        except Exception:
+            pass
+        return False
+
+
+def kick_partitions(redis_conn=None, partitions: Optional[int] = None) -> int:
+    """Wake every partition that holds entries but has no drain job. Returns the count woken."""
+    redis_conn = redis_conn or _get_redis()
+    woken = 0
+    for partition in range(partitions or _partitions()):
+        if not redis_conn.xlen(stream_key(partition)):
+            continue
+        if redis_conn.set(f"{WAKE_PREFIX}{partition}", 1, nx=True, ex=WAKE_TTL_SECONDS):
+            if enqueue_drain(partition, redis_conn):
+                woken += 1
+    return woken
+
+
+def _drain_max_seconds() -> float:
+    from server.config import WA_INGEST_DRAIN_MAX_SECONDS
+    return WA_INGEST_DRAIN_MAX_SECONDS
+
+
+def _default_process(tenant_id: str, messages: List[dict]) -> int:
+    from server.routes_whatsapp import process_baileys_messages
+    try:
+        return process_baileys_messages(tenant_id, messages) or 0
+    except Exception:
+        # The business lookup / dedupe query raised - the one-by-one retry needs a clean session
+        from server.db import db
+        db.session.rollback()
+        raise
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """DB / Redis / network outage: the same messages go through once it is over, so it doesn't count against them"""
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+    from sqlalchemy.exc import DisconnectionError, InterfaceError, OperationalError, TimeoutError as PoolTimeoutError
+    return isinstance(exc, (RedisConnectionError, RedisTimeoutError, OperationalError, InterfaceError,
+                            DisconnectionError, PoolTimeoutError))
+
+
+def _backoff_seconds(attempt: int) -> float:
+    from server.config import WA_INGEST_RETRY_BACKOFF_MAX_SECONDS, WA_INGEST_RETRY_BACKOFF_SECONDS
+    return min(WA_INGEST_RETRY_BACKOFF_SECONDS * 2 ** min(attempt - 1, 20), WA_INGEST_RETRY_BACKOFF_MAX_SECONDS)
+
+
+def _ensure_group(redis_conn, key: str):
+    try:
+        redis_conn.xgroup_create(key, GROUP, id='0', mkstream=True)
+    except Exception as e:
+        if 'BUSYGROUP' not in str(e):
+            raise
+
+
+def _acquire_lock(redis_conn, key: str, token: str, wait_seconds: float) -> bool:
+    deadline = time.monotonic() + wait_seconds
+    while True:
+        if redis_conn.set(key, token, nx=True, px=LOCK_TTL_MS):
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.05)
+
+
+def group_by_tenant(entries) -> List[Tuple[str, List[Tuple[str, dict]]]]:
+    """[(entry_id, fields)] → [(tenant, [(entry_id, msg), ...])] keeping each tenant's arrival order"""
+    grouped: Dict[str, List[Tuple[str, dict]]] = {}
+    for entry_id, fields in entries:
+        fields = {_decode(k): v for k, v in fields.items()}
+        grouped.setdefault(_decode(fields['tenant']), []).append(
+            (_decode(entry_id), json.loads(_decode(fields['msg']))))
+    return list(grouped.items())
+
+
+def _process_batch(process, entries, stats: dict) -> Tuple[List[str], List[Tuple[str, str]], Optional[Exception]]:
+    """
+    Process a batch tenant by tenant. A tenant whose messages fail is retried one
+    message at a time, so one bad message doesn't hold back the others.
+
+    Returns:
+        (entry ids done, [(entry_id, error)] that failed, the outage that stopped the batch or None)
+    """
+    done: List[str] = []
+    failed: List[Tuple[str, str]] = []
+    for tenant_id, items in group_by_tenant(entries):
+        try:
+            stats['processed'] += process(tenant_id, [msg for _, msg in items])
+            done.extend(entry_id for entry_id, _ in items)
+            continue
+        except Exception as e:
+            if is_transient_error(e):
+                return done, failed, e
+            if len(items) == 1:
+                failed.append((items[0][0], f"{type(e).__name__}: {e}"))
+                continue
+            logger.warning(f"[WA-INGEST] {len(items)} message(s) of tenant={tenant_id} failed ({e}), "
+                           f"retrying one by one")
+        for entry_id, msg in items:
+            try:
+                stats['processed'] += process(tenant_id, [msg])
+                done.append(entry_id)
+            except Exception as e:
+                if is_transient_error(e):
+                    return done, failed, e
+                failed.append((entry_id, f"{type(e).__name__}: {e}"))
+    return done, failed, None
+
+
+def _due_entries(redis_conn, partition: int, entries):
+    """Pending entries past their retry time, or never failed (a drainer died holding them)"""
+    states = redis_conn.hmget(f"{RETRY_PREFIX}{partition}", [_decode(entry_id) for entry_id, _ in entries])
+    now = time.time()
+    return [entry for entry, state in zip(entries, states)
+            if not state or json.loads(_decode(state))['retry_at'] <= now]
+
+
+def _record_failures(redis_conn, key: str, partition: int, entries, failed, max_deliveries: int) -> int:
+    """
+    Count a failed attempt for each entry: below max_deliveries it stays pending
+    until its backoff passes, at max_deliveries it moves to the dead-letter stream
+    (with its partition, entry id, failure count and last error) and is XACK + XDELed.
+
+    Returns:
+        Number dead-lettered
+    """
+    from server.metrics import WA_INGEST_DEAD_LETTERED, WA_INGEST_RETRIED, metrics
+
+    retry_key = f"{RETRY_PREFIX}{partition}"
+    fields_by_id = {_decode(entry_id): fields for entry_id, fields in entries}
+    previous = redis_conn.hmget(retry_key, [entry_id for entry_id, _ in failed])
+    now = time.time()
+    dead = []
+    pipe = redis_conn.pipeline(transaction=False)
+    for (entry_id, error), state in zip(failed, previous):
+        failures = json.loads(_decode(state))['failures'] + 1 if state else 1
+        if failures < max_deliveries:
+            retry = {'failures': failures, 'retry_at': now + _backoff_seconds(failures)}
+            pipe.hset(retry_key, entry_id, json.dumps(retry))
+            continue
+        fields = {_decode(k): _decode(v) for k, v in fields_by_id[entry_id].items()}
+        fields.update(partition=str(partition), entry_id=entry_id, failures=str(failures), error=error[:500])
+        pipe.xadd(DEAD_LETTER_STREAM, fields)
+        dead.append(fields)
+    if dead:
+        dead_ids = [fields['entry_id'] for fields in dead]
+        pipe.xack(key, GROUP, *dead_ids)
+        pipe.xdel(key, *dead_ids)
+        pipe.hdel(retry_key, *dead_ids)
+    pipe.execute()
+
+    for fields in dead:
+        message_id = (json.loads(fields['msg']).get('key') or {}).get('id')
+        logger.error(f"[WA-INGEST] Dead-lettered message {message_id} of tenant={fields['tenant']} "
+                     f"(partition {partition}, entry {fields['entry_id']}) after {fields['failures']} "
+                     f"failed attempts: {fields['error']}")
+    metrics.increment(WA_INGEST_DEAD_LETTERED, len(dead))
+    metrics.increment(WA_INGEST_RETRIED, len(failed) - len(dead))
+    return len(dead)
+
+
+def _back_off(redis_conn, partition: int, error: Exception):
+    """
+    Hold the wake key for an exponential backoff after an outage, so publishes
+    don't restart the drain on every request; kick_partitions() wakes it afterwards.
+    """
+    from server.metrics import WA_INGEST_OUTAGE_BACKOFFS, metrics
+
+    outage_key = f"{OUTAGE_PREFIX}{partition}"
+    streak = redis_conn.incr(outage_key)
+    delay = _backoff_seconds(streak)
+    redis_conn.expire(outage_key, int(delay) + WAKE_TTL_SECONDS)
+    redis_conn.set(f"{WAKE_PREFIX}{partition}", 1, ex=max(1, int(delay)))
+    metrics.increment(WA_INGEST_OUTAGE_BACKOFFS)
+    logger.warning(f"[WA-INGEST] Partition {partition} backing off {delay:.0f}s (outage #{streak}): {error}")
+
+
+def drain_partition(partition: int, process: Optional[Callable[[str, List[dict]], int]] = None,
+                    redis_conn=None, batch_size: Optional[int] = None,
+                    max_seconds: Optional[float] = None, lock_wait: float = LOCK_WAIT_SECONDS) -> dict:
+    """
+    Process a partition's stream until it is empty (or max_seconds passed).
+
+    Returns:
+        {'status': 'drained' | 'yield' | 'backoff' | 'busy' | 'error',
+         'batches', 'messages', 'processed', 'failed', 'dead_lettered'}
+        'yield' = time budget used up with entries left (caller re-enqueues)
+        'backoff' = stopped by a DB / Redis outage, the wake key holds off the next drain
+        'failed' = entries left pending for a retry after their backoff
+    """
+    from server.config import WA_INGEST_BATCH_SIZE, WA_INGEST_MAX_DELIVERIES
+
+    redis_conn = redis_conn or _get_redis()
+    process = process or _default_process
+    batch_size = batch_size or WA_INGEST_BATCH_SIZE
+    max_seconds = _drain_max_seconds() if max_seconds is None else max_seconds
+    key = stream_key(partition)
+    wake_key = f"{WAKE_PREFIX}{partition}"
+    lock_key = f"{LOCK_PREFIX}{partition}"
+    retry_key = f"{RETRY_PREFIX}{partition}"
+    token = uuid.uuid4().hex
+    stats = {'status': 'drained', 'batches': 0, 'messages': 0, 'processed': 0, 'failed': 0, 'dead_lettered': 0}
+
+    if not _acquire_lock(redis_conn, lock_key, token, lock_wait):
+        stats['status'] = 'busy'  # the holder re-checks the stream before it lets go
+        return stats
+
+    start = time.monotonic()
+    try:
+        _ensure_group(redis_conn, key)
+        read_from = '0'  # our pending entries first (a previous drainer died before XACK, or retries)
+        while True:
+            response = redis_conn.xreadgroup(GROUP, CONSUMER, {key: read_from}, count=batch_size)
+            entries = response[0][1] if response else []
+            if not entries:
+                if read_from != '>':
+                    read_from = '>'
+                    continue
+                # Clear the wake key, then look once more - a publisher that found the
+                # key set before this point appended entries this read will see
+                redis_conn.delete(wake_key)
+                response = redis_conn.xreadgroup(GROUP, CONSUMER, {key: '>'}, count=batch_size)
+                entries = response[0][1] if response else []
+                if not entries:
+                    break
+                redis_conn.set(wake_key, 1, ex=WAKE_TTL_SECONDS)
+            elif read_from != '>':
+                # Each pending entry is tried at most once per drain; ones still
+                # backing off stay pending for a later drain
+                read_from = _decode(entries[-1][0])
+                entries = _due_entries(redis_conn, partition, entries)
+                if not entries:
+                    continue
+
+            done, failed, outage = _process_batch(process, entries, stats)
+            if done:
+                pipe = redis_conn.pipeline(transaction=False)
+                pipe.xack(key, GROUP, *done)
+                pipe.xdel(key, *done)
+                pipe.hdel(retry_key, *done)
+                pipe.execute()
+            if failed:
+                dead = _record_failures(redis_conn, key, partition, entries, failed, WA_INGEST_MAX_DELIVERIES)
+                stats['dead_lettered'] += dead
+                stats['failed'] += len(failed) - dead
+            stats['batches'] += 1
+            stats['messages'] += len(entries)
+            if outage is not None:
+                stats['status'] = 'backoff'
+                _back_off(redis_conn, partition, outage)
+                break
+
+            redis_conn.eval(_RENEW_LOCK_LUA, 1, lock_key, token, LOCK_TTL_MS)
+            if time.monotonic() - start >= max_seconds:
+                stats['status'] = 'yield'
+                break
+        if stats['status'] != 'backoff':
+            redis_conn.delete(f"{OUTAGE_PREFIX}{partition}")
+    except Exception as e:
+        logger.error(f"[WA-INGEST] Drain of partition {partition} failed after {stats['messages']} message(s): {e}")
+        stats['status'] = 'error'
+        try:
+            redis_conn.delete(wake_key)  # let the next publish / kick_partitions() retry
+        except Exception:
+            pass
+    finally:
+        try:
+            redis_conn.eval(_RELEASE_LOCK_LUA, 1, lock_key, token)
+        except Exception as e:
+            logger.warning(f"[WA-INGEST] Failed to release partition {partition} lock (expires): {e}")
+
+    if stats['messages']:
+        logger.info(f"[WA-INGEST] Partition {partition}: {stats['messages']} message(s) in {stats['batches']} "
+                    f"batch(es), {stats['processed']} processed, {stats['failed']} to retry, "
+                    f"{time.monotonic() - start:.2f}s ({stats['status']})")
+    return stats
+
+
+def iter_dead_letters(redis_conn=None, tenant_id: Optional[str] = None):
+    """Yield (dead-letter id, fields) from wa:ingest:dead, oldest first"""
+    redis_conn = redis_conn or _get_redis()
+    after = '-'
+    while True:
+        batch = redis_conn.xrange(DEAD_LETTER_STREAM, min=after, count=100)
+        if not batch:
+            return
+        for dead_id, fields in batch:
+            fields = {_decode(k): _decode(v) for k, v in fields.items()}
+            if tenant_id is None or fields.get('tenant') == str(tenant_id):
+                yield _decode(dead_id), fields
+        after = f"({_decode(batch[-1][0])}"  # exclusive: entries after the last one seen
+
+
+def replay_dead_letters(redis_conn=None, tenant_id: Optional[str] = None, limit: Optional[int] = None) -> int:
+    """
+    Put dead-lettered messages back on their chat partitions (oldest first),
+    remove them from wa:ingest:dead and wake the drains. Run once whatever made
+    them fail is fixed; re-processing is deduplicated like any re-delivery.
+
+    Returns:
+        Number of messages replayed
+    """
+    redis_conn = redis_conn or _get_redis()
+    partitions = _partitions()
+    touched = set()
+    replayed = 0
+    for dead_id, fields in iter_dead_letters(redis_conn, tenant_id):
+        if limit is not None and replayed >= limit:
+            break
+        chat_jid = ingestible_chat(json.loads(fields['msg'])) or ''
+        partition = partition_for(fields['tenant'], chat_jid, partitions)  # the partition count may have changed
+        pipe = redis_conn.pipeline(transaction=False)
+        pipe.xadd(stream_key(partition), {'tenant': fields['tenant'], 'msg': fields['msg']})
+        pipe.xdel(DEAD_LETTER_STREAM, dead_id)
+        pipe.execute()
+        touched.add(partition)
+        replayed += 1
+
+    for partition in sorted(touched):
+        if redis_conn.set(f"{WAKE_PREFIX}{partition}", 1, nx=True, ex=WAKE_TTL_SECONDS):
+            enqueue_drain(partition, redis_conn)
+    if replayed:
+        logger.info(f"[WA-INGEST] Replayed {replayed} dead-lettered message(s) to {len(touched)} partition(s)")
+    return replayed
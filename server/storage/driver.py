@@ -3,7 +3,7 @@ Abstract base class for storage drivers
 Defines the interface that all storage implementations must follow
 """
 from abc import ABC, abstractmethod
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, BinaryIO
 
 
 class StorageDriver(ABC):
@@ -39,6 +39,48 @@ class StorageDriver(ABC):
         """
         pass
     
+    def put_file(
+        self,
+        key: str,
+        fileobj: BinaryIO,
+        content_type: str = 'application/octet-stream',
+        metadata: Optional[Dict[str, str]] = None
+    ) -> str:
+        """
+        Upload a binary file object to storage
+        
+        Default implementation reads the whole file and calls put_bytes();
+        drivers that support streaming/multipart uploads should override it.
+        
+        Args:
+            key: Storage key (path) for the file
+            fileobj: Readable binary file object
+            content_type: MIME type of the file
+            metadata: Optional metadata dictionary
+            
+        Returns:
+            Storage key of the uploaded file
+            
+        Raises:
+            StorageError: If upload fails
+        """
+        return self.put_bytes(key, fileobj.read(), content_type=content_type, metadata=metadata)
+    
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        """
+        Download a file's content
+        
+        Args:
+            key: Storage key (path) of the file
+            
+        Returns:
+            File content as bytes, or None if the file does not exist
+            
+        Raises:
+            StorageError: If download fails or the driver does not support it
+        """
+        raise StorageError(f"{type(self).__name__} does not support get_bytes")
+    
     @abstractmethod
     def delete(self, key: str) -> bool:
         """
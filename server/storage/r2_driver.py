@@ -3,11 +3,12 @@ Cloudflare R2 storage driver implementation
 Uses boto3 S3-compatible API to interact with R2
 """
 import boto3
+from boto3.exceptions import S3UploadFailedError
 from botocore.client import Config
 from botocore.exceptions import ClientError
 import os
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, BinaryIO
 from .driver import StorageDriver, StorageError
 
 logger = logging.getLogger(__name__)
@@ -94,6 +95,42 @@ class R2StorageDriver(StorageDriver):
             logger.error(f"[R2_STORAGE] Upload failed for {key}: {e}")
             raise StorageError(f"Failed to upload to R2: {e}")
     
+    def put_file(
+        self,
+        key: str,
+        fileobj: BinaryIO,
+        content_type: str = 'application/octet-stream',
+        metadata: Optional[Dict[str, str]] = None
+    ) -> str:
+        """Upload a file object to R2 (boto3 managed multipart upload - not held in memory)"""
+        try:
+            extra_args = {'ContentType': content_type}
+            if metadata:
+                extra_args['Metadata'] = metadata
+            
+            self.s3_client.upload_fileobj(fileobj, self.bucket_name, key, ExtraArgs=extra_args)
+            logger.info(f"[R2_STORAGE] Uploaded file: {key}")
+            return key
+            
+        except (ClientError, S3UploadFailedError) as e:
+            logger.error(f"[R2_STORAGE] File upload failed for {key}: {e}")
+            raise StorageError(f"Failed to upload to R2: {e}")
+    
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        """Download a file from R2 (None if not found)"""
+        try:
+            response = self.s3_client.get_object(
+                Bucket=self.bucket_name,
+                Key=key
+            )
+            return response['Body'].read()
+            
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+                return None
+            logger.error(f"[R2_STORAGE] Download failed for {key}: {e}")
+            raise StorageError(f"Failed to download from R2: {e}")
+    
     def delete(self, key: str) -> bool:
         """Delete a file from R2"""
         try:
@@ -20,16 +20,15 @@ from rq import Retry  # 🔥 FIX: Import Retry for proper RQ retry handling
 from server.models_sql import CallLog, Business, Lead, BusinessTopic
 from server.db import db  # 🔥 FIX: Import db for creating RecordingRun entries
 
+logger = logging.getLogger(__name__)
+
 # Import summarize job for post-transcription processing
 try:
     from server.jobs.summarize_call_job import enqueue_summarize_call
     SUMMARIZE_AVAILABLE = True
-except ImportError:
+except ImportError as e:
     SUMMARIZE_AVAILABLE = False
-    logger.warning("[SUMMARIZE] summarize_call_job not available - summarization disabled")
-
-
-logger = logging.getLogger(__name__)
+    logger.warning(f"[SUMMARIZE] summarize_call_job not available - summarization disabled: {e}")
 
 log = logging.getLogger("tasks.recording")
 
@@ -581,15 +580,17 @@ def process_recording_async(form_data):
                         audio_duration_sec = float(call_log.duration)
                         log.info(f"[OFFLINE_STT] Using call duration as fallback: {audio_duration_sec}s")
                 
-                from server.services.lead_extraction_service import transcribe_recording_with_whisper, extract_lead_from_transcript
+                from server.services.lead_extraction_service import extract_lead_from_transcript
+                from server.services.recording_pipeline import transcribe_recording_chunked
                 
                 # 🔥 PRIMARY: Transcribe from full recording (best quality)
+                # Silence-split segments transcribed in parallel (recording_pipeline.py)
                 if not DEBUG:
                     log.debug(f"[OFFLINE_STT] Starting Whisper transcription for {call_sid}")
                 log.info(f"[OFFLINE_STT] Starting transcription from recording for {call_sid}")
                 logger.info(f"🎤 [OFFLINE_STT] Transcribing recording for {call_sid}")
                 
-                final_transcript = transcribe_recording_with_whisper(audio_file, call_sid)
+                final_transcript = transcribe_recording_chunked(audio_file, call_sid)
                 
                 # ✅ Check if transcription succeeded
                 if not final_transcript or len(final_transcript.strip()) < 10:
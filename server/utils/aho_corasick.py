@@ -0,0 +1,116 @@
+"""
+Aho-Corasick keyword automaton - find which of many keywords occur in a text in one pass
+Used by the status catalog (auto-status keyword scoring, status families) and the topic classifier
+
+Semantics match `keyword in text` for every keyword: find() returns the indices
+of all patterns that occur anywhere in the text (overlapping and nested matches
+included), so callers can reproduce `sum(1 for kw in kws if kw in text)` or
+"first pattern in list order that occurs" exactly.
+
+Pure Python, no dependencies. Transitions are resolved through failure links
+the first time a (state, char) pair is seen and memoized, so a warm automaton
+costs one dict lookup per character regardless of how many patterns it holds.
+Instances are immutable after construction apart from that memo (safe to share
+between threads - a racing write stores the same value).
+"""
+from collections import deque
+from typing import Dict, Iterable, List, Set
+
+
+class KeywordAutomaton:
+    """Compiled set of literal patterns (empty patterns never match)"""
+
+    __slots__ = ("patterns", "_goto", "_fail", "_out", "_delta")
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = list(patterns)
+        goto: List[Dict[str, int]] = [{}]
+        out: List[List[int]] = [[]]
+
+        for index, pattern in enumerate(self.patterns):
+            if not pattern:
+                continue
+            state = 0
+            for ch in pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                state = nxt
+            out[state].append(index)
+
+        # Failure links (BFS); each state's output also carries its suffixes' outputs
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                target = goto[f].get(ch, 0)
+                fail[nxt] = target if target != nxt else 0
+                if out[fail[nxt]]:
+                    out[nxt] = out[nxt] + out[fail[nxt]]
+
+        self._goto = goto
+        self._fail = fail
+        self._out = [tuple(o) for o in out]
+        self._delta = [dict(g) for g in goto]  # goto + memoized failure transitions
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def _resolve(self, state: int, ch: str) -> int:
+        s = state
+        while True:
+            nxt = self._goto[s].get(ch)
+            if nxt is not None:
+                break
+            if not s:
+                nxt = 0
+                break
+            s = self._fail[s]
+        self._delta[state][ch] = nxt
+        return nxt
+
+    def find(self, text: str) -> Set[int]:
+        """Indices of every pattern that occurs in text"""
+        found: Set[int] = set()
+        if not text or len(self._goto) == 1:
+            return found
+        delta, out, root = self._delta, self._out, self._delta[0]
+        state = 0
+        for ch in text:
+            if state:
+                nxt = delta[state].get(ch)
+                state = nxt if nxt is not None else self._resolve(state, ch)
+            else:
+                state = root.get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+    def contains_any(self, text: str) -> bool:
+        """True if any pattern occurs in text (stops at the first match)"""
+        if not text or len(self._goto) == 1:
+            return False
+        delta, out, root = self._delta, self._out, self._delta[0]
+        state = 0
+        for ch in text:
+            if state:
+                nxt = delta[state].get(ch)
+                state = nxt if nxt is not None else self._resolve(state, ch)
+            else:
+                state = root.get(ch, 0)
+            if out[state]:
+                return True
+        return False
+
+    def first(self, text: str) -> int:
+        """Lowest pattern index that occurs in text, or -1"""
+        found = self.find(text)
+        return min(found) if found else -1
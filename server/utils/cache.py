@@ -1,92 +1,545 @@
 """
-Simple in-memory TTL cache for AI settings to prevent bottlenecks
-Reduces database queries for frequently accessed business settings
+Shared in-process cache with optional Redis L2 and cross-process invalidation
+Used by the prompt, business settings, agent, AI settings and topic caches
+
+Features:
+- O(1) LRU eviction (OrderedDict) with a size bound
+- TTL per entry + stale-while-revalidate (get_or_load serves a stale value
+  and refreshes it in the background)
+- Single-flight loading: concurrent misses for one key run the loader once
+- Optional Redis L2 tier (pickled values) shared by all workers / replicas
+- Invalidations (delete / delete_prefix / clear) of named caches are published
+  on Redis pub/sub and applied by every process that holds the same cache
+- hit / miss / stale / eviction / load counters in server.metrics
+
+Redis features are fail-open: without REDIS_URL (or when Redis is down) the
+cache behaves as a plain per-process LRU.
 """
-import time
+import json
+import logging
+import os
+import pickle
 import threading
-from typing import Any, Optional, Dict, Tuple
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "cache:invalidate"
+L2_KEY_PREFIX = "cache:"
+REDIS_RETRY_SECONDS = 30  # after a Redis error, skip Redis for this long
+
+# Identifies this process on the invalidation channel (own messages are skipped)
+_PROCESS_ID = uuid.uuid4().hex
+
+_registry: Dict[str, "weakref.WeakSet"] = {}
+_registry_lock = threading.Lock()
+
+_redis_down_until = 0.0
+_listener_pid: Optional[int] = None  # process the listener was (or was not) started for
+_listener_started = False
+_listener_lock = threading.Lock()
+
+
+def _metric(counter: str, name: str, value: int = 1):
+    try:
+        from server.metrics import metrics
+        metrics.increment(f"{counter}.{name}", value)
+    except Exception:
+        pass
+
+
+def _get_redis():
+    """Redis connection for L2 / pub/sub, or None (no REDIS_URL or recently failed)"""
+    if not os.getenv("REDIS_URL") or time.time() < _redis_down_until:
+        return None
+    try:
+        from server.services.jobs import get_redis
+        return get_redis()
+    except Exception as e:
+        _redis_failed(e)
+        return None
+
+
+def _redis_failed(error: Exception):
+    global _redis_down_until
+    _redis_down_until = time.time() + REDIS_RETRY_SECONDS
+    logger.warning(f"[CACHE] Redis unavailable, using local cache only for {REDIS_RETRY_SECONDS}s: {error}")
+
+
+def _encode_key(key: Any) -> str:
+    return json.dumps(key, ensure_ascii=False)
+
+
+def _decode_key(raw: str) -> Any:
+    key = json.loads(raw)
+    return tuple(key) if isinstance(key, list) else key
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "stale_until")
+
+    def __init__(self, value: Any, expires_at: float, stale_until: float):
+        self.value = value
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+
+
+class _Flight:
+    """In-progress load shared by concurrent callers of get_or_load"""
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
 
 class TTLCache:
     """
-    Thread-safe Time-To-Live cache implementation
-    Stores values with expiration timestamps
+    Thread-safe LRU cache with per-entry TTL
+
+    Keys must be JSON-serializable (str / int / tuples of those) when the cache
+    is named, since they travel over the invalidation channel and into L2 keys.
     """
-    def __init__(self, ttl_seconds: int = 120, max_size: int = 2000):
+
+    def __init__(self, ttl_seconds: float = 120, max_size: int = 2000, name: Optional[str] = None,
+                 stale_seconds: float = 0, l2: bool = False, clock: Callable[[], float] = time.time):
         """
-        Initialize TTL cache
-        
+        Initialize cache
+
         Args:
-            ttl_seconds: Time-to-live in seconds (default: 120s = 2 minutes)
-            max_size: Maximum number of entries (default: 2000)
+            ttl_seconds: Default time-to-live in seconds (default: 120s = 2 minutes)
+            max_size: Maximum number of entries (default: 2000), LRU eviction
+            name: Cache name - enables metrics and cross-process invalidation
+            stale_seconds: How long after expiry get_or_load may serve the old value
+                while it reloads in the background (0 = disabled)
+            l2: Also store values in Redis (values must be picklable)
+            clock: Time source (wall clock - L2 expiry is shared between hosts)
         """
         self.ttl_seconds = ttl_seconds
         self.max_size = max_size
-        self._cache: Dict[Any, Tuple[Any, float]] = {}
+        self.name = name
+        self.stale_seconds = stale_seconds
+        self.l2 = l2
+        self._clock = clock
+        self._cache: "OrderedDict[Any, _Entry]" = OrderedDict()
         self._lock = threading.Lock()
-    
+        self._flights: Dict[Any, _Flight] = {}
+        self._stats = {"hits": 0, "misses": 0, "stale_hits": 0, "evictions": 0, "loads": 0, "l2_hits": 0}
+        if name:
+            with _registry_lock:
+                _registry.setdefault(name, weakref.WeakSet()).add(self)
+
+    # ─── Local tier ───────────────────────────────────────
+
+    def _count(self, stat: str, value: int = 1):
+        self._stats[stat] += value
+        if self.name:
+            _metric(f"cache_{stat}", self.name, value)
+
+    def _lookup(self, key: Any, now: float) -> Tuple[Optional[_Entry], bool]:
+        """(entry, is_fresh) - caller holds the lock; drops entries past their stale window"""
+        entry = self._cache.get(key)
+        if entry is None:
+            return None, False
+        if now > entry.stale_until:
+            del self._cache[key]
+            return None, False
+        self._cache.move_to_end(key)
+        return entry, now <= entry.expires_at
+
     def get(self, key: Any) -> Optional[Any]:
         """
         Get value from cache if not expired
-        
+
         Args:
             key: Cache key
-            
+
         Returns:
             Cached value or None if not found/expired
         """
+        if self.name and _listener_pid != os.getpid():
+            ensure_invalidation_listener()
         with self._lock:
-            if key not in self._cache:
-                return None
-            
-            value, expiry = self._cache[key]
-            
-            # Check if expired
-            if time.time() > expiry:
-                del self._cache[key]
-                return None
-            
+            entry, fresh = self._lookup(key, self._clock())
+            if fresh:
+                self._count("hits")
+                return entry.value
+        value = self._l2_get(key)
+        if value is not None:
             return value
-    
-    def set(self, key: Any, value: Any) -> None:
+        with self._lock:
+            self._count("misses")
+        return None
+
+    def set(self, key: Any, value: Any, ttl: Optional[float] = None) -> None:
         """
         Set value in cache with TTL
-        
+
         Args:
             key: Cache key
             value: Value to cache
+            ttl: Override the default TTL for this entry
         """
+        ttl = self.ttl_seconds if ttl is None else ttl
+        self._set_local(key, value, self._clock() + ttl)
+        self._l2_set(key, value, ttl)
+
+    def _set_local(self, key: Any, value: Any, expires_at: float) -> None:
         with self._lock:
-            # Enforce max size with simple eviction
-            # Note: This removes the first inserted item (FIFO), not true LRU
-            # For production workload with high hit rate, FIFO is acceptable
-            if len(self._cache) >= self.max_size and key not in self._cache:
-                # Remove first (oldest) entry
-                oldest_key = next(iter(self._cache))
-                del self._cache[oldest_key]
-            
-            expiry = time.time() + self.ttl_seconds
-            self._cache[key] = (value, expiry)
-    
-    def delete(self, key: Any) -> None:
+            self._cache[key] = _Entry(value, expires_at, expires_at + self.stale_seconds)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+                self._count("evictions")
+
+    def delete(self, key: Any, broadcast: bool = True) -> None:
         """
         Remove key from cache (for invalidation)
-        
+
         Args:
             key: Cache key to remove
+            broadcast: Also remove it in other processes (and L2)
         """
         with self._lock:
             self._cache.pop(key, None)
-    
-    def clear(self) -> None:
+        if broadcast:
+            self._l2_delete([key])
+            self._publish("delete", key)
+
+    def delete_prefix(self, prefix: str, broadcast: bool = True) -> int:
+        """Remove all string keys starting with prefix; returns the local count removed"""
+        with self._lock:
+            keys = [k for k in self._cache if isinstance(k, str) and k.startswith(prefix)]
+            for k in keys:
+                del self._cache[k]
+        if broadcast:
+            self._l2_delete_prefix(prefix)
+            self._publish("delete_prefix", prefix)
+        return len(keys)
+
+    def clear(self, broadcast: bool = True) -> None:
         """Clear all cached entries"""
         with self._lock:
             self._cache.clear()
-    
+        if broadcast:
+            self._l2_delete_prefix("")
+            self._publish("clear", None)
+
     def __contains__(self, key: Any) -> bool:
         """Check if key exists and is not expired"""
-        return self.get(key) is not None
-    
+        with self._lock:
+            entry, fresh = self._lookup(key, self._clock())
+            return fresh
+
     def size(self) -> int:
         """Get current cache size"""
         with self._lock:
             return len(self._cache)
+
+    def keys(self) -> list:
+        """Snapshot of the current keys (LRU order, oldest first)"""
+        with self._lock:
+            return list(self._cache)
+
+    def items(self) -> list:
+        """Snapshot of unexpired (key, value) pairs - no LRU update, not counted as hits"""
+        now = self._clock()
+        with self._lock:
+            return [(k, e.value) for k, e in self._cache.items() if now <= e.expires_at]
+
+    def purge_expired(self) -> int:
+        """Drop entries past their stale window; returns the number removed"""
+        now = self._clock()
+        with self._lock:
+            expired = [k for k, e in self._cache.items() if now > e.stale_until]
+            for k in expired:
+                del self._cache[k]
+            return len(expired)
+
+    def stats(self) -> Dict[str, Any]:
+        """Entry counts and hit/miss/eviction counters"""
+        now = self._clock()
+        with self._lock:
+            total = len(self._cache)
+            expired = sum(1 for e in self._cache.values() if now > e.expires_at)
+            return {
+                "name": self.name,
+                "total_entries": total,
+                "expired_entries": expired,
+                "valid_entries": total - expired,
+                "max_size": self.max_size,
+                **self._stats,
+            }
+
+    # ─── Loading ──────────────────────────────────────────
+
+    def get_or_load(self, key: Any, loader: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """
+        Get a value, loading it on a miss
+
+        - Fresh hit: returned as-is
+        - Stale hit (within stale_seconds after expiry): returned, reloaded in background
+        - Miss: L2, then loader - concurrent callers for the same key share one load
+
+        A loader returning None is not cached. Loader exceptions propagate to
+        every caller waiting on that load.
+        """
+        if self.name and _listener_pid != os.getpid():
+            ensure_invalidation_listener()
+        with self._lock:
+            entry, fresh = self._lookup(key, self._clock())
+            if entry is not None:
+                if fresh:
+                    self._count("hits")
+                    return entry.value
+                self._count("stale_hits")
+                stale_value = entry.value
+            else:
+                stale_value = None
+
+        if stale_value is not None:
+            self._refresh_in_background(key, loader, ttl)
+            return stale_value
+
+        value = self._l2_get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            self._count("misses")
+        return self._load(key, loader, ttl)
+
+    def _load(self, key: Any, loader: Callable[[], Any], ttl: Optional[float]) -> Any:
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+            with self._lock:
+                self._count("loads")
+            if flight.value is not None:
+                self.set(key, flight.value, ttl)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _refresh_in_background(self, key: Any, loader: Callable[[], Any], ttl: Optional[float]):
+        with self._lock:
+            if key in self._flights:
+                return  # already refreshing
+
+        app = None
+        try:
+            from flask import current_app, has_app_context
+            if has_app_context():
+                app = current_app._get_current_object()
+        except Exception:
+            pass
+
+        def refresh():
+            try:
+                if app is not None:
+                    with app.app_context():
+                        self._load(key, loader, ttl)
+                else:
+                    self._load(key, loader, ttl)
+            except Exception as e:
+                logger.warning(f"[CACHE] Background refresh failed for {self.name or 'cache'}:{key}: {e}")
+
+        threading.Thread(target=refresh, daemon=True, name=f"cache-refresh-{self.name or 'cache'}").start()
+
+    # ─── L2 (Redis) ───────────────────────────────────────
+
+    def _l2_key(self, key: Any) -> str:
+        return f"{L2_KEY_PREFIX}{self.name}:{_encode_key(key)}"
+
+    def _l2_redis(self):
+        if not (self.l2 and self.name):
+            return None
+        try:
+            from server.config import CACHE_L2_ENABLED
+        except Exception:
+            return None
+        return _get_redis() if CACHE_L2_ENABLED else None
+
+    def _l2_get(self, key: Any) -> Optional[Any]:
+        redis_conn = self._l2_redis()
+        if redis_conn is None:
+            return None
+        try:
+            raw = redis_conn.get(self._l2_key(key))
+            if raw is None:
+                return None
+            value, expires_at = pickle.loads(raw)
+        except Exception as e:
+            _redis_failed(e)
+            return None
+        if self._clock() > expires_at:
+            return None
+        self._set_local(key, value, expires_at)
+        with self._lock:
+            self._count("l2_hits")
+        return value
+
+    def _l2_set(self, key: Any, value: Any, ttl: float):
+        redis_conn = self._l2_redis()
+        if redis_conn is None:
+            return
+        try:
+            payload = pickle.dumps((value, self._clock() + ttl))
+            redis_conn.set(self._l2_key(key), payload, px=max(1, int((ttl + self.stale_seconds) * 1000)))
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            logger.debug(f"[CACHE] {self.name}:{key} not stored in L2 (not picklable): {e}")
+        except Exception as e:
+            _redis_failed(e)
+
+    def _l2_delete(self, keys):
+        redis_conn = self._l2_redis()
+        if redis_conn is None:
+            return
+        try:
+            redis_conn.delete(*[self._l2_key(k) for k in keys])
+        except Exception as e:
+            _redis_failed(e)
+
+    def _l2_delete_prefix(self, prefix: str):
+        redis_conn = self._l2_redis()
+        if redis_conn is None:
+            return
+        # JSON-encoded string keys start with a quote
+        pattern = f"{L2_KEY_PREFIX}{self.name}:" + (_encode_key(prefix)[:-1] if prefix else "") + "*"
+        try:
+            keys = list(redis_conn.scan_iter(match=pattern, count=500))
+            if keys:
+                redis_conn.delete(*keys)
+        except Exception as e:
+            _redis_failed(e)
+
+    # ─── Cross-process invalidation ───────────────────────
+
+    def _publish(self, op: str, key: Any):
+        if not self.name:
+            return
+        _metric("cache_invalidations", self.name)
+        publish_invalidation(self.name, op, key)
+
+    def _apply_invalidation(self, op: str, key: Any):
+        if op == "delete":
+            self.delete(key, broadcast=False)
+        elif op == "delete_prefix":
+            self.delete_prefix(key, broadcast=False)
+        elif op == "clear":
+            self.clear(broadcast=False)
+
+
+def _invalidation_enabled() -> bool:
+    try:
+        from server.config import CACHE_INVALIDATION_ENABLED
+        return CACHE_INVALIDATION_ENABLED
+    except Exception:
+        return False
+
+
+def publish_invalidation(name: str, op: str, key: Any = None) -> bool:
+    """Publish an invalidation for cache `name` to all processes; never raises"""
+    if not _invalidation_enabled():
+        return False
+    redis_conn = _get_redis()
+    if redis_conn is None:
+        return False
+    ensure_invalidation_listener()
+    try:
+        message = json.dumps({"src": _PROCESS_ID, "cache": name, "op": op,
+                              "key": None if key is None else _encode_key(key)}, ensure_ascii=False)
+        redis_conn.publish(INVALIDATION_CHANNEL, message)
+        return True
+    except Exception as e:
+        _redis_failed(e)
+        return False
+
+
+def apply_invalidation_message(raw) -> bool:
+    """Apply a message from the invalidation channel to this process' caches"""
+    try:
+        if isinstance(raw, bytes):
+            raw = raw.decode("utf-8")
+        message = json.loads(raw)
+        if message.get("src") == _PROCESS_ID:
+            return False
+        key = _decode_key(message["key"]) if message.get("key") is not None else None
+        with _registry_lock:
+            caches = list(_registry.get(message["cache"], ()))
+        for cache in caches:
+            cache._apply_invalidation(message["op"], key)
+        return bool(caches)
+    except Exception as e:
+        logger.warning(f"[CACHE] Ignoring bad invalidation message: {e}")
+        return False
+
+
+def _listen():
+    while True:
+        redis_conn = _get_redis()
+        if redis_conn is None:
+            time.sleep(REDIS_RETRY_SECONDS)
+            continue
+        try:
+            pubsub = redis_conn.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(INVALIDATION_CHANNEL)
+            logger.info(f"[CACHE] Listening for invalidations on {INVALIDATION_CHANNEL}")
+            for message in pubsub.listen():
+                if message and message.get("type") == "message":
+                    apply_invalidation_message(message["data"])
+        except Exception as e:
+            _redis_failed(e)
+            time.sleep(1)
+
+
+def ensure_invalidation_listener() -> bool:
+    """
+    Start the invalidation subscriber thread for this process (idempotent, fork-safe)
+
+    Called lazily by named caches on access; safe to call at startup as well.
+    """
+    global _listener_pid
+    pid = os.getpid()
+    if _listener_pid == pid:
+        return _listener_started
+    with _listener_lock:
+        if _listener_pid != pid:
+            _start_listener(pid)
+    return _listener_started
+
+
+def _start_listener(pid: int):
+    global _listener_pid, _listener_started
+    _listener_started = _invalidation_enabled() and bool(os.getenv("REDIS_URL"))
+    if _listener_started:
+        threading.Thread(target=_listen, daemon=True, name="cache-invalidation").start()
+    _listener_pid = pid
+
+
+def cache_stats() -> Dict[str, list]:
+    """stats() of every named cache in this process, by name"""
+    with _registry_lock:
+        named = {name: list(caches) for name, caches in _registry.items()}
+    return {name: [c.stats() for c in caches] for name, caches in named.items() if caches}
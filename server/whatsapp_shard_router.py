@@ -52,17 +52,14 @@ def _hash_shard(business_id: int, num_shards: int) -> int:
     return (int(h, 16) % num_shards) + 1
 
 
-def get_baileys_base_url(business_id: int, whatsapp_shard: int | None = None) -> str:
+def get_shard_id(business_id: int, whatsapp_shard: int | None = None) -> int:
     """
-    Get the Baileys service URL for a given business.
+    Get the Baileys shard ID (1-based) for a given business.
 
     Args:
         business_id: The Business ID
         whatsapp_shard: Explicit shard assignment from Business table.
                         If None, falls back to hash-based routing.
-
-    Returns:
-        Base URL for the Baileys shard (e.g. "http://baileys-1:3300")
     """
     num_shards = BAILEYS_SHARDS
 
@@ -72,12 +69,24 @@ def get_baileys_base_url(business_id: int, whatsapp_shard: int | None = None) ->
                 "Business %d has whatsapp_shard=%d but only %d shards configured — remapping",
                 business_id, whatsapp_shard, num_shards,
             )
-            shard_id = ((whatsapp_shard - 1) % num_shards) + 1
-        else:
-            shard_id = whatsapp_shard
-    else:
-        shard_id = _hash_shard(business_id, num_shards)
+            return ((whatsapp_shard - 1) % num_shards) + 1
+        return whatsapp_shard
+    return _hash_shard(business_id, num_shards)
+
+
+def get_baileys_base_url(business_id: int, whatsapp_shard: int | None = None) -> str:
+    """
+    Get the Baileys service URL for a given business.
 
+    Args:
+        business_id: The Business ID
+        whatsapp_shard: Explicit shard assignment from Business table.
+                        If None, falls back to hash-based routing.
+
+    Returns:
+        Base URL for the Baileys shard (e.g. "http://baileys-1:3300")
+    """
+    shard_id = get_shard_id(business_id, whatsapp_shard)
     url = _get_shard_url(shard_id)
     logger.debug("Business %d → shard %d → %s", business_id, shard_id, url)
     return url
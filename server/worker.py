@@ -96,7 +96,8 @@ logger.info(f"Will listen to queues: {LISTEN_QUEUES}")
 # Initialize Flask app context (needed for DB access)
 try:
     from server.app_factory import create_app
-    app = create_app()
+    # Worker role: no HTTP blueprints or call-path warmups, just app_context + DB
+    app = create_app(role=os.getenv('SERVICE_ROLE', 'worker'))
     logger.info("✓ Flask app initialized")
 except Exception as e:
     log_fatal_error("Flask app initialization", e)
@@ -188,11 +189,26 @@ logger.info("=" * 80)
 # Import Redis and job processing modules
 try:
     import redis
-    from rq import Worker, Queue
+    from rq import Worker, SimpleWorker, Queue
     logger.info("✓ Redis and RQ modules imported successfully")
 except Exception as e:
     log_fatal_error("Importing redis/rq modules", e)
 
+from server.config import RQ_IN_PROCESS_QUEUES
+
+
+class ProsaasWorker(Worker):
+    """
+    rq.Worker that forks a child per job, except for jobs from RQ_IN_PROCESS_QUEUES
+    (receipts / previews): those run in the worker process like SimpleWorker, so
+    the browser pool, extraction processes and HTTP sessions outlive a job.
+    """
+
+    def execute_job(self, job, queue):
+        if queue.name in RQ_IN_PROCESS_QUEUES:
+            return SimpleWorker.execute_job(self, job, queue)
+        return super().execute_job(job, queue)
+
 # Connect to Redis
 try:
     redis_conn = redis.from_url(REDIS_URL)
@@ -314,12 +330,14 @@ def main():
                 logger.error(f"   → error: {value}")
                 logger.error("=" * 60)
             
-            worker = Worker(
+            # Fork per job, except on the browser-pool queues (RQ_IN_PROCESS_QUEUES)
+            # where jobs run in this process and reuse its browsers
+            in_process = sorted(set(LISTEN_QUEUES) & RQ_IN_PROCESS_QUEUES)
+            worker_class = ProsaasWorker if in_process else Worker
+            worker = worker_class(
                 QUEUES,
                 connection=redis_conn,
                 name=f'prosaas-worker-{os.getpid()}',
-                # Don't fork - run jobs in main process for simplicity
-                # This is fine for our use case (Gmail sync, Playwright, etc.)
                 disable_default_exception_handler=False,
             )
             
@@ -336,14 +354,22 @@ def main():
                 logger.info("=" * 60)
                 
                 # Call original implementation
-                return original_execute_job(job, queue)
+                try:
+                    return original_execute_job(job, queue)
+                finally:
+                    if queue is not None and queue.name in RQ_IN_PROCESS_QUEUES:
+                        # Jobs share this process's app context - don't let one job's
+                        # session (open transaction, identity map) leak into the next
+                        from server.db import db
+                        db.session.remove()
             
             worker.execute_job = logged_execute_job
             
             # Register custom failure handler for better logging
             worker.push_exc_handler(failed_job_handler)
             
-            logger.info(f"✓ Worker created: {worker.name}")
+            logger.info(f"✓ Worker created: {worker.name} ({worker_class.__name__}, "
+                        f"in-process queues: {in_process or 'none'})")
             logger.info(f"✓ Worker will process jobs from queues: {[q.name for q in worker.queues]}")
             logger.info("✓ Worker will log: 🔨 JOB PICKED when picking up jobs")
         except Exception as e:
@@ -0,0 +1,76 @@
+"""
+Tests for the role-scoped app factory and lazy SDK imports
+SERVICE_ROLE resolution, per-role blueprints, and heavy SDKs staying out of boot
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+from server import app_factory
+from server.app_factory import ROLE_BLUEPRINTS, get_service_role
+from server.services.lazy_services import lazy_module, sdk_available
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def test_service_role_is_normalized(monkeypatch):
+    monkeypatch.delenv('SERVICE_ROLE', raising=False)
+    assert get_service_role() == 'all'
+    assert get_service_role(' Calls ') == 'calls'
+
+    monkeypatch.setenv('SERVICE_ROLE', 'worker')
+    assert get_service_role() == 'worker'
+    assert get_service_role('scheduler') == 'scheduler'  # explicit role wins
+
+    monkeypatch.setenv('SERVICE_ROLE', 'migrate')  # one-off jobs keep the full app
+    assert get_service_role() == 'all'
+    assert ROLE_BLUEPRINTS['api'] is None and ROLE_BLUEPRINTS['all'] is None
+
+
+@pytest.mark.parametrize("role,expected", [
+    ('worker', {'health'}),
+    ('scheduler', {'health'}),
+    ('calls', {'health', 'twilio', 'webhook'}),
+])
+def test_role_registers_only_its_blueprints(role, expected, monkeypatch, tmp_path):
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'roles.db'}")
+    monkeypatch.setenv('RUN_MIGRATIONS', '0')
+    monkeypatch.setenv('DISABLE_TTS_WARMUP', 'true')
+    monkeypatch.setenv('DISABLE_GOOGLE', 'true')
+    monkeypatch.delenv('MIGRATION_MODE', raising=False)
+    monkeypatch.setattr(app_factory, '_app_singleton', None)
+
+    app = app_factory.create_app(role=role)
+
+    assert set(app.blueprints) == expected
+    rules = {rule.rule for rule in app.url_map.iter_rules()}
+    assert '/api/leads' not in rules and '/<path:path>' not in rules  # no dashboard API / SPA
+    if role == 'calls':
+        assert '/webhook/incoming_call' in rules
+
+
+def test_lazy_module_imports_on_first_attribute_access(monkeypatch, tmp_path):
+    (tmp_path / 'heavy_sdk_probe.py').write_text("LOADED = True\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, 'heavy_sdk_probe', raising=False)
+
+    probe = lazy_module('heavy_sdk_probe')
+    assert lazy_module('heavy_sdk_probe') is probe
+    assert 'heavy_sdk_probe' not in sys.modules
+
+    assert probe.LOADED is True
+    assert 'heavy_sdk_probe' in sys.modules
+    assert sdk_available('heavy_sdk_probe')
+    assert not sdk_available('no_such_sdk_anywhere')
+
+
+def test_agent_tools_package_does_not_load_the_agents_sdk():
+    code = ("import sys; import server.agent_tools.phone_utils, server.routes_agent; "
+            "print('agents' in sys.modules, 'openai' in sys.modules)")
+    env = dict(os.environ, PYTHONPATH=ROOT, DATABASE_URL='sqlite://')
+    out = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env,
+                         capture_output=True, text=True, timeout=120)
+    assert out.returncode == 0, out.stderr[-2000:]
+    assert out.stdout.strip().splitlines()[-1] == "False False"
@@ -0,0 +1,129 @@
+"""
+Tests for audio_ring_buffer.py
+PCMRingBuffer (utterance audio) and FrameRingQueue (TX frames).
+"""
+import os
+import queue
+import sys
+import threading
+
+import pytest
+
+from server.services.audio_ring_buffer import PCMRingBuffer, FrameRingQueue, tx_item_size
+
+
+class TestPCMRingBuffer:
+    def test_bytearray_compatible_surface(self):
+        buf = PCMRingBuffer(capacity=1000)
+        assert len(buf) == 0
+        buf.extend(b"abc")
+        buf.extend(bytearray(b"def"))
+        assert len(buf) == 6
+        assert bytes(buf) == b"abcdef"
+        buf.clear()
+        assert len(buf) == 0
+        assert bytes(buf) == b""
+
+    def test_matches_reference_across_wraparound(self):
+        """Random-sized writes behave like a bytearray truncated to capacity"""
+        import random
+        rng = random.Random(3)
+        buf = PCMRingBuffer(capacity=320)
+        ref = bytearray()
+        for i in range(400):
+            chunk = bytes(rng.randrange(256) for _ in range(rng.choice([1, 17, 160, 320, 500])))
+            buf.extend(chunk)
+            ref.extend(chunk)
+            ref = ref[-320:]
+            assert buf.snapshot() == bytes(ref)
+            assert len(buf) == len(ref)
+            if i % 37 == 0:
+                buf.clear()
+                ref = bytearray()
+
+    def test_window_is_zero_copy_and_contiguous(self):
+        buf = PCMRingBuffer(capacity=10)
+        buf.extend(b"0123456789")
+        buf.extend(b"abcd")  # wraps
+        win = buf.window()
+        assert isinstance(win, memoryview)
+        assert win.readonly
+        assert win.tobytes() == b"456789abcd"
+        assert buf.window(3).tobytes() == b"bcd"
+        assert buf.window(4, end_offset=2).tobytes() == b"89ab"
+        assert buf.window(5, end_offset=20).tobytes() == b""
+
+    def test_overwrite_accounting(self):
+        buf = PCMRingBuffer(capacity=100)
+        buf.extend(b"x" * 80)
+        buf.extend(b"y" * 50)
+        stats = buf.memory_stats()
+        assert stats["used_bytes"] == 100
+        assert stats["bytes_written"] == 130
+        assert stats["bytes_overwritten"] == 30
+        assert stats["high_water_bytes"] == 100
+        assert stats["allocated_bytes"] == 200
+
+    def test_invalid_capacity(self):
+        with pytest.raises(ValueError):
+            PCMRingBuffer(capacity=0)
+
+
+class TestFrameRingQueue:
+    def test_fifo_and_queue_exceptions(self):
+        q = FrameRingQueue(maxsize=3)
+        assert q.empty()
+        for i in range(3):
+            q.put_nowait(i)
+        assert q.full()
+        with pytest.raises(queue.Full):
+            q.put_nowait(99)
+        with pytest.raises(queue.Full):
+            q.put(99, timeout=0.01)
+        assert [q.get_nowait() for _ in range(3)] == [0, 1, 2]
+        with pytest.raises(queue.Empty):
+            q.get_nowait()
+        with pytest.raises(queue.Empty):
+            q.get(timeout=0.01)
+
+    def test_put_drop_oldest(self):
+        q = FrameRingQueue(maxsize=2)
+        assert q.put_drop_oldest("a") is False
+        assert q.put_drop_oldest("b") is False
+        assert q.put_drop_oldest("c") is True
+        assert q.get_nowait() == "b"
+        assert q.get_nowait() == "c"
+        assert q.memory_stats()["total_dropped"] == 1
+
+    def test_blocking_get_wakes_on_put(self):
+        q = FrameRingQueue(maxsize=4)
+        got = []
+        t = threading.Thread(target=lambda: got.append(q.get(timeout=2.0)))
+        t.start()
+        q.put({"type": "mark"})
+        t.join(timeout=2.0)
+        assert got == [{"type": "mark"}]
+
+    def test_queued_bytes_accounting(self):
+        q = FrameRingQueue(maxsize=10, sizeof=tx_item_size)
+        q.put_nowait({"type": "media", "payload": "A" * 216})
+        q.put_nowait({"event": "media", "media": {"payload": "B" * 216}})
+        q.put_nowait({"type": "clear"})
+        assert q.memory_stats()["queued_bytes"] == 432
+        assert q.clear() == 3
+        stats = q.memory_stats()
+        assert stats["queued_bytes"] == 0
+        assert stats["depth"] == 0
+        assert stats["high_water"] == 3
+
+
+def test_replay_harness_ring_and_legacy_agree():
+    """Replay a synthetic Twilio capture - both buffer models detect the same utterances"""
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+    import replay_twilio_media as replay_mod
+
+    payloads = [e["media"]["payload"] for e in replay_mod.synthetic_events(10) if e["event"] == "media"]
+    legacy = replay_mod.replay(replay_mod.LegacyCall, payloads, streams=2)
+    ring = replay_mod.replay(replay_mod.RingCall, payloads, streams=2)
+    assert legacy["utterances"] == ring["utterances"] > 0
+    assert ring["per_call_memory"]["bytes_overwritten"] == 0
@@ -0,0 +1,132 @@
+"""
+Tests for server/services/availability_service.py
+Interval merging, nearest-slot ordering, opening windows + minimum notice,
+multi-day range queries and commit-driven cache invalidation
+"""
+import pickle
+from datetime import date, datetime
+
+from server.policy.business_policy import BusinessPolicy
+from server.services import availability_service
+from server.services.availability_service import BusyIndex, find_nearest_slots, find_slots_in_range
+
+
+def make_policy(**overrides):
+    fields = dict(
+        tz="Asia/Jerusalem",
+        slot_size_min=30,
+        allow_24_7=False,
+        opening_hours={day: [["09:00", "13:00"], ["14:00", "18:00"]] for day in
+                       ("sun", "mon", "tue", "wed", "thu", "fri", "sat")},
+        booking_window_days=30,
+        min_notice_min=0,
+        require_phone_before_booking=False,
+    )
+    fields.update(overrides)
+    return BusinessPolicy(**fields)
+
+
+def hm(value: str) -> int:
+    hour, minute = map(int, value.split(':'))
+    return hour * 60 + minute
+
+
+def legacy_nearest(busy, target, duration, slot_size, windows, count):
+    """Reference: scan the whole grid, check every appointment per candidate"""
+    free = []
+    for minute in range(0, 24 * 60, slot_size):
+        end = minute + duration
+        if not any(ws <= minute and end <= we for ws, we in windows):
+            continue
+        if any(s < end and e > minute for s, e in busy):
+            continue
+        free.append(minute)
+    return sorted(free, key=lambda m: (abs(m - target), m - target))[:count]
+
+
+def test_busy_intervals_are_merged_and_clipped():
+    index = BusyIndex([(600, 660), (650, 700), (700, 720), (800, 830), (-30, 30), (1400, 1500)])
+    assert index.starts == [0, 600, 800, 1400]
+    assert index.ends == [30, 720, 830, 1440]
+    assert not index.is_free(710, 740)
+    assert index.is_free(720, 800)   # touching edges are free
+    assert not index.is_free(500, 900)
+
+
+def test_nearest_slots_ordering_matches_full_scan():
+    busy = [(hm("09:00"), hm("10:30")), (hm("11:00"), hm("12:00")), (hm("15:00"), hm("15:45"))]
+    windows = ((hm("09:00"), hm("13:00")), (hm("14:00"), hm("18:00")))
+    index = BusyIndex(busy)
+    for target in (hm("08:00"), hm("10:10"), hm("11:30"), hm("13:30"), hm("15:15"), hm("20:00")):
+        for duration in (30, 60, 90):
+            expected = legacy_nearest(busy, target, duration, 30, windows, 3)
+            assert index.nearest_slots(target, duration, 30, windows, count=3) == expected
+
+
+def test_slots_must_fit_one_window_and_respect_notice():
+    index = BusyIndex()
+    windows = ((hm("09:00"), hm("13:00")), (hm("13:00"), hm("18:00")))
+    # 12:30-13:30 spans two touching windows - rejected like before
+    assert hm("12:30") not in index.nearest_slots(hm("12:30"), 60, 30, windows, count=4)
+    assert index.nearest_slots(hm("12:00"), 60, 30, windows, count=2, earliest=hm("12:10")) == \
+        [hm("13:00"), hm("13:30")]
+
+
+def test_find_nearest_slots_uses_policy(monkeypatch):
+    index = BusyIndex([(hm("09:00"), hm("17:00"))])
+    monkeypatch.setattr(availability_service, "get_busy_index", lambda *args, **kwargs: index)
+    policy = make_policy(min_notice_min=60)
+    now = datetime(2026, 7, 1, 15, 45)
+
+    assert find_nearest_slots(1, date(2026, 7, 1), 30, policy, target_minute=hm("10:00"), now=now) == \
+        [hm("17:00"), hm("17:30")]
+    assert find_nearest_slots(1, date(2026, 7, 1), 60, policy, now=now) == [hm("17:00")]
+    # No opening hours; a day that is already over
+    assert find_nearest_slots(1, date(2026, 7, 4), 30, make_policy(opening_hours={}), now=now) == []
+    assert find_nearest_slots(1, date(2026, 6, 30), 30, policy, now=now) == []
+
+
+def test_find_slots_in_range_spans_days(monkeypatch):
+    full = BusyIndex([(0, 24 * 60)])
+    afternoon = BusyIndex([(hm("09:00"), hm("14:00"))])
+    indexes = {date(2026, 7, 1): full, date(2026, 7, 2): full, date(2026, 7, 3): afternoon}
+    monkeypatch.setattr(availability_service, "get_busy_indexes",
+                        lambda business_id, days, *args: {day: indexes.get(day, BusyIndex()) for day in days})
+    policy = make_policy(slot_size_min=60, booking_window_days=4)
+    now = datetime(2026, 7, 1, 8, 0)
+
+    assert find_slots_in_range(1, date(2026, 7, 1), 7, 60, policy, count=3, now=now) == [
+        (date(2026, 7, 3), hm("14:00")), (date(2026, 7, 3), hm("15:00")), (date(2026, 7, 3), hm("16:00")),
+    ]
+    assert find_slots_in_range(1, date(2026, 7, 10), 3, 60, policy, now=now) == []  # beyond booking window
+
+
+def test_index_pickles_without_derived_ranges():
+    index = BusyIndex([(600, 660)])
+    index.start_ranges(((540, 1080),), 30)
+    restored = pickle.loads(pickle.dumps(index))
+    assert (restored.starts, restored.ends, restored._ranges) == ([600], [660], {})
+    assert restored.nearest_slots(600, 30, 30, ((540, 1080),), count=1) == [570]
+
+
+def test_commit_invalidates_dirty_businesses(monkeypatch):
+    class FakeSession:
+        info = {}
+
+    class FakeAppointment:
+        business_id = 7
+
+    session = FakeSession()
+    invalidated = []
+    monkeypatch.setattr("sqlalchemy.orm.object_session", lambda target: session)
+    monkeypatch.setattr(availability_service, "invalidate_availability", invalidated.append)
+
+    availability_service._mark_dirty(None, None, FakeAppointment())
+    availability_service._after_rollback(session)
+    availability_service._after_commit(session)
+    assert invalidated == []
+
+    availability_service._mark_dirty(None, None, FakeAppointment())
+    availability_service._mark_dirty(None, None, FakeAppointment())
+    availability_service._after_commit(session)
+    assert invalidated == [7]
@@ -0,0 +1,59 @@
+"""
+Tests for the batch STT audio paths in media_ws_ai.py (noise gate, Whisper for Gemini)
+They run with audioop unavailable, as on Python 3.13
+"""
+import sys
+import types
+import wave
+
+import numpy as np
+import pytest
+
+from server.media_ws_ai import MediaStreamHandler
+from server.services.mulaw_fast import ratecv_fast
+
+
+@pytest.fixture
+def handler(monkeypatch):
+    monkeypatch.setitem(sys.modules, "audioop", None)  # import audioop → ImportError
+    return MediaStreamHandler.__new__(MediaStreamHandler)
+
+
+def tone(seconds, amplitude, freq=300):
+    t = np.arange(int(8000 * seconds)) / 8000.0
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype(np.int16).tobytes()
+
+
+def test_stt_audio_gate_passes_speech_level_audio(handler):
+    assert handler._stt_audio_gate(tone(0.5, 5000))
+
+
+@pytest.mark.parametrize("pcm16", [
+    tone(0.5, 50),            # too quiet (peak < 100)
+    tone(0.1, 5000),          # too short
+    b"\x00\x00" * 4000,       # silence
+    tone(0.5, 5000, freq=5),  # no zero crossings - a tone, not speech
+])
+def test_stt_audio_gate_blocks_noise(handler, pcm16):
+    assert not handler._stt_audio_gate(pcm16)
+
+
+def test_whisper_stt_for_gemini_sends_16k_wav(handler, monkeypatch):
+    pcm16_8k = tone(0.5, 5000)
+    uploads = []
+
+    def create(model, file, **kwargs):
+        with wave.open(file, "rb") as wav_file:
+            uploads.append((wav_file.getframerate(), wav_file.readframes(wav_file.getnframes())))
+        return types.SimpleNamespace(text=" שלום, אני רוצה לקבוע תור ")
+
+    client = types.SimpleNamespace(audio=types.SimpleNamespace(
+        transcriptions=types.SimpleNamespace(create=create)))
+    monkeypatch.setattr("server.services.lazy_services.get_openai_client", lambda: client)
+
+    assert handler._whisper_stt_for_gemini(pcm16_8k) == "שלום, אני רוצה לקבוע תור"
+    assert uploads == [(16000, ratecv_fast(pcm16_8k, 8000, 16000))]
+
+
+def test_unused_whisper_fallback_is_gone():
+    assert not hasattr(MediaStreamHandler, "_whisper_fallback_validated")
@@ -0,0 +1,126 @@
+"""
+Tests for broadcast_dispatcher.py
+Token bucket shaping (per tenant + per shard), page sizing and the cached stop flag
+"""
+import pytest
+
+from server.services import broadcast_dispatcher
+from server.services.broadcast_dispatcher import (
+    LocalRateLimiter, RateBucket, StopFlag, page_size, rate_buckets_for,
+)
+
+
+class FakeClock:
+    def __init__(self, start: float = 100.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeRedis:
+    def __init__(self):
+        self.keys = set()
+        self.exists_calls = 0
+
+    def exists(self, key):
+        self.exists_calls += 1
+        return key in self.keys
+
+
+def test_bucket_spaces_sends_at_rate():
+    clock = FakeClock()
+    limiter = LocalRateLimiter(clock=clock)
+    tenant = [RateBucket("tenant", rate=2.0)]
+    assert limiter.try_acquire(tenant) == 0  # bucket starts full
+    assert limiter.try_acquire(tenant) == pytest.approx(0.5)
+    clock.now += 0.25
+    assert limiter.try_acquire(tenant) == pytest.approx(0.25)
+    clock.now += 0.25
+    assert limiter.try_acquire(tenant) == 0
+
+
+def test_simulated_throughput_matches_rate():
+    clock = FakeClock()
+    limiter = LocalRateLimiter(clock=clock)
+    buckets = [RateBucket("meta", rate=20.0, burst=20.0)]
+    sent = 0
+    while clock.now < 110.0:  # 10 simulated seconds
+        wait = limiter.try_acquire(buckets)
+        if wait:
+            clock.now += wait
+        else:
+            sent += 1
+    assert sent == pytest.approx(20 + 20 * 10, abs=1)  # initial burst + rate * time
+
+
+def test_multi_bucket_is_all_or_nothing():
+    clock = FakeClock()
+    limiter = LocalRateLimiter(clock=clock)
+    shard = RateBucket("shard", rate=1.0, burst=2.0)
+    tenant_a = RateBucket("tenant:a", rate=0.5)
+    tenant_b = RateBucket("tenant:b", rate=0.5)
+
+    assert limiter.try_acquire([tenant_a, shard]) == 0
+    # Tenant A is empty: the shard token must not be consumed by the failed attempt
+    assert limiter.try_acquire([tenant_a, shard]) == pytest.approx(2.0)
+    assert limiter.try_acquire([tenant_b, shard]) == 0
+    # Shard is now empty as well - tenant B waits for the shard
+    assert limiter.try_acquire([tenant_b, shard]) == pytest.approx(2.0)
+    assert limiter._buckets["shard"].tokens == pytest.approx(0.0)
+
+
+def test_rate_buckets_per_provider(monkeypatch):
+    monkeypatch.setattr(broadcast_dispatcher, "BROADCAST_BAILEYS_TENANT_RATE", 0.3)
+    monkeypatch.setattr(broadcast_dispatcher, "BROADCAST_BAILEYS_SHARD_RATE", 10.0)
+    monkeypatch.setattr(broadcast_dispatcher, "BROADCAST_META_TENANT_RATE", 40.0)
+
+    baileys = rate_buckets_for("baileys", 7, 2)
+    assert [b.key for b in baileys] == ["wa_rate:baileys:tenant:7", "wa_rate:baileys:shard:2"]
+    assert baileys[0].burst == 1.0  # no bursts on a WhatsApp number
+    assert baileys[1].rate == 10.0
+
+    meta = rate_buckets_for("meta", 7, 2)
+    assert [b.key for b in meta] == ["wa_rate:meta:7"]
+    assert meta[0].rate == meta[0].burst == 40.0
+
+
+def test_page_size_follows_bottleneck_rate():
+    assert page_size([RateBucket("t", 0.3), RateBucket("s", 10.0)], claim_batch=50) == 9
+    assert page_size([RateBucket("m", 40.0, 40.0)], claim_batch=50) == 50
+    assert page_size([RateBucket("slow", 0.001)], claim_batch=50) == 1
+
+
+def test_stop_flag_caches_redis_and_rate_limits_db():
+    clock = FakeClock()
+    redis = FakeRedis()
+    db_checks = []
+
+    def db_check():
+        db_checks.append(clock.now)
+        return False
+
+    flag = StopFlag(5, redis, db_check, clock=clock)
+    assert not flag.is_set()
+    assert not flag.is_set()
+    assert redis.exists_calls == 1  # cached for STOP_CACHE_SECONDS
+
+    assert not flag.is_set(check_db=True)
+    assert db_checks == []  # DB fallback only every STOP_DB_CHECK_SECONDS
+    clock.now += broadcast_dispatcher.STOP_DB_CHECK_SECONDS
+    assert not flag.is_set(check_db=True)
+    assert len(db_checks) == 1
+
+    redis.keys.add("broadcast:stop:5")
+    assert not flag.is_set()  # still within the cache window
+    clock.now += broadcast_dispatcher.STOP_CACHE_SECONDS
+    assert flag.is_set()
+    assert flag.is_set()  # sticky once set
+
+
+def test_stop_flag_without_redis_uses_db():
+    clock = FakeClock()
+    flag = StopFlag(5, None, lambda: True, clock=clock)
+    assert not flag.is_set(check_db=True)
+    clock.now += broadcast_dispatcher.STOP_DB_CHECK_SECONDS
+    assert flag.is_set(check_db=True)
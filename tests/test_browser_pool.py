@@ -0,0 +1,169 @@
+"""
+Tests for the preview browser pool (server/services/browser_pool.py)
+Page reuse and recycling, crash recovery, per-render timeouts and the bounded
+queue - against an in-memory browser, Chromium is not needed
+"""
+import threading
+import time
+
+import pytest
+
+from server.services.browser_pool import BrowserPool, RenderTimeout
+
+
+class FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+        self.closed = False
+
+    def new_page(self):
+        return FakePage(self)
+
+    def close(self):
+        self.closed = True
+
+
+class FakePage:
+    def __init__(self, context):
+        self.context = context
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+        self.closed = False
+        self.contexts = []
+        self.thread = threading.current_thread().name
+
+    def new_context(self, **options):
+        assert options == {'ignore_https_errors': True}
+        context = FakeContext(self)
+        self.contexts.append(context)
+        return context
+
+    def is_connected(self):
+        return self.connected
+
+    def close(self):
+        self.closed = True
+        self.connected = False
+
+
+@pytest.fixture
+def browsers():
+    return []
+
+
+@pytest.fixture
+def make_pool(browsers):
+    pools = []
+
+    def launcher():
+        browser = FakeBrowser()
+        browsers.append(browser)
+        return browser, lambda: setattr(browser, 'driver_stopped', True)
+
+    def make(**kwargs):
+        pool = BrowserPool(launcher=launcher, **{'size': 1, 'timeout': 5, **kwargs})
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.close()
+
+
+def test_pages_are_reused_and_recycled(make_pool, browsers):
+    pool = make_pool(pages_per_context=3)
+
+    pages = [pool.render(lambda page: page) for _ in range(7)]
+
+    assert len(browsers) == 1 and browsers[0].thread == 'browser-pool-0'
+    assert len({id(page.context) for page in pages}) == 3  # 3 + 3 + 1 renders
+    assert pages[0] is pages[2] and pages[2] is not pages[3]
+    assert [context.closed for context in browsers[0].contexts] == [True, True, False]
+    assert pool.stats['renders'] == 7 and pool.stats['launches'] == 1 and pool.stats['recycles'] == 2
+
+
+def test_failed_render_gets_a_fresh_page_and_a_dead_browser_is_relaunched(make_pool, browsers):
+    pool = make_pool()
+    first = pool.render(lambda page: page)
+
+    def broken(page):
+        raise ValueError("Execution context was destroyed")
+
+    with pytest.raises(ValueError):
+        pool.render(broken)
+    second = pool.render(lambda page: page)
+    assert second is not first and second.context.browser is first.context.browser
+
+    def crash(page):
+        page.context.browser.connected = False
+        raise RuntimeError("Target page, context or browser has been closed")
+
+    with pytest.raises(RuntimeError):
+        pool.render(crash)
+    third = pool.render(lambda page: page)
+
+    assert third.context.browser is not first.context.browser
+    assert browsers[0].closed and browsers[0].driver_stopped
+    assert pool.stats['errors'] == 2 and pool.stats['crashes'] == 1 and pool.stats['launches'] == 2
+
+
+def test_slow_render_times_out_and_its_page_is_replaced(make_pool):
+    pool = make_pool()
+    release = threading.Event()
+    slow_page = []
+
+    def slow(page):
+        slow_page.append(page)
+        release.wait(5)
+        return page
+
+    started = time.monotonic()
+    with pytest.raises(RenderTimeout):
+        pool.render(slow, timeout=0.2)
+    assert time.monotonic() - started < 2
+    release.set()
+
+    assert pool.render(lambda page: page) is not slow_page[0]
+    assert pool.stats['timeouts'] == 1
+
+
+def test_queue_is_bounded(make_pool):
+    pool = make_pool(queue_size=1)
+    running, release = threading.Event(), threading.Event()
+    results = []
+
+    def busy(page):
+        running.set()
+        release.wait(5)
+        return 'busy'
+
+    threads = [threading.Thread(target=lambda: results.append(pool.render(busy)))]
+    threads[0].start()
+    assert running.wait(2)
+    threads.append(threading.Thread(target=lambda: results.append(pool.render(lambda page: 'queued'))))
+    threads[1].start()
+    deadline = time.monotonic() + 2
+    while not pool._queue.full() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    with pytest.raises(RenderTimeout, match="no page free"):
+        pool.render(lambda page: 'rejected', timeout=0.2)
+
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert sorted(results) == ['busy', 'queued'] and pool.stats['rejected'] == 1
+
+
+def test_close_shuts_the_browsers_down(make_pool, browsers):
+    pool = make_pool(size=2)
+    pool.render(lambda page: page)
+
+    pool.close()
+
+    assert browsers and all(browser.closed and browser.driver_stopped for browser in browsers)
+    with pytest.raises(RuntimeError):
+        pool.render(lambda page: page)
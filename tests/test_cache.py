@@ -0,0 +1,174 @@
+"""
+Tests for server/utils/cache.py
+LRU order, TTL + stale-while-revalidate, single-flight loading, Redis L2 and
+cross-process invalidation messages
+"""
+import json
+import threading
+import time
+
+import pytest
+
+from server.utils import cache as cache_module
+from server.utils.cache import TTLCache, apply_invalidation_message
+
+
+class FakeClock:
+    def __init__(self, start: float = 1000.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.published = []
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, px=None):
+        self.data[key] = value
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def scan_iter(self, match, count=None):
+        prefix = match.rstrip("*")
+        return [k for k in list(self.data) if k.startswith(prefix)]
+
+    def publish(self, channel, message):
+        self.published.append((channel, json.loads(message)))
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(cache_module, "_get_redis", lambda: redis)
+    monkeypatch.setattr(cache_module, "_invalidation_enabled", lambda: True)
+    monkeypatch.setattr(cache_module, "ensure_invalidation_listener", lambda: False)
+    monkeypatch.setattr("server.config.CACHE_L2_ENABLED", True)
+    return redis
+
+
+def test_lru_eviction_keeps_recently_used():
+    cache = TTLCache(ttl_seconds=60, max_size=3)
+    for key in "abc":
+        cache.set(key, key.upper())
+    assert cache.get("a") == "A"  # a becomes most recently used
+    cache.set("d", "D")
+    assert cache.keys() == ["c", "a", "d"]
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_and_per_entry_override():
+    clock = FakeClock()
+    cache = TTLCache(ttl_seconds=10, clock=clock)
+    cache.set("short", 1, ttl=2)
+    cache.set("long", 2)
+    clock.now += 5
+    assert cache.get("short") is None
+    assert "long" in cache
+    clock.now += 6
+    assert cache.get("long") is None
+    assert cache.size() == 0
+
+
+def test_stale_while_revalidate_refreshes_in_background():
+    clock = FakeClock()
+    cache = TTLCache(ttl_seconds=10, stale_seconds=60, clock=clock)
+    cache.set("k", "old")
+    clock.now += 20  # expired, still within the stale window
+
+    refreshed = threading.Event()
+
+    def loader():
+        refreshed.set()
+        return "new"
+
+    assert cache.get("k") is None  # plain get never serves stale values
+    assert cache.get_or_load("k", loader) == "old"
+    assert refreshed.wait(2)
+    for _ in range(100):
+        if cache.get("k") == "new":
+            break
+        time.sleep(0.01)
+    assert cache.get("k") == "new"
+    assert cache.stats()["stale_hits"] == 1
+
+
+def test_single_flight_runs_loader_once():
+    cache = TTLCache(ttl_seconds=60)
+    calls = []
+    release = threading.Event()
+
+    def loader():
+        calls.append(1)
+        release.wait(2)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load("k", loader))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    release.set()
+    for t in threads:
+        t.join(2)
+    assert results == ["value"] * 8
+    assert len(calls) == 1
+
+
+def test_loader_none_and_errors_are_not_cached():
+    cache = TTLCache(ttl_seconds=60)
+    assert cache.get_or_load("k", lambda: None) is None
+    with pytest.raises(ValueError):
+        cache.get_or_load("k", lambda: (_ for _ in ()).throw(ValueError("db down")))
+    assert cache.get_or_load("k", lambda: 5) == 5
+    assert cache.stats()["loads"] == 2
+
+
+def test_l2_shares_values_between_processes(fake_redis):
+    clock = FakeClock()
+    writer = TTLCache(ttl_seconds=60, name="test_l2", l2=True, clock=clock)
+    reader = TTLCache(ttl_seconds=60, name="test_l2", l2=True, clock=clock)
+    writer.set("1:inbound", {"prompt": "שלום"})
+    assert reader.get("1:inbound") == {"prompt": "שלום"}
+    assert reader.stats()["l2_hits"] == 1
+
+    writer.delete_prefix("1:")
+    assert fake_redis.data == {}
+    assert fake_redis.published[-1][1]["op"] == "delete_prefix"
+
+
+def test_invalidation_messages_apply_to_named_caches(fake_redis):
+    cache = TTLCache(ttl_seconds=60, name="test_invalidation")
+    other = TTLCache(ttl_seconds=60, name="test_other")
+    cache.set((7, "whatsapp"), "agent")
+    cache.set("7:calls", "agent")
+    other.set((7, "whatsapp"), "agent")
+
+    message = json.dumps({"src": "other-process", "cache": "test_invalidation", "op": "delete",
+                          "key": json.dumps([7, "whatsapp"])})
+    assert apply_invalidation_message(message.encode())
+    assert cache.get((7, "whatsapp")) is None  # tuple keys survive the JSON round trip
+    assert other.get((7, "whatsapp")) == "agent"
+
+    own = json.dumps({"src": cache_module._PROCESS_ID, "cache": "test_invalidation", "op": "clear", "key": None})
+    assert not apply_invalidation_message(own)
+    assert cache.get("7:calls") == "agent"
+
+
+def test_metrics_are_exported_per_cache():
+    from server.metrics import metrics
+    cache = TTLCache(ttl_seconds=60, name="test_metrics")
+    before = metrics.get_counter("cache_hits.test_metrics")
+    cache.set("k", 1)
+    cache.get("k")
+    cache.get("missing")
+    assert metrics.get_counter("cache_hits.test_metrics") == before + 1
+    assert metrics.get_counter("cache_misses.test_metrics") >= 1
@@ -0,0 +1,153 @@
+"""
+Tests for call_event_loop.py and the asyncio side of FrameRingQueue
+(async call engine: CALLS_ENGINE_MODE=async)
+"""
+import asyncio
+import queue
+import threading
+import time
+
+import pytest
+
+from server.services.audio_ring_buffer import FrameRingQueue
+from server.services.call_event_loop import SharedCallLoop, get_shared_call_loop
+
+
+@pytest.fixture
+def call_loop():
+    loop = SharedCallLoop(name="TestCallLoop")
+    loop.start()
+    yield loop
+    loop.stop()
+
+
+def test_call_task_has_thread_surface(call_loop):
+    done = threading.Event()
+
+    async def work():
+        await asyncio.sleep(0.05)
+        done.set()
+
+    task = call_loop.task(work, name="TX-test")
+    assert task.name == "TX-test"
+    assert task.ident is None
+    assert not task.is_alive()
+
+    task.start()
+    assert task.ident == call_loop.thread_ident
+    assert task.is_alive()
+    task.join(timeout=2.0)
+    assert done.is_set()
+    assert not task.is_alive()
+
+    with pytest.raises(RuntimeError):
+        task.start()
+
+
+def test_join_timeout_returns_like_thread(call_loop):
+    async def forever():
+        await asyncio.sleep(60)
+
+    task = call_loop.task(forever)
+    task.start()
+    start = time.monotonic()
+    task.join(timeout=0.05)
+    assert task.is_alive()
+    assert time.monotonic() - start < 1.0
+    task.cancel()
+
+
+def test_crashed_task_is_counted_and_join_does_not_raise(call_loop):
+    async def boom():
+        raise ValueError("boom")
+
+    task = call_loop.task(boom)
+    task.start()
+    task.join(timeout=2.0)
+    assert not task.is_alive()
+    assert call_loop.stats()["tasks_failed"] == 1
+
+
+def test_get_shared_call_loop_is_singleton():
+    assert get_shared_call_loop() is get_shared_call_loop()
+    assert get_shared_call_loop().stats()["running"]
+
+
+def test_get_async_woken_by_producer_thread(call_loop):
+    q = FrameRingQueue(maxsize=4)
+
+    async def consume():
+        return await q.get_async(timeout=2.0)
+
+    future = call_loop.submit(consume())
+    time.sleep(0.05)
+    q.put_nowait({"type": "media", "payload": "x"})
+    assert future.result(timeout=2.0) == {"type": "media", "payload": "x"}
+
+
+def test_get_async_timeout_raises_empty(call_loop):
+    q = FrameRingQueue(maxsize=4)
+
+    async def consume():
+        start = time.monotonic()
+        with pytest.raises(queue.Empty):
+            await q.get_async(timeout=0.05)
+        return time.monotonic() - start
+
+    elapsed = call_loop.submit(consume()).result(timeout=2.0)
+    assert 0.04 <= elapsed < 1.0
+
+
+def test_put_async_waits_for_free_slot(call_loop):
+    q = FrameRingQueue(maxsize=1)
+    q.put_nowait("a")
+
+    async def produce():
+        await q.put_async("b", timeout=2.0)
+
+    future = call_loop.submit(produce())
+    time.sleep(0.05)
+    assert not future.done()
+    assert q.get_nowait() == "a"
+    future.result(timeout=2.0)
+    assert q.get_nowait() == "b"
+
+
+def test_put_async_timeout_raises_full(call_loop):
+    q = FrameRingQueue(maxsize=1)
+    q.put_nowait("a")
+
+    async def produce():
+        with pytest.raises(queue.Full):
+            await q.put_async("b", timeout=0.05)
+
+    call_loop.submit(produce()).result(timeout=2.0)
+    assert q.qsize() == 1
+
+
+def test_run_blocking_uses_the_shared_pool(call_loop):
+    async def work():
+        return await call_loop.run_blocking(lambda x: (x, threading.current_thread().name), 7)
+
+    value, thread_name = call_loop.submit(work()).result(timeout=2.0)
+    assert value == 7
+    assert thread_name.startswith("TestCallLoop-blocking")
+    stats = call_loop.stats()
+    assert stats["blocking_calls"] == 1 and stats["active_blocking"] == 0
+
+
+def test_child_tasks_are_cancelled_when_the_call_task_returns(call_loop):
+    children = []
+
+    async def child():
+        await asyncio.sleep(60)
+
+    async def call():
+        children.append(asyncio.create_task(child()))
+        await asyncio.sleep(0)
+
+    task = call_loop.task(call)
+    task.start()
+    task.join(timeout=2.0)
+    assert not task.is_alive()
+    assert children[0].cancelled()
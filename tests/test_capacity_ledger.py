@@ -0,0 +1,162 @@
+"""
+Tests for the call capacity ledger (server/services/capacity_ledger.py)
+All-or-nothing admission across every limit, lease expiry and heartbeats,
+reservation binding, bulk headroom and the Redis fallback
+"""
+import pytest
+
+from server.services import capacity_ledger
+from server.services.capacity_ledger import (
+    INBOUND,
+    OUTBOUND,
+    LocalLedger,
+    acquire_lease,
+    bind_lease,
+    capacity_usage,
+    outbound_headroom,
+    reclaim_expired,
+    release_lease,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(capacity_ledger, "_local", LocalLedger(clock))
+    monkeypatch.setattr(capacity_ledger, "_keeper", capacity_ledger._LeaseKeeper())
+    monkeypatch.setattr(capacity_ledger, "_get_redis", lambda: None)
+    monkeypatch.setattr(capacity_ledger, "MAX_ACTIVE_CALLS", 4)
+    monkeypatch.setattr(capacity_ledger, "MAX_ACTIVE_OUTBOUND_CALLS", 0)
+    monkeypatch.setattr(capacity_ledger, "MAX_CALLS_PER_BUSINESS", 3)
+    monkeypatch.setattr(capacity_ledger, "MAX_OUTBOUND_CALLS_PER_BUSINESS", 2)
+    monkeypatch.setattr(capacity_ledger, "CALL_LEASE_TTL_SECONDS", 60)
+    return clock
+
+
+def test_every_limit_is_checked_in_one_admission(clock):
+    assert acquire_lease("CA1", 1, OUTBOUND)
+    assert acquire_lease("CA2", 1, OUTBOUND)
+
+    denied = acquire_lease("CA3", 1, OUTBOUND)
+    assert not denied and denied.reason == "business_outbound"
+
+    assert acquire_lease("CA3", 1, INBOUND)
+    denied = acquire_lease("CA4", 1, INBOUND)
+    assert not denied and denied.reason == "business"
+
+    assert acquire_lease("CA4", 2, INBOUND)
+    denied = acquire_lease("CA5", 3, INBOUND)
+    assert not denied and denied.reason == "global"
+
+    # A refused lease leaves no trace in any set
+    usage = capacity_usage(1)
+    assert (usage["active"], usage["inbound"], usage["outbound"]) == (4, 2, 2)
+    assert usage["business"] == {"active": 3, "inbound": 1, "outbound": 2, "max": 3, "max_outbound": 2}
+    assert capacity_usage(3)["business"]["active"] == 0
+
+
+def test_reacquiring_a_held_lease_renews_it(clock):
+    assert acquire_lease("CA1", 1, INBOUND).reason == "admitted"
+    clock.now += 50
+    assert acquire_lease("CA1", 1, INBOUND).reason == "renewed"  # Twilio webhook retry
+    clock.now += 50
+    assert capacity_usage(1)["business"]["inbound"] == 1
+
+
+def test_expired_leases_stop_counting_and_are_reclaimed(clock):
+    assert acquire_lease("CA1", 1, OUTBOUND)
+    assert acquire_lease("CA2", 1, OUTBOUND)
+    assert outbound_headroom(1) == 0
+
+    clock.now += 61  # the worker holding them died without releasing
+    assert outbound_headroom(1) == 2
+    assert reclaim_expired() == 2
+    assert reclaim_expired() == 0
+    assert not release_lease("CA1")
+
+
+def test_release_is_idempotent(clock):
+    assert acquire_lease("CA1", 1, INBOUND)
+    assert release_lease("CA1")
+    assert not release_lease("CA1")
+    assert capacity_usage(1)["active"] == 0
+
+
+def test_reservation_is_bound_to_the_call_sid(clock):
+    reservation = capacity_ledger.new_reservation()
+    assert acquire_lease(reservation, 1, OUTBOUND)
+    capacity_ledger._keeper._held.add(reservation)
+
+    assert bind_lease(reservation, "CA1")
+    assert capacity_ledger._keeper.held() == ["CA1"]
+    assert not release_lease(reservation)
+    assert capacity_usage(1)["business"]["outbound"] == 1
+
+    # The call-end paths only know the SID
+    assert release_lease("CA1")
+    assert capacity_usage(1)["business"]["outbound"] == 0
+    assert not bind_lease(reservation, "CA1")
+
+
+def test_heartbeat_renews_held_leases_and_forgets_gone_ones(clock):
+    assert acquire_lease("CA1", 1, INBOUND)
+    assert acquire_lease("CA2", 1, INBOUND)
+    keeper = capacity_ledger._keeper
+    keeper._held.update({"CA1", "CA2", "CA3"})
+    release_lease("CA2")
+
+    clock.now += 50
+    keeper.tick()
+    assert keeper.held() == ["CA1"]
+
+    clock.now += 50  # 100s after acquire, alive thanks to the heartbeat
+    assert capacity_usage(1)["business"]["inbound"] == 1
+
+
+def test_headroom_takes_the_tightest_limit(clock, monkeypatch):
+    assert outbound_headroom(1) == 2
+    assert acquire_lease("CA1", 2, INBOUND)
+    assert acquire_lease("CA2", 2, INBOUND)
+    assert acquire_lease("CA3", 2, INBOUND)
+    assert outbound_headroom(1) == 1  # global: 4 - 3
+
+    for name in ("MAX_ACTIVE_CALLS", "MAX_CALLS_PER_BUSINESS", "MAX_OUTBOUND_CALLS_PER_BUSINESS"):
+        monkeypatch.setattr(capacity_ledger, name, 0)
+    assert outbound_headroom(1) > 1000  # every limit disabled
+
+
+def test_redis_errors_fall_back_to_the_local_ledger(clock, monkeypatch):
+    class BrokenRedis:
+        def register_script(self, script):
+            def run(keys=None, args=None):
+                raise ConnectionError("redis down")
+            return run
+
+    monkeypatch.setattr(capacity_ledger, "_get_redis", lambda: BrokenRedis())
+    monkeypatch.setattr(capacity_ledger, "_redis_down_until", 0.0)
+
+    admission = acquire_lease("CA1", 1, INBOUND)
+    assert admission and admission.source == "local"
+    assert capacity_ledger._redis_down_until > 0
+
+
+def test_gauges_are_published(clock):
+    from server.metrics import (
+        CALLS_ACTIVE_INBOUND, CALLS_ACTIVE_OUTBOUND, CALLS_CAPACITY_AVAILABLE, metrics,
+    )
+    assert acquire_lease("CA1", 1, INBOUND)
+    assert acquire_lease("CA2", 1, OUTBOUND)
+    capacity_ledger.publish_capacity_gauges()
+
+    gauges = metrics.snapshot()["gauges"]
+    assert gauges[CALLS_ACTIVE_INBOUND] == 1
+    assert gauges[CALLS_ACTIVE_OUTBOUND] == 1
+    assert gauges[CALLS_CAPACITY_AVAILABLE] == 2
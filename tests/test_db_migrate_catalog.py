@@ -0,0 +1,121 @@
+"""
+Tests for the schema catalog snapshot in server/db_migrate.py
+Existence checks served from one catalog load, DDL-driven reloads,
+tracking-table bookkeeping and dry-run planning
+"""
+import pytest
+
+from server import db_migrate
+from server.db_migrate import (
+    check_column_exists,
+    check_constraint_exists,
+    check_index_exists,
+    check_table_exists,
+    is_migration_applied,
+)
+
+
+class FakeCatalogDB:
+    """Answers the SchemaCatalog queries and counts round trips"""
+
+    def __init__(self):
+        self.tables = {"leads", "business"}
+        self.columns = {("leads", "phone_raw"), ("business", "lead_tabs_config")}
+        self.indexes = {"idx_leads_phone"}
+        self.constraints = [("leads_pkey", "leads"), ("fk_other_schema", None)]
+        self.applied = {"core_leads_table"}
+        self.queries = 0
+
+    def fetch_all(self, engine, sql, params=None, retries=4):
+        self.queries += 1
+        if "information_schema.tables" in sql:
+            return [(t,) for t in self.tables]
+        if "information_schema.columns" in sql:
+            return list(self.columns)
+        if "pg_indexes" in sql:
+            return [(i,) for i in self.indexes]
+        if "pg_constraint" in sql:
+            return list(self.constraints)
+        if "schema_migrations" in sql:
+            return [(m,) for m in self.applied]
+        raise AssertionError(f"unexpected query: {sql}")
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    fake = FakeCatalogDB()
+    monkeypatch.setattr(db_migrate, "fetch_all", fake.fetch_all)
+    yield fake
+    db_migrate.deactivate_schema_catalog()
+    db_migrate._DRY_RUN_PLAN = None
+
+
+def test_checks_are_answered_from_one_load(fake_db):
+    db_migrate.activate_schema_catalog(engine=None)
+    assert fake_db.queries == 5
+
+    assert check_table_exists("leads") and not check_table_exists("faqs")
+    assert check_column_exists("leads", "phone_raw") and not check_column_exists("leads", "whatsapp_jid")
+    assert check_index_exists("idx_leads_phone") and not check_index_exists("idx_missing")
+    assert check_constraint_exists("leads_pkey", "leads")
+    assert not check_constraint_exists("leads_pkey", "business")
+    assert check_constraint_exists("fk_other_schema")  # name-only lookup spans every table
+    assert is_migration_applied(None, "core_leads_table") and not is_migration_applied(None, "999")
+    assert fake_db.queries == 5
+
+
+def test_ddl_marks_snapshot_stale_and_dml_does_not(fake_db):
+    catalog = db_migrate.activate_schema_catalog(engine=None)
+
+    assert not db_migrate._planned("exec_dml", "UPDATE leads SET status = 'created' WHERE id = 1")
+    assert not catalog.stale
+
+    fake_db.columns.add(("leads", "whatsapp_jid"))
+    assert not db_migrate._planned("exec_ddl", "ALTER TABLE leads ADD COLUMN whatsapp_jid TEXT")
+    assert catalog.stale
+    assert is_migration_applied(None, "core_leads_table")  # tracking never needs a reload
+    assert catalog.loads == 1
+
+    assert check_column_exists("leads", "whatsapp_jid")
+    assert catalog.loads == 2 and fake_db.queries == 9  # schema queries only
+
+
+def test_marking_applied_updates_the_snapshot(fake_db, monkeypatch):
+    executed = []
+    monkeypatch.setattr(db_migrate, "execute_with_retry", lambda engine, sql, params=None, **kw: executed.append(sql))
+    db_migrate.activate_schema_catalog(engine=None)
+
+    db_migrate.mark_migration_applied(None, "146_lead_status_events")
+    assert len(executed) == 1
+    assert is_migration_applied(None, "146_lead_status_events")
+    assert not db_migrate._CATALOG.stale
+
+
+def test_without_snapshot_checks_query_directly(fake_db, monkeypatch):
+    calls = []
+
+    def fake_execute(engine, sql, params=None, **kwargs):
+        calls.append(params)
+        return [("leads",)]
+
+    monkeypatch.setattr(db_migrate, "get_migrate_engine", lambda: None)
+    monkeypatch.setattr(db_migrate, "execute_with_retry", fake_execute)
+    assert check_table_exists("leads")
+    assert calls == [{"table_name": "leads"}]
+    assert fake_db.queries == 0
+
+
+def test_dry_run_records_writes_without_executing(fake_db):
+    db_migrate._DRY_RUN_PLAN = []
+    # engine=None: any attempt to actually execute would raise
+    db_migrate.exec_ddl(None, "ALTER TABLE leads\n    ADD COLUMN reply_jid TEXT")
+    assert db_migrate.exec_index(None, "CREATE INDEX CONCURRENTLY idx_x ON leads(id)") is True
+    assert db_migrate.exec_dml(None, "UPDATE leads SET reply_jid = NULL") == 0
+    assert db_migrate.execute_with_retry(None, "INSERT INTO alembic_version VALUES ('x')").rowcount == 0
+
+    assert db_migrate._DRY_RUN_PLAN == [
+        ("exec_ddl", "ALTER TABLE leads ADD COLUMN reply_jid TEXT"),
+        ("exec_index", "CREATE INDEX CONCURRENTLY idx_x ON leads(id)"),
+        ("exec_dml", "UPDATE leads SET reply_jid = NULL"),
+        ("execute_with_retry", "INSERT INTO alembic_version VALUES ('x')"),
+    ]
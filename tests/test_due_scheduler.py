@@ -0,0 +1,136 @@
+"""
+Tests for due_scheduler.py and the scheduler due loop (run_scheduler.py)
+Epoch conversion, atomic pop ordering, dispatch grouping and the owner-tagged leader lock
+"""
+from datetime import datetime, timezone
+
+import pytest
+
+from server.scheduler import run_scheduler
+from server.services import due_scheduler
+from server.services.due_scheduler import (
+    DUE_KEY, dispatch_due, israel_to_epoch, parse_member, pop_due,
+    schedule_appointment_run, schedule_scheduled_messages, seconds_until_next_due,
+)
+
+
+class FakeRedis:
+    """Sorted sets + strings, with the two Lua scripts emulated in Python"""
+
+    def __init__(self):
+        self.zsets = {}
+        self.strings = {}
+        self.ttls = {}
+
+    def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    def zrange(self, key, start, end, withscores=False):
+        items = sorted(self.zsets.get(key, {}).items(), key=lambda kv: kv[1])[start:end + 1]
+        return items if withscores else [member for member, _ in items]
+
+    def eval(self, script, numkeys, key, *args):
+        if script == due_scheduler._POP_DUE_LUA:
+            now, limit = float(args[0]), int(args[1])
+            zset = self.zsets.get(key, {})
+            due = [m for m, score in sorted(zset.items(), key=lambda kv: kv[1]) if score <= now][:limit]
+            for member in due:
+                del zset[member]
+            return [member.encode() for member in due]
+        if script == run_scheduler._HOLD_LOCK_LUA:
+            owner, ttl = args
+            current = self.strings.get(key)
+            if current not in (None, owner):
+                return 0
+            self.strings[key] = owner
+            self.ttls[key] = int(ttl)
+            return 1
+        raise AssertionError("unexpected script")
+
+
+class BrokenRedis:
+    def zadd(self, key, mapping):
+        raise ConnectionError("redis down")
+
+
+def test_israel_to_epoch_handles_dst():
+    summer = datetime(2026, 7, 1, 12, 0)   # IDT, UTC+3
+    winter = datetime(2026, 1, 1, 12, 0)   # IST, UTC+2
+    assert israel_to_epoch(summer) == datetime(2026, 7, 1, 9, 0, tzinfo=timezone.utc).timestamp()
+    assert israel_to_epoch(winter) == datetime(2026, 1, 1, 10, 0, tzinfo=timezone.utc).timestamp()
+    aware = datetime(2026, 7, 1, 9, 0, tzinfo=timezone.utc)
+    assert israel_to_epoch(aware) == aware.timestamp()
+
+
+def test_pop_due_returns_only_due_items_in_order():
+    redis = FakeRedis()
+    base = datetime(2026, 7, 1, 12, 0)
+    schedule_scheduled_messages([(1, base.replace(minute=5)), (2, base), (3, base.replace(hour=13))], redis)
+    schedule_appointment_run(9, 4, base.replace(minute=1), redis)
+    now = israel_to_epoch(base.replace(minute=5))
+
+    assert pop_due(redis, now=now) == ["scheduled_msg:2", "appointment_run:4:9", "scheduled_msg:1"]
+    assert pop_due(redis, now=now) == []  # popped members are removed
+    assert seconds_until_next_due(redis, now=now) == pytest.approx(55 * 60)
+    assert parse_member(b"appointment_run:4:9") == ("appointment_run", ["4", "9"])
+
+
+def test_reschedule_moves_member_and_limit_is_respected():
+    redis = FakeRedis()
+    base = datetime(2026, 7, 1, 12, 0)
+    schedule_appointment_run(9, 4, base, redis)
+    schedule_appointment_run(9, 4, base.replace(hour=14), redis)  # force_reschedule
+    assert len(redis.zsets[DUE_KEY]) == 1
+    assert pop_due(redis, now=israel_to_epoch(base.replace(hour=13))) == []
+
+    schedule_scheduled_messages([(i, base) for i in range(5)], redis)
+    assert len(pop_due(redis, now=israel_to_epoch(base), limit=2)) == 2
+    assert seconds_until_next_due(redis, now=israel_to_epoch(base) + 10) == 0.0
+
+
+def test_schedule_due_never_raises():
+    assert schedule_scheduled_messages([(1, datetime(2026, 7, 1, 12, 0))], BrokenRedis()) == 0
+    assert schedule_scheduled_messages([], BrokenRedis()) == 0
+
+
+def test_dispatch_groups_by_kind_and_isolates_failures():
+    calls = {}
+
+    def messages(parts_list):
+        calls['messages'] = parts_list
+        return len(parts_list)
+
+    def appointments(parts_list):
+        raise RuntimeError("db down")
+
+    enqueued = dispatch_due(
+        ["scheduled_msg:1", "appointment_run:4:9", "scheduled_msg:2", "unknown:1"],
+        handlers={'scheduled_msg': messages, 'appointment_run': appointments},
+    )
+    assert enqueued == 2
+    assert calls['messages'] == [["1"], ["2"]]
+
+
+def test_scheduler_lock_is_owner_tagged():
+    redis = FakeRedis()
+    assert run_scheduler.hold_scheduler_lock(redis, "lock", "a", 90)
+    assert run_scheduler.hold_scheduler_lock(redis, "lock", "a", 90)  # leader renews
+    assert not run_scheduler.hold_scheduler_lock(redis, "lock", "b", 90)
+    del redis.strings["lock"]  # TTL expired
+    assert run_scheduler.hold_scheduler_lock(redis, "lock", "b", 90)
+
+
+def test_due_index_step_dispatches_and_sleeps_until_next(monkeypatch):
+    redis = FakeRedis()
+    dispatched = []
+    monkeypatch.setattr(due_scheduler, "dispatch_due", lambda members: dispatched.extend(members) or len(members))
+    monkeypatch.setattr(run_scheduler.time, "time", lambda: 1000.0)
+    redis.zadd(DUE_KEY, {"scheduled_msg:1": 999.5, "scheduled_msg:2": 1000.1})
+
+    enqueued, sleep_seconds = run_scheduler.due_index_step(redis, poll_seconds=0.25)
+    assert enqueued == 1
+    assert dispatched == ["scheduled_msg:1"]
+    assert sleep_seconds == pytest.approx(0.1)
+
+    redis.zsets[DUE_KEY].clear()
+    assert run_scheduler.due_index_step(redis, poll_seconds=0.25) == (0, 0.25)
@@ -0,0 +1,189 @@
+"""
+Tests for frame_pacer.py
+Deterministic simulation of the TX loop pacing (MediaStreamHandler._tx_loop)
+with an injectable clock: CPU stalls, underruns, turn boundaries and clears.
+"""
+from collections import deque
+
+import pytest
+
+from server.services.frame_pacer import FramePacer
+
+FRAME = 0.02
+
+
+class FakeClock:
+    def __init__(self, start: float = 1000.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+def run_tx(pacer, clock, arrivals, stalls=None, get_timeout=0.5):
+    """
+    Mirror of the TX loop: `arrivals` are times frames enter the TX queue,
+    `stalls` maps frame index -> extra seconds lost before that send (CPU pressure)
+
+    Returns (send times, finished turn stats)
+    """
+    stalls = stalls or {}
+    pending = deque(arrivals)
+    queued = deque()
+    sent, turns = [], []
+    while pending or queued:
+        while pending and pending[0] <= clock.now:
+            queued.append(pending.popleft())
+        if not queued:
+            delay = pacer.delay()
+            if delay > 0:
+                clock.sleep(delay)
+                continue
+            pacer.starved()
+            wait = pending[0] - clock.now
+            if wait > get_timeout:
+                clock.sleep(get_timeout)
+                turn = pacer.end_turn_if_idle()
+                if turn:
+                    turns.append(turn)
+            else:
+                clock.now = pending[0]
+            continue
+        queued.popleft()
+        delay = pacer.delay()
+        if delay > 0:
+            clock.sleep(delay)
+        clock.sleep(stalls.get(len(sent), 0.0))
+        sent.append(clock.now)
+        pacer.frame_sent(len(queued))
+    clock.sleep(get_timeout)
+    pacer.starved()
+    clock.sleep(get_timeout)
+    turn = pacer.end_turn_if_idle()
+    if turn:
+        turns.append(turn)
+    return sent, turns
+
+
+def burst(start: float, frames: int, speedup: float = 2.0):
+    """Provider audio arriving faster than real time"""
+    return [start + i * FRAME / speedup for i in range(frames)]
+
+
+def legacy_send_times(clock, frames, stalls):
+    """Previous pacing: sleep after send, re-anchor on every missed deadline"""
+    sent = []
+    next_deadline = clock.now
+    for i in range(frames):
+        clock.sleep(stalls.get(i, 0.0))
+        sent.append(clock.now)
+        next_deadline += FRAME
+        delay = next_deadline - clock.now
+        if delay > 0:
+            clock.sleep(delay)
+        else:
+            next_deadline = clock.now
+    return sent
+
+
+def test_steady_stream_is_on_timeline():
+    clock = FakeClock()
+    pacer = FramePacer(interval=FRAME, clock=clock)
+    sent, _ = run_tx(pacer, clock, burst(clock.now, 250))
+    t0 = sent[0]
+    for k, t in enumerate(sent):
+        assert t == pytest.approx(t0 + k * FRAME)
+    stats = pacer.stats()
+    assert stats["frames"] == 250
+    assert stats["late_frames"] == 0
+    assert stats["jitter_max_ms"] == pytest.approx(0.0, abs=1e-6)
+
+
+def test_short_stall_is_caught_up_without_drift():
+    stalls = {100: 0.05}  # 50ms scheduler hiccup
+    clock = FakeClock()
+    pacer = FramePacer(interval=FRAME, clock=clock)
+    sent, _ = run_tx(pacer, clock, burst(clock.now, 250), stalls=stalls)
+    t0 = sent[0]
+    # Stream returns to the original timeline after a bounded burst
+    assert sent[-1] == pytest.approx(t0 + 249 * FRAME)
+    assert min(b - a for a, b in zip(sent, sent[1:])) >= 0.0
+    stats = pacer.stats()
+    assert stats["resyncs"] == 0
+    assert stats["late_frames"] == 3  # frames 100-102 go out back-to-back
+    assert stats["jitter_max_ms"] == pytest.approx(50.0)
+
+    # The old sleep-after-send loop re-anchors on the miss and keeps the delay (drift)
+    legacy_clock = FakeClock()
+    legacy = legacy_send_times(legacy_clock, 250, stalls)
+    assert legacy[-1] - legacy[0] == pytest.approx(249 * FRAME + 0.03)
+
+
+def test_long_stall_resyncs_instead_of_bursting():
+    clock = FakeClock()
+    pacer = FramePacer(interval=FRAME, clock=clock, max_catchup_frames=3)
+    sent, _ = run_tx(pacer, clock, burst(clock.now, 100), stalls={40: 0.3})
+    gaps = [b - a for a, b in zip(sent, sent[1:])]
+    # No catch-up burst: after the stall every gap is a full frame again
+    assert all(g == pytest.approx(FRAME) for g in gaps[40:])
+    assert len(sent) == 100  # audio is never dropped
+    assert pacer.stats()["resyncs"] == 1
+
+
+def test_underrun_mid_turn_is_counted_and_reanchors():
+    clock = FakeClock()
+    pacer = FramePacer(interval=FRAME, clock=clock)
+    start = clock.now
+    # 1s of audio (plays until start+1.0), the rest of the sentence arrives 100ms late
+    arrivals = burst(start, 50) + burst(start + 1.1, 25)
+    sent, turns = run_tx(pacer, clock, arrivals)
+    stats = pacer.stats()
+    assert stats["underruns"] == 1
+    assert stats["late_frames"] == 0  # starvation is not lateness
+    assert len(turns) == 1
+    assert turns[0]["frames"] == 75
+    assert turns[0]["underruns"] == 1
+
+
+def test_turns_are_split_on_idle_gap():
+    clock = FakeClock()
+    pacer = FramePacer(interval=FRAME, clock=clock)
+    start = clock.now
+    arrivals = burst(start, 50) + burst(start + 3.0, 30)
+    sent, turns = run_tx(pacer, clock, arrivals)
+    assert [t["frames"] for t in turns] == [50, 30]
+    assert all(t["underruns"] == 0 for t in turns)
+    assert pacer.stats()["frames"] == 80
+    assert pacer.stats()["underruns"] == 0
+
+
+def test_reset_starts_new_spurt_without_underrun():
+    clock = FakeClock()
+    pacer = FramePacer(interval=FRAME, clock=clock)
+    for _ in range(10):
+        clock.sleep(pacer.delay())
+        pacer.frame_sent(5)
+    pacer.reset()  # barge-in clear
+    assert not pacer.active
+    assert pacer.delay() == 0.0
+    turn = pacer.end_turn_if_idle()
+    assert turn["frames"] == 10
+    assert turn["queue_depth_max"] == 5
+    clock.sleep(0.007)
+    pacer.frame_sent(0)
+    assert pacer.stats()["underruns"] == 0
+    assert pacer.stats()["late_frames"] == 0
+
+
+def test_queue_depth_counters():
+    clock = FakeClock()
+    pacer = FramePacer(interval=FRAME, clock=clock)
+    for depth in (10, 20, 30):
+        clock.sleep(pacer.delay())
+        pacer.frame_sent(depth)
+    stats = pacer.stats()
+    assert stats["queue_depth_max"] == 30
+    assert stats["queue_depth_avg"] == 20.0
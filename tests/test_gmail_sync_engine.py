@@ -0,0 +1,185 @@
+"""
+Tests for the pipelined Gmail receipt sync (server/services/gmail_sync_engine.py)
+Runs against the local fake Gmail API in scripts/fake_gmail_api.py: batch
+fetches, prefetch order, rate limiting, history mode and checkpoint resume
+"""
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+from fake_gmail_api import FakeGmailApi, FakeMailbox  # noqa: E402
+from server.services import gmail_sync_service  # noqa: E402
+from server.services.gmail_sync_engine import (  # noqa: E402
+    MessagePrefetcher, find_resumable_sync_run, list_history_message_ids,
+)
+from server.services.gmail_sync_service import GmailApiClient, GmailApiError, GmailRateLimiter  # noqa: E402
+
+
+@pytest.fixture
+def fake_gmail():
+    with FakeGmailApi(FakeMailbox(40, receipt_every=2)) as api:
+        yield api
+
+
+def _listing(gmail):
+    page_token = None
+    while True:
+        page = gmail.list_messages(max_results=15, page_token=page_token)
+        for message in page.get('messages', []):
+            yield message['id'], page_token
+        page_token = page.get('nextPageToken')
+        if not page_token:
+            return
+
+
+def test_batch_get_retries_the_batch_and_reports_failed_parts(fake_gmail):
+    gmail = GmailApiClient('token', api_root=fake_gmail.url)
+    ids = fake_gmail.mailbox.order[:2] + ['deleted-meanwhile']
+    fake_gmail.fail_next = 2  # the whole batch is throttled twice
+
+    messages = gmail.batch_get_messages(ids)
+
+    assert gmail.retries == 2 and fake_gmail.stats['batch'] == 1 and fake_gmail.stats['batch_parts'] == 3
+    assert [messages[i]['id'] for i in ids[:2]] == ids[:2]
+    assert isinstance(messages['deleted-meanwhile'], GmailApiError)
+    assert messages['deleted-meanwhile'].status_code == 404
+
+
+def test_prefetcher_keeps_listing_order_and_downloads_ahead(fake_gmail):
+    fake_gmail.latency = 0.02
+    gmail = GmailApiClient('token', api_root=fake_gmail.url)
+    fake_gmail.fail_next = 1  # first list call is throttled and retried
+
+    with MessagePrefetcher(gmail, fetch_workers=4, extract_workers=0, batch_size=10, window=30) as prefetcher:
+        items = list(prefetcher.iter_messages(_listing(gmail)))
+
+    assert [item.message_id for item in items] == fake_gmail.mailbox.order
+    assert not [item for item in items if item.error]
+    receipts = [item for item in items if item.is_receipt]
+    assert len(receipts) == 20
+    for item in receipts:
+        (attachment_id, future), = item.attachments.items()
+        assert future.result() == fake_gmail.mailbox.attachments[attachment_id]
+        assert item.extraction.result()['extracted']['vendor_name'] == 'Paypal'
+    assert fake_gmail.stats['batch'] == 4 and fake_gmail.stats['get'] == 40  # 40 parts, no single GETs
+    assert fake_gmail.stats['peak_concurrency'] > 1
+    assert prefetcher.stats['messages'] == 40 and prefetcher.stats['attachments'] == 20
+    assert prefetcher.stats['extractions'] == 20
+
+
+def test_receipts_are_extracted_in_a_worker_process(fake_gmail):
+    gmail = GmailApiClient('token', api_root=fake_gmail.url)
+    listed = [(message_id, None) for message_id in fake_gmail.mailbox.order[:2]]
+
+    with MessagePrefetcher(gmail, fetch_workers=2, extract_workers=1, batch_size=2) as prefetcher:
+        items = list(prefetcher.iter_messages(listed))
+        results = [prefetcher.extraction_pool.result(item.extraction, timeout=120)
+                   for item in items if item.extraction is not None]
+
+    assert len(results) == 1  # one receipt in the first two messages
+    assert results[0]['extracted']['vendor_name'] == 'Paypal' and len(results[0]['parsed_pdfs']) == 1
+
+
+def test_rate_limiter_holds_callers_to_the_quota():
+    limiter = GmailRateLimiter(200)  # bucket of 200 units, refilled at 200/s
+    started = time.monotonic()
+    for _ in range(60):
+        limiter.acquire(5)  # 300 units
+    assert time.monotonic() - started >= 0.4
+
+    limiter.penalize(0.3)  # a 429: nobody calls for 0.3s
+    started = time.monotonic()
+    limiter.acquire(1)
+    assert time.monotonic() - started >= 0.25
+
+
+def test_history_lists_new_messages_once_and_skips_drafts(fake_gmail):
+    gmail = GmailApiClient('token', api_root=fake_gmail.url)
+    start = gmail.get_profile()['historyId']
+    new_id = fake_gmail.mailbox.add('new-1')
+    fake_gmail.mailbox.add('draft-1', labels=('DRAFT',))
+    fake_gmail.mailbox.history.append((fake_gmail.mailbox.history_id + 1, new_id, ['INBOX', 'IMPORTANT']))
+
+    assert list_history_message_ids(gmail, start) == ['new-1']
+
+    fake_gmail.history_expired = True
+    with pytest.raises(GmailApiError) as exc:
+        list_history_message_ids(gmail, start)
+    assert exc.value.status_code == 404
+
+
+# ─── Full sync against the fake API (SQLite, only the tables the sync touches) ───
+
+class _MemoryStorage:
+    def save_file(self, file, business_id, attachment_id, purpose='general_upload'):
+        data = file.read()
+        return f"receipts/{business_id}/{attachment_id}", len(data)
+
+
+@pytest.fixture
+def sync_db(monkeypatch, fake_gmail):
+    from flask import Flask
+    from server.db import db
+    from server.models_sql import Attachment, Business, GmailConnection, Receipt, ReceiptExtraction, ReceiptSyncRun
+    from server.services import attachment_service
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+
+    gmail = GmailApiClient('token', api_root=fake_gmail.url)
+    monkeypatch.setattr(gmail_sync_service, 'get_gmail_service', lambda business_id: gmail)
+    monkeypatch.setattr(attachment_service, 'get_attachment_service', lambda: _MemoryStorage())
+    monkeypatch.setattr(gmail_sync_service, 'RUN_TO_COMPLETION', False)
+    monkeypatch.setattr('server.services.receipt_extraction.RECEIPT_EXTRACTION_TIMEOUT', 120)
+
+    with app.app_context():
+        tables = [model.__table__ for model in (Business, Attachment, GmailConnection, ReceiptSyncRun, Receipt,
+                                                ReceiptExtraction)]
+        db.metadata.create_all(bind=db.engine, tables=tables)
+        db.session.add(Business(id=1, name='Receipts Ltd'))
+        db.session.add(GmailConnection(business_id=1, email_address='fake@example.com',
+                                       refresh_token_encrypted='x', status='connected'))
+        db.session.commit()
+        yield db
+        db.session.remove()
+        db.metadata.drop_all(bind=db.engine, tables=tables)
+
+
+def test_paused_sync_resumes_without_duplicates_then_goes_incremental(sync_db, fake_gmail, monkeypatch):
+    from server.models_sql import GmailConnection, Receipt
+
+    monkeypatch.setattr(gmail_sync_service, 'MAX_MESSAGES_PER_RUN', 12)
+    first = gmail_sync_service.sync_gmail_receipts(business_id=1, mode='incremental')
+    run = find_resumable_sync_run(1, 'incremental', months_back=36)
+    assert run is not None and run.id == first['sync_run_id'] and run.status == 'paused'
+    assert run.messages_scanned == 12 and Receipt.query.count() == 6
+    assert first['pipeline']['extractions'] == 6 and first['pipeline']['extraction_timeouts'] == 0
+
+    monkeypatch.setattr(gmail_sync_service, 'MAX_MESSAGES_PER_RUN', 500)
+    second = gmail_sync_service.sync_gmail_receipts(business_id=1, mode='incremental', sync_run=run)
+
+    assert second['sync_run_id'] == run.id and run.status == 'completed'
+    # checkpoints are per page: the paused page is listed again, its saved receipts are skipped
+    assert second['saved_receipts'] == 20 and second['messages_scanned'] >= 40
+    ids = [r.gmail_message_id for r in Receipt.query.all()]
+    assert len(ids) == 20 and len(set(ids)) == 20
+    assert find_resumable_sync_run(1, 'incremental', months_back=36) is None
+
+    # Next incremental sync reads the mailbox history instead of listing it again
+    connection = GmailConnection.query.filter_by(business_id=1).first()
+    assert connection.last_history_id == str(fake_gmail.mailbox.history_id)
+    fake_gmail.mailbox.add('late-receipt')
+    fake_gmail.mailbox.add('late-draft', labels=('DRAFT',))
+    lists_before = fake_gmail.stats['list']
+
+    third = gmail_sync_service.sync_gmail_receipts(business_id=1, mode='incremental')
+
+    assert fake_gmail.stats['list'] == lists_before and fake_gmail.stats['history'] == 1
+    assert third['messages_scanned'] == 1 and third['saved_receipts'] == 1
+    assert Receipt.query.filter_by(gmail_message_id='late-receipt').count() == 1
@@ -0,0 +1,174 @@
+"""
+Tests for lead_counters.py and lead_list_service.py
+Counters follow ORM inserts / status changes / deletes, the reconciler seeds and
+fixes drift, and keyset pages walk the list without gaps or repeats
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from server.models_sql import Lead, LeadCounter
+from server.services import lead_counters
+from server.services.lead_counters import LeadCounts, counter_key, read_lead_counts, reconcile_lead_counters
+from server.services.lead_list_service import decode_list_cursor, encode_list_cursor, keyset_page
+
+
+@pytest.fixture
+def app():
+    from flask import Flask
+    from sqlalchemy.pool import StaticPool
+    from server.db import db as _db
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'poolclass': StaticPool}
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    _db.init_app(app)
+
+    with app.app_context():
+        # Lead + the tables its relationships touch on delete (create_all trips on SQLite)
+        tables = {Lead.__table__, LeadCounter.__table__}
+        tables.update(rel.mapper.local_table for rel in Lead.__mapper__.relationships)
+        _db.metadata.create_all(bind=_db.engine, tables=list(tables))
+        assert lead_counters.register_lead_counter_listeners(_db.engine)
+        yield app
+        lead_counters.unregister_lead_counter_listeners()
+        _db.session.remove()
+
+
+@pytest.fixture
+def session(app):
+    from server.db import db as _db
+    return _db.session
+
+
+def _add_leads(session, tenant_id, specs, start=None):
+    start = start or datetime(2026, 1, 1)
+    leads = [Lead(tenant_id=tenant_id, status=status, source=source, created_at=start + timedelta(minutes=i))
+             for i, (status, source) in enumerate(specs)]
+    session.add_all(leads)
+    session.commit()
+    return leads
+
+
+def _raw_counters(session, tenant_id):
+    rows = session.execute(text("SELECT status, source, lead_count FROM lead_counters WHERE tenant_id = :t"),
+                           {'t': tenant_id})
+    return {(r.status, r.source): r.lead_count for r in rows if r.lead_count}
+
+
+def test_counter_key_and_counts_math():
+    assert counter_key('3', 'Qualified', None) == (3, 'qualified', '')
+    counts = LeadCounts({('new', 'call'): 3, ('new', 'whatsapp'): 2, ('won', 'call'): 1})
+    assert counts.total == 6
+    assert counts.by_status() == {'new': 5, 'won': 1}
+    assert counts.by_source() == {'call': 4, 'whatsapp': 2}
+    assert counts.count(statuses=['NEW']) == 5
+    assert counts.count(statuses=['new', 'won'], sources=['call']) == 4
+    assert counts.count(sources=[]) == 0
+
+
+def test_listeners_follow_insert_status_change_and_delete(session):
+    leads = _add_leads(session, 1, [('new', 'call'), ('new', 'whatsapp'), ('New', 'call')])
+    _add_leads(session, 2, [('won', 'form')])
+    assert _raw_counters(session, 1) == {('new', 'call'): 2, ('new', 'whatsapp'): 1}
+
+    leads[0].status = 'qualified'
+    leads[1].source = 'call'
+    session.commit()
+    assert _raw_counters(session, 1) == {('new', 'call'): 2, ('qualified', 'call'): 1}
+
+    leads[2].status = 'new'  # case-only change - same counter
+    session.commit()
+    session.delete(leads[0])
+    session.commit()
+    assert _raw_counters(session, 1) == {('new', 'call'): 2}
+    assert _raw_counters(session, 2) == {('won', 'form'): 1}
+
+
+def test_rollback_discards_pending_deltas(session):
+    _add_leads(session, 1, [('new', 'call')])
+    session.add(Lead(tenant_id=1, status='new', source='call'))
+    session.flush()
+    session.rollback()
+    assert _raw_counters(session, 1) == {('new', 'call'): 1}
+
+
+def test_deltas_are_applied_after_commit_not_in_the_callers_transaction(session):
+    _add_leads(session, 1, [('new', 'call')])
+    session.add(Lead(tenant_id=1, status='new', source='call'))
+    session.flush()
+    assert _raw_counters(session, 1) == {('new', 'call'): 1}  # counter rows untouched until commit
+    session.commit()
+    assert _raw_counters(session, 1) == {('new', 'call'): 2}
+
+    session.add(Lead(tenant_id=1, status='new', source='call'))
+    session.flush()
+    session.close()  # ended without a commit
+    session.add(Lead(tenant_id=1, status='won', source='call'))
+    session.commit()
+    assert _raw_counters(session, 1) == {('new', 'call'): 2, ('won', 'call'): 1}
+
+
+def test_savepoint_rollback_drops_only_its_deltas(session):
+    session.add(Lead(tenant_id=1, status='new', source='call'))
+    with session.begin_nested():
+        session.add(Lead(tenant_id=1, status='won', source='call'))
+    with pytest.raises(ValueError):
+        with session.begin_nested():
+            session.add(Lead(tenant_id=1, status='lost', source='call'))
+            session.flush()
+            raise ValueError("rolled back")
+    session.commit()
+    assert _raw_counters(session, 1) == {('new', 'call'): 1, ('won', 'call'): 1}
+
+
+def test_counts_untrusted_until_reconciled_then_drift_is_fixed(session):
+    _add_leads(session, 1, [('new', 'call')] * 3 + [('lost', None)])
+    assert read_lead_counts(1) is None  # listeners saw the writes, reconciler did not yet
+
+    stats = reconcile_lead_counters()
+    assert stats == {'tenants': 1, 'drifted': 0, 'drift': 0, 'failed': 0}
+    counts = read_lead_counts(1)
+    assert counts.total == 4 and counts.by_status() == {'new': 3, 'lost': 1}
+
+    # A bulk UPDATE bypasses the listeners
+    session.execute(text("UPDATE leads SET status = 'won' WHERE status = 'lost'"))
+    session.commit()
+    assert read_lead_counts(1).by_status() == {'new': 3, 'lost': 1}
+    stats = reconcile_lead_counters([1])
+    assert stats['drifted'] == 1 and stats['drift'] == 2
+    assert read_lead_counts(1).by_status() == {'new': 3, 'won': 1}
+    assert _raw_counters(session, 1) == {('new', 'call'): 3, ('won', 'form'): 1}  # Lead.source defaults to 'form'
+
+
+def test_cursor_round_trip_and_invalid():
+    stamp = datetime(2026, 3, 4, 5, 6, 7, 890)
+    assert decode_list_cursor(encode_list_cursor(stamp, 42)) == (stamp, 42)
+    assert decode_list_cursor(encode_list_cursor(None, 7)) == (None, 7)
+    assert decode_list_cursor('') is None
+    with pytest.raises(ValueError):
+        decode_list_cursor('not-a-cursor')
+
+
+def test_keyset_pages_cover_every_lead_once(session):
+    leads = _add_leads(session, 1, [('new', 'call')] * 7)
+    leads[3].created_at = leads[4].created_at  # tie on created_at - id breaks it
+    undated = Lead(tenant_id=1, status='new', source='call')
+    session.add(undated)
+    session.commit()
+    session.execute(text("UPDATE leads SET created_at = NULL WHERE id = :id"), {'id': undated.id})
+    session.commit()
+    _add_leads(session, 2, [('new', 'call')] * 3)  # other tenant, filtered out
+
+    query = Lead.query.filter_by(tenant_id=1)
+    seen, cursor, pages = [], '', 0
+    while cursor is not None:
+        rows, cursor = keyset_page(query, cursor, 3)
+        seen.extend(lead.id for lead in rows)
+        pages += 1
+
+    expected = [lead.id for lead in sorted(leads, key=lambda l: (l.created_at, l.id), reverse=True)]
+    assert seen == expected + [undated.id]
+    assert pages == 3
@@ -0,0 +1,93 @@
+"""
+Tests for lead_export_service.py (/api/leads/export)
+CSV chunking, XLSX output, temp file streaming, filter parsing and flat memory
+"""
+import csv
+import io
+import os
+import tracemalloc
+
+from openpyxl import load_workbook
+from werkzeug.datastructures import MultiDict
+
+from server.services.lead_export_service import (
+    EXPORT_HEADERS, LeadExportFilters, iter_csv_chunks, iter_file_chunks,
+    normalize_source, write_export, write_export_tempfile,
+)
+
+
+def make_rows(count: int):
+    for i in range(count):
+        yield [i, f"ליד {i}", "משה", "כהן", f"+97250{i:07d}", f"u{i}@example.com",
+               "חדש", "phone", "", "", "inbound", "סיכום, עם פסיק", "a,b",
+               "01/01/2026 10:00", "", ""]
+
+
+def test_csv_chunks_round_trip_with_bom():
+    chunks = list(iter_csv_chunks(make_rows(1201), flush_rows=500))
+    assert len(chunks) == 3  # 500 + 500 + 201 rows (headers in the first chunk)
+    data = b"".join(chunks)
+    assert data.startswith("\ufeff".encode("utf-8"))
+    parsed = list(csv.reader(io.StringIO(data.decode("utf-8-sig"))))
+    assert parsed[0] == EXPORT_HEADERS
+    assert len(parsed) == 1202
+    assert parsed[1][0] == "0"
+    assert parsed[1][11] == "סיכום, עם פסיק"
+
+
+def test_csv_empty_export_has_headers_only():
+    data = b"".join(iter_csv_chunks(iter([])))
+    parsed = list(csv.reader(io.StringIO(data.decode("utf-8-sig"))))
+    assert parsed == [EXPORT_HEADERS]
+
+
+def test_write_xlsx():
+    progress = []
+    buffer = io.BytesIO()
+    count = write_export(make_rows(2500), buffer, "xlsx", on_progress=progress.append)
+    assert count == 2500
+    assert progress == [1000, 2000]
+    buffer.seek(0)
+    sheet = load_workbook(buffer, read_only=True).active
+    rows = list(sheet.iter_rows(values_only=True))
+    assert list(rows[0]) == EXPORT_HEADERS
+    assert len(rows) == 2501
+    assert rows[-1][1] == "ליד 2499"
+
+
+def test_tempfile_is_streamed_and_deleted():
+    path, count = write_export_tempfile(make_rows(10), "csv")
+    assert count == 10
+    data = b"".join(iter_file_chunks(path, chunk_size=64))
+    assert data.startswith("\ufeff".encode("utf-8"))
+    assert not os.path.exists(path)
+
+
+def test_filters_from_args():
+    filters = LeadExportFilters.from_args(MultiDict([
+        ("statuses[]", "new"), ("statuses[]", "won"), ("source", "whatsapp"),
+        ("q", "כהן"), ("from", "2026-01-01T00:00:00Z"),
+    ]))
+    assert filters.statuses == ["new", "won"]
+    assert filters.source == "whatsapp"
+    assert filters.from_date == "2026-01-01T00:00:00Z"
+    assert LeadExportFilters(**filters.to_dict()) == filters  # RQ round trip
+
+
+def test_normalize_source():
+    assert normalize_source("WhatsApp ") == "whatsapp"
+    assert normalize_source("realtime_phone") == "phone"
+    assert normalize_source(None) == "phone"
+
+
+def test_csv_memory_is_flat():
+    def peak_for(count):
+        tracemalloc.start()
+        for _ in iter_csv_chunks(make_rows(count)):
+            pass
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+
+    small, large = peak_for(2000), peak_for(40000)
+    assert large < small * 2
@@ -0,0 +1,187 @@
+"""
+Tests for the Twilio media stream bridge (server/services/media_bridge.py)
+Decode-once frames, batched hand-off, frame pooling, TX coalescing and backpressure
+"""
+import asyncio
+import base64
+import json
+import threading
+
+from server.services import media_bridge
+from server.services.media_bridge import MediaStreamBridge, bridge_stats, coalesce
+
+
+def media(seq, stream_sid="MZ1"):
+    payload = base64.b64encode(bytes([seq % 256]) * 160).decode("ascii")
+    return json.dumps({"event": "media", "streamSid": stream_sid, "media": {"payload": payload}})
+
+
+class FakeWebSocket:
+    """Starlette WebSocket surface used by the bridge (receive / send_text / send_bytes)"""
+
+    def __init__(self, messages, delay=0.0):
+        self.delay = delay
+        self.incoming = asyncio.Queue()
+        for text in messages:
+            self.incoming.put_nowait({"type": "websocket.receive", "text": text})
+        self.incoming.put_nowait({"type": "websocket.disconnect"})
+        self.sent = []
+
+    async def receive(self):
+        if self.delay:
+            await asyncio.sleep(self.delay)  # frames arrive paced, like a live stream
+        return await self.incoming.get()
+
+    async def send_text(self, data):
+        self.sent.append(data)
+
+    async def send_bytes(self, data):
+        self.sent.append(data)
+
+
+def run_bridge(messages, handler, delay=0.0, **kwargs):
+    """Run pump_in / pump_out on a loop and `handler(bridge)` on a thread, like asgi.py"""
+    async def main():
+        ws = FakeWebSocket(messages, delay)
+        bridge = MediaStreamBridge(ws, **kwargs)
+        bridge.bind_loop(asyncio.get_running_loop())
+        thread = threading.Thread(target=handler, args=(bridge,))
+        thread.start()
+        await asyncio.gather(bridge.pump_in(), bridge.pump_out())
+        await asyncio.get_running_loop().run_in_executor(None, thread.join, 5)
+        return bridge, ws
+
+    return asyncio.run(main())
+
+
+def test_frames_are_decoded_once_and_handed_over_in_order():
+    messages = [json.dumps({"event": "start", "start": {"streamSid": "MZ1", "callSid": "CA1"}})]
+    messages += [media(i) for i in range(200)]
+    messages += ["not json", json.dumps({"event": "stop"})]
+    seen = []
+
+    def handler(bridge):
+        while True:
+            frame = bridge.receive(timeout=5)
+            if frame is None:
+                break
+            audio = frame.audio
+            seen.append((frame.event, audio[0] if audio else None, frame.data.get("streamSid")))
+
+    bridge, _ = run_bridge(messages, handler, delay=0.001)
+
+    assert seen[0] == ("start", None, None)
+    assert seen[1:201] == [("media", i % 256, "MZ1") for i in range(200)]
+    assert seen[201][0] == "stop"
+    stats = bridge.stats()
+    assert stats["rx_frames"] == 202 and stats["rx_invalid"] == 1
+    assert stats["frames_allocated"] == media_bridge.POOL_SIZE  # frames were recycled
+    assert stats["rx_batches"] <= 202
+
+
+def test_handler_sends_reach_the_socket_in_order():
+    def handler(bridge):
+        for i in range(50):
+            bridge.send(media(i))
+        bridge.send(json.dumps({"event": "mark", "streamSid": "MZ1", "mark": {"name": "end"}}))
+        while bridge.receive(timeout=5) is not None:
+            pass
+
+    bridge, ws = run_bridge([], handler)
+    assert ws.sent[:50] == [media(i) for i in range(50)]
+    assert json.loads(ws.sent[50])["event"] == "mark"
+    assert bridge.stats()["tx_wakeups"] <= 51
+
+
+def test_media_before_clear_is_coalesced_away():
+    mark = json.dumps({"event": "mark", "streamSid": "MZ1", "mark": {"name": "m1"}})
+    clear = json.dumps({"event": "clear", "streamSid": "MZ1"})
+    batch = [media(1), mark, media(2), clear, media(3)]
+    assert coalesce(batch) == [mark, clear, media(3)]
+    assert coalesce([media(1), media(2)]) == [media(1), media(2)]
+    # Compact separators (e.g. the clear in _send_mulaw_frames_with_mark) are matched too
+    compact_clear = json.dumps({"event": "clear", "streamSid": "MZ1"}, separators=(",", ":"))
+    compact_media = json.dumps({"event": "media", "streamSid": "MZ1", "media": {"payload": "AA=="}},
+                               separators=(",", ":"))
+    assert coalesce([compact_media, media(1), compact_clear, media(2)]) == [compact_clear, media(2)]
+
+
+def test_full_rx_queue_drops_media_but_keeps_control_events(monkeypatch):
+    monkeypatch.setattr(media_bridge, "RX_FULL_WAIT", 0.01)
+    messages = [media(i) for i in range(10)] + [json.dumps({"event": "stop"})]
+    release = threading.Event()
+    seen = []
+
+    def handler(bridge):
+        release.wait(5)
+        while True:
+            frame = bridge.receive(timeout=1)
+            if frame is None:
+                break
+            seen.append(frame.event)
+
+    async def main():
+        ws = FakeWebSocket(messages)
+        bridge = MediaStreamBridge(ws, rx_max=4)
+        bridge.bind_loop(asyncio.get_running_loop())
+        thread = threading.Thread(target=handler, args=(bridge,))
+        thread.start()
+        await bridge.pump_in()  # handler not reading yet
+        release.set()
+        await asyncio.get_running_loop().run_in_executor(None, thread.join, 5)
+        return bridge
+
+    bridge = asyncio.run(main())
+    assert seen == ["media"] * 4 + ["stop"]
+    assert bridge.stats()["rx_dropped"] == 6
+
+
+def test_send_nowait_drops_when_the_socket_is_behind():
+    async def main():
+        bridge = MediaStreamBridge(FakeWebSocket([]), tx_max=3)
+        bridge.bind_loop(asyncio.get_running_loop())
+        for i in range(5):
+            bridge.send_nowait(media(i))
+        stats = bridge.stats()
+        bridge.stop()
+        return stats
+
+    stats = asyncio.run(main())
+    assert stats["tx_depth"] == 3 and stats["tx_dropped"] == 2
+
+
+def test_bridge_stats_reports_live_streams():
+    async def main():
+        bridge = MediaStreamBridge(FakeWebSocket([]))
+        bridge.bind_loop(asyncio.get_running_loop())
+        bridge.send_nowait(media(1))
+        live = bridge_stats()
+        bridge.stop()
+        return live, bridge_stats()
+
+    live, after = asyncio.run(main())
+    assert live["streams"] >= 1 and live["tx_depth_max"] >= 1
+    assert after["streams"] == live["streams"] - 1
+
+
+def test_receive_batch_from_another_loop():
+    messages = [json.dumps({"event": "start", "start": {"streamSid": "MZ1", "callSid": "CA1"}})]
+    messages += [media(i) for i in range(100)]
+    seen = []
+
+    def handler(bridge):
+        # Stands in for the shared call loop: a second loop on its own thread
+        async def read():
+            while True:
+                events = await bridge.receive_batch(timeout=5)
+                if not events:
+                    break
+                seen.extend((evt.get("event"), audio[0] if audio else None) for evt, audio in events)
+
+        asyncio.run(read())
+
+    bridge, _ = run_bridge(messages, handler, delay=0.001)
+
+    assert seen[0] == ("start", None)
+    assert seen[1:] == [("media", i % 256) for i in range(100)]
+    assert bridge.stats()["rx_batches"] <= 101
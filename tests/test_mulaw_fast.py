@@ -0,0 +1,101 @@
+"""
+Tests for mulaw_fast.py
+Verifies the NumPy codec is bit-exact with the audioop functions it replaces.
+"""
+import base64
+
+import numpy as np
+import pytest
+
+from server.services.mulaw_fast import (
+    MULAW_DECODE_TABLE,
+    MULAW_ENCODE_TABLE,
+    b64_mulaw_decode,
+    mulaw_to_pcm16_fast,
+    pcm16_peak,
+    pcm16_rms,
+    pcm16_to_mulaw_fast,
+    ratecv_fast,
+    resample_pcm16,
+    ulaw_decode,
+    ulaw_encode,
+)
+
+audioop = pytest.importorskip("audioop")
+
+ALL_PCM16 = np.arange(65536, dtype=np.uint16).view(np.int16).tobytes()
+
+
+def _random_pcm(n_samples: int, seed: int = 0) -> bytes:
+    rng = np.random.default_rng(seed)
+    return rng.integers(-32768, 32768, n_samples).astype(np.int16).tobytes()
+
+
+def test_tables_match_audioop():
+    assert MULAW_DECODE_TABLE.tobytes() == audioop.ulaw2lin(bytes(range(256)), 2)
+    assert MULAW_ENCODE_TABLE.tobytes() == audioop.lin2ulaw(ALL_PCM16, 2)
+
+
+def test_bytes_api_matches_audioop():
+    mulaw = bytes(range(256)) * 3
+    assert mulaw_to_pcm16_fast(mulaw) == audioop.ulaw2lin(mulaw, 2)
+    assert pcm16_to_mulaw_fast(ALL_PCM16) == audioop.lin2ulaw(ALL_PCM16, 2)
+
+
+def test_decode_encode_into_preallocated_buffers():
+    mulaw = bytes(range(160))
+    pcm_buf = np.empty(160, dtype=np.int16)
+    result = ulaw_decode(mulaw, out=pcm_buf)
+    assert result is pcm_buf
+    assert pcm_buf.tobytes() == audioop.ulaw2lin(mulaw, 2)
+
+    mulaw_buf = np.empty(160, dtype=np.uint8)
+    result = ulaw_encode(pcm_buf, out=mulaw_buf)
+    assert result is mulaw_buf
+    assert mulaw_buf.tobytes() == audioop.lin2ulaw(pcm_buf.tobytes(), 2)
+
+
+def test_b64_fused_decode():
+    mulaw = bytes(range(96, 256))  # one 20ms frame
+    payload = base64.b64encode(mulaw).decode("ascii")
+    assert b64_mulaw_decode(payload).tobytes() == audioop.ulaw2lin(mulaw, 2)
+
+    # Into a larger reusable buffer - returns a view of the written slice
+    buf = np.zeros(320, dtype=np.int16)
+    view = b64_mulaw_decode(payload, out=buf)
+    assert len(view) == len(mulaw)
+    assert view.tobytes() == audioop.ulaw2lin(mulaw, 2)
+
+
+@pytest.mark.parametrize("inrate,outrate", [
+    (8000, 16000),
+    (24000, 8000),
+    (16000, 8000),
+    (8000, 24000),
+    (24000, 16000),
+])
+@pytest.mark.parametrize("n_samples", [1, 2, 159, 160, 480, 481])
+def test_resample_matches_ratecv(inrate, outrate, n_samples):
+    pcm = _random_pcm(n_samples, seed=n_samples)
+    expected = audioop.ratecv(pcm, 2, 1, inrate, outrate, None)[0]
+    assert ratecv_fast(pcm, inrate, outrate) == expected
+    assert resample_pcm16(np.frombuffer(pcm, dtype=np.int16), inrate, outrate).tobytes() == expected
+
+
+def test_resample_empty():
+    assert ratecv_fast(b"", 8000, 16000) == b""
+
+
+def test_rms_matches_audioop():
+    for n in (1, 160, 320, 8000):
+        pcm = _random_pcm(n, seed=n)
+        assert pcm16_rms(pcm) == audioop.rms(pcm, 2)
+    assert pcm16_rms(b"") == 0
+
+
+def test_peak_matches_audioop():
+    for n in (1, 160, 320, 8000):
+        pcm = _random_pcm(n, seed=n)
+        assert pcm16_peak(pcm) == audioop.max(pcm, 2)
+    assert pcm16_peak(ALL_PCM16) == audioop.max(ALL_PCM16, 2) == 32768
+    assert pcm16_peak(b"") == 0
@@ -0,0 +1,122 @@
+"""
+Tests for the receipt extraction stage (server/services/receipt_extraction.py)
+Worker output vs the inline extractors, content-hash keys, the per-document
+timeout, and the receipt_extractions cache
+"""
+from pathlib import Path
+
+import pytest
+
+from server.services import receipt_extraction
+from server.services.gmail_sync_service import extract_amount_from_html, extract_amount_merged
+from server.services.receipt_extraction import (
+    KIND_FIELDS, KIND_PDF, ExtractionCache, ExtractionPool, ExtractionTimeout,
+    extract_receipt_fields, fields_hash, pdf_hash, submit_extraction,
+)
+
+FIXTURES_DIR = Path(__file__).parent.parent / 'server' / 'tests' / 'fixtures' / 'receipts'
+
+
+def _fixture(name):
+    return (FIXTURES_DIR / name).read_text(encoding='utf-8')
+
+
+def test_worker_matches_the_inline_extractors():
+    html = _fixture('stripe_email.html')
+    metadata = {'from_domain': 'stripe.com'}
+
+    result = extract_receipt_fields([], html, 'Your receipt from Acme', 'stripe.com')
+
+    assert result['extracted'] == extract_amount_merged('', html, 'Your receipt from Acme', metadata)
+    assert result['html_extraction'] == extract_amount_from_html(html, metadata)
+    assert result['extracted']['amount'] == 34.4 and result['extracted']['currency'] == 'EUR'
+    assert result['pdf_text'] == '' and result['pdf_confidence'] == 0
+
+
+def test_known_pdf_text_is_used_instead_of_parsing():
+    digest = pdf_hash(b'%PDF-1.4 scanned invoice')
+    known = {digest: {'pdf_text': 'Tax invoice\nTotal: ₪250.00\nDate 03/10/2026', 'confidence': 45}}
+
+    result = extract_receipt_fields([(digest, None)], '', 'Invoice', 'bezeq.co.il', known_pdfs=known)
+
+    assert result['pdf_text'].startswith('Tax invoice') and result['pdf_confidence'] == 45
+    assert result['extracted']['amount'] == 250.0 and result['extracted']['currency'] == 'ILS'
+    assert result['parsed_pdfs'] == {}  # nothing was parsed
+
+
+def test_keys_change_with_every_input_and_the_extractor_version(monkeypatch):
+    base = fields_hash(['a'], '<p>x</p>', 'Receipt', 'paypal.com')
+    assert base == fields_hash(['a'], '<p>x</p>', 'Receipt', 'paypal.com')
+    assert len({base, fields_hash(['b'], '<p>x</p>', 'Receipt', 'paypal.com'),
+                fields_hash(['a'], '<p>y</p>', 'Receipt', 'paypal.com'),
+                fields_hash(['a'], '<p>x</p>', 'Invoice', 'paypal.com'),
+                fields_hash(['a'], '<p>x</p>', 'Receipt', 'stripe.com')}) == 5
+
+    before = pdf_hash(b'%PDF')
+    monkeypatch.setattr(receipt_extraction, 'EXTRACTOR_VERSION', receipt_extraction.EXTRACTOR_VERSION + 1)
+    assert pdf_hash(b'%PDF') != before
+    assert fields_hash(['a'], '<p>x</p>', 'Receipt', 'paypal.com') != base
+
+
+def test_slow_document_times_out_and_the_workers_are_replaced():
+    html = _fixture('stripe_email.html')
+    with ExtractionPool(workers=1, timeout=120) as pool:
+        assert pool.result(pool.submit([], html, 'Receipt', 'stripe.com'))['extracted']['amount'] == 34.4
+
+        huge = pool.submit([], html * 2000, 'Receipt', 'stripe.com')  # several seconds of regex
+        with pytest.raises(ExtractionTimeout):
+            pool.result(huge, timeout=0.5)
+
+        assert huge.cancelled()
+        assert pool.stats['timeouts'] == 1 and pool.stats['restarts'] == 1
+        assert pool.result(pool.submit([], html, 'Receipt', 'stripe.com'))['extracted']['amount'] == 34.4
+
+
+@pytest.fixture
+def cache():
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import StaticPool
+    from server.models_sql import ReceiptExtraction
+
+    engine = create_engine('sqlite://', poolclass=StaticPool, connect_args={'check_same_thread': False})
+    ReceiptExtraction.__table__.create(bind=engine)
+    yield ExtractionCache(business_id=7, engine=engine)
+    engine.dispose()
+
+
+def test_cached_results_skip_the_pool(cache):
+    html = _fixture('aliexpress_email.html')
+    pdf = b'%PDF-1.4 not really a pdf'
+    pool = ExtractionPool(workers=0)
+
+    future, key = submit_extraction(pool, cache, [pdf], html, 'Order confirmed', 'aliexpress.com')
+    first = pool.result(future)
+    assert key and list(first['parsed_pdfs']) == [pdf_hash(pdf)]
+    cache.store(key, first)
+    cache.store(key, first)  # a second store is a no-op
+    assert cache.stats['stored'] == 2  # the PDF and the fields
+
+    # Re-sync of the same mail: no job at all
+    future, key = submit_extraction(pool, cache, [pdf], html, 'Order confirmed', 'aliexpress.com')
+    again = future.result()
+    assert key is None and again['cached'] and pool.stats['submitted'] == 1
+    assert again['extracted'] == first['extracted'] and again['html_extraction'] == first['html_extraction']
+
+    # Same PDF attached to another mail: fields are parsed, the PDF is not
+    future, key = submit_extraction(pool, cache, [pdf], '', 'Fwd: Order confirmed', 'aliexpress.com')
+    assert pool.result(future)['parsed_pdfs'] == {} and key is not None
+
+    # Other businesses never see these rows
+    other = ExtractionCache(business_id=8, engine=cache.engine)
+    assert other.get_many(KIND_PDF, [pdf_hash(pdf)]) == {}
+    assert cache.get(KIND_FIELDS, fields_hash([pdf_hash(pdf)], html, 'Order confirmed', 'aliexpress.com'))
+
+
+def test_cache_errors_are_misses():
+    from sqlalchemy import create_engine
+
+    cache = ExtractionCache(business_id=7, engine=create_engine('sqlite://'))  # no receipt_extractions table
+
+    assert cache.get_many(KIND_PDF, ['abc']) == {}
+    cache.store('key', extract_receipt_fields([], '', 'Receipt', 'paypal.com'))  # logged, not raised
+    assert cache.stats['stored'] == 0
@@ -0,0 +1,182 @@
+"""
+Tests for the post-call recording pipeline (server/services/recording_pipeline.py)
+Silence splitting, parallel in-order transcription, fallbacks, and the streamed
+Twilio download - on generated WAV fixtures with a stub STT backend
+"""
+import os
+import threading
+import time
+import wave
+
+import numpy as np
+import pytest
+import requests
+
+from server.services import recording_pipeline, recording_service
+from server.services.recording_pipeline import (
+    pcm_stream,
+    split_on_silence,
+    transcribe_recording_chunked,
+    transcribe_segments,
+)
+
+SPLIT = {'min_sec': 2, 'max_sec': 5, 'silence_ms': 300, 'silence_dbfs': -40}
+
+
+def write_wav(path, parts, rate=16000, channels=1):
+    """parts: [(seconds, 'tone' | 'silence')] -> a 16-bit WAV"""
+    pieces = []
+    for seconds, kind in parts:
+        t = np.arange(int(seconds * rate)) / rate
+        pieces.append(np.sin(2 * np.pi * 440 * t) * 10000 if kind == 'tone' else np.zeros_like(t))
+    samples = np.concatenate(pieces).astype('<i2')
+    with wave.open(str(path), 'wb') as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(np.repeat(samples, channels).tobytes())
+    return str(path)
+
+
+def wav_seconds(path):
+    with wave.open(path, 'rb') as wav:
+        return wav.getnframes() / wav.getframerate()
+
+
+@pytest.fixture(autouse=True)
+def no_ffmpeg(monkeypatch):
+    """Decode with the wave fallback so results do not depend on the box"""
+    monkeypatch.setattr(recording_pipeline.shutil, 'which', lambda name: None)
+
+
+def split(path, out_dir, **overrides):
+    rate, chunks = pcm_stream(path)
+    return list(split_on_silence(rate, chunks, str(out_dir), **{**SPLIT, **overrides}))
+
+
+def test_splits_at_pauses_after_min_length_and_hard_cuts_at_max(tmp_path):
+    audio = write_wav(tmp_path / 'call.wav', [(3, 'tone'), (0.5, 'silence'), (2, 'tone'), (0.5, 'silence'), (7, 'tone')])
+
+    segments = split(audio, tmp_path)
+
+    assert [(s.start_sec, s.end_sec) for s in segments] == [(0, 3.3), (3.3, 5.8), (5.8, 10.8), (10.8, 13.0)]
+    assert [round(wav_seconds(s.path), 2) for s in segments] == [3.3, 2.5, 5.0, 2.2]
+    assert segments[0].voiced_sec == 3.0
+
+
+def test_silent_stretches_are_not_transcribed(tmp_path):
+    audio = write_wav(tmp_path / 'call.wav', [(2.5, 'tone'), (6, 'silence'), (2, 'tone'), (3, 'silence')])
+
+    segments = split(audio, tmp_path)
+
+    assert [s.index for s in segments] == [0, 3]  # 2.8-4.8 and 4.8-6.8 were silence
+    assert segments[1].start_sec == 6.8 and segments[1].voiced_sec == 2.0
+    assert sorted(os.listdir(tmp_path)) == ['call.wav', 'segment_0000.wav', 'segment_0003.wav']
+
+
+@pytest.mark.parametrize('rate,channels', [(8000, 1), (8000, 2), (44100, 2)])
+def test_wave_fallback_downmixes_and_keeps_the_rate(tmp_path, rate, channels):
+    audio = write_wav(tmp_path / 'call.wav', [(2.5, 'tone'), (0.5, 'silence'), (1, 'tone')], rate=rate, channels=channels)
+
+    segments = split(audio, tmp_path)
+
+    assert [(s.start_sec, s.end_sec) for s in segments] == [(0, 2.8), (2.8, 4.0)]
+    with wave.open(segments[0].path, 'rb') as wav:
+        assert (wav.getnchannels(), wav.getframerate()) == (1, rate)
+
+
+def test_segments_are_transcribed_concurrently_and_stitched_in_order(tmp_path):
+    audio = write_wav(tmp_path / 'call.wav', [(2.5, 'tone'), (0.5, 'silence')] * 4)
+    segments = split(audio, tmp_path)
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def stt(path):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        index = int(os.path.basename(path)[8:12])
+        time.sleep(0.05 * (4 - index))  # later segments finish first
+        with lock:
+            active[0] -= 1
+        return f" part{index} "
+
+    assert transcribe_segments(segments, stt, workers=4) == "part0 part1 part2 part3"
+    assert peak[0] > 1
+
+
+def test_failed_segment_is_retried_once_then_fails_the_transcript(tmp_path):
+    audio = write_wav(tmp_path / 'call.wav', [(2.5, 'tone'), (0.5, 'silence')] * 2)
+    segments = split(audio, tmp_path)
+    calls = []
+
+    def flaky(path):
+        calls.append(path)
+        if calls.count(path) == 1:
+            raise requests.ConnectionError("reset")
+        return "ok"
+
+    assert transcribe_segments(segments, flaky, workers=2) == "ok ok"
+    assert transcribe_segments(segments, lambda path: None, workers=2) is None
+
+
+def test_chunked_transcription_end_to_end_and_fallbacks(tmp_path, monkeypatch):
+    legacy = []
+    monkeypatch.setattr(recording_pipeline, 'transcribe_recording_with_whisper',
+                        lambda path, call_sid: legacy.append(path) or "whole file")
+    speech = write_wav(tmp_path / 'speech.wav', [(35, 'tone'), (1, 'silence'), (20, 'tone')])
+    seen = []
+
+    transcript = transcribe_recording_chunked(speech, 'CA1', transcribe_fn=lambda path: seen.append(wav_seconds(path)) or "text")
+
+    assert transcript == "text text" and seen and not legacy
+    assert sorted(round(s, 1) for s in seen) == [20.5, 35.5]
+
+    silence = write_wav(tmp_path / 'silence.wav', [(5, 'silence')])
+    broken = tmp_path / 'call.mp3'
+    broken.write_bytes(b'ID3' + os.urandom(2000))
+    assert transcribe_recording_chunked(silence, 'CA2', transcribe_fn=lambda path: "x") == "whole file"
+    assert transcribe_recording_chunked(str(broken), 'CA3', transcribe_fn=lambda path: "x") == "whole file"
+    assert legacy == [silence, str(broken)]
+
+
+class FakeStreamResponse:
+    def __init__(self, status_code, body=b'', fail_after=None):
+        self.status_code = status_code
+        self.body = body
+        self.fail_after = fail_after
+        self.chunk_sizes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def iter_content(self, chunk_size):
+        self.chunk_sizes.append(chunk_size)
+        for offset in range(0, len(self.body), chunk_size):
+            if self.fail_after is not None and offset >= self.fail_after:
+                raise requests.ConnectionError("connection dropped")
+            yield self.body[offset:offset + chunk_size]
+
+
+def test_download_streams_to_disk_in_chunks(tmp_path, monkeypatch):
+    body = os.urandom(600 * 1024)
+    responses = [FakeStreamResponse(404), FakeStreamResponse(200, body, fail_after=256 * 1024), FakeStreamResponse(200, body)]
+    requested = []
+
+    def fake_get(url, **kwargs):
+        requested.append((url, kwargs))
+        return responses[len(requested) - 1]
+
+    monkeypatch.setattr(recording_service.requests, 'get', fake_get)
+    monkeypatch.setattr(recording_service.time, 'sleep', lambda seconds: None)
+    dest = tmp_path / 'CA1.mp3'
+
+    written = recording_service._download_from_twilio('/2010-04-01/Recordings/RE1.json', 'AC1', 'token', 'CA1', str(dest))
+
+    assert written == len(body) and dest.read_bytes() == body
+    assert os.listdir(tmp_path) == ['CA1.mp3']  # the dropped download left no .part behind
+    assert [url.rsplit('/', 1)[1] for url, _ in requested] == ['RE1.wav?RequestedChannels=2', 'RE1.wav', 'RE1.mp3']
+    assert all(kwargs['stream'] and kwargs['timeout'] == 30 for _, kwargs in requested)
+    assert responses[2].chunk_sizes == [recording_service.RECORDING_DOWNLOAD_CHUNK_BYTES]
@@ -0,0 +1,120 @@
+"""
+Tests for search_service.py (/api/search)
+Normalization, phone patterns, keyset cursors and the index/query expression contract
+"""
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from server.db_indexes import INDEX_DEFS
+from server.services import search_service
+from server.services.search_service import (
+    decode_cursor, encode_cursor, escape_like, normalize_search_text,
+    parse_search_query, phone_search_digits,
+)
+
+
+def compile_pg(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+def test_normalize_hebrew_finals_niqqud_and_geresh():
+    assert normalize_search_text("כהן") == "כהנ"
+    assert normalize_search_text("שָׁלוֹם") == "שלומ"
+    assert normalize_search_text("צ׳יפס  ת״א") == "ציפס תא"
+    assert normalize_search_text("  Moshe COHEN ") == "moshe cohen"
+    assert normalize_search_text(None) == ""
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("050-123-4567", ("501234567",)),
+    ("+972 50 1234567", ("501234567",)),
+    ("00972501234567", ("501234567",)),
+    ("075", ("075", "97275")),
+    ("4567", ("4567",)),
+    ("97250", ("97250",)),
+])
+def test_phone_search_digits(raw, expected):
+    assert phone_search_digits(raw) == expected
+
+
+def test_parse_query_detects_phone_and_builds_tsquery():
+    terms = parse_search_query("(050) 123-4567")
+    assert terms.phones == ("501234567",)
+
+    terms = parse_search_query("משה כהן")
+    assert terms.phones == ()
+    assert terms.text == "משה כהנ"
+    assert terms.tsquery == "משה:* & כהנ:*"
+
+    assert parse_search_query("12").phones == ()  # too short for phone matching
+    assert len(parse_search_query("x" * 500).raw) == search_service.MAX_QUERY_LENGTH
+
+
+def test_escape_like():
+    assert escape_like("a_b%c\\") == "a\\_b\\%c\\\\"
+
+
+def test_cursor_round_trip_and_invalid():
+    cursor = encode_cursor(Decimal("1.2345"), 42)
+    assert decode_cursor(cursor) == (Decimal("1.2345"), 42)
+    assert decode_cursor(None) is None
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+@pytest.mark.parametrize("builder, index_name", [
+    (search_service.lead_name_sql, "idx_leads_search_name_trgm"),
+    (search_service.lead_email_sql, "idx_leads_search_email_trgm"),
+    (search_service.lead_phone_sql, "idx_leads_search_phone_trgm"),
+    (search_service.lead_notes_tsv_sql, "idx_leads_search_notes_fts"),
+    (search_service.call_from_sql, "idx_call_log_search_from_trgm"),
+    (search_service.call_to_sql, "idx_call_log_search_to_trgm"),
+    (search_service.call_summary_tsv_sql, "idx_call_log_search_summary_fts"),
+    (search_service.wa_conv_phone_sql, "idx_wa_conv_search_phone_trgm"),
+    (search_service.wa_conv_name_sql, "idx_wa_conv_search_name_trgm"),
+    (search_service.wa_message_tsv_sql, "idx_whatsapp_message_search_body_fts"),
+])
+def test_index_expressions_match_query_expressions(builder, index_name):
+    index_def = next(d for d in INDEX_DEFS if d["name"] == index_name)
+    assert builder(None) in index_def["sql"]
+    if "gin_trgm_ops" in index_def["sql"]:
+        assert index_def["extension"] == "pg_trgm"
+
+
+def test_lead_select_uses_indexed_expressions_and_keyset():
+    terms = parse_search_query("050-123-4567")
+    stmt = search_service.lead_search_select(terms, 7, 5, cursor=(Decimal("2.5"), 100))
+    sql = compile_pg(stmt)
+    assert search_service.lead_phone_sql() in sql
+    assert search_service.lead_name_sql() in sql
+    assert "leads.tenant_id =" in sql
+    assert "ranked.score <" in sql and "ranked.id <" in sql
+    assert "ORDER BY ranked.score DESC, ranked.id DESC" in sql
+    params = stmt.compile(dialect=postgresql.dialect()).params
+    assert "%501234567%" in params.values()
+    assert 6 in params.values()  # limit + 1 to detect the next page
+
+
+def test_lead_filter_keeps_phone_like_for_short_digit_queries(monkeypatch):
+    bind = SimpleNamespace(dialect=SimpleNamespace(name="postgresql"))
+    monkeypatch.setattr(search_service, "db", SimpleNamespace(session=SimpleNamespace(get_bind=lambda: bind)))
+
+    def compiled(query):
+        expr = search_service.lead_search_filter(query).compile(dialect=postgresql.dialect())
+        return str(expr), list(expr.params.values())
+
+    sql, params = compiled("12")
+    assert "leads.phone_e164 LIKE" in sql and "%12%" in params
+    sql, params = compiled("0501")  # phone-like: indexed digits expression only
+    assert search_service.lead_phone_sql() in sql and "leads.phone_e164 LIKE" not in sql
+    assert "leads.phone_e164 LIKE" not in compiled("דנה")[0]
+
+
+def test_call_select_matches_sid_exactly():
+    sid = "CA" + "a" * 32
+    sql = compile_pg(search_service.call_search_select(parse_search_query(sid), None, 5))
+    assert "call_log.call_sid =" in sql
+    assert "call_log.business_id" not in sql  # system admin: all businesses
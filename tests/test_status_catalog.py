@@ -0,0 +1,140 @@
+"""
+Tests for status_catalog.py, aho_corasick.py and the catalog-backed auto-status matching
+The automaton agrees with `kw in text`, keyword scores / families are unchanged,
+a tenant's statuses are read once and re-read after invalidation
+"""
+import random
+
+import pytest
+from sqlalchemy import event
+
+from server.models_sql import LeadStatus
+from server.services.lead_auto_status_service import (
+    KEYWORD_GROUPS, STATUS_FAMILIES, LeadAutoStatusService, keyword_family, score_keywords,
+)
+from server.services.status_catalog import (
+    clear_status_catalogs, get_status_catalog, invalidate_status_catalog, normalize_label,
+)
+from server.utils.aho_corasick import KeywordAutomaton
+
+
+def test_automaton_finds_exactly_the_contained_patterns():
+    patterns = ['he', 'she', 'his', 'hers', 'לא מתאים', 'לא מתאים לי', 'מתאים לי', 'מתאים', '', 'she']
+    automaton = KeywordAutomaton(patterns)
+    rng = random.Random(7)
+    alphabet = ['h', 'e', 's', 'i', 'r', ' ', 'לא', 'מתאים', 'לי', 'x']
+    for _ in range(500):
+        text = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 30)))
+        expected = {i for i, p in enumerate(patterns) if p and p in text}
+        assert automaton.find(text) == expected, text
+        assert automaton.contains_any(text) == bool(expected)
+        assert automaton.first(text) == (min(expected) if expected else -1)
+    assert KeywordAutomaton([]).find('anything') == set()
+
+
+def test_keyword_scores_and_families_match_the_linear_scans():
+    words = [kw for _, _, kws in KEYWORD_GROUPS for kw in kws] + ['הלקוח', 'אמר', 'שלום', 'hello', 'x']
+    rng = random.Random(11)
+    for _ in range(300):
+        text = ' '.join(rng.choice(words) for _ in range(rng.randint(0, 25))).lower()
+        expected = {group: sum(1 for kw in kws if kw in text) for group, _, kws in KEYWORD_GROUPS}
+        assert score_keywords(text) == {g: n for g, n in expected.items() if n}
+
+    def linear_family(name):
+        for family, patterns in STATUS_FAMILIES.items():
+            if any(p in name for p in patterns):
+                return family
+        return None
+
+    names = ['לא נענה', 'נענה', 'no_answer_2', 'אין מענה 3', 'מעוניין מאוד', 'לא מעוניין', 'new_lead',
+             'פגישה נקבעה', 'callback', 'custom_xyz', 'חזרה', 'תפוס']
+    for name in names:
+        assert keyword_family(name) == linear_family(name), name
+
+
+@pytest.fixture
+def catalog_app():
+    from flask import Flask
+    from sqlalchemy.pool import StaticPool
+    from server.db import db as _db
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'poolclass': StaticPool}
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    _db.init_app(app)
+
+    clear_status_catalogs()
+    with app.app_context():
+        _db.metadata.create_all(bind=_db.engine, tables=[LeadStatus.__table__])
+        statuses = [
+            ('new', 'חדש', True), ('no_answer', 'אין מענה', True), ('no_answer_2', 'אין מענה 2', True),
+            ('contacted', 'נוצר קשר', True), ('interested', 'מעוניין', True), ('follow_up', 'חזרה', True),
+            ('not_relevant', 'לא רלוונטי', True), ('qualified', 'נקבעה פגישה', True),
+            ('archived', 'ארכיון', False),
+        ]
+        for index, (name, label, active) in enumerate(statuses):
+            _db.session.add(LeadStatus(business_id=5, name=name, label=label, order_index=index, is_active=active))
+        _db.session.commit()
+
+        selects = []
+
+        def count(conn, cursor, statement, *args):
+            if 'lead_statuses' in statement and statement.lstrip().upper().startswith('SELECT'):
+                selects.append(statement)
+
+        event.listen(_db.engine, 'before_cursor_execute', count)
+        yield app, _db, selects
+        event.remove(_db.engine, 'before_cursor_execute', count)
+        _db.session.remove()
+    clear_status_catalogs()
+
+
+def test_auto_status_decisions_read_the_statuses_once(catalog_app):
+    from server.services.hebrew_label_service import HebrewLabelService
+
+    app, _db, selects = catalog_app
+    service = LeadAutoStatusService()
+    summary = "הלקוח אמר שהוא מעוניין, נשמע טוב, קבענו פגישה ביום שלישי בשעה 10. [המלצה: נקבעה פגישה]"
+
+    assert service.suggest_status(5, 1, 'outbound', call_summary=summary) == 'qualified'
+    assert service._map_label_to_status_id('no_answer_2', 5) == 'no_answer_2'
+    assert service._map_label_to_status_id('תא קולי', 5) is None
+    assert service._map_label_to_status_id('לא רלוונטי בכלל', 5) == 'not_relevant'
+    valid = service._get_valid_statuses(5)
+    assert 'archived' not in valid and 'interested' in valid
+    assert service._map_from_keywords(summary, valid, 5) == 'qualified'
+    assert service._map_from_keywords("לא מעוניין, תורידו אותי מהרשימה", valid, 5) == 'not_relevant'
+    assert service._build_status_groups(valid, 5)['NO_ANSWER'] == 'no_answer'
+    assert service._get_status_family('no_answer_2', 5) == 'NO_ANSWER'
+    assert service.should_change_status('no_answer', 'no_answer_2', 5) == (
+        True, 'Valid no-answer progression: no_answer → no_answer_2')
+    assert service._get_full_status_info(5, 'interested')['label'] == 'מעוניין'
+
+    labels = HebrewLabelService(5)
+    assert labels.get_lead_status_label('archived')['status_label_he'] == 'ארכיון'  # inactive still labelled
+    assert labels.get_lead_status_label('won')['status_label_he'] == 'זכיה'
+
+    assert len(selects) == 1
+    assert normalize_label('  נוצר   קשר ') == get_status_catalog(5).by_name['contacted'].label_normalized
+
+
+def test_invalidation_reloads_and_drops_derived_data(catalog_app):
+    app, _db, selects = catalog_app
+    service = LeadAutoStatusService()
+    before = get_status_catalog(5)
+    assert service._build_status_groups(set(), 5)['HOT_INTERESTED'] == 'interested'
+
+    status = LeadStatus.query.filter_by(business_id=5, name='interested').one()
+    status.is_active = False
+    _db.session.add(LeadStatus(business_id=5, name='hot', label='ליד חם', order_index=20, is_active=True))
+    _db.session.commit()
+
+    # Cached until invalidated (status CRUD routes call this after commit)
+    assert get_status_catalog(5) is before
+    invalidate_status_catalog(5)
+    after = get_status_catalog(5)
+    assert after.version != before.version
+    assert service._build_status_groups(set(), 5)['HOT_INTERESTED'] == 'hot'
+    assert service._map_label_to_status_id('מעוניין', 5) == 'hot'  # synonym group
+    assert len(selects) == 3  # two catalog loads + the ORM row fetched above
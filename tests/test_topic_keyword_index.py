@@ -0,0 +1,134 @@
+"""
+Tests for the compiled topic keyword layer (TopicKeywordIndex) and classify_texts
+The index returns exactly what the per-topic linear scan returned (topic, method,
+score), and the batch API matches classify_text() text by text
+"""
+import random
+
+import numpy as np
+import pytest
+
+from server.services.topic_classifier import (
+    TopicCacheEntry, TopicClassifier, TopicKeywordIndex, _extract_keywords,
+    _normalize_synonyms_list, _normalize_text_for_matching,
+)
+
+
+def linear_keyword_match(text, topics):
+    """The keyword layer as it was: every topic, name → synonyms → keywords, in order"""
+    text_normalized = _normalize_text_for_matching(text)
+    text_keywords = _extract_keywords(text_normalized)
+    for topic in topics:
+        name_normalized = _normalize_text_for_matching(topic['name'])
+        if name_normalized and name_normalized in text_normalized:
+            return topic['id'], 'keyword', 0.95
+        if topic.get('synonyms_normalized') and topic.get('synonyms'):
+            for synonym in topic['synonyms_normalized']:
+                if synonym and synonym in text_normalized:
+                    return topic['id'], 'synonym', 0.93
+        topic_keywords = _extract_keywords(name_normalized)
+        for synonym in topic.get('synonyms_normalized') or []:
+            if synonym:
+                topic_keywords.update(_extract_keywords(synonym))
+        matching = text_keywords & topic_keywords
+        if len(matching) >= 2 and len(topic_keywords) > 0:
+            ratio = len(matching) / len(topic_keywords)
+            if ratio >= 0.5:
+                return topic['id'], 'multi_keyword', 0.85 + (ratio * 0.05)
+    return None
+
+
+def make_topics(rng, count):
+    words = ['התקנת', 'מזגן', 'תיקון', 'דוד', 'שמש', 'מנול', 'צילינדר', 'פריצה', 'החלפת', 'ברז',
+             'ניקוי', 'צנרת', 'את', 'של', 'a', 'door', 'lock', 'repair']
+    topics = []
+    for i in range(count):
+        name = ' '.join(rng.sample(words, rng.randint(1, 3)))
+        synonyms = [' '.join(rng.sample(words, rng.randint(1, 2))) + rng.choice(['', '!', 'ים'])
+                    for _ in range(rng.randint(0, 3))] + rng.choice([[], ['']])
+        topics.append({'id': 100 + i, 'name': name, 'synonyms': synonyms,
+                       'synonyms_normalized': _normalize_synonyms_list(synonyms)})
+    return topics, words
+
+
+def test_index_matches_the_linear_scan():
+    rng = random.Random(3)
+    classifier = TopicClassifier()
+    for _ in range(40):
+        topics, words = make_topics(rng, rng.randint(1, 25))
+        index = TopicKeywordIndex(topics)
+        for _ in range(40):
+            text = ' '.join(rng.choice(words + ['שלום', 'רציתי', 'לשאול', 'מחיר', 'שׁ', '?']) for _ in range(rng.randint(0, 12)))
+            result = classifier._keyword_match(text, topics, index)
+            expected = linear_keyword_match(text, topics)
+            got = (result['topic_id'], result['method'], result['score']) if result else None
+            assert got == expected, (text, [t['name'] for t in topics])
+
+
+def test_multi_keyword_only_wins_before_the_first_name_match():
+    topics = [
+        {'id': 1, 'name': 'תיקון מזגן', 'synonyms': [], 'synonyms_normalized': []},
+        {'id': 2, 'name': 'מזגן', 'synonyms': ['מיזוג'], 'synonyms_normalized': ['מיזוג']},
+    ]
+    index = TopicKeywordIndex(topics)
+    classifier = TopicClassifier()
+    # "תיקון ... מזגן" (not adjacent): topic 1 by keywords comes before topic 2's name
+    result = classifier._keyword_match('צריך תיקון דחוף של המזגן מזגן', topics, index)
+    assert (result['topic_id'], result['method'], result['score']) == (1, 'multi_keyword', 0.9)
+    result = classifier._keyword_match('יש בעיה במיזוג', topics, index)
+    assert (result['topic_id'], result['method']) == (2, 'synonym')
+    assert index.keyword_index['מזגן'] == [0, 1]
+
+
+@pytest.fixture
+def topic_app(monkeypatch):
+    from flask import Flask
+    from sqlalchemy.pool import StaticPool
+    from server.db import db as _db
+    from server.models_sql import BusinessAISettings
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'poolclass': StaticPool}
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    _db.init_app(app)
+
+    classifier = TopicClassifier()
+    rng = random.Random(5)
+    topics, _ = make_topics(rng, 12)
+    embeddings = np.array([[rng.uniform(-1, 1) for _ in range(8)] for _ in topics])
+    entry = TopicCacheEntry(9, topics, embeddings)
+    requests = []
+
+    def fake_embeddings(texts):
+        requests.append(len(texts))
+        return np.array([np.random.RandomState(sum(map(ord, t)) % 2**32).uniform(-1, 1, 8) for t in texts])
+
+    monkeypatch.setattr(classifier, 'get_or_build_topics_index', lambda business_id: entry)
+    monkeypatch.setattr(classifier, '_generate_embeddings', fake_embeddings)
+    monkeypatch.setattr('server.services.topic_classifier.EMBEDDING_BATCH_SIZE', 4)
+
+    with app.app_context():
+        _db.metadata.create_all(bind=_db.engine, tables=[BusinessAISettings.__table__])
+        _db.session.add(BusinessAISettings(business_id=9, embedding_enabled=True, embedding_threshold=0.3,
+                                           embedding_top_k=3))
+        _db.session.commit()
+        yield classifier, topics, requests
+        _db.session.remove()
+
+
+def test_classify_texts_matches_classify_text(topic_app):
+    classifier, topics, requests = topic_app
+    texts = [topics[0]['name'], 'שלום רציתי לשאול', '', 'מה המחיר', topics[5]['name'] + ' בבקשה',
+             'hello there', 'door lock', 'זה דחוף', '   ', 'עוד שאלה', 'ועוד אחת']
+
+    single = [classifier.classify_text(9, text) for text in texts]
+    single_requests = len(requests)
+    requests.clear()
+
+    batch = classifier.classify_texts(9, texts)
+    assert batch == single
+    assert batch[2] is None and batch[8] is None
+    assert any(r and r['method'] == 'embedding' for r in batch)
+    # Texts left for LAYER 2 went out in requests of EMBEDDING_BATCH_SIZE
+    assert single_requests == sum(requests) and all(n <= 4 for n in requests) and len(requests) < single_requests
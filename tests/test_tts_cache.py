@@ -0,0 +1,113 @@
+"""
+Tests for server/services/tts_cache.py
+Content-addressed keys, telephony conversion, memory → storage → synthesis
+tiers, hit-rate / time-to-first-audio stats and business voice resolution
+"""
+import io
+import struct
+import wave
+from types import SimpleNamespace
+
+import pytest
+
+from server.services import tts_cache
+from server.services.tts_cache import FRAME_BYTES, business_voice, get_mulaw, tts_cache_key
+
+
+class FakeStorage:
+    def __init__(self):
+        self.objects = {}
+
+    def get_bytes(self, key):
+        return self.objects.get(key)
+
+    def put_bytes(self, key, data, content_type='application/octet-stream', metadata=None):
+        self.objects[key] = data
+        return key
+
+
+@pytest.fixture
+def fresh_cache(monkeypatch):
+    storage = FakeStorage()
+    calls = []
+
+    def fake_synthesize(text, provider, voice_id, language, speed):
+        calls.append(text)
+        return b'\x7f' * FRAME_BYTES * 10
+
+    tts_cache._memory.clear()
+    monkeypatch.setattr(tts_cache, "_stats", tts_cache._Stats())
+    monkeypatch.setattr(tts_cache, "_get_storage", lambda: storage)
+    monkeypatch.setattr(tts_cache, "synthesize_mulaw", fake_synthesize)
+    yield storage, calls
+    tts_cache._memory.clear()
+
+
+def test_key_covers_every_synthesis_parameter():
+    base = tts_cache_key("openai", "alloy", 1.0, "he-IL", "שלום  עולם")
+    assert base == tts_cache_key("openai", "alloy", 1.0, "he-IL", " שלום עולם ")  # whitespace normalized
+    assert len({base,
+                tts_cache_key("gemini", "alloy", 1.0, "he-IL", "שלום עולם"),
+                tts_cache_key("openai", "echo", 1.0, "he-IL", "שלום עולם"),
+                tts_cache_key("openai", "alloy", 1.1, "he-IL", "שלום עולם"),
+                tts_cache_key("openai", "alloy", 1.0, "en-US", "שלום עולם"),
+                tts_cache_key("openai", "alloy", 1.0, "he-IL", "שלום")}) == 6
+
+
+def test_pcm_is_resampled_to_whole_mulaw_frames():
+    pcm_24k = struct.pack("<1000h", *([1000, -1000] * 500))
+    mulaw = tts_cache.pcm16_to_telephony(pcm_24k, 24000)
+    assert len(mulaw) % FRAME_BYTES == 0
+    assert len(mulaw) == 3 * FRAME_BYTES  # 1000 samples @24k → ~334 @8k → padded to 3 frames
+    assert mulaw.endswith(tts_cache.MULAW_SILENCE)
+    assert [len(f) for f in tts_cache.iter_frames(mulaw)] == [FRAME_BYTES] * 3
+
+
+def test_gemini_wav_is_unwrapped(monkeypatch):
+    from server.services import tts_provider
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(24000)
+        wav.writeframes(b'\x00\x00' * 4800)  # 200ms
+    monkeypatch.setattr(tts_provider, "synthesize_gemini", lambda *args: (buffer.getvalue(), "audio/wav"))
+    assert len(tts_cache.synthesize_mulaw("x", "gemini", "Kore", "he-IL", 1.0)) == 10 * FRAME_BYTES
+
+
+def test_tiers_memory_storage_synthesis(fresh_cache):
+    storage, calls = fresh_cache
+    audio = get_mulaw("שלום", provider="openai", voice_id="alloy")
+    assert calls == ["שלום"]
+    assert list(storage.objects) == [tts_cache.storage_key("openai", tts_cache_key("openai", "alloy", 1.0, "he-IL", "שלום"))]
+
+    assert get_mulaw("שלום", provider="openai", voice_id="alloy") == audio  # memory
+    tts_cache._memory.clear()                                               # another worker
+    assert get_mulaw("שלום", provider="openai", voice_id="alloy") == audio  # storage
+    assert calls == ["שלום"]
+
+    stats = tts_cache.tts_cache_stats()
+    assert (stats["memory_hits"], stats["storage_hits"], stats["synthesized"]) == (1, 1, 1)
+    assert stats["hit_rate"] == pytest.approx(2 / 3, abs=1e-3)
+    assert stats["ttfa_saved_ms"] is not None
+
+
+def test_failed_synthesis_is_not_cached(fresh_cache, monkeypatch):
+    storage, _ = fresh_cache
+    monkeypatch.setattr(tts_cache, "synthesize_mulaw", lambda *args: None)
+    assert get_mulaw("שלום", voice_id="alloy") is None
+    assert storage.objects == {}
+    assert tts_cache.tts_cache_stats()["failures"] == 1
+    assert get_mulaw("   ", voice_id="alloy") is None
+
+
+def test_business_voice_matches_ai_settings_resolution():
+    gemini = SimpleNamespace(ai_provider="gemini", voice_name=None, tts_voice_id="kore", voice_id="ash",
+                             tts_language="he-IL", tts_speed=1.2)
+    assert business_voice(gemini) == {"provider": "gemini", "voice_id": "kore", "language": "he-IL", "speed": 1.2}
+
+    mismatched = SimpleNamespace(ai_provider="openai", voice_name="kore", tts_voice_id=None, voice_id=None,
+                                 tts_language=None, tts_speed=None)
+    from server.config.voice_catalog import default_voice
+    assert business_voice(mismatched)["voice_id"] == default_voice("openai")
+    assert business_voice(mismatched)["language"] == "he-IL"
@@ -0,0 +1,205 @@
+"""
+Tests for webhook_delivery.py
+POST / redirect / retry classification, the outbox claim-send-record loop,
+per-endpoint concurrency caps, n8n batching and the rewired generic webhook
+"""
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from server.services import webhook_delivery
+from server.services.webhook_delivery import (
+    CHANNEL_GENERIC, CHANNEL_N8N, DeliveryResult, backoff_seconds, deliver_due, endpoint_of,
+    enqueue_webhook, post_webhook,
+)
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None, text=''):
+        self.status_code, self.headers, self.text = status_code, headers or {}, text
+        self.content = text.encode()
+
+    def close(self):
+        pass
+
+
+class ScriptedSession:
+    """Answers POSTs from a url -> [responses] script and records what was sent"""
+
+    def __init__(self, script):
+        self.script, self.calls = script, []
+
+    def post(self, url, data=None, headers=None, timeout=None, allow_redirects=True):
+        self.calls.append((url, data, allow_redirects))
+        return self.script[url].pop(0)
+
+
+def test_post_follows_redirects_with_post_and_classifies_errors():
+    session = ScriptedSession({
+        'https://hooks.example.com/a': [FakeResponse(308, {'Location': '/b'})],
+        'https://hooks.example.com/b': [FakeResponse(200)],
+    })
+    result = post_webhook(session, 'https://hooks.example.com/a', b'{"x":1}', {}, 5)
+    assert result.ok and result.status_code == 200
+    assert [(url, data) for url, data, _ in session.calls] == [
+        ('https://hooks.example.com/a', b'{"x":1}'), ('https://hooks.example.com/b', b'{"x":1}')]
+    assert not any(follow for _, _, follow in session.calls)
+
+    session = ScriptedSession({'https://h/404': [FakeResponse(404, text='nope')],
+                               'https://h/429': [FakeResponse(429, {'Retry-After': '30'})],
+                               'https://h/503': [FakeResponse(503)],
+                               'https://h/loop': [FakeResponse(302, {'Location': 'https://h/loop'})] * 10})
+    assert post_webhook(session, 'https://h/404', b'', {}, 5).permanent
+    throttled = post_webhook(session, 'https://h/429', b'', {}, 5)
+    assert not throttled.permanent and throttled.retry_after == 30
+    assert not post_webhook(session, 'https://h/503', b'', {}, 5).permanent
+    assert post_webhook(session, 'https://h/loop', b'', {}, 5).permanent
+
+
+def test_backoff_is_jittered_exponential_and_honours_retry_after(monkeypatch):
+    monkeypatch.setattr('server.config.WEBHOOK_RETRY_BASE_SECONDS', 2.0)
+    monkeypatch.setattr('server.config.WEBHOOK_RETRY_MAX_SECONDS', 60.0)
+    assert all(0 <= backoff_seconds(3) <= 8 for _ in range(50))
+    assert all(backoff_seconds(20) <= 60 for _ in range(50))
+    assert backoff_seconds(1, retry_after=30) >= 30
+    assert backoff_seconds(1, retry_after=3600) == 60
+    assert endpoint_of('https://Hooks.Example.com:8443/x?y=1') == 'https://hooks.example.com:8443'
+
+
+@pytest.fixture
+def outbox_app(monkeypatch):
+    from flask import Flask
+    from sqlalchemy.pool import StaticPool
+    from server.db import db as _db
+    from server.models_sql import WebhookOutbox
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'poolclass': StaticPool}
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    _db.init_app(app)
+
+    woken = []
+    monkeypatch.setattr(webhook_delivery, 'wake_delivery', lambda redis_conn=None: woken.append(1) or True)
+    monkeypatch.setattr(webhook_delivery, '_clear_wake', lambda redis_conn=None: None)
+    monkeypatch.setattr('server.config.WEBHOOK_OUTBOX_ENABLED', True)
+    monkeypatch.setattr('server.config.N8N_BATCH_MAX_EVENTS', 1)
+
+    with app.app_context():
+        _db.metadata.create_all(bind=_db.engine, tables=[WebhookOutbox.__table__])
+
+        def rows():
+            _db.session.expire_all()
+            return {row.id: row for row in WebhookOutbox.query.all()}
+
+        yield SimpleNamespace(db=_db, woken=woken, rows=rows)
+        _db.session.remove()
+
+
+def _queue(url, n=1, channel=CHANNEL_GENERIC, **kwargs):
+    return [enqueue_webhook(channel, url, json.dumps({'n': i}), {'X-ProSaaS-Event': 'test'}, 'test', **kwargs)
+            for i in range(n)]
+
+
+def test_delivery_records_delivered_failed_and_retried(outbox_app, monkeypatch):
+    monkeypatch.setattr('server.config.WEBHOOK_DELIVERY_MAX_ATTEMPTS', 2)
+    ok, = _queue('https://ok.example.com/hook', business_id='7')
+    gone, = _queue('https://gone.example.com/hook', business_id='business_1')
+    flaky, = _queue('https://flaky.example.com/hook')
+    assert outbox_app.woken == [1, 1, 1]
+
+    outcomes = {
+        'https://ok.example.com/hook': DeliveryResult(ok=True, status_code=200, latency_ms=12),
+        'https://gone.example.com/hook': DeliveryResult(ok=False, status_code=410, error='HTTP 410', permanent=True),
+        'https://flaky.example.com/hook': DeliveryResult(ok=False, status_code=503, error='HTTP 503', retry_after=0),
+    }
+    posted = []
+
+    def post(session, url, body, headers, timeout):
+        posted.append(url)
+        return outcomes[url]
+
+    monkeypatch.setattr('server.config.WEBHOOK_RETRY_BASE_SECONDS', 0.0)
+    stats = deliver_due(max_seconds=5, post=post)
+    rows = outbox_app.rows()
+    assert rows[ok].status == 'delivered' and rows[ok].delivered_at and rows[ok].business_id == 7
+    assert rows[gone].status == 'failed' and rows[gone].attempts == 1 and rows[gone].business_id is None
+    # The retry came due at once and used the last attempt
+    assert rows[flaky].status == 'failed' and rows[flaky].attempts == 2 and rows[flaky].last_status_code == 503
+    assert posted.count('https://flaky.example.com/hook') == 2
+    assert stats['status'] == 'drained'
+    assert (stats['delivered'], stats['failed'], stats['retried']) == (1, 2, 1)
+
+
+def test_retry_is_scheduled_and_not_claimed_before_it_is_due(outbox_app, monkeypatch):
+    monkeypatch.setattr('server.config.WEBHOOK_RETRY_BASE_SECONDS', 60.0)
+    row_id, = _queue('https://flaky.example.com/hook')
+    posted = []
+    post = lambda session, url, body, headers, timeout: posted.append(url) or DeliveryResult(ok=False, error='timeout')
+
+    deliver_due(max_seconds=5, post=post)
+    row = outbox_app.rows()[row_id]
+    assert len(posted) == 1
+    assert row.status == 'pending' and row.attempts == 1 and row.last_error == 'timeout'
+    assert row.next_attempt_at > datetime.utcnow() - timedelta(seconds=1)
+    assert webhook_delivery.next_due_in() >= 0
+
+
+def test_slow_endpoint_is_capped_without_starving_others(outbox_app):
+    _queue('https://slow.example.com/hook', 12)
+    _queue('https://fast.example.com/hook', 4)
+    lock = threading.Lock()
+    running, peak, finished = {}, {}, []
+
+    def post(session, url, body, headers, timeout):
+        host = endpoint_of(url)
+        with lock:
+            running[host] = running.get(host, 0) + 1
+            peak[host] = max(peak.get(host, 0), running[host])
+        time.sleep(0.05 if 'slow' in host else 0.001)
+        with lock:
+            running[host] -= 1
+            finished.append(host)
+        return DeliveryResult(ok=True, status_code=200)
+
+    stats = deliver_due(max_seconds=10, workers=8, per_endpoint=2, post=post)
+    assert stats['delivered'] == 16
+    assert peak['https://slow.example.com'] == 2
+    # The fast host was not queued behind the slow one
+    assert finished.index('https://fast.example.com') < finished.index('https://slow.example.com') + 4
+    assert max(i for i, h in enumerate(finished) if h == 'https://fast.example.com') < 10
+
+
+def test_n8n_events_to_one_url_are_batched(outbox_app, monkeypatch):
+    monkeypatch.setattr('server.config.N8N_BATCH_MAX_EVENTS', 3)
+    ids = _queue('https://n8n.example.com/webhook/x?token=t', 5, channel=CHANNEL_N8N, batchable=True)
+    single, = _queue('https://n8n.example.com/webhook/x?token=t', channel=CHANNEL_GENERIC)
+    bodies = []
+    post = lambda session, url, body, headers, timeout: bodies.append(json.loads(body)) or DeliveryResult(ok=True)
+
+    stats = deliver_due(max_seconds=5, post=post)
+    batched = sorted(len(body['events']) for body in bodies if 'events' in body)
+    assert batched == [2, 3]
+    assert {'n': 0} in bodies  # the non-batchable row went alone
+    assert stats['delivered'] == 6 and stats['requests'] == 3
+    assert all(outbox_app.rows()[i].status == 'delivered' for i in ids + [single])
+
+
+def test_generic_webhook_is_queued_with_a_matching_signature(outbox_app, monkeypatch):
+    from server.services.generic_webhook_service import generate_signature, send_generic_webhook
+
+    assert send_generic_webhook(3, 'lead.created', {'lead_id': '9', 'name': 'דנה'},
+                                webhook_url='https://hooks.example.com/in') is True
+    row, = outbox_app.rows().values()
+    headers = row.headers if isinstance(row.headers, dict) else json.loads(row.headers)
+    assert row.channel == CHANNEL_GENERIC and row.business_id == 3 and row.url == 'https://hooks.example.com/in'
+    assert headers['X-ProSaaS-Signature'] == generate_signature(row.body)
+    assert json.loads(row.body)['name'] == 'דנה'
+
+    # Outbox off: the caller sends it itself
+    monkeypatch.setattr('server.config.WEBHOOK_OUTBOX_ENABLED', False)
+    assert enqueue_webhook(CHANNEL_GENERIC, 'https://x', '{}', {}, 'test') is None
@@ -0,0 +1,370 @@
+"""
+Tests for whatsapp_ingest.py and routes_whatsapp.process_baileys_messages
+Chat partitioning, stream publish / drain order with acks and the wake key,
+failure isolation, backoff and dead letters, and the batched pipeline: message_id dedupe, one lead per chat, bulk insert
+"""
+import json
+import sys
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from server.services import whatsapp_ingest
+from server.services.whatsapp_ingest import (
+    DEAD_LETTER_STREAM, OUTAGE_PREFIX, RETRY_PREFIX, WAKE_PREFIX, drain_partition, ingestible_chat,
+    is_transient_error, partition_for, publish_baileys_messages, replay_dead_letters, stream_key,
+)
+
+
+class FakeRedis:
+    """Streams with one consumer group, strings with NX, hashes, and the two lock scripts"""
+
+    def __init__(self):
+        self.streams = {}   # key -> [(id, fields)]
+        self.pending = {}   # key -> [id] delivered, not acked
+        self.cursor = {}    # key -> last delivered index
+        self.delivered = {}  # entry id -> times delivered
+        self.groups = set()
+        self.strings = {}
+        self.hashes = {}
+        self.seq = 0
+
+    def pipeline(self, transaction=False):
+        return FakePipeline(self)
+
+    def xadd(self, key, fields):
+        self.seq += 1
+        entry_id = f"{self.seq}-0".encode()
+        self.streams.setdefault(key, []).append((entry_id, {k.encode(): v.encode() for k, v in fields.items()}))
+        return entry_id
+
+    def xlen(self, key):
+        return len(self.streams.get(key, []))
+
+    def xgroup_create(self, key, group, id='0', mkstream=False):
+        if (key, group) in self.groups:
+            raise Exception("BUSYGROUP Consumer Group name already exists")
+        self.groups.add((key, group))
+        self.streams.setdefault(key, [])
+
+    def xreadgroup(self, group, consumer, streams, count=None):
+        (key, from_id), = streams.items()
+        entries = self.streams.get(key, [])
+        if from_id != '>':  # pending entries after from_id
+            batch = [e for e in entries if e[0] in self.pending.get(key, []) and _id(e[0]) > _id(from_id)][:count]
+        else:
+            start = self.cursor.get(key, 0)
+            batch = entries[start:start + count]
+            self.cursor[key] = start + len(batch)
+            self.pending.setdefault(key, []).extend(e[0] for e in batch)
+        for entry_id, _ in batch:
+            self.delivered[entry_id] = self.delivered.get(entry_id, 0) + 1
+        return [[key.encode(), batch]] if batch else []
+
+    def xrange(self, key, min='-', count=None):
+        after = _id(min[1:]) if min.startswith('(') else (0, -1)
+        return [e for e in self.streams.get(key, []) if _id(e[0]) > after][:count]
+
+    def xack(self, key, group, *ids):
+        ids = _ids(ids)
+        self.pending[key] = [i for i in self.pending.get(key, []) if i not in ids]
+
+    def xdel(self, key, *ids):
+        ids = _ids(ids)
+        before = self.streams[key]
+        self.streams[key] = [e for e in before if e[0] not in ids]
+        removed_before_cursor = sum(1 for e in before[:self.cursor.get(key, 0)] if e[0] in ids)
+        self.cursor[key] = self.cursor.get(key, 0) - removed_before_cursor
+
+    def set(self, key, value, nx=False, ex=None, px=None):
+        if nx and key in self.strings:
+            return None
+        self.strings[key] = value
+        return True
+
+    def delete(self, key):
+        self.strings.pop(key, None)
+        self.hashes.pop(key, None)
+
+    def incr(self, key):
+        self.strings[key] = int(self.strings.get(key, 0)) + 1
+        return self.strings[key]
+
+    def expire(self, key, seconds):
+        return True
+
+    def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field] = value.encode()
+
+    def hmget(self, key, fields):
+        return [self.hashes.get(key, {}).get(field) for field in fields]
+
+    def hdel(self, key, *fields):
+        for field in fields:
+            self.hashes.get(key, {}).pop(field, None)
+
+    def eval(self, script, numkeys, key, token, *args):
+        if self.strings.get(key) != token:
+            return 0
+        if script == whatsapp_ingest._RELEASE_LOCK_LUA:
+            del self.strings[key]
+        return 1
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis, self.calls = redis, []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+def _id(entry_id):
+    ms, _, seq = (entry_id.decode() if isinstance(entry_id, bytes) else entry_id).partition('-')
+    return int(ms), int(seq or 0)
+
+
+def _ids(ids):
+    return {i if isinstance(i, bytes) else i.encode() for i in ids}
+
+
+def _msg(jid, message_id, text, from_me=False):
+    return {'key': {'remoteJid': jid, 'id': message_id, 'fromMe': from_me},
+            'message': {'conversation': text}, 'pushName': 'Dana', 'messageTimestamp': 0}
+
+
+@pytest.fixture
+def enqueued(monkeypatch):
+    woken = []
+    monkeypatch.setattr(whatsapp_ingest, 'enqueue_drain', lambda partition, redis_conn=None: woken.append(partition) or True)
+    return woken
+
+
+def test_partition_is_stable_and_skips_what_the_pipeline_skips():
+    assert partition_for('business_1', '972501234567@s.whatsapp.net', 16) == \
+        partition_for('business_1', '972501234567@s.whatsapp.net', 16)
+    assert len({partition_for('business_1', f'97250000{i:04d}@s.whatsapp.net', 16) for i in range(200)}) == 16
+    assert ingestible_chat(_msg('972501234567@s.whatsapp.net', 'A', 'hi')) == '972501234567@s.whatsapp.net'
+    assert ingestible_chat(_msg('82399031480511@lid', 'A', 'hi')) == '82399031480511@lid'
+    assert ingestible_chat(_msg('972501234567@s.whatsapp.net', 'A', 'hi', from_me=True)) is None
+    for jid in ('120363@g.us', 'status@broadcast', '1203@newsletter', ''):
+        assert ingestible_chat(_msg(jid, 'A', 'hi')) is None
+    assert ingestible_chat('not-a-message') is None
+
+
+def test_publish_wakes_each_partition_once_and_drain_keeps_chat_order(enqueued, monkeypatch):
+    monkeypatch.setattr(whatsapp_ingest, '_partitions', lambda: 1)
+    redis = FakeRedis()
+    chat_a, chat_b = '972500000001@s.whatsapp.net', '972500000002@s.whatsapp.net'
+    first = [_msg(chat_a, 'A1', 'one'), _msg(chat_b, 'B1', 'one'), _msg(chat_a, 'X', 'echo', from_me=True)]
+    assert publish_baileys_messages('business_1', first, redis) == 2
+    assert publish_baileys_messages('business_2', [_msg(chat_a, 'A2', 'two')], redis) == 1
+    assert enqueued == [0]  # second publish found the wake key set
+
+    calls = []
+    stats = drain_partition(0, lambda tenant, msgs: calls.append((tenant, [m['key']['id'] for m in msgs])) or len(msgs),
+                            redis_conn=redis, batch_size=2, max_seconds=60)
+    assert stats == {'status': 'drained', 'batches': 2, 'messages': 3, 'processed': 3, 'failed': 0, 'dead_lettered': 0}
+    assert calls == [('business_1', ['A1', 'B1']), ('business_2', ['A2'])]
+    assert redis.xlen(stream_key(0)) == 0 and not redis.pending[stream_key(0)]
+    assert f"{WAKE_PREFIX}0" not in redis.strings  # the next publish wakes a new drain job
+    assert publish_baileys_messages('business_1', [_msg(chat_a, 'A3', 'three')], redis) == 1
+    assert enqueued == [0, 0]
+
+
+def test_outage_backs_off_without_counting_a_failure(enqueued, monkeypatch):
+    monkeypatch.setattr(whatsapp_ingest, '_partitions', lambda: 1)
+    redis = FakeRedis()
+    publish_baileys_messages('business_1', [_msg('972500000001@s.whatsapp.net', f'M{i}', 'hi') for i in range(3)], redis)
+
+    def crash(tenant, msgs):
+        raise ConnectionError("db down")
+    for streak in (1, 2):
+        stats = drain_partition(0, crash, redis_conn=redis, batch_size=2)
+        assert stats['status'] == 'backoff' and stats['failed'] == 0 and stats['dead_lettered'] == 0
+        assert redis.strings[f"{OUTAGE_PREFIX}0"] == streak
+    assert redis.xlen(stream_key(0)) == 3 and len(redis.pending[stream_key(0)]) == 2
+    assert not redis.hashes.get(f"{RETRY_PREFIX}0")  # nothing counted against the messages
+    assert f"{WAKE_PREFIX}0" in redis.strings  # held: publishes don't restart the drain during the backoff
+    assert f"{whatsapp_ingest.LOCK_PREFIX}0" not in redis.strings
+
+    seen = []
+    stats = drain_partition(0, lambda tenant, msgs: seen.extend(m['key']['id'] for m in msgs) or len(msgs),
+                            redis_conn=redis, batch_size=2)
+    assert stats['status'] == 'drained' and seen == ['M0', 'M1', 'M2']
+    assert f"{OUTAGE_PREFIX}0" not in redis.strings
+
+
+def test_sqlalchemy_outages_are_transient():
+    from sqlalchemy.exc import IntegrityError, OperationalError
+    assert is_transient_error(OperationalError("SELECT 1", {}, Exception("server closed the connection")))
+    assert is_transient_error(TimeoutError())
+    assert not is_transient_error(IntegrityError("INSERT", {}, Exception("duplicate key")))
+    assert not is_transient_error(ValueError("bad message"))
+
+
+def test_failing_message_is_isolated_retried_with_backoff_and_dead_lettered(enqueued, monkeypatch):
+    from server.metrics import WA_INGEST_DEAD_LETTERED, metrics
+    monkeypatch.setattr(whatsapp_ingest, '_partitions', lambda: 1)
+    monkeypatch.setattr('server.config.WA_INGEST_MAX_DELIVERIES', 3)
+    monkeypatch.setattr('server.config.WA_INGEST_RETRY_BACKOFF_SECONDS', 5.0)
+    redis = FakeRedis()
+    publish_baileys_messages('business_1', [_msg('972500000001@s.whatsapp.net', f'M{i}', 'hi') for i in range(3)], redis)
+    dead_before = metrics.get_counter(WA_INGEST_DEAD_LETTERED)
+
+    calls = []
+
+    def crash(tenant, msgs):
+        calls.append([m['key']['id'] for m in msgs])
+        if any(m['key']['id'] == 'M0' for m in msgs):
+            raise ValueError("poison message")
+        return len(msgs)
+    stats = drain_partition(0, crash, redis_conn=redis, batch_size=2)
+    assert stats['status'] == 'drained' and stats['processed'] == 2 and stats['failed'] == 1
+    assert calls == [['M0', 'M1'], ['M0'], ['M1'], ['M2']]  # the batch is retried one by one
+    assert [i for i, _ in redis.streams[stream_key(0)]] == [b'1-0'] and redis.pending[stream_key(0)] == [b'1-0']
+
+    # Still backing off: the next drain leaves it pending
+    calls.clear()
+    assert drain_partition(0, crash, redis_conn=redis, batch_size=2)['failed'] == 0 and calls == []
+
+    def backoff_passes():
+        retries = redis.hashes[f"{RETRY_PREFIX}0"]
+        for entry_id, state in retries.items():
+            retries[entry_id] = json.dumps(dict(json.loads(state), retry_at=0)).encode()
+    backoff_passes()
+    assert drain_partition(0, crash, redis_conn=redis, batch_size=2)['failed'] == 1  # attempt 2
+    backoff_passes()
+    stats = drain_partition(0, crash, redis_conn=redis, batch_size=2)                 # attempt 3
+    assert stats['status'] == 'drained' and stats['dead_lettered'] == 1
+    dead = redis.streams[DEAD_LETTER_STREAM]
+    assert [(f[b'entry_id'], f[b'failures'], f[b'partition'], f[b'tenant']) for _, f in dead] == \
+        [(b'1-0', b'3', b'0', b'business_1')]
+    assert dead[0][1][b'error'] == b'ValueError: poison message'
+    assert redis.xlen(stream_key(0)) == 0 and not redis.pending[stream_key(0)]
+    assert not redis.hashes[f"{RETRY_PREFIX}0"]
+    assert metrics.get_counter(WA_INGEST_DEAD_LETTERED) == dead_before + 1
+
+    # Replay puts it back on its partition and wakes the drain
+    enqueued.clear()
+    redis.strings.pop(f"{WAKE_PREFIX}0", None)
+    assert replay_dead_letters(redis) == 1
+    assert not redis.streams[DEAD_LETTER_STREAM] and enqueued == [0]
+    seen = []
+    drain_partition(0, lambda tenant, msgs: seen.extend(m['key']['id'] for m in msgs) or len(msgs),
+                    redis_conn=redis, batch_size=2)
+    assert seen == ['M0']
+
+
+def test_busy_partition_is_left_to_the_lock_holder():
+    redis = FakeRedis()
+    redis.set(f"{whatsapp_ingest.LOCK_PREFIX}3", 'other-owner')
+    assert drain_partition(3, lambda t, m: 0, redis_conn=redis, lock_wait=0)['status'] == 'busy'
+
+
+def test_publish_falls_back_to_inline_when_a_partition_is_full(enqueued, monkeypatch):
+    monkeypatch.setattr(whatsapp_ingest, '_partitions', lambda: 1)
+    monkeypatch.setattr('server.config.WA_INGEST_STREAM_MAXLEN', 2)
+    redis = FakeRedis()
+    chat = '972500000001@s.whatsapp.net'
+    assert publish_baileys_messages('business_1', [_msg(chat, 'A1', 'one'), _msg(chat, 'A2', 'two')], redis) == 2
+    assert publish_baileys_messages('business_1', [_msg(chat, 'A3', 'three')], redis) is None
+    assert redis.xlen(stream_key(0)) == 2  # nothing trimmed, nothing appended
+
+
+def test_publish_returns_none_when_redis_is_down():
+    class DownRedis:
+        def pipeline(self, transaction=False):
+            raise ConnectionError("redis down")
+    assert publish_baileys_messages('business_1', [_msg('972500000001@s.whatsapp.net', 'A', 'hi')], DownRedis()) is None
+
+
+# ─── Batched pipeline ──────────────────────────────────────
+
+@pytest.fixture
+def pipeline_app(monkeypatch):
+    from flask import Flask
+    from sqlalchemy import text
+    from sqlalchemy.pool import StaticPool
+    from server.db import db as _db
+    from server.models_sql import WhatsAppConversationState, WhatsAppMessage
+    if getattr(sys.modules.get('server.jobs'), '__file__', None) is None:
+        monkeypatch.delitem(sys.modules, 'server.jobs', raising=False)  # another test module stubs the package
+    import server.routes_whatsapp as routes_whatsapp
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'poolclass': StaticPool}
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    _db.init_app(app)
+
+    leads, jobs = [], []
+    monkeypatch.setattr('server.services.business_resolver.resolve_business_with_fallback',
+                        lambda channel, tenant: (7, 'found'))
+    monkeypatch.setattr('server.services.contact_identity_service.ContactIdentityService.get_or_create_lead_for_whatsapp',
+                        lambda **kw: leads.append(kw) or SimpleNamespace(id=100 + len(leads), phone_e164=None, name=None))
+    monkeypatch.setattr(routes_whatsapp, 'update_session_activity', lambda **kw: None)
+    monkeypatch.setattr(routes_whatsapp, 'enqueue_job', lambda **kw: jobs.append(kw) or f"job-{len(jobs)}")
+    monkeypatch.setitem(sys.modules, 'server.jobs.whatsapp_ai_response_job',
+                        SimpleNamespace(whatsapp_ai_response_job=lambda **kw: None))
+    monkeypatch.setattr('server.whatsapp_appointment_handler.process_incoming_whatsapp_message', lambda **kw: {})
+
+    with app.app_context():
+        tables = [WhatsAppMessage.__table__, WhatsAppConversationState.__table__]
+        tables += [fk.column.table for t in tables for fk in t.foreign_keys]
+        _db.metadata.create_all(bind=_db.engine, tables=list(set(tables)))
+        _db.session.execute(text("CREATE UNIQUE INDEX idx_whatsapp_message_provider_id_unique "
+                                 "ON whatsapp_message(business_id, provider_message_id) "
+                                 "WHERE provider_message_id IS NOT NULL"))
+        _db.session.commit()
+        yield SimpleNamespace(db=_db, leads=leads, jobs=jobs, process=routes_whatsapp.process_baileys_messages)
+        _db.session.remove()
+
+
+def test_pipeline_bulk_inserts_dedupes_and_resolves_one_lead_per_chat(pipeline_app):
+    from server.models_sql import WhatsAppMessage
+    chat_a, chat_b = '972501111111@s.whatsapp.net', '972502222222@s.whatsapp.net'
+    batch = [
+        _msg(chat_a, 'A1', 'שלום'), _msg(chat_b, 'B1', 'hello'), _msg(chat_a, 'A2', 'מה המחיר?'),
+        _msg(chat_a, 'A2', 'מה המחיר?'),           # duplicate id inside the batch
+        _msg(chat_a, 'X1', 'from the bot', from_me=True),
+        _msg('120363@g.us', 'G1', 'group chatter'),
+    ]
+    assert pipeline_app.process('business_7', batch) == 4  # 3 new + 1 duplicate
+    rows = WhatsAppMessage.query.order_by(WhatsAppMessage.id).all()
+    assert [(r.provider_message_id, r.body, r.direction) for r in rows] == \
+        [('A1', 'שלום', 'in'), ('A2', 'מה המחיר?', 'in'), ('B1', 'hello', 'in')]
+    assert [kw['wa_message_id'] for kw in pipeline_app.leads] == ['A2', 'B1']  # newest message per chat
+    assert [job['message_id'] for job in pipeline_app.jobs] == [r.id for r in rows]
+    assert {r.to_number for r in rows} == {'972501111111', '972502222222'}
+    # No messageTimestamp (0): received now, chat order kept with distinct created_at
+    assert rows[0].created_at < rows[1].created_at
+
+    # Webhook retry / stream re-delivery: everything counts as processed, nothing is saved twice
+    assert pipeline_app.process('business_7', batch[:3]) == 3
+    assert WhatsAppMessage.query.count() == 3 and len(pipeline_app.jobs) == 3
+
+
+def test_pipeline_stores_each_message_at_its_own_timestamp(pipeline_app):
+    from server.models_sql import WhatsAppMessage
+    chat = '972501111111@s.whatsapp.net'
+    batch = [dict(_msg(chat, f'H{i}', f'history {i}'), messageTimestamp=stamp)
+             for i, stamp in enumerate([1700000000, 1700000060, 1700000060, 4102444800])]
+    assert pipeline_app.process('business_7', batch) == 4
+    rows = WhatsAppMessage.query.order_by(WhatsAppMessage.created_at).all()
+    assert [r.provider_message_id for r in rows] == ['H0', 'H1', 'H2', 'H3']
+    assert rows[0].created_at == datetime.utcfromtimestamp(1700000000)
+    assert rows[2].created_at - rows[1].created_at == timedelta(microseconds=1)
+    assert rows[3].created_at.year < 2100  # a stamp in the future is clamped to now
+
+
+def test_pipeline_skips_ai_when_disabled_for_the_chat(pipeline_app):
+    from server.models_sql import WhatsAppConversationState, WhatsAppMessage
+    pipeline_app.db.session.add(WhatsAppConversationState(business_id=7, phone='972501111111', ai_active=False))
+    pipeline_app.db.session.commit()
+    assert pipeline_app.process('business_7', [_msg('972501111111@s.whatsapp.net', 'A1', 'hi')]) == 0
+    assert WhatsAppMessage.query.count() == 1 and pipeline_app.jobs == []